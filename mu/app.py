@@ -19,18 +19,32 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
+import atexit
 import logging
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import (
+    TimedRotatingFileHandler,
+    QueueHandler,
+    QueueListener,
+)
 import os
 import platform
 import pkgutil
+import queue
 import sys
 
 from PyQt5.QtCore import QTimer, Qt
 from PyQt5.QtWidgets import QApplication, QSplashScreen
 
 from mu import __version__, language_code
-from mu.logic import Editor, LOG_FILE, LOG_DIR, DEBUGGER_PORT, ENCODING
+from mu.logic import (
+    Editor,
+    LOG_FILE,
+    LOG_DIR,
+    DATA_DIR,
+    DEBUGGER_PORT,
+    ENCODING,
+    get_log_level,
+)
 from mu.interface import Window
 from mu.resources import load_pixmap, load_icon
 from mu.modes import (
@@ -47,12 +61,24 @@ from mu.debugger.runner import run as run_debugger
 from mu.interface.themes import NIGHT_STYLE, DAY_STYLE, CONTRAST_STYLE
 
 
+#: Writes the queued log messages to the log file (see setup_logging).
+log_listener = None
+
+
 def setup_logging():
     """
     Configure logging.
+
+    Messages are put on a queue and written to the log file by the thread of
+    a QueueListener, so logging never waits for the disk. The listener is
+    returned (and kept in log_listener), and is stopped (writing any queued
+    messages) at exit.
     """
-    if not os.path.exists(LOG_DIR):
-        os.makedirs(LOG_DIR)
+    global log_listener
+    # The settings file, with the level to log at, is in the data directory.
+    for directory in (LOG_DIR, DATA_DIR):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
 
     # set logging format
     log_fmt = (
@@ -67,12 +93,19 @@ def setup_logging():
     )
     handler.setFormatter(formatter)
     handler.setLevel(logging.DEBUG)
+    listener = QueueListener(queue.Queue(), handler)
+    listener.start()
+    atexit.register(listener.stop)
+    log_listener = listener
 
-    # set up primary log
+    # set up primary log, at the configured level once it's able to log
+    # anything reading the settings has to say.
     log = logging.getLogger()
     log.setLevel(logging.DEBUG)
-    log.addHandler(handler)
+    log.addHandler(QueueHandler(listener.queue))
+    log.setLevel(get_log_level())
     sys.excepthook = excepthook
+    return listener
 
 
 def setup_modes(editor, view):
@@ -100,11 +133,24 @@ def setup_modes(editor, view):
     return modes
 
 
+def flush_log():
+    """
+    Wait for the queued log messages to be written to the log file. The
+    listener writing them is stopped, which waits for the queue to be
+    empty, then started again.
+    """
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener.start()
+
+
 def excepthook(*exc_args):
     """
     Log exception and exit cleanly.
     """
     logging.error("Unrecoverable error", exc_info=(exc_args))
+    # Mu may die without running the atexit hooks that write what's queued.
+    flush_log()
     sys.__excepthook__(*exc_args)
     sys.exit(1)
 
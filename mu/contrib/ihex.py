@@ -0,0 +1,551 @@
+# -*- coding: utf-8 -*-
+"""
+This module contains functions for encoding and decoding Intel HEX, the
+format used for the firmware and scripts flashed onto a BBC micro:bit.
+
+Runs of equally sized records at consecutive addresses are the common case
+(it's how scripts and firmware are laid out), so they are encoded, decoded
+and checksummed in bulk: a run is treated as a table with a row per record,
+and each column of bytes is handled with a single slice operation rather
+than looping over the records in Python. Anything else falls back to
+handling a record at a time.
+
+Copyright (c) 2015-2018 Nicholas H.Tollervey and others.
+
+See the LICENSE file for more information, or visit:
+
+https://opensource.org/licenses/MIT
+"""
+
+import binascii
+import re
+import struct
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+#: Record types.
+DATA = 0x00
+END_OF_FILE = 0x01
+EXTENDED_SEGMENT_ADDRESS = 0x02
+START_SEGMENT_ADDRESS = 0x03
+EXTENDED_LINEAR_ADDRESS = 0x04
+START_LINEAR_ADDRESS = 0x05
+
+
+#: The number of data bytes in a record written by encode().
+RECORD_SIZE = 16
+
+
+#: A decoded record. The address of a data record is absolute (i.e. the
+#: extended address in effect has been added to it).
+Record = namedtuple("Record", ["type", "address", "data"])
+
+
+class HexError(ValueError):
+    """
+    Raised when Intel HEX cannot be decoded.
+    """
+
+
+#: Translation table giving the two's complement of each byte.
+_NEGATE = bytes(-i & 0xFF for i in range(256))
+
+
+def _row_sums(table, width):
+    """
+    Returns the sum (modulo 256) of the bytes in each row of the given table
+    (a bytes-like object holding rows of width bytes), as bytes.
+
+    Each column is placed in its own lane of a big integer, just wide enough
+    to hold the sum of a row, so adding the integers for all the columns
+    sums every row at once.
+    """
+    rows = len(table) // width
+    lane = 2 if width * 0xFF <= 0xFFFF else 3
+    lanes = bytearray(rows * lane)
+    total = 0
+    for column in range(width):
+        lanes[lane - 1 :: lane] = table[column::width]
+        total += int.from_bytes(lanes, "big")
+    return total.to_bytes(rows * lane, "big")[lane - 1 :: lane]
+
+
+def _encode_run(data, low, size):
+    """
+    Returns a bytearray of data records (each starting with a newline) for
+    the given bytes, which must be a multiple of the record size and lie
+    within a single 64K block starting at the given low address.
+    """
+    rows = len(data) // size
+    # Each row starts with a spare byte, hexlified into the two characters
+    # that are then overwritten with the newline and colon.
+    width = size + 6
+    table = bytearray(rows * width)
+    table[1::width] = bytes([size]) * rows
+    addresses = struct.pack(
+        ">{}H".format(rows), *range(low, low + rows * size, size)
+    )
+    table[2::width] = addresses[0::2]
+    table[3::width] = addresses[1::2]
+    # The spare, record type (DATA) and checksum columns are already zero.
+    for column in range(size):
+        table[5 + column :: width] = data[column::size]
+    table[width - 1 :: width] = _row_sums(table, width).translate(_NEGATE)
+    output = bytearray(binascii.hexlify(table).upper())
+    output[0 :: width * 2] = b"\n" * rows
+    output[1 :: width * 2] = b":" * rows
+    return output
+
+
+def _extended_linear_address(upper):
+    """
+    Returns the extended linear address record selecting the 64K block
+    "upper".
+    """
+    checksum = -(0x06 + (upper >> 8) + (upper & 0xFF)) & 0xFF
+    return ":02000004%04X%02X" % (upper, checksum)
+
+
+def encode(data, address=0, record_size=RECORD_SIZE):
+    """
+    Returns a string of Intel HEX records (one per line) that will place the
+    given bytes-like data at the given address.
+
+    An extended linear address record is emitted first and then whenever the
+    data crosses into a new 64K block. No end of file record is added, so the
+    result can be embedded in another hex file.
+    """
+    data = bytes(data)
+    output = bytearray()
+    offset = 0
+    while offset < len(data):
+        addr = address + offset
+        low = addr & 0xFFFF
+        output += b"\n"
+        output += _extended_linear_address(addr >> 16).encode("ascii")
+        # Records don't straddle 64K blocks.
+        block = min(len(data) - offset, 0x10000 - low)
+        whole = block - block % record_size
+        if whole:
+            output += _encode_run(
+                data[offset : offset + whole], low, record_size
+            )
+        if whole < block:
+            output += _encode_run(
+                data[offset + whole : offset + block],
+                low + whole,
+                block - whole,
+            )
+        offset += block
+    return output[1:].decode("ascii")
+
+
+def _parse(record, upper, where):
+    """
+    Checks the given raw (unhexlified) record and returns a tuple of the
+    Record and the upper address in effect after it. The "where" is the
+    location of the record, reported if it's invalid.
+    """
+    if len(record) < 5 or record[0] != len(record) - 5:
+        raise HexError("Bad record length at {}.".format(where))
+    if sum(record) & 0xFF:
+        raise HexError("Bad checksum at {}.".format(where))
+    record_type = record[3]
+    address = (record[1] << 8) | record[2]
+    payload = record[4:-1]
+    if record_type == EXTENDED_LINEAR_ADDRESS:
+        upper = ((payload[0] << 8) | payload[1]) << 16
+    elif record_type == EXTENDED_SEGMENT_ADDRESS:
+        upper = ((payload[0] << 8) | payload[1]) << 4
+    elif record_type == DATA:
+        address += upper
+    return Record(record_type, address, payload), upper
+
+
+def _iter_records(text, pos, endpos, upper):
+    """
+    Yields each record in the text between pos and endpos, one line at a
+    time. Data records are given absolute addresses relative to the upper
+    address in effect at pos.
+    """
+    colon, newline = (":", "\n") if isinstance(text, str) else (b":", b"\n")
+    while pos < endpos:
+        start = text.find(colon, pos, endpos)
+        if start == -1:
+            return
+        pos = text.find(newline, start, endpos)
+        if pos == -1:
+            pos = endpos
+        try:
+            raw = binascii.unhexlify(text[start + 1 : pos].strip())
+        except (binascii.Error, ValueError):
+            raise HexError("Invalid hex digits at {}.".format(start))
+        record, upper = _parse(memoryview(raw), upper, start)
+        yield record
+
+
+def decode(text):
+    """
+    Returns a list of the records in the given Intel HEX (a string or
+    bytes-like object). All the records are unhexlified in one go before
+    their lengths and checksums are validated.
+
+    Raises a HexError if the text is not valid Intel HEX.
+    """
+    if isinstance(text, str):
+        text = text.encode("ascii")
+    lines = bytes(text).split()
+    if any(line[:1] != b":" or not len(line) % 2 for line in lines):
+        raise HexError("Records must start with ':' and contain whole bytes.")
+    try:
+        raw = memoryview(
+            binascii.unhexlify(b"".join(lines).replace(b":", b""))
+        )
+    except (binascii.Error, ValueError):
+        raise HexError("Invalid hex digits.")
+    result = []
+    upper = 0
+    offset = 0
+    for number, line in enumerate(lines):
+        end = offset + len(line) // 2
+        record, upper = _parse(raw[offset:end], upper, number)
+        result.append(record)
+        offset = end
+    return result
+
+
+def read_records(records, start, end, fill=0xFF):
+    """
+    Returns a bytearray of the memory between the start and end addresses
+    described by the given records. Addresses not covered by a data record
+    are set to the fill value.
+    """
+    result = bytearray([fill]) * (end - start)
+    for record in records:
+        if record.type != DATA:
+            continue
+        first = max(record.address, start)
+        last = min(record.address + len(record.data), end)
+        if first < last:
+            result[first - start : last - start] = record.data[
+                first - record.address : last - record.address
+            ]
+    return result
+
+
+def _decode_run(lines, address):
+    """
+    Returns the bytes held by the given lines if they're a run of valid,
+    equally sized data records at consecutive addresses from the given one.
+    Otherwise returns None.
+    """
+    rows = len(lines)
+    if not rows or len(set(map(len, lines))) != 1:
+        return None
+    colon = ":" if isinstance(lines[0], str) else b":"
+    joined = colon[:0].join(lines)
+    if joined.count(colon) != rows or not len(lines[0]) % 2:
+        return None
+    try:
+        table = binascii.unhexlify(joined.replace(colon, colon[:0]))
+    except (binascii.Error, ValueError):
+        return None
+    width = len(table) // rows
+    size = width - 5
+    low = address & 0xFFFF
+    if size < 1 or low + rows * size > 0x10000:
+        return None
+    addresses = struct.pack(
+        ">{}H".format(rows), *range(low, low + rows * size, size)
+    )
+    valid = (
+        table[0::width] == bytes([size]) * rows
+        and table[1::width] == addresses[0::2]
+        and table[2::width] == addresses[1::2]
+        and table[3::width] == bytes(rows)
+        and _row_sums(table, width) == bytes(rows)
+    )
+    if not valid:
+        return None
+    data = bytearray(rows * size)
+    for column in range(size):
+        data[column::size] = table[4 + column :: width]
+    return data
+
+
+def _blocks(text, start):
+    """
+    Yields the (start, end) offsets of each block of records in the text for
+    the 64K holding the given address, last first.
+    """
+    if isinstance(text, str):
+        ela = ":02000004"
+        marker = _extended_linear_address(start >> 16)[:13]
+    else:
+        ela = b":02000004"
+        marker = _extended_linear_address(start >> 16)[:13].encode("ascii")
+    pos = text.rfind(marker)
+    while pos != -1:
+        block_end = text.find(ela, pos + 1)
+        yield pos, len(text) if block_end == -1 else block_end
+        pos = text.rfind(marker, 0, pos)
+    if start >> 16 == 0:
+        # Records before any extended linear address are in the first 64K.
+        first = text.find(ela)
+        yield 0, len(text) if first == -1 else first
+
+
+def _read_blocks(text, blocks, start, end, fill):
+    """
+    Returns a bytearray of the memory between the start and end addresses
+    described by the records in the given blocks of the text, for when the
+    range doesn't start with a record.
+    """
+    if (end - 1) >> 16 != start >> 16:
+        return read_records(decode(text), start, end, fill)
+    # Only decode the data records that could overlap the range (a record
+    # holds at most 255 bytes). Comparing addresses as hex strings avoids
+    # converting every one of them.
+    low = "%04X" % max(0, (start & 0xFFFF) - 0xFF)
+    high = "%04X" % (((end - 1) & 0xFFFF) + 1) if end & 0xFFFF else "G"
+    data = "00"
+    if isinstance(text, bytes):
+        low, high, data = low.encode("ascii"), high.encode("ascii"), b"00"
+    lines = []
+    for pos, block_end in reversed(blocks):
+        lines.extend(
+            line
+            for line in text[pos:block_end].split()
+            if line[7:9] == data and low <= line[3:7].upper() < high
+        )
+    if isinstance(text, bytes):
+        lines = [line.decode("ascii") for line in lines]
+    upper = start & 0xFFFF0000
+    records = [
+        r._replace(address=r.address + upper) for r in decode("\n".join(lines))
+    ]
+    return read_records(records, start, end, fill)
+
+
+def read(text, start, end, fill=0xFF):
+    """
+    Returns a bytearray of the memory between the start and end addresses
+    described by the given Intel HEX (a string or bytes-like object).
+    Addresses not covered by a data record are set to the fill value.
+
+    Rather than decode the whole text, the record for the start address is
+    found by searching the blocks of records for its 64K, last first, and
+    records are decoded from there in ascending address order until the
+    range is covered. If there is no record at the start address only those
+    blocks are decoded. If the records go backwards or use segment
+    addressing, the whole text is decoded.
+    """
+    if not isinstance(text, (str, bytes)):
+        text = bytes(text)
+    pattern = r":[0-9A-F]{2}%04X00" % (start & 0xFFFF)
+    if isinstance(text, bytes):
+        pattern = pattern.encode("ascii")
+    pattern = re.compile(pattern, re.IGNORECASE)
+    segment = ":02000002" if isinstance(text, str) else b":02000002"
+    upper = start & 0xFFFF0000
+    blocks = []
+    for pos, block_end in _blocks(text, start):
+        if text.find(segment, pos, block_end) != -1:
+            # Segment addressing, which can't be read a block at a time.
+            return read_records(decode(text), start, end, fill)
+        blocks.append((pos, block_end))
+        match = pattern.search(text, pos, block_end)
+        if match:
+            break
+    else:
+        if not blocks and text.find(segment) != -1:
+            return read_records(decode(text), start, end, fill)
+        return _read_blocks(text, blocks, start, end, fill)
+    # Try to decode the records covering the whole range as a single run.
+    pos = match.start()
+    size = int(text[pos + 1 : pos + 3], 16)
+    if size:
+        rows = -(-(end - start) // size)
+        line = text.find(b"\n" if isinstance(text, bytes) else "\n", pos)
+        line = (len(text) if line == -1 else line) - pos + 1
+        lines = text[pos : pos + rows * line].split()
+        data = _decode_run(lines, start) if len(lines) == rows else None
+        if data is not None:
+            return data[: end - start]
+    result = bytearray([fill]) * (end - start)
+    expected = start
+    for record in _iter_records(text, pos, len(text), upper):
+        if record.type == END_OF_FILE:
+            break
+        if record.type == EXTENDED_SEGMENT_ADDRESS or (
+            record.type == DATA and record.address < expected
+        ):
+            # Segment addressing or the records are out of order.
+            return read_records(decode(text), start, end, fill)
+        if record.type != DATA:
+            continue
+        if record.address >= end:
+            break
+        last = min(record.address + len(record.data), end)
+        result[record.address - start : last - start] = record.data[
+            : last - record.address
+        ]
+        expected = last
+    return result
+
+
+class HexIndex:
+    """
+    An index of the data records in some Intel HEX text (a string or bytes),
+    mapping the address of each record to its offset in the text. It's built
+    the first time it's needed and can be saved with to_bytes() so it can be
+    reused without being built again.
+    """
+
+    #: Identifies (and versions) the serialised form of an index.
+    MAGIC = b"IHX1"
+
+    #: The header of the serialised form: magic, length and CRC of the text.
+    HEADER = struct.Struct(">4sII")
+
+    def __init__(self, text):
+        if not isinstance(text, (str, bytes)):
+            text = bytes(text)
+        self.text = text
+        self._addresses = None
+        self._offsets = None
+
+    @classmethod
+    def from_bytes(cls, text, data):
+        """
+        Returns the index of the given text serialised in data (by
+        to_bytes()), or None if the data is not an index of this text.
+        """
+        index = cls(text)
+        header = cls.HEADER.size
+        if len(data) < header or (len(data) - header) % 16:
+            return None
+        magic, length, crc = cls.HEADER.unpack_from(data)
+        if (magic, length, crc) != (cls.MAGIC, len(text), index._crc()):
+            return None
+        count = (len(data) - header) // 16
+        index._addresses = array("Q")
+        index._addresses.frombytes(data[header : header + count * 8])
+        index._offsets = array("Q")
+        index._offsets.frombytes(data[header + count * 8 :])
+        return index
+
+    def _crc(self):
+        """
+        Returns the CRC32 of the indexed text.
+        """
+        text = self.text
+        if isinstance(text, str):
+            text = text.encode("ascii")
+        return zlib.crc32(text) & 0xFFFFFFFF
+
+    def to_bytes(self):
+        """
+        Returns the index serialised as bytes, for caching.
+        """
+        self.build()
+        header = self.HEADER.pack(self.MAGIC, len(self.text), self._crc())
+        return header + self._addresses.tobytes() + self._offsets.tobytes()
+
+    def build(self):
+        """
+        Builds the index, if it hasn't been already.
+        """
+        if self._addresses is not None:
+            return
+        text = self.text
+        if isinstance(text, str):
+            colon, newline, data, linear, segment = ":", "\n", "00", "04", "02"
+        else:
+            colon, newline = b":", b"\n"
+            data, linear, segment = b"00", b"04", b"02"
+        addresses = []
+        offsets = []
+        upper = 0
+        pos = text.find(colon)
+        while pos != -1:
+            kind = text[pos + 7 : pos + 9]
+            if kind == data:
+                addresses.append(upper + int(text[pos + 3 : pos + 7], 16))
+                offsets.append(pos)
+            elif kind == linear:
+                upper = int(text[pos + 9 : pos + 13], 16) << 16
+            elif kind == segment:
+                upper = int(text[pos + 9 : pos + 13], 16) << 4
+            pos = text.find(newline, pos)
+            if pos != -1:
+                pos = text.find(colon, pos)
+        if addresses != sorted(addresses):
+            # Keep records for the same address in the order they appear, so
+            # later ones take precedence.
+            order = sorted(range(len(addresses)), key=addresses.__getitem__)
+            addresses = [addresses[i] for i in order]
+            offsets = [offsets[i] for i in order]
+        self._addresses = array("Q", addresses)
+        self._offsets = array("Q", offsets)
+
+    def __len__(self):
+        self.build()
+        return len(self._addresses)
+
+    def find(self, address):
+        """
+        Returns the offset in the text of the record starting at the given
+        address, or None if there isn't one.
+        """
+        self.build()
+        i = bisect_left(self._addresses, address)
+        if i < len(self._addresses) and self._addresses[i] == address:
+            return self._offsets[i]
+        return None
+
+    def _line(self, offset):
+        """
+        Returns the record (line) at the given offset in the text.
+        """
+        newline = "\n" if isinstance(self.text, str) else b"\n"
+        end = self.text.find(newline, offset)
+        return self.text[offset : len(self.text) if end == -1 else end].strip()
+
+    def read(self, start, end, fill=0xFF):
+        """
+        Returns a bytearray of the memory between the start and end addresses,
+        decoding only the records that overlap the range. Addresses not
+        covered by a data record are set to the fill value.
+        """
+        self.build()
+        # A record holds at most 255 bytes.
+        first = bisect_left(self._addresses, start - 0xFF)
+        last = bisect_left(self._addresses, end)
+        addresses = self._addresses[first:last]
+        offsets = self._offsets[first:last]
+        if not addresses:
+            return bytearray([fill]) * (end - start)
+        # Try to decode the records from the last one starting at or before
+        # the start address (or the first, if none do) as a single run.
+        run = max(bisect_right(addresses, start) - 1, 0)
+        if list(offsets[run:]) == sorted(offsets[run:]):
+            text = self.text[offsets[run] : offsets[-1]]
+            lines = (text + self._line(offsets[-1])).split()
+            base = addresses[run]
+            data = _decode_run(lines, base)
+            if data is not None and len(data) >= end - base:
+                if start >= base:
+                    return bytearray(data[start - base : end - base])
+                # The range starts before the run, so fill up to it.
+                return bytearray([fill]) * (base - start) + data[: end - base]
+        records = []
+        for address, offset in zip(addresses, offsets):
+            line = self._line(offset)
+            if isinstance(line, bytes):
+                line = line.decode("ascii")
+            record = decode(line)[0]
+            records.append(record._replace(address=address))
+        return read_records(records, start, end, fill)
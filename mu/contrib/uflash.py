@@ -13,14 +13,24 @@ https://opensource.org/licenses/MIT
 from __future__ import print_function
 
 import argparse
-import binascii
 import ctypes
+import hashlib
 import os
+import re
+import select
 import struct
 import sys
+import threading
 from subprocess import check_output
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
 import time
 
+from mu.contrib import ihex
+
 # nudatus is an optional dependancy
 can_minify = True
 try:
@@ -55,6 +65,32 @@ _MAX_SIZE = 8188
 MICROPYTHON_VERSION = "1.0.1"
 
 
+#: The path to the bundled MicroPython runtime hex, read on first use.
+_RUNTIME_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "microbit-micropython.hex"
+)
+
+
+#: Cache of the bundled runtime, populated by get_runtime().
+_runtime_cache = {}
+
+
+#: How long (in seconds) a watched file must be left alone after changing
+#: before it counts as saved, so a burst of writes is only acted on once.
+_DEBOUNCE = 0.2
+
+
+#: The inotify events for a file in a watched directory being saved, whether
+#: written in place or written elsewhere and moved into place.
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+
+
+#: The header of each inotify event: watch descriptor, mask, cookie and the
+#: length of the (NUL padded) file name that follows.
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
 def get_version():
     """
     Returns a string representation of the version information of this project.
@@ -62,6 +98,41 @@ def get_version():
     return ".".join([str(i) for i in _VERSION])
 
 
+def get_runtime():
+    """
+    Returns a string representation of the bundled MicroPython runtime hex.
+
+    The runtime is read from disk the first time it is needed and cached for
+    the lifetime of the process.
+    """
+    if "hex" not in _runtime_cache:
+        with open(_RUNTIME_PATH) as runtime_file:
+            _runtime_cache["hex"] = runtime_file.read()
+    return _runtime_cache["hex"]
+
+
+def split_runtime(runtime_hex):
+    """
+    Given a string representing a MicroPython runtime hex, returns a tuple of
+    the ASCII encoded (prefix, suffix) either side of where a hex encoded
+    Python script is embedded (five records from the end).
+    """
+    records = runtime_hex.split()
+    prefix = "\n".join(records[:-5]) + "\n"
+    suffix = "\n".join(records[-5:]) + "\n"
+    return prefix.encode("ascii"), suffix.encode("ascii")
+
+
+def get_runtime_parts():
+    """
+    Returns the (prefix, suffix) of the bundled MicroPython runtime hex, as
+    produced by split_runtime(). They're only computed once.
+    """
+    if "parts" not in _runtime_cache:
+        _runtime_cache["parts"] = split_runtime(get_runtime())
+    return _runtime_cache["parts"]
+
+
 def get_minifier():
     """
     Report the minifier will be used when minify=True
@@ -102,41 +173,24 @@ def hexlify(script, minify=False):
         # 'MP' = 2 bytes, script length is another 2 bytes.
         raise ValueError("Python script must be less than 8188 bytes.")
     # Convert to .hex format.
-    output = [":020000040003F7"]  # extended linear address, 0x0003.
-    addr = _SCRIPT_ADDR
-    for i in range(0, len(data), 16):
-        chunk = data[i : min(i + 16, len(data))]
-        chunk = struct.pack(">BHB", len(chunk), addr & 0xFFFF, 0) + chunk
-        checksum = (-(sum(bytearray(chunk)))) & 0xFF
-        hexline = ":%s%02X" % (
-            strfunc(binascii.hexlify(chunk)).upper(),
-            checksum,
-        )
-        output.append(hexline)
-        addr += 16
-    return "\n".join(output)
+    return ihex.encode(data, _SCRIPT_ADDR)
 
 
-def unhexlify(blob):
+def _script_from_region(region):
     """
-    Takes a hexlified script and turns it back into a string of Python code.
+    Given the bytes of the flash memory holding an embedded script (starting
+    with the "MP<size>" header) returns the script as a string. If there is
+    no valid script, an empty string is returned.
     """
-    lines = blob.split("\n")[1:]
-    output = []
-    for line in lines:
-        # Discard the address, length etc. and reverse the hexlification
-        output.append(binascii.unhexlify(line[9:-2]))
     # Check the header is correct ("MP<size>")
-    if output[0][0:2].decode("utf-8") != u"MP":
+    if region[0:2] != b"MP":
+        return ""
+    size = struct.unpack("<H", region[2:4])[0]
+    if size > _MAX_SIZE:
         return ""
-    # Strip off header
-    output[0] = output[0][4:]
-    # and strip any null bytes from the end
-    output[-1] = output[-1].strip(b"\x00")
-    script = b"".join(output)
     try:
-        result = script.decode("utf-8")
-        return result
+        # Strip off the header and any null bytes from the end.
+        return bytes(region[4 : 4 + size]).rstrip(b"\x00").decode("utf-8")
     except UnicodeDecodeError:
         # Return an empty string because in certain rare circumstances (where
         # the source hex doesn't include any embedded Python code) this
@@ -144,6 +198,13 @@ def unhexlify(blob):
         return ""
 
 
+def unhexlify(blob):
+    """
+    Takes a hexlified script and turns it back into a string of Python code.
+    """
+    return extract_script(blob)
+
+
 def embed_hex(runtime_hex, python_hex=None):
     """
     Given a string representing the MicroPython runtime hex, will embed a
@@ -159,62 +220,125 @@ def embed_hex(runtime_hex, python_hex=None):
         raise ValueError("MicroPython runtime hex required.")
     if not python_hex:
         return runtime_hex
-    py_list = python_hex.split()
-    runtime_list = runtime_hex.split()
-    embedded_list = []
-    # The embedded list should be the original runtime with the Python based
-    # hex embedded two lines from the end.
-    embedded_list.extend(runtime_list[:-5])
-    embedded_list.extend(py_list)
-    embedded_list.extend(runtime_list[-5:])
-    return "\n".join(embedded_list) + "\n"
-
-
-def extract_script(embedded_hex):
+    if runtime_hex is _runtime_cache.get("hex"):
+        # The bundled runtime, so reuse the parts already split apart.
+        prefix, suffix = get_runtime_parts()
+    else:
+        prefix, suffix = split_runtime(runtime_hex)
+    # The embedded hex should be the original runtime with the Python based
+    # hex embedded five records from the end.
+    return "{}{}\n{}".format(
+        prefix.decode("ascii"),
+        "\n".join(python_hex.split()),
+        suffix.decode("ascii"),
+    )
+
+
+def extract_script(embedded_hex, index=None):
     """
     Given a hex file containing the MicroPython runtime and an embedded Python
     script, will extract the original Python script.
 
+    If given, the index should be an ihex.HexIndex of the embedded_hex and is
+    used to find the script's records without searching for them.
+
     Returns a string containing the original embedded script.
     """
-    hex_lines = embedded_hex.split("\n")
-    script_addr_high = hex((_SCRIPT_ADDR >> 16) & 0xFFFF)[2:].upper().zfill(4)
-    script_addr_low = hex(_SCRIPT_ADDR & 0xFFFF)[2:].upper().zfill(4)
-    start_script = None
-    within_range = False
-    # Look for the script start address
-    for loc, val in enumerate(hex_lines):
-        if val[0:9] == ":02000004":
-            # Reached an extended address record, check if within script range
-            within_range = val[9:13].upper() == script_addr_high
-        elif (
-            within_range
-            and val[0:3] == ":10"
-            and val[3:7].upper() == script_addr_low
-        ):
-            start_script = loc
-            break
-    if start_script:
-        # Find the end of the script
-        end_script = None
-        for loc, val in enumerate(hex_lines[start_script:]):
-            if val[9:41] == "FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF":
-                end_script = loc + start_script
-                break
-        # Pass the extracted hex through unhexlify
-        return unhexlify(
-            "\n".join(
-                hex_lines[start_script - 1 : end_script if end_script else -6]
+    if not embedded_hex:
+        return ""
+    if index is not None:
+        read = index.read
+    else:
+
+        def read(start, end):
+            return ihex.read(embedded_hex, start, end)
+
+    # Read the header first, so only as much as the script needs is decoded.
+    header = read(_SCRIPT_ADDR, _SCRIPT_ADDR + 4)
+    if header[0:2] != b"MP":
+        return ""
+    size = struct.unpack("<H", header[2:4])[0]
+    region = read(_SCRIPT_ADDR, _SCRIPT_ADDR + 4 + min(size, _MAX_SIZE))
+    return _script_from_region(region)
+
+
+def load_index(embedded_hex, cache_path):
+    """
+    Returns an ihex.HexIndex of the embedded_hex, loaded from the file at
+    cache_path if it holds an index of this hex. Otherwise the index is built
+    and saved to cache_path for next time.
+    """
+    try:
+        with open(cache_path, "rb") as cache_file:
+            index = ihex.HexIndex.from_bytes(embedded_hex, cache_file.read())
+        if index is not None:
+            return index
+    except (IOError, OSError):
+        pass
+    index = ihex.HexIndex(embedded_hex)
+    with open(cache_path, "wb") as cache_file:
+        cache_file.write(index.to_bytes())
+    return index
+
+
+def _extract_file(path_to_hex, cache_dir=None):
+    """
+    Returns a tuple of the script extracted from the hex file at the given
+    path and None, or None and an error message if it couldn't be extracted.
+
+    If cache_dir is given, the index of the hex file is cached there.
+    """
+    try:
+        with open(path_to_hex) as hex_file:
+            embedded_hex = hex_file.read()
+        index = None
+        if cache_dir:
+            name = hashlib.sha1(
+                os.path.abspath(path_to_hex).encode("utf-8")
+            ).hexdigest()
+            index = load_index(
+                embedded_hex, os.path.join(cache_dir, name + ".idx")
             )
+        return extract_script(embedded_hex, index), None
+    except Exception as ex:
+        return None, str(ex)
+
+
+def extract_scripts(paths_to_hex, processes=None, cache_dir=None):
+    """
+    Extracts the scripts embedded in many hex files in parallel, using a pool
+    of processes (by default, one per CPU).
+
+    Yields a tuple of (path, script, error) for each of the paths_to_hex in
+    turn. If the script couldn't be extracted the script is None and the
+    error describes why.
+
+    If cache_dir is given, the index of each hex file is cached there so the
+    script can be found without searching the file the next time.
+    """
+    if cache_dir and not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    paths_to_hex = list(paths_to_hex)
+    with ProcessPoolExecutor(processes) as pool:
+        results = pool.map(
+            _extract_file,
+            paths_to_hex,
+            [cache_dir] * len(paths_to_hex),
+            chunksize=max(1, len(paths_to_hex) // 64),
         )
-    return ""
+        for path, (script, error) in zip(paths_to_hex, results):
+            yield path, script, error
 
 
-def find_microbit():
+def find_microbits(find_volumes=None):
     """
-    Returns a path on the filesystem that represents the plugged in BBC
-    micro:bit that is to be flashed. If no micro:bit is found, it returns
-    None.
+    Returns a list of paths on the filesystem that represent the plugged in
+    BBC micro:bits. If no micro:bit is found, the list is empty.
+
+    On Linux and OSX, find_volumes (if given) is called with the volume name
+    to look up the paths at which such volumes are mounted, so a caller that
+    keeps its own table of mounted volumes doesn't need the unix "mount"
+    command to be run each time.
 
     Works on Linux, OSX and Windows. Will raise a NotImplementedError
     exception if run on any other operating system.
@@ -222,12 +346,24 @@ def find_microbit():
     # Check what sort of operating system we're on.
     if os.name == "posix":
         # 'posix' means we're on Linux or OSX (Mac).
-        # Call the unix "mount" command to list the mounted volumes.
+        if find_volumes:
+            return find_volumes("MICROBIT")
+        # Call the unix "mount" command to list the mounted volumes. Lines
+        # are of the form "DEVICE on MOUNT_POINT [type TYPE] (OPTIONS)" and
+        # the mount point may contain spaces.
         mount_output = check_output("mount").splitlines()
-        mounted_volumes = [x.split()[2] for x in mount_output]
-        for volume in mounted_volumes:
-            if volume.endswith(b"MICROBIT"):
-                return volume.decode("utf-8")  # Return a string not bytes.
+        mounted_volumes = []
+        for line in mount_output:
+            match = re.match(rb"^.*? on (.+?)(?: type \S+)? \(", line)
+            if match:
+                mounted_volumes.append(match.group(1).decode("utf-8"))
+        # Several micro:bits are mounted as MICROBIT, MICROBIT1 (or
+        # "MICROBIT 1" on OSX) and so on.
+        return [
+            volume
+            for volume in mounted_volumes
+            if re.match(r"^MICROBIT( ?\d+)?$", os.path.basename(volume))
+        ]
     elif os.name == "nt":
         # 'nt' means we're on Windows.
 
@@ -259,6 +395,7 @@ def find_microbit():
         # with SEM_FAILCRITICALERRORS (1) prevents this popup.
         #
         old_mode = ctypes.windll.kernel32.SetErrorMode(1)
+        microbits = []
         try:
             for disk in "ABCDEFGHIJKLMNOPQRSTUVWXYZ":
                 path = "{}:\\".format(disk)
@@ -271,14 +408,28 @@ def find_microbit():
                     os.path.exists(path)
                     and get_volume_name(path) == "MICROBIT"
                 ):
-                    return path
+                    microbits.append(path)
         finally:
             ctypes.windll.kernel32.SetErrorMode(old_mode)
+        return microbits
     else:
         # No support for unknown operating systems.
         raise NotImplementedError('OS "{}" not supported.'.format(os.name))
 
 
+def find_microbit(find_volumes=None):
+    """
+    Returns a path on the filesystem that represents the plugged in BBC
+    micro:bit that is to be flashed. If no micro:bit is found, it returns
+    None. See find_microbits() for find_volumes.
+
+    Works on Linux, OSX and Windows. Will raise a NotImplementedError
+    exception if run on any other operating system.
+    """
+    microbits = find_microbits(find_volumes)
+    return microbits[0] if microbits else None
+
+
 def save_hex(hex_file, path):
     """
     Given a string representation of a hex file, this function copies it to
@@ -298,12 +449,65 @@ def save_hex(hex_file, path):
         output.write(hex_file.encode("ascii"))
 
 
+def save_embedded_hex(python_hex, path, runtime_parts=None):
+    """
+    Given a string representation of a hex encoded Python script, this
+    function streams the script embedded within the MicroPython runtime to
+    the specified path, thus causing the device mounted at that point to be
+    flashed.
+
+    The runtime_parts should be the (prefix, suffix) of the runtime, as
+    returned by split_runtime(). If unspecified, the bundled runtime is used.
+    Only the script needs encoding, so the cost of writing the .hex is in
+    proportion to the size of the script rather than the runtime.
+
+    If the filename at the end of the path does not end in '.hex' it will raise
+    a ValueError.
+    """
+    if not path.endswith(".hex"):
+        raise ValueError("The path to flash must be for a .hex file.")
+    prefix, suffix = runtime_parts or get_runtime_parts()
+    with open(path, "wb") as output:
+        output.write(prefix)
+        if python_hex:
+            output.write(python_hex.encode("ascii"))
+            output.write(b"\n")
+        output.write(suffix)
+
+
+def save_to_microbits(python_hex, paths_to_microbits, runtime_parts=None):
+    """
+    Given a string representation of a hex encoded Python script, this
+    function writes it, embedded within the MicroPython runtime, to all the
+    referenced micro:bits at once. Writing to a device is limited by the speed
+    of its USB connection rather than by Python, so there's a thread per
+    device.
+
+    As each device is finished with, yields its path and the exception raised
+    writing to it (or None if it was flashed).
+    """
+    workers = max(1, min(32, len(paths_to_microbits)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                save_embedded_hex,
+                python_hex,
+                os.path.join(path, "micropython.hex"),
+                runtime_parts,
+            ): path
+            for path in paths_to_microbits
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.exception()
+
+
 def flash(
     path_to_python=None,
     paths_to_microbits=None,
     path_to_runtime=None,
     python_script=None,
     minify=False,
+    report=None,
 ):
     """
     Given a path to or source of a Python file will attempt to create a hex
@@ -325,6 +529,11 @@ def flash(
     the MicroPython runtime. This feature is useful if a custom build of
     MicroPython is available.
 
+    All the devices are flashed at once. If given, report is called with the
+    path of each device and the exception raised flashing it (or None) as
+    each is finished with. Should any device fail, the first exception is
+    raised once they're all finished with.
+
     If the automatic discovery fails, then it will raise an IOError.
     """
     # Check for the correct version of Python.
@@ -343,13 +552,12 @@ def flash(
     elif python_script:
         python_hex = hexlify(python_script, minify)
 
-    runtime = _RUNTIME
     # Load the hex for the runtime.
     if path_to_runtime:
         with open(path_to_runtime) as runtime_file:
-            runtime = runtime_file.read()
-    # Generate the resulting hex file.
-    micropython_hex = embed_hex(runtime, python_hex)
+            runtime_parts = split_runtime(runtime_file.read())
+    else:
+        runtime_parts = get_runtime_parts()
     # Find the micro:bit.
     if not paths_to_microbits:
         found_microbit = find_microbit()
@@ -360,7 +568,16 @@ def flash(
         for path in paths_to_microbits:
             hex_path = os.path.join(path, "micropython.hex")
             print("Flashing Python to: {}".format(hex_path))
-            save_hex(micropython_hex, hex_path)
+        errors = []
+        for path, error in save_to_microbits(
+            python_hex, paths_to_microbits, runtime_parts
+        ):
+            if report:
+                report(path, error)
+            if error:
+                errors.append(error)
+        if errors:
+            raise errors[0]
     else:
         raise IOError("Unable to find micro:bit. Is it plugged in?")
 
@@ -379,25 +596,210 @@ def extract(path_to_hex, output_path=None):
             print(python_script)
 
 
+def batch_extract(paths_to_hex, processes=None, cache_dir=None):
+    """
+    Extracts the scripts from the given hex files in parallel, saving each
+    one alongside its hex file with a ".py" extension. Reports the outcome
+    for each file and returns the number that couldn't be extracted.
+    """
+    failures = 0
+    results = extract_scripts(paths_to_hex, processes, cache_dir)
+    for path, script, error in results:
+        if error is None and not script:
+            error = "No Python script found."
+        if error is not None:
+            failures += 1
+            print("{}: {}".format(path, error), file=sys.stderr)
+            continue
+        output_path = os.path.splitext(path)[0] + ".py"
+        with open(output_path, "w") as output_file:
+            output_file.write(script)
+        print("{} -> {}".format(path, output_path))
+    return failures
+
+
+def _inotify_watch(path):
+    """
+    Return a file descriptor from which to read inotify events for files
+    saved in the referenced directory, or None if inotify isn't available
+    (e.g. on OSX or Windows).
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (AttributeError, OSError):
+        return None
+    if fd < 0:
+        return None
+    mask = _IN_CLOSE_WRITE | _IN_MOVED_TO
+    if libc.inotify_add_watch(fd, os.fsencode(path), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class FileWatcher(object):
+    """
+    Watches a file for changes. On Linux inotify watches the directory
+    containing the file, since editors often save by replacing it. Elsewhere,
+    the file's modification time is polled every interval seconds.
+
+    Changes within debounce seconds of each other count as one.
+    """
+
+    def __init__(self, path, debounce=_DEBOUNCE, interval=1):
+        self.path = os.path.abspath(path)
+        self.name = os.fsencode(os.path.basename(self.path))
+        self.debounce = debounce
+        self.interval = interval
+        self.mtime = os.path.getmtime(self.path)
+        self.fd = _inotify_watch(os.path.dirname(self.path))
+
+    def close(self):
+        """
+        Stop watching the file.
+        """
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def _saved(self, timeout):
+        """
+        Return a boolean to indicate if inotify reports the file was saved
+        within timeout seconds (or forever, if timeout is None).
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            events = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        saved = False
+        offset = 0
+        while offset < len(events):
+            _, _, _, length = _INOTIFY_EVENT.unpack_from(events, offset)
+            offset += _INOTIFY_EVENT.size
+            name = events[offset : offset + length].rstrip(b"\0")
+            saved = saved or name == self.name
+            offset += length
+        return saved
+
+    def _modified(self):
+        """
+        Return a boolean to indicate if the file's modification time has
+        changed since last checked.
+        """
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            # Part way through being replaced, so not saved yet.
+            return False
+        modified = mtime != self.mtime
+        self.mtime = mtime
+        return modified
+
+    def wait(self, timeout=None):
+        """
+        Wait for the file to be changed and return True, or return False if
+        it isn't changed within timeout seconds (or forever, if timeout is
+        None). Further changes in quick succession are waited out.
+        """
+        if self.fd is not None:
+            deadline = None if timeout is None else time.time() + timeout
+            while not self._saved(
+                None if deadline is None else max(0, deadline - time.time())
+            ):
+                if deadline is not None and time.time() >= deadline:
+                    return False
+            while self._saved(self.debounce):
+                pass
+            return True
+        waited = 0
+        while not self._modified():
+            if timeout is not None and waited >= timeout:
+                return False
+            time.sleep(self.interval)
+            waited += self.interval
+        time.sleep(self.debounce)
+        while self._modified():
+            time.sleep(self.debounce)
+        return True
+
+
+class FlashPipeline(object):
+    """
+    Calls the provided function with *args and **kwargs in a background
+    thread each time a build is submitted. A build submitted while the
+    function is still running waits for it, replacing any build already
+    waiting: if a newer save arrives, the pending build for an older one is
+    cancelled since it's out of date.
+    """
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.pending = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self):
+        """
+        Ask for a build, replacing any still waiting to start.
+        """
+        with self.condition:
+            if self.pending:
+                print("Cancelling pending build for a newer change.")
+            self.pending = True
+            self.condition.notify()
+
+    def close(self):
+        """
+        Cancel any pending build and wait for a running one to finish.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.closed)
+                if self.closed:
+                    return
+                self.pending = False
+            try:
+                self.func(*self.args, **self.kwargs)
+            except Exception as ex:
+                print("Error: {!s}".format(ex), file=sys.stderr)
+
+
 def watch_file(path, func, *args, **kwargs):
     """
-    Watch a file for changes by polling its last modification time. Call the
-    provided function with *args and **kwargs upon modification.
+    Watch a file for changes. Call the provided function with *args and
+    **kwargs upon modification, from a FlashPipeline so that changes made
+    while it's running result in only one more call.
     """
     if not path:
         raise ValueError("Please specify a file to watch")
     print('Watching "{}" for changes'.format(path))
-    last_modification_time = os.path.getmtime(path)
+    watcher = FileWatcher(path)
+    pipeline = FlashPipeline(func, *args, **kwargs)
     try:
         while True:
-            time.sleep(1)
-            new_modification_time = os.path.getmtime(path)
-            if new_modification_time == last_modification_time:
-                continue
-            func(*args, **kwargs)
-            last_modification_time = new_modification_time
+            if watcher.wait():
+                pipeline.submit()
     except KeyboardInterrupt:
         pass
+    finally:
+        pipeline.close()
+        watcher.close()
 
 
 def main(argv=None):
@@ -434,6 +836,20 @@ def main(argv=None):
             " instead of creating the hex file."
         ),
     )
+    parser.add_argument(
+        "-b",
+        "--batch",
+        action="store_true",
+        help=(
+            "Extract python source from many hex files (the source and"
+            " targets) in parallel, saving each as a .py file alongside."
+        ),
+    )
+    parser.add_argument(
+        "--cache",
+        default=None,
+        help="Cache indexes of the hex files extracted in batch here.",
+    )
     parser.add_argument(
         "-w",
         "--watch",
@@ -448,7 +864,12 @@ def main(argv=None):
     )
     args = parser.parse_args(argv)
 
-    if args.extract:
+    if args.batch:
+        paths = ([args.source] if args.source else []) + (args.target or [])
+        if batch_extract(paths, cache_dir=args.cache):
+            sys.exit(1)
+
+    elif args.extract:
         try:
             extract(args.source, args.target)
         except Exception as ex:
@@ -503,14494 +924,5 @@ def main(argv=None):
             sys.exit(1)
 
 
-#: A string representation of the MicroPython runtime hex.
-_RUNTIME = """:020000040000FA
-:1000000000400020218E01005D8E01005F8E010006
-:1000100000000000000000000000000000000000E0
-:10002000000000000000000000000000618E0100E0
-:100030000000000000000000638E0100658E0100DA
-:10004000678E01005D3D000065950100678E01002F
-:10005000678E010000000000218F0100678E010003
-:1000600069E80000D59A0100D9930100678E01006C
-:10007000678E0100678E0100678E0100678E0100A8
-:10008000678E0100678E0100678E0100678E010098
-:10009000678E01000D8A0100D98A0100A5E90000E0
-:1000A000B5E90000678E01000000000000000000BC
-:1000B0000000000000000000000000000000000040
-:1000C00010B5064C2378002B07D1054B002B02D02E
-:1000D000044800E000BF0123237010BD2001002070
-:1000E0000000000098870300044B10B5002B03D0DC
-:1000F0000349044800E000BF10BDC04600000000F6
-:100100002401002098870300164B002B00D1144BCC
-:100110009D46402292029A1A924600218B460F4633
-:100120001348144A121A28F050FE0F4B002B00D02F
-:1001300098470E4B002B00D0984700200021040068
-:100140000D000D48002802D00C4800E000BF20F050
-:10015000E3FB2000290028F08EFB20F029FBC0469D
-:100160000000080000400020000000000000000027
-:1001700018010020E02F0020000000000000000017
-:1001800010B54A68014926F045FE10BDC43B030086
-:1001900010B50400080021F08CF90300002C03D0F6
-:1001A000012C06D0002003E00348002B00DC0348AC
-:1001B00010BD40002043FBE7CCE70200C4E702008B
-:1001C00043684B6083688B60C3680800CB60014B59
-:1001D0000B607047A890020030B5040087B00D0096
-:1001E0000020042A25D1200021F063F9AB0722D199
-:1001F000184B2A689A421ED103AA290011F034FB39
-:10020000102026F056F8144BE2680360039B6168E7
-:1002100053435B184360049B6168019353435B182D
-:10022000059983604A43C260002902DAE2689B1A9A
-:10023000836007B030BD002301002A00206802F06F
-:10024000F5FCE36858436368C01801234000184375
-:10025000EFE7C046E8A402006C900200F0B50E0083
-:10026000002785B0110003901D00012203233000F8
-:10027000009712F021F8102026F01BF8039B0400D1
-:10028000036001234760C36028689E4205D102F0E5
-:10029000F5FBA060200005B0F0BD02F0EFFB606050
-:1002A000686802F0EBFBA060032EF3D1A86802F0AF
-:1002B000E5FBE0600028EDD101480DF087F8C0466D
-:1002C000D6FB020070B50D004A688B68084904002F
-:1002D00026F0A0FDEA68012A04D10649200026F094
-:1002E000D8FC70BD0449200026F094FDF9E7C04613
-:1002F000E0FB0200A0020300EDFB0200136810B552
-:100300001400002B05D1A42904D1406825F0D8F9A8
-:10031000206010BDB9235B00994201D18068F5E7E8
-:10032000024B9942F5D1C068F0E7C046BF02000019
-:100330000023820708D10068044A0133904203D0A9
-:10034000034BC01A434243411800704720910200FA
-:10035000E4900200044B88600B60044B08004B6083
-:100360000023CB607047C0466C98020097150200CE
-:1003700030B585B00500080069460CF0F7FB0400B5
-:1003800020000CF055FC011E02D1064805B030BD1E
-:100390002B1D0022180023F085F80028F0D0024819
-:1003A000F4E7C046CCE70200C4E7020070B50500E0
-:1003B000102025F07EFF0400074B696808C023F079
-:1003C00067F8AB68E968A3606B68E0689A0028F09A
-:1003D000E0FC200070BDC04620910200F7B504008B
-:1003E0000D0000268B0704D10B68214E9E1B734223
-:1003F0005E41AB68002B0AD1002E03D01D492000BE
-:1004000026F047FC1C49200026F043FCF7BD002ED7
-:1004100003D01A49200026F03CFC1949200026F0A0
-:1004200038FC002701236A68BA4207D81549200022
-:1004300026F02FFC002EE9D01349E4E7BA00019220
-:10044000EA68B9005258002A0FD0042A0DD0002BB8
-:1004500003D10E49200026F01CFCEB68B900595866
-:100460000122200002F03AFA00230137DBE7C04600
-:10047000E49002002BFC020032FC020038FC020077
-:1004800043FC02005E070300A002030045FC0200DB
-:1004900010B5830707D1044B02689A4203D1034980
-:1004A000034824F0C7FA10BDE4900200F3FB0200F9
-:1004B000E0A7020070B50D000400FFF7E9FF290076
-:1004C000201D012222F0EEFF004870BDE4B30200BF
-:1004D00070B50D000400FFF7DBFF2900201D02228C
-:1004E00022F0E0FF004870BDE4B3020070B50600E2
-:1004F00008680D000124FFF7CBFFB44201D3044884
-:1005000070BDA300E958286820F0E3FF0134F4E748
-:10051000E4B3020070B50D000400FFF7B9FF280036
-:1005200000210CF023FB050028000CF081FB011ECC
-:1005300001D1044870BD231D0322180022F0B2FF30
-:10054000F2E7C046E4B3020010B50400FFF7A0FFD5
-:10055000201D23F035F8014810BDC046E4B3020069
-:1005600010B5012220F0E6FF004810BDE4B3020000
-:1005700070B504000D00FFF78BFF201D022229003B
-:1005800022F090FF002804D1034822F03EFE0CF038
-:10059000A5F8024870BDC046C0A90200E4B302003D
-:1005A00010B50400FFF774FF201D22F0EAFF0028B9
-:1005B00003D10249024824F03DFA10BD15FC0200A7
-:1005C000C0A90200F8B50D0001280BD0002803D007
-:1005D00002280BD0002004E08B681448002B00D1C7
-:1005E0001348F8BD8B685B001843FAE7032400202A
-:1005F0000C408442F5D10F4B0E6820009E42F0D192
-:100600004F68A74203D1012076003043E9E7EA684A
-:10061000A3009958002906D0042904D002200CF028
-:100620003DF9401036180134EBE7C046CCE7020034
-:10063000C4E70200E4900200F8B5040010200D00A9
-:1006400025F037FE0600094B210008C607003000E0
-:1006500022F01EFFA4002C19A54201D13800F8BDDC
-:10066000012202CD300022F01DFFF5E720910200AB
-:10067000F7B504000E00171E2CD0FFF709FF194D27
-:10068000B4422DD000210800FFF7D6FF002105005D
-:1006900030000CF06BFA019001980CF0C9FA061EBC
-:1006A0000CD1002F1CD0E06825F032FE6B6863602F
-:1006B000AB68A360EB680B4DE36011E0201D0022E6
-:1006C000310022F0EFFE0028E6D031002800FFF7CD
-:1006D000F1FEE1E78842D5D1200020F00DFF0500B2
-:1006E0002800FEBDE4B30200F0B589B00400039019
-:1006F000029101920027FFF71BFEB84207D13A0092
-:1007000003AB0121224820F06BFF04000137029D5A
-:1007100000262800FFF70CFEB04207D1320002ABE2
-:1007200001211B4820F05CFF05000136019B002BD6
-:1007300005D00023AA680193A36893420DD0154BFE
-:1007400006940493144B05930023079304A820F008
-:1007500022FF011E12D101230193002F02D020009D
-:10076000FFF7F2FE002E02D02800FFF7EDFE019BFE
-:100770000A48002B00D10A4809B0F0BD2B1D002209
-:10078000180022F08FFE0028E0D10190E5E7C04676
-:10079000209102006C98020097150200CCE702003D
-:1007A000C4E7020073B50C00150000910192002609
-:1007B0008B0704D10B68394E9E1B73425E41320099
-:1007C0001F2868D819F0A0FA2810176767671C67F8
-:1007D0006767676767212D346767673B6767676788
-:1007E0006740464A5358675D2900200020F095FE77
-:1007F0000400200076BD2900200020F0E6FEF7E787
-:100800006946022020F0C2FEF2E7002E04D06946BD
-:100810000220FFF76BFEECE72900200020F073FEBA
-:10082000E6E729002000002EE0D0FFF773FEE0E7A6
-:1008300029002000FFF71CFF002EDAD1D8E7694617
-:10084000022020F077FED3E7012229002000FFF7E5
-:100850004BFFCDE7012221002800F8E72800FFF731
-:1008600067FD002815D0A368AA68934211D129001A
-:10087000200020F0E6FEBBE72900200020F0D9FE92
-:10088000B6E7201D0022290022F00CFE044C0028AF
-:10089000AFD1044CADE70024ABE7C0462091020085
-:1008A000CCE70200C4E70200F0B50F00496885B04C
-:1008B00005001600002901D0002A05D139002800C2
-:1008C00020F0D0FF05B0F0BD0F321309C918009316
-:1008D00020F039FF0F22A868B9687C68324000D147
-:1008E0001032009B1E19234BF3185B00C018214BDC
-:1008F0000290E3185B00CB18019010209C46210069
-:100900000023801A002921D1C3401A48029A844644
-:100910006400141B2380009B5B00E41A009B0234DC
-:1009200063445A00200028F050FA002E04D07300CF
-:10093000023BE35A002B1BD001216E603B78DB07A2
-:10094000DA0F2B788B4313432B70BBE76246128878
-:10095000013913431A00C2400393019B1A80019A84
-:10096000039B023A0192022252421B049444C9E7BB
-:10097000013EDAE7FFFFFF7FF0B54B6815005268D4
-:1009800089B006000C00934201D22C000D00012119
-:10099000227863680A4201D12A781140C9183000D0
-:1009A00020F0D1FEB36822780193A3681700029368
-:1009B000636829789C46AB684F4003930123180075
-:1009C0001F408B4306936346904302006046591EC6
-:1009D000019B04936B681B1A07934B1C18D1634649
-:1009E0005900019B5918002F02D001230B800231BE
-:1009F000019820F02BFE0121706022782B78534063
-:100A00003278DB078A43DB0F1343337009B0F0BD44
-:100A1000029B13481B881B189B180593079B5B18A8
-:100A20008B421AD8039B039A1B8802321B1803922D
-:100A3000069A01399B18059A5A4092B21B0CD71995
-:100A40000693049A059B17801A0C049B3F0C0233F3
-:100A50000493029B02330293BFE7014BE8E7C046D1
-:100A6000FFFF0000F0B5060095B0069353680D0037
-:100A7000591C0492009320F066FE049B00215B68E1
-:100A8000B0685A1C5200009328F09FF9002373604D
-:100A9000049B28005B68591C009320F054FE0499C5
-:100AA000280020F0DFFEAB686F680193069B9B680F
-:100AB0000393069B5B680293B3680793029BBB4258
-:100AC0002DD82ED3039A3900019820F07FFE0028FC
-:100AD00023D10123079A686013807360049B1A78FE
-:100AE000069B1B785A4001231A4214D032781343D4
-:100AF00033706B68002B0ED0012111A8494220F001
-:100B0000D0FE11AA3100300021F0D2F8069A290057
-:100B1000280021F0CDF815B0F0BD002801DA00233F
-:100B2000DBE7824A029B9B185B009C460022039BEA
-:100B3000634405931B8800921AB2002A63DA0022EC
-:100B4000019B7C001A537B1C102709936B60019B4F
-:100B5000A01C00991B180893791A019B0A91089907
-:100B60008B4256D3059B009A1B8893400893029BA7
-:100B7000012B0AD91022039B00996344023B1B8876
-:100B8000521AD340089A1A430892019B029A1C19E0
-:100B9000099B9B1A654A73609B18079A5B00D318E0
-:100BA0000A93634602330E936B680B930B9A029B76
-:100BB000934239D313005D4A102194460024019AD0
-:100BC00063445B00D318009A891A019A9A4200D8AC
-:100BD0009EE07368002B07D0544A07999A18520078
-:100BE000525A002A00D19DE06B68002B00D175E7B6
-:100BF0004E4A01999A185200525A002A00D06DE7C5
-:100C0000013B6B60F0E7009A5B0001329BB292B24D
-:100C100091E71988009F0800B84002431A800A9A99
-:100C20000233D1408AB29AE7A31E20880D931B8815
-:100C300000041843089919F07BF80E9B0022E31A70
-:100C40000C931900039B05909C4609928C4212D884
-:100C500023889A4234D3D31A5A42190C9BB2228069
-:100C60005A1E9341CA18002A2CD003990C9B8C461B
-:100C700000210F0041E0099B009F180C63461B8870
-:100C8000BB4018436B4609909F8C059B5F430B88C4
-:100C90009F4203D2D81B0F9090420CD8D31AFF1852
-:100CA0007B420B80BBB23A0C5F1EBB41D2180223C1
-:100CB00002319C44CAE70F9B9A1A0A800022F6E789
-:100CC0009A1A22800A9B059A023B5A800A930B9B30
-:100CD0000D9C013B6B6067E7380C09906046009FF4
-:100CE0000088B840099F074318884118B8B24118D6
-:100CF000022019808444090C02339C42ECD82388DA
-:100D00005918059B2180013B090C521A0593AAE74B
-:100D10001A88009F100038418A402043188094B2FE
-:100D2000023B52E7013B736053E7C046FFFFFF7F82
-:100D3000436870B55A00002384680A4DA218944293
-:100D400006D30278D20700D55B4201200B6070BD4C
-:100D5000023AAB4203D816881B043343EFE7002066
-:100D6000F5E7C046FF7F0000032230B502400121B5
-:100D7000002A04D1084C05680B00A54209D00B00DD
-:100D8000034006D1002A04D1036804481B1A5842C4
-:100D90004341180030BDC046D4E702002CB9020020
-:100DA00010B50400FFF7E0FF012200280AD1032359
-:100DB00002002340022B05D103480440063C2200D8
-:100DC000541EA241100010BD070080FF044B886034
-:100DD0000B60044B08004B600023CB607047C0469B
-:100DE0006C980200F125020010B501F05FFD084B80
-:100DF00042680848D31859424B41AC215B428B43AF
-:100E0000B02189005B18044907F04CFB0BF066FC2D
-:100E100040FDFFFF90AC020048FC0200F7B5040063
-:100E20000E00019301208B180A0000210093009B03
-:100E3000934212D82725002900D0053D224F2A00D1
-:100E40003900200025F0E6FF009B9E4214D32A00C3
-:100E50003900200025F0DEFFF7BD1378272B08D0DE
-:100E6000223B5D426B41DBB20132002BDFD02725F4
-:100E7000E4E700230100F7E73278AA4205D12A000F
-:100E80001249200025F0C6FF1AE011495C2A14D04F
-:100E90001F2A09D97F2A15D0019B002B02D053B2FB
-:100EA000002B07DB3900ECE70A490A2A05D00A497A
-:100EB0000D2A02D0092A05D10849200025F0E9FEB3
-:100EC0000136C1E70649DCE7820003008100030028
-:100ED00085000300880003008B0003008E000300E0
-:100EE00091000300194B70B506000C0098420FD119
-:100EF0004968A0680FF0AEFD051E09D0200026F05D
-:100F000024F90023ED00236006331D43280070BD43
-:100F1000102025F0CEF96168050081600660A068A8
-:100F20000FF07AFD63686860591C2368994208D104
-:100F3000A368EB600023EA68A9685354A3602360A8
-:100F4000E4E7A06825F0D3F9E860F3E70C9A020023
-:100F500070B504000D00002A05D00FF0ADFDC300F0
-:100F60000620184370BD0FF075FD0028F7D12A0048
-:100F70002100024821F014FAF4E7C0460C9A02005E
-:100F800010B50A000100024821F00AFA10BDC0465F
-:100F9000A0920200094B10B50340062B01D1C008F6
-:100FA00010BD830708D1064B02689A4204D18168BC
-:100FB000C0680FF081FDF3E7FFF716FF070080FF21
-:100FC0000C9A0200064B10B50340062B03D1C00853
-:100FD00024F0D5FC10BD8368C0680B60FAE7C046FA
-:100FE000070080FFF0B50F00002589B01100060052
-:100FF0001C003800009503232A0011F05DF90E2033
-:10100000AF420FD0012F0FD102AA102104A814F073
-:10101000F7FE216802A82A0001F060FC04A9300054
-:10102000FFF760FF09B0F0BD2068830722D1164B9F
-:1010300002689A421ED104A9FFF7C4FF134B0500B2
-:1010400020680340062B13D1C00824F089FC04005B
-:10105000002C04D1049928000FF0DEFC04001020BD
-:10106000049F25F026F906608760C5604460D9E7D3
-:101070004468EDE704A9012201F0BAFE00220599B7
-:101080000498FFF765FFCDE7A0920200070080FFFC
-:10109000F0B58DB00400039101F008FC04A906002E
-:1010A0002000FFF78FFF039B01902F489A0705D17F
-:1010B0001B6883420AD02D4A934207D0C36800229E
-:1010C0000293012103AB029CA0470390002406AACF
-:1010D00005A9039801F074FD2500059BA3420ED8D5
-:1010E0002900002508A826F01FF80A9C059BAB42A2
-:1010F00021D808A93000FFF7F5FE0DB0F0BD069B22
-:10110000A700D85901F0D2FBB04202D018480CF029
-:1011100021FB002C01D0049BED18069BD859154BE0
-:101120000340062B05D1C00824F01FFC2D18013404
-:10113000D3E78068FAE7002D06D02000049A0199D1
-:1011400027F027FE049BE418069AAB00985807A9DD
-:10115000FFF738FF079A0100200027F01AFE079BCF
-:101160000135E418C2E7C04688E702004CA002003F
-:10117000BE000300070080FFF0B58BB00490086844
-:101180000D000692079301F091FB0400686801F0DE
-:101190008DFB0600A04202D06868FFF725FE08A973
-:1011A0002868FFF70FFF040009A96868FFF70AFF26
-:1011B000089A0590A3180393049B2700022B19D9C2
-:1011C000AB681D498B4206D00121300000912100FF
-:1011D00004F04AF80700049B032B0BD0EB68164A77
-:1011E000934207D00122210000923000089A04F0B7
-:1011F0003BF80390039B059AD91B069B380000938C
-:10120000099B21F0AEF8002806D1079B0138002B7E
-:101210000CD00A480CF0DAF8094B9E4208D10100C4
-:10122000200022F054F84400012020430BB0F0BD10
-:10123000041B6400F8E7C046E4B30200AA00030000
-:101240000C9A0200F0B5070087B008680D0001F0A5
-:101250002DFB04A906002868FFF7B4FE05A90400C9
-:101260006868FFF7AFFE03902000022F07D9012323
-:101270000093AB68049A2100300003F0F5FF059A53
-:10128000041B049BA418064D9C4205D8039927F023
-:1012900071FD002800D1034D280007B0F0BDC04605
-:1012A000C4E70200CCE7020073B50D0006006946F2
-:1012B0002868FFF787FE01A904006868FFF782FE2F
-:1012C0000100022E02D908480CF072FA019A009827
-:1012D000064D824206D8801A201827F04BFD0028C0
-:1012E00000D1034D280076BD98000300C4E702003A
-:1012F000CCE70200F0B58FB0079010680C00160024
-:1013000001F0D4FA0690012C31D0706801F0CEFAC9
-:10131000069B984202D07068FFF766FD0DA97068C1
-:10132000FFF750FE0D9B089009930DA93068FFF759
-:1013300049FE0D9B0B900493079B012B1CD1049B32
-:101340005D1E01235B420A9300242700049B039443
-:101350000593059B002B13D1039B002B23D1214B1D
-:10136000069A0E209A4200D01F480FB0F0BD072306
-:1013700009931E4B0893D8E7012300250A93E3E75E
-:101380000B9B09995A1901230898009320F0E9FF53
-:10139000002816D1039B002B19D1079B002B09D1E4
-:1013A0002F00049B5C1E049B0134E21B934212D16C
-:1013B0003068DAE7079B2C00012B0AD001232F00AD
-:1013C00003930A9BED18059B013B0593C1E72C0095
-:1013D000F7E7039FE7E70B9B0698D91920F0E0FF9A
-:1013E000C3E7C0460C9A0200909202001701030066
-:1013F000F0B589B0049008680D0001F057FA0400B8
-:10140000686801F053FA0700A04202D06868FFF74D
-:10141000EBFC06A92868FFF7D5FD060007A9686858
-:10142000FFF7D0FD069A0590B3180393049B340090
-:10143000022B19D9AB681E498B4206D00121380016
-:101440000091310003F010FF0400049B032B0BD02C
-:10145000EB68174A934207D001223100009238000E
-:10146000069A03F001FF03900025079BAB4212D1BF
-:10147000039B2000191B21F039FF0130450001209A
-:10148000284309B0F0BD0599200027F073FC00281F
-:1014900008D101353400079A039BA6189E42F2D961
-:1014A0006D00ECE7200021F009FF0600F2E7C046DE
-:1014B000E4B3020010B50100014821F063F810BD4B
-:1014C0000D33020010B50100014821F05BF810BD9A
-:1014D0001F330200F7B50600080001A9FFF772FDEF
-:1014E000019B0500002B01D11348FEBD134B0400E6
-:1014F0009E4207D10027019A631B9A4211D8002F00
-:1015000007D1F1E70E4B9E42F4D0019A631B9A4239
-:1015100001D80C48E9E72078B04701340028F4D11D
-:10152000E2E7207807F098F8002803D02078B04749
-:10153000071ED9D00134DEE7C4E70200C1860000EF
-:10154000D9860000CCE7020010B501000148FFF782
-:10155000C1FF10BD4186000010B501000148FFF732
-:10156000B9FF10BD5986000010B501000148FFF712
-:10157000B1FF10BD7186000010B501000148FFF7F2
-:10158000A9FF10BDC186000010B501000148FFF79A
-:10159000A1FF10BDD9860000F0B585B006000C0093
-:1015A000170001F083F9694605003000FFF70AFDD6
-:1015B0000600042F23D10098A30715D1114B2268F0
-:1015C0009A4211D101AA210010F04EF9002802D14F
-:1015D0000D480CF0EDF80199029A2800521A711882
-:1015E00020F0DEFE05B0F0BD00230100220028003F
-:1015F00001F01CFB335C01205B001843F2E7002084
-:10160000F0E7C046E8A40200A6FC020070B51D0089
-:101610008EB0002900D174E018683B4C03002340D1
-:10162000062B05D0830726D1384B02689A4222D177
-:101630000239012962D80AA9FFF7C4FC060028680C
-:101640000440062C15D1C00824F08AF90400002CAF
-:1016500004D10A9930000FF0DFF9040010200A9D30
-:1016600024F027FE2A4B85600360C66044600EB0FC
-:1016700070BD4468EBE7012940D80122104210D028
-:10168000441021000AA825F04FFD0C9B00212200E8
-:101690001800019327F099FB0AA91D48FFF722FCC7
-:1016A000E5E703A920F0DAFF002805D0049A0399A2
-:1016B000174820F075FEDAE7286801F0F9FA1021E2
-:1016C000002800D0411006A825F01DFD0AA92868B1
-:1016D0000BF04CFA040020000BF0AAFA002801D10C
-:1016E00006A9DAE701F0CAF9FF2802D909480BF088
-:1016F0006DFEC1B206A825F066FDECE706480CF0C9
-:1017000029F80648B3E7C046070080FF0C9A02009C
-:10171000A092020073FC02008CFC02009092020076
-:1017200073B50400080001A91600FFF74BFC050083
-:10173000042E06D10300019A0749200025F06AFB18
-:1017400073BD0649200025F0A4FA0123019A29005F
-:101750002000FFF763FBF3E703010300CF59030009
-:101760000A001B4B73B51A4005000C000340062B02
-:101770000CD1062A04D1441A60426041C0B212E082
-:10178000C00824F0EDF80600606805E04668062A07
-:10179000FAD1C80824F0E4F8002E05D0002803D0C0
-:1017A000B04201D0002076BD69462800FFF70AFC50
-:1017B00001A905002000FFF705FC009A019B01002C
-:1017C0009A42EFD1280027F0D5FA44426041D5E78C
-:1017D000070080FF084B07B50340062B08D083079E
-:1017E00004D10268054B92699A4201D0FFF7FCFAD6
-:1017F00001A9FFF7E7FB0EBD070080FF9D1D00005C
-:101800000A4B13B503400C00062B08D0830704D104
-:101810000268074B92699A4201D0FFF7E5FA01A9E5
-:10182000FFF7D0FB019B236016BDC046070080FF79
-:101830009D1D0000F0B59BB00B9005910892102102
-:101840000EAA12A8099314F0DBFA059B089A93429A
-:1018500008D30B9A12AB13CB13C21B6813600B98FF
-:101860001BB0F0BD059B19785D1C7D290ED1089B2E
-:10187000AB4208D9059B59787D2904D112A825F0DF
-:10188000A2FC059507E0BC480BF0A0FD7B2906D023
-:1018900012A825F098FC059B01330593D5E7089B1A
-:1018A000AB4216D9059B59787B29E7D02B007D29BF
-:1018B00003D0212901D03A290DD100252E001A7814
-:1018C000212A11D0002206921AE0089A01339A4286
-:1018D00001D1AA48D8E71A787D2A03D0212A01D05D
-:1018E0003A2AF2D11E00EAE708995A1C91421CD903
-:1018F0005A780692723A012A17D802339942E8D9E7
-:1019000000211A7805913A2A1FD15A1C5B7805925A
-:101910007D2B1DD1089B059A9342DAD90027059BA0
-:101920001B787D2B17D09648AEE79648ACE7197820
-:101930007B2905D10132013308998B42F7D3C8E7DF
-:101940007D29F8D1013A002AF5D1059F0593E6E7F4
-:10195000059B0122F0E7002D48D00023287816933C
-:1019600006F086FE00283DD0099B1B680793002BDC
-:1019700001DD854888E716AA3100280020F0D9FC4F
-:10198000209A169B013A04009A4203D87F49804866
-:1019900023F050F8219A01339B009D580122099BA6
-:1019A00052421A60B44231D27A480BF001FF01343E
-:1019B000B44204D223782E2B01D05B2BF7D1611BCC
-:1019C00001222800FFF7C4FA002205000100229836
-:1019D00007F0D2F8002807D129006F4821F01BFC3E
-:1019E0000AF07CFE2C00E3E74568DBE7099B1B68F7
-:1019F000002B01DA694847E7209A013A9342C5D2A1
-:101A0000013321999A005558099A1360002F00D08C
-:101A1000A6E1069B3C00002B04D0069C733C631E91
-:101A20009C41E4B210AA102116A814F0E9F929008B
-:101A3000220010A800F052FF16A95948FFF752FAE9
-:101A400001235B4205000D931093002F00D18FE01E
-:101A50000EF096FF229B059A0293219B3900019379
-:101A6000209B16A80093099BFFF7E4FE16A825F01B
-:101A700098FB0026179B0400C3180A93037806936B
-:101A8000B34208D0474F1900380027F0DAF9B042C6
-:101A900000D16EE1013423782B2B4ED000272D2B63
-:101AA00002D0202B01D1043701342378232B02D11B
-:101AB000133B1F4301342378302B07D1069B002BA7
-:101AC00001D13D330693002E00D130360DAA0A997C
-:101AD000200020F02EFC037807902C2B04D10C3B27
-:101AE0001F43030001330793079B1B782E2B06D15E
-:101AF000079810AA01300A9920F01BFC0790079B59
-:101B00001C78002C1BD02100274827F09AF90028C8
-:101B100003D0079B5B78002B11D02448B4E631003A
-:101B2000380027F08EF9002804D033000234069ED6
-:101B30000693B0E706900600ADE70227B4E716A8C3
-:101B400025F003FB069B002B08D12800FFF728F99E
-:101B50003C230693002801D002330693002E00D1C7
-:101B6000203606231F4229D0732C23D110488BE640
-:101B70003C003E00E9E7C046D1FD020012FE020033
-:101B80002AFE0200F9FD02004EFE020098FE02004D
-:101B900084A90200B1FE0200C0A90200CEFE02002C
-:101BA0000C9A020018FF02001DFF02002DFF020028
-:101BB00046FF0200632C01D1714865E6069B3D2B70
-:101BC0001FD05E2B1FD03C2B01D13B3B1F43280075
-:101BD000FFF7CAF800282DD0632C50D026D8472C08
-:101BE00013D8452C26D2002C40D0252C22D02800FA
-:101BF00020F01DFD220003006249634806F052FCFC
-:101C0000EEE64023E2E78023E0E7582C53D0622C35
-:101C1000EDD1002303930D9B0222029361230196D1
-:101C2000009729000EA813F0FFF834E6672C17D8A8
-:101C3000652C1BD32800FFF7B3F800286CD0002CCC
-:101C400056D06E2C54D0472C3FD8452C41D2252C51
-:101C500050D0280020F0EBFC220003004B49CCE7D9
-:101C60006F2C1AD0782C26D06E2CC0D10023039371
-:101C70000D9B01960293009761230A22D1E7280069
-:101C800000F0FCFE0D9B16A90870012201933B0099
-:101C900000960EA813F06CF8FDE5FB0602D5802334
-:101CA0009B001F43002303930D9B01960293009713
-:101CB00061230822B5E70022230003920D9A173B07
-:101CC0000292019600971022ABE72300653B022B9E
-:101CD000BFD8280000F036FF109B220002930D9B16
-:101CE000011C01933B0000960EA825F04EF8D2E5AA
-:101CF0006724EEE72800802400F024FF244918F030
-:101D000071FE109B640002930D9B3C430193011CE8
-:101D1000009623006622E7E7069B3D2B01D11D4874
-:101D2000B2E5002C01D0732C13D116A92800FFF7BF
-:101D300067FD109B0100169A002B00DA1092109B91
-:101D40009A4200D916930D9B00960193169A3B0078
-:101D50009FE7280020F06BFC220003000E494CE7AF
-:101D6000069B002B00D058E601235B420D93109395
-:101D70006EE66678002E00D0D1E606968BE6C04669
-:101D800072FF0200A5FF020008AD0200D6FF0200AC
-:101D90000000C8420A0003003F000300F0B5A1B0F4
-:101DA00005000C000D920A2800D0E4E10DAB0F9362
-:101DB0000123073D1093059215403CD11368BF4A9B
-:101DC000934206D10FAA10A9059821F02CF8059589
-:101DD00002E0BB4A9342FAD1109B11A907930F9BD3
-:101DE00020000893FFF7EEF8002309900A93A30759
-:101DF00005D1B44A23689B1A5A425A410A9214AA3E
-:101E0000102118A813F0FCFF119A00279446099B93
-:101E1000099C63440493049BA3420FD8079BAA48E0
-:101E2000BB4229D10A9BA948002B00D0A54818A97C
-:101E3000FFF758F8BAE100230593CDE7217825296B
-:101E400004D018A825F0BFF90134E4E7049B661C10
-:101E5000B34202D89E480BF0B9FA6178252904D123
-:101E600018A825F0B0F93400EEE70025282915D18F
-:101E7000059BAB4202D197480BF06CFCA01C0600FE
-:101E80003378292B23D1311A0122FFF761F80100A1
-:101E900005980EF083F80127050001360023340071
-:101EA00040220026302104200B9320330693049B0C
-:101EB000A34213D800231293049BA34231D9237861
-:101EC0002A2B70D1079BBB4221D88348D4E7049BBF
-:101ED000B34201D88148BEE70136D1E723782D2BE4
-:101EE00003D12C3B1E430134E1E72B2B01D1293BCD
-:101EF000F8E7202B01D10643F5E7232B04D0302B44
-:101F0000D8D116430691EEE710230B93EBE77B1C29
-:101F10000C93089BBF00F85800F0B0FD0C9F129086
-:101F2000013401235B421393049BA34292D923788B
-:101F30002E2B17D1049B601C83428BD963782A2BEC
-:101F400038D1079BBB42C0D97B1C0C93089BBF00B8
-:101F5000F85800F093FD0C9F13900234049BA342A9
-:101F600000D877E7002D06D1079BBB42ADD9089A70
-:101F7000BB009D5801372278672A45D8652A00D3CF
-:101F8000B8E0582A5DD01DD81300453B022B00D87D
-:101F9000B0E0099B5249E41A00941300514806F03E
-:101FA00081FA0AF09BFB200012AA049920F0C1F9E3
-:101FB0000400B6E7002313AA0499139320F0B9F99B
-:101FC0000400CBE7632A49D0642AE2D103222B0024
-:101FD0001340022B0AD1444B2B40062B06D0FF2383
-:101FE000DB05E81890430AF0CBF90500139B0A22A1
-:101FF0000393129B00960293069B01936123290091
-:1020000014A812F011FF1FE7732A16D8722A00D302
-:1020100080E0692ADAD06F2ABBD10B9B002B02D05B
-:1020200084239B001E43139B00960393129B08225C
-:102030000293069B01936123E1E7752AC6D0782AB3
-:10204000A7D11300139A173B0392129A0292069A91
-:1020500001920B9A164300961022D0E7224B2B4098
-:10206000062B05D0AB0716D1184B2A689A4212D11D
-:102070001CA92800FFF7C4FB1C9A0100012A01D00B
-:102080001A48F9E6129B019320230093330014A809
-:1020900012F06EFED8E62800FEF766FE00280BD090
-:1020A000280000F0EBFC129B1CA908700193202370
-:1020B000012200933300EAE70D48DDE64CA0020060
-:1020C00074C20200A09202009CFD02000C9A020061
-:1020D000D7FC0200E9FC020016FD020000FD020030
-:1020E00067FD020008AD0200070080FF3DFD020011
-:1020F00056FD0200280000F025FD139B2278029374
-:10210000129B011C0193069B14A80093330024F03A
-:102110003CFE99E616AA10211CA813F071FE237844
-:102120001A00723A51424A41D2B2722B09D00A9B2C
-:10213000002B06D0AB0704D1594B2968994200D136
-:102140000422290016A800F0C9FB139A1D9B002A3F
-:1021500000DA1393139A9A4200D91A00129B1E991F
-:102160000193202314A80093330012F001FE1CA851
-:1021700024F0EBFF68E6080000F098FB16A90700C2
-:102180002000FEF71FFF0590072D22D118A90D98FA
-:1021900000F0B2FC03000020834207D0189981426E
-:1021A00006DC404B40489F4200D10E2021B0F0BDDC
-:1021B000169B1CA8594324F0B7FF1E9B01210493D2
-:1021C00000930598189B169A23F013FD1CA938005C
-:1021D0002EE60D9800F06AFBB8420FD11CA90D98AD
-:1021E000FEF7F0FE1C9E04901D2D17D8192D4ED21F
-:1021F000052D21D0122D1FD00020D7E7284B0D9898
-:102200009F4209D101221CA920F028FA0028CDD034
-:102210001C9B1D9E0493E7E7FEF7E6FD1F2DEBD107
-:102220000123049A009316993300059820F099F839
-:1022300000282AD01D48B9E7169B002B07D10D981E
-:1022400000F034FBB84202D10D9C2000AEE7002E16
-:10225000FBD0169B1CA8F11824F066FF1E9B169A53
-:1022600005991800069326F094FD169A1E9B944635
-:102270000593634418003200049926F08AFD1CA9D6
-:102280003800FEF72FFE0400DFE709488EE70096CE
-:10229000049B169A0599280023F0E1FCC8E7C04684
-:1022A000A09202000C9A020090920200CCE7020079
-:1022B000C4E70200F0B5050087B008680C0000F024
-:1022C000F5FA0090012D28D96668022D26D0A06865
-:1022D00000F0D4FB05000021080024F0C1FB04A994
-:1022E00001902068FEF76EFE049B0400C7183E4B69
-:1022F0009E4241D1BC422AD2207806F0A1F90028A2
-:102300000FD1002D0FD121003A1B009820F048F882
-:102310000100019811F060FF19E0334E01256D4274
-:10232000D9E70134E6E72600307806F089F900287D
-:1023300002D10136B742F7D82100321B009820F0B5
-:102340002FF80100019811F047FFB74209D8019812
-:1023500007B0F0BD0136B74203D1002DF7DD013DD6
-:1023600006E0307806F06CF90028F3D1002DF6DC99
-:10237000BE42ECD23400C4E7300000F097FA009B74
-:10238000984202D03000FEF72FFD05A93000FFF77C
-:1023900037FA059B0390002B13D114480BF016F865
-:1023A0003E002100321B00981FF0FAFF0100019847
-:1023B00011F012FFBE42CAD2059BF418002D00DDB9
-:1023C000013D2600059B0293002DE9D0029BF318E6
-:1023D0009F42E5D3029A0399300026F0CBFC0028F7
-:1023E000DFD00136F0E7C046E4B30200710003001D
-:1023F000F0B507008BB00D00022807D8290038007F
-:10240000FFF758FF050028000BB0F0BD086800F08A
-:102410004DFA08A9049028686E68FEF7D3FD019074
-:10242000A86800F02BFB041EE8DB431C1800002109
-:10243000059324F015FB2F4B05009E4202D12E4838
-:102440000BF0B6F909A93000FFF7DAF9099B0690FD
-:10245000002B02D129480AF0B9FF089A019B944643
-:1024600063440293A3000393099F029BDE1B002C8D
-:102470000BD0019BB34208D83A000699300026F0F1
-:1024800079FC002821D0013EF1E7EB68A6009F19F6
-:10249000019A029B01999A1A04981FF081FF3860F3
-:1024A000002CB0D0059B1C1BEB68A70099193A00C3
-:1024B000180026F077FC6B6800211A1BEB6892006D
-:1024C000D81926F082FCAC609DE7039AEB6894462D
-:1024D00063440793029BF1199A1BD21B04981FF0C7
-:1024E0005FFF079B013C1860039B0296043B03932C
-:1024F000BAE7C046E4B3020008010300710003001C
-:1025000070B50C008AB0050004A920681600FEF71B
-:1025100059FD00230593049B0100C218029605ABE8
-:1025200006A801940095FFF785F906A90248FEF771
-:10253000D9FC0AB070BDC0460C9A020010B5040068
-:10254000002906D0044B8A6B03600968002306F05B
-:1025500015F820000AF0C2F818AC0200F0B504002B
-:1025600087B0039202936618002A06D0023A222A04
-:1025700003D935480AF02AFF0134B44229D2207821
-:1025800006F05EF8071EF7D123782B2B1CD10134FF
-:10259000311B200003AA20F014FA23181C00002588
-:1025A0000193B44217D3002F00D06D4201236D0078
-:1025B0001D43019B9C422FD12449039A244805F0D6
-:1025C00071FF0299FFF7BAFF2D2BE1D101340127EA
-:1025D000DEE70027DCE723781A00303A0092092A68
-:1025E00007D9202213431A00613A192ADBD8573B36
-:1025F00000930399009B9942D5D9280005F004FC6B
-:10260000002816D1039B5D43009BED186B006B40C7
-:102610000FD40134C5E70134B44205D2207806F066
-:102620000FF80028F7D1C7E7B442C5D1280007B09A
-:10263000F0BD019B3A000593F11A05A8039B23F016
-:1026400065F8059C0500B4E7550103007801030017
-:1026500008AD0200F0B504008BB008934318049253
-:102660000193019B9C4200D3F6E0207805F0E8FF3F
-:10267000071E38D123782B2B37D101340590019BCD
-:102680009C4200D3EAE0202322781A43692A33D1FE
-:102690000199A21C914200D8E6E062781A436E2AA2
-:1026A00000D0E1E0A2781A43662A00D0DCE0E21D07
-:1026B000E51C914214D9E2781A43692A10D1227993
-:1026C0001A436E2A0CD162791A43692A08D1A27979
-:1026D0001A43742A04D1E2791343792B00D10535CA
-:1026E000FF26F6051BE00134BBE705902D2BCAD170
-:1026F0002C3B01340593C2E76E2A2ED10199A21C0E
-:10270000914200D8B0E062781A43612A00D0ABE071
-:10271000A27813436E2B00D0A6E05D4EE51C059B0E
-:10272000002B02D080231B06F618A5427BD1594905
-:102730008CE03D002B786F1C18003038092834D805
-:10274000022E15D10A23029A53431B180293019BB0
-:10275000BB42EED8002304934DE000220792029280
-:102760004D4A250006920022002603920993E1E7D4
-:1027700018F0AEFC051C012E0DD1069918F032F9A7
-:10278000011C039817F0BCFD43490390069818F00C
-:1027900029F90690DBE74149039818F023F9291C31
-:1027A00017F0AEFD00260390D1E7002E03D12E2BAB
-:1027B00003D10126CBE7022E16D0099A1A43652AC7
-:1027C00012D1019BBB4256D96B782B2B05D1AF1C84
-:1027D000019B9F42ABD00226B9E702262D2BA8D140
-:1027E0002C3BAF190793F3E7049A002A04D0202268
-:1027F00013436A2B13D13D00079B002B02D0029B91
-:102800005B420293029818F019FC011C23481BF04C
-:10281000D5F8039918F0E6F8049F061C7FE700231B
-:102820000493E9E70135019B9D4205D2287805F024
-:1028300007FF0028F6D17AE7019B9D4200D076E79A
-:10284000089B002B01D1002F1AD01549154820F004
-:10285000E9FC1099FFF772FE002305930023039310
-:10286000002325000493CCE7059B002B00D15EE7F5
-:102870002500002656E7019BBB4200D157E769E7D8
-:10288000032302209E43084B3043C0180BB0F0BD19
-:102890000000C07F3B010300CDCCCC3D00002041B7
-:1028A0001E01030008AD020000008080074BC20734
-:1028B0000AD4074A074B0240062A05D00322064BDA
-:1028C0000240022A00D00368180070472CB90200A9
-:1028D000070080FF0C9A020088B0020070B50D005E
-:1028E000040016000EF04CF82800FFF7DFFF8368A5
-:1028F000002B04D0320029002000984770BD4268A8
-:102900000249200024F086FAF8E7C046E4020300FA
-:1029100010B50A0001000248FFF7E0FF10BDC046F5
-:1029200084E80200F7B5050008000E0020F07EFCE8
-:10293000002810D001AA6946300005F053FE009B24
-:10294000002B08D01749280024F0A3F9009CE71EAB
-:10295000A400002F09DA310028000222FFF7BEFF91
-:102960002800114924F095F9F7BD019B28001A1998
-:1029700011000C3A08390B6812680C4924F04AFA25
-:10298000019B1B19043B1A68002A06D1064928003E
-:1029900024F07FF9033F0C3CDBE70549280024F0D5
-:1029A00039FAF7E7A2020300654F0300C6020300ED
-:1029B000DB02030010B50400FFF778FF054B006948
-:1029C000984203D0431E9841C0B210BD200021F0B0
-:1029D00067FFFAE7F5BA000070B505000C000120AA
-:1029E0008D4203D0214B9D4201D1002070BD994200
-:1029F000FBD001231D4204D01942F6D12B000D005B
-:102A00001C002A001A4B1A40062A05D0AA0711D129
-:102A1000184A296891420DD12340062B05D0A307FF
-:102A2000E3D1144B22689A42DFD121002800FEF73F
-:102A300097FEDBE72340062BD7D0A30703D10D4B2E
-:102A400022689A42D1D02800FFF730FF8369002B1B
-:102A5000CBD0220029001B2098470028C5D0064B68
-:102A6000C01A43425841C0B2C0E7C046E4B30200B6
-:102A7000070080FF0C9A0200CCE70200104B10B553
-:102A8000984219D00F4A0123904217D0184201D022
-:102A9000184110BD830706D10B4B02689A4202D140
-:102AA0000CF036FFF5E71FF0C2FD084902000848A8
-:102AB00005F0F8FC09F012FE0020EAE71800E8E74C
-:102AC000C4E70200CCE702002CB90200690203004F
-:102AD00090AC020010B5C30705D4830706D1054B9F
-:102AE00002689A4202D122F028FE10BDFFF7C6FF0D
-:102AF000FBE7C0462CB902000F4B70B50D00012456
-:102B0000984204D100230B602300180070BD0B4BCA
-:102B1000984201D10C60F7E70300234002D0401037
-:102B20002860F1E78207F0D1054A01689142ECD1B3
-:102B30000CF0EEFEF4E7C046C4E70200CCE702006A
-:102B40002CB90200184B10B5984228D0174B984268
-:102B500027D0C30703D5401018F070FA10BD032327
-:102B6000184206D1124A0168914202D122F0EEFDCC
-:102B7000F4E702001A40022A08D10E4A0240062A4F
-:102B800004D0FF22D20580189843E7E71FF04FFDDD
-:102B900009490200094805F085FC09F09FFD002065
-:102BA000DCE7FE208005D9E7C4E70200CCE702009D
-:102BB0002CB90200070080FF4F02030090AC020016
-:102BC00010B583070CD103680A4CA34202D120F050
-:102BD0002AF910BD084CA34202D123F058FFF8E7B0
-:102BE0001FF025FD05490200054805F05BFC09F0D2
-:102BF00075FDC0464CA0020088E70200FF010300FB
-:102C000090AC020013B50C0001A9FFF7D9FF019B9E
-:102C1000A34206D022000349034805F043FC09F013
-:102C20005DFD13BD2202030008AD0200F7B50500EB
-:102C30000C0017001E00D3070ED557100197019BFB
-:102C4000002B1FDA1B190193002E1DD0002B15DA63
-:102C5000002301930198FEBD01A91000FFF74CFF6E
-:102C60000028ECD138006C681FF0E1FC2200030062
-:102C70000B490C4805F016FC09F030FDA342E9D9D8
-:102C80000194E7E7002EF9D1019B002B01DBA34261
-:102C9000E0D36A680449054805F004FCECE7C04647
-:102CA000C501030090AC0200E901030084A9020001
-:102CB00010B50400830710D10D4B02689A420CD165
-:102CC0000C4B0340062B06D1C00822F04EFE4300F9
-:102CD0000120184310BD8068F9E72000FFF7E6FDEA
-:102CE0004369181EF6D0210001209847F2E7C0463C
-:102CF000A0920200070080FF164B70B50400002070
-:102D00009C4203D0144DAC4201D1012070BD134B45
-:102D100000209C42FAD001262640864203D0601053
-:102D2000431E98410DE02000FFF7C0FD4369002BD2
-:102D300009D0210030009847002804D0401B4342AE
-:102D40005841C0B2E2E72000FFF7B2FF0028DCD014
-:102D50000138E5E7C4E70200CCE70200E4B3020073
-:102D600010B50400FFF7A4FF002809D120001FF0D0
-:102D70005EFC04490200044805F094FB09F0AEFC37
-:102D800010BDC0468102030090AC020070B5040083
-:102D90000D001600FFF78AFD036A002B05D03200F4
-:102DA000290020009847002818D10D4D2000002E42
-:102DB00008D11FF03CFC02000A49280005F072FB14
-:102DC00009F08CFC042E04D11FF031FC06490200EE
-:102DD000F3E71FF02CFC05490200EEE770BDC0468A
-:102DE00090AC0200E9020300140303003503030062
-:102DF00010B51FF033FC002802D102480AF0AAFCEB
-:102E000010BDC046A001030070B5050000291CDB01
-:102E1000032905D80800002416F076FF18180606C6
-:102E20000123023999430C00FE26B52109023143E2
-:102E300028001FF02DFC002C04D005492800214358
-:102E40001FF026FCAE61EC6170BD0024F226ECE7B9
-:102E500080B0000010B50D4C206824F053FC002811
-:102E600007D00B4B1B78002B03D1206803685B68ED
-:102E700098470023074A1370074A13700BF030FC81
-:102E80000CF05CFA0EF038F810BDC0465C2900204A
-:102E9000CB2D0020CA2D0020392E002070B5050052
-:102EA00094B0002804D13F481DF0D4FD14B070BD8B
-:102EB00008A809F0EDFB041E19D12E68290004A80A
-:102EC00001220EF0C7FE23002200310004A808F002
-:102ED00099F90400032001F0A1F8200021F05FFD22
-:102EE0000120404201F09AF809F0F0FBDEE70120F2
-:102EF000404201F093F809992B48FFF713FD099818
-:102F0000FFF7D4FC2949040008F0E6FE0028CDD1E3
-:102F10002749200008F0E0FE0028C7D1099C01AA3B
-:102F20006946200005F05EFB02AA322104A812F0D7
-:102F300067FF009B022B05D9019B1E495A6802A816
-:102F400023F068FF2000FFF7B1FC1B4BC2689A42D8
-:102F500010D1236819495A6802A823F05BFFE3687F
-:102F6000002B07D05A68002A04D00022996802A8D2
-:102F7000FFF7B4FC032001F051F804A824F011F984
-:102F800006F034FC04A824F0E0F80120404201F0EF
-:102F900045F80B4B9A6C002A00D187E700229A640F
-:102FA00084E7C0469803030084E8020054AC0200A2
-:102FB000FCA90200C503030065830000CE030300E3
-:102FC0007C2E0020F8B54E4C1321200025F0BEFCCD
-:102FD0002000032125F050FD4A4C01234A4A1321C9
-:102FE000200016F017F801220221200016F042F806
-:102FF000464C200013F0F2F9454F3860200013F0E2
-:1030000009FC444D2860102025F059FE0400296871
-:103010000025414E3A68330013F042FF3F4B1C60DD
-:103020003F480DF08DFCE120C0000DF099FC3D49BA
-:103030003D480AF07FFE09F071FB06F053FB01F0FA
-:10304000A5FE13F031F8300024F0A3FF22F04AFA75
-:1030500000F064F904F0E0F901F07EFC0AF0D4FC21
-:10306000324C3348230088331D600BF0ADFB0BF06E
-:1030700089FB0AF0DBFC2F4F3B78012B0ED100239C
-:1030800007211A002C4800F051FA031E1DD0010040
-:10309000F720400000F0D2FBFFF700FF3B78002B49
-:1030A0002AD112F0ABF90028F8D0244820F004FB14
-:1030B0000BF078FB08220021214825F086FE230032
-:1030C00098348C331D602560AAE7F82292021178AB
-:1030D0004D2909D15178502906D1F7205288194934
-:1030E000400022F05FFDD7E70122174917200AF0C0
-:1030F000A5F821F07EFCD1E712F0D0F9D3E7C04665
-:103100003C2900205429002017280200DC29002037
-:10311000582900205C290020642900206029002013
-:10312000004000203C2900203C0100207C2E002093
-:10313000552E0000EA000020D2030300DA0303004A
-:10314000FC2E002004E0030044A0020010B5084C4F
-:10315000084A0621200013F075FF074A074920009E
-:1031600025F0A6FD00221E21054824F01CFF10BDFD
-:10317000642900208C94020000000020FD6F0100F3
-:10318000DC29002070B505000C200C0023F091F81C
-:10319000024B45600360846070BDC046A494020089
-:1031A00010B524F09CF8014810BDC046E4B30200FD
-:1031B00010B5C30708D483070ED10368094A9342A8
-:1031C00002D0094A934207D1FFF758FC002801DDDD
-:1031D00020F07FFA054810BDFFF7B4FC17F00EFF92
-:1031E000F4E7C0462CB90200D4E70200E4B30200C1
-:1031F00001220B4B10B51A600A4A51680029FCD015
-:1032000000215160A1220131D2009A585960032354
-:10321000D01718408018801022F052FA10BDC04616
-:1032200000C00040FCC0004010B5002804D1044894
-:1032300012F05CFE034810BD0868FFF71FFCF7E7BB
-:10324000E7030000E4B3020080235B051869034B29
-:103250001B7843438020C002C01A7047C72D00204E
-:1032600080235B051869034B1B7843438020C00211
-:10327000C01A7047C82D002070B5084DC4012B68D6
-:103280000021181921F0E3FB2868054B00197F3055
-:1032900000781B788342F0D270BDC046F42900202C
-:1032A000C62D002010B5C3790400002B08D0064AB3
-:1032B000037981791068DB01C018013021F0C7FB68
-:1032C0000023237210BDC046F429002010B5124B14
-:1032D00001001A684379DB01D31818007F300478A5
-:1032E000FF2C08D10879C00112185278FF2A0FD09C
-:1032F000887990420CD08A799B180132D2B25878E2
-:103300007E2A01D08A7110BD00234C718B71FAE7BF
-:1033100001204042F7E7C046F429002070B5F824A8
-:103320008025A40223786D054D2B4CD12B6980207C
-:10333000E41A2B69C002E41A2969001B16F0F8FC94
-:103340002B4B2C4918702B69E21852185D4215401E
-:10335000294B2A4A9B1A2A4A9B1880225205116936
-:103360009D4234D38020C002401B16F0E1FC254B67
-:10337000641B1870E411244BE4B21C70A1200123DB
-:103380000025224A22491360C0004D604B68002B83
-:10339000FCD01358DBB2A342F7D21E4901330B70A5
-:1033A00001235360FFF750FF037805001A4CFD2BF3
-:1033B0000FD180235B051869184BC009C018C001E4
-:1033C0002818206070BD80242B69E402AFE76D18D7
-:1033D000C5E7FFF745FF0378803DFD2B01D1256050
-:1033E000F0E7FFF73DFFFD2121F031FBF7E7C04695
-:1033F000C82D0020FF87FFFF1401002000000020DF
-:10340000A4870300C72D0020C62D002000D0004057
-:10341000FCD00040C92D0020F4290020FFFFFF014F
-:10342000F7B5254B254F1A78254B14001B783968C2
-:103430000133E001405CFF2829D00134E4B29C4212
-:1034400000D101249442F4D1802300265B051B693E
-:10345000DB090193E30100933B68E2019D182B789F
-:1034600028005A425341F61821F007FB002810D0DB
-:10347000002304E0DA01AA5C002A0AD10133019A90
-:103480009342F7D13868009BC01821F0ECFA200075
-:10349000FEBD0B4B01341B78E4B201339C4200D1DA
-:1034A0000124054B1B78A342D4D1072E02D91FF06B
-:1034B0000CFAB6E7FF24EAE7C92D0020F429002022
-:1034C000C62D0020F7B507000D0001240E4B1B7818
-:1034D00001930E4B1E68019BA34202D2FF242000E1
-:1034E000FEBDE10171180B78FE2B09D18B78AB4240
-:1034F00006D103312A00380025F03CFC0028EED02C
-:103500000134E4B2E7E7C046C62D0020F4290020CC
-:1035100010B5054A03791068DB01C01881780022D4
-:103520000330FDF715FD10BDF4290020F0B585B07E
-:1035300002900D0016000393782948D8FFF7C2FFC8
-:103540000400002E3BD0FF2801D0FFF795FEFFF7C7
-:1035500067FF0400FF2803D11E491F4821F06AFAC3
-:103560001E4FC0013B680190FE21181821F06FFA30
-:103570003B68019AE9B29818023021F068FA38687D
-:10358000019B2A00C018033002990BF037FA0C2077
-:1035900022F08FFE039A0300002A16D0104A1A6008
-:1035A0000E4A1C7112685C71E4011419A278DE7174
-:1035B00002329A7101221A72039A5A7202E033009F
-:1035C000FF28E4D1180005B0F0BD064AE7E7002364
-:1035D000F8E7C046E803030028AB0200F429002006
-:1035E000ECBA020098BB020007B501A9FEF708F982
-:1035F0000199FFF767FFFF2803D10449044821F030
-:1036000019FAFFF739FE03480EBDC0461B0403003C
-:1036100028AB0200E4B30200F7B50192027A04007D
-:103620000091002A02D1244809F0D0FEC579002D6E
-:1036300006D1224A17680279D201D25D002A05D14B
-:10364000092201251A606D422800FEBD61797E22A3
-:10365000C901791808007F30A3790078D21AFF28B1
-:1036600009D12079C00138184078FF2819D0C01A34
-:10367000824200D902000198461B964200D91600EA
-:10368000002EE1D0009A01335019C918320025F0FC
-:1036900080FBA3799B19DBB27E2B04D0A371AD19FB
-:1036A000D4E70022E7E70023A3716379DB01FB186D
-:1036B0007F331B786371F2E7FE030300F4290020D7
-:1036C000F0B585B00393037A040002910192002BB8
-:1036D00002D1304809F07AFEC379002B08D02E4A77
-:1036E00003791268DB019B5C019A0092002B25D1C3
-:1036F0000923039A13600A3B0193019805B0F0BDBA
-:103700007E22A379D71A009A974200D917006079D0
-:10371000214E0133C001C01833683A0018180299CD
-:103720000BF06CF9A379DB19DBB27E2B0AD0A37105
-:10373000029BDB190293009BDB1B0093009B002B79
-:10374000DED1DAE70023A371FFF76AFE0500FF2848
-:1037500009D12079FFF790FD002323721C23039ADF
-:1037600013601D3BC8E760793368C0011818290051
-:103770007F3021F06CF93368ED015819617921F03F
-:1037800066F962793368D2019B187F331B786371C5
-:10379000CEE7C046FE030300F4290020002170B5E7
-:1037A000080023F05DF9012405000C4B1B78A342AF
-:1037B00001D2280070BD0A4AE3011068C0180378DE
-:1037C000FE2B08D1817800220330FDF7C1FB0100F8
-:1037D000280010F001FD0134E4B2E6E7C62D002018
-:1037E000F429002073B501A9FEF70AF80199FFF743
-:1037F00069FEFF2803D10E490E4821F01BF9002570
-:103800007E260D4B1C68C301E31859789B78023360
-:10381000DBB2C201A2187F321078FF2804D1C81A87
-:10382000401921F04DFF76BDF31AED180023F0E7A3
-:103830001B04030028AB0200F42900201FB5034A33
-:10384000034B22F072F905B000BDC046CD32000036
-:10385000A5320000044B054A05481A60054A5A6023
-:1038600000221A817047C046FC290020200307006F
-:10387000E4B3020074696275F7B51600314A0B00B3
-:1038800088321768002F02D12F4809F09FFD0221CE
-:103890002E4C2F4DE167A324E4002C592D4AE4B2AD
-:1038A00006343C192C4F3D68A54204D12B4B1160C6
-:1038B00001930198FEBD2578002832D1601C002BB1
-:1038C00004D12900FDF75CFB01900BE05A68AA4285
-:1038D00000D92A000100186825F064FA01226B0063
-:1038E0001A430192002E0ED0621953785B42336066
-:1038F000D37811791B0209040B43917852790B4359
-:103900001206134373603E68A91D6118721A2000E5
-:1039100025F048FA0223751B0E4A063D3D601360F0
-:10392000C7E7022D04D8002303600E330193D9E7C3
-:103930002100042225F02DFAE91E201D0022FDF7AA
-:1039400007FBC1E77C2E0020AC04030004E100E08B
-:103950000010004000E100E0082A0020E4B302006B
-:103960007FB5002101AA0800FFF786FF0A4B9842A5
-:103970000FD00121019B03905A00029B0A438B4008
-:103980000492064A032013400B4303A9059302F057
-:1039900071FE07B000BDC046E4B30200FEFFFF7F2A
-:1039A000002213B501AC11002000FFF765FF094BA1
-:1039B00098420ED02378022B08D96378012B05D1C9
-:1039C000A378002B02D1E378012B02D0024809F042
-:1039D000FDFC16BDE4B302008C04030002220B4B75
-:1039E00010B5DA6700220121094B5A61094A1161B9
-:1039F0005A69002AFCD0084C88342068002803D07B
-:103A000022F086FC0023236010BDC04604E100E0E4
-:103A1000FC100040001000407C2E002010B5FFF785
-:103A2000DDFF014810BDC046E4B30200F8B5FFF762
-:103A3000D5FF364C26786578063601357543280063
-:103A400022F037FC324A861916600022314B4519A4
-:103A500088331860304B01211D60304B5A60802242
-:103A6000D20511605A68002AFCD003212C4B615604
-:103A70002C4A00259950A178043A9950617A08326D
-:103A800099506168284A08269950217A274A284F78
-:103A900099500121274A9D5004329950264A9E5040
-:103AA0008122247892042243A324E4001A510224A0
-:103AB000224A9C50224A9F50224F043A9F50182776
-:103AC000214A9F50214AC0279850C12292009E50FF
-:103AD0001F4ABF00D0591F4E0640C020000230438D
-:103AE000D051C020400014501460102280301C5867
-:103AF00022431A50184A5560596051680029FCD079
-:103B00000021116101229A60F8BDC046FC29002005
-:103B1000082A00207C2E0020F8290020FC0000400C
-:103B2000001000400C0500001C05000024050000EA
-:103B3000FFFF00002C050000140500003405000004
-:103B40003C050000211001005405000004050000A0
-:103B500000E100E0FF00FFFFFC10004010B5FFF7A0
-:103B600065FF014810BDC046E4B30200F0B5050092
-:103B70008DB01600002802D0694809F0EBFD694BB2
-:103B800009AA190091C991C21A781F7A06925A7827
-:103B900005929A78039203229A5604925A685B7AA5
-:103BA000019202937368AB424CD9EB000793B36860
-:103BB000EA009B181A68002A1BD0042A19D05868FA
-:103BC000FEF788FFB368EA0004009858FDF7E2F9B1
-:103BD0000200B338FF3806282ED816F095F8040CEA
-:103BE000131920262800631EFA2B00D995E0E3B2B2
-:103BF00006930135D6E7631EFD2B00D98DE0E3B2B5
-:103C00000593F6E7532C00D987E0E3B20393F0E77E
-:103C1000072C00D981E0444B1B570493E9E7022CA1
-:103C200000D97AE0E3B20293E3E70194E1E7FF2CE5
-:103C300000D972E0E7B2DCE73C493D4804F032FCD1
-:103C400008F04CFD3B4B09AC88331B68002B12D1AC
-:103C5000069B27722370059B6370039BA370049BD4
-:103C6000E370019B0A93029B63722E4B07CC07C340
-:103C700031480DB0F0BD069B2A4D2370059B637043
-:103C800022882B889A420FD0FFF7A8FE039B277249
-:103C9000A370049BE370019B0A93029B63720ECC9A
-:103CA0000EC5FFF7C3FEE3E70222244B2449DA677F
-:103CB0000022244B4A6101321A614A69002AFCD071
-:103CC000039809AA907004981772D07001980A900E
-:103CD00002985072134870CA70C01B4A04989850DA
-:103CE0000398043A98500298083298500198174A5D
-:103CF0009850174A9F5000224A6001325A604A6821
-:103D0000002AFCD000220A61C02101329A60114BC6
-:103D1000013249005A501A60AAE70F498DE7C046A0
-:103D200036040300FC2900202E0403005104030084
-:103D300008AD02007C2E0020E4B3020004E100E0A4
-:103D4000FC100040001000400C0500001C050000A5
-:103D50002405000000E100E067040300214BF7B5F3
-:103D60005A68214D002A03D000225A600132AA600D
-:103D70001A69002A34D000221A61A323DB00E85814
-:103D80001A4BC2B2883319680C78A24201D21400CF
-:103D900008708023DB00EB58012B1FD1144E154A0D
-:103DA0003768A31D12680193FB189A4216D3621C50
-:103DB000380024F0EEFFA923DB00EB58621CBB5453
-:103DC00015F0F6FE3368020A1C19E270020C22712B
-:103DD000019AA0709B18000E607133600123AB60E4
-:103DE000F7BDC046FC100040001000407C2E0020B3
-:103DF000082A0020F8290020F7B5314F00933B0036
-:103E0000883301921A680E00002A02D12D4809F069
-:103E1000DDFA02212C4B2D4CD96700232C4D636118
-:103E200001332B616369002BFCD0A323DB00EB582B
-:103E30000099DBB27118994203D9B3423DD39B1B61
-:103E40000093009B8837F31813703B68010001331F
-:103E50001800320024F09DFF009B002B06D038682C
-:103E6000013680191A00019924F093FF0023636042
-:103E700001332B606368002BFCD00123AB6000236F
-:103E800023612369002BFCD00023636101332B6184
-:103E90006369002BFCD00023636001336B606368AF
-:103EA000002BFCD00023C021022223610133AB6030
-:103EB000084B49005A501A60F7BD1E000023BFE7A7
-:103EC0007C2E0020AC04030004E100E0FC10004064
-:103ED0000010004000E100E007B501A9FDF790FCEB
-:103EE000019B020003210248FFF786FF01480EBD37
-:103EF0002A040300E4B302001FB5012201A9FEF762
-:103F000077FF002301981A000299FFF775FF014817
-:103F100005B000BDE4B30200030010B50548002B56
-:103F200003D11FF072F908F0D9FB09681FF073F98B
-:103F3000F9E7C04654AC020010B503480968FEF723
-:103F4000F1FC024810BDC04684E80200E4B3020060
-:103F5000F0B5802787B02B4D02907F422C78002C43
-:103F60001CD063B2002B12DA6E787C40E4B2002ED3
-:103F700014D0013CE4B2FF2C02D101350135EDE74C
-:103F800004AB981D0121067005F0F2FBF1E704ABCC
-:103F9000D81D0121047005F0EBFBEFE7052702981F
-:103FA0001FF097FB0124BC4227DA0025164E2200A1
-:103FB000290030000BF0A2FB6B4601901B79002B0F
-:103FC00015D0631E1A002900300003930BF096FBF6
-:103FD000031E0CD12200290030000BF05BFBFF22F6
-:103FE000019B290013403000621E0BF053FB01358A
-:103FF000052DDBD10134E4B2D5E7013F002FCED14E
-:1040000007B0F0BDC70403001C00002010B5C82095
-:10401000FFF79EFF004810BDE4B3020010B5040096
-:10402000431C02D0024804F09BFA024B1C6010BDF6
-:10403000A42E0020782E0020014B024A9A6470477B
-:104040007C2E0020A42E002030B507240278084DD5
-:10405000A24314000222224302707F22039C41608B
-:104060002240D400028883602A402243028030BD6F
-:1040700007FCFFFF10B50B00072401782340A14384
-:1040800019437F23017004990A4C0B40D90003881F
-:10409000426023400B430380039B04685905064B91
-:1040A000C90A23400B430360029B8360059BC360E6
-:1040B00010BDC04607FCFFFFFF03E0FF70B513789B
-:1040C00004000A3BD8B20F2809D90A001048114948
-:1040D00004F0E8F90025636A1860280070BD002527
-:1040E00052781B021A43E36AAB420AD1238C0025A3
-:1040F000042BF2D10849064804F0D4F9636A186029
-:10410000EBE7206BA90009589142E6D00135EBE7B7
-:1041100018AC0200E8060300FD060300F0B5040039
-:1041200085B00D00100003A9A26A1E0021F03EFF19
-:10413000002809D12A000B490B4804F0B3F9636A3F
-:104140001860002005B0F0BD0398FEF7C3FC030023
-:10415000B343F7D0030000962A000449024804F054
-:10416000A1F9ECE7A406030018AC0200BC060300AA
-:10417000F7B51F0013780E000A3BD9B2050021489D
-:104180000F2904D850781B02184321F0F3FB1524A3
-:104190000378009315231C491B1B0193A300CB1A22
-:1041A000190055310978009A91421FD119005631F2
-:1041B000427809788A4219D1573381781B788B422B
-:1041C00014D1002B0FD1019B9A000F4BD05CB84249
-:1041D00008D93B0032000D490D4804F063F96B6AC1
-:1041E00018600020FEBDC378002BECD0013C002CF1
-:1041F000D0D132000749064804F054F96B6A1860C0
-:104200002000EFE73B83030060070300140703006F
-:1042100018AC02002D070300F0B5137885B0050037
-:104220000E00462B47D101A9100021F0EFFE019BA3
-:10423000834240D003781A000A3A0F2A0AD80200B3
-:104240000F2331002800FFF793FF01248440200052
-:1042500005B0F0BDB32B2ED121F0D3FE040021F028
-:10426000CBFE02900378B62B25D10127A73B220075
-:1042700031002800FFF77CFF3C0003A9844002982E
-:1042800021F0C4FE039B02909842E0D09D2102A839
-:1042900021F0CBFE029A039B9A42D8D00F23310023
-:1042A0002800FFF765FF3B00834002981C4321F084
-:1042B000A3FE0290EEE732000349044804F0F2F84E
-:1042C0006B6A00241860C2E74507030018AC0200BF
-:1042D000F0B50E0087B0040004A930001F00019261
-:1042E00021F04DFB019B0500002B0FD1A4239B0067
-:1042F0009E4205D1BF21090220001EF0C9F919E034
-:10430000BE4B9E4200D088E0BD49F5E7019B012BE2
-:1043100000D09AE00A23FF339E420DD101003A6893
-:104320002000FFF7CBFE010020001EF0FBF9002863
-:1043300000D116E207B0F0BDB24B9E4209D1010098
-:104340003A682000FFF7BAFE010020001EF042FA92
-:10435000EDE7AD4B9E420AD101000F233A682000E1
-:10436000FFF706FF8E21C000C9010143C4E70378AF
-:10437000622B3BD1049B032B07D0052B36D1C3788E
-:104380005F2B33D103796E2B30D101230E265B4294
-:1043900069789E480293B300F31AC3181A002B32AF
-:1043A00012788A4209D1AA7894461A002C321278DF
-:1043B000944502D12A331B780293013E002EEAD1A4
-:1043C000029B013329D03A6829002000FFF776FECE
-:1043D000049B0200052B03D12E79773E73425E4188
-:1043E0003300029920001EF0B9F9A0E7884B9E42E5
-:1043F00001D1884980E7884B9E4201D187497BE7FC
-:10440000874B9E4212D129003A682000FFF704FF33
-:10441000FF231B02B421184215D0019B2A008149B9
-:10442000814804F03FF8636A186083E77F4B9E423F
-:10443000F3D13A6829002000FFF7EEFEFF231B02AC
-:104440001842EAD1BC2109028FE7019B022B00D060
-:1044500021E17B68764A1B780A3B0F2B48D89642AD
-:1044600012D13A6801000F232000FFF781FE7A681D
-:10447000060029000F232000FFF77AFE310002001A
-:1044800020001EF038F955E700226A4B02929E4246
-:104490001AD18026F6013A68290007232000FFF789
-:1044A00067FE7A680190290007232000FFF760FE6D
-:1044B000019A0300310020001EF016F93AE7029B32
-:1044C000013302930F2BA8D0029B03229E005A4B6C
-:1044D0002800991924F0D4FC0028F0D1EB78002BA7
-:1044E000EDD1564BF65C80233601DB011E43D2E74B
-:1044F00096421AD1802607233A6829002000FFF748
-:1045000037FEFF23019029007A682000FFF706FE9E
-:104510000100019BB6011B0231431943ECE6A026C2
-:10452000E9E7C026E7E7E026E5E787239B009E4210
-:10453000F5D01E3B9E42F4D0414B9E42F3D0414BFE
-:104540009E4251D0404B9E4250D0404B9E424FD055
-:104550004F339E424ED03E4B9E424DD03D4B9E42ED
-:1045600000D05AE705233C4A9B009B5A290002933E
-:104570003A6807232000FFF7FBFD7E68039033783D
-:10458000452B6BD1300021F07CFD002866D1300036
-:1045900021F037FD0378A62B60D105A921F036FD67
-:1045A0000599060021F01CFD022857D1300021F0AA
-:1045B00023FD07233200070029002000FFF7D8FD64
-:1045C000029B0600DB0451D51F233A00290020007E
-:1045D000FFF7A4FDF100039B029E80011E433143BF
-:1045E000F826F6003040C0E60023BCE70123BAE716
-:1045F000019BB8E70323B6E70423B4E7E602000013
-:1046000030BF00000B0200000F0200006505030030
-:104610002202000072B600002302000062B6000011
-:104620009F0200001F06030018AC02009A0200005F
-:104630008902000001020000690603006806030009
-:10464000C50200006E0200006F020000710200004F
-:10465000C1020000C302000098F602002A0044498B
-:10466000444803F01FFF636A1860D6E66B460822D1
-:104670009B5E002B07DA3E233A0029002000FFF75B
-:104680004DFD4008A6E77C233A0029002000FFF7F3
-:1046900045FD80089EE7019B032B00D0BDE69E23CD
-:1046A0009B009E4222D100263A6807232900200061
-:1046B000FFF75EFD7A680190072329002000FFF7CD
-:1046C00057FD1F230290BA6829002000FFF726FD3E
-:1046D000019F029B374381013943DE0031430BE6E2
-:1046E00080263601E0E780267601DDE7224B9E42F8
-:1046F000F6D0224B9E42F6D0093B9E422BD1C026DB
-:1047000007233A6829002000FFF732FD07230190B4
-:104710007A6829002000FFF72BFDBA68760113782C
-:1047200002900A3B0F2B0DD8072329002000FFF72A
-:104730001FFD029BD900019B194331430F008101EA
-:104740003943D9E58023DB001E43290007232000DD
-:10475000FFF7E4FCEDE70A4B9E4200D05DE6D02671
-:10476000CEE708490348646A1EF05CFD2060E1E57D
-:10477000F405030018AC02007902000007020000F3
-:10478000C502000054060300F7B50E000700110033
-:10479000300021F025FC0025040004281ED97C6A85
-:1047A000134914481EF03EFD206000242000FEBD89
-:1047B00073780002184321F0DDF80236019024F0EE
-:1047C00058FB022811D1019B1B78722B0DD1019B44
-:1047D0005A782B0030339A4207D10135A542E5D0F3
-:1047E00030780A38C3B20F2BE2D97C6A0249D8E785
-:1047F0008F05030018AC0200C2050300054B10B57D
-:10480000186822F07BFF044B002800D1034B1800EE
-:1048100010BDC0465C290020CCE70200C4E70200BE
-:1048200010B5034B186822F071FF024810BDC04656
-:104830005C290020E4B3020010B5034B186822F095
-:10484000D3FF20F03DFF10BD5C29002010B5034BC5
-:10485000186822F0D0FF20F033FF10BD5C29002043
-:1048600010B5034B186822F0CDFF20F029FF10BDD2
-:104870005C29002010B5034B186822F078FF20F067
-:104880001FFF10BD5C29002030B593B009F08AFFEE
-:10489000184C200023F078FB174D286812F068F8B8
-:1048A000200023F076FB09F06DFF20F01BFE1EF0C8
-:1048B0008EF90400296803A822F016FF0F4B200090
-:1048C0000A93039B0B93049B0C93059B0D93069BF0
-:1048D0000E93079B0F93089B1093099B01931193D1
-:1048E00020F0C1F8200020220AA90AF087F8044825
-:1048F00013B030BD642900205C29002055BA11C0D6
-:10490000E4B30200F8B5114D0400286822F0F6FE69
-:10491000002802D12000FFF7B7FF0D4B1B78002BBA
-:104920000DD10C4E3478E4B2002C08D10127286850
-:10493000377003685B689847054B34701F702868B0
-:1049400012F0F2F820F0BCFEF8BDC0465C29002051
-:10495000CA2D0020CB2D0020F0B58DB01EF037F908
-:104960000E4B02689A4217D1046941680894446961
-:104970008268C36809948469C0690A9484466C4655
-:1049800005910692079308A8E0C8E0C4604620603D
-:104990000348006822F092FE0DB0F0BD55BA11C078
-:1049A0005C290020F0B58FB00692426809939446C6
-:1049B0000368040002939B6804300093634403601F
-:1049C0000E001EF011F9059060681EF023F9431CDB
-:1049D00063600378A24A0193831C636043780021DB
-:1049E0000093C31C63608378B5000393031D636069
-:1049F000C3782000049323001033A360059B143078
-:104A00009A1893000793C318E360079B0C331A00AE
-:104A1000089324F0DAF9099B009A5B190B93059B24
-:104A20009B1A039A0A939D1A2F1D009ABF00E7193B
-:104A30000123B24264D2019A1A4207D13300009A8C
-:104A40008849894803F02EFD07F048FE009B033596
-:104A50009900099BAD005918009B6519F01A01F0E7
-:104A600009FE009E043F68600022964200D070E07C
-:104A7000069B002B03D1019B1B0700D4D6E0022329
-:104A80000026019A1A400992B24204D0069820F0FA
-:104A9000BAFE060038600027029B0B9DDB68089376
-:104AA000069B9F425ED10A9B029805339B00E1184A
-:104AB0000A00049D0C30002D00D080E0049A920082
-:104AC0008918079A2032A2188A4200D980E0143B44
-:104AD0000693009B089A9B00D3180793039B9D4263
-:104AE00000D27FE065680DA80D951EF07DF82818AE
-:104AF0000578461CFF2D00D0A7E066600FB0F0BD22
-:104B0000019A1A4205D00335AD00584B6519043F90
-:104B10006B60069B002BA7D1019B1B07A4D4009BB5
-:104B2000049A9A1AB24212D8009A049B991A320037
-:104B30008900009B9A4297D29300029D581828182A
-:104B4000089D0069EB1AE31818610132F1E73300A0
-:104B500076E7099908989300C958C31AE3181961B0
-:104B6000013282E7009B039800221B189C462968AB
-:104B7000944505D8099B002B1CD1CA083C490EE07E
-:104B8000089B90001858884212D1059B013B9B1A44
-:104B90009B00E3185A69002A05D0CA0835493248F3
-:104BA00003F080FC50E76A685A610137083577E7FF
-:104BB0000132DDE76A68300020F05EFEF5E7166836
-:104BC000002E02D1AE0086591660013D043272E714
-:104BD000081D0968002903D1121A92102649DEE740
-:104BE000010071E7069AAB00D71AE7193A69002A63
-:104BF00016D1082000996E180899B6008E190799E9
-:104C0000C958019B03420DD0049B029804339B00BA
-:104C10001858043003F0B0FF002803D043683B610C
-:104C200001355BE732681549D208B8E7039B002BD2
-:104C300002D0134808F08EFD019B9B0700D451E77A
-:104C4000039820F0E0FD38604CE7ED43059BED183C
-:104C5000AD00651968690AF0EBFD6861300047E74F
-:104C6000FDFFFF3FB407030090AC020044A0020028
-:104C70001C080300ED0703003D0803006F08030054
-:104C80009F0803000048704716FCFFFF004870476C
-:104C900016FCFFFF82B007B591B204920593052977
-:104CA00009D01B2902D104A810F0C2FD002003B0D6
-:104CB00008BC02B0184704AB5B88032BF6D106A9E9
-:104CC0000822684624F065F80349049A059B0868A1
-:104CD00011F042FFEAE7C046602900200022044BA1
-:104CE0005A60044A08321A60034A13607047C0468B
-:104CF0000C2A0020A0990200A02B0020F8B5214E1C
-:104D00003568696801292DD9AA684B1ED05C0A282C
-:104D100028D1002B01DC1C0009E0581E145C0A2C71
-:104D2000F9D00300F5E7105D202802D10134A1423B
-:104D3000F9D8002B0BDD601C814208D1581E0028D9
-:104D400005D00138175C0A2F0CD0202FF7D052184D
-:104D5000023AE31A14789B083A3C624254411C1907
-:104D6000002C00D1F8BD084F04223900280022F0A1
-:104D7000AEF90421380004F0EDFC3369013C043342
-:104D80003361EDE7142A0020DB6F030010B5202209
-:104D90000021024824F019F810BDC046DC2E002086
-:104DA000084B10B5426818600020986018750138EB
-:104DB000D86008005A601A6199611EF07DFCFFF707
-:104DC0009DFF10BD142A0020F8B503780400002BC5
-:104DD0001ED0104D286E002804D0210024F03FF88A
-:104DE000002815D0200024F044F8471C380021F09A
-:104DF0006DFA061E0CD03A00210023F0CAFF2A00EB
-:104E0000054B5C321968043B99609342FAD12E66D7
-:104E1000F8BDC0467C2E0020F42E0020F0B5B84C22
-:104E200002002068A568436885B00193002D00D07A
-:104E3000FDE0531E042B11D8636801998B4200D109
-:104E400095E0012A00D12AE1022A07D1236962688C
-:104E5000934200D94FE10122524288E0032A00D157
-:104E600085E0042A00D12FE1052A00D107E1062AB6
-:104E70000ED12369019A9342AD416D42002DEADDC6
-:104E80002368290098682369C01804F063FC1FE0B8
-:104E90000B2A21D1019B2269991A22F0D8F92368A3
-:104EA000019A5B68934204D213002269981A04F0B5
-:104EB00087FC2268236951689068C91AC01804F0F9
-:104EC00049FC236858682369C01A401B04F066FC3B
-:104ED00023695D192561BEE70E2A13D1E368002B13
-:104EE000B9DB013BE3606268019B991A22F0AFF9DC
-:104EF000E368002B18DB1633824A9B00D3189968AD
-:104F000020680FE0102A16D1E368062BA3DC5D1C95
-:104F10007C4A17339B00D318996800299BD063689B
-:104F2000E560436022F058F963682269D61A226866
-:104F30005568ED1A0AE0152A0CD123696268616888
-:104F40009A1A22F08CF9236962689E1A0127002EB2
-:104F50002FDCA4E70D2A0DD16B481EF0ADFB2068B5
-:104F600022F01FF96368C018FFF72EFF002210001F
-:104F700005B0F0BD01231B2A62D0082A01D07F2A88
-:104F800020D121696268914200D864E700238668D5
-:104F9000B618F75C202F13D101339F18B942F8D807
-:104FA0000426032B00DC033E891B320022F057F954
-:104FB0000127300004F0F2FB23699E1B266178E094
-:104FC0000126F1E7092A28D1636822698068D11A8D
-:104FD000C0184E4A03AB02F025FB061E00D13AE78B
-:104FE0000027431C0BD1A0691EF066FB6368226991
-:104FF000D11A22689068C01804F0ACFB4FE723690F
-:105000002068F918039B01375A1C03921A7822F082
-:105010000CF9BE42F3D1350041E71300203B5E2B73
-:1050200000D918E7216922F009F9012537E7012D98
-:1050300008D104234F2A03D002235B2A00D0002387
-:10504000A36008E7022D20D11300303B092B03D8C1
-:1050500003232275A360FEE60023A360412A00D14A
-:1050600052E7422A00D139E7432A00D101E7442A16
-:1050700000D1EBE6482A12D0462A00D0EBE6002702
-:10508000019B22693E009D1A0EE00021032D29D1CB
-:105090007E2A24D1237D312B01D0372B0DD1002541
-:1050A0002F00236962689E1A0023A3609E4200DDE0
-:1050B0007FE7002F00D1E1E6F1E61A00FB25343A44
-:1050C0002A42DCD0332B0AD12169019B994206D2B6
-:1050D000012222F0C4F8002501272E00E4E7002574
-:1050E0002F00FAE7042D04D1462AC8D0482AD6D08A
-:1050F000A5E7A160AFE6002501262F0059E7C046CD
-:10510000142A00207C2E0020DC3F030084E80200EB
-:10511000044B88600B60044B08004B600023CB609D
-:105120007047C0466C980200352C020013B504008D
-:10513000080001A9FBF746FF002C03D0012C07D083
-:10514000002004E0019B0548002B00D1044816BD57
-:1051500001991EF0CBF840002043F8E7CCE70200AD
-:10516000C4E70200F0B585B00400080003A91500EB
-:10517000FBF728FF0600002D07D10300039A2F49F3
-:10518000200021F047FE05B0F0BD039B0200C318CC
-:10519000002101200193019B934206D82727002973
-:1051A00000D0053F3A0026491AE01378272B08D093
-:1051B000223B5D426B41DBB20132002BEBD0272753
-:1051C000F0E700230100F7E730001EF05CF805006F
-:1051D00030001EF073F80600AF4205D13A001949BD
-:1051E000200021F017FE14E017495C2D0ED02B0093
-:1051F000203B5E2B01D82A00D5E714490A2D05D0A3
-:1052000013490D2D02D0092D0CD11249200021F097
-:1052100040FD019BB342D7D83A000949200021F054
-:10522000F9FDB0E7FF2D02D82A000B49D8E70B4B58
-:105230002A000B499D42D3D90A49D1E70301030053
-:105240008200030081000300850003008800030042
-:105250008B0003008E00030091000300FFFF00009D
-:10526000080903000F090300F7B51E0008AB1D78FD
-:10527000294B0C001700984206D12B003200390050
-:10528000FDF7D4FC2018FEBDF30715D57610019666
-:10529000019BE219002B2ADA00213F260127501E2C
-:1052A000A04219D2002900D001932000002DEAD19C
-:1052B0001A491B481FF0BEFB01A93000FDF71CFC7A
-:1052C0000028E5D130001DF0B2F916490200164859
-:1052D00003F0E8F807F002FA0278B243802A01D01E
-:1052E00039000133421E002BCDD01000D8E720003A
-:1052F000012600243F27904204D3002C00D00193C4
-:105300001000D3E7013BBED3340001300178B9432C
-:105310008029F0D10130F9E7A0920200EE080300E5
-:1053200084A90200C608030090AC0200F0B587B063
-:1053300004000E001700FDF7B9FA02A905002000CD
-:10534000FBF740FE0400042F4ED1B30734D1274BA6
-:1053500032689A4230D105AB04AA03A930001DF08F
-:105360009EFE059B224FBB4204D0032B02D0214856
-:1053700008F01EFA039B2600BB4207D00122210041
-:1053800000922800029AFFF76FFF0600029A049B22
-:10539000A118BB4206D00121280000912100FFF78F
-:1053A00063FF01000E208E4204D88A1B28003100C2
-:1053B0001CF0F6FF07B0F0BD0023029A0093210015
-:1053C00033002800FFF750FF0278012153B2002B71
-:1053D00006DA4023012101E001315B081342FBD1D1
-:1053E0000122FBF7B5FDE5E70020E3E7E8A40200B2
-:1053F000E4B30200A6FC020010B504000C2020F06B
-:1054000058FF034B4460036001235B42836010BD7F
-:10541000089B020001220020074B08495A600860DF
-:10542000A821DA60064AC9005A5006495A50043188
-:105430005A5005495A50704700A000400CAC00403B
-:10544000FCFF0000440500004C050000034B04482D
-:105450001B78002B00D103487047C046CD2D00209B
-:10546000CCE70200C4E70200F8B5A826324A334B65
-:10547000F600196813680420CB18C9181160304A67
-:105480008C4612781B11170009112E4A2E4C2F4DF5
-:10549000002F48D0002B3ADA9051C31AA920C0003F
-:1054A000135081239B00002937DA591A13515151A7
-:1054B0000123274CD3602378002B22D03F2225489C
-:1054C000254B01688C331B6801310A409D5C1C4BE5
-:1054D0001B78002B01D0803D6D001C2302606246CA
-:1054E0006B4308339B1A154A9B1013601F23194006
-:1054F00007D11A4B1A78002A03D01948197009F0FD
-:1055000069FA01232278042053402370F8BDA927AB
-:105510000433FF00D0519351C3E7535181239B00C3
-:10552000C9181151C4E7043390515351A920812364
-:10553000C0009B001350F3E7302A0020402A0020CF
-:10554000D800002000A000404C05000044050000E9
-:10555000CC2D0020342A00207C2E0020D9000020F1
-:10556000F32C020030B585B001220400080001A927
-:10557000FDF73EFC029A202A00D920220023019D3B
-:10558000934204D0E85CE11808710133F8E7014860
-:1055900005B030BDE4B3020070B50400080015008A
-:1055A000FDF76CFA1F2802D90C4807F00FFF002DF9
-:1055B00002D10B4808F0CEF82418042D04D10120A4
-:1055C00023795B00184370BD2800FDF757FAFF28C8
-:1055D00001D90448E9E720710348F4E748090300CA
-:1055E0005C09030079FC0200E4B302000123A0225D
-:1055F000834010B5134CD20513510300C133124C34
-:10560000FF339B009C50114B8900C918A223DB007B
-:10561000CA580F4C00022240CA50F82252011040D2
-:10562000C022CC589202224310430322C850CC58C7
-:10563000084822432043C850C046C046C046CA500E
-:1056400010BDC0460C0500000303000000600040D0
-:10565000FFE0ECFF031F0000A0221E21114BD2002F
-:1056600070B59C58104D8C439C50A324E4001D51F0
-:105670000E4C0F4D0F4E5C5104355E510E4D8000A7
-:105680005C51A5240D4DE4001D51084C0C4D001932
-:105690000C4C185104341D510B4C185198580143AF
-:1056A000995070BD00F0014040A1004000600040F2
-:1056B0001C05000044A100402405000048A1004052
-:1056C0004CA100402C0500003405000010B504007A
-:1056D0000A4903F0F5FB0A4BA0211C600123607905
-:1056E000084A8340C9058B500021FFF77FFF002047
-:1056F000FFF7B2FF0022044B1A7010BD18B202006F
-:10570000382A00200C050000D800002070B50D00DC
-:105710000400134E2800310003F0D2FB31002000BA
-:1057200003F0CEFB0F4BA0221C600F4BD2051D6077
-:10573000607901242100814026000C4BD150697909
-:105740008E400021D650FFF751FF68792100FFF706
-:105750004DFF2000FFF780FF054B1C7070BDC04659
-:1057600018B20200382A00203C2A00200C05000054
-:10577000D8000020F8B50025FFF74CFE214B28008B
-:1057800090331D6009F0F4F8A0221E201E4B1F4923
-:105790001D701F4BD2001D601E4B1F4C1D608B588F
-:1057A0001E4F83438B50A223DB00E2581C4E3A402D
-:1057B000E250E2581B493243E2500122E5501A4BB5
-:1057C000186843799A401300A022D205535003F081
-:1057D00061FB164B1B78AB4213D0154B1149E258B5
-:1057E0001740E750E25816430122E650E550114BAE
-:1057F000186843799A401300A022D205535003F051
-:1058000049FBF8BD7C2E0020CD2D002000F001408A
-:10581000302A0020402A002000600040FFE0ECFF1A
-:10582000001F03000C050000382A0020D8000020CB
-:10583000140500003C2A0020F0B53E4E8DB0330028
-:1058400090331B680500002B03D1FFF793FF0DB0C9
-:10585000F0BD002801D008F097FA684606F018FF5E
-:10586000002822D133009033186807F0B9F90400FA
-:1058700006F02CFF002D01D008F090FA2E4B2022CC
-:105880001D6833006D118C3301356D011B681540A7
-:105890005D19002C2DD1903621002800346023F0B2
-:1058A00094FA0122254B1A70D1E7002D01D008F09F
-:1058B00075FA019B2249186806F00EFA00240500CB
-:1058C000A042DBD1019F3800FCF7F0FF1D4B98424E
-:1058D0000BD12900012000F0CDFE2A000400F86061
-:1058E0001F211948FBF734FBA060019B0024B3641F
-:1058F000C4E72000FCF7DAFF144B984209D03300CC
-:1059000000229033124913481A601DF08BFCB064DA
-:105910009DE763682B60A3686B60E368AB602369F5
-:10592000EB6063692B61A3696B61E369AB61236A17
-:10593000EB61B6E77C2E0020342A0020D90000203D
-:10594000DCAB020074AA020016090300EC9B020003
-:105950003609030090AC020010B5FFF70BFF0148B9
-:1059600010BDC046E4B30200F0B589B00493734B98
-:1059700003901B780E001500002B01D0FFF7FAFEF4
-:105980006F4C8C342368002B06D16D4A4020903236
-:10599000136020F08EFC206080226A4BD200DA6710
-:1059A0000122694C694BE250FFF734FD0023684A3D
-:1059B000F021A3500432A3500832A350C22209039D
-:1059C0009200A150634F093AFF3AA3500594BE429A
-:1059D00000D0A3E0B54200D09DE05F4D07AC2800A9
-:1059E00003F062FA002805D001235C4928002370E7
-:1059F00003F066FA5A4D280003F056FA002805D045
-:105A0000012356492800637003F05AFA554D2800C7
-:105A100003F04AFA002805D0012350492800A3705A
-:105A200003F04EFA002307AA5F1C9B5C002B39D0C1
-:105A30004D4ABB00043BD458A02203213D006379AA
-:105A4000D205C133FF339B00995007ABEB5C002BB1
-:105A500026D00426444BAA00D3580193012263792F
-:105A6000A0219A40A123C905DB00CA50019B053340
-:105A7000180002931DF01DF9012811D16379A021AE
-:105A800098403A4BC905C85002981DF012F90028F9
-:105A900006D1013E002EE1D1019949E00225D4E76B
-:105AA000022DFBD10123022FBDD12B4801F0BEFCFA
-:105AB000FFF70CFE0021039807F058F80025012499
-:105AC0003F221F4B802190331860294B1D70294BBA
-:105AD0001C70294B1A601A4B12198C33186823F06A
-:105AE00074F92800FFF7A8FE244B144E1C60059B98
-:105AF00050221C6022492800347008F005FF049BE6
-:105B0000AB4219D00E4B3278002A15D09A6C002A7D
-:105B100012D120BFF7E71B4807F01CFE300001F050
-:105B200085FC0400BD42C3D0280001F07FFC0100C9
-:105B30002000FFF7EBFDBDE709B0F0BDCD2D002043
-:105B40007C2E002004E100E000A00040FC0F0000DB
-:105B500004050000E4B30200ACA20200E8B10200B8
-:105B6000F4A2020004A30200B89B02000C0500008E
-:105B7000CC2D0020D9000020342A00200CAC00409D
-:105B8000695400008109030010B5084B86B002ACCF
-:105B90000093019404230CF0BFFB02982379E26880
-:105BA000A168FFF7E1FE024806B010BDC49B0200E9
-:105BB000E4B30200014B1878C0B27047CD2D00202D
-:105BC00010B5242020F075FB0400044B202208C0EF
-:105BD000802123F0FAF8200010BDC046EC9B0200A3
-:105BE000F8B5070008000D001600FCF75FFE304B0B
-:105BF00098425BD1781F0F2858D814F085F8080810
-:105C00003257575757575757575757303055FFF751
-:105C1000D7FF04230400EA5CE2540133242BFAD1B9
-:105C20003000FCF743FE224B98423FD10121052F63
-:105C300002D0122F00D002390422FF20B35CA55CF1
-:105C4000803B4B435B19FF2B03D90500DB179D43BA
-:105C50002B00A3540132242AF0D12000F8BD2C00DF
-:105C6000DEE7FFF7ADFF04230400EA5CE2540133F2
-:105C7000242BFAD13000FCF765FF0F211DF03EF810
-:105C80002100FF25221D24311378803B4343DB1381
-:105C90008033FF2B03D92E00DB179E433300137094
-:105CA00001329142F0D1D8E72C00E3E70024D4E799
-:105CB000EC9B0200F0B585B00C00FBF76BF903AA72
-:105CC000070002A92000FCF77BFF029E039B350022
-:105CD0001035AD002800019320F0EBFA04002C22CF
-:105CE0001030002123F071F867602700104BE66345
-:105CF0002360104B019EA3600F4B403DE3600F4BB0
-:105D0000403763610E4B7519A3610E4BE3610E4B77
-:105D100023620E4B63620E4B6363AE4202D12000DE
-:105D200005B0F0BD01CEFBF735F901C7F5E7C04678
-:105D300058B80200555D0000B55D0000196600000E
-:105D4000B1660000795D0000B1670000A565000044
-:105D50004CA0020070B50C0005000B6805495A689C
-:105D600021F058F821682800403122000CF08CF90D
-:105D700070BDC046C43B0300136870B5002B10D142
-:105D80000568EE6BB34200D170BD9C002C19246CE9
-:105D9000A14201D00133F5E702339B001B58136089
-:105DA000F2E7024902481EF045FEC046A30903007F
-:105DB000E0A70200F0B51700C26B85B0CE19050050
-:105DC00001910393964206D033002549254802F0FD
-:105DD00069FB06F083FC0021300000F04BFC04005E
-:105DE000019B05609B001A0003990830029322F082
-:105DF000D0FF0298BA0008302018002122F0E5FFF9
-:105E0000029A039B94466344F7191E00019BBB4210
-:105E100002D3200005B0F0BD3068FBF7BBF80021CD
-:105E20000200EB6B0293029B994204D10E490D488C
-:105E300002F038FBCDE78B00E818006C824201D0FD
-:105E40000131F0E7E3189968002901D00749EEE72E
-:105E5000726808369A60019B02330193D6E7C04608
-:105E6000B407030090AC02001C080300ED07030018
-:105E7000014B58687047C0467C2E0020014B1868C3
-:105E80007047C0467C2E0020F0B5194E87B03368AD
-:105E9000050000200C0001931FF0B5FC306000905D
-:105EA00020681EF07CFD019B07003360114E022D1F
-:105EB00003D0A068FCF7FAFC0600210063680831F3
-:105EC000A81E039300F0D6FB009B049005930022CC
-:105ED00003AB0321300006F053FD074B04009F4243
-:105EE00003D0010038001FF07DFB200007B0F0BD9B
-:105EF0007C2E002058B80200E4B302001FB56946AA
-:105F000006F034FE0400200006F092FE002802D1C4
-:105F1000044804B010BDFCF7EFFE0028F3D102489E
-:105F2000F7E7C046CCE70200C4E702001FB56946A8
-:105F300006F01CFE0400200006F07AFE002802D1C4
-:105F4000044804B010BDFCF7D7FE0028F3D0024887
-:105F5000F7E7C046C4E70200CCE7020010B5FCF743
-:105F600029FD034B002800D1024B180010BDC0468C
-:105F7000CCE70200C4E7020037B5FCF77FFD01ABB8
-:105F80007F2806D80121187001221800FAF7E0FFD7
-:105F90003EBD1E49820988420BD8402149420A432E
-:105FA0001A703F2202408020404210435870423114
-:105FB000EAE7174C010BA0420ED82024644221438B
-:105FC000197080215F344942224020400A43014336
-:105FD00099705A700321D7E70E4CA04212D81024B2
-:105FE000850C64422C431C703F2580242940644268
-:105FF0002A40284021432243204359709A70D87088
-:106000000421C1E7044807F0E1F9C046FF0700009A
-:10601000FFFF0000FFFF1000B7090300F0B589B0D3
-:10602000019204000D0000222F490198029302F012
-:10603000A3FD0090002801D043680093012C16D0E6
-:10604000A4002B19002427000193019B9D4224D01A
-:10605000009B2E68002B04D0310018001EF0A6FC17
-:106060000600002C37D137002C680435EDE70024FA
-:1060700004A9286806F07AFD27000390039806F02B
-:10608000D7FD051E0CD1002C07D12200174901981D
-:1060900002F072FD00281BD04468200009B0F0BD5A
-:1060A000009B2E00002B04D0290018001EF07EFC5F
-:1060B0000600002C09D03A003100029807F08EF952
-:1060C0000B4B984201D025003E002C003700D5E74D
-:1060D000084807F07BF93A003100029807F07EF992
-:1060E000034B9842C1D1BEE7561300002E110000A9
-:1060F000CCE70200D809030037B501A90500FBF77A
-:106100007FFB1E4B04002B40062B05D0AB072AD18A
-:106110001B4B2A689A4226D1019920001DF0E6F80F
-:106120000190012822D1207843B2002B04DB01200A
-:1061300023785B0018433EBD7F23013418403F3B6A
-:10614000034208D13F22237819009143802905D0CA
-:106150001FF0B6FAEFE798435B10F1E780011340B8
-:1061600001341843EFE7019B012BE0D0019A054968
-:10617000054802F097F906F0B1FAC046070080FF23
-:106180000C9A0200F109030090AC0200F0B5140073
-:1061900087B00290039100222349200002F0ECFC1A
-:1061A000002205002149200002F0E6FC0123040042
-:1061B000049305931E4F002D07D068681D4B98422D
-:1061C00003D004A9FBF71CFB07001B4E002C07D0D3
-:1061D0006068184B984203D005A9FBF711FB060035
-:1061E0000024029B154D9C420AD10023059A01937D
-:1061F0000093310028000EF0BBFD0E4807B0F0BD43
-:10620000002C07D00023049A019300933900280042
-:106210000EF0AEFD0399A3000022C9582800FCF738
-:106220005DFB0134DDE7C0468E15000096110000CD
-:10623000DE6F0300E4B30200654F030084E8020050
-:1062400010B5040086B06A4602A810210FF0D8FDF0
-:10625000012221006846FCF741FB02A90248FAF737
-:1062600041FE06B010BDC0460C9A020070B50C6825
-:10627000E30726D4A30703D1174B22689A4220D004
-:10628000012820D94868FCF7F9FB06002000FCF73C
-:1062900059FC051C300014F0D1FE011C0F4817F00A
-:1062A0008DFB011C041C281C14F09CFB16F0F6FF4F
-:1062B000211C14F0BFF9032302249843084B044324
-:1062C000E418200070BD2000FCF73CFC16F0E6FF4F
-:1062D00006F056F80400F4E72CB902000000204153
-:1062E0000000808030B50B0085B01400012802D971
-:1062F000094807F02FFA09480121C2680192019D5F
-:106300000022A8472200039003A901200DF0C4FF3A
-:10631000039805B030BDC046450A030088E7020077
-:1063200013B504000800FAF735FE6A4601002000A4
-:1063300006F09EFB009B0248002B00D1014816BDD1
-:10634000CCE70200C4E7020037B50024022800D9D8
-:106350008C6848680D68FAF71DFE0A4B0100002C96
-:1063600000D0094B6A4628009847009B002B07D0B5
-:1063700001991C00002903D01800FCF703FF04005A
-:1063800020003EBDD5CA000071CA000070B50400EF
-:1063900008001500FAF7FEFD2A000100200006F0B3
-:1063A000C1FB014870BDC046E4B30200F8B5032646
-:1063B000050007003540022D16D10E4B0340062B79
-:1063C00012D0FF23DB05C418B443201C002113F0B6
-:1063D00075FE002806D080231B06E418B443064B44
-:1063E0002C43E7183800F8BD380009F069FA0700B7
-:1063F000F8E7C046070080FF000080807FB50B00F3
-:10640000012803D100211868FCF782FA102102A8A4
-:1064100020F079FE0C4902A81CF002FC032804D1EC
-:106420000A481CF0F2FE06F059F9039B0193002B79
-:1064300003D1042801D10648F3E702A90548FAF779
-:1064400051FD07B000BDC0463B830300FCA902001C
-:1064500058A802000C9A020010B506F0C1FB0028F3
-:1064600004D103481CF0D1FE06F038F910BDC04637
-:10647000DCAB020010B5022803D0054905481EF028
-:10648000D9FA4A680B20096806F0A8FF10BDC0467B
-:106490002B0A0300ECAA02007FB50D4D0400A842B0
-:1064A00013D00C4E012201003000FCF717FA0A4904
-:1064B000300020F0EEFB04230293084B0394DB69C9
-:1064C00002AA0321064801939847280004B070BD32
-:1064D000E4B3020084E80200654F030098B10200B3
-:1064E0005C9D0200F8B50E0000280FD10400284B77
-:1064F0001D680021080020F0B3FA00270600BD4205
-:1065000032D10025AC423ED13000F8BD0868830787
-:1065100014D103681F4A93420DD11CF087FF050078
-:106520003068FCF7C3F91C4BC26800249A42E0D1E2
-:1065300034680434DDE7194A934201D0FCF7B6F918
-:10654000856B002DECD0164B2A689A42E8D00025C6
-:10655000E6E7EA68FB009958002904D0042902D034
-:1065600030000DF039FE0137AB68BB42F1D8C8E707
-:10657000A268EB009958002904D0042902D0300009
-:106580000DF02AFE01356368AB42F1D8BCE7C04686
-:106590007C2E002098B102007DB6000058B80200A1
-:1065A00074C20200044B88600B60044B08004B600F
-:1065B0000023CB607047C0466C980200E72D0200B4
-:1065C00070B50E0010490400002520F062FB7368CE
-:1065D000AB420AD8012B03D10C49200020F059FB13
-:1065E0000B49200020F055FB70BD002D03D0094958
-:1065F000200020F04EFBAB00F31801229968200028
-:10660000FCF76CF90135E2E7E20D0300700A0300C4
-:10661000A002030045FC020070B50D0001281ED049
-:10662000002803D0022807D0002004E04B680E4861
-:10663000002B00D10D4870BD00260D4C6B689E42AA
-:1066400003D3012064002043F5E7B300EB189968F9
-:10665000022006F023F9401024180136EEE74B68BB
-:106660005B001843E7E7C046CCE70200C4E702003E
-:1066700044A0020070B506000D000B48002E0DD09E
-:10668000B41CA40020001FF014FE084B46600360F9
-:10669000002D03D00023083CA34200D170BDE9586F
-:1066A000C21891600433F7E744A002004CA0020036
-:1066B000F0B5070085B00E0014001D2803D9002591
-:1066C000280005B0F0BD01238340324D1D4044D168
-:1066D000314A13421FD1F82292051342EFD0200015
-:1066E000FCF7E4F82D4B426A9A4205D020002C4971
-:1066F0001EF0F8F8041E0CD0230031006268083345
-:1067000000920831726838000BF02AF9254D0028F4
-:10671000D6D1254DD4E72000FCF7C8F8204905F074
-:10672000DBFA0028CBD07368626829009818FFF75D
-:10673000A1FF07003100736808379A00050008318F
-:10674000380022F026FB210070686368800038184A
-:106750009A00083122F01DFBB2E703A91000FCF7F4
-:10676000CBF90025A842ABD00398104D0028A7DD37
-:10677000736800215843FFF77DFF05002B003000B0
-:10678000083300930830039B726804211FF031FA2C
-:1067900096E7C0468000100020000400A5650000B8
-:1067A0004CA00200CCE70200C4E7020044A00200B3
-:1067B00030B5040085B0042A2DD1032540680D4072
-:1067C0001FD1164B0A689A421BD101AA0BF04CF854
-:1067D000002802D1124806F0EBFF019B0298290025
-:1067E000C01AFFF747FF050021006B6808319A00C7
-:1067F000019B08309C00091922F0CBFA280005B053
-:1068000030BD0A00002301002068FCF70FFA0230B7
-:1068100080000559F2E70025F0E7C046E8A4020031
-:10682000A6FC0200F0B50C001100002285B01E008D
-:106830000092012320000BF03FFD184D002C1ED0CC
-:106840003568AB0703D1164B2A689A4217D010203F
-:106850001FF02FFD00210400306806F087F90025A5
-:1068600004260390039806F0E3F9071E0AD12800D6
-:106870002100FFF7FFFE050020001FF049FD280062
-:1068800005B0F0BDAE4205D8F10020001FF02FFD8D
-:1068900004007600AB001F510135E3E744A002007D
-:1068A0004CA002000022104B10491A600300123362
-:1068B000FF3341185A701A7004338B42FAD1010029
-:1068C0000300002209310833FF311A709A705A70A0
-:1068D000DA7004338B42F8D1C3237F229B00C25469
-:1068E000034B044A1A607047442A00201103000039
-:1068F00004000020720A0300F0B500267E24320056
-:1069000031009300C318FF335F7C7F2F4CD09B7CFA
-:10691000F618F6B2531CDBB2EF2E2AD9C1267D251C
-:10692000B60086193700AC469C4516DA9B00C318A2
-:10693000FF3359749974D97419757D230232D2B218
-:10694000934211DA9300C318FF335C749974D974BD
-:10695000197500260132D2B2D3E73D68043FBD600D
-:1069600001256D42AC44DFE73568013B7560043EAC
-:10697000E6E77D2FEED80D4DEF5D01252F42E9D0E2
-:10698000C1227D26920082189E4208DA9A0082185F
-:10699000FF3254749174D17411751A00D9E71568D7
-:1069A000013E5560043AEFE7F0BDC046550B0300C9
-:1069B00070B5002140250D4C8B00C318FF335A7C65
-:1069C0007F2A11D0A25C0131C9B22A42F4D05A7D8B
-:1069D0007F2AF1D0A25C7F2AEED9DA7D56B2002E52
-:1069E000EADD0132DA74E7E770BDC046040B03004C
-:1069F0000300F7B500214B4A1333FF338218197097
-:106A000004339A42FBD1FC2300249C462200844498
-:106A100053B2002B04DA444B444A1A60002008E0C9
-:106A200063461F69BC4205D37F234432920013544E
-:106A30000120FEBDDE68355D602D01D9203DEDB23F
-:106A4000611CC9B28F4251D0735C602B01D9203BCD
-:106A5000DBB2232D4DD1303B092B02D9324B344AC6
-:106A6000DBE70234E1B28F4204D8FF2BF6D8437043
-:106A70000C00CDE7745C2500303D092DF5D80A25C2
-:106A80006B430131303BE318C9B2ECE70136512EBC
-:106A900030D10023274C1F5DDEB22A2F0CD1264FA8
-:106AA000FF5CAF4208D19300C318FF335E74447893
-:106AB00001321C75D2B2DBE70133512BEBD11F4CF5
-:106AC000493B08342678AE4208D0013C002B02D165
-:106AD000154B1B4AA1E7013BDBB2F3E7002BF7D0D4
-:106AE00014004334A4000419A370C1E7232DB5D0CA
-:106AF00000230026F7B201970F4FF75DAF42C5D1D3
-:106B00000C4FF75D2A2FC1D09F42BFD1930001994E
-:106B1000C318FF3359744178013202341975D2B267
-:106B2000E1B2A5E71203000004000020750A03008B
-:106B3000870A0300940C0300430C0300E50C0300D8
-:106B4000950A030010B51130084A0949FF3003784F
-:106B50007F2B00D110BD02240457002C03DCCB5C3A
-:106B600043700430F3E7D35CFAE7C046F30B03004D
-:106B7000A30B0300F0B50023070085B09E00BE19EB
-:106B80003100FF314A7C9C467F2A01D105B0F0BD1F
-:106B90004F4B02209C5C63460133DBB20442EDD0D4
-:106BA000012560462C4242D15419E0B20090494878
-:106BB0007C35801840780190C87C097D0290039153
-:106BC000C1218900791808009D4226DA9B000098AF
-:106BD000FB18FF3358740198941C98740298E4B21F
-:106BE000D874039818753B48634682183000FF300C
-:106BF0009578027D023300927D22C67CDBB29A42F8
-:106C000010DA9B00FB18FF335C749D74DE74009AED
-:106C10001A7563460333DBB2B0E70468013D446094
-:106C20000438D1E70868013A48600439E7E70130E1
-:106C3000C0B2010044318900C95D0029F7D07F2925
-:106C400008D008242248405C204297D124390129E9
-:106C500000D893E73000511CC9B200911D49FF30A4
-:106C6000891849787D250191C17C0291017D0391AC
-:106C7000C121890079180C009D421FDA9B00009CFD
-:106C8000FB18FF335C74019C124D9C74029CDC74F5
-:106C9000039C1C75941CAA1863469678027D0233E7
-:106CA00000927D22C57CDBB2E4B29A420BDA9B00F3
-:106CB000FB18FF335C749E74DD74A8E72668013D01
-:106CC0006660043CD8E70868013A48600439ECE79C
-:106CD000040B0300A30B0300F7B500229300C318B5
-:106CE000FF335C7C002C03D10132D1B20A00F5E7FE
-:106CF0007F2C00D126E1102693490D5D511CC9B2AD
-:106D0000354227D0DC7CAD06ED0FA4462C00C12512
-:106D10001434AD001F7D019445196D368E4214DA8E
-:106D20008D00019C4519FF356C740024AC746446D9
-:106D30002F75EC745C7C352C00D0C5E05A7B834CFD
-:106D4000A25C5207D2D5102285E02C68013E6C600F
-:106D5000043DE3E74E2C1CD118220D24DD7C5C742D
-:106D60001E7DC1239B00C31870348C420CDA8B004B
-:106D7000C318FF335A740022DD749A741E75B5E788
-:106D80001B22EAE71C22E8E71F68013C5F60043B26
-:106D9000EBE74F2CF4D0502CF4D06DB2002D2BDA51
-:106DA000DD7C002D28D00D004435AD002D5C002D7C
-:106DB00022D1961CF5B20195AD004519FF356F7CC7
-:106DC0007F2F19D0604EF75D7F2F15D9EF7C002FF4
-:106DD00012D0C1237D229B00C318019C944206DD82
-:106DE0001F236B740023AB74EB742B757EE71C6858
-:106DF000013A5C60043BF0E7172C2ED15C7B013A32
-:106E0000D2B2452C1DD11B3C5C7315004335AD003F
-:106E10004D4C2D5C655D7F2D00D867E70132D2B205
-:106E200092008218FF32557C002D00D180E0645D15
-:106E30007F2C00D85AE7D27C002A00D056E71E32B9
-:106E400009E0392C01D10D3CDEE73F4A125D7F2A73
-:106E500000D84BE712225A7448E7182C07D15A7B06
-:106E6000394CA25C7F2A00D840E71322F3E7202C9C
-:106E700005D15A7B3C2A00D038E7163AEBE7482C7C
-:106E800015D15C7D7F2C02D14B245C7403E02E4D28
-:106E90002C5DA406F8D55C7C2B4D2D5DED0700D450
-:106EA00048E75D7B202D3CD10C3C5C741EE73C2CFC
-:106EB000F1D15A7D7F2A00D118E7234CA25C9206BB
-:106EC00000D513E73F22C6E72A2C16D1DA7C1C7DB9
-:106ED000C1237D259B00C3188D4209DA2B258B0029
-:106EE000C318FF335D740025DA749D741C75FDE6CC
-:106EF0001E68013D5E60043BEEE72C2C11D1DA7C6C
-:106F00001C7DC1237D259B00C3188D4204DA8B00B4
-:106F1000C318FF332D25E5E71E68013D5E60043B85
-:106F2000F3E7452C00D170E7392C00D0DEE66CE7A2
-:106F3000527D7F2A00D1D9E6A25C7F2A00D8D5E60F
-:106F40001E2288E7F7BDC046040B0300550B030063
-:106F5000F0B50022060085B0130044339B009B5D12
-:106F60007F2B31D05B4CE35CDB072AD51300511E2D
-:106F7000C9B244318900584F7118013BDBB2002B74
-:106F800023D008787F2803D0385C04397F28F4D9CF
-:106F900099007118FF31487C7F280ED02027255C8E
-:106FA0003D4204D04C4D285C0425284205D0887C05
-:106FB0004508AC460130604488740133DBB293422B
-:106FC000E6D10132D2B2C7E70023022712E06B07F5
-:106FD00008D4EB070DD56246FF32937CD9085B1AC3
-:106FE000937406E0039B039A9B7B99080133CB18AB
-:106FF0009373029B9A00B2181100FF3194464A7CA9
-:107000007F2A64D034485D1C845CEDB2029565B281
-:10701000002D21DA029A9200B218FF320392527CBC
-:107020000192855C019C2A0041257F2C00D015002F
-:1070300040242242CBD1019C123C012CD9D84022C1
-:107040000233DBB244339B009B5DC35C1342D0D060
-:107050008B7C013B8B74CCE71E4DAA5C08252A4231
-:107060000ED0029B9B00F318FF335A7C7F2AC0D0BE
-:10707000825C3A42BDD006229A7405229A73B8E720
-:107080003C421AD00133DBB21A0044329200925DC6
-:10709000002AF7D07F2AACD00F498A5C3A42A8D0A8
-:1070A0009B00F318FF339A7C520801329A746246AF
-:1070B000FF32937C5B08013392E710231A4298D089
-:1070C0004B7BC35C3B4294D08B7C023BC2E705B058
-:1070D000F0BDC046550B0300040B030070B504005F
-:1070E000FFF7E0FB2000FFF783FC23000022FC33C6
-:1070F000DA601A61904226D02500224E113533689D
-:10710000FF35934203D029001F4806F079FB200089
-:10711000FFF7E2FD2000FFF74BFC2000FFF712FD18
-:107120002000FFF715FF2000FFF724FDC4222B00ED
-:107130009200A1181A78502A06D97F2A07D0002079
-:10714000124B134A1A6070BD04338B42F2D133687C
-:10715000002B02D00F4819F07DFC2000FFF7CCFB7C
-:107160003368002B03D029000B4806F049FB2000B0
-:107170001BF066FE054B0949186821F070FE43427A
-:107180005841E0E7582A0020AC0A03000400002020
-:10719000BB0A0300E10A0300F10A0300720A0300BC
-:1071A00070B504000800FBF769FC0500431002D02D
-:1071B0000F4806F00BF90F49200001F081FE00286E
-:1071C00007D0A02203216379D205C133FF339B008E
-:1071D0009950012362799340A022D205002D04D05A
-:1071E000A121C9000448535070BD0449FAE7C046C4
-:1071F0003B0D0300F8B10200E4B302000C050000EF
-:1072000070B505000800FBF739FC0B2303410400AF
-:10721000DB0702D4094806F0D9F82800084901F034
-:107220004FFEFF22A40092001440A0226B79D205E9
-:10723000C133FF339B0003489C5070BD0D0D03000C
-:10724000F0B10200E4B3020010B50C49040001F0F3
-:1072500037FEA022D205002805D004216379C1336E
-:10726000FF339B00D150A223DB00D0586379D84074
-:10727000012318401EF024FA10BDC046F0B10200F0
-:1072800010B5040001F0E8FD0A4B984205D00A4B06
-:10729000984202D0200001F0EDFDA0226379D205D2
-:1072A000C133FF339B0098580007800F1EF008FA87
-:1072B00010BDC046F0B1020008B20200032370B551
-:1072C0000B4004000800022B14D1194B0B40062B75
-:1072D00010D0FBF737FC15F08BFC0022154B13F098
-:1072E00037FF15F015FC144B0500984205D91348DB
-:1072F00006F06CF8FBF7C2FBF5E71149200001F03E
-:10730000DFFD002807D0A02203216379D205C13315
-:10731000FF339B0099506079290006F0B5FB002DE2
-:1073200003D10849200001F0CBFD074870BDC046DD
-:10733000070080FF0000E03FFF0300001A0D03007C
-:1073400038B20200E8B10200E4B3020013B50A4902
-:10735000040001F0B5FD05216846615611F084FD79
-:10736000684611F0A7FDA0230021044ADB00D1509C
-:107370001EF0A6F916BDC046E8B10200007000403C
-:1073800010B50800FBF77AFBFA239B00584306F080
-:1073900057FB002802D0024806F018F8014810BD3B
-:1073A000FE0C0300E4B3020010B50800FBF766FB17
-:1073B00006F046FB002802D0024806F007F8024813
-:1073C00010BDC046FE0C0300E4B3020010B504007B
-:1073D00001F042FD0C4988420DD00C4B98420AD076
-:1073E000200001F06DFDA02200216379D205C13398
-:1073F000FF339B009950200007F0BCF9044B002894
-:1074000000D0044B180010BD20B2020008B20200E8
-:10741000CCE70200C4E70200A0230C220249DB05EE
-:107420005A5024315A5070474407000010B50400E8
-:10743000FBF73CFA064B984208D0064B984205D021
-:10744000054B984202D0054806F084F9200010BD93
-:107450007CA3020034A2020070A20200EE0C030022
-:10746000F0B50D00002785B0110003901E00280024
-:10747000104B022200970AF01FFFAB1C9B00180064
-:1074800002931EF016FF0400039B013D036045605C
-:107490003368029D8360083D0437BD4202D120005D
-:1074A00005B0F0BD0021F05905F060FBE3199860CC
-:1074B000F2E7C046FFFF0000F7B503780400002B99
-:1074C0001FD0402B20D101230193002304221E0052
-:1074D0001D00190094462278002A3ED1013200296D
-:1074E00010DC002D0EDC002E0CDC033B934209D98E
-:1074F000013C23785C2B05D00199002901D00A2B8F
-:1075000000D100221000FEBD3F491BF0FAFC00280C
-:10751000D9D13E4920001BF0F4FC0028D3D13C49CE
-:1075200020001BF0EEFC0028CDD13A4920001BF0D2
-:10753000E8FC0028C7D1384920001BF0E2FC0028F5
-:10754000C1D1364920001BF0DCFC0028BBD13449F6
-:1075500020001BF0D6FC0190B7E76778272A11D1ED
-:10756000002B4DD0032B09D1272F05D1A278272A34
-:1075700004D10234243AD31A0134ACE7012BFBD8EE
-:107580000122F8E7222A11D11A006046824309D16C
-:10759000222F05D1A278222A02D102346246EAE7DC
-:1075A000002B01D0022BE7D10222E4E75C2A0AD1AA
-:1075B000272F03D0222F01D05C2F04D11A00571E91
-:1075C000BA41A418D8E7002BD6D15B2A12D006D82E
-:1075D000282A0DD0293A57425741C91BCCE77B2AAC
-:1075E0000AD07D2A0AD05D3A57425741ED1BC3E7C6
-:1075F0000131C1E70135BFE70136BDE7013EBBE719
-:10760000272FBDD1B2E7C046876B03005C0D030096
-:10761000620D0300660D030072640300948703008B
-:1076200081390300F0B58BB007934318039004929F
-:1076300001930093009B5C1E039BA34201D900931E
-:1076400010E0207801F008F8002801D00094F1E75C
-:10765000207801F00DF80028F8D123785F2BF5D0C1
-:107660002E2BF3D07D4B1D68009C019B9C4202D2C7
-:1076700023782E2B21D1009BE71A019B9C4241D3FA
-:107680000024260002940194AB68A34256D8019BC3
-:10769000002B00D084E0009B039A93422FD1704CC2
-:1076A0003A002100180021F065FB002827D1079B34
-:1076B000E41907301C60C01B22E00134D5E7013615
-:1076C000AB68B3421BD9F3000293EB68F200985801
-:1076D0000028F4D00428F2D009A9FAF791F8099B00
-:1076E0000100BB42EBD13A00009821F0C9FB002811
-:1076F000E5D1EB68029A9B185868002804D1002055
-:107700000BB0F0BD0026DBE7032318420CD1036861
-:10771000544A934205D11BF089FE0500631C009377
-:10772000A2E7514A934201D0FBF7C0F8856B002DC8
-:10773000E5D04E4B2A689A42F0D0E0E7EA68E300D1
-:10774000985800281CD004281AD009A9FAF758F82C
-:10775000099B06900593BB4212D301003A000098A2
-:1077600021F08EFB00280BD1029B002B12D03B0096
-:107770009E4202D3059A9A4204D2019B013301939F
-:10778000013481E7029AD15C069AD25C914205D11C
-:107790000133EDE7069B059E0293EEE71E00ECE742
-:1077A000019B012B01D0BE4254D9029B079ADB19E1
-:1077B0001360F01BA4E7029BEA68DB0098580028DE
-:1077C0003AD0042838D009A9FAF71AF8099B03908F
-:1077D0000593BB4230D301003A00009821F050FBE2
-:1077E0000190002828D133000F220F33DC171440FA
-:1077F000E41824112401A41B012C00DC1034059A88
-:1078000033199B18402B0DD9039A194904981FF07E
-:1078100001FB099E10E0174904981FF03AFA019BFA
-:1078200001330193019B9C42F5DC039904981FF0FE
-:1078300030FA099BF6183619029B01330293AB68A4
-:10784000029A9342B7D80C4904981FF022FA0120FB
-:10785000404255E7002340260293F0E77C2E0020AB
-:10786000500D030098B1020058B8020074C2020023
-:10787000580D0300DE6F0300654F030010B50400D0
-:107880001FF08FFC1AF0CDFF01280BD00649200015
-:107890001FF0A2FC20001FF084FC1AF0C2FF022897
-:1078A00000D0002010BDC046A60D0300F0B59DB06D
-:1078B00000AF0C68032835D9CB68FB60042835D0AD
-:1078C0000D6900206D102BD41C232000F918F9F746
-:1078D00097FF7861002D5AD0954C9649606808F062
-:1078E0005DFB0600606800229349043001F044F912
-:1078F0001823FA18D11804003000F9F781FF3B6B08
-:10790000013D0100C318002C05D1994203D2013B6F
-:107910001A782E2AF9D1013D0ED299420FD187480B
-:1079200005F054FD864B0025FB60CDE70025CBE735
-:10793000013B1A782E2AEED09942F9D3EBE7FE6983
-:107940005C1A2500002E01D0751C2D192B006A46EB
-:107950000E33DB08DB00D31A9D46220018003B6182
-:1079600021F017FA002E08D02E233A69601C135517
-:1079700010187969320021F00CFA2900386909F0F1
-:107980009BF806243B69C0000443FD617B61200035
-:10799000F9F700FB01F0C4F8061E15D02E21786916
-:1079A00021F04FFA00280BD0654BFA689A4207D1B4
-:1079B0007B69C11A180009F07FF801F0B1F80600E0
-:1079C0003000BD461DB0F0BD182318000125FA187F
-:1079D000D2183818103B4021C0181FF0ADFBBE6014
-:1079E0003E61FB69AB4205D2554BFA689A42E7D03B
-:1079F000BE68E5E7AB4204D07B695B5D2E2B00D00F
-:107A000094E02900786909F057F87B6A3860002B08
-:107A100017D12A00082479691833F81800191FF0C3
-:107A200056FB1823FB181819FFF728FF78607B68AE
-:107A3000002B14D13A684349434800F033FD04F069
-:107A40004DFE18230824FA182F2110190EF0E4F91E
-:107A50003B693969EA1A7B6959181823DDE73868E8
-:107A600001F05EF8041E4BD1386801F027F8FB697D
-:107A70000400AB4213D1354BFA689A420FD17B68B0
-:107A8000012B0FD0324A2B4940681DF0F5FE182219
-:107A90000823BA18D11820001BF04EFA30E07B689A
-:107AA000012BF4D10022796AB86AF9F751FAF4216E
-:107AB0000200FF31200005F035F87B6A18227B6058
-:107AC0000823B818C0182F210EF0A6F91822082391
-:107AD000B818C0181F491FF07FFB18220823BA18D6
-:107AE000D0181FF05EFB1AF09CFE022806D1182267
-:107AF0000823BA18D11820001BF01EFA7B687B629D
-:107B0000BB68002B0CD07A693B699446E91A634440
-:107B1000180008F0D1FF22000100B86805F002F853
-:107B2000002E00D126006B1C3B61BC60013558E77C
-:107B30007C2E0020860F00009E0F00006A0D0300BF
-:107B4000E4B30200890D03000CA90200C4E702009F
-:107B5000760F00009E0D0300184BF7B530CB0F00D9
-:107B6000160001281AD94B68154A934207D0990785
-:107B700011D114491C688C420DD11C001D00022833
-:107B80000CD0BB68934209D09A0704D10D4A1968FA
-:107B90001C00914202D0002005F0DCFD01A93868EC
-:107BA000F9F72EFE019A0100002310201DF0FAFFC4
-:107BB0002A003100230005F0C1FBFEBD7C2E002011
-:107BC000E4B3020074C20200F0B58BB006000800F6
-:107BD00011001A0010AB1F78314B05AD01950093D1
-:107BE00005230AF099FB912000011EF062FB2D4B4A
-:107BF00004A91860059B476043706B682A4F0370A7
-:107C0000AB6804008370EB68C3702B7C30003B6072
-:107C1000F9F7F6FD0025254B03900C201D601EF0A2
-:107C200048FB234B06000360FDF7CAFFB060FDF779
-:107C3000C7FF204B204A1860204B11001D70204BBD
-:107C400070601D701F4B30001D602B00FDF78CFE17
-:107C50002000049A03991BF0EFF82000FFF73EFA8A
-:107C60000400A84207D1FDF785FD0E4B1C60164BA2
-:107C7000186805F0ABFB0122144B1A70FDF79AFF50
-:107C80000028FBD1124B943318603B68002B04D0C2
-:107C90000C4B1048196818F063FE07480BB0F0BD94
-:107CA00050A40200102F0020582A00204C2A002047
-:107CB0009CA40200482A0020E4B30200D02D00203A
-:107CC000CE2D0020502A002004000020CF2D0020BF
-:107CD0007C2E0020AA0D030000220D4910B50B7860
-:107CE000DBB2934210D10B4A1478002C02D001244D
-:107CF0000C701370084B1B78002B07D0074A1368D1
-:107D000020331360064B1A68100010BD8268FBE731
-:107D1000CE2D0020CF2D0020D02D00204C2A002079
-:107D2000482A002073B501A9F9F76AFD019B0600F6
-:107D30001748502B17D8802040001EF0BAFA154C77
-:107D400005002300943318600023019A9A420CD155
-:107D50005B232800AB540AF0C5FF2B00002808D194
-:107D6000943420600C4805F031FBF15CE954013398
-:107D7000ECE75A1B0133591E09789B29F9D12900D8
-:107D800006481AF00DFB00239434236076BDC046EC
-:107D9000B90D03007C2E0020C70D03000C9A0200D1
-:107DA000D2235B005843134AF0B51368000C83429A
-:107DB00006D9114C2368013323601368203B1360FC
-:107DC0001F23050001270D4E9D431468A5420BD8C3
-:107DD00003401A1D202A00D92022094C246893420E
-:107DE00004D3084B1860F0BD3770EEE7E518297131
-:107DF0000133F4E74C2A0020502A0020D02D002027
-:107E0000482A0020542A002070B506000D000028E2
-:107E100014DD002907DD154812F014F80124B042E2
-:107E200009DB002407E00100C020000612F00AF878
-:107E30000124A842F5DDE4B2200070BD002907DD71
-:107E4000C020000611F0FEFF0124B042F3DCE8E799
-:107E50000024A042F0D00100044811F0F3FF0123F8
-:107E6000A84200DC231CDCB2E6E7C046FFFFFF3F70
-:107E700070B504000D0010491EF00BFF6968012267
-:107E80002000FAF72BFD0D4E200031001EF001FFFF
-:107E9000A96801222000FAF721FD310020001EF020
-:107EA000F8FEE96801222000FAF718FD04492000D5
-:107EB0001EF0EFFE70BDC046DD0D030045FC020064
-:107EC000A002030070B5060010200D0014001EF083
-:107ED000F0F9034B466085600360C46070BDC04626
-:107EE000E8A4020010B5FAF72DFE054912F07AFD5C
-:107EF0000323020002209A43024B1043C01810BD16
-:107F0000E02E65420000808010B5FAF71BFE05499F
-:107F100012F068FD0323020002209A43024B104333
-:107F2000C01810BD35FA8E3C0000808010B5FAF7FD
-:107F300009FE011C13F04CF8024B002800D1024B43
-:107F4000180010BDCCE70200C4E7020010B5FAF734
-:107F5000F9FD440064080849201C13F039F8002892
-:107F600005D10549201C12F0BDF8002801D00348B6
-:107F700010BD0348FCE7C046FFFF7F7FC4E7020057
-:107F8000CCE7020010B5FAF7DDFD034B03400220F9
-:107F90001843024BC01810BDFCFFFF7F000080801B
-:107FA00010B5FAF7CFFD440064080849201C13F00F
-:107FB0000FF8002807D10549201C12F089F8002885
-:107FC00001D1034810BD0348FCE7C046FFFF7F7F97
-:107FD000CCE70200C4E702001FB500230193FAF7C3
-:107FE000B1FD01A915F03CF90322030002209343DF
-:107FF000064903435B180293019B934303435B18B9
-:1080000002A90393FEF736FB05B000BD0000808097
-:1080100070B50D00FAF796FD041C2800FAF792FDE2
-:1080200012F0ECFF0100201C15F0F6F8032302000B
-:1080300002209A43014B1043C01870BD000080809D
-:108040001FB500230193FAF77DFD01A915F0BAF8D9
-:10805000032302249843074B2043C0180290019841
-:108060001DF02EFB02A903902000FEF703FB04B0D5
-:1080700010BDC0460000808070B50D00FAF762FDAB
-:10808000041C2800FAF75EFD011C201C15F0B2FB51
-:108090000323020002209A43014B1043C01870BD15
-:1080A0000000808070B50D00FAF74CFD041C28001C
-:1080B000FAF748FDC00FC3076000400818430323C8
-:1080C00002249843014B2043C01870BD00008080FB
-:1080D00070B50D00FAF736FD041C2800FAF732FDE2
-:1080E000011C201C15F00EFB0323020002209A4302
-:1080F000014B1043C01870BD0000808010B5FAF726
-:1081000021FD14F075FE0323020002209A43024B66
-:108110001043C01810BDC0460000808010B5FAF7AB
-:1081200011FD15F09DFA0323020002209A43024B31
-:108130001043C01810BDC0460000808010B5FAF78B
-:1081400001FD15F03BFA0323020002209A43024B83
-:108150001043C01810BDC0460000808010B5FAF76B
-:10816000F1FC15F091F90323020002209A43024B1F
-:108170001043C01810BDC0460000808010B5FAF74B
-:10818000E1FC15F043F90323020002209A43024B5D
-:108190001043C01810BDC0460000808010B5FAF72B
-:1081A000D1FC14F083FF0323020002209A43024B08
-:1081B0001043C01810BDC0460000808010B5FAF70B
-:1081C000C1FC15F0A3FA0323020002209A43024BDC
-:1081D0001043C01810BDC0460000808070B50D006F
-:1081E000FAF7B0FC041C2800FAF7ACFC011C201CB8
-:1081F00015F0E4FB0323020002209A43014B1043D5
-:10820000C01870BD0000808010B5FAF79BFC0021FB
-:10821000041C11F053FF002802D0074805F0D6F8DF
-:10822000201C15F08BFD0323020002209A43034B10
-:108230001043C01810BDC046F50D0300000080803B
-:1082400070B5060008680D00FAF77CFC0021041CDC
-:1082500011F03EFF002802D0184805F0B7F8201CA6
-:1082600015F030FB041C012E06D1032302209C4391
-:108270002043134BC01870BD6868FAF763FC0021F7
-:10828000051C11F025FF0028E6D1FE21281C8905D8
-:1082900011F00EFF002803D00A490B481CF0CAFB5E
-:1082A000281C15F00FFB011C201C12F0C3F903233E
-:1082B000020002209A431043DBE7C046F50D03009D
-:1082C00000008080E40D030044AD0200F0B50E0014
-:1082D0001100002285B0B71C03901C0030000D4B2C
-:1082E0000092BF0009F0E8FF38001DF0E2FF466091
-:1082F00006000500039B083F03600836E719BC42EF
-:1083000002D1280005B0F0BD002101CC04F02EFC04
-:1083100001C6F4E7FFFF0000F7B505002C200E00B2
-:10832000170001931DF0D7FF040005708660878158
-:10833000072D01D0012D0FD1337872780A3B1B0233
-:108340001343E381019B20206375042363841DF0A4
-:10835000B0FFA0622000FEBD014B5B5DF1E7C046AF
-:10836000070E0300F7B50D00110000220600009271
-:1083700028001F000B4B09F09FFF10201DF0A6FFE7
-:10838000041E08D1084B094A094C5A620023266092
-:108390002000A360FEBD39002800FEF76BF9E06005
-:1083A000F4E7C046FFFF00007C2E002044A002003E
-:1083B000942E002010B5013810C9FEF75BF9E0607B
-:1083C000004810BDE4B30200F8B57F2553B20400A5
-:1083D0000E0017001540002B0ADB6B1E012B07D87F
-:1083E0000B6858681DF0C6FA010020001EF051FC11
-:1083F000022D16D10F4920001EF04BFCF368002B14
-:1084000002D05A68002A04D10B4920001EF041FC1A
-:10841000F8BD012A07D1002299682000FAF75EFA18
-:10842000F6E7002DEAD03A00F1682000FEF7C8F820
-:10843000EEE7C046613A03003B830300C36803488C
-:108440005A68002A00D098687047C046E4B302001A
-:10845000136810B51400002B0BD0FC23FF33994296
-:1084600006D10C4B52689A4202D10023C38023608C
-:1084700010BD094B994201D1C368F8E7074B026868
-:108480009A42F5D1064B9942F2D1FFF7D7FF20600F
-:10849000EEE7C046E4B3020003020000DCAB0200DA
-:1084A000E30200000EB470B5050087B010201DF087
-:1084B0000DFF041E0BD11A4B1A4A1B4C9D6118620A
-:1084C0005A62200007B070BC08BC03B018470021F6
-:1084D000056081600120FEF7CDF82521E0600500F0
-:1084E0000B9820F0AEFC061E09D10B9820F0C1FCC1
-:1084F000320001000B98F8F72BFDA860E1E702A815
-:1085000010211EF000FE0CAA0B9902A801920DF09A
-:10851000D7FC02A90548E568F8F7E4FCEDE7C0469A
-:108520007C2E002044A00200942E00200C9A020011
-:1085300010B50300820708D1064A0168914204D1B0
-:10854000054AD9680120914203D00449180003F07C
-:10855000C3FB10BD58B80200658300001CA80200D0
-:1085600010B50400FAF7A2F9034BC2689A4200D092
-:1085700024690023A36010BD65830000F8B51600D0
-:108580001D0004000F00FAF791F9154BC2689A42DA
-:1085900000D02469A068002811D10C301DF096FE8F
-:1085A000A06000280AD003236360E288A1689300DA
-:1085B000CB180332E2801F605E609D60F8BDE388E7
-:1085C000A18802338B42F0DB0331890001221DF0C8
-:1085D0009BFE0028F2D0A388A0600333A380E4E7C9
-:1085E0006583000070B5150004000E00FAF75EF90F
-:1085F000064BC2689A4200D02469A368002B02D1BE
-:1086000033602B6070BDE2883260FAE7658300005A
-:10861000F8B5050010200C001F0016001DF049FEE3
-:10862000054B44608460A4190760C4606B60034B11
-:108630002860AB60F8BDC046593202006F320200BC
-:1086400000237F2803D8034B1B5C9B07DB0F18001C
-:108650007047C0460E0E030000237F2803D8034B4B
-:108660001B5C1B07DB0F18007047C0460E0E030093
-:1086700000237F2803D8034B1B5C5B07DB0F18002C
-:108680007047C0460E0E030000237F2803D8034B1B
-:108690001B5C5B06DB0F18007047C0460E0E030024
-:1086A00000227F2808D8054B0132195C0C2319429F
-:1086B00002D15F3842424241100070470E0E030063
-:1086C00000237F2803D8034B1B5CDB06DB0F18005D
-:1086D0007047C0460E0E030000237F2803D8034BCB
-:1086E0001B5C9B06DB0F18007047C0460E0E030094
-:1086F00070B50400FAF7DAF800230C49DA005218D2
-:108700001568A54205D1516809481EF0C2FA01203A
-:1087100070BD0133612BF1D1064B9C4203D09842CE
-:1087200001D00020F4E70449EEE7C04680AD020026
-:1087300084E8020088E902008E0E0300FF23032272
-:10874000DB05CB1810B59343042804D811F0DCFAEC
-:1087500006030F0416000021080010BD0021181C9C
-:1087600011F0A6FC0A490028F6D00A49F4E7181CC3
-:1087700012F044FC012140000143EDE7802109068D
-:108780005B18022193431943034BC918E4E7C04621
-:10879000CCE70200C4E7020000008080FF23DB0575
-:1087A00010B50400C81803239843002386B0019332
-:1087B000063300931022613302A903F00BFB02A9D8
-:1087C00020001EF066FA2E2102A820F03AFB0028B5
-:1087D0000FD1652102A820F034FB002809D16E21B9
-:1087E00002A820F02EFB002803D1034920001EF030
-:1087F00050FA06B010BDC046C404030030B50C00EA
-:108800001100002285B01D0000920123200009F014
-:1088100053FD002C23D02868124B0340062B06D0B2
-:10882000032420420ED1104B02689A420AD103A9B8
-:10883000F8F7E6FF0022039900921300F9F70AFF08
-:1088400005B030BD03002340022BF9D0FAF77AF9C6
-:1088500003000220A3431843044BC018F0E7044868
-:10886000EEE7C046070080FF0C9A020000008080FF
-:1088700002008080F0B5050087B010000191FAF782
-:1088800061F9041C0390681F182800D9BDE011F09D
-:108890003BFA0D121F24333E6F81BCBCBCBCBC0D27
-:1088A000121F24333E6F9FA8ADB2B7000198211C60
-:1088B00011F026FD03E0211C019812F0C5F901908A
-:1088C00003230198524A9843013B03439B187CE0E1
-:1088D000211C019812F086F8F1E70021201C11F00C
-:1088E000E7FB002803D04B494B481CF0A3F803A931
-:1088F00001A81AF024FDE3E70021201C11F0D8FBA9
-:108900000028F0D1211C019811F094FED7E7002136
-:10891000201C11F0CDFB0028E5D1211C019814F09A
-:1089200069FF0021041C019011F0C2FB002807D050
-:10893000039A0023002A01DA80231B060193BFE774
-:108940000021201C039E012711F0B8FB002800D154
-:10895000071C0021301C012511F0B0FB002800D1BC
-:10896000051CFFB2EDB2AF42AAD0311C201C9FE71C
-:10897000019D0021281C11F09BFB002805D000213F
-:10898000201C11F09BFB0028ADD1211C281C15F0E8
-:1089900015F894E70021201C11F08AFB0028A2D1D1
-:1089A00003A901A81AF0CBFC03220220019B18495D
-:1089B000934303435B180493039B934303435B1864
-:1089C00004A90593FDF756FE0300180007B0F0BD9B
-:1089D0000199201C11F086FB104B0028F5D1104B9B
-:1089E000F3E70199201C11F069FBF5E70199201CC0
-:1089F00011F05EFBF0E70199201C11F07DFBEBE725
-:108A00000199201C11F064FBE6E70023DDE7C04676
-:108A100000008080E40D030044AD0200CCE70200BA
-:108A2000C4E7020010B5040048680022043007497A
-:108A300000F0A2F8064A002803D04068F8F7CAFE02
-:108A40000200044920001EF0E5F910BD860F000069
-:108A50003B8303009534030070B5150012680C00C9
-:108A60004068002A0AD1CC0006210430214300F0DE
-:108A700083F8002801D043682B6070BD03799B0701
-:108A80000BD50C4B9842F8D10B4EF36D002B03D154
-:108A900001201CF0B8FEF065F06D06216A68E40064
-:108AA0002143002A03D11CF0F1FE0023E4E71CF06F
-:108AB000E3FEFAE7649D02007C2E002070B50625D7
-:108AC000C0000543012229000B4800F055F8446816
-:108AD0000600002C0ED108201DF0EBFB074B040014
-:108AE000036001201CF08FFE2A00606004491CF026
-:108AF000C3FE7460200070BDB82E002098B1020043
-:108B0000860F000010B50C000621C00001430122B1
-:108B1000024800F031F8446010BDC046B82E002075
-:108B200073B50625C3001D43060000222900104826
-:108B300000F022F8041E18D1020029000D4800F0B0
-:108B40001BF8041E12D0EA216A46FF31406803F088
-:108B50008FFF009B002B08D000216A4608001BF005
-:108B60002DFF61683000FFF7CDFF606876BDC0461D
-:108B7000B82E0020C4B00200F0B587B00092027891
-:108B800004000F00930703D5009B002B00D0F5E0F5
-:108B9000D307DB0F0ED07A4B3B40062B43D0032389
-:108BA0003B4003D177493868884203D0009B012BB2
-:108BB00000D0E3E0019353075FD52368A568DE0882
-:108BC000F600AE19B54230D3009B012B00D0D5E0A2
-:108BD0002368D9086368994210D104316160A068A4
-:108BE000C9001DF084FB23686268DB08D21ADB0031
-:108BF000A060D200C018002120F0E7F80721236808
-:108C0000DD086A1CD2000B4013432360A368ED000B
-:108C10005D195B4B2F601F40062F21D00122237866
-:108C2000934323701CE00123C4E72868B8421AD19B
-:108C3000009B022B14D129002368721BD210083B21
-:108C4000013A6F6828002360D200083120F0AAF8AA
-:108C50002368DD08A368ED005D1900236F602B60B9
-:108C6000280007B0F0BD019B002B04D13900F9F7B3
-:108C7000B3FE0028DCD10835A4E76368002B05D1DA
-:108C8000009B012B7AD1200000F07EF83C4B3B404A
-:108C90000593062B27D1F8081CF062FE039061684B
-:108CA000039811F0CBF800260491049B0293029BD9
-:108CB000DD00A3685D19286800281BD1009B012BEB
-:108CC0005CD107212368DA080132D2000B4013433C
-:108CD0002360002E00D0350000236B60059B2F60C1
-:108CE000062B9BD1BCE73900022003F0D7FD4310CF
-:108CF0000393D4E7042803D1002E1DD12E001BE0DE
-:108D0000B84211D1009B022BAAD123680298083BDC
-:108D100023600130616811F091F8A368C900CB5855
-:108D2000002B25D12B609BE7019B002B04D1390040
-:108D3000F9F752FE0028E5D102986168013011F080
-:108D40007DF8049B02918B42B1D1009B012B15D180
-:108D5000002E0FD023683500083323600023736092
-:108D6000059B3760062B00D17AE72378009A57E7F6
-:108D70000423D7E7200000F007F890E700256FE70D
-:108D8000070080FF0C9A0200F7B5436804000193C6
-:108D90005A1C002317495800455AAA4206D90133E4
-:108DA000222BF8D15508AD18213B1D43E800A768D8
-:108DB0001DF091FA07232268656013400122002507
-:108DC000236013432370A060019B9D4203D13800B0
-:108DD0001DF09EFAF7BDEE00B959002908D004290C
-:108DE00006D001222000FFF7C7FEBE19736843605A
-:108DF0000135E9E7B0F60200F8B505000023046884
-:108E000086681449621C5800405A824206D90133D0
-:108E1000222BF8D15008821801201043002328602B
-:108E20006B6080001DF057FA3700A400A860A419F9
-:108E3000A74203D130001DF06BFAF8BD3968002954
-:108E400005D0042903D0012228001AF02BFB043797
-:108E5000EEE7C046B0F602000379044AD35C002B6B
-:108E600000D183790248DB00C0187047D12D002063
-:108E7000E0B1020010B50400FFF7EEFF22790368AD
-:108E800002490348FFF70EFB03F028FCA33403005C
-:108E900008AD0200002803D001210379014AD15412
-:108EA0007047C046D12D002010B5FFF7D5FF034B0A
-:108EB0004068C01A431E9841C0B210BD758E0000B4
-:108EC00070B506000C00FFF7C7FF0C4D2B002833D0
-:108ED000984204D12A001032002394420BD0002380
-:108EE000A04208D0436830009847641B3379044A95
-:108EF000E410D4540123180070BDC046E0B1020054
-:108F0000D12D0020F0B589B0002807D1664B674805
-:108F100019681DF0BEFE664809B0F0BD0D68654BCE
-:108F20009D425BD1002108001DF09AFD0024050040
-:108F30000590614B5A680192944217D300255F4A0D
-:108F400005A901200BF0A8F907AA06A905981DF0AC
-:108F50009EFD069B03339B0801939B000393019B9B
-:108F6000524EAB4210D156493000D2E79B68019374
-:108F7000019AE3009958002904D0042902D028005E
-:108F80000BF02AF90134D4E72F00AB000293079BC2
-:108F9000029A9858F8F71EFC010030001DF079FE87
-:108FA000019BFF18069B9F4212D212231C1A002C11
-:108FB00007DD013C07D2039A029B94466344029367
-:108FC000E5E71234F3E73F4930001DF062FEF0E7B9
-:108FD0003D4930001DF05DFE0135C0E72800F9F77E
-:108FE00065FC3A4B42689A4200D16D682800FFF751
-:108FF0007FFB061E00D08EE72C4C354920001DF06B
-:1090000048FE31002800F9F783FC280019F00FFB17
-:109010003049020020001DF0FDFEAB0732D12B6865
-:109020002D4A93422BD128001AF000FA1CF039FC8B
-:1090300000250600A84200D16DE773689D4200D369
-:1090400069E7B268EB00D3181F68002F15D05B6882
-:109050002249200001931DF01CFE00213800F9F781
-:1090600057FC1F4920001DF014FE00210198F9F75C
-:109070004FFC154920001DF00CFE0135DDE7194AB3
-:10908000934203D02800F9F711FC0500A86B0028D3
-:1090900000D140E7830700D03DE7134B02689A42B6
-:1090A00000D038E7C2E7C0460800002084E802008C
-:1090B000E4B3020046140000C4B00200D4B10200C0
-:1090C000B5340300DE6F0300654F03000D0200009E
-:1090D000D9340300E134030098B10200DD6F0300CE
-:1090E000F134030058B8020074C20200002803D013
-:1090F000012807D0002004E08B680448002B00D131
-:10910000034870478B685B001843FAE7CCE702001E
-:10911000C4E70200034B48600B60002308008B602B
-:10912000CB60704798B202007FB5040001220800AE
-:1091300001A9F9F75DFE0022217940200BF0E6FA43
-:1091400001000500029810F0F3FD636806001A0A9A
-:10915000824218D2A368C1186943E0681DF0C7F8BD
-:109160006368E060DBB22A00A06863606843E3687C
-:109170007243181801991FF00CFEA36804489E1949
-:10918000A66004B070BD121A1202DBB21343EAE704
-:10919000E4B30200F7B5FF27456804000191BD4321
-:1091A0001DD101792A0040200BF0B0FA6368060057
-:1091B0003B408027A1683F011F430831414367605E
-:1091C000E0681DF094F86368E0601A0AA368013A49
-:1091D000013372435E43290080191FF0F6FD2079A8
-:1091E000019BA268E1680BF031FCA36803480133DE
-:1091F000A3606368013BFF3B6360FEBDE4B3020014
-:10920000F8B5002207000D00010040200BF07EFAA7
-:10921000060010201DF04DF8084B0400012F00D06F
-:10922000074B2800277123606368A560DBB2704399
-:1092300063601DF03EF8E0602000F8BD30B302002E
-:10924000F4B2020070B506008AB00C0015001228B6
-:109250005CD003D8052826D0002454E01B2800D178
-:109260006CE01F28F8D1012207A9280019F0F6F9AF
-:10927000032300284FD01C4213D13B4B22689A4253
-:109280000FD1012204A920001AF0B8F90123079A8E
-:1092900000930599089B049819F063F8334C002853
-:1092A00031D1334C2FE0012204A920001AF0A6F995
-:1092B0002800012207A9F9F79BFD069B00220393D2
-:1092C0006B464020197B0BF021FA0100060008983C
-:1092D00010F02EFD069BA16803936B464118050014
-:1092E000187BFFF78DFF059B04001A000499C068E6
-:1092F00003931FF04EFD2A000598E3687243181887
-:1093000007991FF046FD20000AB070BD1100200033
-:10931000FFF70AFFF7E7EA070DD41D4203D1154B0B
-:109320002A689A4207D003232B40022BB9D1124B53
-:109330001D40062DB5D0114804F03AFA012204A9C7
-:1093400020001AF05BF9012207A9280019F086F91C
-:109350000028A6D0089B059A00930499079B30002B
-:109360001CF07DFC9AE7C04630B30200CCE7020057
-:10937000C4E702002CB90200070080FF3B83030012
-:10938000F0B5050087B00E00012808D08B0726D164
-:109390000B68264A934202D0254A93421FD10122EC
-:1093A00003A9300019F05AF9002818D0002229002A
-:1093B00040200BF0ABF901000700049810F0B8FC56
-:1093C000060001002800FFF71BFF320004007A436B
-:1093D0000399C0681FF0DDFC200007B0F0BD30002D
-:1093E000F9F766FC071E00D0471039002800FFF788
-:1093F00007FF00210400300003F0B8FB00260090B6
-:10940000009803F015FC031EE6D0002F04D11900CC
-:109410002000FFF7BFFEF3E7721C0192E168320003
-:1094200028000BF013FB019EEAE7C046A092020061
-:1094300030B3020070B50E7904000D00012E0DD17D
-:1094400019491DF026FC3300AA68E9682000F7F7E7
-:10945000E5FC164920001DF01CFC70BD32001449CB
-:109460001DF0D8FCAB68002BF3D0124920001DF092
-:1094700010FC0026AB68B34204D80F4920001DF051
-:1094800008FCE6E7002E03D00C4920001DF001FC8B
-:109490003200E96828790BF0A1F9012201002000CF
-:1094A000F9F71CFA0136E5E7F6340300A0020300E1
-:1094B000023503000D3503001D06030045FC0200C4
-:1094C00070B5050086B0161E44D0032480680C4099
-:1094D0002BD1214B0A689A4227D103AA08F0C4F97C
-:1094E000002802D11D4804F063F9042E1AD122008D
-:1094F000297940200BF00AF9049B06000093039B96
-:1095000028790193019A009B991AFFF779FE039934
-:10951000049A0400521A71437243EE68C0687118CD
-:109520001FF037FC200006B070BD0A0000230100C8
-:109530002868F9F77BFB02002879042E04D1E9683A
-:109540000BF04CF90400EDE73300E9680BF07EFA0C
-:10955000034CE7E71400E5E7E8A40200A6FC0200DC
-:10956000E4B3020037B50C00110000221D00009288
-:109570000123200008F0A0FE002C05D121000120CD
-:10958000FFF73EFE040016E02968CB0705D48B07E1
-:1095900013D10C4B0A689A420FD10800F9F76EFA02
-:1095A000010005000120FFF72BFE2A000400002126
-:1095B000C0681FF00AFC20003EBD0120FFF7E0FE5E
-:1095C000E0E7C0462CB9020037B50400A06803F0FC
-:1095D0002FFB019000280ED06568074B9D4205D0F7
-:1095E00001AB00220121280003F0CAF9F9F784FB3E
-:1095F0000028EBD001983EBDE4B3020030B58DB039
-:109600000500684603F044F8011E10D12A1D012010
-:109610001BF0D4F90122EB6804005B1001335B00FE
-:109620001343EB6003F052F820000DB030BD0198F9
-:10963000054A0368934205D0044A00249342F3D0BC
-:1096400003F04CF80024EFE7DCAB020084A9020031
-:10965000044B0B6003684B60436808008B60012378
-:10966000CB607047A8B3020010B502491DF011FB92
-:1096700010BDC0461135030010B50400034B036054
-:1096800040301DF02FFE200010BDC04624B6020061
-:1096900010B50F4C20001FF027F8002808D020003C
-:1096A0001EF0F4FF0B4B1B68984202D1FAF7C4FC82
-:1096B00010BD3F21084A138801330B400749098830
-:1096C0008B42F5D01188064C13806054F0E7C046F9
-:1096D0005C2A0020782E0020BC2D0020BE2D00200A
-:1096E000F12D0020002210B5044B05491A80054BCE
-:1096F00005481A801EF0FDFF10BDC046BC2D00209D
-:1097000091960000BE2D00205C2A0020034B188893
-:10971000034B1B88C01A431E98417047BE2D002082
-:10972000BC2D0020084A094B10881988884201D1B5
-:1097300030BFF9E713880649C85C3F21138801331D
-:109740000B4013807047C046BE2D0020BC2D00206A
-:10975000F12D002070B504004518AC4205D02178E9
-:1097600002481EF097FF0134F7E770BD5C2A002025
-:1097700070B504004518AC420DD02378064E0A2B74
-:1097800003D10D2130001EF085FF217830001EF03E
-:1097900081FF0134EFE770BD5C2A002070B5040042
-:1097A0000825002C08D02100082C00D929000348E6
-:1097B000641AFFF7CFFFF4E770BDC0461F35030002
-:1097C00070B5050004000826002C08D02100082CE4
-:1097D00000D931000448641AFFF7BCFFF4E7280001
-:1097E000FFF7DCFF70BDC0461635030010B5010061
-:1097F00001481BF04DFE10BD1C000020142313B5C2
-:10980000064C00931922182120000DF069FF044A2C
-:10981000044920001FF04CFA13BDC0465C2A00200A
-:10982000000000207996000010B5024B672219F065
-:10983000F2FF10BD3541020010B5024B972219F01E
-:10984000EAFF10BD59AA0000F7B50F0011001A0079
-:10985000C38A8579868A019300230400837143615A
-:109860000F4B19F0D8FFA368002B17D1E18A00290C
-:1098700008D0A38A002B05D1206B1BF09FFC206B26
-:109880001BF01CFBA38AE28A3900200019F074FF48
-:109890006B1E9D41019BA571A682E382F7BDC04668
-:1098A00075A6000010B54379C26A012B03D11000E0
-:1098B00019F08EFB10BD0B00006B024919F0B2FBD2
-:1098C000F8E7C0462CBD02007FB50B7804000D0000
-:1098D0004E1C002B0AD0032B0BD103A928001CF02F
-:1098E00050FB03990600206B1BF07FFA300004B098
-:1098F00070BD012B07D18E1C49780429F6D0006B6E
-:1099000005F0F0F9F2E7042B0BD14B788978006B66
-:10991000090219431BF0B1FA28001CF06DFB060088
-:10992000E4E7052B15D14379042B04D02649006BBD
-:109930001BF0AFFAF0E788784B780002184303A9D0
-:109940001CF01DF80399246BF7F71AFB01002000A7
-:10995000EEE71A000A3A0F2A09D803A9280019F0DD
-:10996000DFFE039906002000FFF79CFFBEE7082BEF
-:109970000CD103A928001CF0FAFA039B226A9B0071
-:1099800006009958206B1BF084FAAFE703AB02AADC
-:1099900001A928001CF061FB05000299206B05F06D
-:1099A00055F9019B094A9B009B582900039A200006
-:1099B0009847A368002B04D0E368002B01D1029BD9
-:1099C000E360039E92E7C046E4B302002CB60200B7
-:1099D000F7B506000192FFF777FF04270500019B0A
-:1099E0009D4200D1F7BDA91C30006C78FFF76CFFD9
-:1099F0002F3CE4B205003900082C01D8024B195D58
-:109A0000306B1BF0B9FBEAE72835030010B543794A
-:109A1000C26A012B03D1100019F0EBFA10BD0B0044
-:109A2000006B024919F0FEFAF8E7C0463CBD02009F
-:109A300010B54379C26A012B03D1100019F0D9FA8D
-:109A400010BD0B00006B024919F0ECFAF8E7C046B4
-:109A50001CBD0200836870B504000D00002B09D105
-:109A60001100054819F0DEFBA060200029000C3031
-:109A70001AF0F3F870BDC04618AC020010B5024AE7
-:109A8000FFF7E8FF10BDC04670380300F0B50400D2
-:109A90000D00E162002162712B7891B005920161A5
-:109AA0009F4A072B3BD1059B012B06D00200836BFD
-:109AB00008321B680599406B9847AB6818000893FB
-:109AC0001CF09AFA63790890032B0FD10D90402176
-:109AD0000DA81CF0AAFAA36B02009B680D99606B9D
-:109AE0009847A368E882002B00D0D4E008981CF0C7
-:109AF00083FA08900378002B4FD00A3B0F2B47D8EE
-:109B00000DA919F00DFE95220D9B9200934244D0B1
-:109B10000AD80125483A93420DD0824A089920007C
-:109B2000FFF798FF11B0F0BD7F4A934202D07F4A01
-:109B30000325F0E7002508981CF05EFA182108902C
-:109B400008A81CF072FA089B07900693069B079AD8
-:109B5000934224D16379012B15D9A36B29005B684B
-:109B6000606B98476379042B0DD10023E06A03955D
-:109B70000293C18A626B0191009393680521D268B8
-:109B80000069FAF777FAA368002B00D083E0C9E7F1
-:109B90000100674A2000FFF75DFF0225CBE7069B27
-:109BA00008931B78222B04D106981CF025FA069006
-:109BB000CCE71F2B01D05F4AB0E709A906981CF03B
-:109BC00025FA03780600432BF5D11CF015FA099B02
-:109BD0009842F0D109A930001CF018FA0378070068
-:109BE0000A3B0F2BE7D81CF007FA099B06008342BB
-:109BF000E1D00378472BDED11CF0FEF9099B984297
-:109C0000D9D10AA9380019F08BFD30001CF0F9F900
-:109C10009F210B900BA81CF008FA01000B981CF078
-:109C2000DFF99B220A9B0600920093421BD1012878
-:109C300004D10B9803780A3B0F2B01D93E4A6DE7FC
-:109C40002669731C2361059B012B21D00DA919F0F6
-:109C500067FDA36B0D9ADB683100606B98470028A5
-:109C600016D1364A5AE7364A93421AD1012803D10F
-:109C70000B980378032B01D0324A4FE7059B012B49
-:109C800006D0666B1CF08CF9010030001CF0B8FAAD
-:109C9000A368002B88D0200008990C3019F0DDFF54
-:109CA00040E789229200934222D1012803D90B98E0
-:109CB0000378032B01D0244A30E7059B012BE7D022
-:109CC0000CA91CF05EF901270B900B980378032B6D
-:109CD00001D01E4A22E70DA91CF053F901370B9061
-:109CE0000D9A0C99606B1CF092FABE42EDD1CFE751
-:109CF000059B012BCCD0032800D95CE70B9B1800F7
-:109D00000D931CF079F90E901CF076F9A36B0F906F
-:109D10001F6932000DAB0A99606BB847B8E7C046BF
-:109D2000653703008937030091020000DA02000062
-:109D300096370300BE370300E1370300FD37030009
-:109D4000FF0100000D380300293803004E380300DE
-:109D5000F0B587B001920A000593531E9A410D0099
-:109D600006000599019804921CF03AF92C1E039004
-:109D700009D02B7800243A2B05D102002100306B4A
-:109D80001BF08DFA2C00049B019F0293059B9F42C0
-:109D90001ED1002C3BD1039A049B944663441900C6
-:109DA000306B1BF070FA002D3ED1019B9F422CD0EE
-:109DB000019B9C423BD120001CF023F900220100B2
-:109DC000300000F039F801981CF016F90190ECE72A
-:109DD0003B783A2B0CD1002C12D1049B306B5A1ECD
-:109DE000039B3C00D218029BD21A19001BF057FAB1
-:109DF00038001CF001F9029B070001330293C5E70C
-:109E00000C4A39003000FFF725FE07B0F0BD002DE9
-:109E1000CBD0AC4208D120001CF0F3F800220100A6
-:109E2000300000F009F8C0E700222900F8E700221E
-:109E30000199C5E79B350300F0B50B7817001A00B0
-:109E40000A3A85B004000D000F2A10D803A9280093
-:109E500019F066FC03992000002F01D0022F03D1D6
-:109E6000FFF7D4FD05B0F0BDFFF71CFDFAE76A4A25
-:109E7000192B00D8CBE01A3B2A2B00D182E005DC5D
-:109E8000062B08D0292B11D0644AC0E02B2B00D11F
-:109E900094E0972BF8D1002F00D0B7E003A9280059
-:109EA0001CF0B4F80200039B00219BE002A92800EB
-:109EB0001CF0ACF80600022F03D001002000FFF7D1
-:109EC00003FD30001CF098F80299060019F01DFC03
-:109ED0000028D9D13378A22B13D1300003A91CF06C
-:109EE00095F8060030001CF087F8039A0190904224
-:109EF00007D2022F03D031002000FFF7E5FC019EBE
-:109F0000F0E73378482B21D1022F06D1206B1BF0CC
-:109F100060F8206B1BF01CF80EE030001CF071F8AC
-:109F200001002000FFF7D0FC206B012FF2D11BF0C5
-:109F300024F8206B1AF0F4FF30001CF05DF8029951
-:109F400019F0E3FB002800D08CE79DE7492B9BD15B
-:109F500030001CF056F803A919F0E2FB012F07D1DD
-:109F6000206B1BF000F80399206B1AF0B1FFE3E7B8
-:109F7000022F02D1206B1BF015F80399206B1AF009
-:109F8000DAFFD9E703A928001CF040F8039906007E
-:109F900019F0BBFB002800D076E7002F36D1350042
-:109FA00003A928001CF032F806001CF025F80378FD
-:109FB000A92B1BD100231A00310013E0002F25D15B
-:109FC00003A928001CF022F80399050019F09DFB55
-:109FD000021E02D03B003A0066E72B78A62BDFD0AA
-:109FE000030029002000FFF7B3FE3BE7AA2B05D1B1
-:109FF00003A91CF00BF8039B0200DDE7C12B00D185
-:10A0000042E71BF0F9FF320003004DE7044A290044
-:10A010002000FFF71FFD25E73C3503005435030002
-:10A020006F350300F0B5170085B0040008000D007F
-:10A030001BF0E2FF3900060019F067FB01900028D1
-:10A040001FD02379002B17D0E36A1E78002E13D17E
-:10A05000F6212000FF31FFF725FC29002000FFF743
-:10A0600033FC330032000121206B1BF056F9206BCA
-:10A070001AF08DFF05B0F0BD29002000FFF724FC89
-:10A08000F5E733786D2B1DD1290001222000FFF761
-:10A09000D3FE30001BF0B5FF4378811C4E3BDBB292
-:10A0A00018260A2B01D8234AD65C2000FFF70CFCA7
-:10A0B0003100206B1BF060F8022229002000FFF71E
-:10A0C000BBFED7E76E2B2ED1300003A91BF09EFFFD
-:10A0D00006000700039BBB421FD101992000FFF738
-:10A0E000F3FB206B1AF03FFF002229002000FFF74E
-:10A0F000A3FE019BB342BDD030001BF07DFF019B4E
-:10A100000500834202D0206B1AF02DFF310000229F
-:10A110002000FFF791FE2E00EBE738001BF06CFFEC
-:10A1200001970700D6E731002000FFF7CDFB019A29
-:10A13000C3E7C04631350300F0B50B788FB00A3B5A
-:10A140000400019103920F2B00D906E108001BF0D7
-:10A1500053FF0378432B00D0FFE001981BF04CFF26
-:10A160000BA91BF053FF037842780A3B1B021343F1
-:10A17000A14A934200D0F0E01BF03EFF03780500B7
-:10A18000472B00D0E9E01BF07CFF002800D0E4E082
-:10A1900028001BF031FF0B9B984200D0DDE0280027
-:10A1A0001BF02FFF9F210C900CA81BF03EFF0C9B77
-:10A1B00007000293012302980D931BF01DFF050079
-:10A1C0000C90B84200D1BDE01BF016FF0C90B842D5
-:10A1D0000ED00378032B00D0BFE00DA91BF0D1FEF9
-:10A1E0000D9B0C90002B00D1B7E0B84200D0B4E03A
-:10A1F000029B1B784533DBB2022B00D8ADE02B78F5
-:10A200004533DBB2022B00D8A7E00B9B1800059367
-:10A210001BF0F2FE039B0700984200D100270D9B24
-:10A2200026690493238B26830693638B0793E38B22
-:10A230000893731C6383A38BE383331D23612B7803
-:10A24000D91E03930B00591E8B410993039B032BCB
-:10A2500003D029002000FFF737FB02992000FFF709
-:10A2600033FBF11C206B1AF0C9FEB11C206B1AF0F5
-:10A2700088FD206B1AF077FE002201992000FFF77D
-:10A28000DBFD05992000FFF71FFB711C206B1AF006
-:10A2900078FD0499206B1AF0A8FD1221206B1AF0AA
-:10A2A0006BFF206BF11C1AF06CFD039B206B032BE2
-:10A2B0004CD01AF062FE206B1AF074FE049B206BE7
-:10A2C0001921002B00DA1A2100251AF055FFB21CC3
-:10A2D0000121206B1AF09EFE069B2383079B63835C
-:10A2E000089BE383AF4218D0206B1AF050FE039B0B
-:10A2F000032B02D0206B1AF04AFE39002000FFF732
-:10A30000E3FA2569206B6B1C290023611AF076FEA5
-:10A310000999206B01311AF07AFC3100206B1AF098
-:10A3200030FD206B1AF033FE039B032B02D0206B11
-:10A330001AF02DFE002F03D02900206B1AF021FD0A
-:10A340000FB0F0BD2D4B029D029351E71AF00BFEAA
-:10A3500029002000FFF7B8FAB0E7238B25690293A4
-:10A36000638B6E1C0493E38B66830593AB1C06938F
-:10A37000A38B0198E383224B2B432383EB1C2361A4
-:10A380001BF03AFE01002000FFF79EFA07000121B2
-:10A39000206B1AF090FE3100206B1AF0F2FCA91C21
-:10A3A000206B1AF09BFE002201992000FFF744FD6C
-:10A3B00039002000FFF788FA0700206B1AF022FC12
-:10A3C000002803D13100206B1AF018FEA91C206B65
-:10A3D0001AF0D7FC206B1AF08DFE029B2383049B9E
-:10A3E0006383059BE383039BBB42A5D03900200018
-:10A3F000FFF76AFAA0E7C046A20200001A6D030048
-:10A400000080FFFFF0B589B005000591049200932C
-:10A410000191002904D09F2105A81BF006FE0190A0
-:10A4200000231E001F00059C03930293019BA3427F
-:10A430001AD1002E0DD0029B002B00D079E0286BA2
-:10A440001AF03CFD039B002B00D077E0286B1AF03C
-:10A4500035FD049B286B002B00D174E033003A00DB
-:10A4600000991AF063FF0AE02378BB2B14D1BA3BA2
-:10A470001E4206D0374A21002800FFF7EBFA09B048
-:10A48000F0BD012320001E431BF0BBFD0290200005
-:10A490001BF0B2FD0400C9E7BC2B0BD1BA3B1E4236
-:10A4A00001D02D4AE7E7022320001E431BF0A9FD3F
-:10A4B0000390ECE7BD2B2AD120001BF0A2FD040085
-:10A4C0001BF09AFD0378C12B0BD128000622210036
-:10A4D00019F031FA009B2000013300931BF08CFD32
-:10A4E000D6E723780A3B0F2B01D91C4AC3E707A9FB
-:10A4F000200019F015F904000799286B1AF0BDFC2B
-:10A5000021002800FFF7E0F9013704008EE7002E54
-:10A5100001D0134AAFE7002F01D0124AABE7210068
-:10A520002800FFF7D1F9009B0400013300933E009F
-:10A530007CE702992800FFF7C7F983E70399280011
-:10A54000FFF7C2F985E733003A0000991AF0E5FEFB
-:10A5500095E7C0468D380300A4380300BC380300DB
-:10A56000DD380300F8380300F0B589B0040003912A
-:10A5700003A83D211BF059FD0027E36A02905E7D90
-:10A580000398029B984215D118001BF03AFD029BDC
-:10A5900003901B780100320020001D2B59D119F0C7
-:10A5A00075F90500013F57D229002000FFF72EFA68
-:10A5B00009B0F0BD05A91BF029FD6821039003A88F
-:10A5C0001BF033FD06A90500039819F0A9F896239E
-:10A5D000069AFF3301909A4213D003992000FFF7A7
-:10A5E00073F9013703900398A84229D105992800EF
-:10A5F00019F08BF800280CD129002000FFF764F92E
-:10A6000007E0019B9D4207D8174A00212000FFF771
-:10A6100021FA059B0393B3E701981BF0EDFC8542FB
-:10A62000F2D107A9019819F07BF8079B0F4A9342D2
-:10A6300004D00F4A9342E7D10426EAE70126E8E76F
-:10A6400007A919F06DF807990390206B1AF040FCE8
-:10A65000C9E719F065FBA4E7002301211A00206B6C
-:10A660001AF05BFE9EE7C04654360300110200005C
-:10A6700006020000F7B50A780E00130008215D3BC2
-:10A680008B43DBB20400002B02D101338371F7BD91
-:10A6900013005E3B8B43DBB2002BF8D013000A3B68
-:10A6A0000F2B2FD95C2A11D101A930001BF0AEFC71
-:10A6B00007001BF0A1FC019B834205D01BF09CFC12
-:10A6C000019B0500834208D1002506E030001BF005
-:10A6D00098FC07001BF090FC050001A9380019F058
-:10A6E0001FF8A379002D02D02A78002A0CD1002B64
-:10A6F000CDD1E38A002BCAD0184A31002000FFF7E1
-:10A70000A9F9C4E73700DFE7002B1ED0A38A013385
-:10A710009BB2A382012B09D1E18A206B002911D0C1
-:10A720001AF04CFD0021206B1AF062FD2900200078
-:10A73000FFF7CAF8206B01991AF09FFB206B1AF003
-:10A7400063FDA4E71AF0BAFBECE7E38A29000133C2
-:10A75000E3822000FFF7B8F899E7C046723603009D
-:10A76000F0B504000E00056987B002936B1C0393DB
-:10A77000AB1C03612900006B17001AF079FC200064
-:10A7800018F0D6FF31002000FFF79EF8206B1AF07A
-:10A79000B7FC691C206B1AF031FC2900206B1AF001
-:10A7A000F0FA206B1AF006FE2669731C2361029BE7
-:10A7B0009F4218D1A38B206B013BA3831AF070FC3E
-:10A7C000206B1AF0FCFD0399206B1AF0DAFA0C9B4F
-:10A7D000002B03D019002000FFF776F83100206B22
-:10A7E0001AF0CFFA1BE038001BF00BFC0023059396
-:10A7F000236905000193013323610378002B10D1F5
-:10A800001BF0FAFB1BF0F8FB029B984224D03C4A59
-:10A8100029002000FFF71EF9A38B013BA38307B09B
-:10A82000F0BD07008B2B07D11BF0EBFB07001BF0E3
-:10A83000E3FB05A918F074FF206B1AF094FB3900B4
-:10A840002000FFF741F82121206B1AF095FC019AB6
-:10A850000021206B1AF0DEFB28001BF0CDFB0599D0
-:10A860000700002948D1206B1AF091FB0025059BB9
-:10A87000AB4209D02569206B6B1C236129001AF0BB
-:10A8800003FC200018F054FF39002000FFF71CF8EB
-:10A89000059B0700002B02D0206B1AF031FC206BC7
-:10A8A0001AF053FC059B002B19D00E21206B04F0ED
-:10A8B00019FA2900206B1AF064FA0E21206B04F0BB
-:10A8C00011FA05992000FFF7A1F820000599FFF77C
-:10A8D000AFF8A38B206B013BA3831AF0E1FB31009F
-:10A8E000206B1AF08BFB0199206B1AF04AFA0121B8
-:10A8F000206B1AF08CF95AE72000FFF787F8B5E7CC
-:10A900001A390300F0B587B0039143790400012B95
-:10A9100007D1C36A0D001B78002B04D1194AFFF739
-:10A9200099F807B0F0BD692103A81BF07EFB0290E7
-:10A930000398029B9842F4D005A90B2718F0F0FE6B
-:10A94000059B0390019302ABFF183A000199E06A5E
-:10A9500018F0FEFB3B780600002B0DD0019A010099
-:10A96000E06A18F020FC3378074A002BE0D1290078
-:10A970002000FFF76FF8DBE70378042BD8D0034AF9
-:10A98000F5E7C046BF360300E43603000237030094
-:10A99000F0B587B0039144790500012C09D10191EC
-:10A9A00003A869211BF041FB02900398029B984287
-:10A9B00001D107B0F0BD05A90B2718F0B1FE02AB1D
-:10A9C000059EFF1803903A003100E86A18F0C0FBBA
-:10A9D0003B78002B08D10378012B05D0074A019959
-:10A9E0002800FFF737F8E0E704703100E86A18F054
-:10A9F000D1FB0028D9D00470D7E7C046A0360300A9
-:10AA000010B5084B428B04009A4202D1064AFFF768
-:10AA100021F8A28BE38B618BD21A206B04F088F9AA
-:10AA200010BDC046FFFF00003C36030010B5084BC8
-:10AA3000028B04009A4202D1064AFFF70BF8A28B60
-:10AA4000E38B218BD21A206B04F072F910BDC04643
-:10AA5000FFFF000027360300F7B50B7804001A004B
-:10AA60000A3A0E000F2A08D801A9300018F058FE43
-:10AA700001992000FEF7DCFFF7BD432B44D1694666
-:10AA800030001BF0C3FA01002000FEF71DFF037821
-:10AA90000500A22B10D101A91BF0B8FA050028006F
-:10AAA0001BF0AAFA019B0700834205D02900200071
-:10AAB000FEF70AFF3D00F2E72B78482B16D128005D
-:10AAC0001BF09FFA01002000FEF7FEFE0500206B40
-:10AAD0001AF089FA0099280018F017FE0028CBD147
-:10AAE000214A31002000FEF7B5FFC5E7492BF7D119
-:10AAF00028001BF086FA01A918F012FE0199050042
-:10AB0000206B1AF059FAE5E7442BE9D108001BF055
-:10AB1000B8FA0028E4D130001BF073FA06001BF0ED
-:10AB200070FA050001002000FFF796FF28001BF0D7
-:10AB300063FA0378A92B9FD0AA2B0ED101A91BF091
-:10AB400065FA019B0500834296D020002900FFF79B
-:10AB500083FF28001BF050FAF3E7C12BC0D001009F
-:10AB60002000FFF779FF87E7B5350300F7B5022628
-:10AB70000D00C16A0400097D314005D0344A290026
-:10AB80002000FEF767FFF7BD0191297808000A3819
-:10AB90000F281DD8280001A918F0C2FDA279E36A88
-:10ABA000002A03D01A8B01321A8302E0DA8A0132BA
-:10ABB000DA82012601990029E5D06B46DF1C3A00B4
-:10ABC000E06A18F0C5FA3B78002B3CD1214AD6E761
-:10ABD0001A32914204D128001BF013FA01A9DBE7D5
-:10ABE0001A33994223D1A379002BC7D1012728001A
-:10ABF000A7711BF046FA03260028DBD128001BF0C2
-:10AC000000FA0278E36A0A3A0F2A09D828001A7D66
-:10AC100017431F751BF0F5F901A918F081FDC9E76D
-:10AC20001A7D280017431F751BF0EBF9F2E7280087
-:10AC30001BF0E7F901A918F073FDE36A1A7D1643CA
-:10AC40001E750526B6E70223467003709BE7C046D3
-:10AC50003D3703004C370300C36A70B51B7804000E
-:10AC60000D00072B04D00C4A0021FEF7F3FE70BD47
-:10AC70001100280018F049FD002807D00E21206B94
-:10AC800004F030F8206B1AF05BFBF0E7290020009D
-:10AC9000FEF71AFEF6E7C04623370300C36A70B515
-:10ACA0001B7804000D00072B06D0022B04D0174A96
-:10ACB0000021FEF7CFFE70BD1100280018F025FD21
-:10ACC000061E07D00E21206B04F00CF8206B1AF042
-:10ACD00052FBF0E72B78C42B12D128001BF091F91E
-:10ACE00001002000FEF7F0FD3100206B1AF0E3F9BF
-:10ACF000206B0E2103F0F6FF206B1AF04BFBDAE716
-:10AD000029002000FEF7E0FDE0E7C04639390300E6
-:10AD1000F0B50D0085B004001100280018F0F5FC16
-:10AD2000071E05D00021206B1AF062FA05B0F0BDB5
-:10AD30002B784E2B0BD1206B01211AF059FA2900E8
-:10AD40002000FEF7C1FD206B1AF05EFAEEE7B32B90
-:10AD500061D128001BF055F905001BF04DF9029058
-:10AD60000378B62B4DD103A91BF050F9039B029039
-:10AD7000984203D09D2102A81BF057F92B784E2B47
-:10AD800020D103990298266B1BF02AF9411C300050
-:10AD90001AF02EFA29002000FEF796FD206B1AF01B
-:10ADA00033FA0127029E039B9E4210D1002FBDD192
-:10ADB00031000298246B1BF013F9411C20001AF09B
-:10ADC0002EFAB3E729002000FEF77EFDEAE733788C
-:10ADD000310020000193FEF777FD019B0600002F54
-:10ADE0000BD04E2B05D00F4A29002000FEF732FE73
-:10ADF0009CE7206B1AF008FAD5E74E2BD3D10A4A0C
-:10AE0000F2E72B7804224E2B00D0052229002000E7
-:10AE100018F091FD8AE729002000FEF755FD012179
-:10AE2000206BCCE7CD350300F0350300F0B504000E
-:10AE30000D00002662711100C56206612A0087B00C
-:10AE4000006B03F071FE6279012A01D1EE832E843A
-:10AE5000AE683378542B0AD130001BF0D2F80100D1
-:10AE60002000FEF731FD206B1AF06AFA2AE02B78F9
-:10AE7000002B08D131002000FEF726FD0E21206BAB
-:10AE800003F030FFEFE7072B21D130001BF0B4F8BF
-:10AE900063790500012B07D100230100A371402233
-:10AEA0005F4B200018F0B7FC28001BF0A5F81BF042
-:10AEB000A3F801002000FEF707FD206B19F0A2FEA9
-:10AEC0000028DBD0206B19F070FE07B0F0BD022B1C
-:10AED00017D1012A07D100234732A3713100514B0A
-:10AEE000200018F098FC30001BF086F801002000CC
-:10AEF000FEF7EAFC2B7D5B07B5D5206B1AF047F80F
-:10AF0000BCE7033B032B50D830001BF075F805A9B4
-:10AF10001BF07CF81BF070F867790390012F09D1C2
-:10AF20000B2202ABD2183900E06A18F011F90223A3
-:10AF30000370EF822B78032B20D10021206B1AF0B5
-:10AF40004AF92B78062B27D1206B19F0B7FF012186
-:10AF50002000FEF7A7FC206B19F0B0FF206B19F062
-:10AF6000ADFF0023059A009303993300200019F0E8
-:10AF700096F92B78062B00D075E77FE7042B04D1D8
-:10AF80000021206B1AF034F9DBE7052BD9D1002121
-:10AF9000206B1AF044F9D4E720000121FEF782FC6F
-:10AFA0000121206B1AF087F8DBE7012A07D1DE21A7
-:10AFB00005AAFF31280018F0CBF80223037005A979
-:10AFC000A86818F0ADFBF82120004900FEF76AFCE4
-:10AFD000F0212000FF31FEF719FDE989206B19F0FF
-:10AFE0004CFFFA2120004900FEF710FDA8681BF075
-:10AFF00003F81BF001F801002000FEF765FCDE21DC
-:10B000002800FF3118F094F80378022B00D135E7BF
-:10B01000DE214288FF31206B19F007FE23E7C0468E
-:10B02000BF3E0200B33E0200F8B5164B0400A83341
-:10B030001B681600002B24D1056901226B1C0361DB
-:10B040002B0019F0B2F8BE210700FF31206B19F078
-:10B0500019FE3100380018F058FB061E09D13900DE
-:10B060002000FEF731FC330032000121206B1AF082
-:10B0700054F90121206B1AF070F92900206B19F0A6
-:10B0800080FEF8BD7C2E0020F0B585B005000E00D6
-:10B090000192FEF719FC03780400A22B03D101A949
-:10B0A0001AF0B4FF0400EB6A1B78072B00D070E0A5
-:10B0B000337872780A3B1B021343504A934268D19B
-:10B0C0002378472B65D120001AF0DBFF002860D0E1
-:10B0D000DE212800FF31FEF7E5FB0121EA6A936AD1
-:10B0E000928C002A06D1464A21002800FEF7B2FCC5
-:10B0F00005B0F0BD5878084211D059682800FEF715
-:10B10000D1FB019920001AF06BFF02280ADC002312
-:10B11000286B1A0002211AF000F9200036E0013AEB
-:10B120000833DEE720001AF067FF0378492BEED1E1
-:10B1300020001AF061FF1AF05FFF0378472BE6D179
-:10B1400020001AF059FF07001AF056FF06003800D9
-:10B150001AF057FF03A918F0E3FA03990122286BAC
-:10B1600019F0C2FE30001AF08CFF0021884203D192
-:10B1700030001AF046FF0100002301222800FFF7EB
-:10B1800041F920001AF038FF1AF036FF1AF034FFA8
-:10B190000400019BA342ABD020001AF02DFF019BBD
-:10B1A0000600834224D02378492B21D10378472BF2
-:10B1B0001ED120001AF025FF070030001AF061FFB1
-:10B1C0000024A04203D130001AF01BFF040003A9A1
-:10B1D000380018F0A5FA00220399286B19F084FEB4
-:10B1E0002800002301222100FFF70CF93000CDE7F1
-:10B1F00021002800FEF768FBCAE7C046C70200002E
-:10B200000F360300F0B59BB01500069038220F00F2
-:10B210000CA800211E001DF0D8FD069B0BAC5B683E
-:10B220000B97236201235B421193069B26711868DA
-:10B230001AF0E2FE1AF0B4FE606280001BF04BF8D8
-:10B240000022A06200950025069B11001B682000CB
-:10B2500018F078FA19F093FC2B0003902063049502
-:10B26000626A0792954202D2A268002A41D0002B5E
-:10B270005DD10593059A079B934202D00D9A002A4F
-:10B2800058D00499039819F07FFC0025149A0D9B5F
-:10B290000592954200D213E1002B0CD0169B0EA80C
-:10B2A000996818F0DAFC169B0E9A0493DB890B99C7
-:10B2B0000D98FDF763F9039819F06EFC18980028B3
-:10B2C00001D017F073FC002406981AF0E4FE159BD9
-:10B2D0001B681D69149B159803939C4200D219E1C9
-:10B2E0001BF016F80D99002900D11BE1080001F0B0
-:10B2F000F5F9A16AAA005658002E13D03269002A27
-:10B3000010D117F0C6FB737D30610122310020009F
-:10B31000042B09D1FEF7BAFB2369049A9A4200D2A2
-:10B320000493012301359BE7FFF780FDF4E7002339
-:10B330001D0095E70599159B8900CB58002B37D048
-:10B340000120998C8C46197D01421BD06446601EF9
-:10B35000C000002C16D00226996A09184D78354293
-:10B3600029D0002A0ED00F00508816780890506817
-:10B370005578099011CF11C2089A0E704A80099A27
-:10B380004D704A600021DE249983FF348C451ADC1D
-:10B3900000218C4535DC5E68002E09D00021B28C7E
-:10B3A00009920A00099881423BDB0020824263D166
-:10B3B000059B01335DE7002A02D1012D00D10A006F
-:10B3C000013C0838C5E7986ACA0082181878012835
-:10B3D00004D15068A04208D10131D7E7157801287F
-:10B3E00003D9002D01D1012010701078022803D05C
-:10B3F000012550782842EFD0988B451C9D835080C2
-:10B40000EAE7986ACA0082181078032807D1012455
-:10B410005078204203D1988B5080001998830131D5
-:10B42000B7E7B06ACD0040190890007803380128CA
-:10B4300012D800240EE09F6AE00038180778042F25
-:10B4400007D1089D6F683D004768BD4201D1428029
-:10B4500001320134A445EEDC0131A3E79C6AC1004E
-:10B4600061180C78042C03D101254C782C4202D0B1
-:10B470004C88A4184C8001308445EFDCD98A92B204
-:10B480005118D982998B52189A8391E7039B022213
-:10B4900021000BA81793FFF7C9FC0D9B0593002B08
-:10B4A00004D1032221000BA8FFF7C0FC0D9B0593DC
-:10B4B000002B2DD1042221000BA8FFF7B7FC27E0B9
-:10B4C000002B00D0EAE6159B0593059AAB009C582B
-:10B4D000002C1DD0637D042BD8D1189B0593002B25
-:10B4E00004D10499139817F04AFB1890002317937E
-:10B4F0000F4B032221000BA81993FEF7C7FA0D9BEF
-:10B500000593002B04D1042221000BA8FEF7BEFAFC
-:10B510000135BBE6A3001858002801D017F0FFFD45
-:10B520000134D7E60A00280017F0BFFA1BB0F0BDBF
-:10B5300058980200F8B5124A0E00124B1249904278
-:10B540001AD0C4688C4203D0012430602000F8BDBA
-:10B55000406B002812D004689C42F0D10500002402
-:10B5600047680835BF00EF19BD42EFD2310001CD69
-:10B57000FFF7E0FF2418F7E70024E7E70400E5E71A
-:10B580004CB202004CA002007DB60000F7B50500E9
-:10B590000C00AB68002B0AD0344AE168914206D017
-:10B5A000E358002B03D00422EB681A60F7BDA06BB0
-:10B5B000002820D06B680430D900062300221943EC
-:10B5C000FDF7DAFA002816D0297C4268EB68286873
-:10B5D000002904D00100002001F0F0F9E6E700287E
-:10B5E00007D02249E5688D4203D021498C4200D022
-:10B5F00000692100F0E72B68002B16D1646B002C4A
-:10B60000D4D01C4B22681A4F9A420BD12600636893
-:10B61000194A08369B189B00F3180193019B346864
-:10B620009E4216D3BC42B4D1C0E72A7C002AE5D1A1
-:10B630000E4AE1689142E1D00D4A9442DED0186989
-:10B64000EA68696801F014FAEB681B68002BD5D032
-:10B65000ACE7BC4201D10436E0E721002800FFF747
-:10B6600095FFEB681B68002BF5D09FE77DB60000C7
-:10B670004CB202004CA00200FFFFFF3FF0B58FB0BC
-:10B680000E0005A9019202930700FFF753FF041D66
-:10B69000A40020001AF00DFE0500002180C017F064
-:10B6A000C7FE22002800103A103000211DF08DFB4B
-:10B6B000012E05D1029B1B680393042B00D189E066
-:10B6C00007AC0822002120001DF07FFBF22200239E
-:10B6D00009A8FF324260E63AFF3A39008260C4604E
-:10B6E00003740993FFF752FF079804282FD1059898
-:10B6F000029BC468019A3100A04728612800F7F72F
-:10B70000D5F8B84266D1EA220023FF32390009A8F1
-:10B71000089307930B9309950A92FFF737FF079B4E
-:10B72000002B57D00198304336D107AA010019F0F9
-:10B7300045F90400294B9C424CD0200016F077FFBD
-:10B74000274902002748FCF7ADFE00F0C7FF00289C
-:10B75000D4D0019A324306D106AB0121069701F0FD
-:10B760000FF90500CAE7019B5D00AD190135AD0079
-:10B7700028001AF09EFD2A1F0390029980C01DF038
-:10B7800008FB711C039B019A206801F0F9F8050081
-:10B7900003981AF0BDFDB1E7019B5C00A4190234C7
-:10B7A000A40020001AF085FD22000700079B0299E3
-:10B7B00003600393089B083A436008301DF0E9FAE0
-:10B7C0003A000199300019F0F9F8040038001AF035
-:10B7D0009FFDAFE728000FB0F0BDC046E4B3020004
-:10B7E000A339030090AC0200F0B5146889B01700CB
-:10B7F000002C0ED1436803AD82686960596B0392D7
-:10B80000AC60EF602C74002905D111492800FFF7C6
-:10B81000BDFE09B0F0BD0F4B0A689A4210D14B68CB
-:10B8200008310E000193019B9C42EED0A300F15819
-:10B830002800FFF7ABFE3B68002BEAD10134F2E7AA
-:10B840002800FFF7A3FE3B68002BE2D1DDE7C046EE
-:10B850004CB202004CA0020010B54A6801491BF02E
-:10B86000D9FA10BD9D3A0300F0B58BB005000E006B
-:10B8700014000021082268461DF0A7FA00211022BA
-:10B8800006A81DF0A2FA202307936B46059508939E
-:10B890002968E023002C02D0042C10D1E623FF33CA
-:10B8A00005A80693FFF772FE0221009F042F0ED118
-:10B8B000220031002869F7F769FA0BB0F0BDFC23CC
-:10B8C00005A85B000693FFF761FE0321EDE7381E34
-:10B8D000F3D002AB002202950396049401F050F8D5
-:10B8E000042CEAD00048E8E7E4B30200F0B5204BAE
-:10B8F0008BB08200D35803AF0C0008220021060051
-:10B90000380001931DF061FA019B05AD6B601423B3
-:10B91000AB600023280021680594EF602B74FFF7CB
-:10B9200035FE0398042805D12169300000F0B6FFE8
-:10B930000BB0F0BD00280AD0210019F037F8022E14
-:10B94000F6D1F7F7C7F8440001202043F0E7022EB4
-:10B9500001D00020ECE7E2232168FF3328006B6070
-:10B96000FFF714FE3B68002BF3D16400ECE7C04600
-:10B9700094B80200F0B55642564103238BB00C0038
-:10B980000190002117007642082203A81E401DF0F6
-:10B990001CFA0823079303AB0893002305ADF73681
-:10B9A000FF36216828002B7405940696FFF7EEFDFC
-:10B9B000039B002B09D1002F07D1F733FF332168F8
-:10B9C00028006B60AF60FFF7E1FD039804281AD1EF
-:10B9D0002069F6F76BFF154BC2689A4211D1002F10
-:10B9E00007D02368586819F0C5FF010001981BF0C3
-:10B9F00050F980223A4321690198F6F76FFF0BB0A6
-:10BA0000F0BD3A00F7E7002805D0210018F0CEFF7E
-:10BA100000220100F0E7200016F009FE23000200DA
-:10BA2000034901981BF0F6F9E9E7C0466583000079
-:10BA30005239030070B504000D000B491BF029F9C1
-:10BA4000696800222000F6F749FF084920001BF032
-:10BA500020F9A96800222000F6F740FF04492000E1
-:10BA60001BF017F970BDC0465B3A030045FC0200AD
-:10BA7000A83A030010B5C468002C06D142680449F6
-:10BA80000448FCF70FFD00F029FEA04710BDC0469A
-:10BA9000643A030090AC0200F0B5154B89B0160073
-:10BAA0008200D5580C000C220021070068461DF0CA
-:10BAB0008CF9182303A84560836000256B46216834
-:10BAC000C36003940574FFF761FD009B042B06D14E
-:10BAD00032002169380001F081FC09B0F0BD181E68
-:10BAE000FBD06A4629000120029618F067FFF4E7B0
-:10BAF0000CB70200F0B51700EE228DB004000393DE
-:10BB0000002307A852004260CD3A05ADFF3A0E006F
-:10BB100021688260C560037405936B600794FFF72A
-:10BB200035FD0598002809D1200016F080FD0C494C
-:10BB300002000C48FCF7B6FC00F0D0FD039B042883
-:10BB400006D13A003100206900F01AFF0DB0F0BDB7
-:10BB5000009332003B00696816F072FEF6E7C046BB
-:10BB60008739030090AC0200F0B50D0085B001A943
-:10BB700007001600280002AA17F055F900230199C2
-:10BB8000029899422CD13C201AF0A5FB2A4B019A2D
-:10BB900003602A4B04008360294B4760C360294B34
-:10BBA0000361294B4361294B8361294BC361294BB5
-:10BBB0000362294B4362294BC362002A06D0029BD1
-:10BBC0001968096B0163012A18D94563A66303A9A3
-:10BBD0002000FFF7AFFC012813D9214801F0BAFD7E
-:10BBE0009A008258D468002C06D152681D491E481C
-:10BBF000FCF758FC00F072FD0133C2E71B68436399
-:10BC0000E4E7A36B0022181D1849FCF7B5FF051ED9
-:10BC10000ED0032243681A400AD11968144B4968B0
-:10BC2000994205D1031D0121124818F093FD686067
-:10BC3000200005B0F0BDC04658B8020075B900003C
-:10BC40007DB60000F5BA0000EDB8000099BA00001A
-:10BC5000C746020069B8000047480200FD470200DD
-:10BC60002D3A0300043A030090AC02008E0F00004E
-:10BC700045020000E0B7020037B50D001C000023AC
-:10BC80001100009301220333280006F015FB012D5B
-:10BC900004D0032D06D0074801F05CFD2068F6F7BC
-:10BCA00005FE3EBD2068F5F775F9A2686168FFF7EB
-:10BCB0005BFFF6E7813A03001FB5064B0A000193CC
-:10BCC0004B6802938B68010001A8039300F002FF08
-:10BCD00005B000BD1CB80200F8B50E0003271349DB
-:10BCE000134AB0421CD003003B401BD104688C4275
-:10BCF0001AD1406B002814D003689342F1D105009B
-:10BD000044680C4B0835E418A4002C192868A54297
-:10BD1000E5D23100FFF7E0FF002802D10435F5E756
-:10BD20000120F8BD0020FCE71800FAE758B802002F
-:10BD30004CA00200FFFFFF3FF0B585B00500019168
-:10BD400008008B0717D10B68134A93420BD10123CC
-:10BD5000029301AB03930024029E039FA6420DD1E0
-:10BD60000E4805B0F0BD0E4A934204D103AA02A9C1
-:10BD700017F059F8EFE70B4801F0ECFCA300F95875
-:10BD8000094B994206D02800FFF7A6FF002801D1F1
-:10BD90000134E3E70548E4E758B80200C4E70200CD
-:10BDA0004CA00200CB3903004CB20200CCE70200E9
-:10BDB00010B5830703D1054B02689A4202D00448AC
-:10BDC00001F0C8FCFFF7B8FF10BDC04658B802002C
-:10BDD00064390300F0B58BB0079310AB10CB009023
-:10BDE00001911B78062A12D8012A08D93F230B702B
-:10BDF0000B0001330193002301990B7001E0002A2D
-:10BE0000F9D101209042804140420BB0F0BD009931
-:10BE1000002929DA019B01995F1C2D230B708021D9
-:10BE200009068C46009B63440093019BFF21099304
-:10BE3000009BC90518000840884222D120234E21CA
-:10BE4000079AF81C1A4013001143009A540212D1A9
-:10BE500049225A403A70462253407970BB70002301
-:10BE6000FB70019BC01AD0E7019F002BDDD0390089
-:10BE700001370B70D9E74124634039707B70B9708A
-:10BE8000EDE7002C00DA06240199013A7D1A551BD2
-:10BE90002022079911430291672940D1002C00D13B
-:10BEA000CEE1002B79D0A64A934200D9D4E0A5492F
-:10BEB00000980EF021F9431E9841002300263030EF
-:10BEC00003932033059004939F4B039A0099D05815
-:10BED0000EF008F9002808D0049B039AF6189B4B33
-:10BEE0000098D1580EF07EFD0090049B5B100493E7
-:10BEF000039B04330393182BE6D115330393009A65
-:10BF00008F4B93425DD38F4900980EF0F5F80028CF
-:10BF100051D0002E7CD0FE239B05009351E0002BD6
-:10BF2000C1D1029B662B38D1631CAB4200DBAC1E37
-:10BF3000029B651C049300231E0003930593E343B7
-:10BF4000DB171C40049B652B00D0EEE0651C002332
-:10BF50000693069B9D424CDD00980FF04FF87B1C2A
-:10BF60000893030030333B70059A069B934205D13A
-:10BF7000002C03D0BB1C08932E237B700FF05EF8BF
-:10BF8000011C00980EF060FE71490EF02BFD069B1F
-:10BF9000009001330693089FDBE7631DAB4200DB93
-:10BFA000AC1F029B652B00D1AFE0002504930395E5
-:10BFB00005952E00C3E7009865490EF013FD013684
-:10BFC0000090029B662B03D0672B39D1042E37DCFF
-:10BFD000059B3B70029B672B01D1731EE418631C09
-:10BFE000AB4200DBAC1E002C15D166230137039455
-:10BFF0000493029B662B00D0B0E0012E00DDDDE053
-:10C00000544900980EF078F8002800D0ACE0D5E054
-:10C010002B2303937FE72E23250030227B70BB1C4C
-:10C02000013E1F00002E76D0002D05D1039501237F
-:10C030005B42059367334DE01A70013D0133EFE732
-:10C040006B1FA3426CDC029A672A66D01300AC1FF8
-:10C0500000250493059572E70023002603932033FF
-:10C0600004933A4B039A0099D0580EF031F8002807
-:10C0700008D0049B039AF618334B0098D1580EF061
-:10C08000B1FC0090049B5B100493039B0433039367
-:10C09000182BE6D12E4900980EF02EF8002805D076
-:10C0A00000982D490EF09EFC01360090029B662BF5
-:10C0B00012D1AE4214DAA3190133AB4204DBAC1B3C
-:10C0C000023C631C00D10024002335190393013581
-:10C0D00005966633049332E7029B652B00D0B1E0EE
-:10C0E0006B1FA34200DCAC1F2B2300250393059597
-:10C0F0003A33EFE7231DAB4200DB6C1F029BA642E5
-:10C1000000DBA3E0731CE41ADEE7029B0025049326
-:10C110002B2303934CE7039689E71C00029B97E7C8
-:10C120000025029B059504930CE7049B672B00D028
-:10C130000DE7251E00D00AE701252C0007E7C046C1
-:10C14000FFFF7F3FF8FF7F3FB0B80200C8B8020092
-:10C15000000020410000A040CDCCCC3D3E490098DD
-:10C160000DF0CAFF002824D030217B1E1A782E2A19
-:10C170004FD010003038092842D901330193019B78
-:10C180001B78302B15D1019A52782E2A45D104996B
-:10C19000662942D001994B70039B0A702D2B3AD12E
-:10C1A000013E002E3BD03B00019A9A423AD3312304
-:10C1B0001370029B672B01D1002C39D1039B002BFC
-:10C1C00019D02022079B0A2113401A00452313434C
-:10C1D0003B70039B30007B700DF034FE0A210DF0A4
-:10C1E00017FF3031B97030000A210DF011FF3C1DEE
-:10C1F0003031F970270000233B70099BF81A04E6E0
-:10C20000392A02D001321A70B8E7019A19709342A4
-:10C21000B5D0013BAAE70136C5E70137C3E72B23B9
-:10C220000393C0E75A1E117819701300BCE71F0072
-:10C230007B1E1A78302AFAD02E2ABFD11F00BDE704
-:10C2400001242EE6029B672B00D153E704932B2396
-:10C2500000250393FEE6C0460000A040F8B50700A5
-:10C2600008680C0016F026FE05006068F6F744FD2D
-:10C270000600022F0AD9A068F6F700FC0200310080
-:10C28000280018F03CFB19F01BFAF8BD004AF6E74D
-:10C2900040420F00F0B5486887B00F00F6F7EEFB9C
-:10C2A000041E02DA002001F091F8BB68164A0193DF
-:10C2B0009D186B1E9D41010002A81AF035FF049ED7
-:10C2C0002200002130001CF080FD3868EDB2C30769
-:10C2D0000AD433002200290019F0BFF902A90B4843
-:10C2E000F4F700FE07B0F0BD43102000042C00D985
-:10C2F00004200749019F00228F4200D0221AB21861
-:10C3000029001AF001FCE9E75AECFFFFA0920200B5
-:10C31000A6130000F0B50C0087B0012203A96068E5
-:10C32000F6F766FDA3681349039A8B420DD10126E7
-:10C33000049976424C1E01911419049900200D00B5
-:10C34000002D05D119F0D7F90DE014000126F4E70E
-:10C35000094F013DB84208D908481B18581E8341AF
-:10C36000D8B219F06BF907B0F0BD27780002384356
-:10C37000A419E5E7A6130000FFFF3F005AECFFFFFA
-:10C3800070B546007508041C291C281C0EF020FE00
-:10C3900000280BD11649281C0DF0A4FE002808D057
-:10C3A0001449154816F03EFF00F098F9134801F0C3
-:10C3B0000DF8002C11DA002E12D0FF23DB05E31854
-:10C3C0009C22D20593420BD903F03EFA211C0500B2
-:10C3D000043015F0B1FA280070BDE30DDB05EFE77E
-:10C3E000201C0EF00BFE012540000543F3E7C0467C
-:10C3F000FFFF7F7FBA3A030064AB0200D33A030029
-:10C40000F0B50C00002585B0110020001E0000953D
-:10C4100002232A0005F050FF0120AC422BD08442B9
-:10C4200031D13068204226D103230340AB4203D1EF
-:10C430001C4A016891421ED01B4A0240062A06D0BF
-:10C44000002B0DD10268194B92699A4208D103A9B9
-:10C45000F5F7D6F900231A000399F6F77FF80AE0FA
-:10C46000032302001A40022A07D1FF22D2058018B6
-:10C470009843FFF785FF05B0F0BDF6F7FFFA0123FB
-:10C4800040001843F7E703A93068F5F7B9F904004D
-:10C490007068039FF6F7F2FA2B00020039002000C3
-:10C4A000DBE7C0462CB90200070080FF9D1D00009D
-:10C4B000F8B51F000B4B15005918013909780DF01C
-:10C4C00037FC00260400B74204D0013003210DF0F0
-:10C4D0002FFC0600281E01D01CF0CBFC0334A4194D
-:10C4E0002018F8BDAA3A0300F0B58DB00A9214AA3C
-:10C4F000147815AA127806000F000792DA0742D5C1
-:10C500005D100023002D01DA2D236D420693139A4E
-:10C51000079B12992020FFF7CBFF3B6805908342D1
-:10C5200004D219F0C6FE059B30603B6000213768DD
-:10C53000059BFB185A1E11708D4240D00A3C09928F
-:10C5400008920B94129928000DF078FC0B00303300
-:10C55000092901D90B9B5B18089A541E2370079B6D
-:10C56000002B48D000282DD0A7422BD2099B1B1BA3
-:10C57000032B05D1079B013C2370A74222D20994CB
-:10C5800005000894DEE79A0712D1244A19689142FF
-:10C590000ED1079A02940392139A39000192129ACB
-:10C5A00000920A9A19F020F8040020000DB0F0BDA6
-:10C5B0000023326813700A9A34681360F5E79C1EF2
-:10C5C00030232370139B002B05D018001CF051FC66
-:10C5D000201A87421FD3069B002B04D0BC4202D9ED
-:10C5E000069B013C23703368059A9B181B1B0A9A13
-:10C5F000013B1360D9E7A742E4D20028C0D1E1E7AC
-:10C60000C2540133139AD25C002AF9D1069B04006C
-:10C61000002BE5D1E7E70023F4E7C0462CB9020080
-:10C620001300144A10B50400934204D101222000E3
-:10C6300000F0D4FE10BD104A934201D10322F6E768
-:10C640000020072CF6D10D4A1A40062A0ED09A0770
-:10C65000F0D11A680A4CA24208D00A4CA24205D076
-:10C66000094CA24202D0094CA242E3D10A000720A1
-:10C670001900DDE7C4E70200CCE70200070080FFF5
-:10C680000C9A0200A09202004CA0020088E702006F
-:10C69000C4600561466187614146C16149460162E6
-:10C6A00051464162594681626946C1627146816064
-:10C6B00000490847BDC600000020C046024B9A68EA
-:10C6C00002609860002070477C2E0020024B9A6820
-:10C6D00012689A607047C0467C2E00200E4A93680C
-:10C6E000002B01D116F0AAF8196858609160181C47
-:10C6F000C468056946698769C1698846016A8946CF
-:10C70000416A8A46816A8B46C16A8D4681688E4637
-:10C7100001207047FEE7C0467C2E002070B504F073
-:10C720008DF90F4C0F4B0025A3620F4BE56263633D
-:10C7300023002563A83303210C481D60A56403F082
-:10C740003FFC0B4E0121300003F03AFC3000094A57
-:10C75000094919F091F826606660E56570BDC0462C
-:10C760007C2E0020FCA9020044A00200B42E002070
-:10C77000C82E0020760F0000860F000070B506243A
-:10C78000134EC3001C437368002205002100181DCE
-:10C79000FCF7F2F9021E18D1F06D002807D0043022
-:10C7A0002100FCF7E9F9002801D0406870BD0022A3
-:10C7B00021000848FCF7E0F9021E06D12A000649CC
-:10C7C0000648FBF76FFEFFF789FF5068EEE7C046AB
-:10C7D0007C2E0020689D0200E63B0300B0AA020008
-:10C7E0000A4B10B5040018685B6898420AD006210D
-:10C7F000E300194304300022FCF7BEF9002801D001
-:10C80000406810BD2000FFF7B9FFFAE77C2E00203A
-:10C81000074B10B5D86D002801D1064810BD043073
-:10C8200000220549FCF7A8F90028F6D04068F5E792
-:10C830007C2E0020309C0200DE0E00000A00C100A9
-:10C84000062010B5024B0143186819F015F810BD09
-:10C850007C2E0020062110B5034BC0000143186850
-:10C8600019F014F810BDC0467C2E00200A00C1004B
-:10C87000062010B5024B0143586818F0FDFF10BDAB
-:10C880007C2E0020062110B5034BC00001435868E0
-:10C8900018F0FCFF10BDC0467C2E002037B5050007
-:10C8A0000C00062806D10800F6F726FA00280DD05D
-:10C8B0002C483EBDCB071BD54B10042816D80DF0D5
-:10C8C00023FA03154E4E0700002BF1D02648F0E75F
-:10C8D000C0221206934204D18020C00518F0F0FE59
-:10C8E000E7E75B425B0001201843E2E7DB43F9E73F
-:10C8F00002281AD11D4B0B40062B08D08B0714D1F0
-:10C900000A681B4B92699A420FD1486802E0C80836
-:10C9100019F026F8002806D101A92000F4F752FBEF
-:10C92000019904F079F84300DDE72000F5F7BEFF38
-:10C930004369002B0DD10F4BAD002000ED5815F0D1
-:10C9400076FE2A0003000C490C48FBF7ABFDFFF70D
-:10C95000C5FE2100280098470028AAD1EBE708006F
-:10C96000A7E7C046C4E70200CCE70200070080FF4B
-:10C970009D1D000094B80200723C030090AC0200C0
-:10C98000F7B50400019116001F00F5F78FFF056948
-:10C99000002D09D1200015F04AFE06490200064884
-:10C9A000FBF780FDFFF79AFE3B0032000199200063
-:10C9B000A847FEBD8739030090AC0200F8B50E0011
-:10C9C00015001C00930714D113681E4A934202D12C
-:10C9D0006B682360F8BD1C4A934207D1002802D03F
-:10C9E000F5F764FF06006B6848C4F3E7174A934203
-:10C9F00001D12560EEE75A68022117008F431449E0
-:10CA00008F4202D013498A42F3D1002817D1124A2B
-:10CA100093420BD0114A934208D0114A934205D059
-:10CA2000104A934202D0104A934208D10C2019F0C8
-:10CA300040FC0E4B4660036085602060CAE72560BD
-:10CA40006060C7E7E0B70200A4B7020058B8020070
-:10CA5000450200001A0200003CEA020078EA0200E7
-:10CA6000B4EA0200F0EA02002CEB020070B9020006
-:10CA7000F8B500231360536006000D001400F5F7AD
-:10CA800015FFF92307005B009D4205D1836A002B47
-:10CA900002D00F4B48C4F8BDFB69002B04D0220024
-:10CAA000290030009847F6E7B86B0028F3D006213C
-:10CAB000ED00294304301A00FCF75EF80028EAD0A4
-:10CAC0004268230039003000FFF778FFE3E7C046F3
-:10CAD000F89C020070B5160004000D00FFF7C8FFB7
-:10CAE0003368002B15D10B4EA3070BD10A4B2268DC
-:10CAF0009A4207D12B00626808493000FBF7D2FC4C
-:10CB0000FFF7ECFD200015F092FD2B000200044918
-:10CB1000F3E770BDE0A7020058B80200FF3B030036
-:10CB2000263C030073B504000D001600F5F7BEFEA9
-:10CB3000C369002B09D004220196009229006A469D
-:10CB400020009847009B002B0AD0200015F06FFDB5
-:10CB50002B00020003490448FBF7A4FCFFF7BEFDCD
-:10CB600073BDC046263C0300E0A7020073B5040075
-:10CB70000D00F5F79BFE174B426A06009A4226D03D
-:10CB8000002D03D1102019F094FB0500736A002BCF
-:10CB900012D1E6216A46FF312000FFF769FF009BB2
-:10CBA000002B0FD1200015F042FD0B4902000B486D
-:10CBB000FBF778FCFFF792FD29002000984700283A
-:10CBC000E7D076BD29006846FCF742FDF9E7200072
-:10CBD000F7E7C0465B260200953B030090AC0200DD
-:10CBE00037B50400F5F762FE856A002D02D02000FB
-:10CBF000A8473EBDF9216A4649002000FFF738FFEB
-:10CC0000009B002B05D06A462900280017F0D6FEAD
-:10CC1000EFE7200015F00BFD034902000348FBF786
-:10CC200041FCFFF75BFDC046C73B030090AC020030
-:10CC300030B505008FB003F0A3FE2800F5F736FEEF
-:10CC4000846A002C05D02800A047040020000FB003
-:10CC500030BDF9216A4649002800FFF709FF009B13
-:10CC6000002B16D002A8FFF713FD002807D16A4653
-:10CC7000010017F0A3FE0400FFF728FDE6E7039B81
-:10CC800008491868FFF728F80028DFD10398FFF754
-:10CC900025FD280015F0CBFC034902000348FBF7F3
-:10CCA00001FCF4E7DCAB0200C73B030090AC0200E0
-:10CCB000F0B513688FB00793002800D073E004002C
-:10CCC000131D0393FF220B00090A13401140019327
-:10CCD0004B000693069A019B05919B18039A9B00B3
-:10CCE000D2580492039AD3185F68381E09D00020E6
-:10CCF000BB0706D1944B3A689A4202D1380018F02B
-:10CD0000B8FD059B1818049B4600002B50D1019BD1
-:10CD1000581C83199800009319F0CBFA26000500DF
-:10CD2000002C01D001260460019BB0009A00281855
-:10CD300003991CF02EF8019B9B190293029B98000B
-:10CD4000059B2818DA00019B9900039B59181CF0D9
-:10CD500020F8029A069B944663440193002F12D058
-:10CD600003243C4000D0A9E0774B3A689A4200D0B7
-:10CD7000A4E0380018F095FD0323060000937368C3
-:10CD80009C4200D27DE0019B029A02999A1A5208B5
-:10CD90002B000798FFF7F4FD0400280019F0B8FAFB
-:10CDA00020000FB0F0BD130008330393546889E7E7
-:10CDB000049B9B072FD1049B644A1B68934202D0BB
-:10CDC000634A934227D10AAA09A90498F5F7F8FE05
-:10CDD000099B581C019BC01883199800009319F0F7
-:10CDE00068FA26000500002C01D001260460019B92
-:10CDF000B0009A00039928181BF0CBFF019B0A99F9
-:10CE00009819099B80009A0028181BF0C2FF019B0B
-:10CE1000099A9B1890E7019B181D831998000093AD
-:10CE200019F047FA26000500002C01D00126046005
-:10CE3000019BB0009A00039928181BF0AAFF019BE0
-:10CE40000AA99B1904980293FFF790FE029B049095
-:10CE50009C000498FFF7ECFE061E00D16EE7009BD5
-:10CE6000029A934207D8D900280019F040FA050029
-:10CE7000009B5B000093029B2E510133029304340C
-:10CE8000E7E7B368E700D859002815D0042813D085
-:10CE9000009B184205D12F4B02689A4201D115F030
-:10CEA000BAFB019B019A9B00E85002320192B268E2
-:10CEB000EB18D7197A685A60013460E70AAA264944
-:10CEC0003800FFF707FE00210AAA080017F076FDD8
-:10CED0000021FFF74BFE019B03909E000398FFF794
-:10CEE000A7FE041E00D14EE7019B009A01339A422F
-:10CEF0000BD853000093042B01D204230093009B12
-:10CF00002800990019F0F3F9050003231C4207D10A
-:10CF1000104B22689A4203D1200015F07CFB0400DC
-:10CF2000E6210AAAFF313800FFF7D4FD0AAA002142
-:10CF300001200C9417F042FD019BAC510233019388
-:10CF4000AB1958600836C9E774C202004CA0020051
-:10CF500088E702000C9A02006B02000070B50C001A
-:10CF600086B0160083071CD10368204A934202D082
-:10CF70001F4A934215D102AA01A9F5F721FE019B90
-:10CF8000A3422CD31BD80023029DA000A34201D1B1
-:10CF900006B070BD9900421A043AAA580133725083
-:10CFA000F4E702A9FFF7E2FD002305000193019BCE
-:10CFB0002800A34206D3FFF73BFE0028E8D022005A
-:10CFC0000C490EE0FFF734FE002808D0019A0A4908
-:10CFD000A31A5B189B00013298510192E7E7019A6E
-:10CFE00006490748FBF75EFAFFF778FB4CA0020002
-:10CFF00088E70200B33C0300FFFFFF3F903C0300C3
-:10D0000008AD0200F7B5FF240E00090A26401500FE
-:10D010000C40830731D10368384A934202D0384A22
-:10D0200093422AD101AA6946F5F7CAFD009833193F
-:10D0300083425BD883009C46002301999A00A34257
-:10D040000FD1B400801B0919C01AAD1819F008FDE2
-:10D05000019B28601C190023013601339E4207D131
-:10D06000F7BD6746BF1A043FCF590133AF50E5E71C
-:10D070009A0051426158A950EFE70021FFF776FD71
-:10D08000002307000093009BB34218D3002108003F
-:10D0900019F0E6FC06003800FFF7CAFD011E1BD19F
-:10D0A000B168A14222D3A3008A00EB181E60AA181F
-:10D0B000091B9D4214D1300019F0EEFCD0E7380076
-:10D0C000FFF7B6FD002811D0009AB31A1B199B0078
-:10D0D000013258510092D6E7300007F07DF8DAE7C8
-:10D0E000F468D01A2058043B1860E2E7009A05491A
-:10D0F0000548FBF7D7F9FFF7F1FAC0464CA002004C
-:10D1000088E70200903C030008AD0200F0B591B042
-:10D110001D0006000C001700F5F7C8FB334B9842C2
-:10D1200007D12B003A002100300004F0E3FA11B0DF
-:10D13000F0BD826A2E4B002A08D09C4230D13000CC
-:10D14000904728600028F2D00120F0E79C4227D1C8
-:10D15000F92101AA49003000FFF78AFC019B002B4E
-:10D160000DD1D72101AA49003000FFF7B3FC039489
-:10D1700001AA0021012017F021FC2860E4E704A89F
-:10D18000FFF786FA002807D101AA010017F016FC64
-:10D190002860FFF79BFAD7E7059B2B600220C6E7C4
-:10D1A000002CDED13800F5F781FB1249FEF794FD23
-:10D1B00001AA00280ED010493000FFF759FC019B4E
-:10D1C000002B10D001AA2100200017F0F7FB2860E7
-:10D1D0002000ACE709493000FFF74AFC019B002B17
-:10D1E00001D00397C4E72F60D8E7C04634D20200CD
-:10D1F000E4B30200D0A8020019020000CD02000032
-:10D2000010B50400FBF794F9002808D00023200093
-:10D210001A001900FFF7B4FB0400200010BD200025
-:10D2200016F004F80028F8D10249034815F0FAFF77
-:10D23000F2E7C046483C030090AC02007FB5C30053
-:10D2400006201843054B01900491052001A9029383
-:10D2500003930592FAF72AFB07B000BDE4B302007E
-:10D260001423F0B58DB000AFFA1805000C00FFF7DD
-:10D27000FFFBBB69002B06D022002C492C48FBF792
-:10D2800011F9FFF72BFA786900284CD1280015F026
-:10D2900065FE0028F0D01423F821FA182800490070
-:10D2A000FFF7E6FB10227869B918F4F7A9FAB8601D
-:10D2B000200018F05AFB6A463E69B968731C7B600F
-:10D2C000C318FB600E33DB08DB00D31A9D466D46A6
-:10D2D000320028001BF05DFD2E23AB557B6820003B
-:10D2E000EB18BB6018F046FB0600200018F03DFB71
-:10D2F00031000200B8681BF04CFDF968280003F00B
-:10D30000DBFBC300062018430A4B10223B627B6202
-:10D31000094BBA18BB620123FB620B33F861D118C9
-:10D320000520FAF7C3FABD460DB0F0BDB13B0300CE
-:10D330000CA90200E4B30200CCE70200F0B5174CE0
-:10D340000F00616895B003912168060008A8049158
-:10D3500062602360FFF79CF9051E06D0039B0998C5
-:10D360006360049B2360FFF7B9F933683A0031002A
-:10D3700005A8019304F06EFC2B002A00019905A872
-:10D38000FDF740FF17F00BFB0500FFF79FF92800A2
-:10D39000039B6360049B236015B0F0BD7C2E0020CE
-:10D3A00010B5040000F004FD031E054802D0054935
-:10D3B00017F040FB22000449FBF774F8FFF78EF9E1
-:10D3C00074AA0200043B03002D3B0300010010B5CA
-:10D3D000014817F02FFBC04608AD0200F0B58BB036
-:10D3E00004900F000392202803D191420FD0AF4E3A
-:10D3F000BFE0049B1B2B01D01E2B0DD103993800DD
-:10D40000F5F7EAFA049B002803D01B2BEFD1A84EB6
-:10D41000AFE01B2BFBD1EAE7049B212B3FD1039804
-:10D42000FBF786F8002806D00399380015F004FFB2
-:10D430000028ECD1DBE70324039B1C4005D1039AB1
-:10D440009C4B126805929A4223D0049B9A4A9B00F7
-:10D4500038009C5815F0EBF80500039815F0E7F834
-:10D460002B000090220095499548FBF71BF847E1F7
-:10D47000039AA300D3189D682800FBF759F80028E9
-:10D4800000D158E12900380015F0D6FE0028BED1A1
-:10D490000134039B5B680593A342E9D8A7E7012603
-:10D4A000314200D116E1039B4D101E4000D1E7E050
-:10D4B0005C10049B1D2BC8D818000CF02FFC1E001C
-:10D4C00028002A002D0045004C004E0050005D0051
-:10D4D00066007B008300B4001E0028002A002D0097
-:10D4E00045004C004E0050005D0066007B0083004C
-:10D4F000CC00D000C6FFD400D80025432E00700019
-:10D500000300734000D5B6E00126064331E06540D4
-:10D51000F4E72C402600F2E7002C02DA6948FFF716
-:10D5200055FF1F2C08DC684B2341AB4204DBC023B2
-:10D530001B062341AB4205DDE917280018F0B1F8BE
-:10D5400007004BE0A540D9E7002CE7DB1F2C00DDEE
-:10D550001F242541D2E72E19D1E72E1BCFE721004A
-:10D560002800FAF751FC0028E6D1012665436D003A
-:10D570002E4330000BB0F0BD002C00D1DDE02100C7
-:10D58000280015F07DFD0600B9E7002C00D1D4E09D
-:10D5900028000DF053FD051C20000DF04FFD011C6F
-:10D5A000281C0DF047F8032302269843474B0643F7
-:10D5B000F618DEE7002C00D1BFE02100280015F0AE
-:10D5C0004FFDE0E72F00002C2ADA28000DF036FD91
-:10D5D0000323022798433D4B0743FF183800F5F714
-:10D5E00065F98369002B00D12FE7039A390004986D
-:10D5F000984756E001231C4206D039003000FAF764
-:10D6000003FC002898D17E43012C00D177E7390034
-:10D6100038006410FAF7F8FB002800D08CE77F434D
-:10D62000002CE7D16BE7002C00D186E0002102201E
-:10D63000F9F720F821000600280015F021FD012748
-:10D6400040003843B0602100280015F009FDB840C3
-:10D650000743F7608DE7A54200DAD8E6C7E6A542A2
-:10D6600000DDD4E6C3E6A54200DCD0E6BFE6A54275
-:10D6700000DBCCE6BBE6300018F022F8060078E7C5
-:10D680000323039A1340022B24D1114B1340062B82
-:10D6900020D028000DF0D2FC039A011C0498FBF75F
-:10D6A000E9F8061E00D064E7CFE6C046C4E70200F2
-:10D6B000CCE702004CA002000CB70200703B030054
-:10D6C00090AC02005B3B0300FFFFFF3F0000808047
-:10D6D000070080FF049B1F2B00D07FE70398F5F71E
-:10D6E000E5F883690400002B0CD1636A002B11D18B
-:10D6F000039814F09CFF134902001348FAF7D2FE76
-:10D70000FEF7ECFF3A00039904989847061E00D0F4
-:10D710002FE7EAE706A90398FFF728FA040020009C
-:10D72000FFF786FA002800D161E63900F5F754F9D1
-:10D730000028F4D06BE6039587E60449044817F007
-:10D7400079F9C046953B030090AC0200E40D03005C
-:10D7500044AD0200010010B5014817F06BF9C04656
-:10D7600090AC0200F8B504000D0017001E0000295F
-:10D7700008D01868F5F79AF86368834202D0054824
-:10D78000FFF7E8FF33003A002900A068FFF7F8F838
-:10D79000F8BDC046EC3A030001214000014310B53A
-:10D7A000024815F038FDFEF799FFC04628AB02008D
-:10D7B000010010B5014817F03DF9C046ECAA02007F
-:10D7C00010B5034A0349044819F024FB034810BD6F
-:10D7D000B33D0300590D030084E80200E4B30200E6
-:10D7E00010B5034A0349044819F014FB034810BD5F
-:10D7F000DB3C0300590D030084E80200E4B302009F
-:10D80000F7B50600194D0C00280013F023F931007C
-:10D81000174813F0A5F8174813F01CF9164813F031
-:10D8200019F9FF239B00E61821787F2901D0A64231
-:10D8300006D1280013F00EF9104813F00BF9F7BDCC
-:10D840006278A37850290CD80D48475C0D48405C9D
-:10D85000019300923B0002000B4813F081F804345E
-:10D86000E2E70A4813F07CF8F9E7C046AA3F030054
-:10D87000D73F0300DF3F0300683F0300863F0300FC
-:10D88000940C0300430C03000040030023400300FA
-:10D89000F0B51D0087B006001A4817000C0013F001
-:10D8A000D9F82900184813F05BF8184813F0D2F89B
-:10D8B000174813F0CFF8AD006519AC4204D11148F8
-:10D8C00013F0C8F807B0F0BD3878A278049020684B
-:10D8D00023780003400E0390E0789B060009029035
-:10D8E00020883178C004400E0190E0789B0E00073C
-:10D8F000000F00901209074813F032F80434013683
-:10D900000137DAE7AA3F0300F73E0300243F030094
-:10D91000563F0300883F0300F7B50020214A224EFE
-:10D9200012783368111D4900CC5A5F18598801904C
-:10D93000A020C00584466405640D4C431B49A41215
-:10D940000968787807270500BD43F82D1DD001250B
-:10D95000C00885402800A1256746ED0001327851B6
-:10D96000D2B2101D4000C55A1F186D0558886D0DA4
-:10D9700068438012001BE4D00A4C2270019A002AEE
-:10D9800002D00A4A33601160FEBD6046084A5C68F6
-:10D990008450002903D001220B00002101920A00CB
-:10D9A0000C00DEE7312E0020BC2A0020C02A002017
-:10D9B0000C05000010B572B600220F4B18681A60F3
-:10D9C00062B6904210D10D4B0D4A1B680D48934230
-:10D9D00000D010001A7802705A8842805A6842605B
-:10D9E000002219788A4200D310BD510044185918FA
-:10D9F000098901322181F4E7C02A0020BC2A0020D5
-:10DA0000C42A0020F42A0020044B054A1A6000238F
-:10DA1000044A1360044A13707047C046BC2A0020B1
-:10DA20004CBA0200C02A0020312E002010B5782206
-:10DA30000249022000F068FF10BDC04619D900005D
-:10DA4000421E084BFF3A10B504009A4207D8FFF770
-:10DA5000B1FF054B241144801860002010BD012047
-:10DA60004042FBE740410F00C02A0020044B1B68E6
-:10DA7000002B01D1034B1B68588800017047C0463A
-:10DA8000C02A0020BC2A0020F7B53D4A04000D0042
-:10DA90000B00914200D913008022D200D31A0193C7
-:10DAA000FFF788FF0122A24046680092164207D184
-:10DAB0002300A0210327C133FF339B00C9055F501A
-:10DAC000002703789F4206DB002D01D0132B0BD9D2
-:10DAD0002C4B1860F7BD391D490042185278D20806
-:10DAE000A24243D00137EDE7009A191D324342604C
-:10DAF000019A490055050A5A6D0DD20AD2022A43ED
-:10DB00000A525205E400520F4118144301334C707D
-:10DB10000370851C012225E0009A013BDBB296438D
-:10DB200003704660BB42F4DD04335B001B5A0B52AA
-:10DB3000EFE72F00131D5B00195A2E894905490D87
-:10DB4000531E1C1D6400245A6405640D8C4204D9C4
-:10DB5000FC88023F7C81013BF3D205335B001E52FF
-:10DB60000132023503789A42E3DBB1E7002DD3D0CE
-:10DB7000019B5A050B5A520DDB0ADB021343D6E711
-:10DB8000FF030000C02A002070B500210400FFF749
-:10DB90007BFF00210D4B18680578A94200DB70BDA2
-:10DBA0000B1D5B00C3185A78161CD208944201D092
-:10DBB0000131F2E70822524232435A700123A02178
-:10DBC000A340034AC9058B50E9E7C046BC2A0020A0
-:10DBD0000C05000010B50C0017F0AFFD631E1842D5
-:10DBE00007D00200230003490348FAF75BFCFEF765
-:10DBF00075FD10BD4440030008AD020010B54A6831
-:10DC00000249D20019F006F910BDC0466C4003006D
-:10DC100070B50B0006001400101E0FD071681800BC
-:10DC2000042A0ED1FFF7D6FF7368012B03D0022B15
-:10DC300005D0006800E0007817F042FD70BD008854
-:10DC4000FAE7FFF7C7FF05002000F4F743FF72680B
-:10DC500003000548012A03D0022A03D02B60EDE718
-:10DC60002B70EBE72B80E9E7E4B30200F7B52D4F0B
-:10DC7000B43701972B4A2C49FC32536C8B4200D8A5
-:10DC8000F7BD0325043B53641A68264B501CAC3384
-:10DC90001E6804008108715C2C4064002141831AD5
-:10DCA000294001300229F4D00326019912010968A4
-:10DCB0001B018A181B499B08002BDBD00F2014681E
-:10DCC000044229D119480068A04225D80D00B83572
-:10DCD0002D68A54220D9241A200900900800AC30F4
-:10DCE0000068A409009D0419207835406D00844621
-:10DCF0002841304001280FD13700AF403D00674632
-:10DD00003D4325700D00FC356C6C094FBC4206D2BA
-:10DD1000201D686400982060013B0432CCE70C00B1
-:10DD2000BC34F8E77C2E00203C2F0020302F002050
-:10DD3000BC2F00200F23994370B506000D00081A70
-:10DD400041210BF0F5FF0F4C02002300B0331860A7
-:10DD500023002100AC331E608301EB1AB4310B6049
-:10DD600023003000B83300211D601BF02EF8802303
-:10DD7000FC345B020122A36400235242E364226567
-:10DD8000636570BD7C2E0020A222034952008B5A8D
-:10DD900001338B527047C0467C2E0020A2220349DB
-:10DDA00052008B5A013B8B527047C0467C2E00209C
-:10DDB000A223034A5B00D05A431E9841C0B2704769
-:10DDC0007C2E0020F7B50400032589004318019339
-:10DDD000019B9C4200D1F7BD0F232168194229D134
-:10DDE000184B1A00B43212688A4223D81800B8308F
-:10DDF000006888421ED9891A1A000F093800AC320F
-:10DE00001268890951180A78284040009446024156
-:10DE10002A40012A0ED12E0086403000664630434B
-:10DE200008701800FC30416C074EB14206D20B1D41
-:10DE300043640F60FFF71AFF0434C9E7BC331A606C
-:10DE4000F8E7C0467C2E0020BC2F0020A22210B58F
-:10DE500008485200835A0100013383520300002214
-:10DE6000FC33BC310A60DA64034A27215A64FFF7A5
-:10DE7000A9FF10BD7C2E00203C2F0020F8B5032602
-:10DE80002E4C00252200BC321368AB4213D1022273
-:10DE90001900032794462200B03212689200914282
-:10DEA0002AD323000022FC335A654532FF32A35A9D
-:10DEB000013BA352F8BD23001560214AFC335A648C
-:10DEC0002300B0331B689B009D42D9D22200AC32A4
-:10DED0001268AB08D35C2A00324052001341334031
-:10DEE000032B07D12200FC32536C191D51641D60B5
-:10DEF000FFF7BCFE0135E3E72000AC3000688A087C
-:10DF0000801802780D0016003D406D002E413E4005
-:10DF1000022E09D0032E0BD0012E07D13B00AB40BF
-:10DF20009A430270012301E0002BF7D10131B2E7DF
-:10DF30006346AB409A4302700023F7E77C2E002033
-:10DF40003C2F0020334BF0B51A001900B832B43121
-:10DF500009681268521A1900B0331E680260032360
-:10DF60000022AC310F68140011009C4642608260B0
-:10DF7000C260026142618261B60065468B08FB5C4B
-:10DF80000D406D002B4165462B404568012B33D079
-:10DF9000002B2BD0022B32D001318E420AD06546A5
-:10DFA0008B08FB5C0D406D002B4165462B4001D07A
-:10DFB000012BE2D1012C26D1056901350561856966
-:10DFC000A54200D284618E4201D0012BD5D1C36815
-:10DFD000934200D2C2608E4206D143681B01436067
-:10DFE00083681B018360F0BD0022C6E784680132AC
-:10DFF000013484601C00CFE701354560FAE7013544
-:10E0000045600134C8E7022CD9D145690135456125
-:10E01000D5E7C0467C2E0020F7B50F3003090193E9
-:10E0200002D100242000FEBDA223474A5B00D35A40
-:10E03000002BF6D14733FF33D35A5E425E41002BAB
-:10E0400007D0414BFC33DA6C1B6D9A4201D306F0CA
-:10E0500071F8002430213F273B4A3B4BB032126815
-:10E06000FC339446384A5B6DAC3210689C4505D849
-:10E07000002ED6D106F05EF80136EBE70325C25C30
-:10E080002A4231D1019D0134A5422ED89B00191B93
-:10E090004E1C5A1C012C03D12B4C9708FC3467658D
-:10E0A000B40800190324270037407F00A446023C2F
-:10E0B000BC40077802313C43234F0470AC378B429D
-:10E0C00034D22149204DB431FC350C68E96C330160
-:10E0D0008C46E418019B921B63441201002120002E
-:10E0E000EB641AF072FE9DE700240C252A4206D14B
-:10E0F000019D0134A54203D89B000133C7E70024EA
-:10E100000A4206D1019D0134A54203D89B00023387
-:10E11000BDE70024BA4306D1019A0134A24203D8D4
-:10E120009B000333B3E7002401339FE73C68880872
-:10E130002018644602250C406400A5402C00057898
-:10E1400001312C430470BAE77C2E0020A22230B5A6
-:10E15000164B52009A5A002A26D1002824D01A00C1
-:10E16000B4321268801A1A00FC32546D0109800919
-:10E17000A04200D25065AC331800032204688B081B
-:10E18000E3180C00150014406400A5401C78013110
-:10E19000AC431C7004688B08E35C0C001440640002
-:10E1A00023411340022BE9D030BDC0467C2E002015
-:10E1B0000F2203000240002070B5824228D1154C86
-:10E1C00010002100B4310968994221D82000B830EC
-:10E1D000056810009D421BD9AC345B1A24681909EC
-:10E1E0009B09E55C0800032318404000054110002E
-:10E1F0001D40012D0CD14D1C2E00AA08A25C1E4012
-:10E2000076003241681A1A400135022AF4D0000122
-:10E2100070BDC0467C2E0020F0B585B007000D0013
-:10E220000292002807D101002800FFF7F5FE060042
-:10E23000300005B0F0BD002903D1FFF787FF2E00A5
-:10E24000F6E70F2100260140B142F1D153480E00FC
-:10E250000300B4331B68BB42EAD80200B83212682C
-:10E26000BA42E5D9FB1A1A0900920200AC321268D0
-:10E270009B090192D25C0323009C23405B001A415E
-:10E2800003231A40012AD3D14233FF33C35A002B50
-:10E29000CED129000F310909B0308C460168032620
-:10E2A00089000391210014000131039A914212D296
-:10E2B00001988A08825C08003040400002413240E8
-:10E2C000022A02D101340131EFE7002A03D10133E0
-:10E2D000E2186245F7D3644501D13E00A8E76445E2
-:10E2E00021D9009B032663441900009B0800E21813
-:10E2F000AC239C46294B9C44634605001B6884085C
-:10E300001C19330035406D00AB40257801309D432A
-:10E3100025709042F0D1214B8908FC335A6D91420F
-:10E32000DBD25965D9E71B19634523D303250226A0
-:10E330001A49009BAC31E3180191009A62449A4259
-:10E3400009D86346191B090120010A003818002169
-:10E350001AF03BFDC1E70199180009689A088A186C
-:10E360003100284040008140080011780133084303
-:10E370001070E2E7029E002E00D159E7002128002C
-:10E38000FFF74AFE061E00D152E7220139001AF0BB
-:10E3900000FD3800FFF7DAFE4AE7C0467C2E002079
-:10E3A00010B58CB005A8FFF7CDFD079B0A4C039371
-:10E3B0000093059A069B0949200018F02BFD089B45
-:10E3C000099A01930B9B06490393009320000A9B33
-:10E3D00018F020FD0CB010BD84E80200BB40030023
-:10E3E000DE400300F8B5434E434F3300B4331A68A0
-:10E3F0004249380018F00EFD00243300B0331B688A
-:10E400009B00A34223D93F2214422CD13200250085
-:10E41000AC3210680321AA08825C294049000A41F5
-:10E4200003210A4202D10135AB42F3D12A1B7F2AD4
-:10E4300012D992093249380018F0ECFC2C003F2325
-:10E440009C433300B0331B689B00A34204D83800C0
-:10E450002C4918F01EFCF8BD2B4B22011A402B4909
-:10E46000380018F0D7FC3200AC321268A308D35C35
-:10E470000322224052001341032213403A32022B5E
-:10E4800031D03032032B2ED03F3A012B2BD1330029
-:10E49000B4331B682201D3581D4954228B4222D029
-:10E4A0001C49083A8B421ED01B49083A8B421AD0AD
-:10E4B0001A490F328B4216D019498B4213D0194991
-:10E4C000123A8B420FD018498B420CD017490532B3
-:10E4D0008B4208D01649043A8B4204D015492632A3
-:10E4E0008B4200D11B3A1449380018F093FC0134D8
-:10E4F00083E7C0467C2E002084E802007C400300B5
-:10E5000097400300654F0300F0FF0F00B340030086
-:10E510004CA0020088E7020074C202000C9A0200BC
-:10E52000A092020030B30200F4B2020088B00200F0
-:10E5300000EA020098B1020082000300C379024899
-:10E54000002B00D101487047CCE70200C4E702006D
-:10E5500010B5F4F7A7FE014810BDC046E4B30200B1
-:10E5600010B50868F4F79EFE004810BDE4B3020041
-:10E5700073B50D00022836D1012601A96868F3F7AA
-:10E580003FF976423400019BC318834212D101A99E
-:10E590002868F3F735F97342734162426241DBB296
-:10E5A000D2B20199F4F7C2FF002820D110491148D6
-:10E5B00016F040FA0278722A01D0772A06D1611C3F
-:10E5C0000ED1723A544254410130DEE7622A01D042
-:10E5D000742A05D1711C03D1743A56425641F3E7AF
-:10E5E0000548FEF7F3FE012676423400CFE776BDFC
-:10E5F0001B04030028AB02002341030007224368E9
-:10E6000004481B791340044AD35C002B00D0034814
-:10E610007047C046CCE70200DA000020C4E70200E1
-:10E6200010B50124037A05499B005A580448224238
-:10E6300000D10448A243CA5010BDC046242B00207C
-:10E64000CCE70200C4E7020070B5037A064C05006F
-:10E650009B001859400817F033F801222B7A9B00D1
-:10E6600019590A401A5170BD242B002030B5A2223E
-:10E67000A025D200ED05AA580723CA401100164C68
-:10E680000340E056421EC90700D5421C022A0ADC9C
-:10E69000002082421ADB1149CD5C854201D0C8546A
-:10E6A0000230E25430BD072A09DD0C2A10DC0B4988
-:10E6B0000320CD5C002DF4D10238C854F1E707499E
-:10E6C0000320C95C0029ECD10800EAE70200E8E772
-:10E6D00003200C22E5E7C046E2000020DA0000201B
-:10E6E0001D4B70B559791879FFF7C0FF022805D185
-:10E6F0001A490B689A1C012313430B60184B597974
-:10E700001879FFF7B3FF022805D114494B689A1C0A
-:10E71000012313434B60134C2000FAF79DFB124D6D
-:10E72000A84203D161792079FFF7A0FF0F4C2000A8
-:10E73000FAF792FBA84203D161792079FFF796FF9F
-:10E740000B4C2000FAF788FBA84203D161792079AD
-:10E75000FFF78CFF70BDC0461CA30200242B0020D5
-:10E76000BCA20200ACA2020020B20200F4A202008D
-:10E7700004A30200072203791340014AD05C7047CA
-:10E78000DA0000208022044B52001A600123034A61
-:10E790001360034A1360704700E100E00C8C0040F6
-:10E7A000008000408022054B5200DA67044BFF3A9C
-:10E7B0005A600022034B1A607047C04604E100E033
-:10E7C000008000400C8C004070B5002501261E4BD7
-:10E7D0001E4C1D601E4B18601E4BE650C046FFF7D6
-:10E7E000E1FF1D4B1D4AE660E25002221C4BFF2058
-:10E7F000E5500433E25008339218E250C1238022DE
-:10E800009B001203E250053BFF3BE550C22440222F
-:10E81000144BA400195981430A4380211A510C3426
-:10E820001A5909061202120A0A431A51C022043464
-:10E83000195981430A431A51802212041A60802216
-:10E8400052041A6070BDC046D02F002000800040E6
-:10E850003C2B0020FC0F00004C050000701700004E
-:10E860000405000000E100E070B51F4C1F4D636C13
-:10E87000002B0AD0002363641D4B1B689847A82314
-:10E88000DB00EA5800018018E850A36C002B09D087
-:10E890000023A364164B5B689847164B0001EA58A7
-:10E8A0008018E850E36C002B0AD00023E364104B7F
-:10E8B0009B689847A923DB00EA5800018018E850BC
-:10E8C000236D002B0ED000230B4A2365AB580B4958
-:10E8D0005B18AB500A4A1368063313608022094B59
-:10E8E00012045A6070BDC046FC80004000800040A9
-:10E8F0000C000020440500004C05000070170000CB
-:10E90000D02F0020FCE100E0F7B50191032823D8C7
-:10E91000134B8000C758C223124D9B00EF500123B8
-:10E9200044192364A8230F210F4EDB009C46E358B3
-:10E93000AE59921BD218D3170B409A1801990B4B62
-:10E940001211C150C1239B00EF50634600200132D9
-:10E9500012019619E650FEBD01204042FBE7C04679
-:10E9600084BC0200008000404C0500000C00002028
-:10E9700003280BD8074B8000C158C223064A9B00CE
-:10E98000D150064B064AC250002070470120404239
-:10E99000FBE7C04684BC0200008000400C00002061
-:10E9A000494A020010B5024B1B68984710BDC0468B
-:10E9B0003C2B002010B50024054AA1008B58002BE9
-:10E9C00002D00020885098470134042CF4D110BDA7
-:10E9D0002C2B0020074A89008B58002B06D1885029
-:10E9E00080211800044A49045160704701204042C8
-:10E9F000FBE7C0462C2B0020FCE100E0F8B50E0040
-:10EA000005001400FFF7CEFE330003272B433B42E3
-:10EA10000BD1BC4209D9A208310028000AF0AEF897
-:10EA20002300BB43ED18F6183C40002C04D0220014
-:10EA30003100280019F0D7FD80220449D2008B58FC
-:10EA4000002BFCD0FFF79EFEF8BDC04600E0014061
-:10EA5000F0B5060000248BB0194B1A48E15804F0B9
-:10EA600001F803AFE05104341C2CF5D11423002429
-:10EA7000734301930025AB00F958134816F0ACFC22
-:10EA80000135300014F025FE072DF4D1013DAB0017
-:10EA90000D48F95816F0A0FC300014F01AFE013DA4
-:10EAA000F5D20134082C03D100F0D4FD0BB0F0BD39
-:10EAB00001231C42DED1019814F00BFEDAE7C046B8
-:10EAC000F0BC02002CB502001C00002010B519207B
-:10EAD000FFF7BEFF004810BDE4B3020070B515009B
-:10EAE000040016F016F82A000249200015F0CFFFA6
-:10EAF00070BDC046F54A020070B543790D00002490
-:10EB0000032B06D9836A074C9200E41AC369D358D1
-:10EB1000E418032115F0EEFF447024120570847090
-:10EB200070BDC046FD7F0000F7B500230400617191
-:10EB300083608371E260036101330F00150043615C
-:10EB4000032906D80121836949429A00C0691AF055
-:10EB50003CF90023A3622362AA8BEB8BD218002A14
-:10EB600000D10132384E2000310015F090FF2A8C80
-:10EB70003100200015F08BFFE3682000197D15F0AF
-:10EB8000B2FFE3682000997D15F0ADFFE368200037
-:10EB9000197E15F0A8FFE3682000997E15F0A3FF09
-:10EBA000042F27D1636A226A31009A1A200015F0D7
-:10EBB0006EFF3100EA89200015F069FF3100AA8953
-:10EBC000200015F064FF0026AB8CB34217DCFF2158
-:10EBD000200015F09EFF042F35D1EA8A2B8B0237D7
-:10EBE000D31801930023019A9A422CD0AA8C0021B9
-:10EBF000009223E00221200015F068FFD9E7AA6AFD
-:10EC0000F300D3181A78032A03D19978200015F05D
-:10EC100080FF0136D8E70126A86ACA00821850781A
-:10EC200030420AD05088984207D15268D200606BB7
-:10EC300099003A430A500133D5E70131009A8A42DC
-:10EC4000E9DC0222F2E7F7BDCD4A0200F7B5234B1B
-:10EC50000500A8331B680191022B0DD847698F422C
-:10EC60000AD2836A0269CF1B9C1A3B00234304D15A
-:10EC7000AB6A2B61019B6B61F7BD062F01D90F2C8D
-:10EC800018D900941F2C01D91F230093009B002644
-:10EC90009C4203D83E00032F00D9032601212800FF
-:10ECA00015F014FF009A730113430370009BBF1B00
-:10ECB000E41ADAE70A4B3E009F4200D91E00022107
-:10ECC000280015F003FF702233091340F03A224365
-:10ECD0001343037046700094E8E7C0467C2E002082
-:10ECE000FF07000070B50D000121040015F08FFF33
-:10ECF0000E2D14D00F2D17D010210D2D10D017214F
-:10ED0000200015F006FF0322A36A04210333934376
-:10ED1000A362200015F0EEFE044B036003E0112116
-:10ED2000200015F0F6FE70BD1221F9E728900200D0
-:10ED3000F8B5174F05000C0016000F40002A1AD135
-:10ED4000110015F064FF23040FD53221280015F0BF
-:10ED5000E0FE3221280015F0DCFE3221280015F0FB
-:10ED6000D8FE3221280015F0D4FE3A0035212800C3
-:10ED7000FFF7C2FEF8BD3A004621FFF7BDFE7F2334
-:10ED8000210A99433143C9B2280015F0C2FEF1E7C8
-:10ED9000FF7FFFFFF0B5124B87B003AD40C90138CC
-:10EDA00000930195032303F0B7FA68680D4F1E2402
-:10EDB000B84202D014F07EF844B2A8680023B842EA
-:10EDC00002D014F077F843B270680399437104716C
-:10EDD00009F00EFF70680AF075FA380007B0F0BD50
-:10EDE000C0BD0200E4B3020030B5124B8BB003ACDF
-:10EDF00020C9013800930194032303F08DFA616860
-:10EE000006A818F091F9039B089A5900237A0093F9
-:10EE10006868079B08F088FA021E05D00649074873
-:10EE2000F9F740FBFDF75AFC06A90548F2F75AF836
-:10EE30000BB030BDD8BD02003041030028AB02004A
-:10EE4000A092020030B5114B89B002AC20C9013844
-:10EE500000930194032303F05FFA012205A960687F
-:10EE6000F3F7C6FF029B059A5900237A009368685E
-:10EE7000069B08F069FA021E05D005490548F9F716
-:10EE800011FBFDF72BFC044809B030BDF0BD0200BA
-:10EE90004241030028AB0200E4B302000021F8B5B0
-:10EEA0004768080017F0DCFD08250600B1223B6822
-:10EEB000D2009D508022002092001900985001221B
-:10EEC000FC319A6088605A61104A8868002803D132
-:10EED000002A19D0013AF8E70024A24204D00C4AD3
-:10EEE0009C5863425C41E4B238000AF0EBF9002C14
-:10EEF00005D001216B001943300005F06DF9013593
-:10EF0000782DD3D13000F8BD1400EDE710270000B4
-:10EF1000C404000010B5040001F018FD074B020006
-:10EF20001B690749074817F075FFFFF739FA012CED
-:10EF300001D1FFF757FA044810BDC0467C2E0020CF
-:10EF40005541030084E80200E4B3020010B5F3F772
-:10EF500095FDF5F763F8014810BDC046E4B3020023
-:10EF600010B5FEF71BFF014810BDC046E4B3020018
-:10EF700010B5FEF709FF014810BDC046E4B302001A
-:10EF800010B586B0040005AB04AA03A902A801F0DD
-:10EF900003FE059B029A0193049B064900930648D1
-:10EFA000039B17F037FF012C01D101F031FE03481C
-:10EFB00006B010BD6A41030084E80200E4B3020019
-:10EFC00010B5084C002805D1A834236801305B0037
-:10EFD000184310BD0868F3F751FDA83420600248BB
-:10EFE000F7E7C0467C2E0020E4B3020001220100B6
-:10EFF00003001140100000290CD10800990709D125
-:10F000001B68054910008B4204D00448181A43427B
-:10F010005841C0B27047C0462CB90200D4E7020084
-:10F020000023FA21094A89001360094A1370094A2A
-:10F030001360094A1160094A1370094A111D083208
-:10F04000D3670122CB67074B1A707047442B00200F
-:10F05000322E0020402B002018000020332E0020EC
-:10F060007C2E0020342E002010B5084B084A197859
-:10F07000002907D1916C002902D0FFF7D1FF10BD04
-:10F0800030BFF4E700221A70F9E7C046342E0020A2
-:10F090007C2E0020837F0248002B00D1014870475E
-:10F0A000CCE70200C4E702000023A022E02110B553
-:10F0B00083770C4BD2050902D1500B48F9F7EAFED1
-:10F0C0000A48F9F7E7FE0A48F9F7E4FE0948F9F7B4
-:10F0D000E1FE0948F9F7DEFE0848F9F7DBFE0848CB
-:10F0E00010BDC0460C0500000CA3020014A30200D2
-:10F0F00024A302002CA302003CA30200B4A202003D
-:10F10000E4B30200F8B5164C2368002B07D1482061
-:10F1100019F0D5FD0500134908F0F8F925601248EB
-:10F12000124902680B68D21A0123312A04D96233CA
-:10F1300093429B415B420233002201260C4D2E700C
-:10F140002F78032FFCD101329342F8D10368206855
-:10F150000B6018F081FF430001201843F8BDC04642
-:10F16000482B0020D8BE0200D02F00204C2B0020BE
-:10F17000352E002030B50D4C87B02378012B13D1EC
-:10F180000B4B02221D680621002302A818F0EDF89F
-:10F19000082204A9684619F0FCFD039B029A280086
-:10F1A00008F030F90223237007B030BD352E00205F
-:10F1B000482B0020A02010B51049C0054B7F5A1CD9
-:10F1C000002B09D14C8C0E4BA3430E4C03510E4B1C
-:10F1D0004A775200D05A0FE010335B00CB185C889E
-:10F1E000A123DB00C450092AF1D10120FFF7C0FBA5
-:10F1F000FFF7C0FF0120404210BDC0461C000020A8
-:10F20000F01F00000C050000F4F6020073B5041EA8
-:10F2100009D11A4D2B78002B2CD01949194816F01A
-:10F22000DBF82C7073BD184D2B1DDE6FF3F73EFB22
-:10F23000164B2100984214D0154B2340062B05D0C5
-:10F24000A30712D1134B22689A420ED101A92000C4
-:10F25000F2F7D6FA019B012B0CD1007817F01FFBB7
-:10F260000100300016F0B8F8DCE70B490B4813F04A
-:10F27000D9FFA864FFF7D4FED4E7C046332E0020A0
-:10F28000A8E402001C0000207C2E002008E50200FB
-:10F29000070080FF0C9A02001E42030090AC02009F
-:10F2A000F7B5A123A021214AC905DB00CA500123DB
-:10F2B000C27F0D3293401E4A8B50C37F01920133AF
-:10F2C000DBB2032B2FD0C3770200030000212233CF
-:10F2D0003632198002339342FBD10424C17F154F8B
-:10F2E0004D000522EB5D7E195343134A7678D318FF
-:10F2F0009B190126A640B44662461B7901345B0087
-:10F30000C3185E8C063516435E840D2CE9D10122AC
-:10F310000D318A40A023A121DB05C9005A50828EFD
-:10F3200001995A50F7BD0023CDE7C046F01F0000F9
-:10F330000C050000B24103001C00002070B5394BE1
-:10F340008CB01A78022A07D1A0223749D2008A58F5
-:10F35000012A07D003221A70344DAB7F002B03D152
-:10F36000FFF708FF0CB070BD2800FFF799FF304A87
-:10F37000304913680968063313608B4207D30024B1
-:10F380002D4B14601B78012B0FD0022B45D000238E
-:10F390002A8C6B77FF33FF331A42E1D0E1222749F1
-:10F3A000D2000120FFF7B0FADCE7254E331DDB6FFA
-:10F3B000002B04D033000833DB6F002B02D1FFF7A2
-:10F3C0002FFEE4E7FEF7E0FC6846FDF761F9002850
-:10F3D0000CD11C4B1868FDF703FC0400FDF776F90F
-:10F3E000FEF7DCFC2000FFF711FFD0E7FEF7D6FCAC
-:10F3F000019B15491868FCF76FFC0028F2D10198B1
-:10F40000F3F754FA114B984203D11149114817F000
-:10F4100001FD019B0024B364E4E70F49280015F0C7
-:10F42000DBFFCCE7352E0020007000401C000020E0
-:10F43000402B002018000020322E0020B5F10000E3
-:10F440007C2E0020442B0020DCAB020074AA0200BA
-:10F450001609030084E80200A8E40200F0B50024C5
-:10F4600085B0154D02930AAB1B782E1D0700083599
-:10F470000800210001920393F467EC67FDF776FB27
-:10F480000E4B019A18600E4BF7671A60029A0D4BEB
-:10F49000E8671A700C4B1C70FDF7A2FBFFF7B6FE75
-:10F4A00001220A4B1C600A4B1A70039BA34201D035
-:10F4B000FFF7DAFD05B0F0BD7C2E0020442B0020C4
-:10F4C00018000020332E0020342E0020402B002076
-:10F4D000322E0020F0B50024384B8FB01D1D0833AC
-:10F4E000DC67374BEC6709AD80C9013801950093A3
-:10F4F000052302F011FF6B68099C049307942B7B92
-:10F500002E7A05932B7C20000393FFF76FFD2D4D82
-:10F51000002806D103232340022B09D12C40062CBE
-:10F5200006D007AB002201212748F1F75BFD0790C9
-:10F5300007980540062D05D0830730D1224B02687D
-:10F540009A422CD108A9F2F75BF9089B002B23D033
-:10F55000012B0DD1002E0BD1039B002B08D100787D
-:10F5600017F09DF907900799380015F035FF13E063
-:10F57000079803F05FFB079009AB1B7C002B03D0BF
-:10F580000798F5F739FF0790059B049A00930799B0
-:10F5900033003800FFF762FF0C480FB0F0BDF3F7FF
-:10F5A00085F90B4B9842E7D1002E02D1039B002B2B
-:10F5B000D9D007A90120F7F75DF8DCE77C2E002001
-:10F5C00084BF0200070080FF0C9A0200E4B302002F
-:10F5D00008E5020070B51B4B8AB005AD40C9013883
-:10F5E00000930195052302F097FE059C20000494EA
-:10F5F000FFF7FCFC002807D103232340022B0AD18C
-:10F60000114B1C40062C06D004AB002201210F48F0
-:10F61000F1F7E8FC049003A90498F2F7F1F82A7CCA
-:10F620002B7B03990092059A03F0EEFA2B7A0100E6
-:10F630000093300000236A68FFF710FF04480AB007
-:10F6400070BDC046ACBF0200070080FF0C9A0200EC
-:10F65000E4B302000022074B10B51A70064B0232C9
-:10F660001A70064B064A1B68063B1360FFF7FCFC4A
-:10F6700010BDC046342E0020322E0020180000207D
-:10F68000402B002010B5FFF7E5FF014810BDC04634
-:10F69000E4B3020010B5042901D8042A02D90948AC
-:10F6A000FDF794FE092B01D90748F9E705246143CA
-:10F6B00041188A18137101229A40038C1343038462
-:10F6C00010BDC046480903002B420300F8B5486846
-:10F6D0000C000D68F3F7D2F90600A068F3F7CEF935
-:10F6E0000700E068F3F7CAF93A0003003100280088
-:10F6F000FFF7D0FF0048F8BDE4B3020010B50429BD
-:10F7000001D8042A02D90448FDF760FE05235943B5
-:10F7100040188018007910BD4809030070B5104CDE
-:10F72000050021000F48F9F7CBFB21000E48F9F73F
-:10F73000C7FB21000D48F9F7C3FB21000C48F9F77E
-:10F74000BFFB21000B48F9F7BBFB21000A48F9F782
-:10F75000B7FB15F0C7FE01230848AB7770BDC04664
-:10F7600000B202000CA3020014A3020024A30200B2
-:10F770002CA302003CA30200B4A20200E4B30200E6
-:10F7800070B50D00F3F7DEF9041C2800F3F7DAF981
-:10F79000211C0BF059FA051C15F0B1FE011C281CA8
-:10F7A0000BF020F9211C0AF0ABFD0323020002201C
-:10F7B0009A43024B1043C01870BDC04600008080C1
-:10F7C00010B515F09CFE0323020002209A43024B61
-:10F7D0001043C01810BDC0460000808010B5074C13
-:10F7E000002802D00868A04203D106F05DFC20008A
-:10F7F00010BDF3F76FF906F077FCF8E7E4B3020009
-:10F8000010B50400F3F7ACFAF3F738F9002803DC7D
-:10F810000021064815F00EF906F020FC15F050FF07
-:10F82000042201002000F3F7B1FA10BD84A9020000
-:10F8300010B50400082016F03CFD024B4460036044
-:10F8400010BDC046C0C0020010B5102016F031FD3A
-:10F850000400034B08C011F0F6FF200010BDC046A5
-:10F860002CB9020070B50C00052804D80AF04CFA37
-:10F8700006030C04131C0024200070BD8B680E4C82
-:10F88000002BF9D10D4CF7E7081D12F043FC0124C1
-:10F8900040000443F0E7FFF7D7FF211D05000430C7
-:10F8A00012F05EF92C00E7E7FFF7CEFF211D0500FF
-:10F8B000043012F065F9F5E7CCE70200C4E7020076
-:10F8C00070B5050083070CD1104B02689A4208D12D
-:10F8D000FFF7BAFF291D0400043012F036F92000AA
-:10F8E00070BD2800F3F7CAF8C0231B06984206D162
-:10F8F00080200021C00515F0D4FE0400EFE70124AC
-:10F90000C317C018584040000443E8E72CB9020070
-:10F9100007B5C30701D540100EBD043001A9F1F7AA
-:10F9200007FA002801D00198F6E70249024815F0CD
-:10F9300081F8C0464442030064AB0200F0B58BB0CE
-:10F94000019001200D00170008402BD04B1002221F
-:10F9500003A904A811F0AFFF04AEFB072BD57B1061
-:10F96000022203A904A811F0A6FF04AD019B092BF4
-:10F9700001D0162B3FD16B68002B68D0300012F0FD
-:10F9800024FC041C280012F020FC011C201C0AF09E
-:10F9900051FE032302249843704B0443E4182000D3
-:10F9A0000BB0F0BD03240C4023D16D4B0A689A4282
-:10F9B000F5D10E1DD1E703231F4205D1684A3968EE
-:10F9C000914201D13D1DD1E73B40022B0CD1654B4B
-:10F9D0003B40062B08D0300012F0F7FB3A00011C28
-:10F9E0000198F8F747FF04E03A0029000198FCF776
-:10F9F00017FE0400D3E7019B182B00D98AE0FFF71C
-:10FA000023FF040001980AF07FF9444A3E50500D4C
-:10FA100013191F72336572444A3E50500D13191F5B
-:10FA200072336500201D2A00310012F041F9B6E75B
-:10FA3000201D2A00310012F075F9B0E7201D2A00C0
-:10FA4000310012F0A2FAAAE76B68002B03D14649F5
-:10FA5000464814F0EFFF07A811F0F5FE2B00320026
-:10FA6000201D07A9F0F7FEFF07A811F0F1FE96E7A9
-:10FA70006B68002BEBD007A811F0E5FE211D2B00D1
-:10FA8000320007A8EEE7201D2A00310012F08BF9A2
-:10FA900085E7201D2A00310012F001FA7FE7201DC2
-:10FAA0002A003100F0F768FF79E73800FFF730FFF0
-:10FAB000021E02DA2E48FDF789FC019B201D310051
-:10FAC000032B01D0102B02D1F0F7EEFE67E712F006
-:10FAD0008EF864E76B68002B03D02B78DB0700D52A
-:10FAE00079E7201D2A00310012F0D2FA57E76B683F
-:10FAF000002BACD0FFF7A8FE0700211D04302B001F
-:10FB00003200F0F7AFFF07A9022007970894F6F735
-:10FB1000B1FD6EE72900300011F0F4FF03000198F9
-:10FB200000241938042800D939E7124C0AF0ECF8FF
-:10FB30000308120B0F00002B00DB30E70E4C2EE702
-:10FB4000002BFBDC2BE7002B00DD28E7F6E7002B82
-:10FB5000F4DA24E7002B00D021E7EFE700008080F3
-:10FB60002CB90200070080FFE40D030044AD020041
-:10FB70005B3B0300C4E70200CCE70200044B886053
-:10FB80000B60044B08004B600023CB607047C046FD
-:10FB90006C9802009F570200044B0B60037A0B71B4
-:10FBA000436808008B600023CB607047F0C10200FF
-:10FBB00010B504000C2016F07CFB034B446003607E
-:10FBC0000223037210BDC0462CC2020010B50430DF
-:10FBD00013F049FC004810BDE4B30200002803D034
-:10FBE000012808D0002005E007224B680448934311
-:10FBF00000D1044870474B68DB085B001843F9E705
-:10FC0000CCE70200C4E702000B6870B506000D00E7
-:10FC1000181D49681400F8F7AFFF002802D04368A8
-:10FC2000002B10D1022E08D1094B022C06D1696895
-:10FC3000084813F0F0FAFCF751FDAB68012C00D135
-:10FC40004360180070BD022CFBD100224260F8E72F
-:10FC5000E4B30200C0A9020070B504000D000B7AE5
-:10FC6000164A9B0086B0995817F013F814492000E3
-:10FC700017F00FF8134B02AA02932B7A0126137187
-:10FC80006B68019304930023059302A815F091FD7E
-:10FC9000051E05D10C49200016F0FBFF06B070BD13
-:10FCA000002E03D10949200016F0F3FF012229009C
-:10FCB0002000F2F713FE0026E7E7C04668C2020004
-:10FCC000BA420300F0C10200BD42030045FC02003D
-:10FCD000F0B513681400012287B00F680D00009280
-:10FCE000D9080223060002F0E7FA022E12D10323FC
-:10FCF0006868034018D101682A4AC968914213D143
-:10FD00002A68904206D0059305A9686815F032FD6F
-:10FD1000061E01D100253EE0381D01223168F8F7AA
-:10FD20002BFF73684360EFE70021FCF71FFF039090
-:10FD30000398FCF77DFF0028ECD00021FCF716FFAC
-:10FD40000500FCF775FF02902800FCF771FF060024
-:10FD50002800FCF76DFF029B002B03D0002E01D082
-:10FD6000002802D01048FDF731FB381D012202990E
-:10FD7000F8F702FF4660DBE7A368EE009E193168E2
-:10FD8000002907D0042905D0381D0122F8F7F4FE18
-:10FD90007368436001356368AB42EDD8034807B030
-:10FDA000F0BDC0461D00010094420300E4B3020010
-:10FDB00030B5002585B001A90400019515F0DAFCE5
-:10FDC000A84203D109490A4814F034FE636802A925
-:10FDD000083B63600368029343680393042328C0CD
-:10FDE0000220F6F747FC05B030BDC0467142030063
-:10FDF000C0A90200F7B50C0015001B280DD0002388
-:10FE00001F2808D1081D00222900F8F7B5FE2C4B49
-:10FE1000002800D12B4B1800FEBD03222B001340FD
-:10FE2000114225D1284922688A4221D1002BF1D1E3
-:10FE3000296891421ED1009301936946200015F074
-:10FE400099FC01A90700280015F094FC0600002F7A
-:10FE500031D00028DED031683868F2F7BDFD0028C7
-:10FE6000D8D071687868F2F7B7FD0028E5D1D1E7FE
-:10FE7000002BCFD1154B2A689A42CBD16A686368B0
-:10FE8000534007229343C5D1019301A9200015F0E7
-:10FE900071FC061E01D10A4BBDE7281D0022316806
-:10FEA000F8F76AFE0028B5D041687068F2F794FD53
-:10FEB0000028EAD1AEE7024B0028ABD1ABE7C04641
-:10FEC000CCE70200C4E70200B0C2020074C2020024
-:10FED000F7B50B681C4A04000D00934203D05A6822
-:10FEE0001A4916F097FF1A49200016F0D2FE002397
-:10FEF0000127019301A9280015F03CFC061E0CD136
-:10FF00001449200016F0C5FE2B680F4A934203D017
-:10FF10001149200016F0BDFEF7BD002F03D10F4997
-:10FF2000200016F0B6FE012231682000F2F7D6FC60
-:10FF30000B49200016F0ADFE012271682000F2F797
-:10FF4000CDFC0027D6E7C04674C2020090420300F1
-:10FF500043FC02005E070300A002030045FC020010
-:10FF6000613A030010B504000C2016F0A2F9034B0F
-:10FF7000446003600023037210BDC0462CC202001F
-:10FF800010B504000C2016F094F9034B4460036094
-:10FF90000123037210BDC0462CC2020010B504300C
-:10FFA00000220C00F8F7E8FD002805D121000348E5
-:10FFB00013F031F9FCF792FB406810BDC0A90200B4
-:10FFC00010B5024B08C013F033FA10BD74C2020022
-:10FFD000F8B50E00070000217068FCF7C7FD0E4C55
-:10FFE0000500022F00D9B4687068F2F761FE00289E
-:10FFF00009D115F008FC06002800FCF719FE011EC7
-:020000040001F9
-:1000000003D13000F8BD4010F3E7331D0122180082
-:10001000F8F7B2FD4460EFE7E4B30200F0B5070083
-:1000200089B000201E000D00019215F0ECFB0E4B74
-:10003000040007609F4203D1042302791343037134
-:10004000019B2B430DD03368AA00B218019905A873
-:100050000394049313F0FAF9681C05AA03A9FFF7A7
-:1000600037FE200009B0F0BDB0C2020010B50C0090
-:10007000002A03D115F00AFC0A480EE0042A0DD12B
-:1000800004300022F8F778FD002805D12100064849
-:1000900013F0C1F8FCF722FB406810BD15F0ECFB33
-:1000A000EAE7C046E4B30200C0A9020010B50100AF
-:1000B00083880120A0229840044BD205D050CA88E2
-:1000C000083117F0E3F8024810BDC0460C050000E7
-:1000D000E4B30200EFB5070008001500F98802003C
-:1000E00000233868F2F7A2FD03267043002D14D0D8
-:1000F0003F18042D14D101237A7A01A952001A4322
-:1001000001923A7A30009A401A430292BA7A9A409F
-:1001100013430393F6F7AEFA0500280004B0E0BDE0
-:10012000310001AA2800F2F76DFD019B1868F2F773
-:10013000A5FC019B06005868F2F7A0FC019B050096
-:100140009868F2F79BFCFF2E03D8FF2D01D8FF28FB
-:1001500002D90448FDF73AF93D727E72B872024D39
-:10016000DBE7C046FA420300E4B30200F7B51C0027
-:10017000002300930233080011001A0002F09CF8DB
-:10018000206812F097FE47B26068F2F777FC041E11
-:1001900002DC1048FDF71AF90326300060430830EE
-:1001A00016F087F80C4BA2B20500878072430360FB
-:1001B000C4800021083018F008FE3B00A022C133A3
-:1001C000FF33D2059B009E500123BB40034928000A
-:1001D0005350FEBDE142030044C302000C05000081
-:1001E000032210B50400C38800215A43083018F0D8
-:1001F000ECFD2000FFF75AFF004810BDE4B30200F9
-:100200000523020070B5094C094D20684343094895
-:100210009B189B0018582B682260C0180F231940A8
-:1002200009012860F7F7BCFD70BDC046502B0020C7
-:10023000442A002080C30200A839030000B508004A
-:1002400006292ED809F060FD040A10161B2128008B
-:100250009A18E223DB00D218107800BDC432920055
-:10026000D05C8006800EF8E7C4329200D05AC004F9
-:10027000400EF2E7C4329200D0580003F8E7C432CF
-:1002800092009A1890780009E7E7C43292009A1811
-:10029000D0780007000FE0E7C43292009A18D078B7
-:1002A000F1E7024B024A00201A60D6E70400002062
-:1002B00009430300A83910B504000800062949D8ED
-:1002C00009F022FD040A141F2A343F00E221A2187B
-:1002D000C9005218137010BD3F210B401800C432E2
-:1002E0009200135D8B4303431355F4E77F21C4321F
-:1002F000920019401948135B890103400B431353C3
-:10030000E9E77F21C432920019401059144B490388
-:1003100003400B431351DEE70F20C4329200A218B2
-:100320001901937803400B439370D4E70F210B40DE
-:100330001800C4329200A218D3788B430343D370C1
-:10034000C9E70F20C4329200A218D1781B010140E6
-:100350000B43F4E7034B044A1A60BCE73FE0FFFF9E
-:10036000FF1FF0FF0400002027430300F0B5D2B2C6
-:1003700085B00E000293072113000B40013BDBB256
-:10038000042B02D9294C2A4D25608A431F02002ADA
-:1003900024D1284B3578C45C274B2409E443E4B2CC
-:1003A0002D1BDB19EDB2039308276319039ADBB207
-:1003B000D35C5A00D2B25BB20192002B33DA1A211D
-:1003C0000320013FFFB2FFF71BFF019B002FF0D17D
-:1003D0000134E4B2002CE7D135701AE0D443174958
-:1003E000E4B2CE5C0825144B1B19DB5D5A00D2B277
-:1003F0005BB20192002B0FDA05210220FFF700FF0C
-:10040000013DEDB2019B002DF0D10134E4B2002C8E
-:10041000E8D1029805B0F0BD31000120FFF7F0FEF1
-:10042000002EE9D0ECE706210420CAE704000020F2
-:1004300014430300190700009F480300FA4E03000D
-:100440000022F0B505000F00FF200F248BB008AB91
-:10045000654EDA710100C431890069188B781A0978
-:10046000B25C234012011343CA788B7013071B0F31
-:10047000F35CA243234013431A09B25C23401201E8
-:100480001343CB700138E5D2E223DB00EE5CB30806
-:10049000F31ADBB20493554B1B68002B0BD0E222FE
-:1004A000C4218120D200890000013B00AA186918EC
-:1004B0002818FDF7EDF900244823029403930194D2
-:1004C000009481222B1912019B181B7818000593A8
-:1004D0000723984320D008A92300059A0731280054
-:1004E000FFF744FF0230C4B2023FFFB2002F78D0C2
-:1004F0002B780393013EF6B2002E47D1E2222B194E
-:10050000D2009B181E78B308F31ADBB204930023C1
-:10051000029301930093D4E7354B009A9C469A5C72
-:100520002300C4339B00EB18997809090A43314929
-:100530008A5C019907926246DB78525C1907090FC1
-:100540000A432C491B098A5C2B490692029A8A5C51
-:1005500006991343079A8A182649C95C012389180A
-:10056000FF2A00DC031CC918882309061B06C918CA
-:10057000090F0020FFF744FE039B013BDBB203930E
-:10058000002BB7D10134E4B2013FAEE7049B013B3D
-:10059000DBB20493002B02D1059B002B18D1220063
-:1005A000C4329200535D00999B069B0ECB18DBB2C0
-:1005B0000093535B0199DB045B0ECB18DBB2019314
-:1005C0005359029A1B035B0ED318DBB2029378E7F0
-:1005D00008A92300059A07312800FFF7C7FE040089
-:1005E0008CE70BB0F0BDC04623440300582A00201E
-:1005F000EF4D0300FB4503009F470300064B1B5CC8
-:10060000002B05D0054B185C4843C011C0B27047A1
-:10061000034B185CFBE7C0464B470300C44503008F
-:1006200084440300064B1B5C002B05D0054B185C73
-:100630004843C011C0B27047034B185CFBE7C0468B
-:100640004B470300FF4E0300D4440300F0B5037A88
-:100650008DB004007F2B00D157E103000700002577
-:100660000933FF330837099301953E787F2E00D078
-:1006700087E000230693019306998B00E318039308
-:100680001A7A481C1B7BC0B206907F2B00D11BE15D
-:100690009F49CE5C8D5C9F49AE4200D0F1E08D5CFD
-:1006A000CB5C0493039B597A019B5918CBB20193FD
-:1006B000049BEB18DBB20793023B1B06DCD4A82794
-:1006C000019B5D1BEBB20593A82F00D0E1E0039BDB
-:1006D000039A5B7A527B5B08520899180291019940
-:1006E00001988A18E221C31AD2B2DBB2C900A2185B
-:1006F000E31852185B18157818782D1AEDB27F227E
-:100700002B006DB293430893EB17E81858400299F9
-:1007100009F07EFC2800CBB20299099309F092FB04
-:10072000059A00251600C3B20A93029B9B18DBB200
-:100730000B93320039002000FFF77EFD0A9B013643
-:100740000B9AC018F6B2C3B2964200D1B6E0099A2D
-:10075000AD18029AEDB2AA420DD8AD1A20216A4610
-:1007600052181278EDB252B2002A00DAA4E0002B3F
-:1007700001D00133DBB2320039002000FFF79AFDCF
-:10078000D7E7012E77D12B003100019A200015F018
-:1007900092F8BA78604BA1789B185B78300001938F
-:1007A000FB780893FFF72AFF3F23E17803403000EE
-:1007B0000293FFF737FF7F22584B9B5D1A40584B3F
-:1007C00003929A5D0F231A400492564A925D1A4092
-:1007D0000592554A925D1A4006923F22534B9B5D0B
-:1007E00007937B78EB18DBB20A93029B13400293CA
-:1007F0007F23184083019C462A003F21C432920087
-:10080000135D0F268B4302990B431355135B484925
-:100810000B4061460B431353039B10595903454B3F
-:1008200003400B430498190C314000011351084355
-:10083000A21890701B0E0598B34306990343090153
-:100840001E400E43D67081226319079912019A182F
-:100850001170E222D2009B180899019A01355218B2
-:100860001A700A9BEDB29D42C6D1099B0437BB4268
-:1008700000D0FAE6FDE6022E8BD12B00019AFF2173
-:1008800084E72D48AE4201D9C55C09E78D5C835CE5
-:1008900007E7049B019A39009A18D2B22000FFF7AB
-:1008A000CBFC059A050039002000FFF7C5FC079B2B
-:1008B0002D1AEDB2029322E7013B5BE70137FFB24D
-:1008C000AF2F00D000E7D7E6023189006118019B05
-:1008D000497859186368C9B2002B13D1E2238122E9
-:1008E0001648DB001201E318A518001B1A18C432C1
-:1008F0009200125D1E789206D20EB21A1A7001335F
-:100900009D42F3D12000FFF79BFD0DB0F0BDC04626
-:1009100034440300FB460300EF4E0300244503006C
-:100920003343030083430300D34303009F4D03007D
-:100930003FE0FFFFFF1FF0FF74450300F0F8FFFFEB
-:10094000014BD8607047C0467C2E0020034B82B01C
-:10095000D86801ABC01A02B07047C0467C2E002098
-:10096000014B18617047C0467C2E002010B54E2107
-:10097000024812F050FCFBF7B1FEC046A0AB0200EB
-:1009800007B5054A01ABD1681269CB1A9A4201D862
-:10099000FFF7ECFF07BDC0467C2E0020074B5B69CC
-:1009A000002B01D1180006E05A68824204D8801A50
-:1009B00004308000C05870471B68F1E77C2E00208F
-:1009C00070B5144D04006B699868DB68834215D3D9
-:1009D0000230C00015F07AFC6B69002803D19868DA
-:1009E0004000FCF7DDFC5A68D96803609B68521828
-:1009F0005B00836000234260C36068616A69D368FA
-:100A00005068591C04339B000138D16040189C5039
-:100A100070BDC0467C2E0020074B4118884204D38D
-:100A2000D8B2002800D1013070475A01D31802789B
-:100A300001305340F2E7C04605150000034B044A5D
-:100A40005A6100229C331A607047C0467C2E0020F9
-:100A5000E4C30200F0B585B001900E00FFF7DCFFA3
-:100A6000144B02905C69002C01D120001EE027008D
-:100A700010373D00E3689B00FB180393039B9D42E6
-:100A800001D32468EFE72868029A037893420FD1D4
-:100A90004378B3420CD102303200019918F06AF960
-:100AA000002805D1ED1B6068AD10281805B0F0BD19
-:100AB0000435E3E77C2E0020F0B585B0039001916A
-:100AC000FFF7C8FF002861D1314D019B2F009C37F3
-:100AD000DC1C3B68002B18D02E002E4AA036126872
-:100AE00031680292A2188A420FD9020061181800D8
-:100AF00015F00AFC0290002822D1264B020019684A
-:100B0000386815F001FC029B3B602B009C331B688E
-:100B1000002B20D12600802C00D2802630002F0010
-:100B200015F0D4FB9C37386000280DD1200015F05B
-:100B3000CDFB26003860002806D12000FCF730FCF1
-:100B400033681B193360E0E72B00A0331E602B00D5
-:100B50000022A4331A602B00A4331A689C352D6838
-:100B6000A41801990398AD181C60FFF755FF019B6D
-:100B700028701A006B70A81C039918F00AF900225B
-:100B8000019B2800EB189A70FFF71AFF05B0F0BD23
-:100B90007C2E0020202F0020F7B51D00160000231A
-:100BA000070003600B6033602B60174B00915C699A
-:100BB000002C02D0154B9C4204D133682A68D3180C
-:100BC0002B60F7BD3B6801333B60E268009B9446B5
-:100BD0001B68009A0193634413602200E36810329B
-:100BE0009B00D3189A4207D32000FDF7E1FA2B6847
-:100BF000246818182860DBE702CA30684978033097
-:100C000009183160EEE7C0467C2E0020E4C30200E4
-:100C10000C4B70B55C69002C02D00B4B9C4200D190
-:100C200070BD2600E36810369D007519AE4201D3F1
-:100C30002468F0E704CE05490232054816F0EAF8C8
-:100C4000F4E7C0467C2E0020E4C302003C4F0300C2
-:100C500084E80200044B054A98331B6804481A6074
-:100C6000044A9A807047C0467C2E00207800040019
-:100C7000E4B3020004040000084A10B513009833DE
-:100C80001B689979002908D0916C0029F9D00021BE
-:100C900099711B695879FCF7F7FE10BD7C2E002076
-:100CA00013B5084C98342368188814F009FD23689C
-:100CB0000090588814F004FD694601900220F5F771
-:100CC000D9FC16BD7C2E002010B50D4C002803D099
-:100CD0000868F6F7ABFB04000A492000F8F7F0F8C3
-:100CE00060790021FCF7D0FE2000F8F7D3F800224D
-:100CF000054B064898331B681A619A7110BDC046AF
-:100D0000ACA2020010B202007C2E0020E4B302006C
-:100D10001FB50C4B02AC00930194022301F0FCFAC6
-:100D2000029A002A03D0084B98331B685A806268E5
-:100D3000002A03D0044B98331B681A80034804B080
-:100D400010BDC046D4D002007C2E0020E4B30200C7
-:100D5000F0B5254B89B004AC00930194042301F055
-:100D6000DBFA224F224A3B0098331B6804989A8092
-:100D7000204B0340062B06D0830730D102681E4B60
-:100D800092699A422BD1012303940293002598374C
-:100D90003B681869F8F77EF83B6860681D61F6F7F4
-:100DA00045FB16490600F8F78BF83B68144A9D711D
-:100DB000126802999A60227B9981DA71DD81039A27
-:100DC000012900D112685A6101221E619A71237AA9
-:100DD000002B01D0FFF750FF0A4809B0F0BD03AA6D
-:100DE00002A9F1F7EDFED1E794D002007C2E00209D
-:100DF00004040000070080FF9D1D000010B20200E7
-:100E0000D02F0020E4B30200F0B5274B89B004AD29
-:100E100001950093042301F07FFA6B68A868049E93
-:100E20000393F6F703FB214F040098373B681869DA
-:100E3000F8F730F800223B681D491A612000F8F7E6
-:100E40003FF8607980212D7BFCF71EFE002E1CD11F
-:100E50006079FCF799FE039B002B13DB0022134BF8
-:100E6000144998331B6803989A710968DA7141181C
-:100E7000DA605A61023299601C619A71002D01D0CA
-:100E8000FFF7FAFE0C4809B0F0BD31000B4808F03E
-:100E90004FFFFCF7D5FD0028DDD06079FCF774FE2C
-:100EA0000748FCF793FAC046B4D002007C2E00201D
-:100EB00010B20200D02F0020E4B3020040420F0025
-:100EC000EB6A030010B5182015F0F3F9064B9833C0
-:100ED0001860064B0360064B838000238371036117
-:100EE0004361044810BDC0467C2E002078000400F9
-:100EF00004040000E4B30200F0B56D4C87B0260096
-:100F000098363368002B40D09A79002A3DD0694D3D
-:100F100099682A68914238D89A79022A0BD11B69BC
-:100F200000215879FCF7B0FD2B6832680A339360D2
-:100F30000123937129E09A79012A26D19A89D989C6
-:100F4000914204D3DD79002D19D00021D98158694F
-:100F5000012A02D0DA8992001058574A904216D1DD
-:100F60001B69002158799834FCF78EFD246853489A
-:100F7000218808F067FF0123A060A37105E09D713F
-:100F80001869F7F787FF33681D6107B0F0BD05A941
-:100F9000F0F736FC9834236801901B69802158795A
-:100FA0000293059EFCF770FD019B24681F781F23A8
-:100FB000218842481F4008F045FF618808F042FF41
-:100FC0007D1EEDB20390012E5AD9019B5B78232B35
-:100FD0004DD0622B50D1002D4BD0023FFDB26A1E86
-:100FE00053425A415242022E4ED00121022301980F
-:100FF000C05C3A2803D00F27384020710133207994
-:1010000084469E420ED90198C05C3A280AD1581CE9
-:10101000864207D9019F0233385C0F2738409E4231
-:1010200035D86071092D3DD86346043B9A1852B2F9
-:101030006F00234B002900D1224BD85B002A2EDB06
-:101040001041FCF7FDFC1A4B039998331A68537949
-:1010500059430B0017490A3B09680A2B00DA0A2397
-:101060005B189360D3890133D381022361E70022A7
-:10107000B9E72A000625B6E7002101230A00B6E7F2
-:10108000002101230A00BAE733000121B7E70A264D
-:101090007043019E6071F65C3E408019C1E7524288
-:1010A0009040CEE7029B00215879FCF7EDFCCAE79F
-:1010B0007C2E0020D02F0020E4B3020060EA000064
-:1010C00014F7020006F70200F7B5CC1CA4000700D5
-:1010D00020000E00019215F0ECF822000500054BEF
-:1010E0004760866003600C3A01990C3017F051FE9E
-:1010F0002800FEBD2CD102000021F0B5070087B00A
-:10110000816414F0DFFCFB693C6ABB637B6AFC63AF
-:10111000002B05DA3A00062140321170013306E057
-:10112000002B07D03A00052140321170013B7B6251
-:1011300007B0F0BD002833D0BB6A002B30D1390096
-:10114000043340310B703A6BAE4B786BD3185B00B5
-:101150001B5A013C9C42EBD017D9F96A8A4207D34B
-:101160000831490015F0C3F8FB6A78630833FB6265
-:101170003B6B5A1C3A637A6B5B009C527B6ACDE7EF
-:10118000013B3B637B6A013B7B623B6B9D4A9A1848
-:101190005200125A9442F3D3CAD002230B70C7E70D
-:1011A0003C69631C03D1002240373A70C0E7380025
-:1011B00014F030FC0490002800D129E13B004033BA
-:1011C00005930023059A13703B69752B5AD0622B47
-:1011D00007D17B69722B5CD001240B230022019282
-:1011E00008E0722B51D17B69622B52D0049B012401
-:1011F00001930A23390040310A78002A4ED10B703E
-:10120000002C07D0380014F02DFC022C02D138003D
-:1012100014F028FC3B690293222B01D02723029370
-:10122000380014F01FFC0123029A03933B69934298
-:101230000BD113007A69934207D1380014F012FCE5
-:10124000380014F00FFC0323039300263C69631C51
-:1012500000D1CEE0039B012B02D10A2C00D1C8E0C3
-:10126000039B9E421DD338003100443015F0EFFF40
-:101270000121380014F026FC380014F0CBFB0028C4
-:10128000A2D155E701240A23A8E700240A230194E8
-:10129000B0E7049B022401930B23ABE79A42AFD043
-:1012A00046E7029BA34209D13800190044300136B9
-:1012B00004F0B2FD380014F0D5FBC7E75C2C00D079
-:1012C00091E0380014F0CEFB019B3D69002B06D065
-:1012D00038005C21443004F09FFD2C0071E0622D49
-:1012E00051D030D84E2D77D01AD8222D29D0272D85
-:1012F00027D000260A2DDDD02C00303C0326072CF9
-:10130000E6D87B69303B072B5BD8013E002E58D0D6
-:10131000380014F0A7FB3B69E400303B1C19F0E7F0
-:101320005C2D0ED00724612D21D0552DE4D13B003A
-:1013300040331B780B2B2ED138005C21443004F055
-:101340006BFD2C0013E0742D1FD007D86E2D1ED01E
-:10135000722D0BD0662DCFD10C2408E0762D18D03D
-:10136000E5D30226782DC7D1002428E00D243B00C8
-:1013700040331B780A2B32D138002100443004F06E
-:101380004BFD002696E70824F1E70924EFE70A243D
-:10139000EDE70B24EBE70826752DE5D1043EE3E7E6
-:1013A000380014F05FFB3D692800F7F76DF900285D
-:1013B00000D144E1280011F0BBFF24012418013EB4
-:1013C000EED20026631C00D174E70F4B9C42CED9AD
-:1013D0000122059B1A70D4E70C48FCF7E9F9FF2CB1
-:1013E000F6D80B2BF4D13800E1B2443015F0EBFE07
-:1013F000C7E7039B9E4200D335E73B0003224033FF
-:101400001A7030E7FFFFFF7FFFFF10003A6B030009
-:101410002000F7F721F9041E386903D15F2801D0B5
-:101420007F2842D93D0007233C0040352B704434CF
-:10143000C1B2200015F0C7FE380014F013FB386964
-:10144000431C1BD1200015F0ACFE002406007E4F8B
-:10145000A300F958300017F002FD00281ED10D340A
-:10146000E4B22C70102C00D062E6784BA8331A68D6
-:101470000D23002A00D102332B7059E6F7F7ECF860
-:10148000002808D138695F2805D07F2803D8F7F7EE
-:10149000EFF80028D6D03B69D9B2CAE7002800DAB5
-:1014A00046E60134222CD3D142E6F7F7E1F80028D2
-:1014B0000FD03E00396940362E2916D109233370EA
-:1014C0003D004435280004F0A7FC380014F0CAFAA7
-:1014D00031E03B692E2B04D17869F7F7C9F8002871
-:1014E000E7D100255A4C02234AE008233370302903
-:1014F000E6D17A6918331343623B0024162BDFD8F8
-:10150000544CDC4001231C40DAE7002C17D10300C7
-:1015100020229343452B12D13C3B33706521280098
-:1015200004F07AFC380014F09DFA396902220B00AD
-:101530002B3B9343C6D03869431CE6D1F8E5F7F757
-:101540008BF8002805D039692E290BD10923337077
-:10155000B8E73869F7F78CF80028F4D13B692E2BEF
-:10156000F1D0E5E50B00202293434A2BAAD1EDE709
-:10157000633E9E43F6B272425641A41901350134CE
-:101580002678002E02D03A69B242F1D1380014F028
-:1015900069FA002E02D14037012206E6212E08D139
-:1015A0003B693D2BF7D1380014F05CFA40374122FB
-:1015B000FBE52E2E12D13C003B6940342E2B02D18C
-:1015C0007B692E2B02D04A232370B1E5380014F03A
-:1015D00049FA380014F046FA0C23F5E72A000134E2
-:1015E000267802213300633B8B43DBB2002B0ED104
-:1015F000637839690135994207D1380014F032FA1D
-:101600002A00652E03D00234EAE7632EFBD1124B89
-:101610009B5C3A0040321370190004229143422926
-:1016200001D0442B03D1BB6A0133BB6280E543295F
-:1016300002D0452B00D07BE5BB6A013BF5E70122D8
-:10164000059B04001A7092E668D102007C2E0020EF
-:10165000F96A030001204000B66B0300F7B5456846
-:101660001600A8681F00019111F0CEFA0400A868C6
-:1016700011F0D0FA11F0C8FA0300032058430734E0
-:101680000019800014F015FE074B040003606B681E
-:101690003200436000238560C36001993B0008303D
-:1016A000F3F780F92000FEBD34D2020070B50500CA
-:1016B00088680C0015F07CFC230002000249280019
-:1016C00015F0A8FB70BDC046006C030010B50248C1
-:1016D00011F09BFDFBF702F8DCAB020010B5040033
-:1016E000082014F0E6FD024B4460036010BDC046C4
-:1016F00070D20200F7B5C56804001E00002D02D1AB
-:101700001D602800FEBD03691830834205D1184BC7
-:10171000994203D01748FCF71DF819602000164FB6
-:1017200011007B680830019363687B6001F0A6FDBF
-:10173000019B05007B60012807D002280CD0002304
-:10174000E36023691B683360DBE723691B68336050
-:10175000002BD6D1E360D4E7A368986811F054FA5F
-:10176000002305308000E36024186368EBE7C0467F
-:10177000E4B302001E6C03007C2E002013B501AB05
-:10178000FFF7B8FF01280ED0104C02280DD0019BA6
-:10179000A34219D0002B17D001AA01210C4811F047
-:1017A0002EFDFAF79BFF019816BD0198F1F77EF820
-:1017B0000749FAF791FA002801D10198F1E7019859
-:1017C000F6F73CFEA042F8D10020EDE7E4B30200BA
-:1017D000DCAB020010B50B00022808D14A680549AD
-:1017E0001868FFF7CBFF002803D1FFF76FFF8A6867
-:1017F000F5E710BDE4B3020010B500220149FFF780
-:10180000BDFF10BDE4B3020013B5114C01AB114A8A
-:101810002100FFF76FFF012803D0022805D0200028
-:1018200016BD0D490D4813F005F90198F1F73EF882
-:101830000B49FAF751FA0028F1D10198F1F736F87F
-:101840000849FAF749FA0028E9D10198FAF746FF62
-:10185000E4B3020048A70200E06B0300A0AB020063
-:10186000D0A80200DCAB0200F0B585B00500160080
-:10187000080003AB02AA01A911F011FC0398364F2E
-:10188000B84209D0032807D0F1F7F8F8B060002873
-:1018900004D13248FBF79AFD0123B3600198B842A6
-:1018A00029D10024B368A34200DC6C1E0298B84220
-:1018B00025D1B368002B47DD2800002C2ADA6419F3
-:1018C00001D5B368DC17002834DA401901D50120AE
-:1018D0004042B368002B00DA0130B368002B2DDDE5
-:1018E000A04200DA2000013B706058425841C0B26B
-:1018F000346005B0F0BDF1F7C1F80400D6E7F1F7A8
-:10190000BDF8B368002801DBDA0F8018002CD6DBA5
-:10191000002B03DDAC42D6D92C00D4E7002BD2D06B
-:10192000A54200D86C1E002804DA4019D4D5012045
-:101930004042D1E7A842D0D92800CEE7002BD2D030
-:10194000A042D0DD601CCEE7002C01DA0020B6E713
-:1019500000208342E4D1C0E7E4B30200546C0300EA
-:10196000F0B5060085B017001B2805D10A9A9742EA
-:1019700009D0002005B0F0BD19281AD01C281AD0B3
-:101980000A9A0A9717001A000B0011000A9A01928E
-:10199000BA4200D901971D000C0000230093009B60
-:1019A000019A934209D10A9BBB4220D0E1D3012086
-:1019B000E0E71A26EAE71D26E8E70295039401CD41
-:1019C00002CCF1F709F8002802D0009B0133E5E7CB
-:1019D0001B2ECED0039B30001A68029B1968FBF7C0
-:1019E000FDFC044BC01A43425841C0B2C2E71A2E54
-:1019F000DDD1BEE7CCE70200F0B51E0085B0039054
-:101A000018680D001700F0F751FF736801900293FA
-:101A10000024022F0ED90123B2682900F1F706F93C
-:101A20000400032F06D029000123F2680198F1F782
-:101A3000FDF80500A54202D80848FBF7C7FC039A49
-:101A4000A3000299D058F0F7C7FF002801D1013454
-:101A5000F0E701206400204305B0F0BD6E6C030088
-:101A6000002313B5044A046A09050093890C8A58B7
-:101A7000A16B14F0BCF913BDACD20200F0B587B075
-:101A800000931B7804000F0002922A2B05D1826874
-:101A9000525C002A01D0A62A14D11A00213A022A47
-:101AA0002DD8A568E8190378032B5CD104A96668D2
-:101AB00014F067FAAB19984206D1676004992000C8
-:101AC00014F0C3F907B0F0BD0378032B4BD105A97F
-:101AD00014F057FA009B1B78212B04D1049B059A24
-:101AE00013430493E6E7222B03D1049B059A53404A
-:101AF000F7E7232BDED1059B049A1340F1E71A0088
-:101B0000243A022A00D986E0A368D8190193037801
-:101B1000032B28D1636804A9039314F032FA06005A
-:101B2000019B039A9B189E42C7D0B378B01C75786E
-:101B3000032B18D105A914F024FA0600372D35D14E
-:101B4000059A1F2A0FDC4249049B114199420ADB86
-:101B5000C021090611418B4205DB93400493049A8E
-:101B600053005340DCD500226368029DDB1B0193C8
-:101B7000561CED0969D1019B0135DB09FCD102320C
-:101B800052193900200015F033FB0400009B029A23
-:101B90001B7831001A330370013014F0AAF8701C5E
-:101BA0002018019A290014F0A4F88BE7392D08D1E8
-:101BB000059B1F2B01DD1F230593049B059A1341F1
-:101BC000CCE72F2D03D1049B059A9B18C6E7302D37
-:101BD00003D1049B059A9B1AC0E7312D09D10599C1
-:101BE0000498F6F711F90028BDD1059B049A5343D8
-:101BF000B4E7332DB7D00599352D06D10029B2D0E1
-:101C0000049811F02DFA0490A9E70029ABD00498AC
-:101C100011F036FAF7E7272BA5D1A368D8198378F6
-:101C2000032BA0D14578023014F0BAF92F2D01D141
-:101C3000049042E7302D06D14042430004905840C2
-:101C400000D43AE78FE7C043F2E7320090E7C0469E
-:101C5000FFFFFF3FF0B597B00890C020002560233C
-:101C60000AAC80000F00160025706360A56014F0B8
-:101C70002DFB2561E0606561A561E5612762E56294
-:101C8000A84218D1C449C54811F0CCFA0023060077
-:101C900013930D9814F03CFB002E00D1E1E10023DA
-:101CA000BA6B39683000F6F769FC380013F087FF2B
-:101CB0003000FAF713FD3822002E03D00232022E34
-:101CC00000D02A000026B649009692005258200003
-:101CD000B96B330014F08BF8102014F0EAFA1021DD
-:101CE000040015F010FA0AADAB682A78002B00D179
-:101CF00094E1002AC6D1EA68013BAB60DB00D3184F
-:101D0000DA78A7499200525802921A689D88120206
-:101D1000120A0592029ADB88527806920F220699DF
-:101D20000A400492002D2DD030220393069B1340CD
-:101D3000102B29D0202B65D0002E00D047E10123A5
-:101D4000069A1A400992099A02992A405300CB1820
-:101D500080215B88490107931B0B1B038B4200D03A
-:101D60004DE13B00079940331B780905090D8B4273
-:101D700000D02BE1002A00D123E13800FFF7BCF9A5
-:101D80000135E0E76368CFE7002D01D0002E35D0A4
-:101D90008022390052014031049BAB4201D8012618
-:101DA000A1E7029B6E009B195B88180B0003904211
-:101DB00013D108781B051B0D984221D121000AA8D8
-:101DC00014F052F8002819D13B0040331B78052B42
-:101DD00000D03AE17349744856E7049A6B1C934269
-:101DE00006D2039A059900920AA8029A13F0FFFFFF
-:101DF000029B9E1971880AA8FFF732FE002672E73F
-:101E00000135C9E7002E0BD0029A6B009B5A1B0BC1
-:101E1000032B47D10121200015F0B5F900230370F1
-:101E2000049BAB4242D880200026029B049A0233D6
-:101E30005100C9184001994271D1A368039A9818BA
-:101E400000230493A2686368D318984272D3029B5C
-:101E50001B78052B01D00C2B00D10126029B597851
-:101E600040230B405842434149B25B421E40002987
-:101E700000DA01260025039B0695D0180795049BE0
-:101E80009D425ED1002E02D1079B012B69D006999D
-:101E9000200015F0DCF9029B059A03992000FFF75A
-:101EA000EDFDABE7012D00D879E78DE78021029B9E
-:101EB0006E009E19738849011A0B12038A4225D1BC
-:101EC0003A0040321278DBB29A421BD1072A07D17E
-:101ED000B96CF86CFEF7F0FD0100200013F07DFFF7
-:101EE000002D0AD1029B5B787F2B06D90E9B200028
-:101EF000591C06930E9113F0A8FF3800FFF7FCF869
-:101F000001358DE7002D00D149E75DE7039A6B1C91
-:101F100000920599029A0AA813F069FF6AE71A88E5
-:101F2000150B2D03854203D1D2B2062A00D9012612
-:101F3000023380E7049B01210133049313F0FCFE7C
-:101F400080E7069A037801320692002B04D0079BA3
-:101F50000133079300230693012113F0EDFE0135B1
-:101F60008DE7A268039B944663441D00049B9E4238
-:101F700000D143E72B78002B07D1A3680122E91A8F
-:101F8000200015F06CF90136F0E72800012113F06C
-:101F9000D3FE0500F7E7C046856C030074AA020073
-:101FA000ACD20200AD6C030048A90200012D00D1A3
-:101FB000F5E601232A001A402ED0049A032A0DD0F8
-:101FC00002E721000AA813F04FFFD9E60135049B70
-:101FD000022BEBD10023012D00D1E0E6069A691E09
-:101FE000D20705D5029A9288120B012A00D16908FE
-:101FF000012900D04FE7002B00D1FFE64BE7039A01
-:10200000059900920AA86B1C029A13F0F0FE07993A
-:102010000AA8FFF725FD66E61300DFE7002A00D0D7
-:1020200030E63B0040331E78002E00D0CCE66368DB
-:10203000002B00D1C8E62B692000591C13F005FFC6
-:10204000A3686B62EB69AB6223E6022B01D10A49FC
-:10205000C1E60A3B09480A49012B00D814E60949A0
-:1020600012E6380013F0ABFD089A13AB13CB13C282
-:10207000089817B0F0BDC046BF6C030018AC020052
-:10208000F36C03003D370300F7B5019111490400DB
-:102090001700002514F0FDFD7B68AB4204D80E4903
-:1020A000200014F0F6FDF7BD002D03D00B492000F1
-:1020B00014F0EFFD019BAE009A5909492000BE19AA
-:1020C00014F0A8FE0122B1682000F0F707FC0135EA
-:1020D000E2E7C046E20D0300A002030045FC020057
-:1020E000236D0300004870475CD60200004870472B
-:1020F0000148E80110B5F0F7C1FC80F310880148F1
-:1021000010BDC046E4B30200F0B508C98DB0059318
-:10211000244B06AC013800930194062300F0FCF830
-:10212000E068214E214FB04202D0F5F77FF9070059
-:102130001F4B20690393B04202D0F5F777F9039063
-:102140001C4B60690493B04202D0F5F76FF904901C
-:10215000194D38002900F6F7B3FE29000398F6F769
-:10216000AFFE29000498F6F7ABFE01200523049A80
-:102170000399059D5279497904354042FB5652B284
-:10218000009049B2280007F0EDFA0023A2686168C8
-:10219000280007F06DFA2800069907F0A1FA300030
-:1021A0000DB0F0BDA8D70200E4B30200CCA202003B
-:1021B000DCA20200D4A2020030B20200F0B50E6828
-:1021C00087B0736807000C00002B02D11248FBF7A0
-:1021D000FDF84868F0F752FC010002A814F0A4FFD3
-:1021E0000025032F03D1A068F0F748FC0500002468
-:1021F000039B0193A34208D9301D290007F09AFBE5
-:10220000049B185501930134F2E702A90348EEF745
-:1022100069FE07B0F0BDC0469C6D0300A0920200AD
-:1022200070B505006B6886B00800002B02D10B4822
-:10223000FBF7CCF8012203A9F0F7DAFD039E340086
-:10224000049AA31B01929A4205D92178281D07F010
-:1022500071FB0134F4E7024806B070BD9C6D0300C9
-:10226000E4B30200F0B505006B6889B00800140003
-:10227000002B02D10E48FBF7A9F8012202A9F0F7C2
-:10228000B7FD20000024022205A9029FF0F7B0FD4F
-:10229000059E039B0193A34206D9395D281D07F0D3
-:1022A00049FB30550134F4E7024809B0F0BDC0469F
-:1022B0009C6D0300E4B3020010B51C0002AB1B7858
-:1022C000002904D0002B02D10E48FBF743FAA242AA
-:1022D00007D1824214D003000B490C48F6F7E2F80C
-:1022E00006E0824206D9121A09490848F6F7DAF8D8
-:1022F000FAF7F4F9844203D2030022000549ECE71F
-:1023000010BDC046B06D0300B407030090AC0200DE
-:10231000D96D03000B6E0300F0B50024170087B0E1
-:102320000C9D03900491059302940194059B9C429B
-:1023300006D1019B039A934240D22548FBF70AFA43
-:10234000039B9C4213D26B889B05F6D4019B049A95
-:1023500001330193A300D058FF226B88A6001340DD
-:10236000012B24D1F0F7C8FC0D9B985517E00623EC
-:1023700029880022C90019433800F6F7FDFB002820
-:1023800010D16B88DB0506D52A8812491248F6F76A
-:1023900089F8FAF7A3F90D9A6968A300D1500134BE
-:1023A0000835C3E7029B406801330293D4E7022B50
-:1023B00001D1F0F763FB0D9B9851F0E73B68029A5F
-:1023C000DB08934201D90548B8E707B0F0BDC04625
-:1023D000516E03003A6E030090AC0200726E03006F
-:1023E000A3230021024A5B000248D1527047C04635
-:1023F0007C2E0020E4B30200A3230121024A5B00EB
-:102400000248D1527047C0467C2E0020E4B302003F
-:10241000A323044A5B00D35A0348002B00D103488E
-:102420007047C0467C2E0020CCE70200C4E70200C3
-:1024300010B501F07FFE014810BDC046E4B30200B4
-:1024400010B50C4C002808D1FC34236D18005A1C20
-:1024500002D0180113F034F910BD0868F0F70EFB34
-:10246000FC34031E044803DA01235B422365F3E7CF
-:102470001B09FBE77C2E0020E4B302000300203B95
-:102480005E2B00D93F20052320384343014A1068C2
-:10249000C018704768000020044B0B6043684B6015
-:1024A00083680800CB6000238B607047FCE102006A
-:1024B00070B50500080068430130401008300C007A
-:1024C00013F0F7FE0122044B857103600379447118
-:1024D0009343037170BDC04608E5020010B503794F
-:1024E000DB0702D50148FBF735F910BD906E0300FC
-:1024F00070B50500202013F0DCFE05210B4B040015
-:1025000003600800FFF7D4FF6B68EA68A0602361EE
-:1025100062602A7C2000A276AA689B1863616B7CAB
-:10252000E37613F022FF200070BDC0464CE50200A8
-:1025300070B50D000400FFF7D1FF2800F0F79EFAF8
-:102540000100092802D90448FAF740FF200013F0DF
-:102550006EFF024870BDC0462B420300E4B3020088
-:10256000F7B5C3684269040093420BD1037E052B83
-:1025700008D1C37E181E43D0200013F0F6FEA068D9
-:1025800013F063FF012500266B1E0193A76832003C
-:102590002900380013F017FF3200030001993800BA
-:1025A000013613F01DFF052EF0D10135052DEAD1BE
-:1025B00000252A0000230421A068013513F010FF34
-:1025C000052DF6D1227E637E9A421AD2207FFFF734
-:1025D00055FF002507000426227E7B5DB21A1341B9
-:1025E000012213400832534304212A00A068013518
-:1025F00013F0F6FE052DEFD1237EA068013323767C
-:10260000FEBD9A42F8D1E36861695A1CE2608A42D1
-:1026100005D120232377A023DB002383ECE7587820
-:102620002077FFF72BFFA17E0500002901D0064B84
-:10263000F3E713F071FE40422076280013F084FE89
-:1026400001306076D8E7C046FF050000F0B50C0009
-:102650000B6889B0070018000493FFF73FFF656817
-:102660002800F0F723F91E4B984202D01D48FBF7D3
-:1026700071F8072F01D11C48F9E7A068F0F7FEF9BF
-:102680000690E068F0F7FAF907902069F0F7F6F99C
-:1026900005906069F0F7F2F9059B0600002B01DB5D
-:1026A000002802DA1148FAF791FE062F14D0A0692B
-:1026B000F0F7E4F90700E069F0F7E0F9059B039013
-:1026C0000093280002970196079B069A049913F03D
-:1026D000EAFE074809B0F0BD00200700EEE7C0465B
-:1026E00008E50200BD6E0300D06E0300EA6E030031
-:1026F000E4B3020070B5040008001600F0F7BEF95C
-:1027000005003000F0F7BAF90600002D01DB0028C3
-:1027100002DA0C48FAF75AFE200013F0AFFEA84286
-:1027200004DD200013F0B8FEB04201DC0648F1E7FA
-:1027300032002900200013F093FE430001201843CB
-:1027400070BDC0462D6F0300466F0300F8B50D0045
-:102750000C682000FFF7C2FE6868F0F78FF90600EA
-:10276000A868F0F78BF90700002E01DB002802DAD9
-:102770000F48FAF72BFEE868F0F780F90500092802
-:1027800001D90C48F5E7200013F078FEB04204DDD3
-:10279000200013F081FEB84201DC0748E9E72B0076
-:1027A0003A003100200013F01BFE0448F8BDC0467B
-:1027B0002D6F03002B420300466F0300E4B30200B9
-:1027C000F7B50E0025490400019214F023FB019B8C
-:1027D000002B03D12249200014F01CFB21492000CA
-:1027E00014F018FB0025300013F056FEA84225DD3A
-:1027F0000027300013F042FEB8420CDD39002A00F9
-:10280000300013F02DFE184B18491A5C200014F00C
-:1028100001FB0137EDE71649200014F0FBFA019B9C
-:10282000002B09D1300013F037FE0138A84203DD38
-:102830001049200014F0EEFA0135D4E709492000D0
-:1028400014F0E8FA019B002B03D10B49200014F08F
-:10285000E1FA0A49200014F0DDFAF7BDD36F030056
-:10286000DA6F0300E66F0300E86F030082000300E5
-:1028700095400300E06F0300654F0300A0020300D2
-:10288000F0B50E00110000228BB01C000092032353
-:102890003000FFF711FD032E00D9D5E0300007F01E
-:1028A00033FA020B919105210800FFF701FE0700A2
-:1028B000380013F0CAFD18E02068644B0340062B73
-:1028C00007D0830700D07AE0614B02689A4200D0BB
-:1028D00075E007A9EEF794FF079B03900593012B82
-:1028E00006D1007813F0DBFF070038000BB0F0BD15
-:1028F00000231E00039A029303990598511A8842F7
-:1029000015DD11780A2901D03A2908D19E4200DA52
-:102910001E00029B0133029300230132ECE70133D6
-:102920002029FAD03929F8D94A48FAF74FFD002B67
-:1029300005D0029A013202929E4200DA1E000299EC
-:102940003000FFF7B5FD002507002C00039B049322
-:10295000039A049B9B1A059A9A4223DD049B1B78D9
-:102960000A2B01D03A2B0FD1A64207DD210000230C
-:102970002A00380013F034FD0134F5E70024013556
-:10298000049B01330493E3E7202B07D100232100AC
-:102990002A00380013F024FD0134F1E7392BEFD879
-:1029A000303BF4E7029BAB429FDDA6429DDD210058
-:1029B00000232A00380013F013FD0134F5E7264800
-:1029C000FAF7C8FE2068F0F759F805006068F0F7DC
-:1029D00055F8029001002800FFF76AFD0700022E5B
-:1029E00000D165E7012207A9A068F0F701FA002DE0
-:1029F0000BDB029B002B08DB0024089B0394049351
-:102A0000029B049A6B43934205D014488DE7039BC5
-:102A100001345B190393029B9C4200D165E70026B9
-:102A2000AE42F4D0039A079B9446049363449A5DA4
-:102A3000131C092A00D909233100DBB22200380017
-:102A400013F0CEFC0136EBE70548B9E7070080FF3D
-:102A50000C9A0200566F03007F6F0300976F03000C
-:102A6000B46F0300F0B585B0019105000021019815
-:102A700007F024FB041E02D02148FAF7A7FC280027
-:102A800013F0FCFC0600280013F006FD01003000E6
-:102A9000FFF70EFD0700280013F0F0FCA0422CDD2C
-:102AA0000026280013F0EAFCB04224DD32002100A9
-:102AB000280013F0D5FC08F0C1FA019907F092FF45
-:102AC0000AF096F800220F4B08F042FB0E4B002252
-:102AD0000290039107F0B8FA0923002804D0029865
-:102AE00003990AF015F8030032002100380013F0B2
-:102AF00077FC0136D5E70134CDE7380005B0F0BDED
-:102B0000026F03000000E03F00002240F0B587B0F4
-:102B100004910592070013F0BFFC0400380013F085
-:102B2000ADFC0290049813F0B7FC0190A04202D0D3
-:102B30001948FAF74BFC01990298FFF7B9FC0025F8
-:102B40000390029B9D4223DA0026019BB3421DDDC8
-:102B500032002900380013F083FC32000400290001
-:102B6000049813F07DFC059B002B0AD02318092B39
-:102B700000DD092332002900039813F031FC0136EF
-:102B8000E3E7231ADA43D2171340F3E70135D8E716
-:102B9000039807B0F0BDC046F36F0300F8B504001A
-:102BA00008000D001600EFF781FE164FB84201D065
-:102BB00000200FE0053C042CFAD8200007F09AF81A
-:102BC000141403F80B003000EFF7BCFF011C2800C1
-:102BD000FFF748FFF8BD3000EFF7B4FF011CFE20FF
-:102BE000800507F027FDF1E73000EFF75FFEB84200
-:102BF000DED1624262413100D2B22800FFF786FF87
-:102C0000E8E7C04608E50200F7B507000193142085
-:102C100008AB0E0015001C7813F04BFB044B47600B
-:102C20000360019B8660C56003744474FEBDC046AA
-:102C300088E5020070B505000C2013F03AFB052171
-:102C4000044B0400456003600800FFF731FCA060FE
-:102C5000200070BDB0E102000139C9B2054B401837
-:102C600080301970044A03781370044AD25C044B14
-:102C70001A707047372E0020382E0020CF810300B5
-:102C8000362E00200131C9B2054B40188030197032
-:102C9000044A03781370044AD25C044B1A707047DC
-:102CA000372E0020382E0020CF810300362E002042
-:102CB000074B984206D9074B1818074B4118C918FB
-:102CC00008787047054B18184118054BF7E7C046C0
-:102CD000A4920000108003005B6DFFFF24700300CE
-:102CE0000083FFFF03002022F0B57F254F265F27DA
-:102CF000803304001A7089B003007F3019780A000D
-:102D00002A406F2A26D90A003A401900013381313E
-:102D10000A709842F2D17F22B64B1A702300643AAF
-:102D2000FF331A70E4320292531CB348DBB20493AF
-:102D30000370E31880331B78B0490B705B2B0ED106
-:102D40009B22029B0A700133DBB20370E254012024
-:102D500009B0F0BD5F2AD8D90A003240D5E72E2B42
-:102D600013D10232D2B20270A21880321278A14876
-:102D70000270A348825C0120024206D1029A0B70C5
-:102D80001218D2B20292A354CEE10220994A1370D3
-:102D90009B4AD25C104000D0A1E0002A15D1964891
-:102DA000203203780A70E31880331A70029B0133D3
-:102DB000DBB202930370782B01D8E254B4E19B2379
-:102DC000029AA354049B0B70C1E716007F2552B2F0
-:102DD000AE430E70002A03DB8A4B8B4A1A60B7E7BA
-:102DE000413B8A4ADBB28A49D25CCB5C1202134374
-:102DF0000393039B002101339BB218000393FFF759
-:102E000057FF0306F5D5012300260127794D2B70C6
-:102E100039000398FFF74CFF7B1CDBB20193282895
-:102E20005FD1002E00D02F702D780135EDB2290032
-:102E30000398FFF73DFF6B1CDBB2292854D17F2696
-:102E4000069306990398FFF733FF069B3040013342
-:102E5000DBB23D284AD10026684B049A1870664BB5
-:102E60001A70644B019A1A70049B0593059B019993
-:102E7000E31880331B7803980793FFF719FF079B2C
-:102E80009842B6D1019B0133DBB20193AB422FD103
-:102E9000002E02D0584B059A1A70049D013FFFB2D4
-:102EA000544B390003981F70FFF702FF534E03067F
-:102EB00000D509E1504B7F211870514B1B5C1A0063
-:102EC0005BB28A433270002B18DA4B4B013DEDB2F6
-:102ED0001D70631980331B789842DFD089E74D4B12
-:102EE00086E70126019F93E71D00A0E70693A8E768
-:102EF000059B01260133DBB20593B7E7307020282C
-:102F00001BD0232825D02E282CD0262832D040288C
-:102F10004ED05E2856D02B285CD03A2800D02EE127
-:102F2000202629002000FFF797FE344A137833400B
-:102F30001370B3D0304B1D78F3E729002000FFF762
-:102F40008BFE0023F356002B00DA52E72A4B1D7844
-:102F5000A4E729002000FFF77FFE402233781342C8
-:102F6000F4D146E729002000FFF776FE33781B07EF
-:102F7000ECD43EE729002000FFF76EFE10223378E4
-:102F800013403370E2D11C4B1B78E1188031097873
-:102F90003170482900D02CE7013B1749DBB20B7098
-:102FA000E31880331B789343432B00D021E7CDE710
-:102FB00029002000FFF750FE0422337813403370BD
-:102FC000C4D116E729002000FFF746FE33789B06A0
-:102FD000BCD40EE7084B013DEDB21D70651980357C
-:102FE0002B78452BB2D010229343492B00D000E719
-:102FF000ACE7C046382E0020372E0020362E0020A9
-:10300000CF810300040000201070030055820300EC
-:103010003B820300A59200006B1C924ADBB2137046
-:10302000E31880331B7890490B70452B36D1A81CD0
-:10303000C0B2231880331B788C4E33708C4EF656FA
-:10304000002E02DB874B1D783FE010700B70522B77
-:10305000F8D0532BF6D0442BF4D04C2B08D10335A9
-:10306000EDB21570651980352B78592BEAD0C0E682
-:10307000462B00D0BDE6EB1CDBB21370E3188033A7
-:103080001B780B70552B00D0B3E60435EDB21570EC
-:10309000651980352B784C2BD4D0AAE6492B00D06B
-:1030A000A7E6AB1CDBB21370E31880331B780B7000
-:1030B0004E2B00D09DE60335EDB2157065198035B5
-:1030C0002B78472BBED094E6059D019B03980133D6
-:1030D000DBB20193019A654B11001A70FFF7E8FD0E
-:1030E000019B069A5F4F934220D100257F272E0037
-:1030F00001990398FFF7DCFD03003B403D2B04D012
-:10310000029A0132D2B20292A354019A0132D2B28F
-:10311000010600D4A2E0002E02D0544A0199117099
-:10312000514A1370059B0493049AFDE5504B7F218F
-:103130001B5C4D4E1A005BB28A4338703270002B14
-:1031400008DA0135EDB2631980331B783D70834294
-:10315000BBD04EE63070202816D023281ED02E2853
-:1031600026D026282DD0402848D05E2851D02B28A4
-:1031700058D020263A2864D0252800D14CE73D4B72
-:103180003D4A00201A60E3E529002000FFF77AFDA0
-:103190000023F356002B00DB54E72AE62900200029
-:1031A000FFF770FD40223378134200D04AE720E653
-:1031B00029002000FFF766FD33781B0700D541E7A3
-:1031C00017E629002000FFF75DFD10223378134039
-:1031D000337000D036E73B78E118803109783170E0
-:1031E000482900D005E60133DBB23B70E318803399
-:1031F0001B789343432B00D0FBE523E729002000F5
-:10320000FFF740FD042233781340337000D019E7F4
-:10321000EFE529002000FFF735FD33789B0600D548
-:1032200010E7E6E50135EDB23D70651980352B7884
-:10323000452B00D106E710229343492B00D0D8E557
-:1032400000E729002000FFF71DFD074A13783340EF
-:10325000137000D139E7034B1D78F2E70192012684
-:1032600046E7C046372E0020362E0020382E00209C
-:10327000CF810300040000201A700300F0B503683A
-:1032800099B00700986807910FF0BEFC431E0493A5
-:10329000031D9B00FB1802933B0001220F218000BD
-:1032A00014331B180393FB6806A81A4009180A7008
-:1032B000032293430A930CA8F9F7EAF9031E00D0FE
-:1032C00040E3079A7D68BC68002A00D19DE22A7815
-:1032D0005E2A00D199E207980793F9F791FF04005D
-:1032E0000AE0D64B63600434D54B9A6C002A00D1B7
-:1032F0008AE200229C6C9A64F9F7E8F90D9421E3C4
-:10330000D04BEFE7D04BEDE77F216B785B06DB1707
-:103310003278DB01100052B2084003430136002A24
-:10332000F6DB01225B001343DCE700237F213278C8
-:10333000DB01100052B20840C3180136002AF6DB48
-:10334000DB000622EFE703220336964308CEC9E7E7
-:103350000023C7E700237F213278DB01100052B23F
-:103360000840C3180136002AF6DB9B005B42029A34
-:103370009858002800D027E3B449B5480FF052FF11
-:10338000ADE700237F213278DB01100052B2084004
-:10339000C3180136002AF6DB029A9B005B4298585C
-:1033A00012F01EF9E5E700207F223378C0011900F2
-:1033B0005BB2114008180136002BF6DB251DF9F72A
-:1033C0000FFA60603EE000207F223378C0011900D0
-:1033D0005BB2114008180136002BF6DB251DF9F70A
-:1033E000CDF9EEE700217F223378C90118005BB2E6
-:1033F000104041180136002BF6DB206811F0EDFA81
-:10340000206071E700217F223378C90118005BB288
-:10341000104041180136002BF6DB220001CCF9F7F1
-:1034200059FB61E700207F223378C00119005BB2AD
-:10343000114008180136002BF6DB21000839251F42
-:10344000F8F73AFC2C004FE7251DF9F7E1F9B8E74A
-:10345000251F042221682868EFF798FC2860F1E70F
-:1034600000237F213278DB01100052B20840C318DC
-:103470000136002AF6DB9B005B42029A21689950D4
-:10348000F7E000237F213278DB01100052B20840C0
-:10349000C3180136002AF6DB029A9B005B422168C2
-:1034A0009858251F12F09EF8CCE700207F22337831
-:1034B000C00119005BB2114008180136002BF6DB81
-:1034C0002168251FF9F7BAF9BCE700207F2233787D
-:1034D000C00119005BB2114008180136002BF6DB61
-:1034E0002168251FF9F7C2F9ACE700217F22337864
-:1034F000C90118005BB2104041180136002BF6DB01
-:10350000231F1A682068F9F70DFB083CECE622003F
-:10351000231F083A216812681868EFF737FC0C3C43
-:10352000E2E600237F213278DB01100052B208402E
-:10353000C3180136002AF6DB029A9B00D31A1A68D8
-:10354000002A00D118E700221A60CDE600257F226C
-:103550003378ED0119005BB211404D190136002B93
-:10356000F6DB029BAD005D1B286812F039F80028DD
-:1035700000D101E70021286812F034F8B4E60020F9
-:103580007F223378C00119005BB211400818013660
-:10359000002BF6DBF9F75EF9A6E600207F223378F0
-:1035A000C00119005BB2114008180136002BF6DB90
-:1035B000F9F768F998E6236894E62368A360231F67
-:1035C0001B68636008348FE6231F19682268216036
-:1035D000BAE7221F1368216823602300083B18689C
-:1035E0001060196080E6737832781B021343ED187F
-:1035F000184BEE1878E633787678206836021E434A
-:103600000196EFF779FBEE1C251F2C00002800D156
-:103610006AE6114A019B94466344F61864E63378DF
-:103620007678206836021E430196EFF765FBEE1CA4
-:10363000251F2C00002800D056E6EAE7C4E7020068
-:103640007C2E0020E4B30200CCE702006F8203006E
-:10365000B0AA02000380FFFF0080FFFF3378767876
-:10366000206836021E430196EE1CEFF745FB00284A
-:10367000CFD1043C38E633787678206836021E4392
-:103680000196EE1CEFF738FB0028C2D0F1E7F121DC
-:103690002668220030004900F9F71CFA2300F021C7
-:1036A00008331A00300049000193F9F713FA00219A
-:1036B000019A080011F082F9AB786A781B02134373
-:1036C0000A9A0F210C320A920A9AEE1CF318136020
-:1036D000022206ABC9180B780A9D1A43231D134317
-:1036E0006B6000230A9A0B709360A060019CFBE55D
-:1036F00025002368B54A0193083D934209D16360D0
-:10370000A3602A000021032011F058F9019B2B60CF
-:1037100098E60122019B134005932AD0231F1A68C3
-:103720000592019A5210012A0DD1A84A0C3C1A6048
-:10373000E260226100212200032011F03FF9059B85
-:1037400023600323E3E72A68002106929F4A0320AF
-:103750002A601A602300103B22601A00019311F0C6
-:103760002DF9019B069A0C3C1A60059B23600523EA
-:10377000CDE7019B63601800EFF798F8934B20604A
-:10378000A3602A000599032011F018F9EFF7B4FAA5
-:1037900000280DD001228D4B06A92B600A9B5B6887
-:1037A00013400E32521813700A9B0C3B0A9349E6E1
-:1037B0006368ACE7737832781B021343844AEB18D2
-:1037C0009B186360EB78083423600F267F2102206A
-:1037D000012506AA2368B6180B4206D1221F1668D7
-:1037E000002B00D191E6183C7EE50A9A013B526815
-:1037F00002426FD0220008C20523636014000A9BB6
-:103800001E680A9B0C3B0A9335007D602B786E1C6A
-:10381000180010385A2800D905E306F07FFA62FD37
-:1038200071FD73FD040375FD040386FD94FD99FD90
-:103830009BFDB2FDC4FDD4FDE3FDF3FD03FE15FECB
-:1038400019FE21FE32FE46FE56FE66FE78FE82FE20
-:1038500097FEB0FEBEFE0403040304030403CCFE83
-:10386000CEFE2AFFD5FEDAFEE4FEECFE00FF1FFFCF
-:103870002CFF04030403040338FF69FF63006300A3
-:103880008000AE00BF00DD00DD00CBFFB30004030D
-:103890000403040304030403040304030403E9000E
-:1038A000FB0004030D011C01040325015201370133
-:1038B00073018901380268029602800204039E01A6
-:1038C000A901B401C101CD01EA0104022102CE0225
-:1038D000ED02FE020A9A52682A4032700A9A0C3AA5
-:1038E0000A9279E7737832781B0213430A9AEE1C26
-:1038F0000C320A920A9AF31813602B7806A9403BFF
-:103900005A4253410F22521810785B000A99034320
-:1039100023434B6000230A9913708B60E4E423680F
-:103920002A4A934200D1A4E6DA0707D55B10DBB23E
-:10393000043C012B00D048E70222CEE1F8F7C6FE96
-:1039400023680D930D9B23491868F8F7C5F90028E3
-:1039500000D1AEE27A68002A00D1AAE21378432BA4
-:1039600000D098E2937850781B02D11C0343CB1807
-:103970007B60BB68103BBB609DE400212068F9F7C9
-:10398000F5F83DE52500210020680C35F9F7EEF843
-:10399000844200D156E50023236012E520003378ED
-:1039A00076780C383602BC601E4303680196EE1C24
-:1039B000002B02D12300083B1868F9F711F9002801
-:1039C00002D1103C019B28E660608CE4E4B3020065
-:1039D0000380FFFFDCAB020001220A9B06A95B68A3
-:1039E00013400E32521813700A9B0C3B0A937BE46F
-:1039F00000207F223378C00119005BB21140081803
-:103A00000136002BF6DB8100641A04342100F2F742
-:103A100031FEF5E400207F223378C00119005BB24B
-:103A2000114008180136002BF6DB8100641A0434BB
-:103A3000210013F015F8E3E400207F223378C00161
-:103A400019005BB2114008180136002BF6DB251D6A
-:103A500011F0D9FEB5E42500231F083D1A6821683E
-:103A6000286811F009FFEDE400207F223378C001BF
-:103A700019005BB2114008180136002BF6DB8100FB
-:103A8000641A04342100ECF7D7FDB9E400237F2148
-:103A90003278DB01100052B20840C3180136002A08
-:103AA000F6DB251F28682168022B03D1CC4AF4F7E6
-:103AB00009FAD3E4083C0A0001002068F4F702FA8E
-:103AC0009EE400237F213278DB01100052B20840CF
-:103AD000C3180136002AF6DB9A08920052421059A8
-:103AE000032221681340251F002B02D100F074FB34
-:103AF000A8E4012B03D12A6811F0BEFE05E50DF004
-:103B000069FD9FE400257F213378ED011A005BB247
-:103B10000A4055190136002BF6DB220029002068E7
-:103B2000F9F71CFAAF4B5D19AD006419FFF7DCFB28
-:103B300000257F213378ED011A005BB20A40551948
-:103B40000136002BF6DB220029002068F9F75AFA2B
-:103B5000FF222B0A13401540E5E70322F31C934391
-:103B60000022186811001E1D251D0EF09EFF28E47E
-:103B70000322F31C9343251F2268296818681E1D21
-:103B80000EF093FF6AE40322F31C934319795E1D40
-:103B90008A00A41A0434220018680EF0A2FF2FE451
-:103BA0000322F31C934318798021C24349009200F9
-:103BB0005E1DA4180143EEE700207F213378C00189
-:103BC0001A005BB20A4010180136002BF6DBFF2505
-:103BD000FF220100C3096D0011402B405B189B00C0
-:103BE000E41A000A0240231D2068F8F7C9FEFFF717
-:103BF00007FC00217F223378C90118005BB2104016
-:103C000041180136002BF6DBFF22CB09520013408E
-:103C1000CAB29B189B00E41A083C22000020F9F766
-:103C200047F8FFF7EDFB00237F203278DB0111001E
-:103C300052B20140CB180136002AF6DBFF211800F2
-:103C4000FF250840DA096D002A40451C52199200F0
-:103C5000A41A1B0A1940220010F0B0FEFFF7D0FB97
-:103C600000217F223378C90118005BB2104041184F
-:103C70000136002BF6DBFF22CB0952001340CAB2FB
-:103C80009B189B00E41A0C3C22000120C7E70F227E
-:103C900006ABD2181378002B00D14DE601210A9B08
-:103CA0005B680B4013700A9B0C3B0A9344E60A9B2B
-:103CB0005B6813420ED003220A9B21685B68934322
-:103CC0001C0059609A600A9B08341E680A9B0C3BD2
-:103CD0000A9399E50A9B0C3B0A930A9B03998B4232
-:103CE000E5D2F8F7F3FC0020BC6019B0F0BD6B78AA
-:103CF000022B03D1043C2068FFF7EFFA002BFAD126
-:103D00000A9B039A934203D237493848FFF736FBA0
-:103D10009868002801D0FFF7E0FA0C3BF1E7231F79
-:103D20000593079B0193231F1868019B002B19D053
-:103D30000021079B07910193019A0BABF9F7E6F974
-:103D40000B9B012812D12E002360F8F7BFFC0F2334
-:103D500006AA9B181A780A9B7E601343BC60FB601E
-:103D60000120C2E70BAB019A2168E7E7002811D1D7
-:103D7000043C002B00D11A4B2360019B002B19D06F
-:103D80001B4918000FF058FA002813D0F8F79EFCD2
-:103D9000019BD6E5174918000FF04EFA002805D010
-:103DA0000B98F4F74BFB043C2060E6E7F8F78EFC39
-:103DB0000B9BC6E5059CFFF797FA00207F2233781E
-:103DC000C00119005BB2114008180136002BF6DB68
-:103DD000251F2A682168F9F731FAFFF73FFBC04633
-:103DE000E4B30200FFFFFF3FB5820300A0AB020077
-:103DF000D0A80200DCAB020000217F223378C90189
-:103E000018005BB2104041180136002BF6DB25008C
-:103E100001CDF9F725FAFFF7D4FA2068251F10F035
-:103E2000E8FDFFF70FFBAF2B05D80120803B5B00BF
-:103E30000343FFF757FABF2B04D8B022D31A9B00D5
-:103E4000FFF795FACF2B04D8C022D31A9B00FFF7B7
-:103E500014FBD62B06D8D03B18002168F8F71EFDBE
-:103E6000FFF7CEFAFA2B08D8251FD73B1800226897
-:103E70002968F9F7B3FAFFF7F1FA454945480FF019
-:103E8000D1F90400F8F722FC049B04339B00FB18D3
-:103E90005C60022029E75E2B0BD1BC680D98231DC6
-:103EA000BB60F4F7CBFA60607B6801337B60FFF79F
-:103EB00002FA0D9B384A93422AD0384A934227D0BF
-:103EC0003B6898680EF0A6FE0EF0A4FE7B68051D08
-:103ED00028005C1B0EF098FE060028000EF09AFEEB
-:103EE00005000EF091FEA41B060028000EF092FEC5
-:103EF00005000EF089FE019028000EF08BFE0122D5
-:103F00000378002B09D1330001990D98F4F736FBA3
-:103F10000F2306AA9B1801211DE059B2002909DBD5
-:103F200019001F255B09294001308C42EBD3641A2C
-:103F3000D218E5E70F21E0251940ED001B012B40C9
-:103F4000457802302B43F0E70A9A52680A401A700B
-:103F50000A9A0C3A0A921A78002AF5D10A9903981B
-:103F60000D9A81420DD3012119700A9B02311B6801
-:103F70007B600A9B5B688B430A9904338A601A60F2
-:103F8000F9E4049B04339B00FB185A6081E7C046A8
-:103F90009B820300ECAA020048A7020058A7020077
-:103FA000F0B5304B8FB007AE0138009304310723D2
-:103FB0000196FEF7B1F90023B0682B4F0393B84286
-:103FC00003D0EEF75BFDC3B2039370691825B842C6
-:103FD00002D00EF06FFF45B2B0691924B84202D08A
-:103FE0000EF068FF44B23069B8420DD005AA022134
-:103FF000EEF708FE059B18680EF05CFF059B45B2C6
-:1040000058680EF057FF44B201210E00A022AE40C6
-:10401000A140164BD205D75815483E430590D650BF
-:10402000D6588E43D650134A03218550C4502800D9
-:1040300014F0A8FD2000032114F0A4FD079905A8A1
-:1040400005F076FA0A9B039A089905A805F080FA0C
-:104050000799094805F0F6FE084B01301880024820
-:104060000FB0F0BD60E60200E4B3020014050000EA
-:10407000002000400C050000C8320000C02D0020C8
-:1040800010B5F5F743FB034B002800D1024B180095
-:1040900010BDC046CCE70200C4E70200F7B50D0032
-:1040A00014001E00002A07D0F5F730FB002805D1C8
-:1040B0000B230124336064422000FEBD2E002F1923
-:1040C000F5F730FB741C3070BC4213D00A4B1B88D0
-:1040D00000930FF016FB0190F5F718FB260000285F
-:1040E000EED10FF00EFB019BC01A009B8342F3D868
-:1040F000641BE1E73C00FBE7C02D00200F2310B557
-:104100001940012908D00300002909D0022909D14A
-:1041100011F0D6FA030003E0044B002800D1044B51
-:10412000180010BD11F0E7FAF4E7C046CCE7020032
-:10413000C4E7020000B58BB0F9F788FE684612F0BC
-:10414000C2FB054BD968091A8908F9F73BFEF9F754
-:1041500095FE0BB000BDC0467C2E0020002803D089
-:10416000012807D0002004E08B680448002B00D110
-:10417000034870478B685B001843FAE7CCE70200FE
-:10418000C4E70200044B88600B60044B08004B60DE
-:104190000023CB607047C0466C980200EB680200B9
-:1041A00000238168F0B5CA0F094C521852100E193D
-:1041B0009A4201DC0748F0BDC568F11A9C008900ED
-:1041C0002C196D5827682560C46801336750EFE7E4
-:1041D000FFFFFF3FE4B3020070B583680D00416844
-:1041E00004008B4212D3C900C06812F080F86368E3
-:1041F0000A495A00A3686260D21A013352189B0020
-:10420000E0609200C018002114F0DFFDA368E268AE
-:10421000591C9B00A16002489D5070BDFFFFFF3FED
-:10422000E4B30200F8B5070016004C10836812D5FD
-:10423000E41810D500240D4D38002900FFF7CCFFFD
-:10424000BB68591E9B00FA68181F8C4207DBA4004C
-:104250002800A650F8BD9C42EDD91C00EBE7D3180E
-:10426000083B1B68013913500300ECE7E4B302007C
-:1042700070B50025040085601021C06812F037F881
-:1042800004232900E0606360102214F09EFD0148C1
-:1042900070BDC046E4B3020030B50C0085B0104BD1
-:1042A00002AD04310093013802230195FEF734F882
-:1042B00023680C4C996801290FD9D8680A4B029AD7
-:1042C000C91889004118A24200D100222D79074B5C
-:1042D000002D00D1064B12F016FB200005B030BDBA
-:1042E000ACE60200E4B30200FFFFFF3FC4E70200B8
-:1042F000CCE7020070B50C680B00A1680200002931
-:1043000003D11949194810F095FB2068012A27D0DC
-:104310005A680023EEF78AFCE168A26886008B19D0
-:10432000013A1D680436A260121A92008919180019
-:1043300014F038FD0021A368E0689A00115061680C
-:1043400004290BD95B00994208D949088900E06823
-:1043500011F0CDFF6368E0605B086360280070BD0A
-:1043600001225242D5E7C046D482030084A902004C
-:1043700007B5009001910220694612F02CFB6946B6
-:1043800001900220FFF7B6FF00480EBDE4B3020023
-:1043900070B50E000D490500002412F07AFCB368D8
-:1043A000A34204D828000A4912F073FC70BD002C07
-:1043B00003D00849280012F06CFCF168A300012228
-:1043C00059582800EEF78AFA0134E8E70F35030060
-:1043D0001D06030045FC020070B5032604000D0015
-:1043E0000E4029D1174B0A689A4225D183688A6802
-:1043F00099184368994210D904318900C06811F0B6
-:1044000076FFAA68A368E0609B181A1D9B00626093
-:10441000C0181022310014F0D8FCA368E968980095
-:10442000E3681818AB689A0014F0B3FCAB68A26894
-:10443000D318A360044870BD2900200012F0D4FAFC
-:10444000F8E7C04688E70200E4B302000B4B70B502
-:10445000050003600C000800042900D204206860F5
-:10446000AC60800011F025FF6A68E860121BA400B0
-:1044700092000019002114F0A8FC70BD88E702002A
-:104480007FB50D00160012283ED005D8052819D09A
-:1044900007283FD0002434E00300193B042BF9D84F
-:1044A00093070DD1284B12689A4209D1B368009343
-:1044B0008A68F368C968FDF753FA244C002820D1B4
-:1044C000234C1EE0032300241340A34219D11C00F7
-:1044D0001D4A3368934214D18B68B268981812F061
-:1044E0009CFA0400AB68E9689A00C06814F051FCBB
-:1044F000A868E36880001818B368F1689A0014F09F
-:1045000048FC200004B070BD11002800FFF764FFD4
-:104510002C00F6E703A91000EEF7EEFA0024A04203
-:10452000EFD0039BA34200DA0394AB68039858438F
-:1045300012F073FAC36804000093AA68039B042175
-:10454000E86811F056FBDCE788E70200CCE70200E0
-:10455000C4E70200F0B5032704008BB00E00100082
-:104560000F40002A33D1002F2AD1654B0A689A42A6
-:1045700026D104AAA068FDF777F9002802D1614886
-:10458000F9F716F90599049BA268E0685D1A521ABA
-:104590009B00890041189200C01814F003FCA36826
-:1045A000AA00E818E368800018185242390014F095
-:1045B0000CFCA3685D19A560534D28000BB0F0BD3D
-:1045C00007A9022007940896FFF794FEF4E7042A4F
-:1045D0002CD1A068002F1FD1494B0A689A421BD1E9
-:1045E00007AAFDF741F9002806D107AAE168A068EB
-:1045F00011F012FB0500E0E7079B0898C01A12F0C3
-:104600000CFA8368E1689A00079B05009B00C918B3
-:10461000C06814F0BEFBD0E7002301003200206820
-:10462000EEF704FBE3688000C558C6E7364D002F5F
-:1046300060D1334B0A689A425CD103AA02A9EEF713
-:10464000BFFA07AA3100A068FDF70EF9002896D03E
-:10465000079B029A08999E180191761AE068002E2D
-:1046600027DDA368F1186368994206D9890011F023
-:104670003EFEA368E0609B196360029A079BA168F5
-:104680009B18F21A52180899E0689B00890041189B
-:104690009200C01814F086FB029B03999A00079BB6
-:1046A0009800E368181814F07DFBA3689E19A660B3
-:1046B00083E79B000399C018920014F06AFB0899E5
-:1046C000A268E368521A8900019359180798029B5F
-:1046D0009200C018019B8000181814F063FBA368B7
-:1046E000B200F018E368800052421818390014F044
-:1046F0006CFBDAE702003100200012F0CFF95CE732
-:10470000E8A402003B830300E4B3020010B53E2896
-:1047100003D040282ED03C2813D1532924D013D8BD
-:104720004C2921D007D8482950D049291CD04229EA
-:1047300007D1012348E04F2903D3502914D9512927
-:1047400047D02548F8F742FE68293FD006D86429AB
-:104750003FD0662908D06229F3D1EAE76C2903D05B
-:10476000712936D06929ECD101230420002A00D018
-:10477000136010BD512926D010D849290CD006D875
-:104780004229D6D0482918D00129DAD1D1E74C29BD
-:1047900002D0D6D34F29D4D30423E6E76629FBD031
-:1047A00006D86229C5D064290DD05329F4D0C8E7B2
-:1047B0006929F1D003D86829C3D1022304E06C2908
-:1047C000EAD07129BDD108231800CFE701230220C8
-:1047D000CCE701230820C9E7E882030010B551287F
-:1047E0003DD011D849282ED007D8422803D04828D8
-:1047F00026D0012806D18B5C10E04F284BD017D86B
-:104800004C2820D0002309E0682816D00AD8642854
-:1048100036D066282AD06228F4D18B5601205B005E
-:10482000184314E06C2803D0712811D06928E9D10D
-:104830009200505810F044FF09E05200535EEDE73B
-:104840005200535AEAE79200505810F054FF10BD3E
-:10485000D2008A181068516810F023FFF7E7D200E1
-:104860008A181068516810F037FFF0E703239200B0
-:1048700050589843030002201843084BC018E6E73D
-:10488000D2008A181068516808F004FA0323020065
-:104890009A431300EFE792005058D8E70000808059
-:1048A000F7B51700156801AA04000E00FFF72EFFE8
-:1048B000402C05D1019B043C5A1EAA185D421540AC
-:1048C0005A213E3C62426241B14289412B183B6011
-:1048D000D2B22B00494212F0EEF804000D004F2E28
-:1048E00008D0532E07D114F0C4FA00220100200092
-:1048F000ECF72EFBFEBD662E06D10323022498435F
-:10490000154B2043C018F5E7642E06D108F0C2F914
-:104910000323040002209C43F2E75A2E0FD9802281
-:104920000023D20512196B41002B04D1002A02DBAF
-:1049300010F0C6FEDEE7290010F0B3FEDAE700292A
-:1049400005D1064B984202D810F0D5FED2E72900D7
-:1049500010F0C2FECEE7C04600008080FFFFFF3FA0
-:10496000F0B589B0160005AA02931C6801900F00EB
-:10497000FFF7CCFE019B0500402B06D1059B5A1E7C
-:10498000A2185C423C2314400193029A63191360FD
-:10499000019B3E3B03935A425341DBB20293642F87
-:1049A00012D0662F0BD04F2F2AD12800042D00D90A
-:1049B000042033002200029912F0A6F82CE0300007
-:1049C000EEF7C0F80600F0E73000EEF7BBF808F0AD
-:1049D0000FF9029B0690079108AA9B00D318083B89
-:1049E00022001B680299042012F08EF8039B043405
-:1049F0005A1E934108AA9B00D318083B1E68D4E7AF
-:104A0000B3070BD1104B32689A4207D123002A001A
-:104A10000299300010F021FE09B0F0BD3000EEF731
-:104A20002DF80600042DC0D900215A2F02D9884242
-:104A300000DAFF312A00200014F0C7F9019B3E2B59
-:104A4000B3D12B1FE418B0E72CB90200F7B506006C
-:104A50000F0014001D0064280DD0662804D04F28D4
-:104A600013D19400E35105E0940018000F19EEF7FC
-:104A700069F83860F7BD1800EEF764F808F0B8F888
-:104A8000E4003F1938607960F4E703232B40019379
-:104A900011D10E4B2A689A420DD1019A0100402093
-:104AA000FFF734FE230043430200FB18019928005E
-:104AB00010F0D3FDDEE72800EDF7E0FF2200030051
-:104AC0003900300012F033F8D4E7C0462CB90200A8
-:104AD00010B50B790349002B00D1034912F0D9F826
-:104AE00010BDC046556B03004F6B030037B50C007B
-:104AF000110000221D00009201232000FDF7DCFBC5
-:104B0000002C05D02868EEF7F7F8034B002800D1F9
-:104B1000024B18003EBDC046CCE70200C4E70200CD
-:104B2000F0B505008BB008680C00ECF753FE04905C
-:104B300004A812F050F800260127049B0390069366
-:104B4000069B197800291AD13000F1F793FD012254
-:104B5000070007A96068EEF74BF9079B089A0593D1
-:104B60009B180193022D1FD9A068EDF787FF00283D
-:104B700017DA089BC01814D52848F8F727FC080056
-:104B8000F3F776FD002806D006A812F036F8069B4B
-:104B90001B78732B00D13800069B3618013306931F
-:104BA000CEE7059B181805900025B54202D33800C2
-:104BB0000BB0F0BD049B01241878F3F759FD0028D1
-:104BC00003D004A812F019F804000598019A0319FB
-:104BD0009A42D1D3049B1B78732B10D02D19AB00B4
-:104BE0000293049B013C14D3197805AA0398FFF79C
-:104BF00057FE029AA300D31AFB185860F1E7210070
-:104C0000ECF7BEF9059B1C19AB1C9B000594013504
-:104C1000D851049B01330493C7E7C046F5820300D3
-:104C2000F0B589B0039101921E00ECF7D3FD04901A
-:104C300004A811F0D0FF00250290B54201D309B0BD
-:104C4000F0BD049B18780028F9D0F3F711FD01247A
-:104C5000002803D004A811F0D0FF0400039B019AA0
-:104C60001B199A4202D21B48F8F7B0FB049B1B7831
-:104C7000732B10D02D190E9BAF00DF19049B002C55
-:104C800024D0A20052421978BA5803AB0298FFF719
-:104C900067FE013CF2E70E9B6F1CAD00E858012255
-:104CA00005A9EEF7A5F8069DA54200D925002A0022
-:104CB0000599039814F06DF8039B621B58193D0089
-:104CC000002114F082F8039B1C190394049B013308
-:104CD0000493B2E7F5820300F0B50E0089B00390AB
-:104CE00001CE0F0011F09FFF4410210004A812F024
-:104CF0001BFA069D22000021280014F066F8039B91
-:104D00000096013B2A1929003868FFF789FF04A99A
-:104D10000248ECF7E7F809B0F0BDC046A0920200E7
-:104D200030B50C0089B005000222606805A9EEF7D5
-:104D30005FF8A068EDF7A2FE002806DA069B039351
-:104D4000C01802D50848F8F741FB0599069AEB1EF2
-:104D50008A18091820000C3000902068FFF760FFC7
-:104D6000024809B030BDC046F5820300E4B302003A
-:104D7000F0B587B0039205910D9A03990500521A78
-:104D80000CA9097820200C00844339D030293BD06D
-:104D90000CA902910121802401911C4036D0D40F2E
-:104DA000A4186410171B002C37DD2600019B049308
-:104DB000B34200DD04966B68049A0299286898470C
-:104DC000049BF61A002EF1DC039B002B06D01A0080
-:104DD00005996B6828689847039BE418002F0CDD41
-:104DE000E419019EBE4200DD3E00320002992868AF
-:104DF0006B689847BF1B002FF3DC200007B0F0BDA5
-:104E0000074902911021C6E70649FAE701271F402A
-:104E100001D11400C7E71700D6E70024D4E7C04645
-:104E20001883030029830300F0B593B01C0018AB6E
-:104E300020CB05901B780F0016000793CB070BD4EF
-:104E40008B0703D1854B0A689A4205D03800EDF7ED
-:104E500015FE01274000074381231D4209D1079B0E
-:104E6000302B06D11A9B1B9A934200DA1A92002328
-:104E70001B93380010F001FC0AAA1300002806DB7F
-:104E8000AB070FD52B231370123B04AA9B18E1B27A
-:104E9000EA0615D5022E0CD130221A704A1C5A701F
-:104EA00002330DE013006A07F1D520221A7019238E
-:104EB000EBE7082E3BD130221A70AA0534D4013317
-:104EC00000220AA81A701B1A2C200693AB06DB17C7
-:104ED00018400EAB0B9310230C931B9B0D92012BD0
-:104EE00001DD40231D43402404ABDA752C400390C0
-:104EF000029123D03B00019200960DAA0CA90BA8A9
-:104F0000F7F7F2FA037807002D2B00D08EE004AA01
-:104F1000D3750D9B1B9A013B01370D93012A00DDD0
-:104F200097E00026340035E00A000E32B7E7102E75
-:104F3000C6D130221A700A001732B0E70AAB0193CB
-:104F400000963B000DAA0CA90BA8F7F7CDFA1B9B06
-:104F500007002600012B1DDD0D9B1B9C9C4200DAE7
-:104F60001C001A9BA3425EDD01261C1B2E4001D0B3
-:104F70002600002401239D432F330793002C09D0E2
-:104F8000103B0093002301941A0035490598FFF760
-:104F9000EFFE04006B0621D5172104ABC9180B786E
-:104FA000002B0AD000230122009301920598FFF7FD
-:104FB000DFFE1A9B2418013B1A93069B002B0DD091
-:104FC000012301930023069A00930AA90598FFF78D
-:104FD000CFFE1A9B069A24189B1A1A931B9B012B2F
-:104FE00001DC1A9B1B931B9B0D9A0193079B3900B5
-:104FF000009305982B00FFF7BBFE2418002E09D064
-:1050000020230093002301961A0015490598FFF705
-:10501000AFFE24180B980EAB984201D011F078F92E
-:10502000200013B0F0BD00263400A3E71B9B012B2A
-:1050300000DC76E70D9B1B9C9C4200DA1C001723CA
-:1050400004AA9B181B78002B00D00134069BE4189F
-:1050500087E71B9C9C42F8DA1C00F6E72CB902009B
-:105060003B830300F0B50600140000278DB00D004F
-:105070002B78002B15D1A94217D30B78002B00D128
-:1050800048E14B1C049320230025302208210420F2
-:105090000893049B1B78002B11D10693013B0793C7
-:1050A0005FE0252BE7D00135E2E76B1A04931A0085
-:1050B000306873689847049B2900FF18DDE72D2BA3
-:1050C00005D12C3B1D43049B01330493E1E72B2BBB
-:1050D00001D1293BF6E7202B01D10543F3E7212B32
-:1050E00001D10D43EFE7302B2CD110331D43089233
-:1050F000E9E7069A4A43D318303B0693049B0133F1
-:105100000493049B1B781A00303A092AF1D92E2BFC
-:1051100047D1049B5B782A2B18D0049B0A210133CA
-:10512000049300230793049B1B781A00303A092A42
-:1051300017D8079A4A43D318303B0793049B01338F
-:105140000493F0E700230A210693DAE7049B023375
-:105150000493236804340793DB43079ADB171A4050
-:105160000792049B1B786C3B5A425341049AD31814
-:1051700004931B780593002B00D1CBE0642B00D166
-:10518000A1E022D8502B29D00ED8453B022B00D8C5
-:10519000A9E001220499306873689847013709949F
-:1051A00052E001235B427AE7059B622B3CD057D843
-:1051B000582BEED1231D0993069B01950393089B61
-:1051C000029341230093313B7BE0059B712B53D02D
-:1051D0000FD8672B00D886E0702BDAD1231D0993F6
-:1051E000069B01950393089B029361230093513B17
-:1051F00067E0059B752B5AD0782BEFD0732BC8D165
-:10520000231D24680993002C49D0079B013303D147
-:10521000200013F02EFE0790069B079A0193089B2F
-:10522000210000932B000BE0231D09932368002B22
-:105230000ED0069B04220193089B384900932B0053
-:105240003000FFF795FD3F180499099C01310EE7E6
-:10525000069B05220193089B314900932B00EFE741
-:10526000231D099323680BA90B70069B0122019350
-:10527000089B00932B00E3E7231D0BA920680993EB
-:1052800010F07DFB079B0100013301D10B9B0793BD
-:10529000069B079A0193089B00932B00D0E7069B7F
-:1052A00006220193089B1F4900932B00C8E7231D8A
-:1052B0000993069B01950393089B02936123009336
-:1052C000573B00220AE0231D0993069B012203930A
-:1052D000089B0195029361230093573B216830009E
-:1052E00011F0E6FCAFE7072307349C432300206856
-:1052F00061680833099307F0CDFC079B011C0293FA
-:10530000069B059A0193089B300000932B0011F037
-:105310003CFD98E738000DB0F0BDC04606830300A1
-:105320000B830300118303000023F0B52F4E93B0CD
-:10533000050006A81400336001910127F7F7A8F9CA
-:105340002740031E35D1E2062DD56A68A9681120D1
-:1053500010F028FC05002E6829000125019A03A8F9
-:10536000FCF778FCA3082B400022310003A8F5F7D6
-:1053700049FF04000320EEF751FE20000FF00FFB61
-:1053800001204042EEF74AFE2C00F7F79FF9002F6C
-:1053900024D029001648F4F7DDF93C000121144817
-:1053A000F4F7D8F91AE0A306D5D528000DF0E3FAF2
-:1053B000D0E701204042EEF731FE002F03D001215B
-:1053C0000B48F4F7C7F90798EDF770FA0949F6F7B3
-:1053D00083FC041E05D03468002FDFD1200013B0F9
-:1053E000F0BD07990448EDF79DFAF5E7542B00202E
-:1053F0003A83030054AC020084E8020010B586B082
-:10540000202102A8802411F07EFE64001E480EF0C8
-:1054100053F900231D4803930EF04EF9F4F782F977
-:105420000128F3D002280BD119480EF045F902A843
-:1054300011F08BFE01220020164B1A7006B010BD31
-:10544000032802D100230393E8E7042804D0C1B263
-:1054500002A811F0B8FEE1E70F480EF02DF9039B0A
-:105460000193002B08D10A480EF026F902A811F08A
-:105470006CFE80204000E1E71122012102A8FFF725
-:1054800053FF2042C5D0D9E7F4830300A83A0300B4
-:10549000DC3F0300EA000020720A030030B587B049
-:1054A000202102A8802511F02EFE6D0037480EF055
-:1054B00003F937480EF000F90024364902A8039496
-:1054C0000DF0AEFB01280AD133480EF0F5F802A822
-:1054D00011F03BFE2000314B1C7007B030BD02289C
-:1054E00003D12D480EF0E8F8E0E7032801D12A485F
-:1054F000E0E7042808D128480EF0DEF802A811F0F1
-:1055000024FE80204000E8E7052827D124480EF03B
-:10551000D3F80394F4F706F96B46C1B2DC1D217091
-:105520000329E4D004290AD11B480EF0C5F8012153
-:10553000162202A8FFF7F8FE2842BDD0CDE702A848
-:1055400011F041FE23780D2B03D116480EF0B4F86C
-:10555000E0E701212000F4F7FDF8DBE7039B002BD7
-:10556000AAD002A811F01DFEF1F7A6FF00280BD06B
-:105570000A2102A811F027FE0B4902A80DF050FBEA
-:105580000328B4D00428ECD10021D1E73C830300E8
-:105590008D830300B3830300DC3F0300EA00002097
-:1055A000B8830300E8830300EF83030010B5EDF731
-:1055B000C9FA044905F016FA04F0C8FD0EF089F89E
-:1055C000014810BD00007A44E4B3020010B5EDF7C5
-:1055D00055FA002801DD0EF07CF8014810BDC046E8
-:1055E000E4B3020010B504000800EDF747FA6410B8
-:1055F0002018034C400020400124204310BDC04629
-:10560000FEFFFF7F10B5EDF739FA002801DD0EF03F
-:105610005CF8014810BDC046E4B3020010B50EF0BE
-:1056200070F8034B400018400123184310BDC046DA
-:10563000FEFFFF7F10B50EF060F8034B40001840EE
-:105640000123184310BDC046FEFFFF7F054B10B578
-:105650009A6C002A04D00022986C9A64F7F73EF8FE
-:1056600010BDC0467C2E002010B5034B186811F009
-:105670009FFF10F025F810BD5829002010B5034BEE
-:10568000186811F09CFF10F01BF810BD582900207D
-:1056900010B5034B186811F099FF10F011F810BD08
-:1056A000582900201FB500210320F0F7E3FF0A4B23
-:1056B0000400196801A811F06EFF019810F000F8BD
-:1056C000A06002980FF0FCFFE06003980FF0F8FF75
-:1056D0002061200004B010BD5829002010B5EBF760
-:1056E00059FC0023064A99008958814205D00133AC
-:1056F0000C2BF8D10348F7F769FE180010BDC0461F
-:10570000C4E802000F840300094A70B51378002B27
-:105710000DD1084D2C78E4B2002C08D10133137060
-:105720002B70054B186803685B6898472C7070BD38
-:10573000392E00203A2E00205829002010B5FFF7FE
-:10574000E3FF054B186811F062FF044B8000C3585B
-:105750000620DB00184310BD58290020C4E80200D1
-:1057600010B50800FFF7BAFF0400FFF7CDFF054BA7
-:10577000186811F04CFF044BA04200D0034B1800F6
-:1057800010BDC04658290020CCE70200C4E7020043
-:1057900010B50800FFF7A2FF0400FFF7B5FF0123D3
-:1057A000A340064A064811880B4200D105481188DB
-:1057B000994311800022044B1A7010BDC22D0020A5
-:1057C000CCE70200C4E70200432E0020F8B5FFF743
-:1057D0009BFF134C13482378002B1FD02078002107
-:1057E000C0B2F0F747FF012600220F4F2378934203
-:1057F00012D915005308FB5C3540AD002B410F2535
-:105800002B400A4D9B005B5906259100DB00411897
-:105810002B438B600132E9E700232370F8BDC046BB
-:10582000432E002044A002003B2E0020C4E80200CA
-:1058300070B543885A1E0A2A1FD801252A009A40AB
-:105840000F490888024392B20E480A8002780F2A54
-:1058500013D802780C4CEA40A25C0678D2B20F2131
-:105860002E420BD00A401B0113430278DBB25208D0
-:10587000A35403780133DBB2037070BD8A43F3E7AE
-:10588000C22D0020432E00203B2E0020F0B5060044
-:1058900087B000AF7B60F960BA60FBF771F8B06861
-:1058A0000DF0B2F93861B0680DF0B4F90DF0ACF953
-:1058B000032358433B69C01883001D007B611435E6
-:1058C0002C2B2CD86B460E35ED08ED005B1B9D464E
-:1058D00000236C467B61002326606360BA687B68A6
-:1058E000F9682000EFF75EF8154D00216B68200085
-:1058F000236173686B60FDF7C1FC2369061E6B6052
-:1059000013D1A3681D687B69002B04D0200010F020
-:10591000FFFC002E11D12800BD4607B0F0BD2800C5
-:1059200010F0D4FC041ED6D1CCE73B6903339B00B6
-:10593000E3185D687B69002BE8D12800F6F7CEFEFE
-:105940007C2E00200122030030B5134085B00400F6
-:105950004510002B14D125491D00884210D0244940
-:1059600088420DD0234B1500984209D003230340F1
-:1059700009D1214A0168914205D10FF0DEFE0500F0
-:10598000280005B030BD1D4A25002240062A05D05A
-:10599000002B08D11A4B22689A4204D101A9200099
-:1059A000EBF72EFFEBE72000ECF780FF154B98425A
-:1059B00007D1FF23DB05E0180323984305F01EFB06
-:1059C000DDE7114B984202D0104B984206D101AA54
-:1059D00069462000EDF7F4F8019DD1E7022201A904
-:1059E00020000CF03BFE0028CAD0F5E7E4B302002B
-:1059F000C4E70200CCE702002CB90200070080FFD8
-:105A00000C9A020088B002004CA0020088E7020055
-:105A1000F7B506000F0000920193041E00D0446801
-:105A20003800431E984120180430800010F041FCDB
-:105A30000C4B050003600C4B5B684360009B83606C
-:105A4000019BC360002E05D03100A2000831103048
-:105A500013F09FF9002F02D00434A40067512800EE
-:105A6000FEBDC04600EA02007C2E002070B5060094
-:105A700010200D00140010F01CFC034B46608560E4
-:105A80000360C46070BDC046C4E9020010B50C00DC
-:105A9000ECF70CFF006B00280ED0E30702D503687B
-:105AA000002B09D0A30702D54368002B04D063075D
-:105AB00006D58368002B03D1024903480EF0BAFFD4
-:105AC00010BDC0461F84030028AB0200F0B50F00D4
-:105AD0008BB00400012138680392FFF7D7FF06005E
-:105AE000012C22D13B68012118000393FFF7CEFF60
-:105AF00080210700490006A811F005FB802400233F
-:105B0000089E6400029305AB2200310003983D68B3
-:105B1000A847431C28D105980B2800D0ACE0029B75
-:105B2000002B34D159480BB0F0BD7868ECF7A6FFD4
-:105B3000030002900133D5D00125337B029C2B4218
-:105B400000D181E00026210006A811F0DCFA0395BF
-:105B5000002C6ED0210006A811F015FB011E1ED1ED
-:105B60004B494C480EF066FF002810D0029B1B18D2
-:105B70000293844202D9241A3618C4E7802106A869
-:105B8000490011F0EDFA802406006400BBE7029B97
-:105B9000414807933B7BDB0775D5404873E0002302
-:105BA0000093220005AB386811F00CFA059B050044
-:105BB000002B0ED006A8210011F049FB05980B28F8
-:105BC0005AD1079B0293002B33D106A811F0BDFADE
-:105BD000A8E7844227D8089B30009C46079C634670
-:105BE0009B5D039A59B2002912DA19001F2502227F
-:105BF000A943C0290CD01900103D0132A943E02966
-:105C000006D004329343F03B1A00511E8A410432FD
-:105C10009619A64212D8029B3000013B0293A6427D
-:105C2000DDD31C0094E7211A06A811F010FB002D0B
-:105C3000D1D11A4806A9EBF755F974E7E443029B62
-:105C4000A419E418060083E7029906A811F06CFA7B
-:105C5000039B029A0093089905AB386811F0B2F9DA
-:105C6000059B002B0AD006A811F06FFA059B074888
-:105C70000B2B00D157E71800F7F78EFD337B079009
-:105C800005482B4289D106A9D5E7C046E4B30200F6
-:105C90003E84030074AA0200A09202000C9A020043
-:105CA00030B50C0087B0012105002068FFF7EEFE3B
-:105CB000022203A96068EDF79BF8049A022D06D929
-:105CC000A068ECF7DBFE049A824200D902000023B0
-:105CD00003990093206802AB11F074F9029B002B2A
-:105CE00005D005480B2B05D01800F7F755FD4300EC
-:105CF0000120184307B030BDE4B30200F0B589B00D
-:105D00000191019B040001211868FFF7BFFE070005
-:105D1000012C18D9019B5B685C10631C13D0210017
-:105D200004A811F0F0F9631C03D0631E002C2FD0DF
-:105D30001C00012104A811F026FA061E0AD11B49F5
-:105D40001B480EF077FE0124102104A811F0DBF9A6
-:105D50006442E8E70100019803AB012200683D6856
-:105D6000A847431C0ED103980B2809D1059B01932A
-:105D7000012B09D104A811F0E8F90E4809B0F0BDD3
-:105D8000F7F70AFD00280CD1012104A811F05FFAF1
-:105D90003B7B0948DB0700D4084804A9EBF7A2F8CD
-:105DA000ECE733780A2BBED1F2E7C0463E8403000D
-:105DB00074AA0200E4B302000C9A0200A09202004E
-:105DC000F0B51F0004000D00160085B00221FFF79A
-:105DD0005DFE03AB009732002900200011F0F2F8BD
-:105DE000039B002B05D005480B2B05D01800F7F7B7
-:105DF000D3FC43000120184305B0F0BDE4B302001A
-:105E000070B50500140011F07EF9024B2560636047
-:105E100070BDC046CF70020010B50C007F2906D8B7
-:105E2000012111F0B0F9002800D0047010BD224B00
-:105E3000994210D8022111F0A6F90028F6D040238B
-:105E4000A2095B42134303703F2323408024644232
-:105E50001C434470EAE7194B994214D8032111F00E
-:105E600092F90028E2D02023220B5B4213433F210A
-:105E700080220370A30952420B400C40134322437B
-:105E800043708270D2E7042111F07DF90028CDD053
-:105E90001023A20C5B4213433F2103708023220B8B
-:105EA0005B420A401A434270A2090A400C401A435E
-:105EB0001C438270C470B9E7FF070000FFFF0000B9
-:105EC00007B5034B009068460193FFF7CBF807BD79
-:105ED000CF700200BFF34F8F024B034ADA60BFF36B
-:105EE0004F8FFEE700ED00E00400FA05F0B597B033
-:105EF00018220021060010A812F067FF132110A835
-:105F000012F024FD032110A812F0B6FD4C4B1B68C3
-:105F1000002B00D10133DBB202934A4A0123002156
-:105F20000BA803F015FA484B9E4200D9002672B622
-:105F3000464B64211C68464B3000079303F082FFF8
-:105F4000052510306843201808900A21300003F01E
-:105F500079FF0A2104F05CF8103169436118099156
-:105F600030000A2104F054F810314D4380236419A5
-:105F70000A9400249B010193029B002B5DD0002515
-:105F800000272E1F07AB9B190593032C03D18023F9
-:105F900000249B01019307AB5B592E4A03936300D6
-:105FA000D31804930023190006205843049A1618A6
-:105FB0007678B4466246039EB25C10269446049AF4
-:105FC000105C62460641164202D00120984001430F
-:105FD0000133092BE8D1C9431F4B059A0901194028
-:105FE0001268039B934225D1312F23DC00210BA89B
-:105FF00012F00DFEFA23159A1199DB001068014288
-:106000001BD0013B002BF9D1019B01345B000193B4
-:10601000FA230137E4B25B009F42B6D10435102D5C
-:10602000AED1074B1B68002BA6D0029F013FFBB2ED
-:106030000293A1E7019B1943D9E7FFF74BFFC04645
-:106040005C2B0020F0FF0000E70300006800002048
-:10605000828403004C840300F01F0000F0B5002888
-:106060001BDD0F4C421E276811000020BE09FB0FEC
-:1060700073407B403E097D087340BF087B406B4006
-:10608000DB072B4301251F0040002B401843E9404C
-:10609000ECD18242E8D32760F0BD0248FCE7C0465D
-:1060A000582B002017FCFFFF0023F0B50121A1268B
-:1060B00004241F00094D0A480A4A2B60F6000160BB
-:1060C000576051680029FCD081591B02013C0B43E9
-:1060D000002CF5D12B6001234360F0BD582B00202C
-:1060E00000D00040FCD00040014B18607047C04613
-:1060F000582B0020020010B5014B12CB12C210BD6C
-:10610000602B0020034B1A68034B1A607E225A60F2
-:106110007047C04668000020602B002070B5051E47
-:1061200014DD0B4E0B4C3368002B02D0206812F0AC
-:1061300017FBFA2120680024074B89008361C462A1
-:106140006943356012F014FB200070BD0348FCE782
-:10615000682B0020982B00200562010017FCFFFF30
-:10616000F8B5114F06003D68002D0AD1302012F01D
-:10617000A6FD040002F08AFD0C4BA5612360E562D8
-:106180003C600B4D2B68002B09D1102012F097FDBD
-:10619000040012F03AFB20002C6012F010FB3000DB
-:1061A000FFF7BCFFF8BDC046982B002070EF02003F
-:1061B000942B0020014B18687047C046682B0020C4
-:1061C00070B50D4C2368002B03D00C4B1B68002BC3
-:1061D00002D10620FFF7C4FF206812F007FB02007F
-:1061E0000749C3170D684E685219734120680A6049
-:1061F0004B6012F001FB70BD942B0020982B002007
-:106200001801002010B5FFF7DBFF0024054BA200AA
-:10621000D058002802D003681B68984701340A2C24
-:10622000F4D110BD6C2B002010B5FFF7C9FFFA2286
-:10623000034B920018685968002303F067FF10BDF4
-:106240001801002010B5FFF7BBFF024B1868596812
-:1062500010BDC046180100200B4B10B51B68040090
-:10626000002B03D0094B1B68002B02D10620FFF73F
-:1062700077FF0023064A99008858002801D001338F
-:10628000F9E78C5010BDC046942B0020982B0020BD
-:106290006C2B0020002310B5044A99008C588442CE
-:1062A00001D00133F9E70020885010BD6C2B00208D
-:1062B00010B50400002902D00B78002B03D1034B4A
-:1062C0002360200010BD11F014F8FAE798EB0200EB
-:1062D000014B03607047C04698EB020010B50548BB
-:1062E000054C206011F07FF8044A0549200012F0A7
-:1062F000DFFC10BD98EB02009C2B0020000000206A
-:10630000E5720200084B73B51C680500002C0AD02A
-:106310000100266808310822684612F03AFD0CCDCB
-:1063200031682000884773BDA02B002010B5054CB4
-:106330000121200011F04BF8034A0449200012F01B
-:10634000B7FC10BDA42B0020000000208B730200BE
-:106350000388074A10B50120934208D0834202D037
-:106360000020DB0703D41E20FFF7C0FD002010BD76
-:10637000FFFF00000048704716FCFFFF10B53220F9
-:10638000FFF7B4FD004810BD16FCFFFF10B5124C1E
-:106390000023083482800460416202241422010038
-:1063A0008371847203638386028136310A78C36005
-:1063B000A243F1342240036143618361C3610362FC
-:1063C0000A70020040321370021DD38701334387E5
-:1063D0008387C38710BDC046B8EB0200F0B5544FA9
-:1063E00097B03B6806000593002B00D08BE006AC0D
-:1063F0000B331C222121200001F0CAF80EAD0B2323
-:106400001D2222210AA801F0C3F80B231B222321FD
-:10641000280001F0BDF8082012F051FC0122059B74
-:106420001100049011F0CEFF3A21300011F0D1FE9E
-:1064300000281DD0A38812ADAB80A3795C20AB717E
-:106440003C4B1293A3681493237B2B73637B6B7376
-:10645000A37BAB7312F033FC042301933633009318
-:106460002A00049B3100040001F000FD3C604AE07A
-:106470003221300011F0DDFE00281CD0A38812ADBF
-:10648000AB80A3795C20AB712A4B1293A368149361
-:10649000237B2B73637B6B73A37BAB7312F00FFCBB
-:1064A000042301932E3300932A00049B310004003F
-:1064B00001F07AFEDAE73C21300011F072FE00288C
-:1064C0002CD0AB8812ACA380AB79A420A371194B5C
-:1064D0001293AB6814932B7B23736B7B6373AB7B3F
-:1064E000A37312F0ECFB052305000293013B01931B
-:1064F000383300932200049B310001F0D5FB0E4B92
-:106500003D6044351D600C4B094C1868002802D0D2
-:10651000216811F00AF9206817B0F0BD442012F08C
-:10652000CEFB042204990400FFF730FF9EE7C0462B
-:10653000A82B0020A8EB0200AC2B0020F0B561498D
-:10654000C56885B08D4254DA0300022236331B78C9
-:10655000134059D104698C4264DA02003632127851
-:10656000520768D4426901920200019E40328E4275
-:106570006FDA010036310978090774D4002B7DD118
-:1065800013780293002B16D006000127011DCB8F34
-:10659000363601339BB2CB8703963678BC463740FC
-:1065A00000D188E01D2B06D963469E43039B1E70D5
-:1065B0000023CB87137010F063FF434A07239042F8
-:1065C00076D94249043B8D4272DBC82201339200E6
-:1065D00095426DDC023B8C426ADB013B944267DCF6
-:1065E00001980433884263DB0133904260DC00236E
-:1065F0005EE0C822002352009542ABDD0300363333
-:106600001A7800239207A5D4012306001F0036360E
-:1066100032785408A7433C0002279C40BA432243E7
-:10662000327097E7C822520094429BDD0200363256
-:106630001278520796D406000122363633789F0826
-:10664000BA439700042293431A003A43327001235D
-:1066500088E7C821019E49008E428FDD0100363156
-:10666000097809078AD40100012636310B78DF0842
-:10667000BE430827F600BB4333430B701378032B4C
-:1066800000D97DE70133DBB21370012B03D1002168
-:10669000031DD98774E7042B00D071E7020036325E
-:1066A0001178033B0B43137000230430C3870B3373
-:1066B000180005B0F0BD092B00D87CE7029BCF87FE
-:1066C000013B77E770FEFFFFFF700200E0FCFFFF79
-:1066D000F0B5040087B0C06806F050FA0090019150
-:1066E000206906F04BFA04900591606906F046FABD
-:1066F00002000600802000060B180F000098019988
-:1067000006F0F8FE06F0C6FAE062051C06F07EFE12
-:106710000390281C06F0CAFC051C039806F068FAD2
-:10672000009A019B05F03AFC00900191281C06F0AC
-:106730005FFA32003B0005F031FC02000B000098CC
-:10674000019905F09DFE02000B000498059906F0E2
-:10675000D1FE06F09FFA0022051C0023300039000C
-:1067600003F086FC002806D1A5620223A279134318
-:10677000A37107B0F0BD0021281C03F0B3FC0B4E41
-:10678000002811D10A4F281C06F032FA02000B0033
-:106790003000390005F074FE32003B0004F0D8FCF4
-:1067A00006F078FAA062E0E7024FECE7EA2E4454E4
-:1067B000FB21F9BFFB21F93F0048704716FCFFFFA2
-:1067C00010B53320FFF792FB004810BD16FCFFFF09
-:1067D000002310B50400838083710D4821640830C4
-:1067E00020608020C000A061E0612062E3602000A2
-:1067F000236163616362A362E36223636363A363F0
-:10680000E3636364110010F047FF200010BDC04631
-:10681000ECEB0200F0B5534F97B03B6806000593D0
-:10682000002B00D08BE00B331C22212106A80AACE0
-:1068300000F0AEFE0EAD0B231D222221200000F041
-:10684000A7FE0B231B222321280000F0A1FE082015
-:1068500012F035FA0122059B1100049011F0B2FDEF
-:106860001D21300011F0CDFC00281DD0A38812ADF1
-:10687000AB80A3796020AB713B4B1293A368149358
-:10688000237B2B73637B6B73A37BAB7312F017FAC1
-:1068900005230193183300932A00049B3100040060
-:1068A00001F0B8FB3C604AE03C21300011F0D9FC1B
-:1068B00000281CD0A38812ADAB80A3796020AB71F7
-:1068C000294B1293A3681493237B2B73637B6B7305
-:1068D000A37BAB7312F0F3F90523019337330093D5
-:1068E0002A00049B3100040001F000FDDAE73C219E
-:1068F000300011F056FC00282AD0AB8812ACA380DF
-:10690000AB79A420A371184B1293AB6814932B7B23
-:1069100023736B7B6373AB7BA37312F0D0F90523F6
-:1069200005000293013B0193383300932200049B3E
-:10693000310001F0B9F90D4B1D6044353D600B4B42
-:10694000084A1B681068002B00D0436417B0F0BDE4
-:10695000482012F0B4F9052204990400FFF738FF2B
-:10696000A0E7C046AC2B0020A8EB0200A82B00201B
-:1069700030B50425837985B004002B421BD1036810
-:10698000DB699847200010F0C1FEA379A1882B4352
-:10699000A37103220123684610F0E7FCA0790300ED
-:1069A000AB43A3710223184043425841034B40427A
-:1069B000184005B030BD0248FBE7C04614FCFFFF9D
-:1069C00015FCFFFFF0B5040089B0406C10F012FE1A
-:1069D000071C606C10F001FE02222100061C05A8B5
-:1069E00010F0A5FE069804F029FB051C079804F09A
-:1069F00025FB041C381C06F009FD0390381C06F02A
-:106A000055FB0190301C06F001FD0290301C06F091
-:106A10004DFB0399071C201C03F0E4FF0199061CA1
-:106A2000281C03F0DFFF011C301C04F00DF9061CCC
-:106A3000059804F003FB391C03F0D4FF0299071CEE
-:106A4000281C03F0CFFF039903F0CCFF011C381C76
-:106A500003F056FC0299051C201C03F0C3FF0199AA
-:106A600003F0C0FF011C281C03F04AFC311C06F097
-:106A700049FE0F4903F0B6FF06F0BAF80D4A0E4B77
-:106A800004F082FE06F006F9011C0C4804F0DCF864
-:106A90000021041C03F012FB002804D0201C044930
-:106AA00003F02EFC041C201C04F0A8FA09B0F0BD71
-:106AB0000000B443EA2E4454FB2119400000B442C4
-:106AC0001FB50122010001A810F031FE029804F068
-:106AD000B5FA041C019804F0B1FA211C06F012FE6C
-:106AE0000D4903F07FFF06F083F80C4A0C4B04F0CD
-:106AF0004BFE06F0CFF80021041C03F0DFFA00285B
-:106B000004D0201C074903F0FBFB041C201C04F0EC
-:106B100075FA04B010BDC04600003443EA2E445458
-:106B2000FB2109400000B44310B5837904005A07E3
-:106B30000DD49B0701D4FFF71BFF636C2000002BD3
-:106B400002D0FFF73FFF10BDFFF7BAFFFBE7014898
-:106B5000F9E7C04615FCFFFF82B0F0B50400EDB0C8
-:106B600064207393729211F080FF052210A8110027
-:106B700011F09CFC974911A801F0CEFD002221AB39
-:106B80006CA91A605A609A600C339942F9D11922A3
-:106B9000002113A812F019F9A06811F0B1F900262C
-:106BA0000B90FF21A06800F0B5FB8B4FA06800F0B0
-:106BB00041FB07960996884B9F4203D0874B9F4223
-:106BC00000DBFDE0A06811F0E9F9A56884491AA886
-:106BD000FFF76EFB78221AA9280000F071FB1AA8B3
-:106BE00010F080FB00267C4F0322099B6068013374
-:106BF0001A40099210F0DCFC0500606810F0DFFC20
-:106C00000022784B05929D4210DB013205922A004A
-:106C1000C8320BDBAA22042192000591954205DCC3
-:106C200002220592C82D01DD013205920022069252
-:106C3000984210DB012306930300C8330BDBAA2321
-:106C400004329B000692984205DC02230693C82872
-:106C500001DD0133069310A811F01FFC002513ABD2
-:106C6000EB5C012B08D160496B00CA185278C95CF3
-:106C700010A8FF2301F0E2FC0135192DEFD16B467E
-:106C800018229A5E6B4610A81421595E099B01F0E8
-:106C9000D5FC002F01DB0F2E07D90023A06800933D
-:106CA00074301A0010A911F008FC01230893089B06
-:106CB00005995A004C4B9B189A1E12788A4226D18D
-:106CC000013B1B78069A934221D1089A6CAB9B1822
-:106CD000663BFF3B0A931B78012B18D00C23079AC5
-:106CE000216853431D0000220CA810F020FD21AAAA
-:106CF0002B0094460CAA634423CA23C301220A9B97
-:106D000001361A70079BF6B20133DBB20793089B7A
-:106D1000013308931A2BCAD1642011F0A6FE079BF9
-:106D2000643F3FB2182B00D845E71A0021A91AA8E2
-:106D300010F05DFF6A461DAB23CB23C21B681360B6
-:106D40001A991B9A1C9B206810F0B8FCE568002D6E
-:106D50000CD0264912A8FFF7ABFA1C231AAA12A9D5
-:106D6000280011F005FA12A810F0BCFAA06811F082
-:106D700015F911A912A8A56811F087FB00221C4B78
-:106D8000009212A901932800130000F06FFA12A8D4
-:106D900011F06EFBFA20800011F067FEA06811F080
-:106DA000FDF80B99A06800F0B5FA11A811F060FB8E
-:106DB00010A811F05DFB6DB0F0BC08BC02B0184724
-:106DC000002F02D00F2E00D00EE7A06800F032FA9C
-:106DD0000AE7C046628603008C3C0000D18AFFFFB0
-:106DE000A786030058FDFFFFC7860300BC8603008B
-:106DF000DC050000F0B587B001930EAB1B880600E0
-:106E000003930D9B0D000093019B02920C9F002B9E
-:106E10003DD0002F02D1009BDB0738D5282011F090
-:106E20004EFF0400103010F096FA029B18202580C7
-:106E3000638011F044FF0500009B08220593019B2D
-:106E4000002103600C30049711F0BFFF082204A951
-:106E5000281D11F09EFF0F4B02226B610023039946
-:106E6000E3602362636233680A43A560A2805B68C3
-:106E7000210030009847002807D0200011F08DFA3B
-:106E80002000282111F00CFF034807B0F0BD034893
-:106E9000FBE7C0461378020016FCFFFF17FCFFFF5C
-:106EA00030B54260002283600C4B04000160C26078
-:106EB000186887B090420DD00592C03202926A469F
-:106EC000074904AB049122CB22C2230003220521EF
-:106ED000FFF790FF200007B030BDC046A02B002078
-:106EE000596B0100F0B5040085B0637A9C46002B15
-:106EF00004D1200010F099FE05B0F0BDA37A266FF2
-:106F000001931023019AF35600259B1801229A4001
-:106F10002900F36803920293029BAB4231DDB36810
-:106F2000019A6B439B1872695B00E77AD3181A7851
-:106F30005878E379012F14D15F1E3F1A10003A00F0
-:106F40005B004343606F8218D3189B79634500DD73
-:106F50006346627B1A4202D00123AB4019430135DC
-:106F6000DAE7022F05D15F1EBA1A277A013F381AD5
-:106F7000E6E7032FE4D1277A013FBF1A0200380069
-:106F8000DEE71123C943F356606C99402369194029
-:106F9000039B194311F03BFEA27B072AACD8637B0D
-:106FA0000C495B006373531CDBB290004158A37320
-:106FB000022A03D8080011F04DFD96E7064B200089
-:106FC000236300236363054BE4622364143011F0F0
-:106FD000CFFB91E718EC0200E56E0100157C020082
-:106FE00010B50400044B036011F0BAFB200001F05F
-:106FF00063FE200010BDC04670EF020010B5040013
-:107000000E4B08330360FFF745F92000743011F090
-:107010002FFA2000603011F02BFA2000583010F0C9
-:1070200061F92000503010F05DF92000044B14305D
-:107030006361FFF7D5FF200010BDC04638EC0200A9
-:1070400084EF0200F8B500250400324B8580083338
-:1070500003608571143016000F0001F017FE200048
-:107060002D4BE562636125645030FFF731F9200054
-:107070005830FFF72DF92000603001F0D9FA2000D8
-:107080000423F25E33682667590009B2743011F0A8
-:107090000DFA3368226FE37173680126237210239F
-:1070A0006581A7802561D35691685918994204DDFE
-:1070B0003000984001330543F8E711230120D356EF
-:1070C000D1685918994206DD02009A4026690133B9
-:1070D00032432261F6E7142011F0F1FD226900210C
-:1070E0002A430123060002F033F9FF2322006372D2
-:1070F0000133A381002348326664A3732000137018
-:10710000A366FFF7A9F80123A27920001343A37116
-:10711000F8BDC04638EC020084EF0200F0B5437AB7
-:1071200085B00400002B04D1200010F07EFD05B0D6
-:10713000F0BD0122837A11009C461023066F0025C2
-:10714000F35603926344994002912900F368019336
-:10715000019BAB422CDDB36872696B4363445B00F7
-:10716000E77AD3181A785878E379012F10D15F1E87
-:107170003F1A10003A005B004343606F8218D31837
-:107180009B79002B02D0039BAB4019430135DFE70D
-:10719000022F05D15F1EBA1A277A013F381AEAE793
-:1071A000032FE8D1277A013FBF1A02003800E2E737
-:1071B0001123C943F356606C994023691940029B1F
-:1071C000194311F024FD667AB31EDBB2FC2B14D8F0
-:1071D000FEF7F0FF0B4B0500236300230A486363AF
-:1071E0000A4BFF21E4622364704302F02BFE290066
-:1071F00041432000143011F0BBFA637A012B00D90F
-:1072000095E791E72B7C0200B6030000157C020095
-:107210001FB5012381881A00684610F0A6F80123E3
-:1072200003491A00684610F0A0F805B000BDC0463A
-:10723000FE0300001FB5030048331A780400002A3B
-:107240000DD000221A70012381881A00684610F0C0
-:107250008CF8012304491A00684610F086F82000D3
-:10726000743011F01AF91FBDFF03000073B5079CBD
-:107270000500002C1CDB060048363078002802D0C0
-:107280003078012816D106981BB2C0B200902800B1
-:1072900012B2743011F011F9002C07D02B004A33D0
-:1072A0001C80002407234C352C803370200076BDD1
-:1072B000014CFBE7014CF9E717FCFFFF12FCFFFF55
-:1072C000F8B50400171E1DDD060048363378002B84
-:1072D00002D03378012B17D12200E3795632013BDB
-:1072E000137023000025200054331D80503010F00F
-:1072F00016F823004A331F80022328004C342580CF
-:107300003370F8BD0148FCE70148FAE717FCFFFFBE
-:1073100012FCFFFFFF2902D841720020704701488C
-:10732000FCE7C04617FCFFFF13B5040004A8007873
-:107330000090200011F07EF9002801D1207516BDC3
-:107340000048FCE70EFCFFFF13B5040004A800781A
-:107350000090200011F056F9002801D1207516BDCB
-:107360000048FCE70EFCFFFF7FB50D0011000F2267
-:107370006A4404001E1E117016D0089B002B13DDFA
-:10738000012329000093FFF7DFFF002802D0074800
-:1073900004B070BD0090089B320029002000FFF768
-:1073A000C3FF0028F4D0F2E70148F1E70EFCFFFF2D
-:1073B00017FCFFFF10B5040086B0006C01F07AFDE9
-:1073C000217BA0228B00185100200C4BD20098503A
-:1073D0000B4A14309850636C68465B7CC91849B2FC
-:1073E00010F02DFE039B019A03211A60207B0130CF
-:1073F000C0B202F023FD217306B010BD0070004042
-:107400000405000082B070B50400002588B00C921D
-:107410000D93636C9A68AA420ADD197C02A8491987
-:1074200049B210F00CFE069B039A01351A60F0E792
-:107430005D7C237B02A8ED186DB2290010F0FFFDE2
-:10744000039A059B01921A600021182202A811F0EC
-:10745000BCFC02A80022290011F07DFA206C002853
-:1074600002D0082111F01CFC082011F028FC290092
-:10747000060001F0F9FC094B2000E3620023FA2129
-:107480002363074B2664A462E3631030090111F003
-:107490006FF908B070BC08BC02B01847B5730100A2
-:1074A000E97F0200F0B504000E00150085B01F0052
-:1074B0000CAB1B88103001930FF04DFF26806580C8
-:1074C000182011F0FCFB02AE050033000AAA03CA23
-:1074D00003C32F602800082700213A000C3011F068
-:1074E00074FC3A003100281D11F053FC064B0222B7
-:1074F0006B61200000230199A5600A43E360A2802C
-:107500002362636205B0F0BDFF7F020070B5040026
-:1075100086B010300D0001F0B9FB0023194AA362B8
-:107520002261194AE363166865642373236063600C
-:10753000A3609E4220D0154A28200492059311F0A2
-:10754000BEFBC02305006A46029304AB03CB03C213
-:107550002300062102222800FFF7A4FF3368290038
-:107560005B6830009847002806D0280010F015FF0F
-:107570002821280011F094FB00232000236406B08A
-:1075800070BDC04684EF0200A02B002005740100EE
-:1075900030B5002403730123034D8471056081809D
-:1075A00082734373846030BDA8EB020070B58379A9
-:1075B0000400DB0703D51821806811F071FBA37963
-:1075C0009B0703D51821A06811F06AFBA3795B071C
-:1075D00008D5A0230021164ADB00D150A06808314D
-:1075E00011F05EFB0826A379334209D0A568002D6F
-:1075F00006D0280010F0EDFF3100280011F050FBFC
-:10760000A379DB0605D5A068002802D00368DB68F3
-:1076100098476023A2791A4205D0A068002802D0BA
-:1076200003685B6898470023A360A37170BDC046E0
-:1076300000700040F7B50126037B040033422AD0D6
-:10764000612385791D4017D1FFF7B0FF182011F095
-:1076500036FB0E230700E35618220093637B2900B4
-:10766000019311F0B2FB019A0099380011F073F9FF
-:10767000A379A7603343A3716023A279A0681A425B
-:1076800002D010F0EFFFFEBD436940681B68184050
-:10769000431E9841F7E70148F5E7C04616FCFFFF97
-:1076A00010B50124837941731C4004D0806811F027
-:1076B000E3F9002010BD6022134203D0806810F06F
-:1076C000D8FFF6E70048F5E716FCFFFF10B50029E4
-:1076D00003DB024B196010F0FFFF10BDB02B002040
-:1076E00070B504001E0004AB1D7801F099FA20006B
-:1076F0000E4B40302360FEF7EBFD230001364C3388
-:10770000013522001E701D730023E1214E32A36457
-:107710006365138053809381D381013B20006364B0
-:107720004902FFF7D3FF200070BDC04624B6020017
-:10773000F7B580277F053D697C690822113C6C43C1
-:1077400006002100684611F024FB104B009A9A4273
-:1077500019D00093002301937969300013396943EC
-:1077600010F093FC019A0099300010F0A6FC210063
-:10777000300010F08AFC7969AB08133969432200A4
-:10778000300010F08CFC0198FEBDC046FECA00001F
-:10779000F0B50D00A9B00D9200213022060010A80E
-:1077A0000B9311F012FB280011F063FB431C0C93A8
-:1077B000102B00D9B6E00B9B202B00D9B2E029009A
-:1077C000300010F0A1FC071E50D129000C9A10A81F
-:1077D00011F0DFFA0D990B9A14A811F0DAFA802350
-:1077E0005B051A695F690C92113F7A4330005D694D
-:1077F0000B92FFF79DFF3022002104001CA811F01E
-:10780000E4FA290000270C9B13395943300010F08B
-:107810003CFC0D9730257D430B9B0833ED18A742A8
-:1078200043DA290030221CA811F0B3FA10A91CA8D1
-:1078300011F015FB002828D13C49300022000E91A0
-:107840000F9410F03AFC6A46099513AB23CB23C280
-:1078500023CB23C223CB23C23000129B1099119A51
-:1078600010F039FC01230D930137D3E70D99103047
-:107870000B9A11F07FFA30210400380011F010FA51
-:10788000002CA2D1200029B0F0BD6A4609951FAB9B
-:1078900023CB23C223CB23C223CB23C230001C998A
-:1078A0001D9A1E9B10F017FCDEE7E5433023ED1711
-:1078B00025405D430B9B08355D190D9B002B1DD1A9
-:1078C0000C9B3021981E02F033FAA0422CD01749AD
-:1078D0000134300022000E910F9410F0EEFB6A4646
-:1078E000099513AB23CB23C223CB23C223CB23C2C3
-:1078F00030001099119A129B10F0EDFB0B9930009B
-:1079000010F0C3FB80235B0559690C230C9A1339D3
-:1079100063434A430233110030000B9A10F0BFFB5F
-:107920000024AFE7024CADE7024CABE7FECA000013
-:1079300017FCFFFF13FCFFFF022802D10122014BBD
-:107940001A707047442E002070B5064C050023784D
-:10795000002B04D1044801F043F8012323702800D0
-:1079600070BDC046452E00203979010070B50C006D
-:107970000FF0B3FC002810D00023144DA40A2B7084
-:10798000200010F0FDFB002803D00A2011F06DF854
-:10799000F6E72B78002BFCD070BD02210C4B0D4A72
-:1079A00099508021C90008005D58002DFCD0A1210C
-:1079B000C9005C5019580029FCD000219950802141
-:1079C000C9005A58002AFCD0E6E7C046442E0020E1
-:1079D00000E0014004050000F8B50C0015001E0091
-:1079E0000FF07BFC002811D00023174F3B703200B2
-:1079F0002900200010F0C2FB002803D00A2011F05B
-:107A000034F8F4E73B78002BFCD0F8BD01210F4897
-:107A10000F4B844619508021C9005A58002AFCD0C7
-:107A200080270022FF00964207DD910068586050D1
-:107A3000D9590029FCD00132F5E7002261465A509D
-:107A4000DA59002AFCD0E0E7442E002004050000AB
-:107A500000E0014008B4024B9C46443808BC604733
-:107A600085810200FA21F8B50389C9000400594351
-:107A7000324810F0A2FCFA21890002F059F9304F87
-:107A80002081A17A380010F098FC23002600250000
-:107A900022894C33A072A0361A808C3531780023AD
-:107AA0002A22286810F087FA002801D02548F8BD5E
-:107AB00031781F235B22286810F07DFA0028F5D169
-:107AC000317820235C22286810F075FA0028EDD167
-:107AD000317801232C22286810F06DFA0028E5D1B6
-:107AE000317801232D22286810F065FA0028DDD1B5
-:107AF000317801232E22286810F05DFA0028D5D1B4
-:107B0000A17A380010F054FC3178C3B20E222868F4
-:107B100010F051FA0028C9D1FA212389890059436C
-:107B2000064810F045FC01230343DBB231782A22DA
-:107B3000286810F040FA0028B9D0B7E758EC0200E6
-:107B400050EC02000EFCFFFF08B4024B9C46443888
-:107B500008BC6047657A0100074B10B51A000400A5
-:107B600008323C330260436444300FF062FD200071
-:107B70000FF076FC200010BDB8EC020008B4024BF8
-:107B80009C46443808BC6047597B010008B4024B4E
-:107B90009C46443808BC60478F810200F0B504253C
-:107BA00083798BB004002B4204D100F0EFFBA37962
-:107BB0001D43A57120009030FFF73CFD0026B04228
-:107BC0000FD12300A033197820000C2307AD0093B8
-:107BD0008C302B0001220068FFF7C6FB061E03D085
-:107BE0002C4E30000BB0F0BD0A2304AA9B182A7853
-:107BF0005A706A781A700022985EAA785A70EA78E9
-:107C00001A700022995E03912A795A706A791A7063
-:107C100000229F5EAA795A70EA791A7000215A5E92
-:107C200004922A7A5A706A7A1A7000215A5E059272
-:107C3000AA7A5A70EA7A1F251A7000229B5EA27AED
-:107C40009C46039B504359425143CB172B407A43E8
-:107C50005B185B11A361C3172B401818D3171D4085
-:107C60006423AD18059A5B425343A36764236146BE
-:107C7000049A40115A434B43E2676D11221DE061A3
-:107C800025622000D3670FF066FC200044300FF01F
-:107C9000D8FCA6E70EFCFFFF08B4024B9C46443814
-:107CA00008BC60479D7B0100F7B51E00040008ABCF
-:107CB0001B881500019309AB00911A8831000AABAB
-:107CC0001F88FEF763FB20003A0031004430FEF7C6
-:107CD0007FFD134B20001A003C33636423000832FD
-:107CE0002260009A8C331A60AB8890308380AB7925
-:107CF000019A83710B4B03210360AB6883602B7B7C
-:107D000003736B7B4373AB7B83732300A0331A80B5
-:107D1000FFF7C6FC2000FFF7A5FE2000FEBDC04611
-:107D2000B8EC0200A8EB0200F8B5FA260189B6000B
-:107D300004007143264810F040FB310001F0F8FFC9
-:107D4000244F2081A17A380010F037FB2500A07263
-:107D50005835297800232A22606C10F02CF900286D
-:107D600001D01D48F8BD297810232B22606C10F03B
-:107D700022F90028F5D1297801232D22606C10F01A
-:107D80001AF90028EDD1297801232E22606C10F019
-:107D900012F90028E5D1A17A380010F009FB297802
-:107DA000C3B20E22606C10F006F90028D9D12189E7
-:107DB0000748714310F0FCFA01230343DBB2297832
-:107DC0002A22606C10F0F7F80028CBD0C9E7C04633
-:107DD00020ED020018ED02000EFCFFFF10B50400BC
-:107DE000034B083303600FF03BFB200010BDC0467F
-:107DF00080ED02007FB50425837904002B4204D175
-:107E000000F0C4FAA3791D43A57120004830FFF7A4
-:107E100011FC0025A8420DD1230058331978062300
-:107E200002AE009301223300606CFFF79DFA051E3D
-:107E300003D00D4D280004B070BD022300210420A2
-:107E4000F356A27ADB00715630565B425343C000B2
-:107E5000C90051434243A3612368E16122629B6AE6
-:107E600020009847E6E7C0460EFCFFFFF8B5040087
-:107E7000150006AA168807AA0F0012881900FEF737
-:107E800085FA0F4B6764083323602300AA884833C0
-:107E90009A80AA7920009A710A4AA264AA68226587
-:107EA0002A7B1A736A7B5A73AA7B9A730023A37185
-:107EB000230058331E80FFF737FF2000F8BDC0466F
-:107EC00080ED0200A8EB020010B50400034B08335C
-:107ED00003600FF0AEFB200010BDC04614EE0200A0
-:107EE000F0B507005C3787B0040039780023102212
-:107EF000806C10F060F80326002802D01F4807B0FD
-:107F0000F0BD0F2502ABED1801233978082200934C
-:107F1000A06C2B00FFF728FA184B9842EED02B7874
-:107F2000334203D0642000F0BDFAEAE7FA26218943
-:107F3000134DB6007143280010F03FFA310001F0F4
-:107F4000F7FE20813978A0231122A06C10F033F8BD
-:107F50000028D3D1A36C21890393714328003F7873
-:107F600010F026FA01231843C3B2102239000398F7
-:107F700010F021F80028C2D0C0E7C0460EFCFFFF79
-:107F8000B4ED020070B50825837986B004002B4259
-:107F900004D100F0FBF9A3791D43A57120004C30FA
-:107FA000FFF748FB061E0DD023005C33197806232B
-:107FB00004AD009301222B00A06CFFF7D5F9061E3B
-:107FC00003D0134E300006B070BD0E232A786B44E8
-:107FD0005A706A7820001A700022995E64224A431F
-:107FE000A263AA785A70EA781A700022995E642215
-:107FF000524251436163297959706979197000219E
-:108000005B5E5A432368E2631B6A9847DAE7C0461F
-:108010000EFCFFFFF8B50400150006AA168807AA93
-:108020000F0012881900FEF7D3FB0D4BA76408332D
-:1080300023602300AA884C339A80AA7920009A7181
-:10804000084AE264AA6862652A7B1A736A7B5A73DB
-:10805000AA7B1E829A73FFF743FF2000F8BDC0463B
-:1080600014EE0200A8EB0200F7B5FA250189204FB3
-:10807000AD0004006943380010F09FF9290001F0B9
-:1080800057FEA17A20811B4810F097F92600636CF7
-:10809000A0720093218958363378694338000193E0
-:1080A00010F086F907230343DBB2202201990098E0
-:1080B0000FF081FF002801D00F48FEBD317810235A
-:1080C0002222606C0FF077FF0028F5D1A17A0948D1
-:1080D000656C377810F06CF980235B420343DBB2A8
-:1080E0002322390028000FF066FF0028E5D0E3E7DF
-:1080F00048EE020040EE02000EFCFFFF10B5040047
-:10810000034B083303600FF0ABF9200010BDC046ED
-:10811000B8EE0200F0B50425837985B004002B4247
-:1081200004D100F033F9A3791D43A5712000483034
-:10813000FFF780FA061E0DD0230058331978062366
-:1081400002AD0093A8222B00606CFFF70DF9061E0C
-:1081500003D0144E300005B0F0BD1F200023EA5EAE
-:10816000D31703409B180222A95E5B11CA17024075
-:10817000521804216F5E5211F9170140C9194911B3
-:108180002B806A80A980A07A5B42434352424243DB
-:108190004143E3612368A26121629B6A2000984702
-:1081A000D8E7C0460EFCFFFFF8B50400150006AA8C
-:1081B000168807AA0F0012881900FEF7E7F80F4B80
-:1081C0006764083323602300AA8848339A80AA7919
-:1081D00020009A710A4AA264AA6822652A7B1A734F
-:1081E0006A7B5A73AA7B9A730023A37123005833C6
-:1081F0001E80FFF739FF2000F8BDC046B8EE020030
-:10820000A8EB0200F7B5FA2504000189134EAD0072
-:108210006943300010F0D1F8290001F089FD2700F2
-:10822000A36C208100935C373B7881B269433000B6
-:10823000019310F0BDF86022C3B2019900980FF0CD
-:10824000BAFE002801D00648FEBD3978012362221B
-:10825000A06C0FF0B0FE0028F6D0F4E7ECEE0200C0
-:108260000EFCFFFF10B50400034B083303600FF052
-:10827000E0F9200010BDC04614EF02007FB50825CC
-:10828000837904002B4204D100F080F8A3791D43C8
-:10829000A57120004C30FFF7CDF9051E0DD023004D
-:1082A0005C331978062302AE0093E8223300A06CF9
-:1082B000FFF75AF8051E03D00B4D280004B070BD1F
-:1082C0000223F25E96235B425A4362630021725E90
-:1082D00020005343A3630423F25E96235343E363D6
-:1082E00023681B6A9847E8E70EFCFFFFF8B5040017
-:1082F000150006AA168807AA0F0012881900FEF7B3
-:1083000067FA0D4BA764083323602300AA884C3317
-:108310009A80AA7920009A71084AE264AA68626584
-:108320002A7B1A736A7B5A73AA7B1E829A73FFF7A1
-:1083300069FF2000F8BDC04614EF0200A8EB020060
-:1083400010B572B60B4B1C68002C08D020000FF043
-:10835000A3FF0023E364084B2000E36310BD62B673
-:108360005C2010F0ACFC5C220021040010F02DFD1C
-:10837000EFE7C046D82B002000400020024B1878C1
-:10838000012318407047C046462E0020002310B538
-:1083900004499C006258002A01D00133F9E760507B
-:1083A000100010BDBC2B002010B50024084BA2000B
-:1083B000D058002802D003685B6898470134062C27
-:1083C000F4D1044B1B68002B00D120BF10BDC04668
-:1083D000BC2B0020D42B0020F8B5FFF7CFFF0028DE
-:1083E0001CD02A4D2C68E36CDA0718D502273B43D2
-:1083F000E364274B1E680423F26C30001343F364DC
-:10840000636BF3630FF05FFF3000716C00F097FA5D
-:108410002868C36C3B4201D000F0CBFAF8BD1D4F79
-:108420001D4E3A683168002A1ED129602A6891429F
-:1084300008D11B0706D52C60FFF7B6FF3B68002B61
-:10844000FAD02B6029688C42E8D03368994214D165
-:10845000124B4B63124B8B6320000FF034FF2968E3
-:10846000626C4B6C20000DE0206DB84203D1606D52
-:10847000002800D002002A60D8E79C42ECD10022FC
-:1084800010004B6C00F01AFAC8E7C046E02B002041
-:10849000B82B0020D42B0020DC2B0020FC3F002038
-:1084A000F982020070B50500FFF768FF002803D1CC
-:1084B000280010F0DAFA70BD0C4B1C68E36CDB0787
-:1084C00006D5FFF73DFF0A4B1860002800D00400D6
-:1084D000FDF7AAFE2D18A56420000FF0DDFE05496A
-:1084E00020000FF0C7FEFFF777FFE4E7E02B002046
-:1084F000B82B0020B42B002070B5114E3278022A20
-:108500001AD081421AD90C1A072C17D90D0003234F
-:1085100005432B4012D172B60A4DD2005051AA1811
-:1085200051608022A408120614430460327801329C
-:10853000327062B6180070BD0348FCE70348FAE7E2
-:10854000482E0020E42B002013FCFFFF17FCFFFF48
-:1085500070B5134C06002378124D002B0CD1124934
-:1085600012482B70FFF7C8FF114B984202D11E2012
-:10857000FDF7BCFC0123237000242B78A34209DD06
-:108580000C49E300C91830000FF0BCFE002805D1EB
-:108590000134F2E71420FDF7A9FC002070BDC046AD
-:1085A000472E0020482E002000380020E02F002019
-:1085B00017FCFFFFE42B002070B5002819D0104BEA
-:1085C00010491C7800239C4216DDDA00555885427C
-:1085D00010D28A18526882420CD9041F2368002BDB
-:1085E00002DC1E20FDF782FC802322681B06134359
-:1085F000236070BD0133E6E71E20FDF777FCF8E746
-:10860000482E0020E42B00200268084B406810B57B
-:10861000C018C000101803009A4205D81C688C428C
-:1086200002D31800083BF7E710BDC046FFFFFF1F4D
-:10863000014B03607047C04640EF020030B5006850
-:108640004488A1420CDA8588AA4209DA002907DBAE
-:10865000002A05DB5443401800198371002030BD07
-:108660000048FCE717FCFFFFF0B5070085B00E00DF
-:108670001D00002921DD002A1FDD002B1DD004680C
-:10868000638803938B4200DD0391A3880293934296
-:1086900000DD0292002306340193019B029A93426B
-:1086A0000EDA29002000039A10F073FB3B68AD1925
-:1086B0005B88E418019B0133EEE7024805B0F0BD8A
-:1086C0000020FBE717FCFFFFF8B504000D001600C3
-:1086D0001F00002901DB002A02DA0E4B2360F8BDDF
-:1086E000100048430630FFF733FF20600EF078FE9D
-:1086F00023685D8023689E80002F06D03B003200F7
-:1087000029002000FFF7B0FFE9E720000FF0C5FEC9
-:10871000E5E7C04640EF0200F7B506000D1E03D1A5
-:10872000234B03603000FEBD00200F000400010059
-:1087300001903B78002B1AD03022524294469C4440
-:108740006246092A11D90A2B0AD1019B2418013348
-:108750000193A14200DA2100002004000137E8E77C
-:108760000028FBD001340020F8E70120F6E7019A49
-:10877000300012B209B2FFF7A7FF33680A249A1D2E
-:1087800001235B42180029780029CBD00F00303F2D
-:10879000092F07D85F1C00D1002363435B18303BCF
-:1087A0000135F0E7591CFBD0137001320300F7E7E5
-:1087B00040EF0200F0B5040087B004A80E0001925B
-:1087C0001D00FDF797FC236801995A88914233DA1E
-:1087D0009B889D4230DA1F2E2ED9059B00939E4226
-:1087E0002ADC05230022203E5E43049B9B19039351
-:1087F0000021039BAE189B5C0293019BCF1823685A
-:108800005888009087420EDA9888B0420BDDDB1959
-:1088100010270F41009870431B1802980740781EDC
-:1088200087417F429F7101310529E6D10132052A36
-:10883000DED1002007B0F0BD0048FBE717FCFFFFCA
-:10884000F7B50468070063880E1E01931EDD994288
-:1088500018DA0023063400933B68009A9B889A42FA
-:1088600012DA019BA1199D1B2A00200010F091FA39
-:10887000601931000FF003FE3B685B88E418009B31
-:108880000133E8E70FF009FE002000E00048FEBDDC
-:1088900017FCFFFF10B50548054C20600EF0A3FD46
-:1088A000044A0549200010F003FA10BD40EF020011
-:1088B000F42B00200000002071840200002815D055
-:1088C000006041608260C360046145618661C76188
-:1088D000444604624C464462544684625C46C46228
-:1088E000644604636E46466374468463002A06D079
-:1088F000C46B043C043A25681560B442F9D18C6B12
-:10890000A6464E6BB546002B06D0CC6B043C043B10
-:108910001D682560B442F9D10C6BA446CC6AA3460D
-:108920008C6AA2464C6AA1460C6AA046CF698E6941
-:108930004D690C69CB688A680868496870470060AF
-:1089400041608260C360046145618661C7614446DD
-:1089500004624C464462544684625C46C462644687
-:1089600004636E46466374468463C46B043C0439F6
-:1089700025680D60B442F9D1C76986694569046903
-:108980007047006041608260C36004614561866138
-:10899000C761444604624C464462544684625C4665
-:1089A000C462644604636C46446374468463046929
-:1089B0007047846BA646446BA546046BA446C46A04
-:1089C000A346846AA246446AA146046AA046C769CF
-:1089D000866945690469C3688268006841687047B0
-:1089E000014B18607047C046F82B002080B2002869
-:1089F00007D1BFF34F8F034B034ADA60BFF34F8FAA
-:108A0000FEE7704700ED00E00400FA050120054B89
-:108A100010B51A7850401870034B1B68002B00D01B
-:108A2000984710BD492E0020FC2B0020F0B5254BA7
-:108A300085B01B78DBB20093002B18D0224E234F59
-:108A400033685A425A41D2B201923A68002A14D18C
-:108A5000009C002B0BD021E003983B6898472C002A
-:108A600019E028003368984729E0002C05D005B0AC
-:108A7000F0BD002CFBD1009C019403A80FF0AFFDCA
-:108A8000009C0500052806D00028E5D00022110032
-:108A9000FFF7ACFF0024019B002BE6D10C4B03A990
-:108AA0001B880B800B4B1D6828000FF09AFD0528D2
-:108AB000DFD00028D5D000221100FFF797FF002C4F
-:108AC000ECD1D9E74A2E0020002C0020082C0020F1
-:108AD000C42D00200C2C0020074B10B51B68002B68
-:108AE00007D09847002803D000221100FFF77EFF2F
-:108AF00010BDFFF79BFFFBE7042C002002210C4B6D
-:108B00000C4A30B599508021C9000C005D58002DE9
-:108B1000FCD0A121C900585019590029FCD00021CE
-:108B200099508021C9005A58002AFCD030BDC04657
-:108B300000E0014004050000032370B504009840E4
-:108B40009C4315331840E73383408140012022685D
-:108B50009A438918074B084A98508020C0000500A6
-:108B60001E58002EFCD0216059590029FCD000214C
-:108B7000995070BD00E001400405000070B501256A
-:108B800080260D4B0D4CF6001D519D59002DFCD03B
-:108B9000802592001218ED00091A904205D100229A
-:108BA0001A515A59002AFCD070BD0E5806605E5901
-:108BB000002EFCD00430F0E700E001400405000086
-:108BC00070B504000D0016000021102210F0FDF811
-:108BD000054B320023612900200000F011FB034BFC
-:108BE00020001C6070BDC046A0860100102C002033
-:108BF00010B50400016100F0BDFA014B1C6010BD0E
-:108C0000102C002070B5054D04002B68834203D062
-:108C1000016900F0AFFA2C6070BDC046102C002036
-:108C200010B5040000F006F8014B2000236010BDD1
-:108C300050EF02000C4B70B503600023436083606B
-:108C4000C360036243628363962304009B01051D96
-:108C5000C363280000F010FC28002200034900F044
-:108C6000A7FC200070BDC04660EF02009F86020096
-:108C700010B50400044B03600FF072FD200000F0FB
-:108C80001BF8200010BDC04670EF0200084B10B565
-:108C900008330360002343608360C360040000F076
-:108CA000B3F8044920610FF06DFE200010BDC046EE
-:108CB00090EF02002788020010B50400034B083330
-:108CC00003600FF0BDFD200010BDC04690EF020014
-:108CD000054B10B51B68002B04D11922182103483D
-:108CE00000F0CAFB10BDC046AC2D0020D42F0020E0
-:108CF000030010B50020022B0ADD0749033B9B004F
-:108D00005A585850824204D0136810005B68984744
-:108D100010BD01204042FBE7142C002070B50C0070
-:108D20001500022810DC0F4B1B68002B01D1FFF748
-:108D3000CFFF6619B44205D021780B4800F08AFCB9
-:108D40000134F7E7280070BD0338084B8000C05895
-:108D5000002803D003681B689847F4E701204042CD
-:108D6000F1E7C046AC2D0020D42F0020142C0020A9
-:108D700010B50C0002280BDC0C4B1B68002B01D13A
-:108D8000FFF7A6FF0A480FF052FF2070012010BD28
-:108D90000338084B8000C058002803D003689B6844
-:108DA0009847F4E701204042F1E7C046AC2D00208F
-:108DB000D42F0020142C0020030010B50120022B1A
-:108DC00008DD033B054A9B009858002803D0036840
-:108DD000DB68984710BD01204042FBE7142C0020BF
-:108DE000030010B50020022B08DD033B05489B0063
-:108DF0001858002803D003681B69984710BD01204C
-:108E00004042FBE7142C002000487047A4EF02000A
-:108E100010B502480FF0BFFD10BDC046A4EF020020
-:108E20000848026803210A4302600749074A084BC1
-:108E30009B1A03DD043BC858D050FBDC0548804733
-:108E40000548004724050040A487030000000020D7
-:108E5000140100203D9C010009010000FEE7FEE72F
-:108E6000FEE7FEE7FEE7FEE770B50E000E4C0500DC
-:108E70002100300000F0D2FE28600023E3565A1C87
-:108E800001D1002302E0B3420CD1A368A02201204B
-:108E90000649D2002B7188506A221B021343044AF0
-:108EA0008B5070BD0C34E8E7C0EF0200007000404A
-:108EB000040500000B4B0C4910B55A580B4C2240CE
-:108EC0005A5002795C58120222435A5080200122E3
-:108ED000C0001A6019581142FCD1A122D200985842
-:108EE00080B210BD0070004004050000FF00FFFFCD
-:108EF00001704B1C0AD001238B404360044BC360BC
-:108F0000044B0361044B4361044B83607047C046CC
-:108F1000080500500C0500501005005014050050C5
-:108F2000F7B5A223A022DB00D205D358BE220193BD
-:108F3000314B5200995800293FD0C121890059581E
-:108F400000293ADA0024E025C0269C50ED00B60244
-:108F50002A4BA700F85800282CD0294BE35C002BA3
-:108F600017D0019B0121E3400B4227D02300A02210
-:108F7000C133FF339B00D2059B589B039B0F032BF0
-:108F80001CD0204B1B68E3400B4217D01E4B1B68C4
-:108F90009847A023DB05FF187A5932420AD07A5944
-:108FA0001A490A407A51019AE240D3071FD57A59EB
-:108FB00032437A5101341F2CCAD1F7BD019B0122E3
-:108FC000E3401342E5D12300A021C133FF339B00CE
-:108FD000C9055B589B039B0F032BDAD10C4B1B6815
-:108FE000E3401342D5D0084B02211B68D0E7802212
-:108FF000795992020A43DCE7006000401C2D0020F2
-:109000004B2E0020A02D0020982D0020FFFFFCFFFC
-:109010009C2D002030B5040008004D1C1CD00F48CA
-:1090200021600260BE2200200D4C5200A0500D4A6B
-:109030008D00AB5001220C4B5A54C1228023920068
-:109040001B06A350094B0A4C99580C40C021090437
-:109050002143995040221A6030BDC046982D00200F
-:10906000006000401C2D00204B2E002000E100E09D
-:10907000FFFF00FF70B5A024E0250068E405830031
-:10908000ED001B195C591F4E34405C511E4D0124EC
-:109090002E68002A26D0A14203D181400E432E60C3
-:1090A00006E0022904D18440184A11680C43146078
-:1090B0002A680121C2400A4204D1144A1268C240FF
-:1090C0000A420ED0A021A222C905D2008958F1324D
-:1090D000C140FF329858C90711D5C0218902014308
-:1090E000995070BD012902D181408E43D7E70229F2
-:1090F000DED1844005490A68A2430A60D8E780218E
-:10910000ECE7C046FFFFFCFFA02D00209C2D0020B7
-:109110000368074A9950074AFC33196A002902D0AC
-:10912000002018627047013A002AF6D10120F9E7C1
-:109130001C050000A186010010B50368002A03D0B9
-:10914000802202209200985001221C001A62084AD4
-:10915000FC34E068002806D00020A322E060D200A2
-:109160009B580B7010BD013A002AF2D10120F9E79B
-:10917000A186010010B50B4C02680B4BA14205DC27
-:109180000A498160CC214904D15010BD084CA1424C
-:1091900004DC084981608021C904F5E70649816043
-:1091A000CD21F9E78FD0030024050000A08601003F
-:1091B0007F1A060090D00300801A060070B50400E4
-:1091C0001000A025C026C130FF30F600ED0580005C
-:1091D00046510800C130FF3080004651A12520686B
-:1091E000ED004251054A815019002000FFF7C2FFEF
-:1091F000A02305212268DB00D15070BD0C050000C2
-:10920000F8B50E001500040000F002FC264AF1B289
-:109210001378DBB2012B1DD1507888421AD1977890
-:10922000E8B2874216D16373204B19000022FC314B
-:109230002360657126718A62A021C9005A501C49B9
-:1092400020005A5001325A502A003100194BFFF7C2
-:10925000B5FFF8BD184BE8B21F78012F09D15F7830
-:109260008F4206D19F78874203D102236373134B49
-:10927000DBE71778002F04D1012313705170907031
-:10928000D1E71A78002A04D101321A705970987007
-:10929000EBE70B480FF031FB0023FC2223606571E4
-:1092A00026719362FFDEC0466A2E00200030004027
-:1092B000FC0F0000A08601006E2E00200040004040
-:1092C000F9860300036800221900FC3110B58A6298
-:1092D000A021C9005A5006495A5001325A5005225D
-:1092E0000421825641568368FFF768FF10BDC046CF
-:1092F000FC0F0000036800211A00FC3210B59160D9
-:1093000001315961074B9168002905D0002404738D
-:10931000FFF7D8FF200010BD013B002BF3D1012047
-:10932000F9E7C046A1860100036810B51900FC31B9
-:109330008A6A0020012A08D1044C1C5988625A61AB
-:109340000238A40701D40120404210BDC40400002B
-:109350000261064A10B54260054A01738260054AFF
-:10936000190002600FF030FC10BDC046040500502B
-:1093700010050050000700500023134A30B5D356A3
-:1093800083421DD00123D35683421BD00223D356E0
-:10939000834214D10223190045310C480C4CFF3193
-:1093A00089000C5001210D005C00601C8540A1402B
-:1093B000A120084C2943C0002150FF21D15430BDC9
-:1093C0000023E8E70123E6E7EB000020006000400F
-:1093D000031F020000F00140A820012110B5124A2D
-:1093E000124B1488C00059601C50548810481C50FF
-:1093F0009088A922D200985080220820920098508C
-:1094000080200932FF32000398500A4A1078A222C5
-:10941000D2009850084A1088084A985000221960D3
-:10942000FC331A6510BDC046D200002000A00040E9
-:1094300044050000EE000020D00000204C05000094
-:10944000012310B50A4ADC0014598C4207DD013BA8
-:10945000DB00D3185A680168064BCA5010BD0133AF
-:10946000112BF0D180210268024B4905D150F5E75C
-:1094700014F0020024050000F8B50F0016000122C8
-:10948000244BBA400360A023234CDB051959050087
-:109490000A431A518022195912060A430121B14088
-:1094A0001A511A598A4396211A511A5989015200A0
-:1094B00052081A51FFF7C4FF002204202B681749F5
-:1094C0005A506C3958500121996019601900FC31CB
-:1094D000CA6013495A506A6014391F325A501149F0
-:1094E0005F5009185A501E517B1C03D003213800CD
-:1094F0000FF048FB731C03D0032130000FF042FB38
-:109500000122094B29001A60084807320FF041FC7C
-:10951000F8BDC04600200040140500006C050000A6
-:109520001C0500000C050000AC2D0020D42F0020ED
-:10953000962310B5DB00994202DDFFF781FF10BDD5
-:109540009E210268014BC902D150F8E724050000B2
-:109550000168034B002A01D1CA5070470E22FBE775
-:109560006C050000C1230E4A9B00D15810B50906B6
-:1095700003D50C49096A002908D1D3585B0704D5E3
-:10958000084B0021DB68002B01D110BD0121064BE7
-:1095900018680028F9D0054B1B689847F5E7C046C6
-:1095A00000200040FC200040A82D0020A42D002019
-:1095B000034B1960436803499B005A507047C046EB
-:1095C000A42D0020A82D002000681F4B30B5C31823
-:1095D0005C4263415B00002A1CD0002911D00129A4
-:1095E00014D0FF20C024DD00A8401849A4000A5967
-:1095F0008243C020A84002430A5101229A400A60D7
-:1096000030BDC122042192008150EAE7C1228021AD
-:109610009200F9E7002908D00129F1D1C222802463
-:10962000920084508258920806E0C22204219200DF
-:10963000815082580339D2099143E1D001229A40E6
-:109640001300034AD367DBE700E0FFBF00E100E05F
-:1096500004E100E003681A00FC32106A0128FCD122
-:1096600000201062014AC9B2995070471C050000E1
-:1096700070B51D00A02304001600DB00002D0ED0E5
-:1096800000224068C250082902D012480FF035F974
-:10969000032E16D8300000F037FB170510120268B1
-:1096A000D550F0E70223A0220B48D200002D0DD0A8
-:1096B00061680B5002238B5070BD0423F3E706232F
-:1096C000F1E706480FF019F90023ECE721680B5089
-:1096D0000123F0E70A8703005405000023870300F5
-:1096E000036810B55A1C0DD0A0220020164CD200E1
-:1096F00098501000154AA14205DC80218904995038
-:1097000001221A5010BD124CA14202DC8021C90472
-:10971000F5E7104CA14202DC80210905EFE70E4C71
-:10972000A14202DC80214905E9E70C4CA14202DCA0
-:1097300080218905E3E70A4CA14202DC8021C905AA
-:10974000DDE780210906DAE78FD003002405000059
-:109750001FA107003F420F007F841E00FF083D004D
-:10976000FF117A00F7B5009308AB1B7805005BB2D8
-:109770000F0016000193013357D1614B1A78022A6A
-:109780003ED15978FAB291423AD19978F2B29142E7
-:1097900036D1DA786B461B789A4231D10123594C85
-:1097A00003720123002201205B426B603900564B9B
-:1097B0002C60E250E050A023C131FF31DB0589006D
-:1097C000C850524967500099C131FF318900C850D3
-:1097D000A1210098C90060503100C131FF318900DA
-:1097E000CA50A223DB00E650FC3408212800E260C6
-:1097F0001300FFF73DFF46492800FFF771FFF7BD53
-:10980000444A1378DBB2022B0FD15078F9B2884268
-:109810000BD19078F1B2884207D1D1786A4612789C
-:10982000914202D12B723C4CBBE73A4B1A78002A8A
-:1098300050D10232F9B21A705970F1B2997069467A
-:109840000978354CD9702A72019B0133A9D00123C4
-:1098500000222D495B4238002B6002336C6062505D
-:109860006350A021C130FF30C90580004250300054
-:10987000C130FF30800042500098C130FF3080007E
-:1098800042500198C130FF3080004250A221C900EF
-:1098900067501E49009866500439605001981F496E
-:1098A00060502100FC318A60CA62A721C900635060
-:1098B000103163501A481B4960501B481B496050C7
-:1098C0008021042089006050F939FF392800FFF712
-:1098D000CFFE94E70A4B1A78002A0CD102321A7094
-:1098E000FAB25A70F2B29A706A461278054CDA707F
-:1098F00001232B72A8E70E480EF0FFFFA4E7C04635
-:109900006A2E002000300040FC0F00000C05000013
-:1099100040420F006E2E0020004000401405000061
-:10992000732E002044050000722E00203405000034
-:109930003487030003681A00FC32D0680028FCD189
-:1099400005481950D1680129FCD10021D160A3221A
-:10995000D20098587047C0461C050000A023F0B5FF
-:10996000284FDB00FA5885B001920022A024FA505B
-:10997000E023254AE405DB00E658E2507833E1585D
-:1099800001250291E250A1238022DB00D205E250A2
-:109990000420E5500FF05FF9A222D200A3580397EC
-:1099A0009B0F2B4228D0A35813242B4225D00120F3
-:1099B000A023E0220299DB05D2009E507832995014
-:1099C000A023039A0199DB00D15005B0F0BD0F4BE5
-:1099D0000420EF500FF03FF9A123DB00EF500420EB
-:1099E0000FF039F9A223DB00EB585B00DFD4013C18
-:1099F000002CECD12000DBE71324A0250127ED0586
-:109A0000F5E7C046004000400D0600000C050000D0
-:109A1000A023E021134ADB05C90010B55A50783164
-:109A20005A50114B00221900FC31CA600A62A12170
-:109A30001E20C9005A500D4A0D4C9850CC200D4A9A
-:109A400040049850A2200C4AC00014500B480C4C03
-:109A5000145001205050A0220521D2009950FFF748
-:109A60007DFF10BD0C060000004000400C0500000A
-:109A7000384100402405000000F0014014050000BA
-:109A80001C400040012310B50D4C0E49A3648023F7
-:109A90009B00CB670C490D4A086D002804D00020BC
-:109AA000086511680131116009490B60A923DB00C9
-:109AB0001068E358010C9BB20004184310BDC04667
-:109AC0000090004004E100E0FC900040B02D002038
-:109AD00000E100E0F8B50F4C636C002B0FD00027BD
-:109AE0000D4E67643378BB4209D00C4B1D68FFF7FD
-:109AF000C9FF2D1ABD4202DC3770FFF789F9236DCB
-:109B0000002B05D0064A1368013313600023236538
-:109B1000F8BDC046FC900040742E0020B42D0020FB
-:109B2000B02D002070B51B4D2878002831D10121BF
-:109B3000194B1A4A596050608020C0050160516875
-:109B40000029FCD000221649A2205A5004240121E9
-:109B5000C000D9601C5008381A501248C2261A504A
-:109B6000C12280209200000398508020400298502B
-:109B70000D4AB60090590D4C0440C020000220430D
-:109B80009051C02480206400800010511060196042
-:109B9000297070BD752E002000900040FC00004030
-:109BA000040500004C05000000E100E0FF00FFFF9D
-:109BB000044B10B51B78002B01D1FFF7B3FFFFF763
-:109BC00061FF10BD752E0020104B70B51B7804008E
-:109BD000002B01D1FFF7A6FF0D4D0E4E2B78002B69
-:109BE00002D03368A34210D0FFF74CFF201A0A2896
-:109BF00003DCFFF747FF0A30040001232B70A82382
-:109C0000054A3460DB00A4B2D45070BD752E00202C
-:109C1000742E0020B42D00200090004010B50400E8
-:109C2000431C07D00FF030F80400431C02D1024857
-:109C30000EF063FE200010BD45870300224910B5D9
-:109C40000B68DBB2012B0FD1204B1B681B070BD11C
-:109C50001F4BE0241A68F02310001840224228D13C
-:109C60001C4A12681A4227D00B68DBB2012B12D1B2
-:109C7000164A126812070ED1F021154A12680A40DE
-:109C8000402A08D1134A12680A4204D18021C12215
-:109C9000C905D2008B508022A3230021D205DB000E
-:109CA000D1500D4B9960013191609A68002AFCD027
-:109CB00010BD3028D4D0D7E7084B094A1A6080225B
-:109CC000084B12021A60CFE7E00F00F0E40F00F03B
-:109CD000E80F00F0EC0F00F0FC000040040500402D
-:109CE000DFFF07C0186C0040014B18687047C04682
-:109CF000B82D002002B471464908490009564900B0
-:109D00008E4402BC7047C04602B4714649084900FF
-:109D1000095C49008E4402BC7047C04603B47146DA
-:109D2000490840004900095E49008E4403BC704761
-:109D3000002243088B4274D303098B425FD3030A8A
-:109D40008B4244D3030B8B4228D3030C8B420DD39D
-:109D5000FF22090212BA030C8B4202D3121209022B
-:109D600065D0030B8B4219D300E0090AC30B8B4269
-:109D700001D3CB03C01A5241830B8B4201D38B0317
-:109D8000C01A5241430B8B4201D34B03C01A5241BC
-:109D9000030B8B4201D30B03C01A5241C30A8B42FF
-:109DA00001D3CB02C01A5241830A8B4201D38B02EA
-:109DB000C01A5241430A8B4201D34B02C01A52418E
-:109DC000030A8B4201D30B02C01A5241CDD2C30900
-:109DD0008B4201D3CB01C01A524183098B4201D37C
-:109DE0008B01C01A524143098B4201D34B01C01A67
-:109DF000524103098B4201D30B01C01A5241C308DF
-:109E00008B4201D3CB00C01A524183088B4201D34D
-:109E10008B00C01A524143088B4201D34B00C01A39
-:109E20005241411A00D20146524110467047FFE7A5
-:109E300001B5002000F0F0F802BDC0460029F7D0BF
-:109E400076E7704703460B437FD4002243088B42DA
-:109E500074D303098B425FD3030A8B4244D3030BB1
-:109E60008B4228D3030C8B420DD3FF22090212BA76
-:109E7000030C8B4202D31212090265D0030B8B42F2
-:109E800019D300E0090AC30B8B4201D3CB03C01ADC
-:109E90005241830B8B4201D38B03C01A5241430BB7
-:109EA0008B4201D34B03C01A5241030B8B4201D3A7
-:109EB0000B03C01A5241C30A8B4201D3CB02C01A12
-:109EC0005241830A8B4201D38B02C01A5241430A8A
-:109ED0008B4201D34B02C01A5241030A8B4201D379
-:109EE0000B02C01A5241CDD2C3098B4201D3CB0120
-:109EF000C01A524183098B4201D38B01C01A5241CF
-:109F000043098B4201D34B01C01A524103098B42D2
-:109F100001D30B01C01A5241C3088B4201D3CB00BD
-:109F2000C01A524183088B4201D38B00C01A5241A0
-:109F300043088B4201D34B00C01A5241411A00D250
-:109F400001465241104670475DE0CA0F00D04942B9
-:109F5000031000D34042534000229C4603098B4229
-:109F60002DD3030A8B4212D3FC22890112BA030AB1
-:109F70008B420CD3890192118B4208D38901921133
-:109F80008B4204D389013AD0921100E08909C309B8
-:109F90008B4201D3CB01C01A524183098B4201D3BA
-:109FA0008B01C01A524143098B4201D34B01C01AA5
-:109FB000524103098B4201D30B01C01A5241C3081D
-:109FC0008B4201D3CB00C01A524183088B4201D38C
-:109FD0008B00C01A5241D9D243088B4201D34B00A7
-:109FE000C01A5241411A00D20146634652415B10E9
-:109FF000104601D34042002B00D5494270476346CA
-:10A000005B1000D3404201B5002000F005F802BD0E
-:10A010000029F8D016E770477047C0468446101CE8
-:10A0200062468C46191C634600E0C0461FB501F02D
-:10A030004DFF002801D40021C8421FBD10B501F01A
-:10A04000A5FE4042013010BD10B501F03FFF0028D1
-:10A0500001DB002010BD012010BDC04610B501F08D
-:10A0600035FF002801DD002010BD012010BDC046D5
-:10A0700010B501F0C7FE002801DC002010BD012052
-:10A0800010BDC04610B501F0BDFE002801DA002069
-:10A0900010BD012010BDC0468446081C6146FFE784
-:10A0A0001FB500F04FFC002801D40021C8421FBD9D
-:10A0B00010B500F0D1FB4042013010BD10B500F0EA
-:10A0C00041FC002801DB002010BD012010BDC0466E
-:10A0D00010B500F037FC002801DD002010BD012084
-:10A0E00010BDC04610B500F0DFFB002801DC0020E9
-:10A0F00010BD012010BDC04610B500F0D5FB0028F2
-:10A1000001DA002010BD012010BDC046002B11D186
-:10A11000002A0FD1002900D1002802D00021C94314
-:10A12000081C07B4024802A14018029003BDC046B3
-:10A13000E9FEFFFF03B4684601B5029800F01EF87F
-:10A14000019B9E4602B00CBC7047C0469E2110B5D4
-:10A15000C905041CFFF7D0FF002803D1201C00F024
-:10A160004DFF10BD9E21201CC90500F06DFD00F0C3
-:10A1700045FF80231B069C466044F2E7F0B54F463E
-:10A180004646D646C0B5040082B00D0091469846BA
-:10A190008B422FD82CD04146484602F01DFE2900A4
-:10A1A0000600200002F018FE331A9C46203B9A4617
-:10A1B00000D576E04B46524693401F004B46624620
-:10A1C00093401E00AF4228D825D05346A41BBD4162
-:10A1D000002B00DA7BE00022002300920193012390
-:10A1E000524693400193012362469340009318E046
-:10A1F0008242D0D900220023009201930A9B002BB7
-:10A2000001D01C605D600098019902B01CBC9046B2
-:10A210009946A246F0BDA342D7D90022002300925E
-:10A2200001936346002BE9D0FB079846414672082C
-:10A230000A437B0866460EE0AB4201D1A2420CD82D
-:10A24000A41A9D41012024196D410021013E2418CA
-:10A250004D41002E06D0AB42EED9013E24196D418E
-:10A26000002EF8D100980199534600196941002B3E
-:10A2700023DB2B005246D3402A006446E2401C00F8
-:10A2800053461500002B2DDB26005746BE403300F9
-:10A2900026006746BE403200801A99410090019125
-:10A2A000ACE7624620239B1A4A46DA406146130017
-:10A2B00042468A4017001F4380E7624620239B1ACC
-:10A2C0002A0066469A402300F3401343D4E76246CF
-:10A2D000202300219B1A0022009101920122DA40E2
-:10A2E000019280E72023624626009B1ADE402F0061
-:10A2F000B0466646B74046463B003343C8E7C046D3
-:10A30000F8B54746CE4643025B0A4400C20F9C465E
-:10A310004800DD004B02240E5B0A000E80B5984613
-:10A3200026009146C90FDB00271A8A4229D0002F48
-:10A3300015DD00284AD1002B00D095E0ED08FF2C58
-:10A3400000D188E06B025B0AE6B25B02F605580AB0
-:10A350003043D20710430CBC90469946F8BD002FFD
-:10A3600000D087E0601CC0B2012800DCB6E0EE1A25
-:10A37000720100D5C5E0002E3DD100220026002349
-:10A38000E3E7002F00DC96E000285DD0FF2C60D0D2
-:10A390008022D20413431B2F00DDECE02022D21BCD
-:10A3A00018009340F8405A1E93410343ED186B0187
-:10A3B0007BD50134FF2C00D1B7E0012207262A40CB
-:10A3C0006B089A4D1D4015432E4029E0FF2CB5D057
-:10A3D0008022D20413431B2F00DDB2E02022D21BC7
-:10A3E00019009340F9405A1E93410B43ED1A6B013B
-:10A3F0005BD5AD01AE09300002F0D0FC05388640D7
-:10A40000844265DC041B330020200134E340041B3C
-:10A41000A640751EAE41334307261D0000241E4092
-:10A4200001224B461A40002E04D00F232B40042B50
-:10A4300000D004356B0100D480E70134E6B2FF2C74
-:10A440002FD1FF26002380E7002B52D1FF2C00D014
-:10A4500074E70A00ED08002DF3D08023DB032B43C3
-:10A460005B025B0AFF2670E7013F002FBED0FF2C86
-:10A47000B1D163E7002C47D0FF2869D08024E404E1
-:10A480007A4225431B2A00DDC5E02C002026D4405B
-:10A49000B21A95406A1E954125435D1B040089460A
-:10A4A000A5E7AB015B0A50E7002401224B461A40A6
-:10A4B0006B07BAD142E7002F3BD10134E0B201284B
-:10A4C0004ADDFF2CBDD00726ED186D082E40A7E70A
-:10A4D0000723574D241A35401E40A1E7002C1BD1FD
-:10A4E000002D6ED1002B00D19AE00A001D003C0027
-:10A4F00024E7013F002F00D158E7FF2C00D04AE7A6
-:10A50000A7E75E1B894676E7002D1CD10A00FF28CD
-:10A510001FD004001D0011E7002D5DD1002B17D1C5
-:10A5200080230022DB03FF260FE70A00FF2600231B
-:10A530000BE7002C21D1002D66D1FF28E9D11D00A9
-:10A5400087E7012352E77A1CA7D0FA43FF2899D165
-:10A550000A001D00FF24F1E6002E21D1002D4FD06E
-:10A56000002B4CD0ED186B019ED5314B07362E4099
-:10A5700001241D4054E7012318E7FF28DFD0802481
-:10A58000E4047F4225431B2F4DDC2026F61B2C00C4
-:10A59000B540FC406A1E95412543ED18040006E7CE
-:10A5A000002DCCD0002B00D153E780216046C90399
-:10A5B000084203D04046084200D11D00012111404D
-:10A5C00047E7002B00D1B9E6EA1A500125D5072646
-:10A5D0005D1B2E40894623E7FF24002B00D1ADE60A
-:10A5E00080226046D203104204D04046104201D17E
-:10A5F0001D00894601224B46FF241A409EE62B008F
-:10A60000DD080A0000249DE67A1CC6D0FF43FF281F
-:10A61000B9D11D001DE701253FE7151E00D044E715
-:10A620000022002391E60125B7E7C046FFFFFF7D2A
-:10A63000FFFFFFFBF8B557464E464546DE4644024F
-:10A64000E0B546008846640A360EC70F002E63D078
-:10A65000FF2E24D08023E400DB041C430023994612
-:10A660009B467F3E434642465D02D20F5B006D0A29
-:10A670001B0E9046924665D0FF2B55D080220021BC
-:10A68000ED00D2047F3B1543F61A43464A467B4011
-:10A690000F2A00D98DE06D48920082589746002C11
-:10A6A00054D108239946063BFF269B46DAE700254E
-:10A6B000534602291BD0032900D1BFE0012928D02D
-:10A6C00030007F30002820DD6A0704D00F222A40A6
-:10A6D000042A00D004352A0103D530005C4A8030BA
-:10A6E0001540FE2803DCAC01640AC2B201E0FF227F
-:10A6F00000246402D205600ADB07104318433CBC07
-:10A7000090469946A246AB46F8BD0122101A1B2876
-:10A710007CDD00220024ECE7002C1DD104239946A7
-:10A72000033B00269B469DE7FF3E002D20D10221E2
-:10A7300043464A467B400A430F2AD8D845489200F0
-:10A7400082589746002D19D10121F1E70C23994633
-:10A75000093BFF269B4685E7200002F01FFB76267B
-:10A76000431F9C4000237642361A99469B4679E760
-:10A770004A4603231A439146032186E7280002F044
-:10A780000DFB431F36189D40763600217DE780245F
-:10A790000023E403FF22ACE700258023DB031C42F7
-:10A7A00028D01D4226D12B435C02640A4346FF2277
-:10A7B0009FE762016C01A24224D21B210025013EC9
-:10A7C000012710006D005200002801DB944201D8DF
-:10A7D000121B3D4301390029F3D11400621E94413C
-:10A7E00025436DE7BA46594625005346022900D055
-:10A7F00061E77CE78023DB031C436402640A3B00BF
-:10A80000FF2276E7121B1A210125D9E79E362A007E
-:10A81000B5402C00C240651EAC411443620704D011
-:10A820000F222240042A00D00434620103D4A40180
-:10A83000640A00225DE7012200245AE78024E40331
-:10A840002C436402640AFF2253E7C0469CF00200D6
-:10A85000FFFFFFF7DCF0020070B542004E024C0033
-:10A8600045026D0A120EC30F760A240EC90FFF2A85
-:10A870000FD0FF2C11D00120A24200D070BDB542F4
-:10A88000FCD18B420DD0002AF8D12800451EA841EA
-:10A89000F4E70120002DF1D1EBE70120002EEDD1EE
-:10A8A000E9E70020EAE7C04670B54A004E024502DB
-:10A8B00044006D0A240EC30F760A120EC90FFF2C36
-:10A8C00015D0FF2A0ED0002C15D1002A01D1002E60
-:10A8D0001CD0002D14D08B4227D00220013B184001
-:10A8E000013870BD002EEED002204042F9E7002D65
-:10A8F000FAD1FF2A0ED0002A0ED1002EEDD00BE0A7
-:10A9000001230139994308000130EAE70020002DB6
-:10A91000E7D0E2E7002EE7D18B42DED1944205DD9D
-:10A920000221581E08400138DBE70024A24204DC63
-:10A93000B542D2D80020B542D3D2581E0123984345
-:10A940000130CEE730B5420044024D02C30F48004B
-:10A95000640A120E6D0A000EC90FFF2A12D0FF28DA
-:10A960000CD0002A12D1002819D1002D17D1002CAB
-:10A970002BD00220013B1840013826E0002DF0D0FA
-:10A98000022022E0002CFBD1FF281FD000281FD17D
-:10A99000002D1DD10220013B1840013815E0002C8C
-:10A9A0000ED08B42E5D10022904204DCAC42E0D8CC
-:10A9B0000020AC4209D2581E01239843013004E024
-:10A9C0000123013999430800013030BD002DD7D152
-:10A9D0008B42CED18242E7DD0221581E0840013869
-:10A9E000F3E7C046F0B54E4657464546DE46E0B56D
-:10A9F00043025B0A450083B00F1C99462D0EC60F1B
-:10AA0000002D57D0FF2D24D08020DB00C004184338
-:10AA1000002381469A469B467F3D7C027A00FB0FCD
-:10AA2000640A120E984623D0FF2A4BD0E3008024FC
-:10AA30000020E4047F3A1C43AD186B1C4746019389
-:10AA4000534677403A000F2B48D87D499B00CB589E
-:10AA50009F46002B00D085E008339A46063B9B4674
-:10AA60007C027A00FB0FFF25640A120E9846DBD1A8
-:10AA7000002C00D090E0524601231A439246012058
-:10AA8000DBE74C4658461700022824D0032800D1A3
-:10AA9000CFE00022002301284DD15802D205400A00
-:10AAA000FF071043384303B03CBC90469946A2468A
-:10AAB000AB46F0BD002B5BD104239A46033B002537
-:10AAC0009B46AAE7FF35002C60D1524602231A4369
-:10AAD00092460220B1E7FF220023DEE74B461B0C23
-:10AAE0009C464B462604360C180461463300220C63
-:10AAF0006446000C43434E435043544380191A0CA0
-:10AB00001218964203D9802149028C4664441B04E2
-:10AB10001B0C1004C01883015E1EB341800E184345
-:10AB2000130C1B199B0103431C00230179D501233E
-:10AB300062081C401443019A7F32002A4DDD6307EE
-:10AB400004D00F232340042B00D00434230103D569
-:10AB50003C4B019A1C408032FE2ABCDCA3015B0AFC
-:10AB6000D2B29AE70C239A46093BFF259B4654E74D
-:10AB7000180002F013F94A46431F76259A40002335
-:10AB80006D4291462D1A9A469B4646E7524603234C
-:10AB90001A439246032050E7200002F0FFF8431FBB
-:10ABA0002D1A9C40763D002047E780230027DB03D9
-:10ABB000FF2272E7424666E74C463200584662E79B
-:10ABC00080234A46DB031A4222D01C4220D1234371
-:10ABD0005B025B0A4746FF225FE701239A1A1B2AA2
-:10ABE00021DC23000199D3409E318C401A002300C0
-:10ABF0005C1EA34113435A0704D00F221A40042AB3
-:10AC000000D004335A0111D49B015B0A002244E7AF
-:10AC100080234A46DB0313435B025B0A3700FF22B3
-:10AC20003BE7019587E70022002336E70122002356
-:10AC300033E78023DB0323435B025B0AFF222CE71D
-:10AC40001CF10200FFFFFFF7F8B54746CE4644006F
-:10AC5000C20F80B547024802400A84466646480053
-:10AC60007F0A240EF60025009046FB00000EC90F57
-:10AC7000B146FF2800D185E001267140261A914295
-:10AC800057D0002E43DD002800D07FE04946002940
-:10AC900000D1AAE0013E002E00D0F7E05B1A5A0175
-:10ACA00000D48BE09B019C09200002F077F8053866
-:10ACB0008440854200DDD3E0451B23002020013580
-:10ACC000EB40451BAC40621E944123430724002502
-:10ACD0001C40012241460A40002C04D00F2119409B
-:10ACE000042900D00433590100D480E00135ECB2CE
-:10ACF000FF2D00D0A3E0FF2400235B02E405580AE7
-:10AD0000D207204310430CBC90469946F8BD002E54
-:10AD100074D1601CC0B2012800DCA7E04A469C1A2E
-:10AD2000620100D5B6E0002CBED100220024002331
-:10AD3000E3E7002E00DC85E0002846D0FF2C49D058
-:10AD400080224846D2041043814601221B2E09DC92
-:10AD500020204C46801B84404A462000F240441E7E
-:10AD6000A04102439B185A0128D50135FF2D00D17F
-:10AD7000A8E00122072494491A405B080B401343C2
-:10AD80001C40A6E7002E00D078E775E7FF2C54D0D2
-:10AD900080224946D2041143894601221B2E09DC38
-:10ADA00020214846891B88404A460100F240481E3F
-:10ADB00081410A439B1A5A0100D573E7012241469B
-:10ADC0000A40590700D089E711E04846002858D1C9
-:10ADD000FF2C0CD1DB08002B00D18CE78020C003B6
-:10ADE00003435B025B0AFF2487E7FF2C25D0DB08C7
-:10ADF000FF2DF0D05B025B0AECB27EE7002C4DD059
-:10AE0000FF2818D08024E404724223431B2A00DD6B
-:10AE1000C4E01C002025D440AA1A93405A1E934136
-:10AE200023434A460500D31A884638E7721CF8D0F7
-:10AE3000F243FF28EAD10A004B46FF25D7E79B01E2
-:10AE40005B0A5AE7002E41D1651CE9B2012945DDB4
-:10AE5000FF2D00D14FE707244B445B081C4038E727
-:10AE600007225A4B2D1A2340144032E7002C1DD1E3
-:10AE7000002B7AD14B46002B00D191E00A0000252F
-:10AE8000B5E7013E002E19D14B446CE7FF2C84D16D
-:10AE9000FF25ACE74A468846D41A05E7002BC5D102
-:10AEA0000A00FF28C8D005004B46A0E7002B49D177
-:10AEB0004B46002B77D00A00FF2598E7FF2C00D0E7
-:10AEC00043E787E70A00FF24002316E7002C15D18B
-:10AED000002B57D1FF28E6D14B467BE7002C20D131
-:10AEE000002B57D04946002953D04B445A0168D50E
-:10AEF0000724364A1C4001251340EAE6FF28EBD020
-:10AF00008022D204764213431B2E53DC2025AD1B36
-:10AF10001A00AB40F2405C1EA34113434B440500B2
-:10AF200021E7002BD8D04946002900D152E78021E3
-:10AF3000C9030F4200D14DE76046084200D049E7FF
-:10AF40004B4647E74846FF25002800D14FE78022BF
-:10AF5000D203174204D06046104201D14B468846C6
-:10AF600001224146FF250A4041E7484600281FD0FC
-:10AF70001A1A500120D54A460724D31A1C40884685
-:10AF80000025A6E6741CC9D0F643FF28BCD14B4669
-:10AF900020E799464B460025DB082BE7012340E7D5
-:10AFA00000220023A9E680230022DB03FF24A4E67D
-:10AFB00000251CE70123B1E7002AF1D0130000258A
-:10AFC000FCE60025FAE6C046FFFFFF7DFFFFFFFB22
-:10AFD00042024B0240004900520A5B0A090E000E71
-:10AFE000FF2806D00020FF2902D11800431E9841F7
-:10AFF0007047FE38002AFBD1F4E7C0464102420008
-:10B00000C30F490A120E00207E2A0DD99D2A0CD8A2
-:10B01000802000040143952A0ADC9620821AD14040
-:10B020004842002B00D108007047034A9818FBE7FC
-:10B03000963A9140F4E7C046FFFFFF7F70B50028C5
-:10B040003DD0C317C5185D40C40F280001F0A6FE0F
-:10B050009E22121A962A07DCD2B2082833DD08385D
-:10B0600085406802400A23E0992A0BDD0523290068
-:10B070001B1AD94003001B339D402B005D1EAB41C2
-:10B0800019430D00052801DD431F9D402B000F498A
-:10B090000B406E0709D00F263540042D05D0043330
-:10B0A0005D0102D59F220B40121A9B01580AD2B2B1
-:10B0B0004002D205400AE4071043204370BD00243B
-:10B0C00000220020F4E76802400AF1E7FFFFFFFBDF
-:10B0D00070B5041E34D001F061FE9E22121A962A29
-:10B0E00007DCD2B208282EDD083884406002400A0E
-:10B0F00021E0992A09DD030021001B3399404B1EF2
-:10B10000994105231B1ADC400C43052801DD431F30
-:10B110009C4023000D490B40650709D00F252C40AA
-:10B12000042C05D004335C0102D59F220B40121A77
-:10B130009B01580AD2B24002D205400A104370BDAA
-:10B1400000220020F7E76002400AF4E7FFFFFFFB60
-:10B15000F0B54F464646D6460C000903C0B5490A2D
-:10B16000470F5E0039431F03DB0F9C4665007B0AD7
-:10B17000570F1F436D0DE40F760DA146C000B84672
-:10B18000D200AB1B64457BD0002B5FDD002E00D0CE
-:10B19000A4E03E00164300D112E15E1E002E00D056
-:10B1A0009EE1871A4346B84280410125C91A4042B0
-:10B1B000091A0B0200D431E149024E0A002E00D1D7
-:10B1C0006EE1300001F0EAFD0300083B1F2B00DDBB
-:10B1D00061E120223900D21A9E40D1409F400E43A7
-:10B1E0009D4200DD51E15D1B6B1C1F2B00DD7CE1EE
-:10B1F0002021C91A3D0030008F408840DD40791E73
-:10B200008F41310007222843D940002507433A40A7
-:10B21000002A09D00F233B40042B05D03B1DBB4225
-:10B22000BF417F42C9191F000B0200D426E26A1CED
-:10B23000C64B55056D0D9A4200D106E1C44AFF0880
-:10B240000A40530752023B43120B8EE0002B00D002
-:10B25000B8E06B1C5B055B0D012B00DC30E1871A4D
-:10B260004346B842B641CB1A76429E1B330200D504
-:10B270004CE13B003343A1D100220024002570E0C3
-:10B28000002B00DCE5E0002E00D183E0AF4EB5429C
-:10B2900060D0802636043743B846382B00DC3EE1C8
-:10B2A000434613431F007A1E97413F18874280414F
-:10B2B000404209180B0200D4B0E0A44B01359D4276
-:10B2C00000D1C3E0A24A7B080A4001210F401F437E
-:10B2D0005108D30707221F433A4099E79B4EB542D6
-:10B2E00038D0802636043743B846382B00DDDCE002
-:10B2F0001F2B00DC30E11E004746203EF740BC46D5
-:10B30000202B04D04026F31A46469E4032431700B5
-:10B3100063467A1E97411F43CCE0002B00D104E224
-:10B320004346134300D159E14B07C008184380231B
-:10B33000C9081B03194208D04546ED081D4204D137
-:10B340004346D008590708432900420FC9007F4DE2
-:10B350001143C0004B07CA087C49C00803438D4213
-:10B3600068D012036D05120B6D0D00211203180039
-:10B37000130B0A0D12051A43764B2D0513402B4370
-:10B380005B00E4075B08234319001CBC9046994608
-:10B39000A246F0BD3E00164312D05E1E002E00D025
-:10B3A00000E1871887428041414440420918012545
-:10B3B0000B0233D5022585E7644633004146100071
-:10B3C0001D00C7E7002D00D0DAE00C000443F3D0E5
-:10B3D0005C1C00D19FE15D4CA64200D12FE1DB4314
-:10B3E000382B00DD66E11F2B00DD83E12024050002
-:10B3F000E41A0F00DD40D940A0404346A7405B1A45
-:10B40000441EA04198462F433843171ABA4292412E
-:10B4100043465242991A64463500CAE607223A402A
-:10B42000002A00D0F6E64B07CA084849FF083B430C
-:10B430008D4296D11900114300D19EE1802109036C
-:10B440000A431203120B414D8FE71500002200231F
-:10B450008BE7002B00D0C7E06B1C5F057F0D012F31
-:10B4600000DCF1E0394DAB4200D1B9E085180A00AB
-:10B47000854289414244494251180722CF076D084D
-:10B480002F4349083A401D00C2E607223049ED1A11
-:10B4900031403A40BCE63E002838864000279FE60F
-:10B4A000380001F07BFC20308EE6434613431F003A
-:10B4B0007A1E9741C71BB84280414042091A78E67C
-:10B4C0000E003B0006431343002D61D1002E00D037
-:10B4D000F4E0002B00D11BE164463900100039E78D
-:10B4E0001A4FBB427AD03300FFE630001F3DE840E0
-:10B4F000202B03D04021CB1A9E4037437B1E9F4117
-:10B50000072207433A400021002589E7171A4346DE
-:10B51000BA42B641591A76428E1B64464EE61F2B3C
-:10B5200000DDADE020264746F61AB740B9461700C1
-:10B53000B246DF404E463E4337005646B240561EA6
-:10B54000B24117434246DA408918AEE6FF070000D1
-:10B55000FFFF7FFFFFFF0F8020264746F61AB74008
-:10B56000B9461700B246DF404E463E4337005646C6
-:10B57000B240561EB24117434246DA40891A99E753
-:10B580007F4CA6425BD0802424045B42214327E702
-:10B59000002E0CD1002B00D1CBE064463900100006
-:10B5A000774DD7E6764FBB4218D0330075E6002BB7
-:10B5B00014D04B07C00818438023C9081B03194245
-:10B5C00007D0FC081C4204D17907D0080843E146A3
-:10B5D00021004C46420FC9001143C000684DB9E636
-:10B5E0001D0000220023C0E6002D5BD10D000543A5
-:10B5F00000D1E2E65D1C00D1B0E0614DAE421FD04B
-:10B60000DB43382B71DC1F2B00DD96E020250F007B
-:10B61000ED1AAF40B9460700AA46DF404D463D430C
-:10B620002F005546A840D940451EA84188440743ED
-:10B63000BF18974292415142414435003AE6644670
-:10B6400035004146100085E60B000343002D00D075
-:10B6500063E6002BF5D04346134300D17AE6871802
-:10B660008742804107224144404209183A400B0278
-:10B6700000D4D5E6434B01351940C9E5380069E6E9
-:10B680001E004746203EF740BC46202B04D04026F3
-:10B69000F31A46469E403243170063467A1E97418E
-:10B6A0001F4302E6364DAE42CAD080252D045B42D0
-:10B6B0002943A6E70843411E8841A6E6002B00D196
-:10B6C00048E6871A4346B842B641CB1A76429E1BDB
-:10B6D00033024BD5171A4346BA429241591A524285
-:10B6E000891A072264463A4092E501430F00791E09
-:10B6F0008F419DE71C000F00203CE740202B03D02A
-:10B700004024E31A99400843411E884138437CE6AF
-:10B710000022002425E6171A4346BA429241591ADC
-:10B720005242891A6446350043E541461000144DE3
-:10B7300010E680220024120380E61D000F00203D49
-:10B74000EF40BC46202B03D04025EB1A994008431C
-:10B7500007006346781E87411F4369E787189742B1
-:10B760009B4141445B42C9183500A3E53B0033438C
-:10B77000CED0072231003A4052E600231A00F4E509
-:10B78000FF070000FFFF7FFFF0B55746DE464E463D
-:10B790004546E0B5834607000E03480085B0924653
-:10B7A0001C00360B400DCD0F002800D19DE0954BBD
-:10B7B000984239D08023F6001B041E43924A7B0F27
-:10B7C00033439946944603006344009300230026C4
-:10B7D000FF00029323031B0B98466300E40F5246BD
-:10B7E0005B0D019400D1B3E086498B4200D19EE00D
-:10B7F0004246D100802212040A435146490F1143A8
-:10B800008B46814952468C4600996344CB1A0021ED
-:10B81000D20000932B0063409A460F2E00D905E119
-:10B820007A4BB6009B599F465B463343994600D0FE
-:10B83000B8E002230826002700900293CAE7CB460F
-:10B840003A0002990195019B9A46022927D00329C3
-:10B8500000D180E2012944D06D49009B8C466344AD
-:10B860001C00002C38DD530700D013E2D2085B46E1
-:10B87000DB0109D55946674B19408B468021C90029
-:10B880008C46009B63441C00634B9C4207DC5B4678
-:10B8900064055F075B0217431B0B620D02E0002388
-:10B8A0000027584A00211B031C0B0B0D1B052343CB
-:10B8B00014055A4A380013401C4353466400DB0702
-:10B8C00064081C43210005B03CBC90469946A24642
-:10B8D000AB46F0BD0122524201231B1B382B00DC7A
-:10B8E000ADE1002200230027DCE75B4633439946A5
-:10B8F0005ED0002E00D18AE1300001F04FFA030043
-:10B900000B3B1C2B00DD7BE11D22D31A5A460100A4
-:10B91000DA4008398E4013005F46334399468F4022
-:10B920003F4B00261B1A00930023029352E7414627
-:10B9300053460B433B499B468C46009B6344009314
-:10B940005B46002B3BD1022300221E43022161E70C
-:10B95000434613439B4637D04346002B00D162E158
-:10B96000404601F01BFA03000B3B1C2B00DD53E1AA
-:10B9700002004146083A914088461D21CB1A5146A3
-:10B98000D9400B0041460B439B46534693401A0057
-:10B99000009B25499C46604403008C466344009309
-:10B9A000002137E70323B14600900C26029311E7EC
-:10B9B0000023009301330426002702930AE70323A0
-:10B9C000C3461E43032125E701331E430022012104
-:10B9D00020E700239A46802300271B03094A61E7DA
-:10B9E000802349461B03194200D1E2E0594619421F
-:10B9F00000D0DEE00B431B0317001B0BA246014ADD
-:10BA000050E7C046FF07000001FCFFFF5CF10200A9
-:10BA1000FF030000FFFFFFFEFE070000FFFF0F8097
-:10BA20000DFCFFFF01F8FFFFF3030000D94500D92B
-:10BA3000CBE000D1C6E03C0048460027009B013B1C
-:10BA400000935B46160E1B021E43130298463304F6
-:10BA50001B0C9946310C0191FEF7F0F94A4642431E
-:10BA60000B04210C050019438A4207D98919013DAD
-:10BA70008E4203D88A4201D9851E8919881A0199F4
-:10BA8000FEF7DCF909048C464A4621046446424329
-:10BA9000090C030021438A4204D98919013B8E42D3
-:10BAA00000D8F1E02D041D43AB464346891A4246B7
-:10BAB000280C12041D0C5B46140C22001B041B0CEA
-:10BAC0005A4303946B434443029568431B19150C76
-:10BAD000EB189C4203D980246402A44660441C0CE9
-:10BAE00015041B042D0C20185D19814277D373D0E7
-:10BAF0000C1AA24A7D1BAF42BF419446009B7F4275
-:10BB00006344E01B1C00864200D1DBE00199FEF794
-:10BB100095F94A4642430B04290C070019438A420F
-:10BB200007D98919013F8E4203D88A4201D9871E5D
-:10BB30008919881A0199FEF781F909044A4689464C
-:10BB400029044D464243090C030029438A4207D980
-:10BB50008919013B8E4203D88A4201D9831E891973
-:10BB60003F04891A3A00039F1A43380013041B0C40
-:10BB7000584381460298150C6F434343454348465A
-:10BB8000000C8446DB1963449F4203D980204002A5
-:10BB90008446654448461F0C00041B04000C7D19B4
-:10BBA0001818A94200D284E000D17FE001231A4393
-:10BBB00057E680234A461B0313431B031B0BAA466D
-:10BBC0006F4A6FE6BA4200D935E74B46DC075808A2
-:10BBD0007B081C43FF0734E70024AF4289D2474467
-:10BBE0004745A4415B466442A4196418013BA64240
-:10BBF0001ED2A0426DD800D1B6E0241A9B4678E749
-:10BC000003005A46283B9A400027914688E658464A
-:10BC100001F0C4F8203072E603005246283B9A40F7
-:10BC200093460022B4E6504601F0B8F820309AE678
-:10BC3000A642E2D1B845DCD9341A9B4659E71F2BFE
-:10BC400065DC504C0099A4465C46614408008C4079
-:10BC500011008240D940501E82410C4314435A4681
-:10BC6000DA401300620709D00F222240042A05D0CF
-:10BC70002200141D9442894149425B181A0262D580
-:10BC80000122002300270DE68A4200D80AE7831E1E
-:10BC9000891907E70F231340042B00D1E6E5171D90
-:10BCA0009742924153429B44FA08E0E5002800D1B4
-:10BCB000D7E57118531EB14227D3A94215D358D0E6
-:10BCC0001A0073E7002B00DC04E6012300229B44EA
-:10BCD000CDE502234744474589415B429C464942A2
-:10BCE00089190C19E344241A03E743465F004745CA
-:10BCF0009B41B8465B429E19023A8919A94200D07D
-:10BD000054E7404500D051E7ABE51A00F6E71F21A4
-:10BD10005F4649420C1BE740202B07D01A49009B85
-:10BD20008C46634418005B4683401A43501E824190
-:10BD30003A4307270023174009D00F210023114061
-:10BD40001400042995D122005F075B021B0BD20867
-:10BD500017430022A6E5802359461B030B431B0310
-:10BD600017001B0B064A9DE5BD42B2D89B46002436
-:10BD7000BFE68045B9D31A00C3E7C046FF03000001
-:10BD8000FF0700001E0400003E040000F0B54F460F
-:10BD90004646D6468446C0B58046194E18030F0362
-:10BDA0004D00000B5C0082463F0B6D0DC90F9146A4
-:10BDB000640DDB0F0120B5420AD0B44203D0A54286
-:10BDC00001D157450CD01CBC90469946A246F0BD07
-:10BDD00066463E43F7D1AC42F5D154461443F2D106
-:10BDE0000120C845EFD1994207D0002DEBD1634621
-:10BDF0001F433800471EB841E5E70020E3E7C0468F
-:10BE0000FF070000F0B54F464646D6464D00C0B588
-:10BE10000E03C90F8A462C491F035C008046360B6F
-:10BE20006D0D91463F0B640DDB0F8D421ED08C4291
-:10BE300016D0002D1ED130438446002C01D13A4348
-:10BE400023D06246002A1AD09A4529D051460220B2
-:10BE50000139084001381CBC90469946A246F0BD05
-:10BE600039001143E5D002204042F4E73043FAD1D3
-:10BE7000AC420FD0002C0FD13A43E7D00CE00122A6
-:10BE8000013B934318000130E5E763460020002B97
-:10BE9000E1D0DBE73A43E6D19A45D7D1A542D5DCDC
-:10BEA000A54205DBBE42D1D808D00020BE42D2D286
-:10BEB00050460123013898430130CCE7C845C5D826
-:10BEC0000020C845F4D3C6E7FF070000F0B54F4691
-:10BED0004646D6464D00C0B50E03C90F8A462E49C8
-:10BEE0001F035C008046360B6D0D91463F0B640DC1
-:10BEF000DB0F8D4218D08C4211D0002D18D1304369
-:10BF00008446002C1ED13A431CD163460020002BEE
-:10BF100030D0514602200139084001382AE039006A
-:10BF20001143EAD0022025E03043FBD1AC4226D0B9
-:10BF3000002C26D13A4324D1514602200139084031
-:10BF4000013817E06246002A0FD09A45E1D1A54298
-:10BF500005DBBE42DDD819D00020BE420AD25046D1
-:10BF6000012301389843013004E00122013B93434F
-:10BF7000180001301CBC90469946A246F0BD3A43D9
-:10BF8000D0D19A45C5D1A542C3DCE0E7C845C0D8A9
-:10BF90000020C845E3D3EDE7FF070000F0B55746A2
-:10BFA000DE464E464546E0B5834606000F03480090
-:10BFB00087B092461D003F0B400DCC0F002800D1EA
-:10BFC0006FE0DE4B984238D08023FF001B041F43F4
-:10BFD000730F3B430193DA4B0027994600239B469E
-:10BFE000F60081442B0369001B0B52469846490D0D
-:10BFF000ED0F002900D185E0D04B994200D173E0CC
-:10C000004346DA0080231B0413435246CC48520FA8
-:10C0100084461343524600206144D20089442100E3
-:10C02000694000918C46012149448A460F2F00D96E
-:10C0300090E0C449BF00CF59BF465B463B430193E4
-:10C0400000D06AE102230827002681469B46C9E703
-:10C0500032005846019B61460091022800D175E0EC
-:10C06000032800D1FEE1012800D02CE100230027A5
-:10C07000002600253F032A0D3F0BB34812053A4323
-:10C0800002401B051343009A5B00D1075B080B437A
-:10C090003000190007B03CBC90469946A246AB461A
-:10C0A000F0BD5B463B43019300D12FE1002F00D14F
-:10C0B000A5E1380000F072FE03000B3B1C2B00DDF5
-:10C0C00096E11D22D31A5A460100DA405E4608392D
-:10C0D0008F4013008E403B4301939C4B00271B1A5B
-:10C0E000994600239B467DE7414653460B439349BF
-:10C0F0008C46E144002B00D01AE1022202201743B3
-:10C1000000228CE7134300D10DE14346002B00D100
-:10C1100081E1404600F042FE02000B3A1C2A00DD9D
-:10C1200072E10100434608398B4098461D239A1A54
-:10C130005346D3401A004346134352468A40494669
-:10C14000081A824989468144002068E77B4B002712
-:10C1500000268EE7140C1204120C1100370C360462
-:10C16000350C794328008C462E006043604483469A
-:10C1700056432100300C8046584679434044029192
-:10C18000844506D98846802149028C46E0444146D0
-:10C1900002913604010C360C00048B4681191E0CEA
-:10C1A0001B041B0C0391190079438C46280075432E
-:10C1B0006544A8465843050C45447743A94203D932
-:10C1C000802149028C466744290C8C4639000004C2
-:10C1D000000C2D042D186144AB440591594604917F
-:10C1E00001990F043F0C080C39005143424390461B
-:10C1F00002008C46090C8B4662437C4344445C44F9
-:10C20000A04503D98021490288464244210C884632
-:10C2100061460904090C8C46390059434343704375
-:10C220007E430F0CF6182404BE19644442448C4625
-:10C23000B34203D980235B0298464044029B614687
-:10C240009846049B370443449B46AB45AD416B4243
-:10C250000D0405992D0C8C467F196744FD18A846DE
-:10C260005D462D19A542A44193466442A446C344A9
-:10C27000DC448F42BF4198459B4193459241A44580
-:10C28000A4415B427F421F43360C52426442BF19B5
-:10C290002243BF18624638184302D20D0399134354
-:10C2A0006A020A43501E82416146ED0D2A434E0246
-:10C2B0003243D90100D4B3E0012650083240024392
-:10C2C000DE0732435B08224C5444002C62DD5107E8
-:10C2D00009D00F201040042805D0101D9042924133
-:10C2E00052429B180200D90104D580241948E40069
-:10C2F000034054441848844200DD27E75E075B0290
-:10C30000D2081F0B630516435B0DB2E60023994666
-:10C310000133042700269B4664E6032301978146E8
-:10C320000C279B465EE6012201201743002276E699
-:10C33000032303201F43434671E6C046FF07000066
-:10C3400001FCFFFF9CF10200FFFF0F800DFCFFFFCF
-:10C35000FF030000FFFFFFFEFE0700000023802711
-:10C3600000933F030026434B83E6019B3200A44623
-:10C37000584670E6AC466EE6802701993F03394285
-:10C380002DD03B422BD11F433F033F0B009516009E
-:10C39000384B6EE601252D1B382D00DD66E61F2D7E
-:10C3A00040DC35481C005044160082408440EE407A
-:10C3B000501E824134431443EB40620709D00F22E0
-:10C3C0002240042A05D02200141D9442804140429C
-:10C3D0001B181A023ED501230027002649E68027B4
-:10C3E000019B3F031F433F033F0B0094214B40E65B
-:10C3F00003005A46283B9A40002601926DE65846B3
-:10C4000000F0CCFC203057E603005246283B9A400F
-:10C410001300002293E6504600F0C0FC20307BE67B
-:10C42000CA4650E71F201E004042041BE640202D54
-:10C4300003D0124C5444A3401A43501E824132434D
-:10C4400007260027164009D00F20002310401400B3
-:10C450000428B9D122005E075B021F0BD2081643E5
-:10C46000002306E680273F031F433F033F0B1600D0
-:10C47000004BFEE5FF0700001E0400003E04000024
-:10C48000F8B557464E464546DE460C000903E0B572
-:10C49000490A460F5F0031431E03DB0F760A9B46B5
-:10C4A000530F3343C84E6500C000E40FD2006D0D3A
-:10C4B000A24681467F0D9C469046B74200D1B9E026
-:10C4C0005B46012673409B46EE1BA34500D183E0EB
-:10C4D000002E63DD002F00D0B1E06346134300D18E
-:10C4E00023E1731E002B00D0BAE1861A6346B042E6
-:10C4F00080410125C91A4042091A0B0200D447E1C4
-:10C5000049024B0A98464346002B00D189E1404638
-:10C5100000F044FC0300083B1F2B00DD7CE12022DF
-:10C520003000D21A4146D040994002009E400A4352
-:10C530009D4200DD6AE15D1B6B1C1F2B00DD94E159
-:10C54000202110003500C91A8E40DA408840DD40B5
-:10C55000711E8E41110007222843002506433240F8
-:10C56000002A09D00F233340042B05D0331DB342DA
-:10C57000B641764289191E000B0200D43DE26A1CC6
-:10C58000914B55056D0D9A4200D119E18F4AF6087D
-:10C590000A40570752023743120B9BE0002E00D08F
-:10C5A000C5E06E1C7605760D012E00DC48E167467D
-:10C5B000861ACB1BB042BF417F42B8461F0043469C
-:10C5C000FF1A3B00B8461B0200D55FE137439AD102
-:10C5D00000220024002579E0002E00DCFAE0002F84
-:10C5E00000D18DE0784B9D4267D0802367461B04C5
-:10C5F0001F43BC46382E00DC52E1634613435A1EEB
-:10C6000093411E1886428041404209180B0200D413
-:10C61000BEE06D4B01359D4200D1D2E06B4A7308FC
-:10C620000A4001210E401E435108D30707221E4332
-:10C63000324095E71E00164300D045E740E7624BC5
-:10C640009D423AD0802367461B041F43BC46382EC8
-:10C6500000DDEBE01F2E00DC3AE133006746203BB3
-:10C66000DF403B00202E05D04027BF1B6646BE4062
-:10C67000324390464646721E96413343DAE0002B21
-:10C6800000D114E26346134300D168E180234E07D2
-:10C69000C008C9081B030643194208D06046C008F9
-:10C6A000184204D163460100D2085E071643F30026
-:10C6B0009946C900720F444D11434B46DE08424B68
-:10C6C0004F073743CA089D4200D16EE012036D0543
-:10C6D000120B6D0D00211203130B0A0D12051A43E4
-:10C6E0003B4B2D0513402B435B00E4075B082343C2
-:10C6F000380019003CBC90469946A246AB46F8BDAE
-:10C700006346134311D0731E002B00D007E1861837
-:10C710008642804161444042091801250B0237D509
-:10C7200002257BE73E00614691463500C5E75C4641
-:10C73000002D00D0E1E00B000343F3D0731C00D1C7
-:10C74000ACE1214B9F4200D13AE1F343382B00DDAD
-:10C750006FE11F2B00DD8CE120250E00ED1AAE40AD
-:10C76000B0460600AA46DE40454635432E005546F3
-:10C77000D940A8406346451EA8415B1A9C463043F9
-:10C78000161AB242924163465242991A3D00B4E6EB
-:10C7900007223240002A00D0E4E60B4BF6084F0790
-:10C7A0003743CA089D4200D090E73B00134300D1B5
-:10C7B000A6E180231B031A431203120B024D89E7E3
-:10C7C00015000022002785E7FF070000FFFF7FFF1D
-:10C7D000FFFF0F80002E00D0C7E06B1C5E05760DBA
-:10C7E000012E00DCF0E0C84DAB4200D1B9E0851865
-:10C7F0000A00854289416244494251180722CE0706
-:10C800006D082E43490832401D00A9E6BF49ED1AC4
-:10C81000114007223240A3E6320028388240002629
-:10C8200086E6300000F0BAFA203073E66346134320
-:10C830005A1E9341C61AB04280414042091A5CE632
-:10C840000E00674606431743002D5ED1002E00D030
-:10C85000F3E0002F00D11EE15C46614691462CE7D3
-:10C86000A94FBE427BD01E00F1E610001F3DE840FC
-:10C87000202B03D04021CB1A9A401643731E9E41B1
-:10C880000722064332400021002583E7161A63463B
-:10C89000B2428041591A40420B1A98465C4632E631
-:10C8A0001F2E00DDABE02027BB1B9A466346574690
-:10C8B000BB40994613004F46F3401F433B00574689
-:10C8C000BA40571EBA4113436246F240891898E6AF
-:10C8D0002027BB1B9A4663465746BB409946130028
-:10C8E0004F46F3401F433B005746BA40571EBA41DC
-:10C8F00013436246F240891A9CE7834B9F425FD004
-:10C9000080252D047342294320E7002E0CD1002FEF
-:10C9100000D1D0E05C46614691467B4DCDE67A4F32
-:10C92000BE421CD01E0065E6002F18D0C0084E077E
-:10C9300006438020C9080003014208D06346DC0892
-:10C94000044204D12100DA46D2085E071643F30000
-:10C95000994601245346C900720F11431C406A4D89
-:10C96000ABE61D0000220027B4E6002D59D10B00D4
-:10C97000034300D1D6E6731C00D1B2E0624B9F4264
-:10C980001ED0F343382B6FDC1F2B00DD97E02025F2
-:10C990000E00ED1AAE40B0460600AA46DE404546FF
-:10C9A00035432E005546A840D940451EA8418C4429
-:10C9B0000643B61896429241514261443D0025E635
-:10C9C0003D006146914678E60B000343002D00D000
-:10C9D00055E6002BF5D06346134300D16DE686186B
-:10C9E0008642804161444042091800220B0200D473
-:10C9F000D0E6464B01351940B2E5B1465DE633005D
-:10CA00006746203BDF403B00202E05D04027BF1B60
-:10CA10006646BE40324390464646721E96413343B8
-:10CA2000EFE5394B9F42CBD080252D04734229433B
-:10CA3000A8E70843411E8841A2E6002F00D13CE64A
-:10CA40006346861ACF1AB0429B415B42FB1A984656
-:10CA50001B024ED5161A6346B2429241591A5242EF
-:10CA6000891A5C4600227BE501430E00711E8E414F
-:10CA70009FE71D000E00203DEE40B046202B04D065
-:10CA80004025EB1A99400843814648464346411EDB
-:10CA90008841184374E60022002417E6161A6346FC
-:10CAA000B2429241591A5242891A3D0025E5614627
-:10CAB0009146154D01E680220024120379E61D00FF
-:10CAC0000E00203DEE40B046202B04D04025EB1A4E
-:10CAD0009940084381464E464346711E8E411E438F
-:10CAE00067E7861896429B4161445B42C9183D0046
-:10CAF0008CE547463743CED007224146324049E6CF
-:10CB000000273A00E6E5C046FF070000FFFF7FFF71
-:10CB100030B5144D0A034B00120B5B0DC90F0024F6
-:10CB2000AB4211DD104CA34210DC8024640322438D
-:10CB30000E4CE41A1F2C0CDD0D48C31ADA4013000A
-:10CB40005C42002900D11C00200030BD094BCC18EC
-:10CB5000FAE7094DE040AC4663449A4013000343B2
-:10CB6000EEE7C046FE0300001D0400003304000091
-:10CB700013040000FFFFFF7FEDFBFFFF70B50028EF
-:10CB80002DD0C317C5185D40C40F280000F006F96A
-:10CB9000154B1B1A5B055B0D0A2815DD0B3885400C
-:10CBA00000222D032D0B002110002D030A0D2D0B4B
-:10CBB00012052A430D4D1B052A4013435B00E40771
-:10CBC0005B082343190070BD020029001532914013
-:10CBD0000A000B21081AC5402D032D0BE3E70024A2
-:10CBE000002300250022DEE71E040000FFFF0F8067
-:10CBF0004100090E4B1C70B5DBB24602750AC40F2A
-:10CC0000012B14DDE0239B006D07360BCB180021B0
-:10CC10000A0D280012051C4D32435B052A405B08B3
-:10CC200013435B00E4075B082343190070BD002930
-:10CC300014D1002D1ED0280000F0B0F80A281CDC0A
-:10CC40000B232A001B1ADA40030015339D400F4BBB
-:10CC500012031B1A5B05160B5B0DD8E7002D06D0DF
-:10CC6000320B802636036D071643094BCFE7084B7E
-:10CC70000026CCE700230026C9E703002A000B3B6F
-:10CC80009A400025E3E7C046FFFF0F8089030000BC
-:10CC9000FF070000F0B54C00640D0B03621C5B0A3B
-:10CCA000460F5205C90F1E43C500520D012A29DD4A
-:10CCB000374BE718FE2F1CDC002F3BDD8001431EA5
-:10CCC00098410722F3006D0F03432B431A40002ABB
-:10CCD00004D00F221A40042A00D004338022D20448
-:10CCE0001A4024D00137FAB2FF2F02D09B01580A14
-:10CCF00001E0FF2200204002D205400AC90710438C
-:10CD00000843F0BD3543002C04D1002D0AD1002288
-:10CD10000020F0E7002DECD08020C0033043FF223C
-:10CD2000E9E7002400235B02580AE2B2E3E7DB08EC
-:10CD30003C00F8E73B001733F3DB80231B0433434D
-:10CD40001E26F61B1F2E14DD02225242D71B1A008C
-:10CD5000FA401700202E04D00E4A94466444A340A3
-:10CD60001D432B005D1EAB4107223B431A400027A9
-:10CD7000ADE7094A2800A218954093406C1EA541D2
-:10CD8000F04007222B4303431A4000279FE7C04689
-:10CD900080FCFFFFA2FCFFFF82FCFFFF1C210123A0
-:10CDA0001B04984201D3000C10391B0A984201D38E
-:10CDB000000A08391B09984201D30009043902A26C
-:10CDC000105C40187047C0460403020201010101D3
-:10CDD000000000000000000010B5002903D1FFF79B
-:10CDE000DDFF203002E0081CFFF7D8FF10BDC04671
-:10CDF000F0B5C646714B450000B5041C07006D0830
-:10CE00009D4208DDFF23DB059D4271DC002800DC2C
-:10CE10009DE06B486FE06B4B9D4200DD7AE06A4B12
-:10CE20009D426BDD01267642211C201CFDF7DAFDB8
-:10CE3000011C8046FDF7D6FD6449051CFDF7D2FDB7
-:10CE40006349FDF75DFA291CFDF7CCFD6149FDF74B
-:10CE500057FA291CFDF7C6FD5F49FDF751FA291C59
-:10CE6000FDF7C0FD5D49FDF74BFA291CFDF7BAFD42
-:10CE70005B49FDF745FA4146FDF7B4FD5949804647
-:10CE8000281CFDF7AFFD5849FDF7DEFE291CFDF714
-:10CE9000A9FD5649FDF7D8FE291CFDF7A3FD54490D
-:10CEA000FDF7D2FE291CFDF79DFD5249FDF7CCFE92
-:10CEB000291CFDF797FD011C4046FDF721FA211CB6
-:10CEC000FDF790FD731C44D04B4BB600F158FDF7B5
-:10CED000BBFE211CFDF7B8FE484B011CF058FDF7C6
-:10CEE000B3FE002F07DA80231B069C46604402E055
-:10CEF000011CFDF705FA04BC9046F0BD4049FDF762
-:10CF0000FFF9FE218905FDF7EDF80300201C002B39
-:10CF1000F1D187E700F008F93A4B041C9D421DDC73
-:10CF2000394B9D4239DC011CFDF7EAF9FE218905E8
-:10CF3000FDF78AFE8021051CC905201CFDF7E0F9DC
-:10CF4000011C281CFDF776FB0026041C6CE72F480B
-:10CF5000D1E7011C201CFDF777FECCE72C4B9D424E
-:10CF600014DCFF218905FDF76FFEFF21051C8905F3
-:10CF7000201CFDF737FDFE218905FDF7C1F9011CD5
-:10CF8000281CFDF757FB0226041C4DE7011C214815
-:10CF9000FDF750FB0326041C46E7FE218905FDF73B
-:10CFA00053FEFE21051C8905201CFDF7A9F9011C73
-:10CFB000281CFDF73FFB0126041C35E7FFFF7F50CF
-:10CFC000DB0FC93FFFFFDF3EFFFFFF30D769853C26
-:10CFD00059DA4B3D356B883D6E2EBA3D2549123EE0
-:10CFE000ABAAAA3E21A215BD6BF16E3D95879D3D72
-:10CFF000388EE33DCDCC4C3EECF10200DCF102007A
-:10D00000CAF24971FFFF973FFFFF2F3FDB0FC9BFF8
-:10D01000FFFF1B40000080BFF0B5C64643005F081D
-:10D020001B0E7F3B00B5051C06001C00162B1CDCEC
-:10D030008046002B21DB1A4F1F41074211D01949AE
-:10D04000FDF75EF90021FDF74DF8002809D0002D0D
-:10D0500004DD80231B0423419846A8444346BB4378
-:10D060001E00301C04BC9046F0BD0F4B9F42F8D907
-:10D07000011CFDF745F9061CF3E70A49FDF740F9E5
-:10D080000021FDF72FF80028EBD0002D04DB002F46
-:10D09000E7D0FE26B605E4E780263606E1E7C0467F
-:10D0A000FFFF7F00CAF24971FFFF7F7F00B51C4A76
-:10D0B000430083B05B08934218DD1A4A934204DDB3
-:10D0C000011CFDF7C1FD03B000BD694602F0C6F9C1
-:10D0D00003230199184001280CD0022817D00028FA
-:10D0E00011D00098012202F0E1FFECE7002102F0EC
-:10D0F00093FBE8E70122009802F0D8FF80231B068B
-:10D100009C466044DFE7009802F086FBDBE700986E
-:10D1100002F082FB80231B069C466044D3E7C04696
-:10D12000D80F493FFFFF7F7F400040087047C0464F
-:10D13000F0B5C64643005F081B0E7F3B00B5051CDB
-:10D1400006001C00162B1CDC8046002B21DB194F2F
-:10D150001F41074211D01849FDF7D2F80021FCF712
-:10D16000C1FF002809D0002D04DA80231B042341CD
-:10D170009846A8444346BB431E00301C04BC90465E
-:10D18000F0BD0E4B9F42F8D9011CFDF7B9F8061C03
-:10D19000F3E70949FDF7B4F80021FCF7A3FF0028E5
-:10D1A000EBD0002D01DB0026E7E7002FE5D0044E91
-:10D1B000E3E7C046FFFF7F00CAF24971FFFF7F7FB0
-:10D1C000000080BF70B50C00002121600F494300B2
-:10D1D00002005B088B4217DC002B15D00C4D0021A0
-:10D1E000AB4208DC9821C905FDF7FCFB19210200C0
-:10D1F00043005B0849420748DB150240FC207E3BA8
-:10D200005B1880052360104370BDC046FFFF7F7F21
-:10D21000FFFF7F00FFFF7F8070B5041C0D0003F04F
-:10D22000A5FA002805D00021201CFCF741FF0028AA
-:10D2300001D0201C70BD201C290000F083F8041CC4
-:10D2400003F094FA002805D00021201CFCF730FFE1
-:10D250000028EED003F0A6FA22230360E9E7C046D7
-:10D2600043001B0E7F3B10B5162B05DC002B0EDB9D
-:10D27000094A1A41024203D10860C00FC00710BD1D
-:10D28000030093430B60191CFDF7DEFCF7E7C30FA7
-:10D29000DB070B60F3E7C046FFFF7F0010B500F02F
-:10D2A00001F810BD30B5430059081B0E7F3B83B019
-:10D2B0000200162B1EDC00291AD00100C40F002B1F
-:10D2C0001FDB1D4A1A41024212D05208024204D00A
-:10D2D0009143802292031A411143184BA400E45851
-:10D2E000201CFDF70DF801900198211CFDF7ACFC06
-:10D2F00003B030BD124B9942FAD9011CFDF700F87A
-:10D30000F6E743020D495B0AA0004558594219430C
-:10D310008023490ADB03120D194012051143281C12
-:10D32000FCF7EEFF01900198291CFDF78DFC4000F1
-:10D330004008E4072043DBE7FFFF7F00FCF1020029
-:10D34000FFFF7F7F420070B5031C0C0005005108F1
-:10D350000FD0274EB1420DD8264881420ED9120E69
-:10D360001219FE2A1CDC002A22DD2348D20528409F
-:10D37000104370BD011CFCF7C3FFFAE79821181C8D
-:10D38000C905FDF72FFB1D4A031C944204DB420034
-:10D39000120E0500193AE3E71949FDF723FBE8E708
-:10D3A000191C184803F0DCF91649FDF71BFBE0E7F0
-:10D3B000110016310ADA144A191C944210DD114882
-:10D3C00003F0CEF90F49FDF70DFBD2E7CC2119325E
-:10D3D000D005094A890515402843FDF703FBC8E736
-:10D3E000074803F0BDF90649FDF7FCFAC1E7C0465E
-:10D3F000FFFF7F7FFFFF7F00FFFF7F80B03CFFFFCD
-:10D400006042A20DCAF2497150C3000000B51C4A27
-:10D41000430083B05B0893421BDD1A4A934204DD4C
-:10D42000011CFDF711FC03B000BD694602F016F8BF
-:10D43000032301991840012810D0022817D0002892
-:10D4400010D0009802F0E8F980231B069C46604447
-:10D45000E9E70022002102F029FEE4E7009802F04B
-:10D46000DBF9E0E70098012202F020FEDBE70098FC
-:10D47000012202F01BFE80231B069C466044D2E77B
-:10D48000D80F493FFFFF7F7F00B5104A430083B0AC
-:10D490005B08934214DD0E4A934204DD011CFDF744
-:10D4A000D3FB03B000BD694601F0D8FF0222400063
-:10D4B0001040013A121A0199009802F071FEF0E74B
-:10D4C0000122002102F06CFEEBE7C046DA0F493F73
-:10D4D000FFFF7F7F43001B0E7F3B162B04DC002BDE
-:10D4E00003DB034A1A4190437047C00FC007FBE7B4
-:10D4F000FFFF7F0010B500F073FC10BDF0B547468C
-:10D50000CE4680B58DB004000D0000F025FD294BFE
-:10D5100006001B780F005BB29846013310D0220042
-:10D520002B002000290003F07FFF8146002807D14F
-:10D530000022002320002900FCF786FD002806D1E8
-:10D54000300039000DB00CBC90469946F0BD012367
-:10D550000293194B0694079503934B460A9343464F
-:10D5600004940595002B15D000230022190010000B
-:10D57000FEF70AF9434608900991022B0ED103F0F9
-:10D5800011F9212303600A9B0193002B0CD1089E03
-:10D59000099FD5E7002300240893099402A803F00B
-:10D5A000D7F80028EFD1EAE703F0FCF80A9B0193D3
-:10D5B0000360ECE7EF00002004F20200F0B58DB04C
-:10D5C000041C00F0A1FD0023224E051CF35601337C
-:10D5D00031D0211C201CFDF7FBFC071E2BD1201C89
-:10D5E000FFF7A2FDFE218905FCF77CFD002822D073
-:10D5F00001230293184B201C03930A97FFF7F8FAB4
-:10D600000690079104900591144803F0A3F80023B5
-:10D61000F35608900991022B10D002A803F098F855
-:10D6200000280BD00A9B0193002B0CD10898099974
-:10D63000FFF730FB051C281C0DB0F0BD03F0B2F85D
-:10D6400021230360EEE703F0ADF80A9B019303602A
-:10D65000ECE7C046EF0000200CF2020030F20200BE
-:10D66000F0B58DB0041C00F0B1FE0023224E051C65
-:10D67000F356013331D0211C201CFDF7A9FC071EF5
-:10D680002BD1201CFFF750FDFE218905FCF72AFD58
-:10D69000002822D001230293184B201C03930A97E1
-:10D6A000FFF7A6FA0690079104900591144803F03D
-:10D6B00051F80023F35608900991022B10D002A8CC
-:10D6C00003F046F800280BD00A9B0193002B0CD1E5
-:10D6D00008980999FFF7DEFA051C281C0DB0F0BD6B
-:10D6E00003F060F821230360EEE703F05BF80A9B88
-:10D6F00001930360ECE7C046EF00002014F2020043
-:10D7000030F2020010B500F0B3FF10BDF0B58BB0E1
-:10D71000041C01F041F80023304E051CF356013380
-:10D7200036D0201C03F022F8002831D02C49201CD0
-:10D73000FCF7D8FC071E2ED12A49201CFCF7BEFCA2
-:10D74000002825D004236D460093274B2F626B6081
-:10D75000201CFFF74DFA00230022AA61EB61002391
-:10D76000F35628616961A860E960022B31D0280076
-:10D7700002F0EEFF00282CD02B6A002B03D003F020
-:10D7800011F82B6A0360A869E969FFF783FA051CA1
-:10D79000281C0BB0F0BD03236D460093124B201CD8
-:10D7A0006B6000232B62FFF723FA0023F3562861F6
-:10D7B0006961A860E960002B05D1E0220B4B1206DD
-:10D7C000AA61EB61D3E700200949A861E961022B56
-:10D7D000CDD102F0E7FF22230360CDE7EF00002068
-:10D7E0008071B142B5F1CFC21CF20200FFFFEF47DA
-:10D7F0000000F07FF0B5C64600B58CB0051C0C1CCF
-:10D8000001F0C4F82D4B061C1B785BB2984601331F
-:10D810003DD0211C201CFDF7DBFB002837D1291C43
-:10D82000281CFDF7D5FB071E31D10021201CFCF779
-:10D830003FFC00282BD001230293214B281C03938B
-:10D840000A97FFF7D5F906000F00201C04960597EC
-:10D85000FFF7CEF9434606900791002B1CD000231A
-:10D86000002219001000FDF78FFF43460890099130
-:10D87000022B13D102F096FF212303600A9B019330
-:10D88000002B14D108980999FFF704FA061C301CE4
-:10D890000CB004BC9046F0BD0896099702A802F0AF
-:10D8A00057FF0028E6D00A9B0193002BEAD002F034
-:10D8B00079FF0A9B01930360E4E7C046EF00002074
-:10D8C00024F2020070B500258CB0041C01F0EEF8C3
-:10D8D000354B061C5D576B1C0BD0211C201CFDF723
-:10D8E00077FB002805D10021201CFCF7FBFB00285A
-:10D8F00002D0301C0CB070BD2C4B0A90201C03933E
-:10D90000FFF776F90690079104900591002D1BD141
-:10D91000E022274B12060021201C08920993FCF7F5
-:10D92000C7FB002837D00223029302A802F010FFA1
-:10D93000002817D00A9B0193002B18D10898099949
-:10D94000FFF7A8F9061CD4E700221A4B0021201C7F
-:10D9500008920993FCF7ACFB00280ED00223029337
-:10D96000022DE2D102F01EFF22230360E2E702F063
-:10D9700019FF0A9B01930360E0E701230293022D44
-:10D980000BD102F00FFF212303600B4802F0E2FEEF
-:10D9900008900991CEE70123029302A802F0D8FE75
-:10D9A0000028F2D1EDE7C046EF0000202CF2020083
-:10D9B000FFFFEFC70000F0FF30F20200F0B54E4667
-:10D9C0004546DE465746E0B500268FB0051C0C1CC8
-:10D9D00001F0B2F9CB4B80469E579946731C39D063
-:10D9E000211C201CFDF7F4FA8246002832D1291CA4
-:10D9F000281CFDF7EDFA0021071E00D071E0281C5D
-:10DA0000FCF756FB00282DD00021201CFCF750FB12
-:10DA10008246002800D19CE004AB98460123424690
-:10DA20000493B94B17625360281CFFF7E1F8434693
-:10DA30009860D960201CFFF7DBF84346002218618C
-:10DA40005961002341468A61CB61002E6BD0FE23D1
-:10DA50009B05984640460FB03CBC90469946A2466E
-:10DA6000AB46F0BD404602F081FE061E00D1A8E0A4
-:10DA700000214046FCF71CFB0028EBD0281C02F0DC
-:10DA800075FE0028E6D0201C02F070FE0028E1D0D0
-:10DA900004AB98460423424604939B4B281C5360D6
-:10DAA00000231362FFF7A4F843469860D960201C56
-:10DAB000FFF79EF843460022186159610023414652
-:10DAC0008A61CB614B461B785BB2022B04D0404687
-:10DAD00002F03EFE00282CD102F064FE22230360F7
-:10DAE00027E0201CFCF7E4FA0028B3D004AB9846EA
-:10DAF000012342460493844B281C536052464346FC
-:10DB00001A62FFF775F843469860D960201CFFF74A
-:10DB10006FF8434600221861596141467B4B8A6188
-:10DB2000CB61022E93D0404602F012FE002800D1B5
-:10DB300097E043461B6A002B04D002F033FE4346B5
-:10DB40001B6A036043469869D969FFF7A3F88046CA
-:10DB500080E7201C02F00AFE002800D17AE70021AD
-:10DB6000201CFCF7ABFA002800D173E704AB984601
-:10DB7000012342460493644B281C5360434652469B
-:10DB80001A62FFF735F843469860D960201CFFF70A
-:10DB90002FF84346186159614B461B785BB2002B46
-:10DBA00064D0002042465A499061D161022B62D173
-:10DBB00002F0F8FD2123036043461B6A002BC1D00D
-:10DBC000BBE7281C02F0D2FD002800D150E7201C42
-:10DBD00002F0CCFD002800D14AE7281CFFF708F826
-:10DBE00000900191201CFFF703F84B461B78029030
-:10DBF00003915BB2414640469B46FDF7E9F904AB11
-:10DC0000984600285FD103234246414604933E4B89
-:10DC100010625360009A019B8A60CB60029A039B5A
-:10DC20000A614B61FC21201C8905FCF7DBFE5B4689
-:10DC3000041C002B25D1E0224146364B12068A6196
-:10DC4000CB61281C0021FCF739FA002828D1404676
-:10DC500002F07EFD0028AFD102F0A4FD2223036074
-:10DC6000AAE702F09FFD2123036062E70022002360
-:10DC700041468A61CB61404602F06AFD00289BD193
-:10DC800096E741460022244B281C8A61CB61002183
-:10DC9000FCF714FA002843D15B46022BDCD0D6E710
-:10DCA000201CFFF7FFFA211CFCF702FA002805D11F
-:10DCB000E0221A4B120641468A61CB614B461B7823
-:10DCC0005BB29B46E8E70123424604930E4B166283
-:10DCD0005360009B019C9360D460029B039C136182
-:10DCE00054615B46002BC1D00021081CFCF7A2FC4C
-:10DCF000FEF77EFF43469861D9615B46022B00D157
-:10DD000056E7B8E7EF00002034F202000000F03FD1
-:10DD10000000F0FFFFFFEF470000F07FFFFFEFC7BD
-:10DD2000201CFFF7BFFA211CFCF7C2F90028C5D15F
-:10DD30000022014BBFE7C0460000F0FFF0B5002510
-:10DD40008DB0041C01F00EFD234B061C5D576B1CAF
-:10DD50000BD0211C201CFDF73BF9071E05D100212B
-:10DD6000201CFCF7ABF9002802D1301C0DB0F0BD2F
-:10DD700001230293194B201C03930A97FEF738FFE7
-:10DD8000002206900791049005910023002D15D0E4
-:10DD900010001900FDF7F8FC08900991022D0FD131
-:10DDA00002F000FD212303600A9B0193002B0DD19B
-:10DDB00008980999FEF76EFF061CD6E708920993AA
-:10DDC00002A802F0C5FC0028EED1E9E702F0EAFC67
-:10DDD0000A9B01930360EBE7EF0000203CF2020096
-:10DDE000F8B515004746CE465A001C006B4280B578
-:10DDF0002B434B4F5208DB0F1343BB421DD84B0044
-:10DE00005B089846464643420343DB0F894633434B
-:10DE1000BB4212D8434BE3182B4339D00226A31739
-:10DE20001E40CB0F1E434346034310D1022E47D062
-:10DE3000032E08D13C483D4905E002000B002800B4
-:10DE40002100FDF785F90CBC90469946F8BD1300FA
-:10DE50002B4320D0BA4224D0B8451CD043469A1A4E
-:10DE600012153C2A2FDC002C30DA3C322EDA00204E
-:10DE70000021012E3ED0022E31D0002EE3D02C4ABC
-:10DE80002C4BFEF7FDFA284A2B4BFEF7F9FADAE79E
-:10DE900002F0C6FAD7E74B462348002B0EDB274992
-:10DEA000D1E790452BD0022E0AD0032EC2D00020FD
-:10DEB0000021012EC7D180210906C4E72049C2E70D
-:10DEC00019481D49BFE718481C49D2E72A0023001A
-:10DED000FDF75AFC02F038FC02F0A2FAC9E7144A36
-:10DEE000144BFEF7CDFA02000B000F481249FEF763
-:10DEF000C7FAA8E7802424060B191900A3E7022E0D
-:10DF000006D0032E09D00848012E04D00D499AE707
-:10DF10000D480E4997E70E4995E70B480D4992E7E2
-:10DF20000000F07F000010C0182D4454FB2109C0F0
-:10DF3000075C143326A6A13CFB210940FB21F93FD5
-:10DF4000FB21F9BFFB21E93FD221337F7CD902407D
-:10DF5000FB21E9BF7CD902C0F8B54746CE46674BE6
-:10DF600080B50A000F00190005003940994200D120
-:10DF70009BE004000100002F69DD3F1500D1B4E0F3
-:10DF80005F4B12039C468023120B5B0313435B0021
-:10DF9000CA0F67449B184A00F80703D5D20F5B00ED
-:10DFA0009B188A0079108C4600218020162489460F
-:10DFB00080030D189D4202DC29185B1B8144D50F9C
-:10DFC0005B00013C5B1952004008002CF1D100209D
-:10DFD0008046802020250027000609E08B425CD087
-:10DFE000D40F5B00013DE31852004008002D16D00D
-:10DFF000C4198B42F2DD27180E00002C49DB5B1A96
-:10E00000A242894149425B1A121BD40F5B00013DB9
-:10E0100080443100E31852004008002DE8D113433A
-:10E020004ED143465B0837494A4688464946521016
-:10E030004244C90702D5802109060B4361460F05FA
-:10E04000BD18180029000CBC90469946F8BD7B000D
-:10E050005B0803433900002BF5D0002F3CD1E30AC5
-:10E06000153A6405002BFAD08020400303423FD1CB
-:10E07000002700E00F005B00791C0342FAD0250066
-:10E0800020208D40401A2900D71B2200C2401A438D
-:10E0900076E7FE43F60F8E19B1E79442A0D8271811
-:10E0A000002CF6DB1E000023AEE702003B00280038
-:10E0B0003900FDF773FF2A003B00FDF749F8C2E77E
-:10E0C0004346013303D0434601335B08ABE70123EA
-:10E0D00098460023C144A6E73B000200FEF7D0F9B2
-:10E0E00002000B00FDF750FBADE713000022BBE779
-:10E0F0000127210020207F42C6E7C0460000F07FB4
-:10E1000001FCFFFF0000E03FFE22F8B54300041CC5
-:10E1100001005B089205934261D05ADC9B4A93420E
-:10E1200062DC8C229205934200DCCEE0FCF75AFCC4
-:10E130009749051CFCF756FC9649FCF7E1F8291CA9
-:10E14000FCF750FC9449FCF77FFD291CFCF74AFCC6
-:10E150009249FCF7D5F8291CFCF744FC9049FCF7E0
-:10E1600073FD291CFCF73EFC8E49FCF7C9F8291CFD
-:10E17000FCF738FC8C49061C281CFCF733FC8B4947
-:10E18000FCF762FD291CFCF72DFC8949FCF7B8F867
-:10E19000291CFCF727FC8749FCF756FD291CFCF7D6
-:10E1A00021FCFE218905FCF7ABF8011C301CFCF7B3
-:10E1B00041FA211CFCF716FC011C7F48FCF744FDCA
-:10E1C000011C201CFCF740FD011C7C48FCF73CFDB9
-:10E1D00004E0FCF739FD011CFCF72CFAF8BD002027
-:10E1E000002CFBDC7648F9E7002870DBFE20800578
-:10E1F000FCF72AFDFC218905FCF7F4FB041C01F067
-:10E20000B1FA6349061C050B201CFCF7EBFB6149C6
-:10E21000FCF776F8211CFCF7E5FB5F49FCF714FDE1
-:10E22000211CFCF7DFFB5D49FCF76AF8211CFCF7B9
-:10E23000D9FB5B49FCF708FD211CFCF7D3FB5949CE
-:10E24000FCF75EF8211CFCF7CDFB5749071C201C8E
-:10E25000FCF7C8FB5549FCF7F7FC211CFCF7C2FB97
-:10E260005349FCF74DF8211CFCF7BCFB5149FCF766
-:10E27000EBFC211CFCF7B6FBFE218905FCF740F8FE
-:10E28000011C381CFCF7D6F9311CFCF7ABFB2D0345
-:10E29000071C291C281CFCF7A5FB011C201CFCF7F3
-:10E2A000D3FC291C041C301CFCF72AF8011C201C80
-:10E2B000FCF7C0F9011C381CFCF722F8291CFCF7FC
-:10E2C0001FF8011CFCF71CF888E73E4886E7FE2192
-:10E2D0008905FCF715F8FC218905FCF783FB2C491F
-:10E2E000041CFCF77FFB2B49FCF70AF8211CFCF708
-:10E2F00079FB2949FCF7A8FC211CFCF773FB274993
-:10E30000FBF7FEFF211CFCF76DFB2549FCF79CFC8D
-:10E31000211CFCF767FB2349FBF7F2FF211CFCF7EC
-:10E3200061FB061C201C01F01DFA1F49051C201C66
-:10E33000FCF758FB1D49FCF787FC211CFCF752FB3E
-:10E340001B49FBF7DDFF211CFCF74CFB1949FCF7CF
-:10E350007BFC211CFCF746FBFE218905FBF7D0FF67
-:10E36000011C301CFCF766F9291CFCF73BFB124929
-:10E37000FCF76AFC291CFBF7C3FF011CFBF7C0FF7D
-:10E38000011C1148FCF760FC28E7C046FFFFFF3E78
-:10E3900008EF1138047F4F3A4611243DA80A4E3E3B
-:10E3A00090B0A63EABAA2A3E2EC69D3D6133303FBB
-:10E3B0002D57014039D119406821A233DA0FC93FE6
-:10E3C000DB0F4940DB0FC93FDA0F4940F0B5FE23B0
-:10E3D0004646D6464F464400C0B5051C06006408B4
-:10E3E0009B059C4200D18AE07EDC8F4B9C420EDC78
-:10E3F0008E4B9C4200DD8FE08D49FBF781FFFE21B3
-:10E400008905FBF76FFE0300281C002B72D1281C26
-:10E41000FEF78AFE011CFE208005FCF715FCFC219E
-:10E420008905FCF7DFFA8349051CFCF7DBFA824912
-:10E43000FBF766FF291CFCF7D5FA8049FCF704FCC2
-:10E44000291CFCF7CFFA7E49FBF75AFF291CFCF781
-:10E45000C9FA7C49FCF7F8FB291CFCF7C3FA7A4996
-:10E46000FBF74EFF291CFCF7BDFA78498046281CB3
-:10E47000FCF7B8FA7649FCF7E7FB291CFCF7B2FA7F
-:10E480007449FBF73DFF291CFCF7ACFA7249FCF715
-:10E49000DBFB291CFCF7A6FAFE218905FBF730FF00
-:10E4A0008146281C01F05EF96C4B071C9C4200DC85
-:10E4B0007DE049464046FCF7BDF8391CFCF792FA6E
-:10E4C000391CFBF71DFF011CFBF71AFF6449FBF722
-:10E4D00017FF011C6348FCF7B7FB002E0ADC802302
-:10E4E0001B069C46604405E0011CFCF7ADFB011CCB
-:10E4F000FCF7A0F81CBC90469946A246F0BD5949CD
-:10E50000FCF770FA5849041C281CFCF76BFA011C34
-:10E51000201CFBF7F5FEEDE7011CFCF763FA45490B
-:10E52000041CFCF75FFA4449FBF7EAFE211CFCF7E8
-:10E5300059FA4249FCF788FB211CFCF753FA404981
-:10E54000FBF7DEFE211CFCF74DFA3E49FCF77CFB95
-:10E55000211CFCF747FA3C49FBF7D2FE211CFCF7D3
-:10E5600041FA3A49061C201CFCF73CFA3849FCF7F2
-:10E570006BFB211CFCF736FA3649FBF7C1FE211C68
-:10E58000FCF730FA3449FCF75FFB211CFCF72AFA50
-:10E59000FE218905FBF7B4FE011C301CFCF74AF88C
-:10E5A000291CFCF71FFA291CFBF7AAFEA2E7011C95
-:10E5B000040BFBF7A5FE494682464046FCF73AF8B5
-:10E5C000011C5046FCF70EFA24038046211C201C37
-:10E5D000FCF708FA011C281CFCF736FB391C051C4B
-:10E5E000201CFBF78DFE011C281CFCF723F8011CE6
-:10E5F000FBF786FE011C1C48FCF726FB011C40466D
-:10E60000FCF722FB211C051C201CFBF779FE011CDA
-:10E610001648FCF719FB011C281CFCF715FB011C14
-:10E620001248FCF711FB58E7FFFFFF3EFFFFFF31E9
-:10E63000CAF2497108EF1138047F4F3A4611243D60
-:10E64000A80A4E3E90B0A63EABAA2A3E2EC69D3DDD
-:10E650006133303F2D57014039D119409999793FA5
-:10E660002EBD3B33DB0FC93F2EBD3BB3DB0F493F14
-:10E67000F0B54B00C6460C1CFF2100B55B08C90570
-:10E680008B4217DC4200804652088A4212DCFE258B
-:10E69000AD05AC4236D0A517AC46022567463D40D5
-:10E6A000C70F3D43002A0CD1022D3CD0032D05D1CC
-:10E6B000304803E0011C201CFBF722FE04BC9046FE
-:10E6C000F0BD002B19D08B421FD08A4215D0D31A2F
-:10E6D000DB153C2B29DC002C29DA3C3327DA00201F
-:10E6E000012D34D0022D2AD0002DE7D02249FBF78E
-:10E6F00007FE2249FCF7A8FAE0E74346002B10DBAF
-:10E700001F48DBE7FEF774FBD8E79A4224D0022DBE
-:10E7100009D0032DCCD00020012DCFD180200006C0
-:10E72000CCE71848CAE71548C8E71548D8E7211CC0
-:10E73000FBF780FFFEF7F8FCFEF75AFBD0E70E4927
-:10E74000FBF7DEFD011C0D48FCF77EFAB6E78023DF
-:10E750001B069C466044B1E7022D05D0032D07D06F
-:10E76000012D03D00848A9E70848A7E70848A5E70E
-:10E770000848A3E7DB0F49C02EBDBB33DB0F494080
-:10E78000DB0FC93FDB0FC9BFDB0F493FE4CB1640AE
-:10E79000DB0F49BFE4CB16C0F0B5FF22D6464F468B
-:10E7A00046464300C0B5041C01005B08D2059342F5
-:10E7B00031D8C50F934235D0634A904236DC0028E9
-:10E7C00000DA88E0614A934235D9614A934200D821
-:10E7D000A9E06049201CFCF705F95F4BAD00E95842
-:10E7E000FBF78EFDFCF70AFC0500FCF727FC5B49F4
-:10E7F000071CFCF7F7F8011C201CFCF725FA584908
-:10E800008246381CFCF7EEF8071C391C5046FCF712
-:10E810001BFA041C13E0FBF773FD1CBC90469946E1
-:10E82000A246F0BD002DF8D00020F6E74D49081CA7
-:10E83000FCF7D8F8F1E74C4A934264D90025211C33
-:10E84000201CFCF7CFF84949061CFCF7CBF84849D7
-:10E85000FCF7FAF9311CFCF7C5F84649FBF750FD07
-:10E86000311CFCF7BFF84449FCF7EEF9311CFCF70A
-:10E87000B9F84249FBF744FD311CFCF7B3F8011C21
-:10E88000201CFCF7E1F9011C8046201CFCF7AAF8CB
-:10E890008146002D25D080204146C005FCF7D4F9E3
-:10E8A000011C4846FBF7C6FE011C381CFCF7CCF9DE
-:10E8B0005146FCF7C9F9011CFE208005FCF7C4F99C
-:10E8C0002B007D333CDAD8216435ED052818090585
-:10E8D000FCF788F8A1E72A4A934200D872E70020A3
-:10E8E0009BE780214046C905FCF7AEF9011C48466C
-:10E8F000FBF7A0FE211CFCF7A7F9011CFE208005F8
-:10E90000FCF7A2F989E71749201CFBF7F9FCFE2167
-:10E910008905FBF7E7FB002890D0FE21201C890524
-:10E92000FBF7EEFC79E7174BAF00F958201C0124E8
-:10E93000FCF78AF9144B641B8246FF58651B64E799
-:10E94000ED05281869E7C0461772B1421872B13E4A
-:10E950009115853F3BAAB83F44F202008071313FD8
-:10E96000D1F71737CAF24971FFFF7F314CBB313302
-:10E970000EEADD3555B38A38610B363BABAA2A3E29
-:10E98000B5F1CF424CF2020054F20200F8B54B0050
-:10E99000071C5B0836D0414A44006408944231DCCD
-:10E9A000013293422EDC9C4232DBC00FC5079C42F1
-:10E9B0002FD03B4A944231DDE2157F3A38488342FA
-:10E9C00056DC7E2618027642013E4000FCD510003F
-:10E9D0007E3048DB80207C02640A0004044330005F
-:10E9E0007E303BDB80234902490A1B040B43911B09
-:10E9F000E21A00291BD06400002A01DB09D0540070
-:10EA00000139F5E7381CFBF7EDFF011CFBF712FE9F
-:10EA1000F8BDE80F234B8000C058F9E7200233D03F
-:10EA20007E225242013A40000028FBDCC6E7002A61
-:10EA300000DA2200002AECD019490B008A4203DCDC
-:10EA40005200013E9A42FBDD33007E3313DA7E230F
-:10EA50005B429E1B32412A431000D9E77E21494286
-:10EA6000891B8B40C3E77E204042801A8440B6E772
-:10EA7000DE157F3EABE70C4B7F369C4662442A4353
-:10EA80001000F6053043C3E7934204DD7E22DE1515
-:10EA90007F3E52429EE77E22524292E7FFFF7F7FF7
-:10EAA000FFFF7F005CF20200000080FFF8B5DE4649
-:10EAB00057464E4645460300E0B5420044D0002884
-:10EAC0004DDB8E4A904251DC8D4A0021904206DC9B
-:10EAD0009821C905FBF786FF192103004942DA1581
-:10EAE0005B025C0A874B7F3AE01880231B040340DB
-:10EAF000FE205218FE2180055840DD15204389056F
-:10EB0000AD18FCF7A1F823000F335B02061C5B0A6B
-:10EB10000F2B2FDC0021FBF7CBFA002800D19EE061
-:10EB20000020002D15D02800FCF788FA7649041C37
-:10EB3000FBF758FF7549051C201CFBF753FF011C10
-:10EB4000281CFBF7DDFB04E0CC2000210006FBF7CE
-:10EB500071FD3CBC90469946A246AB46F8BD011CEF
-:10EB6000FCF772F80021FBF765FDF2E7011CFBF7EB
-:10EB7000C7FBEEE78021C905FBF7C2FB011C301C77
-:10EB8000FBF758FD80462800FCF758FA41468146BD
-:10EB90004046FBF727FF5E4B011C9A468346FBF776
-:10EBA00021FF5C49071CFBF71DFF5B49FBF7A8FB36
-:10EBB000391CFBF717FF5949FBF7A2FB391CFBF780
-:10EBC00011FF5749FBF79CFB5946FBF70BFF5549D3
-:10EBD0008346381CFBF706FF5349FBF791FB391CB2
-:10EBE000FBF700FF5149FBF78BFB391CFBF7FAFEE3
-:10EBF000011C5846FBF784FB4D4BA2441C1B53469B
-:10EC0000071C1C43002C65DDFC21301C8905FBF72B
-:10EC1000E9FE311CFBF7E6FE011C041C381CFBF767
-:10EC20006FFB4146FBF7DEFE071C002D44D0364942
-:10EC30004846FBF7D7FE3549051C4846FBF7D2FE90
-:10EC4000391CFBF75DFB011C201CFBF7FDFF311C91
-:10EC5000FBF7FAFF011C281CFBF7F6FF79E73549A3
-:10EC6000301CFBF7BFFE011CFC208005FBF7ECFF0E
-:10EC7000311C041C301CFBF7B5FE011C201CFBF7EB
-:10EC8000B1FE041C002D20D02800FCF7D7F91E4946
-:10EC9000051CFBF7A7FE1D49071C281CFBF7A2FE5D
-:10ECA000011C201CFBF7D0FF311CFBF7CDFF011C22
-:10ECB000381CFBF7C9FF4CE7011C201CFBF7C4FF05
-:10ECC000011C301CFBF7C0FF43E7211C301CFBF785
-:10ECD000BBFF3EE7011C301CFBF7B6FF4146FBF7CC
-:10ECE00081FE041C002DF0D007494846FBF77AFE50
-:10ECF0000649051C4846FBF775FEA4E7FFFF7F7F2A
-:10ED0000FFFF7F0020FB4A008071313FD1F71737AA
-:10ED1000305CCFFF9788173E25333A3E2549923E17
-:10ED2000ABAA2A3F4FD01C3E298E633ECDCCCC3EB1
-:10ED300088C23500ABAAAA3EF0B557464E464546B6
-:10ED4000DE46E0B54F0087B0061C0C1C0D007F08A6
-:10ED500011D08146400043089846FF23DB059845C3
-:10ED600003DD5C4801F00CFD07E09F420CDDFE2353
-:10ED70009B059845F5D1FE20800507B03CBC904628
-:10ED80009946A246AB46F0BD00239B46002E2DDBE4
-:10ED9000FF23DB059F423ED0FE239B059F4244D0CC
-:10EDA0008023DB059D421CD0FC239B059D4248D15E
-:10EDB0004B46301C002B7ADAFEF7B6F9FF23DB0551
-:10EDC000984502D04346002B45D15A46424B434416
-:10EDD00013436FD0012AD0D180231B069C46604488
-:10EDE000CBE7311C301CFBF7FDFDC6E73B4B9F42D8
-:10EDF00024DC3B4B9F42CFDD9622FB15D31A3A0011
-:10EE00001A4111009940B942C6D101231A40013379
-:10EE10009B1A9B46C0E7FE239B059845ABD040DD7F
-:10EE2000201C002DA9DA0020A7E7301C002DA4DA51
-:10EE3000FE20311C8005FBF7FDFB9EE702239B466D
-:10EE4000A6E7301CFEF770F9FF23DB0598451CD0C0
-:10EE50004346002B19D0FE239B05984515D0F30F90
-:10EE6000013B1A0000935B4613432AD09A23DB052B
-:10EE70009F423BDD1B4B984500DD07E2002DD2DAB7
-:10EE80001949081CFBF7AEFD77E7002D04DA011CD9
-:10EE9000FE208005FBF7CEFB4B46002B00DB6CE72A
-:10EEA00093E7002DBFDA80231B06E01865E700F02A
-:10EEB00059FC62E7011CFBF7C7FE011CFBF7BAFB1C
-:10EEC0005BE7311C301CFBF7BFFE011CFBF7B2FBFC
-:10EED00053E7C04630F20200000080C0FFFF7F4BC6
-:10EEE000FFFF7F3FF7FF7F3FCAF24971EB4B0022E4
-:10EEF000984506DC9721C905FBF774FD182280466A
-:10EF000052424346DB157F3B99184346FE225B0283
-:10EF10005B0A92051A439046E14A0291934208DD4A
-:10EF2000E04A934200DC6CE2DF4B01319C460291E7
-:10EF3000E04400239A46FE2300259B05994601954F
-:10EF400043464946181CFBF77FFE4646071C4946C8
-:10EF500040460396FBF7D4F9011CFE208005FBF721
-:10EF600069FB011C0590381C0497FBF73BFD4246EA
-:10EF700053108022920513438022D20294466344A8
-:10EF80001A00070B52443F03111C061C381C904604
-:10EF9000FBF728FD011C0498FBF756FE4946824604
-:10EFA0004046FBF751FE011C0398FBF74DFE391C50
-:10EFB000FBF718FD011C5046FBF746FE0599FBF7D1
-:10EFC00011FD311C8146301CFBF70CFD8046B74912
-:10EFD000FBF708FDB649FBF793F94146FBF702FD45
-:10EFE000B449FBF78DF94146FBF7FCFCB249FBF74E
-:10EFF00087F94146FBF7F6FCB049FBF781F941463A
-:10F00000FBF7F0FCAE49FBF77BF9414682464046F0
-:10F01000FBF7E8FC011C5046FBF7E4FC8046311C82
-:10F02000381CFBF76DF94946FBF7DCFC4146FBF762
-:10F0300067F9391C8246381CFBF7D4FCA1490390C0
-:10F04000FBF75EF95146FBF75BF9000B0303191C54
-:10F05000381C9846FBF7C6FC9A49071C4046FBF74C
-:10F06000F3FD0399FBF7F0FD011C5046FBF7ECFDA7
-:10F07000311CFBF7B7FC494682464046FBF7B2FC21
-:10F08000011C5046FBF73CF98246011C381CFBF77B
-:10F0900037F9000B0303181C8B499846FBF7A2FCB9
-:10F0A000391C061C4046FBF7CFFD011C5046FBF700
-:10F0B000CBFD8649FBF796FC8549071C4046FBF7CC
-:10F0C00091FC011C381CFBF71BF90199FBF718F99F
-:10F0D00080460298FBF7B2FF82464146301CFBF7A0
-:10F0E0000FF9291CFBF70CF95146FBF709F9070B3F
-:10F0F0003F035146381CFBF7A7FD291CFBF7A4FD75
-:10F10000311CFBF7A1FD011C4046FBF79DFD81462C
-:10F110005D46009B013D1D4300D1B4E0FE239B05ED
-:10F120009846250B2D03291C201CFBF78DFD391C4F
-:10F13000FBF758FC211C061C4846FBF753FC011C3E
-:10F14000301CFBF7DDF8291C8146381CFBF74AFC14
-:10F15000011C051C83464846FBF7D2F84400061CF8
-:10F1600007006408002800DCDFE08623DB059C4202
-:10F1700000DDD2E000D1C1E0FC2300229B059246D5
-:10F180009C4200DDDEE049465846FBF7B9F8040B27
-:10F1900024035049201CFBF725FC5946061C201C63
-:10F1A000FBF752FD011C4846FBF74EFD4A49FBF7B1
-:10F1B00019FC4A49051C201CFBF714FC011C281CE7
-:10F1C000FBF79EF8051C011C301CFBF799F8311C5D
-:10F1D000041CFBF739FD011C281CFBF735FD211C25
-:10F1E000061C201CFBF7FEFB3D49051CFBF7FAFB48
-:10F1F0003C49FBF729FD291CFBF7F4FB3A49FBF7D7
-:10F200007FF8291CFBF7EEFB3849FBF71DFD291C95
-:10F21000FBF7E8FB3649FBF773F8291CFBF7E2FB29
-:10F22000011C201CFBF710FD051C011C201CFBF71A
-:10F23000D9FB8021071CC905281CFBF705FD011C13
-:10F24000381CFBF7F7F9311C051C201CFBF7CAFB27
-:10F25000311CFBF755F8011C281CFBF7F5FC211CA1
-:10F26000FBF7F2FC011CFE208005FBF7EDFC53468A
-:10F27000DB051B18DA15002A00DCD4E0181C414617
-:10F28000FBF7B0FB79E51B4B98464AE71A4B9845CC
-:10F2900077DD002D00DDF3E500206EE5FFFF7F0048
-:10F2A00071C41C00D6B35D00000080FF42F1533EE4
-:10F2B00055326C3E05A38B3EABAAAA3EB76DDB3E32
-:10F2C0009A99193F000040400038763F4F38763F0A
-:10F2D000A0C39D360072313F1872313F8CBEBF35DE
-:10F2E0004CBB31330EEADD3555B38A38610B363B02
-:10F2F000ABAA2A3E000080BF0700803F4C49484629
-:10F30000FAF7FEFF291C8246301CFBF79DFC011C0E
-:10F310005046FAF7E7FE002814D046494046FBF76E
-:10F3200061FB4449FBF75EFB27E5434B9C4272DCE3
-:10F3300000D021E7291CFBF787FC4946FAF7DCFEE1
-:10F34000002868D1802212041300E4157E3C23417A
-:10F350009E19F31530007602760A16431722DBB2A7
-:10F3600036497F3B1941D31A1E4188430100B246FA
-:10F37000002F01DA73429A46281CFBF765FC83468E
-:10F3800001E7FE218905FBF75FFC2D49071CFBF710
-:10F3900029FB2C49061C381CFBF724FBFA21051C11
-:10F3A0008905381CFBF71EFB011C2748FBF74CFCAA
-:10F3B000391CFBF717FB011CFC208005FBF744FC04
-:10F3C000391C8246381CFBF70DFB011C5046FBF72D
-:10F3D00009FB1E49FBF706FB011C281CFBF734FC4C
-:10F3E000011C051C301CFAF78BFF070B3F03311C77
-:10F3F000381CFBF729FC011C281CFBF725FC814667
-:10F4000086E6134B134D019380239B039A46FF23FB
-:10F410009B05994694E510494046FBF7E3FA0E49EF
-:10F42000FBF7E0FAA9E45146FDF78CFF27E7C04659
-:10F430003CAA3833CAF2497100001643FFFF7F002F
-:10F4400000AAB83F70A5EC36ABAAAA3E3BAAB83FCB
-:10F45000DCCFD13500C0153F6042A20DF0B5574654
-:10F460004E46DE464546E0B5B04B470089B00C003D
-:10F4700006007F089F426EDDAD4B9F421ADC0F23D2
-:10F48000AC499F43002800DC71E0FBF7DDFBAA4B91
-:10F49000061C9F4200D114E1A849FBF7D5FB011CD3
-:10F4A0002060301CFBF7D0FBA449FBF7CDFB012506
-:10F4B000606054E0A24B9F426FDDA24B9F4200DD93
-:10F4C000F8E0862252429146FB1599444B46DD05F1
-:10F4D0007D1B281CFBF792FDFBF7B0FD011C05907E
-:10F4E000281CFBF7B1FB8721C905FBF77BFA804697
-:10F4F000FBF784FDFBF7A2FD011C0690051C4046AE
-:10F50000FBF7A2FB8721C905FBF76CFA00210790E6
-:10F51000FAF7CEFD002800D105E10021281CFAF7FA
-:10F52000C7FD434243410133874A21000192022231
-:10F5300005A800924A4600F039FA0500002E0EDABE
-:10F540008022120694462368454263442360636820
-:10F550006344636003E00023002508604B602800DB
-:10F5600009B03CBC90469946A246AB46F0BDFAF7BE
-:10F57000C7FE714B061C9F4200D1C1E06F49FAF7EC
-:10F58000BFFE011C2060301CFBF75EFB6B49FAF7E5
-:10F59000B7FE012560606D42E1E7FDF7C5FD6B49EF
-:10F5A0008046FBF71FFAFC218905FAF7A9FEFBF755
-:10F5B00025FD0500FBF742FD5E498146FBF712FA87
-:10F5C000011C4046FBF740FB5C4980464846FBF780
-:10F5D00009FA8246011C40461F2D00DC83E0FBF740
-:10F5E00033FB83465B46FF22DB0DFF151340FB1AFE
-:10F5F000082B47DD56494846FBF7F4F98246011CC3
-:10F600004046FBF721FB8346011C03904046FBF775
-:10F610001BFB5146FBF718FB80464E494846FBF75B
-:10F62000E1F94146FBF710FB011C82465846FBF707
-:10F630000BFBFF22C30D1340D846FB1A8346192B40
-:10F6400020DD45494846FBF7CDF9039B071C011C0B
-:10F65000181C9A46FBF7F8FA011C80465046FBF747
-:10F66000F3FA391CFBF7F0FA3C49071C4846FBF754
-:10F67000B9F9391CFBF7E8FA011C82464046FBF752
-:10F68000E3FA83465B46594623604046FBF7DCFAC3
-:10F690005146FBF7D9FA6060002E00DB5FE780235C
-:10F6A0001B065B44236080231B069C46604460600D
-:10F6B0006D4254E7011CFBF7C7FA0025606020602B
-:10F6C0004DE72349FBF7C0FA2249051CFBF7BCFABA
-:10F6D000011C2060281CFBF7B7FA1E49FBF7B4FA9F
-:10F6E000012560603BE7FBF7AFFAFF233A001C49B6
-:10F6F0009A436B1E9B005B5883469A42C2D171E7C6
-:10F700001349FAF7FDFD1349051CFAF7F9FD011C31
-:10F710002060281CFBF798FA0E49FAF7F1FD012545
-:10F7200060606D421BE70323FEE6C046D80F493FE9
-:10F73000E3CB1640800FC93FD00FC93F4344353754
-:10F74000800F4943FFFF7F7FE4F2020084F9223FEC
-:10F750000044353708A3852E00A3852E32318D2431
-:10F7600064F202002A49430070B50200041C5B08E1
-:10F770008B423BD8002B38D000283EDB2549C615EC
-:10F780008B420BD88020000420423DD1002300E0B2
-:10F790000B005200591C0242FAD0F61A8023520282
-:10F7A0001B04520A1A437F3E5300F10700D5930011
-:10F7B000802270101921002600255204AC189C42AA
-:10F7C00002DCA5181B1BB61801395B005208002982
-:10F7D000F4D1002B02D0012301369E43FC239B056C
-:10F7E0009C4676106644C005801970BD011CFBF76D
-:10F7F000F9F8211CFAF784FDF7E7011CFBF724FA5E
-:10F80000011CFAF717FFF0E701235B42C5E7C0468A
-:10F81000FFFF7F7FFFFF7F00F8B54746CE46584B7E
-:10F82000450080B5061C0F1C6D089D4248DCFBF7A7
-:10F83000E5FB002800D19BE0311C301CFBF7D2F81F
-:10F840005049041CFBF7CEF84F49FAF759FD211C2B
-:10F85000FBF7C8F84D49FBF7F7F9211CFBF7C2F895
-:10F860004B49FAF74DFD211CFBF7BCF84949FBF762
-:10F87000EBF9211CFBF7B6F84749FAF741FD211CCB
-:10F88000FBF7B0F88046FC21201C8905FBF7AAF89D
-:10F890004146051C201CFBF7A5F8391C041C301C34
-:10F8A000FBF7A0F8011C201CFBF7CEF9011C281C5B
-:10F8B000FBF7CAF9011CFE208005FBF7C5F953E0F0
-:10F8C000011CFBF78FF82F49041CFBF78BF82E491E
-:10F8D000FAF716FD211CFBF785F82C49FBF7B4F964
-:10F8E000211CFBF77FF82A49FAF70AFD211CFBF7D8
-:10F8F00079F82849FBF7A8F9211CFBF773F826498A
-:10F90000FAF7FEFC211CFBF76DF8244B80469D4264
-:10F91000B9DD234B9D422EDCFF231B069C46FE20B7
-:10F920006544291C8005FBF78FF98146FC21201CCA
-:10F930008905FBF757F8291CFBF786F94146051C9A
-:10F94000201CFBF74FF8391C041C301CFBF74AF84D
-:10F95000011C201CFBF778F9011C281CFBF774F92B
-:10F96000011C4846FBF770F90CBC90469946F8BD5F
-:10F97000FE208005F8E70B4B0B4D9946D6E7C046B5
-:10F98000FFFFFF314ED747ADF6740F317CF2933451
-:10F99000010DD037610BB63AABAA2A3D9999993E31
-:10F9A0000000483F0000383F0000903EF0B54E4652
-:10F9B0004546DE465746E0B5DDB00B9166990390AB
-:10F9C00007931800CB4B8900CE580723D11E441E45
-:10F9D000C81703405B18D910CB43DB1719404B1CE9
-:10F9E000DB00D31A05960194099104930D1B371976
-:10F9F00019D4679A7F199046AB00013798440026C6
-:10FA000020AC08E043469859FBF718FB0135A0519C
-:10FA10000436BD4207D0002DF4DA00200135A05194
-:10FA20000436BD42F7D1059B002B00DA24E3059B89
-:10FA3000039901339B009946079B9A0094460092D4
-:10FA40000022904648AA9346F422524261449246CC
-:10FA50000F005CAB63449A44019B0026002B0FDB34
-:10FA600055460026039C4544296801CCFAF7BAFFA5
-:10FA7000011C301CFAF744FC043D061CBC42F3D1C7
-:10FA80005B4642469E5004239C46E044C845E3D171
-:10FA90000CA904228C46524262449446059DAB0058
-:10FAA0009C4462468C460892039A083B6344944601
-:10FAB0000A93009B63449A465A46AB000093D6587B
-:10FAC000002D26DD8C4BA846EC1847AB99460CABB5
-:10FAD0001D00A4005C44EE21301C8905FAF782FF6A
-:10FAE000FBF78CFAFBF7AAFA8721C905071CFAF77E
-:10FAF00079FF011C301CFBF7A7F8FBF77FFA2168A0
-:10FB000001C5381CFAF7FCFB043C061C4C45E2D14D
-:10FB10004546049F301C3900FDF714FCF821890587
-:10FB2000041CFAF75FFFFDF703FB8221C905FAF712
-:10FB300059FF011C201CFBF787F8061CFBF75EFA37
-:10FB40000400FBF77BFA011C301CFBF77DF8061C58
-:10FB5000002F00DCC4E06A1E92000CAB9B5808200A
-:10FB60001900C01B0141641881405B1A0CA98B501D
-:10FB70000722D21B134198464346002B29DD01344E
-:10FB8000002D00DCF0E10C9F0123002F00D08EE05F
-:10FB9000012D08D099000CAA57580133002F00D02E
-:10FBA00086E09D42F6D1049B002B0EDD012B00D197
-:10FBB000FCE0022B09D16B1E9B000CAAD2580292CA
-:10FBC0003F2202990A400CA9CA504346022B00D199
-:10FBD000D6E00021301CFAF76BFA002800D19DE036
-:10FBE000059B691E8B420FDC0CAA94460022424BF7
-:10FBF0000898EB189B0063441E68043B3243834221
-:10FC0000FAD1002A00D0DCE0059B0CAA013B9B0046
-:10FC1000D358002B00D0C7E001220A9B043B59684F
-:10FC200001320029FAD052196B1C069293423ADC39
-:10FC3000531B9B000293099B00275B199B0099466D
-:10FC4000079B9C4620AB98466544AD00A844679A44
-:10FC50004B469446DB1963445868FBF7EFF943467B
-:10FC6000D851019B002B20DB4346DD193B00039C50
-:10FC7000574600269A4600E0286802CCFAF7B2FE02
-:10FC8000011C301CFAF73CFB043D061CA742F3D1D3
-:10FC90005346BA461F00009BFB185B445E60029B04
-:10FCA00004379F42D3D1069D06E70026F3E70021E3
-:10FCB00080225200D71B0CAA57509D420EDD0CA982
-:10FCC0008C4600999B006144D25808006344FF2190
-:10FCD00000E01A688A1A04C38342FAD1012762E756
-:10FCE000049B002B0AD16B1E9B000CAAD3581B123D
-:10FCF000984641E728F60200FFFFFF3FFC218905F7
-:10FD0000FAF7FAF9002800D021E100230021301C85
-:10FD10009846FAF7CDF9002800D061E74346049FE2
-:10FD2000301C794202940393FDF70CFB8721C9052F
-:10FD3000041CFAF7E1F9002800D17EE1EE21201C35
-:10FD40008905FAF74FFEFBF759F9FBF777F9872199
-:10FD5000C905061CFAF746FE011C201CFAF774FFC1
-:10FD6000FBF74CF9009A0CAB985008376B1C301C11
-:10FD70009D0001930497FBF741F90CAB58513CE00F
-:10FD8000FE20311C8005FAF75FFF061C002F00D112
-:10FD90001FE7FE2004998005FDF7D4FA011C301CF2
-:10FDA000FAF752FF061C14E701223CE76B1E9B008A
-:10FDB0000CAAD25802927F2202990A400CA9CA507A
-:10FDC00003E74346049A03930CA88B00C358083AF0
-:10FDD000029401910492002B0FD1B1480B0084468C
-:10FDE0000CA8634484469B006344043B5868013973
-:10FDF000083A0028F9D004920191FE200499800568
-:10FE0000FDF7A0FA019B061C002B00DA3AE19B00EB
-:10FE10001D005C4604930CAB5859FBF70FF9311CDD
-:10FE2000FAF7E0FDEE2160518905301CFAF7DAFDA2
-:10FE3000043D061C2B1DEED1A346049B994D5B444B
-:10FE40009846019B01339B4600239A4634AB994662
-:10FE50005B460093059B9B465B460027002B14DB0B
-:10FE6000002691480027002403E0043654450CDCAA
-:10FE7000705943469959FAF7B5FD011C381CFAF739
-:10FE80003FFA0134071CA345EFDA53464A469B006C
-:10FE9000D75001239C46053BE2449C46009BE0442E
-:10FEA0005345D9D1669B022B62DC002B1EDC13D19B
-:10FEB000049B00204B441D0033AC2968043DFAF735
-:10FEC0001FFAAC42F9D1039B002B03D080231B0601
-:10FED0009C4660440B9B18600720029B18405DB055
-:10FEE0003CBC90469946A246AB46F0BD019B002023
-:10FEF000002B0DDB34AB9946019B00209B004B444B
-:10FF00001D0033AE2968043DFAF7FAF9AE42F9D183
-:10FF1000039B002B00D098E00B9B011C18603498C9
-:10FF2000FAF792FE019B002B0EDD34AB01261D007B
-:10FF3000019CB300E9580136FAF7E2F9B442F8DA65
-:10FF4000039B002B00D08DE00B9B5860C4E702237D
-:10FF500001349846002D00DD15E6FE20311C800599
-:10FF6000FAF772FE061C34E600271CE634AB99460D
-:10FF7000669B032BB0D1019B002B00DC8EE0019A25
-:10FF800093009B464B46594694465B589846444BD3
-:10FF9000454663449E00009333AB9A464E4437680F
-:10FFA000291C381CFAF7ACF9041C011C381CFAF7A0
-:10FFB0004BFE291CFAF7A4F9043EB0607460251CBE
-:10FFC000B245ECD1019B012B68DD4B465A469E5849
-:10FFD000009B4C469B009846444400E01C00276868
-:10FFE000311C381CFAF78CF9051C011C381CFAF777
-:10FFF0002BFE311CFAF784F9231F606025602E1C4C
-:020000040002F8
-:100000009945EBD14646002004364E443168043E03
-:10001000FAF776F9B442F9D14B460399349A5B6802
-:10002000002924D0802109068C460B996244634440
-:1000300060440A604B6088604EE7201CFAF7DEFFE0
-:10004000009A0CAB98500195D7E680230B9A1B06BB
-:10005000C3181360011C3498FAF7F6FD019B002BBE
-:1000600000DD62E780231B069C4660446CE70B9929
-:100070000A604B6088602FE7079B9B00009348ABAA
-:100080009B4605E5669B022B00DD6FE7002B00DD3C
-:100090002CE70020002B00D115E71DE70020BBE76F
-:1000A000FFFFFF3FFCF502000000C93FF8B54746DF
-:1000B000CE4680B51700334A4300041C0E1C5B0873
-:1000C000934205DCFAF79AFF0300201C002B46D070
-:1000D000211C201CFAF786FC051C011C201CFAF7C9
-:1000E00081FC29498046281CFAF77CFC2749FAF74D
-:1000F000ABFD291CFAF776FC2549FAF701F9291C12
-:10010000FAF770FC2349FAF79FFD291CFAF76AFCFD
-:100110002149FAF7F5F88146002F24D0FC21301C44
-:100120008905FAF75FFC4946071C4046FAF75AFC76
-:10013000011C381CFAF788FD291CFAF753FC311C06
-:10014000FAF782FD1549051C4046FAF74BFC011CE5
-:10015000281CFAF7D5F8011C201CFAF775FD0CBC19
-:1001600090469946F8BD011C281CFAF73BFC0B4948
-:10017000FAF76AFD4146FAF735FC211CFAF7C0F898
-:10018000EDE7C046FFFFFF31D3C92E2F342FD73202
-:100190001BEF3836010D50398988083CABAA2A3E3E
-:1001A000F0B5DE4657464E464546E0B58A4B46001A
-:1001B00083B0041C88469246834676089E4212DC31
-:1001C000FAF71CFF002828D1534601331E4300D103
-:1001D000F5E05346012B00D1FBE0211C7F48FAF7E4
-:1001E00029FA051CB5E07E4B9E4216DD002805DA93
-:1001F00080231B069C46434498466444211C79484E
-:10020000FAF722FD4146041C7748FAF71DFD211C30
-:10021000FAF776F800239846041C211C201CFAF7F4
-:10022000E1FB011C071CFAF7DDFB391C051C201C37
-:10023000FAF7D8FB6D498146281CFAF7D3FB6C49C5
-:10024000FAF75EF8291CFAF7CDFB6A49FAF758F875
-:10025000291CFAF7C7FB6849FAF752F8291CFAF784
-:10026000C1FB6649FAF74CF8291CFAF7BBFB644955
-:10027000FAF746F8391CFAF7B5FB62490190281CD9
-:10028000FAF7B0FB6049FAF73BF8291CFAF7AAFB2A
-:100290005E49FAF735F8291CFAF7A4FB5C49FAF72E
-:1002A0002FF8291CFAF79EFB5A49FAF729F8291C5E
-:1002B000FAF798FB5849FAF723F8011C0198FAF766
-:1002C0001FF84946FAF78EFB4146FAF719F8391C30
-:1002D000FAF788FB4146FAF713F85049051C4846DF
-:1002E000FAF780FB291CFAF70BF8011C071C201CED
-:1002F000FAF706F83A4B051C9E4232DC5346012BB6
-:1003000027D0011C060B3548FAF794F93603211C57
-:100310008046050B301CFAF797FC2D03011C381C96
-:10032000FAF792FC291CFAF75DFB291C041C301C0F
-:10033000FAF758FBFE218905F9F7E2FF011C201CA2
-:10034000F9F7DEFF4146FAF74DFB291CF9F7D8FF14
-:10035000051C281C03B03CBC90469946A246AB46FF
-:10036000F0BD5046FAF76AFE291C061C281CFAF755
-:1003700039FB311C8046281CF9F7C2FF011C40469E
-:10038000FAF758F9391CFAF75FFC011C201CFAF740
-:100390005BFC011CF9F7B4FF011C301CFAF754FC9C
-:1003A0005B46041C981702231840013B181AFAF701
-:1003B00045FE011C201CFAF715FB051CC9E7201C93
-:1003C000FCF7B2FE011CFE208005FAF733F9051C8C
-:1003D000BFE7251CBDE7C046FFFF7F31000080BF9F
-:1003E0003FA12C3FDA0F493F682122338453D9378C
-:1003F0007AC09538B937813948DEBE3A1F37113C8B
-:10040000D10D5D3D5FAE9BB745F4A338C8261A3ABF
-:1004100016696B3BA427B33C8988083EABAAAA3E69
-:10042000F8B54E4657464546DE46A04BE0B54E0071
-:1004300080468A46894676089E420CDD9C4B9E4249
-:1004400000DDA2E000D19DE04B46002B00DCE0E0A7
-:10045000984B994AA1E0994B9E4200DDB3E0984B3E
-:100460009E4200DCA1E001235B429B46424653468C
-:1004700040465146FBF792FD02000B0006000F00BC
-:10048000FBF78CFD04000D008E4A8F4BFBF786FDB9
-:100490008E4A8F4BFAF75CFE22002B00FBF77EFDA5
-:1004A0008C4A8D4BFAF754FE22002B00FBF776FDA9
-:1004B0008A4A8B4BFAF74CFE22002B00FBF76EFDAD
-:1004C000884A894BFAF744FE22002B00FBF766FDB1
-:1004D000864A874BFAF73CFE32003B00FBF75EFD95
-:1004E000844A06000F00844B20002900FBF756FDCC
-:1004F000824A834BFBF7C4FF22002B00FBF74EFD23
-:10050000804A814BFBF7BCFF22002B00FBF746FD26
-:100510007E4A7F4BFBF7B4FF22002B00FBF73EFD2A
-:100520007C4A7D4BFBF7ACFF22002B00FBF736FD2E
-:1005300002000B0030003900FAF70AFE534642462B
-:10054000FBF72CFD5B46013366D05B46734A744C67
-:10055000DB00E418D3181A685B68FBF791FF42468A
-:100560005346FBF78DFF02000B0020686168FBF724
-:1005700087FF030048460A0000280EDA8022120690
-:100580008A180AE0002800D15EE7424653464046FA
-:100590005146FAF7DDFD03000A00180011003CBCCB
-:1005A00090469946A246AB46F8BD5E4A5E4BFAF7C6
-:1005B000CFFD00225D4BF9F75BFD002800D152E72B
-:1005C00043465246E9E700F0BFF8594B04000D00DE
-:1005D0009E422ADC574B9E4250DC02000B00FAF789
-:1005E000B7FD0022514BFBF74BFF802306000F00A5
-:1005F0000022DB0520002900FAF7AAFD0B0002000B
-:1006000039003000FBF7C0F8002380468A469B463D
-:100610002CE7284B484AC0E702000B0040465146F1
-:10062000FBF72EFF03000A00B7E7444B9E421ADC9B
-:100630000022434BFBF724FF002206000F00404B33
-:1006400020002900FBF7AAFC0022384BFAF780FDB6
-:100650000B00020039003000FBF796F802238046B9
-:100660008A469B4602E70B00020036490020FBF752
-:100670008BF8032380468A469B46F7E600222B4BE5
-:10068000FBF7FEFE002206000F00284B2000290089
-:10069000FAF75EFD0B00020039003000FBF774F83A
-:1006A000012380468A469B46E0E6C046FFFF0F4492
-:1006B0000000F07F182D4454FB21F93FFFFFDB3F82
-:1006C000FFFF1F3E11DA22E33AAD903FEB0D762497
-:1006D0004B7BA93F513DD0A0660DB13F6E204CC56C
-:1006E000CD45B73FFF8300922449C23F0D55555574
-:1006F0005555D53F2F6C6A2C44B4A2BF9AFDDE52EB
-:100700002DDEAD3F6D9A74AFF2B0B33F711623FE8C
-:10071000C671BC3FC4EB98999999C93F08900200F3
-:10072000E88F02009C7500883CE4377E0000F03FB3
-:10073000FFFFF23FFFFFE53FFB21F9BFFF7F0340D3
-:100740000000F83F0000F0BF49004B081900704757
-:1007500000207047002001497047C0460000F87F24
-:100760004000C90FC90740080843704743000020F4
-:10077000024A5B089A4240417047C046FFFF7F7FB4
-:10078000004870470000C07F10B504000448130003
-:10079000002804D00A000220210002F050F810BD09
-:1007A0003F280200014B18687047C0466C000020CB
-:1007B000084B10B50400002B02D0002100E000BF60
-:1007C000054B1868836A002B00D09847200008F07A
-:1007D0005AF8C0460000000094F60200002310B54D
-:1007E000040003604360836081814366C2810361CA
-:1007F00043618361190008225C3008F0E6FA054B7A
-:1008000024626362044BA362044BE362044B2363E0
-:1008100010BDC046A10A0200C90A0200010B020075
-:10082000378E020010B5024908F078FA10BDC046B4
-:10083000250E0200836913B50400002B28D18364C0
-:10084000C3640365134B144A1B6882620193984288
-:1008500001D101238361200000F020F860602000B6
-:1008600000F01CF8A060200000F018F80022E06002
-:1008700004216068FFF7B2FF01220921A068FFF799
-:10088000ADFF02221221E068FFF7A8FF0123A36158
-:1008900013BDC04694F6020025080200F8B51C4BB3
-:1008A00007001E68B369002B02D13000FFF7C2FFBA
-:1008B0004836B4687368013B04D53368002B07D011
-:1008C0003668F6E70C22A55E002D0DD06834F2E7FD
-:1008D0000421380008F00CFA30600028F0D10C2315
-:1008E00004003B602000F8BD20000A4B65662560CF
-:1008F0006560A560E36025616561A5610822290046
-:100900005C3008F062FA6563A563A564E564E9E715
-:1009100094F602000100FFFF70B500260C4D0D4C4F
-:10092000641BA410A64209D1002608F04FFB0A4D13
-:100930000A4C641BA410A64205D170BDB300EB584D
-:1009400098470136EEE7B300EB5898470136F2E7D7
-:10095000F0000020F0000020F00000201001002036
-:100960000FB40B4B13B51C68002C05D0A369002BEA
-:1009700002D12000FFF75EFF05AB049AA1682000BA
-:10098000019300F0FBFA16BC08BC04B01847C0463F
-:100990006C00002070B505000E00002804D08369AB
-:1009A000002B01D1FFF746FFAB69AC68002B02D1E9
-:1009B0002800FFF73FFF244B9C420FD16C68A389AE
-:1009C0001B0702D52369002B1FD12100280000F04E
-:1009D00017F9002819D00120404270BD1B4B9C42E2
-:1009E00001D1AC68EBE71A4B9C42E8D1EC68E6E732
-:1009F0000136A360002B04DAA2699A4216DC0A29A8
-:100A000014D023685A1C22601970A3683178013B06
-:100A10000029EDD1A360002B0FDA22000A31280053
-:100A200000F084F8431CD6D00A20D6E72200280024
-:100A300000F07CF8431CE8D1CDE70A2023685A1C5B
-:100A400022601870C9E7C04654F6020074F602002E
-:100A500034F6020010B5034B01001868FFF79AFF47
-:100A600010BDC0466C00002010B5034B0100186893
-:100A700008F0B3F910BDC0466C000020002370B52B
-:100A8000064C050008001100236000F0F1FC431C37
-:100A900003D12368002B00D02B6070BDDC2F002019
-:100AA00070B50C000E25495F00F086FC002803DBC2
-:100AB000636D1B18636570BDA389024A1340A3814F
-:100AC000F9E7C046FFEFFFFFF8B51F008B8905006F
-:100AD0000C001600DB0505D50E23C95E002202239B
-:100AE00000F0CCF9A389054A28001340A381320005
-:100AF0000E23E15E3B0000F06FF8F8BDFFEFFFFF53
-:100B000070B50C000E25495F00F0B8F9A389421CAE
-:100B100003D1054A1340A38170BD802252011343C3
-:100B2000A3816065F8E7C046FFEFFFFFF8B5050059
-:100B30000E001400002804D08369002B01D1FFF7B8
-:100B400079FE224B9C422DD16C68A369A360A389D6
-:100B50001B0731D52369002B2ED023682269F7B2F9
-:100B6000981A6369F6B2834205DC2100280000F080
-:100B700059F9002826D1A3680130013BA3602368FE
-:100B80005A1C22601F706369834204D0A389DB076B
-:100B90001AD50A2E18D12100280000F043F90028A8
-:100BA00012D00FE00A4B9C4201D1AC68CDE7094B53
-:100BB0009C42CAD1EC68C8E72100280000F020F868
-:100BC0000028CAD0012676423000F8BD54F6020053
-:100BD00074F6020034F6020070B50500080011003A
-:100BE0000022064C22601A00F8F798F8431C03D143
-:100BF0002368002B00D02B6070BDC046DC2F002086
-:100C0000364B70B51D6806000C00002D05D0AB6991
-:100C1000002B02D12800FFF70DFE314B9C420FD173
-:100C20006C680C23E25E93B219072DD4D90611D457
-:100C300009230120336037331343A381404270BD41
-:100C4000284B9C4201D1AC68EBE7274B9C42E8D192
-:100C5000EC68E6E75B0713D5616B002908D0230039
-:100C60004433994202D0300007F092FB00236363C3
-:100C70002422A3899343A381002363602369236013
-:100C80000823A2891343A3812369002B0BD1A02140
-:100C90008022A389890092000B40934203D0210057
-:100CA000300000F027F90123A289134011D000235E
-:100CB000A36063695B42A361002023698342BED1C4
-:100CC0000C23E25E1306BAD540231343A3810138F7
-:100CD000B5E7920700D46369A360EDE76C000020DC
-:100CE00054F6020074F6020034F60200002370B5D8
-:100CF000064C050008002360F7F7FAFF431C03D1F8
-:100D00002368002B00D02B6070BDC046DC2F002074
-:100D1000F7B58A8905000C00130760D44B68002BD7
-:100D200004DC0B6C002B01DC0020FEBDE76A002F09
-:100D3000FAD000232E682B6080235B01216A1A40C1
-:100D400034D0606DA3895B0706D56368C01A636BF6
-:100D5000002B01D0236CC01A0200216A0023280056
-:100D6000E76AB847A189431C06D12B681D2B30D8F0
-:100D70002B4ADA40D3072CD5002363602369236014
-:100D8000CB0405D5431C02D12B68002B00D1606534
-:100D9000616B2E600029C7D023004433994202D0F2
-:100DA000280007F0F5FA00206063BEE70123280061
-:100DB000B847431CC6D12B68002BC3D01D2B01D0D4
-:100DC000162B01D12E60AFE74023A2891343A381E4
-:100DD000ABE740230B430120A3814042A5E70F6905
-:100DE000002FA1D00B680F60DB1B0193002392073B
-:100DF00000D14B69A360019B002B00DC94E7019BB1
-:100E00003A00216A2800A66AB047002803DC402384
-:100E1000A2891343DFE7019B3F181B1A0193EAE7FE
-:100E2000010040200B6970B505000C00002B01D1BA
-:100E3000002070BD002804D08369002B01D1FFF78A
-:100E4000F9FC0B4B9C4209D16C680C22A35E002B71
-:100E5000EED021002800FFF75BFFEAE7054B9C423C
-:100E600001D1AC68F1E7044B9C42EED1EC68ECE7B1
-:100E700054F6020074F6020034F6020070B5050064
-:100E8000080011000022064C22601A00F7F7A8FFA4
-:100E9000431C03D12368002B00D02B6070BDC046DB
-:100EA000DC2F002070B50E001D000E23C95E96B029
-:100EB0001400002907DA00232B60B3891B0611D424
-:100EC0008023DB000FE06A4600F08AFA0028F2DB9C
-:100ED000F022019B12021340054A9B185A425341CB
-:100EE0002B60EDE740230020236016B070BDC046A4
-:100EF00000E0FFFFF7B502268B8905000C003342A6
-:100F000006D0230047332360236101236361F7BDCB
-:100F100001AB6A46FFF7C6FF00990700280007F0FB
-:100F200032FA002808D10C22A35E9A05EFD40322DE
-:100F300093431E43A681E4E70F4BAB628023A28953
-:100F400020601343A381009B20616361019B002B00
-:100F50000DD00E23E15E280000F054FA002806D0E0
-:100F60000322A38993431A0001231343A381A08979
-:100F70003843A081CBE7C04625080200F0B5A1B0F8
-:100F800003900F0016001D00002805D0836905930B
-:100F9000002B01D1FFF74EFC7B4B9F425CD1039BA2
-:100FA0005F68BB891B0763D53B69002B60D00023BA
-:100FB00008AC6361203363761033A3760795350060
-:100FC0002B78002B01D0252B5CD1AB1B05930CD0CB
-:100FD00032003900039807F079FF431C00D1C4E0C8
-:100FE0006269059B9446634463612B78002B00D1B2
-:100FF000BBE0012200235242626004A9543252181D
-:101000006E1C2360E360A3601370A3653178052232
-:101010005E4807F0A4FE751C002835D12268D3066F
-:1010200004D5532304A95B1820211970130704D594
-:10103000532304A95B182B21197033782A2B2CD049
-:10104000350000210A20E3682A786E1C303A092A0C
-:1010500064D900292ED026E04D4B9F4202D1039B3C
-:101060009F689EE74B4B9F429BD1039BDF6898E7AD
-:1010700039000398FFF7C4FD002898D001204042B2
-:1010800021B0F0BD01359BE7404B2268C01A012317
-:101090008340134323602E00B8E7079B191D1B688C
-:1010A0000791002B01DB0B9304E05B42E36002231A
-:1010B000134323602B782E2B0AD16B782A2B35D142
-:1010C000079B02351A1D1B680792002B2BDB099327
-:1010D000314E29780322300007F041FE002806D067
-:1010E0004023801B83402268013513432360297805
-:1010F00006222A486E1C217607F031FE00283AD0DD
-:10110000274B002B25D10722079B07339343083336
-:1011100007936369049A9B18636150E74343012175
-:101120009B18350090E701235B42D0E700230A209B
-:101130001A000135636029786E1C3039092903D9FA
-:10114000002BC5D00992C3E7424301235218350052
-:10115000F1E707AB00933A00124B2100039800E03F
-:1011600000BF0490049B0133D3D1BB895B0600D53B
-:1011700084E70D9884E707AB00933A00094B210000
-:10118000039800F011F8ECE754F6020065870300BD
-:1011900074F6020034F602006B8703006F870300C9
-:1011A00000000000CD8E0200F0B589B004920A0064
-:1011B00043320593039002920A7E0C000E9B6E2A26
-:1011C00000D186E01FD8632A33D008D8002A00D186
-:1011D0008CE0582A4DD0250042352A7030E0642A30
-:1011E00001D0692AF7D1196825680A1D280629D572
-:1011F00008681A60002803DA2D23029A404213700F
-:101200006B4E0A274FE0732A74D008D86F2A1FD07C
-:10121000702AE0D1202209680A43226003E0752A7F
-:1012200016D0782AD7D12200782145321170614E2C
-:1012300022E025001A684235111D196013682B70D1
-:10124000012365E008681A606906D3D500B2D1E7CA
-:1012500019682568081D186008682E0605D5544EC3
-:1012600008276F2A1BD00A2719E06D06F7D580B230
-:10127000F5E745314E4E0A7018682268011D006876
-:101280001960150621D5D30702D520231A43226001
-:101290001027002803D1202322689A4322602300CC
-:1012A000002243331A706368A360002B58DB0422CA
-:1012B000216891432160002854D1029D002B5AD00F
-:1012C0002500337842352B7055E05506DBD580B2CA
-:1012D000D9E71A680D68101D4969186013682E0651
-:1012E00001D5196002E06D06FBD519800023029D2F
-:1012F00023614FE01A68111D1960156800216268AA
-:10130000280007F02CFD002801D0401B60606368B6
-:1013100023610023029A13703CE023692A00049998
-:101320000398059DA847431C3ED023689B0715D40E
-:10133000079BE068984239DA180037E02200012361
-:10134000193204990398059EB047431C2CD00135EF
-:10135000E368079A9B1AAB42F0DCE9E70025F7E760
-:101360000028ADD0029D3900F8F768FD735C013D9F
-:101370002B700028F7D1082F09D12368DB0706D589
-:1013800063682269934202DC3023013D2B70029B8B
-:101390005B1B2361059B07AA00932100049B039814
-:1013A00007F0A6FD431CB8D10120404209B0F0BDB2
-:1013B000768703008787030070B5050008001100D9
-:1013C0000022064C22601A00F7F7D2FC431C03D11E
-:1013D0002368002B00D02B6070BDC046DC2F00209E
-:1013E000002370B5064C050008001100236007F0CB
-:1013F0002DFA431C03D12368002B00D02B6070BD55
-:10140000DC2F0020002370B5064C05000800236087
-:10141000F7F7D2FC431C03D12368002B00D02B60CC
-:1014200070BDC046DC2F002070B50C4E0D031C03B0
-:1014300049005B002D0B490D240B5B0DB14208D018
-:10144000064900208B4203D114432000441EA041D2
-:1014500070BD05430120002DFAD1F1E7FF07000020
-:1014600058220120014B40421A607047DC2F0020B7
-:1014700058220120014B40421A607047DC2F0020A7
-:10148000C26810B50300002A05DD4168806881420A
-:1014900008DB002010BD00208242FBD059689C6808
-:1014A000A142F7DD012059684C00521820435A60D0
-:1014B000F0E783684268C1689B1A5B1810B5581C36
-:1014C000002900DD581EF8F7BDFCC343DB171840A8
-:1014D00010BD70B5050008000021EBF747FB0400C4
-:1014E0002000EBF7A5FB011E00D170BD2B1D0122D2
-:1014F000180001F0D7FFF3E710B50400DEF756FF40
-:101500002368036010BD70B50D00FFF7F5FF040000
-:101510002900FFF7DEFF200070BD70B505000E004A
-:10152000DEF744FF04003100DEF7F4FF2B682000F3
-:10153000236070BDF7B50C6801900E002000002AF2
-:101540000AD0DEF7A5FF0125019B9D4208D3336831
-:1015500020001B682360FEBDDEF728FF0400F2E7D1
-:10156000AB00F058844204D12000DEF7EDFF0135D6
-:10157000EAE70021EBF7FAFA07003800EBF758FB2F
-:10158000011EF4D02000DEF7A3FFF6E710B500221D
-:10159000FFF7D0FF10BD30B58468C3686568990057
-:1015A000AB4201D3002207E0E26801335258002A1F
-:1015B00004D0042A02D0C360100030BD0431EFE72C
-:1015C00010B50122DFF754F810BD10B50022DFF787
-:1015D0004FF810BD10B50430012201F063FF10BDBB
-:1015E000F7B50C000025060011001F00009501232F
-:1015F0002A002000F0F760FEAC4207D12100200055
-:10160000DFF71AF8040026602000FEBD290028003C
-:10161000DFF712F8290004003868EBF7A7FA050095
-:101620002800EBF705FB011EEDD02000FFF7D2FFED
-:10163000F6E70B0010B5010000221800DFF754F8A0
-:1016400010BD10B50022DFF74FF810BD02398142FE
-:1016500002D30B88002BF9D00231081A40107047D2
-:1016600070B51D090024954217D26C000919541B4E
-:101670000F22250013400E883200012D02D04A8827
-:1016800012043243DA40013D92B20280023102304C
-:10169000002DF0D153425A41A41A200070BDF0B57C
-:1016A000059C121B9446002227001400002F11D124
-:1016B000059B5D004219491916006546002D12D19F
-:1016C00063465B00D218002C01D014800232101A3D
-:1016D0004010F0BD8E5A9D5A013F7619341984523C
-:1016E000240C0232E2E70B88013D1C1934800231E0
-:1016F000240C0236E2E7F7B50025089C2E002700EF
-:101700000193121B002F0BD16400031915001F0059
-:101710000919002D0FD152009918FFF797FFFEBD50
-:101720004B5B013F9C46019B66445B5BF61A46534C
-:1017300036140235E6E70C88013DA6193E800231D9
-:1017400036140237E5E770B505000C00022900D217
-:101750000224A868002803D02B689B08A34209D262
-:10176000610004F0C4FD03232A68A40013401C4355
-:10177000A8602C6070BD70B505000C2004F099FDC8
-:1017800001212B780400DB07DA0F03788B43134326
-:101790000222934303702B68216898080323820078
-:1017A0000B40134323606B686360AB68002B02D16E
-:1017B000A360200070BD400004F07BFDA0602B689A
-:1017C000A9689A08520007F0E4FAF2E710B54B0056
-:1017D000C018D218002901D1080010BD0238023A01
-:1017E000038814881B1B02D404D10139F2E70120BD
-:1017F0004042F2E70120F0E710B5041E05D08068F2
-:1018000004F086FD200004F083FD10BD70B50500D6
-:101810000C000221FFF797FF2B780122002C07DA3A
-:1018200013432B70644200236B60002C03D170BD06
-:1018300093432B70F7E76B685A1C6A60AA685B00D9
-:101840009C52240CF1E700230360436083607047DF
-:1018500010B5002805D003789B0702D4806804F0F7
-:1018600057FD10BD70B50C0005004968FFF76BFF10
-:1018700001212378A868DB07DA0F2B788B43134309
-:101880002B706368A1686B6063685A0007F081FA87
-:1018900070BD10B5002901D1416010BDFFF7B6FF42
-:1018A000FBE770B50D000400FFF7CDFF2900200015
-:1018B000FFF7EFFF70BD70B5012504788160AC4380
-:1018C000250002242C4304709400032205681900AB
-:1018D0002A402243026000224260FFF7DAFF70BD17
-:1018E000F8B504001F0006AB1D7804211600FFF7B1
-:1018F0002AFF23780122002D0CD0002F0ADA13438F
-:10190000237000237242BB41002161601100194322
-:1019100005D1F8BD9343237032003B00F4E76168C2
-:101920001D04481C6060A06849000A52100C190C84
-:1019300005432A000B00E9E7F7B50E1C01210378E7
-:10194000F20F8B431343FF220370D201330C0700C5
-:10195000134002D100237B60F7BD9342FAD07F236E
-:101960007400240E5B42E518F4D4002D02D1FFF779
-:101970004DFFF1E721000F236F39CA171A405218A3
-:10198000802176021211760A090400920E43162D68
-:1019900028DC08335D1BEE4000252C000099380040
-:1019A000FFF7D1FE009B7B6063000193002C04D005
-:1019B0001A000021B86807F008FA002D08D033009B
-:1019C000AB40BA686100535210235D1BEE400134F6
-:1019D000009B64005B009C42BED0BA681653360C74
-:1019E0000234F8E71D40963CE217173D1D401340B6
-:1019F0001C192411D2E7F0B504000D001E008B184D
-:101A0000D100090985B001310293FFF79CFE2378CC
-:101A10000122002E0DD013432370002328006360A1
-:101A20000A9B9BB20393029B984204D3401B05B0D0
-:101A3000F0BD9343F0E703781A00303A092A04D93D
-:101A4000113A192A18D8373B1A000A9B9A42EDD24C
-:101A50006368A7689C463E0001936346002B11D142
-:101A6000019B5B00FB18002A01D01A800233DF1BA8
-:101A70007F1067600130D6E71A00613A192AD5D87D
-:101A8000573BE1E73188039B594301238A185B42A6
-:101A900032809C44120C0236DFE7F8B504001500D2
-:101AA0001E000127002902D0531EF618023FE9004C
-:101AB0000F3109092000FFF746FE012223789343E6
-:101AC000237000236360002D08D163685900A36868
-:101AD00059181800FFF7BAFD6060F8BD00200F2B01
-:101AE00008DC3278013D9A40104380B20833F61981
-:101AF000002DF4D16168103B4A1C6260A268490065
-:101B00008852E0E70A00416870B50500002903D15A
-:101B100053680800002B14D013782C78DB07E007FB
-:101B2000DB0FC00F181A0CD1536899420AD3013049
-:101B3000994203D89268A868FFF748FEE30700D5EA
-:101B4000404270BD01204042F8E710B504008842D1
-:101B500001D0FFF787FE012223789343237010BD45
-:101B600010B50400884201D0FFF77CFE01212278E5
-:101B7000D307DB0FCB1A0B408A431343237010BDEE
-:101B80007FB50400884201D0FFF76CFE6268002A2E
-:101B90000BD101212000FFF7D6FD0123A26813809D
-:101BA00022786360134323707FBD0E2601252378BE
-:101BB0006E442B420AD0A168AB43237035803300BA
-:101BC00000950800FFF797FD6060EDE7511C2000CD
-:101BD000FFF7B9FDA1683580330000956268080001
-:101BE000FFF75DFD237860601D432570DCE7F0B5ED
-:101BF0000D00496887B004001600002901D0002AB2
-:101C000005D129002000FFF72DFE07B0F0BDFFF73A
-:101C10009AFD3300A9686A68A068FFF721FD60603B
-:101C2000029001202B78DB07D90F237883430B43E5
-:101C300023700342E9D00E23002102AA9B186A6890
-:101C4000300919800392039A8A4201D0814212D14D
-:101C5000039A8242D9D9A9684000405A01250F2130
-:101C60000E402900B1400139014200D01D80198881
-:101C700000290CD1C9E74A0094466746AA68BA5AB7
-:101C8000002A10D00121039A19808242E3D8029AD7
-:101C9000A0680121002A08D00091029A0100FFF7F4
-:101CA000FEFC6060B1E70131CDE701806160ACE727
-:101CB00073B553680C00496806001500994206D3B5
-:101CC00008D89268A068FFF781FD002802DA230097
-:101CD0002C001D0023782A7861685340DB0715D457
-:101CE00001313000FFF72FFD6B68B0680093AB68DF
-:101CF0006268A168FFF7D3FC012170602378DB07DD
-:101D0000DA0F33788B431343337073BD3000FFF722
-:101D10001AFD6B68B0680093AB686268A168FFF752
-:101D2000EAFCE9E7F7B553680C00496806001500BE
-:101D3000994208D30027994209D89268A068FFF712
-:101D400045FDB84203DA230001272C001D0023784B
-:101D50002A7861685340DB0719D501313000FFF75D
-:101D6000F2FC6B68B0680093AB686268A168FFF72B
-:101D700096FC706023780121DB07DB0F3278002F9F
-:101D800001D0CB1A0B408A4313433370F7BD3000A8
-:101D9000FFF7D9FC6B68B0680093AB686268A16814
-:101DA000FFF7A9FCE5E7F0B54B68160052688BB069
-:101DB00005000C00934201D234000E00012122786C
-:101DC00063680A4201D132781140C9182800FFF730
-:101DD000BAFCA36821780393636872680193B368BF
-:101DE000347804930B0000266340A868B446DB07F0
-:101DF00002D4CB07DB0F9C46C907CB0F1E00029312
-:101E0000634607005B429BB2E40707937342E40F0B
-:101E10009BB2089363429BB20693019B0594591EA3
-:101E2000D31A09934B1C14D1019B590063464118E6
-:101E3000002B02D001230B800231FFF707FC0122A7
-:101E4000029B68601C402B7893431C432C700BB0A2
-:101E5000F0BD039B089A1B8853409E19099B069A64
-:101E60005B188B4206D8049B1A88069B5A40049B39
-:101E700002330493059B0139D318079A0593334025
-:101E800053409BB263443B801B0C059A9C46039BCA
-:101E9000120C02330592360C02370393C2E7F0B5F9
-:101EA0004B68160052688BB005000C00934201D2BB
-:101EB00034000E000121227863680A4201D1327891
-:101EC0001140C9182800FFF73EFCA368217802934F
-:101ED0006368A8680093B368726803930123347839
-:101EE000194200D12340C907C90F0E000191594280
-:101EF00089B2E40707917142E40F89B20891614207
-:101F000089B2009F06910099D21B05940139049073
-:101F100009924A1C0ED1009B59004118FFF796FB0D
-:101F20000122019B686023432C7894431C432C704E
-:101F30000BB0F0BD029A089F12887A409619099A50
-:101F4000069F5218BC468A4206D8039A1288574008
-:101F5000BC46039A023203923700059A360C62445B
-:101F600005921743079A01395740BAB29446049A2A
-:101F700063441380059A1B0C120C0592049A0232DA
-:101F80000492029A02320292C3E7F0B54B688BB01A
-:101F900004000E001500002B02D05368002B03D163
-:101FA000002363600BB0F0BD814237D10800FFF71A
-:101FB000E2FB06000190A54200D1050073686A6843
-:101FC00020009918FFF7BFFB236800219A085200F0
-:101FD000A06806F0FAFEA3680593B3680599079315
-:101FE00073680693AB6802936B689C46069B5B0024
-:101FF00004930023049A023209926246002A3ED1D9
-:1020000063602B78317822785940012319423CD102
-:102010009A4322700198FFF7EFFBC3E70023019377
-:102020008242CBD11000FFF7A6FB05000190C5E767
-:102030001388DB190893038802301F00029B1B885A
-:102040007B43089FDF19039B1780013B3F0C0393E1
-:102050000232039B002BEBD1049BCB18002F03D043
-:10206000099B049A5B188F52059A02319B1A012230
-:1020700052429444029A5B1002320292BDE7069BE0
-:10208000079803930A000027E3E713432370C1E78F
-:10209000F8B54B6807001500002B03D00124137816
-:1020A000234202D000237B60F8BD5368002B03D18C
-:1020B0002100FFF7ABFBF7E70800FFF75CFB06002A
-:1020C0002800FFF758FB210005003800FFF79EFBB2
-:1020D0006B68002B11D0AB681B88234204D0320000
-:1020E00039003800FFF751FFA96823006A6808002B
-:1020F000FFF7B6FA6860002806D13000FFF77CFBD6
-:102100002800FFF779FBCFE7320031003000FFF7FE
-:102110003CFFDDE7816843680200002010B55B00EA
-:10212000CB18023B9C1CA14204D31378DB0700D5DB
-:10213000404210BD1C8800042043F2E7F0B587B090
-:10214000039104921D00002901D0049A9D180024D7
-:102150008268260000924268019201220292019A4E
-:10216000002A26D0009A24041188049A10369A185E
-:102170000C430592072E06DC009A02320092019A67
-:10218000013A0192EBE701270278A1B23A4207D067
-:10219000FF228A431100029A891889B20A0A029220
-:1021A000039AC9B2002A06D06A1E9446117093425F
-:1021B00007D107B0F0BD6A1C9446059A2970944572
-:1021C000F7D0083E240A6546D4E7F8B58668436828
-:1021D000050000205C003419023CA31C9E4206D37B
-:1021E0002B78DB0702D580231B06C018F8BD8F2192
-:1021F000C905F8F7F7FB071C2088F8F71FFF391C03
-:10220000F8F77EF8E8E7F0B589B007930EAB1B78D6
-:102210000F9F0600069114000393381E05D00B0093
-:10222000023B1E2B03D90020387009B0F0BD756841
-:10223000002D11D13B00002A09D130230370002367
-:1022400001300370C01BF0E71A70013401332278AB
-:102250001800002AF8D1F0E76D00280004F029F8F2
-:102260002A00B168029006F094FD029B04975B1966
-:102270000593079B01973A3B07930021059D029B1D
-:10228000023DAB4212D93031392901D9079BC91817
-:10229000019B5D1C1970029B059A93420ED3039B10
-:1022A000002B2BD001231EE00195E6E728880904C6
-:1022B00008430699F7F7C2FD2880E0E71A88002A4C
-:1022C0000DD10233E8E7013802781A7001331FE0BC
-:1022D00011781878013B10705970013223E0039B8C
-:1022E000002BE1D00023049AAA1A032A04D1019AF0
-:1022F0000399951C51700495002BD5D0029804F0D9
-:1023000007F8002C07D0200006F0B3FD2B002018A2
-:102310001D00A042D7D83378DB0702D52D232B70C0
-:1023200001353A006B1E9A42D2D30023E81B2B7072
-:102330007BE730B5884213D20378303B092B0FD8A6
-:1023400000230A251360136804786B43303C1B1983
-:1023500001301360814203D00378303B092BF2D95E
-:1023600030BDF7B51E00009001920025994215D3AB
-:10237000CC1A089B2F00AB4201DD27002C00009BEC
-:1023800032001D190199280006F0F4FC002805D040
-:10239000BC4202D0089BE418F1E700252800FEBDEE
-:1023A000F8B50600102015000F0003F082FF0400AE
-:1023B00006608560002F0FD029003800EEF72CFB57
-:1023C0006060681C03F075FF2A00E06039000600B9
-:1023D00006F0DFFC002373552000F8BD10B5002384
-:1023E0000122DEF7C9FE10BD012210B500235242C2
-:1023F000DEF7C2FE10BD012310B51A00DEF7BCFEE9
-:1024000010BD012210B513005242DEF7B5FE10BD1B
-:1024100010B50A0001000220DEF76CFF10BD10B5F8
-:102420000A0001000020DEF765FF10BD10B50A00AC
-:1024300001000120DEF75EFF10BDF0B50C0095B085
-:1024400004280AD1C868E0F719FB002802D12068E7
-:1024500015B0F0BD0690002802DA01235B42069316
-:102460002068E0F723FA05006068E0F71FFA07909C
-:10247000A84202D06068DEF7B7FCA068E0F716FA61
-:10248000079B834201D0A068F5E70DA92068DEF71D
-:1024900099FD0EA909906068DEF794FD0FA90B90D5
-:1024A000A068DEF78FFD0E9B0D9A0A9000269342DE
-:1024B000CDD80E9B0D9F002B5BD1002E04D00F9A20
-:1024C0000A99300006F065FC0F9B039301230493E7
-:1024D000099D26E0089F7B425F41059BDB19059320
-:1024E0005F1B002E05D0039B3A00F018290006F070
-:1024F00050FC039BDF19002E04D0F0190F9A0A99A3
-:1025000006F047FC0E9A0F9B9446FB180393059B1D
-:102510000D9A63441D00099B9F18049B7F1B013388
-:102520000493049B069A93420ED0002F0CD00E9B6E
-:102530000B9A08930123390000932800089BFFF7AA
-:1025400010FF05900028C5D1002E05D0039B3A004E
-:10255000F018290006F01DFC039BF918002E0CD181
-:10256000049B002B00D172E710A804F0DDFD129E41
-:102570009FE7002304930393AAE710A90798DEF7C7
-:10258000B1FC65E7F0B50D0089B003A9070028008C
-:10259000DEF718FD00240600039904A804F0C4FD2A
-:1025A000069B0193039BA34207D82800E0F77EF91E
-:1025B00004A9DEF797FC09B0F0BD305DB847019B78
-:1025C00018550134EEE713B50C00012A09D101A911
-:1025D000DEF7F8FC019B2060636042230020A360CB
-:1025E00016BD00230B604B60013B8B600120F7E7B9
-:1025F00013B5040001A98068DEF7E4FCE3680199E3
-:10260000020000208B4205D2D25C0130520001331F
-:102610001043E36016BD07B501A9DEF7D3FC0199AD
-:10262000EEF74AFAC300062018430EBD704710B5F6
-:10263000E0F73CF9406803F09DF910BD10B5830741
-:1026400002D003F03DF810BD002803DB0123400059
-:102650001843F8E703F04FF8F5E7704770B504004A
-:102660000D001600E0F722F9C36A181E06D03200EA
-:1026700029002000984743425841C0B270BD02284B
-:1026800003D149000138084370470020FCE7704738
-:1026900010B50C00022103F09FFD002802D0047049
-:1026A000240A447010BDC36910B50400002B04D087
-:1026B000B02109021943FFF7EBFFBD21A36909020D
-:1026C00019432000FFF7E4FF10BD70B50D00042191
-:1026D000140003F081FD002805D0057084702D0AD8
-:1026E000240A4570C47070BD10B5DB001143194356
-:1026F000FFF7CEFF10BD10B5072A09D8D200072971
-:102700000CD80A438C21C9011143FFF7C1FF10BD4A
-:1027100013004022083BDB001A43F0E7802308390E
-:102720001943EEE74369890070B5CC58E0210500F4
-:1027300043680902E41A043C23055B0D1943FFF7C3
-:10274000A7FF2B680120022B07D1E40AE40204D082
-:1027500080231B01E4186042604170BDF8B51D0084
-:1027600043699200D45843680600E41A043C63109D
-:10277000002D16D10A02D021FF27090211433B4048
-:102780001943FFF785FF012332681D00022A05D196
-:10279000BC4303D00134FF34654265411D4028002D
-:1027A000F8BD802080228001204012021B050243D8
-:1027B0001B0D1A438B01F021802009021943C00030
-:1027C000A312034024031943A40E21433000FFF752
-:1027D0007CFFE4E74369F822890070B5CC58F0210A
-:1027E000050043681202E41A043C63109BB21A43CA
-:1027F00063025B0D09021943FFF767FF2B68012095
-:10280000022B07D1A40DA40504D08023DB03E41818
-:102810006042604170BD10B5022901D104F05FFD36
-:1028200010BD10B5040006F024FB01002000E0F705
-:1028300049FEFF38431E9841400010BDFEE7704737
-:10284000F0B585B000AFBB605B009B185C1C786086
-:102850003960FA60A400042B20D823006A460E33A6
-:10286000DB08DB00D31A9D4600266D4628003B6836
-:10287000221F08C0B96A06F08CFAF9682B000131F2
-:10288000BA687868EAF77CF80400002E02D03000BD
-:1028900003F03EFD2000BD4605B0F0BD200003F072
-:1028A00015FD051ED9D00600E0E707B5009313001B
-:1028B0000A0081684068FFF7C3FF0EBD10B5F3F74B
-:1028C000B3FC43000120184310BD8023F0B55B0525
-:1028D00087B01D69E0F7B8FC037805AFFD2B19D16F
-:1028E000E0F7B2FC03783B70E0F7AEFC0400E0F7E1
-:1028F000B7FC00950290029B9C4218D1200002F088
-:10290000B2F8012239002000ECF778F8E0F706FD74
-:1029100007B0F0BDE0F7A4FC03783B70E0F7A0FC43
-:102920000400E0F791FC6B4202900093E3E7009B08
-:102930002000E61802F097F8200002F094F88023B7
-:1029400035005B051B69009ADB09DB01B21A9B1994
-:1029500001920393039B34009D42CCD02B78002B33
-:1029600004D0802229000198ECF748F8019B8035BB
-:1029700080330193EEE770B5050006F07AFA002384
-:1029800001001A002800E0F7D1FD041E05D0280040
-:1029900002F0B7FF2100E0F751FF70BD002210B533
-:1029A00011001000E0F768FF10BD1FB5022201A959
-:1029B000E0F71EFA002201A91000E0F75DFF05B064
-:1029C00000BD70B51468012927D9102523000178AE
-:1029D000AB4315D1302920D146781039831C3143BF
-:1029E000782902D11560181A70BD002C19D16F29F1
-:1029F00002D167391160F6E7622910D16039F9E731
-:102A00000300082C0FD13029EDD1202243781A433E
-:102A100003006F2AE7D1831CE5E7002C01D10A23CC
-:102A200013600300DFE7022CDDD13029DBD1202247
-:102A300043781A430300622AD5D1ECE713B50400AA
-:102A40004068EAF7F5F800280BD0A3680190591CFC
-:102A5000A16001215B000B43022069460093E3F76C
-:102A600009FE16BDF8B507000C201D000E0003F08E
-:102A700020FC0760040000212868EAF777F860600E
-:102A80000020012E02D96868DFF7F8FFA06020005F
-:102A9000F8BD10B5102003F01EFC07220378934305
-:102AA0001A0001231343037010BD70B5040023788E
-:102AB00008005B07150061685B0F052B0BD12368CD
-:102AC000E268D802400DF2F7D1FF23889B0601D5BA
-:102AD000EEF704FE70BD0A00A3682900F2F798FF24
-:102AE000F3E770B50C0080214900214015000A1E53
-:102AF00001D06A682968FFF7D8FF0223E2091A406B
-:102B00009A40E1B2AA18EEF7DFFA70BD70B5038CF7
-:102B1000046B032B03D10023C56A9D4205D18B00B2
-:102B2000E25003F065FB012070BD9E00A65996425D
-:102B300001D00133F1E70020F6E710B50400FFF7FC
-:102B4000B2FD2000FFF7A3FD10BD8BB270B50500EC
-:102B50000C0003844262032B05D1C36A00219A0052
-:102B6000006B06F032F9043C6142614128000131FA
-:102B700003F019FB28000021E0F746F970BD70B59D
-:102B8000060034200D0003F094FB040020220021F5
-:102B900006F01BF92900200003F0F2FAA662E562B4
-:102BA000A80003F086FB2063200070BD10B5040070
-:102BB000006B03F0ADFB0021200003F0E9FA2000D8
-:102BC00003F0A6FB10BD10B54368984710BDF82070
-:102BD0008023800202785B051B694D2A01D1C01A4F
-:102BE00070478020C002FAE730B5010003687F25F6
-:102BF00000201A78C001140052B22C402043013347
-:102C0000002AF6DB0B6030BD07B5019001A8FFF785
-:102C1000EBFF0EBD0023C3560130002BFADB7047DB
-:102C200010B5E2F7BDF8E6F77DFDE2F7F7F800280A
-:102C3000F9DB10BD73B5050001A98068DEF7C2F9A4
-:102C4000EB68019A0400002093420CD2E4182000A3
-:102C500000F034FB061B310001222000DEF778F97A
-:102C6000EB689E19EE6076BD836870B55D1C04004C
-:102C700085604068E0F774F8DFF700FF854201DB0C
-:102C80000023A3600121A36804225B00194360684C
-:102C9000E0F77CF870BD4123012800D00023180024
-:102CA0007047202304304B60423308608B60002063
-:102CB0007047A021037802000020C133FF33C9050B
-:102CC0009B005850012318000138C046C046C0463A
-:102CD000C046C046C046C046C046C046C046C046C4
-:102CE000C046F1D1A220C00008581278D040184048
-:102CF000704710B50120E2F79FFD10BD022310B50B
-:102D000084171C40013B1C1B802342021B04520AF7
-:102D1000C0151A43C3B2963B5918002903DD8A40F7
-:102D20002000504310BD0B0000201F33FADB494246
-:102D30000A41F5E707B508001100002200921300D0
-:102D4000EFF7BAFAE2F73CFF0EBD10B50021E9F744
-:102D50000DFF10BD3E2307B50022019069460220F9
-:102D60000093DFF7CDFB0EBD10B50A0001000C206B
-:102D7000EAF734FB10BD10B5020036210A20EAF74D
-:102D80002DFB10BD10B502002E210A20EAF726FB0C
-:102D900010BD30B5012485B00B00A04200D04C68B6
-:102DA00069461868E9F7E2FE05002800E9F740FFE8
-:102DB000021E02D1200005B030BD21000520EAF737
-:102DC0000DFB0400F1E710B501000220E9F766FDF4
-:102DD00010BD10B51A23E3F721F910BD10B5192362
-:102DE000E3F71CF910BD10B58468C3686168020080
-:102DF00000208B4204D2991C890001330859D3600A
-:102E000010BD10B50C68020020000B00083061688E
-:102E1000EEF7F2FD10BD030010B50A000830596846
-:102E200002F053FF10BD436808300B60106070471C
-:102E300010B503F06DFA10BDFC30C160026170473F
-:102E4000002370B504001D007F26AA00A218FF32DF
-:102E5000517C7F2906D102339B0019552000EDF7E4
-:102E6000F5FB70BD0135EDB27E2907D102339B0021
-:102E70001E552000EDF7EAFB0023E6E70029E4D029
-:102E8000980020180172917C01334172D17CDBB231
-:102E90008172127DC272D8E710B5E5F7DDFF0368D5
-:102EA0000620DB00184310BD10B5EAF7DFFD02F085
-:102EB00007FC10BD10B5E4F7B9FA407910BD4368BE
-:102EC000F7B50500980003F0F4F9002607006968DB
-:102ED000B14205D83B000022A868E9F751FD0BE09C
-:102EE000B3000193EB18D868E9F7A2FE041E04D1E1
-:102EF000380003F00DFA2000FEBDB300F850013693
-:102F0000E5E710B500220400A05C8B5C002808D126
-:102F1000584258410123184010BD98420AD101324D
-:102F2000F2E7002BF9D1E5F7BBFB03000120584085
-:102F3000C0B2EFE70020EFE770B50500080004F02D
-:102F400030F9FFF718FD0400280000F06FFA0121A6
-:102F5000020003002000EAF7F1F970BD07B5F42183
-:102F60006A46FF31E9F784FD0098431E9841C0B2DC
-:102F70000EBD10B50222E4F7EFFD10BD10B5012221
-:102F8000E4F7EAFD10BD13B513000C000A1D411E45
-:102F9000002000902068E4F717FE16BD13B513005B
-:102FA0000C000A1D411E012000902068E4F70CFE71
-:102FB00016BD73B50C00050001CC1600E4F7B2FE97
-:102FC0000023691E009322003300E4F7FDFD76BD67
-:102FD00073B56B46DE1D32000D00040000F0B8F83A
-:102FE00033780100002B03D02A00200000F0DBF82A
-:102FF00073BD37B56B460400DD1D2A0000F0A8F84C
-:103000002A782378002A06D0012B02D902230370E4
-:1030100037BD0023FBE7012BFAD90378002BF7D14A
-:103020000233F4E770B505000E00100019001C0013
-:1030300000F07EF80378002B04D1B368210028004B
-:10304000984770BD012B01D1F368F7E74288022B46
-:1030500004D13368210028009847F2E77368F9E744
-:1030600010B50C00F6F7D4FF002903DA002C05DCBC
-:10307000080010BD0029FBD0002CF9DA0919F7E788
-:1030800010B5002806DB002901DACB43C018F6F79B
-:10309000D9FE10BD0029FADB401A0130F7E710B560
-:1030A00044680C6081681160C2681A6010BD10B578
-:1030B000DFF748FDFAF70EFAE9F762F910BD10B52F
-:1030C000DFF740FDFAF734F8E9F75AF910BD10B50B
-:1030D000DFF738FDF9F7A0FFE9F752F910BDF7B5B2
-:1030E00006004068041E13D00021E3F7C3FA002550
-:1030F00004007368AB420BD9AB000193F3189868D6
-:10310000E9F796FD071E05D12000FFF791FE3C0070
-:103110002000FEBDAB00E31898600135E9E710B56B
-:103120000400806A03F0F4F8200003F0F1F810BD09
-:1031300030B500230400858C9D4201D8002030BDAD
-:10314000A06ADA00801842688A42F8D00133F3E7B7
-:1031500070B504000E001500FFF7EAFF00230028F9
-:1031600016D1618CA38C8B4208D30631C900A06AAA
-:1031700003F0BDF8638CA06206336384A38CA06A5D
-:103180005A1CDB00C0180023A28403604660013390
-:103190002B7070BD10B54368002B02D1FFF7C8FF3C
-:1031A00010BD1800F7E7F7B544680E001700231E9E
-:1031B00008D10023337004E00378022B01D10133DE
-:1031C0000370F7BD5D68002DF3D018003900FFF7DC
-:1031D000AFFF2B000028F5D00378023B022BE8D884
-:1031E000042535706B46DE1D320039002000FFF7E4
-:1031F000AFFF3378002BDFD005706468F2E710B5BD
-:103200001300C4680022A04710BD002210B51100B1
-:10321000FFF7F5FF10BD07B5019101AA0121FFF7E6
-:10322000EEFF0EBD10B5E5F73DF910BD10B5DFF7A7
-:103230003DFBE5F77DF910BD70B504000D00FFF70B
-:10324000F5FF002803D02000DFF730FB0400290041
-:103250002000E8F741FD70BD8368C268934203D245
-:103260005A1C82601878704701204042FBE70368CF
-:1032700010B50400002B02D0406803F049F820008C
-:1032800003F046F810BD10B503785AB2002A0BDAE5
-:103290007F2213403F3A1A4208D13F210130027881
-:1032A00014008C43802C04D0180010BD93435208A6
-:1032B000F1E79B010A4001301343F0E73F22013060
-:1032C00003789343802B00D070470130F8E730B586
-:1032D00000223F24814201D8100030BD01390B7813
-:1032E000A343803B5D1EAB41D218F3E730B502002B
-:1032F00041183F2400208A4200D330BD13780132A8
-:10330000A343803B5D1EAB41C018F4E710B5040039
-:10331000E5F7D6F9002800D02034200010BD10B504
-:103320000400E5F7D9F9002800D0203C200010BDAA
-:103330003038092802D92023984307387047F0B560
-:10334000070085B00E0000680968FAF753FA3B6879
-:103350003568011C041C181C0293F7F775FC291C26
-:10336000F7F768F900210190201CF6F7A1FE00286C
-:1033700017D00024002D01DA8024240600210198B2
-:10338000F6F796FE002833D0291C0298F7F752F979
-:103390000025002801DA80252D063D60346005B047
-:1033A000F0BD01236A4600219373201CF6F786FEC8
-:1033B000002801D16B46987301236A460021D3731C
-:1033C000281CF6F77BFE002801D16B46D8736B46AC
-:1033D0009A7BDB7B9A42D1D0291C201CF6F790FF08
-:1033E000FE21041C89050198F7F72EFC0190C5E722
-:1033F0000198F9F79DFE011C051C0198F7F724FCC4
-:10340000FC218905F6F76EFE0028C6D0FE21281C97
-:103410008905F6F775FF051CBFE7FF23DB05C91813
-:10342000032310B59943E5F725FA10BD40687047AE
-:1034300010B504004160002903D18160012323609D
-:1034400010BDC80002F047FFA060F7E7CB00416065
-:10345000072110B5046882602140194307230160E9
-:103460001943017010BD037810B504009B0702D406
-:10347000806802F04DFF0722236800211A400123D3
-:10348000226013430222934361602370A16010BD48
-:10349000002310B5040001604360880002F01BFFA8
-:1034A000A06010BDF0B5036887B004000E00029262
-:1034B000002B04D11300DB0761D5E5F79DFC31003B
-:1034C0000220E9F7EBF94310180021680593F6F79D
-:1034D000B5FC00270391039B0193019B9B00049380
-:1034E000049AA3689B181D68002D0BD1029AD2077D
-:1034F00045D5002F00D03B006268013262601E603B
-:10350000350031E0042D16D1002F00D11F000198A5
-:1035100021680130F6F792FC039B01918B42DCD1CC
-:103520000122029B13422AD0002F22D063689B18ED
-:1035300063603E60E4E731002800DFF74DFA0028C1
-:10354000E5D0029B9B070FD563680198013B636040
-:10355000A768049B01302168FE18F6F76FFC89000C
-:10356000CB59002B03D13360280007B0F0BD0423F2
-:10357000F9E72000E5F740FC21680598A7E700255A
-:10358000F2E7002370B50168994201D1002513E0EC
-:1035900086689C00341925680133002DF4D0042D71
-:1035A000F2D04268013A42601800F6F747FC890001
-:1035B0008B59002B02D12360280070BD0423FAE749
-:1035C00010B50400806802F0A3FE0023236063604E
-:1035D000A36010BD704710B54079EAF7D5FA10BD69
-:1035E00013B5040008001100002200921300EEF74A
-:1035F00063FE042002F05DFE046016BD70B5040099
-:103600000D00002201794020F1F780F8E3682B607B
-:10361000A3685843686023790020AB6070BD41689F
-:1036200070B5C2688C6803000020A24207D29C6873
-:10363000551C08791219C968DD60F1F7CFF870BD23
-:1036400073B50E0000251C0011000223012230007A
-:103650000095EEF731FE2068DEF7BCF80078012E09
-:1036600003D12900E5F7CCFD76BD6168E5F788FE5A
-:10367000FAE7F7B51D0000260223070000960800B0
-:1036800011001A00EEF718FE0C2002F012FE07607F
-:103690002B680400436031006868E9F767FAA060AE
-:1036A0002000FEBD10B50400E5F7E6FF2000602114
-:1036B00005F0F6FA200010BD10B5040005F0D9FBA6
-:1036C00001002000E6F746F810BD10B505F0C2F97C
-:1036D00010BDD0B5041E0FD0F2F7A6FD06000F00F6
-:1036E000F2F7A2FD801BB941002905D1844203D91C
-:1036F000F1F7ACFF30BFF3E7D0BD10B5F6F758FADD
-:1037000010BD10B5F2F790FD10BD10B501242300D7
-:10371000884202D00278534253412340180010BD22
-:10372000037842780A3B1B02134302300B60704758
-:10373000838BC26A01339BB28383118C994200D27E
-:103740001384704770B505000C00100019002A683A
-:10375000049BE4F7E1FDEB6AA4004360AB6AE05030
-:1037600070BD13B50400080001A9FFF7D9FF019946
-:10377000206B01F0ADFB13BDF0B587B005000C0068
-:1037800004920593002B03D008230A7D13430B7585
-:10379000049B6383EB6A1B78002B39D1059B049A49
-:1037A0002100286B01F089FD07B0F0BD926AF3009B
-:1037B000D31803931B78033B012B19D8002312E085
-:1037C000029BA26ADB00D3181A78042A09D1039A53
-:1037D0005B685168994204D15288286B01F025FA40
-:1037E0000137029B01330293029AA38C9342E7DCD8
-:1037F0000136EA6A938CB342D8DC002FCED0059B09
-:103800003A0000932100049B286B01F06BFDCBE78D
-:1038100000263700EDE773B51D000B781A3206005D
-:10382000080093420ED101A902F0F0FB019B0400B5
-:10383000984200D173BD30002100A847200002F05B
-:10384000DBFBF3E7002BF5D03000A847F2E730B5FB
-:10385000040085B0080003A902F093FB637905001A
-:10386000012B08D1E36A02225B7D039900930300D8
-:103870002000FFF767FF039BA06A990009584823BF
-:103880002A002000E5F7E0FF05B030BD7FB5040059
-:10389000080003A9160002F074FB63790500012BF0
-:1038A00006D103000096072203992000FFF74AFF84
-:1038B000280002F0A1FB039BA16A9B005D58020057
-:1038C000402320002900E5F7BFFFE88904B070BD60
-:1038D00070B5040008000D0002F08EFB010020000E
-:1038E000E5F7F2FF29002000E5F7EEFF70BD10B507
-:1038F0000400E5F7E9FF206B01F012FB10BD10B5E5
-:103900000400E5F7E1FF206B01F041FB10BD70B54D
-:1039100005001400A14200D170BD2800E5F7D4FFD6
-:103920000100F7E710B50400FFF7F1FF0B21206B52
-:1039300001F022FC10BDF0B5040085B008000F00B6
-:10394000150002F059FB02F05CFB03A902F019FB21
-:1039500063790600012B08D1E36A2A005B7D039995
-:10396000009320003B00FFF7EDFE039BA06A990047
-:10397000002309581A002000FFF7FEFE300002F075
-:103980003BFB01002000E5F79FFF062D03D100213E
-:10399000206B01F090FB002301211A00206B01F045
-:1039A000BCFC05B0F0BD70B504000D0016009142DE
-:1039B00005D10E21006BEBF795F9022113E00B788E
-:1039C000AE2B14D1006B0E21EBF78CF9280002F01E
-:1039D00058FB0028F1D1280002F013FB0100200061
-:1039E000E5F772FF0321206B01F026FC70BDAF2BC1
-:1039F0000CD1080002F005FB01002000E5F764FF90
-:103A000002F0FFFA01008642E9D1D6E7E5F75CFF54
-:103A1000D3E770B50D00160004000E21006BEBF724
-:103A200061F9320029002000FFF7BDFF70BD70B5BD
-:103A300015000400E5F748FF02F0E3FA2A00010050
-:103A40002000FFF7B0FF70BDF8B500240500160098
-:103A50001F00A14202D0E5F737FF0134BE4204D176
-:103A6000286B210001F0AAFBF8BD31002800E5F722
-:103A70002BFF0600F1E710B513000A000021FFF745
-:103A8000E3FF10BDF8B5050016001F00E5F71CFFA9
-:103A90000400B44200D1F8BD21002800E5F714FF6E
-:103AA00039000400286B01F067FBF2E710B5022330
-:103AB000FFF7E8FF10BD10B50123FFF7E3FF10BDCE
-:103AC00010B50023FFF7DEFF10BD10B50400E5F7C9
-:103AD000FBFE0621206B01F042FB10BDF7B5040090
-:103AE0000D00170006690193731C0361BD4204D1E8
-:103AF0003100206B01F045F9F7BD29002000E5F702
-:103B0000E3FE05008742F1D032000199206B01F0FD
-:103B100092FAEBE710B50023FFF7E0FF10BD10B5F8
-:103B20000123FFF7DBFF10BDF7B50D000400110006
-:103B3000280002F055FA290007002000E5F7C4FE2E
-:103B4000002306000193032F03DD23690193013352
-:103B5000236101230093009B01339F421BDC032F51
-:103B600018DD2569206B6B1C2361290001F046FAE2
-:103B70000199206B01F005F90121206B01F047F854
-:103B8000206B01F00FFA206B01F001FA2900206B85
-:103B900001F0F7F8F7BD3378012B33D17078B11C01
-:103BA00036380B282CD8F6F7AFF83C2B062B2B2BEE
-:103BB0002B2B252723291A252000E5F785FE009BBE
-:103BC000060002330093BB4205DA206B01F0CBF90B
-:103BD000206B01F0FEF92900206B01F0CDFA009B6B
-:103BE000BB42B8DA019A0021206B01F024FAB2E757
-:103BF0001B25E1E71C25DFE71D25DDE71E25DBE7AB
-:103C00001F25D9E72225992B06D0300002F039FA7A
-:103C1000023D002800D10335300002F0EDF901002B
-:103C2000CAE71925C8E710B5C36A04005A7DFFF733
-:103C30002DFE01002000E5F7E9FE10BD37B50400B8
-:103C4000080001A9256B02F092F9019B226A9B00F2
-:103C50002800995801F01DF937BD1FB504002368ED
-:103C60000800002B0BD1002909D00B78192B06D99D
-:103C700003AB02AA01A902F0F0F9029B23601FBD69
-:103C8000F7B504000D001700914203D31100E5F7CA
-:103C90001BFEF7BD0669731C03610B78902B27D1BF
-:103CA000080002F0AEF901002000E5F70DFE31003A
-:103CB0000190206B01F0D0F9002201992000E6F775
-:103CC000BBF8280002F098F905002000FFF730FD4E
-:103CD0003A0029002000FFF7D3FF206B310001F0EC
-:103CE00019FAA38B206B013BA38301F0D9F9D0E72C
-:103CF000E5F7EAFD31000500206B01F0ADF9206B1E
-:103D000001F045F9E1E713B50400019101A875211F
-:103D100002F08BF9019902002000FFF7B1FF13BDFB
-:103D20007FB50400080003A9150002F02AF96279A2
-:103D30000600012A05D10300009503992000FFF732
-:103D400001FD206B01F0E2F8039BA26A9B009D58E5
-:103D5000002329001A002000FFF70EFDE989206BDF
-:103D600001F08BF8300002F047F903780100B82B1E
-:103D700000D10021200002230022E6F743FBE8895E
-:103D800004B070BD10B5C36A04005A7DFFF7C8FFC8
-:103D900001002000E5F73AFE10BD91429241002358
-:103DA00010B511401A00E6F72DFB10BDF0B5040068
-:103DB000056985B003936B1C03610E00006B29003D
-:103DC000170001F061F92000FFF7B2FC002F26D1A7
-:103DD0000321206B00F01BFF31002000E5F774FD8C
-:103DE0000321206B494200F012FF206B01F088F99B
-:103DF000206B0E21EAF776FF2900206B00F0C1FF4F
-:103E00000B9802F0FEF801002000E5F75DFDA38BA2
-:103E1000206B013BA38301F043F905B0F0BD0A9B81
-:103E20003A0000933100039B2000E6F799FCDCE7A1
-:103E3000F0B5060087B008000D0002F0DDF8039031
-:103E40000378FD221C00763414400CD1722103A8A3
-:103E500002F0EBF80300039A009429003000E6F723
-:103E60007FFC07B0F0BD892B1ED104A902F0CEF86B
-:103E70007221059005A802F0D8F8040002F0BCF801
-:103E8000049B984203D100942300059AE5E7059F1F
-:103E9000200002F0B1F823003A00019000942900BC
-:103EA0003000FFF783FFDCE700220190009213004F
-:103EB000F5E710B54B234A22E6F758FE10BD10B5C2
-:103EC00043234222E6F752FE10BDF8B50D00040070
-:103ED000110028001600FFF718FC0021002835D13A
-:103EE0002B78A62B34D1280002F08BF8050002F0C5
-:103EF00083F8027813005733DBB2012B15D802F098
-:103F000080F8070029002000E5F7DEFC20003200E1
-:103F10003900FFF7FCFC31003800246B02F060F838
-:103F2000411C200001F057F906E0C12A05D1BE3A34
-:103F300029002000FFF7FFFCF8BD29002000E5F76D
-:103F4000C3FC01002000E5F7BFFC0221206BE9E77C
-:103F500029002000E5F7B8FC0121F7E7F8B50D00CE
-:103F60000400110028001600FFF7CFFB071E06D043
-:103F700000231A0019002000FFF766FD18E0280052
-:103F800002F03FF8050002F037F8027813005733CB
-:103F9000DBB2012B05D802F034F83300020029000F
-:103FA000E9E7C12A05D1BB3A29002000FFF7C3FC8D
-:103FB000F8BD33002A003900DDE770B54D780231D5
-:103FC0000400E5F781FC2F2D04D10321206B01F0C3
-:103FD000C6F870BD206B0421302DF8D00521F6E71E
-:103FE00070B50D00040011002800FFF78EFB0021C2
-:103FF00000280ED12B78742B0FD1280002F001F885
-:1040000001002000E5F760FC01002000E5F75CFC02
-:104010000221206B01F0A1F970BD29002000E5F715
-:1040200053FC0121F5E7F0B5060087B00D00140040
-:10403000002906D101212160306800F0B2FE07B0EE
-:10404000F0BD00220B7801927E2B0CD1080001F00C
-:10405000D8FF050001F0D0FF2100FFF761FB002D24
-:10406000E8D0012301932B78002BE3D00A3B0F2BE0
-:104070000AD805A92800FFF753FB019B002B01D1AB
-:10408000059B23600599D7E7280002A901F0BEFF30
-:10409000019B0500002B02D12100FFF741FB012409
-:1040A0002F006442029B9F4223D1200003A901F00C
-:1040B00031FC2F000400029B9F4225D1039801F0A0
-:1040C00034FC0100306800F06CFE019B002BB6D080
-:1040D000280001F091FF0400029B9C42AFD005A98B
-:1040E0002000FFF71DFB05990400306800F0F0FE8A
-:1040F000F2E705A93800FFF713FB0700059801F068
-:1041000034FC01342418CDE7BD4202D22E232370A3
-:10411000013404A93800FFF703FB05A90700049840
-:1041200001F02DFC059A0100200004F032FE059BF1
-:10413000E418C0E737B504000D00006B002100F063
-:1041400054FE206B0E21EAF7CDFD2000290001AAC4
-:104150003030FFF768FF01992000E5F757FC37BDC5
-:1041600010B50278012A05D143780F3B58424341EC
-:10417000180010BD0023032AFAD101F011FF03003B
-:10418000581E8341F4E710B50278012A05D143781F
-:104190000D3B58424341180010BD0023032AFAD1B9
-:1041A00001F0FEFE43424341F5E7F0B5040085B05F
-:1041B00008000E0015000093FFF7E5FF002809D066
-:1041C000002D03D10099206B00F018FF300001F0A2
-:1041D00013FF4FE03000FFF7C3FF002802D0002D8F
-:1041E000F4D0EFE73378192B4ED903A9300001F052
-:1041F0000DFF33780700362B2ED1002D28D1012654
-:104200002369019301332361380001F0F5FE039B1C
-:1042100098420DD13900009B2A002000FFF7C5FF0E
-:1042200001990600206B00F0ACFD300005B0F0BD38
-:1042300032003900019B6A402000FFF7B6FF0700FB
-:10424000E2E73900009B2A002000FFF7AEFF0700DD
-:10425000039EB742F5D1E8E7372B02D1002DF7D006
-:10426000CDE7382B08D1012201006A40009B2000D5
-:10427000FFF79BFF0600D8E7442B05D1300001F083
-:1042800000FF0028ABD09BE731002000E5F71CFBC6
-:10429000009A06002900206B00F0BCFEC5E7F0B5CF
-:1042A00004000F00066987B00293B31C036131005C
-:1042B000006B751C039200F064FD2900206B00F078
-:1042C0000DFF002239002000E5F7B6FD380001F0AF
-:1042D00093FE01F091FE039B834221D102992000BD
-:1042E000E5F7F2FAE36A1978062912D1206B01F09A
-:1042F00042F8206B00F04BFE3100206B00F07EFE98
-:104300002900206B00F03DFD206B00F0F3FE07B0AC
-:10431000F0BD0C9B206B9A00053200F09AFFEBE792
-:104320000378C22B09D103A901F070FE330001000C
-:1043300000222000FFF739FFCDE705A901F066FE56
-:1043400001F05AFE070001F057FE01002000E5F7DA
-:10435000BBFA206B012100F0AEFE0C9B059A0133E5
-:1043600000933900029B2000FFF799FFC4E7F7B5DF
-:10437000040008000F0001F03FFE01F042FE256935
-:104380000022AB1C0100236120002B00FFF70DFF72
-:104390006E1C390001902000E5F796FA3100206B81
-:1043A00000F02CFE2900206B00F0EBFC0121206BBB
-:1043B000494200F02CFC01992000E5F785FA310014
-:1043C000206B00F0DEFCF7BDF0B589B00792038BDF
-:1043D00007690493438B7E1C0593C38B0783069365
-:1043E000BB1C0361838B4683C383040008000D005C
-:1043F00001F002FE029001F0FFFD03902800FFF79C
-:10440000C2FE00281ED123692800019301332361D5
-:10441000FFF7A6FE002803D13100206B00F0EEFD6F
-:104420000199206B00F0ADFC02992000E5F74CFAF1
-:104430003100206B00F0A5FC019B01222900200027
-:10444000FFF7B3FE049B079A2383059B6383069BB8
-:10445000E383039B934203D019002000E5F734FA6D
-:104460003900206B00F08DFC09B0F0BDF0B5040000
-:10447000256985B06B1C0800236103910092FFF74A
-:1044800082FE071E1FD0039801F0B6FD039001F0D5
-:10449000B3FD0390039B009A93420ED06C2103A8B6
-:1044A00001F0C3FD07000398B8423FD1009B9F4233
-:1044B00003D039002000E5F707FA2900206B00F04F
-:1044C00060FC05B0F0BD26690398731C2361FFF7FB
-:1044D00047FE33003A00019003992000FFF765FE84
-:1044E000010003902000E5F7EFF9019B070003901E
-:1044F000002BE2D10099FFF708F9002809D1206BC1
-:1045000000F080FB00280CD12900206B00F076FD24
-:1045100007E0380001F070FD0099FFF7F6F8002879
-:10452000EDD03100206B00F02CFCB3E701F069FD09
-:104530000390FFF728FE0190002807D0039801F0B0
-:104540005BFD039001F058FD0390ACE726690398EA
-:10455000731C2361FFF704FE33000290019A039954
-:104560002000FFF722FE010003902000E5F7ACF9E0
-:10457000029B0390002BA0D1206B00F043FB00288E
-:1045800003D12900206B00F039FD3100206B00F0D1
-:10459000F8FB88E7F0B589B003910B7804000D00B3
-:1045A000012B01D07B2B38D107950025612107A86D
-:1045B00001F03BFD002607000798B84238D1039868
-:1045C00001F01AFD220003900778303203000192B7
-:1045D0003100012F03D15B78206B312B35D0206B5C
-:1045E00000F003FC662103A801F01FFD0027039ED5
-:1045F0000290029B9E423CD33900206B00F0DEFD0E
-:10460000290004AA0198FFF70EFD039D029B9D421D
-:104610003FD3206B00F0BBFC29E00026782BCED1E5
-:10462000080001F0EEFC079001F0E6FC0500BDE794
-:104630000378012B07D143784A2B04D1013601F0CE
-:10464000DBFC0790B8E70336F9E700F0CEFB022168
-:10465000206B00F012FC3900206B00F0AFFD0198D8
-:1046600007AA2900FFF7DFFC206B00F0B3FB09B0BD
-:10467000F0BD300001F0C5FC07A9FFF751F807991C
-:10468000206B00F0FAFB300001F0B6FC01370600A9
-:10469000AFE705A9280001F0B9FC06A9FFF740F82B
-:1046A00006990500206B00F089FB059B0699AB423B
-:1046B00005D007A92800FFF733F805000799200067
-:1046C000E5F7A4F9A2E7F0B5062514001268CB00BF
-:1046D00006008BB00F0004301D43002A29D12900A9
-:1046E000E4F74AFA002802D0436823601FE005ABD4
-:1046F0001874079031681800059606970894E6F735
-:1047000045FF23680193002B11D1F22149008F420C
-:104710000DD002AA3000E8F7ABF9029B002B06D0BF
-:1047200002AA01990120049500F048F920600BB01D
-:10473000F0BD6668002E07D102222900E4F71CFABA
-:104740000028F4D00023D0E701222900E4F714FA6E
-:104750004660F7E737B51D000023009301330400DE
-:10476000080011001A00EDF7A7FD082001F0A1FDD7
-:104770002B68436004603EBD37B51C0000230093E6
-:1047800002330500080011001A00EDF795FD0C201A
-:1047900001F08FFD236862680560826043603EBD62
-:1047A00030B51400126887B0002A0CD101AB01901B
-:1047B0000291039201000132180004941A74E6F782
-:1047C000E5FE07B030BD806B0028FAD0CB00062193
-:1047D000656804301943002D06D10222E4F7CCF9B4
-:1047E0000028EED02560ECE70122E4F7C5F90028A7
-:1047F000E7D06368436000232360E2E7F0B58BB045
-:1048000003AD04000191170000210822280004F0E4
-:10481000DCFA2C2305A88360012600232168037499
-:104820004660C5600594E6F7B1FE039B3000042B9B
-:1048300007D12069DEF73AF83A00C36A0199206986
-:1048400098470BB0F0BDF0B589B001AE0400082266
-:104850000F003000002104F0B8FAF523002503A86A
-:104860005B004360C73BFF3B21688360C660057403
-:104870000394E6F78BFE019B1800AB4208D0042B93
-:1048800008D12069DEF712F83900436A2069984799
-:1048900009B0F0BD32002900280000F08FF8F7E7DA
-:1048A00010B5EE24002288B0640003AB01A9049483
-:1048B000CD3C03900691FF3C016818001A740192E8
-:1048C00002920594E6F762FE0198431E9841C0B239
-:1048D00008B010BD10B50C00DDF7E8FF2100E7F7C8
-:1048E0002BFA10BD70B50D000400DDF7DFFF2900C5
-:1048F000E7F7F2F9031E00D02369180070BDF7B581
-:10490000050001911600FEF7F8FE0700A023A22281
-:10491000DB05D2009C580123EC401C40019B9C42CB
-:1049200010D1FEF7EAFE0700A023A222DB05D20089
-:104930009B580122EB4013409C420BD0FEF7DDFE5A
-:10494000C01BFEBDFEF7D9FEC01BB042DED3022065
-:104950004042F6E7FEF7D1FEC01BB042E4D301208F
-:10496000F6E7102230B58DB0069200220392029233
-:1049700001920A320B000500009206A907AA08ACB2
-:1049800005A80594E7F7B0FD0100280002F081F9C1
-:104990000598A04201D001F0BBFC0DB030BD002352
-:1049A00010B51A001900E7F7EBFF10BD07B500229C
-:1049B000019101AB0121E7F7E3FF0EBD10B5140033
-:1049C0005268531E9A4193001018E31A0A000833E4
-:1049D00001002068E7F7D4FF10BD07B56A46E8F785
-:1049E00079F801990098002900D10EBDDEF7CAFBC5
-:1049F000FBE7F8B5FEF71AFD00F053FF00250600AF
-:104A00007368AB4200D8F8BDB368EF00DC59002CE6
-:104A10000ED0042C0CD0E408200000F0ABFF03788B
-:104A20005F2B05D0B3682000DF197968E7F706FF30
-:104A30000135E5E710B5002903D1FEF7E6FBE7F7FE
-:104A40004DFEFEF7EFFBFAE701204042704770B5DC
-:104A50000D000400E9F7A6FE29002000F4F76CF829
-:104A6000E9F790FE70BD10B50400E9F79BFE200049
-:104A7000F4F744F8E9F786FE10BD802203005205E2
-:104A800010690138184043425841C0B2704773B5AD
-:104A900014006A46551D0B007F2629002200013DA7
-:104AA00032402A70E409F9D18026491B984701ABAE
-:104AB000591B76428C4204D16A4612795D1B4255DD
-:104AC00073BD2A5D324302550134F3E70300006AE7
-:104AD0005A790918032A02D81800196270471A6B0C
-:104AE00019621018FAE710B50C000121FFF7EEFF6C
-:104AF000047010BD0300806A5A790918032A02D88D
-:104B00001800996270475A6A996280181A6B1018D7
-:104B1000F8E710B50C000121FFF7ECFF047010BDA1
-:104B200010B52821E9F7DAFF10BD10B52921E9F702
-:104B3000D5FF10BD70B504001500FFF7EAFF032292
-:104B4000A36A042103339343A3622000FFF7D2FF3B
-:104B5000056070BD70B543790D000024032B06D9A4
-:104B6000836A033CE41AC3699200D358E418032112
-:104B7000FFF7C0FF4470240A0570847070BD10B543
-:104B8000382001F0A8FB10BD10B504008161880039
-:104B900001F08FFBE06110BD10B50400C06901F0A9
-:104BA000B7FB200001F0B4FB10BD13B5437904003E
-:104BB000012B18D00021FFF796FF6379032B13D147
-:104BC000226AD01C9843A36A20626062E362C01824
-:104BD00001F081FBE3682063D88A1B8BC01880003A
-:104BE00001F079FB606313BD042BFCD1E068636ABC
-:104BF000E26A216B9A18037D00930069636BDFF70B
-:104C000023FAF0E78079431E9841C0B27047437998
-:104C1000012B09D08368C918C3688160DA8B91427F
-:104C200000DDD98300238371704770B50121140022
-:104C30000500FFF7ECFF0F2C06D821005039C9B250
-:104C40002800FFF766FF70BD220019212800E9F750
-:104C500045FFF8E770B5150004000121FFF7D7FF05
-:104C60002A001A212000E9F739FF70BD70B50D0048
-:104C700004000121FFF7CBFF2A001B212000E9F7E8
-:104C80002DFF70BD70B50D0004000121FFF7BFFFBF
-:104C90002A001C212000E9F721FF70BD012170B519
-:104CA000494214000500FFF7B2FF0F2C06D821007F
-:104CB0004039C9B22800FFF72CFF70BD2200222125
-:104CC0002800E9F70BFFF8E7012170B51500040093
-:104CD0004942FFF79CFF2A0023212000E9F7FEFE4E
-:104CE00070BD70B50D00012104004942FFF78FFF30
-:104CF0002A0024212000E9F7F1FE70BD70B50D00F7
-:104D0000012104004942FFF782FF2A0025212000EB
-:104D1000E9F7E4FE70BD70B50D0004000021FFF757
-:104D200076FF2A002A212000E9F7D8FE70BD70B571
-:104D30000D0004000021FFF76AFF2A002B2120004C
-:104D4000E9F7CCFE70BD70B505000498C91A44009F
-:104D500000021843059B091B0600D4B2002B0AD0A1
-:104D600002392800FFF753FF32000134E1B2280076
-:104D7000E9F7B4FE70BD2800FFF749FF32002100BB
-:104D8000F5E770B504000D000021FFF740FF6379DF
-:104D9000012B05D0032B03D8A26AE369AD00EA50CA
-:104DA00070BD70B50D00012104004942FFF72FFFCF
-:104DB0002A0068212000E9F791FE70BD70B50D0052
-:104DC00004000121FFF723FF2A0069212000E9F7F1
-:104DD00085FE70BD012110B504004942FFF717FFA1
-:104DE0006A212000FFF795FE10BDF7B50C000121E8
-:104DF0000500FFF70CFF230010333F2B06D82100DE
-:104E00008039C9B22800FFF784FEF7BD14212800BD
-:104E1000FFF77FFE6B46053319007F20E2B21700D3
-:104E20005E1E0740E4113770671C012F18D8402719
-:104E30003A40013416D1002A02D1023B18701E00FC
-:104E40002800891B8025FFF755FE002201AB9C1B23
-:104E50006D42A2420CD16A4612799B1BC254D4E720
-:104E60003300DBE7002AEBD00022023B1A70E6E7B2
-:104E7000B15C294381540132EBE770B50D000400A9
-:104E80000121FFF7C4FE2A0016212000E9F726FEC3
-:104E900070BD70B504000D000121FFF7B8FE2000C1
-:104EA0001721FFF736FE0322A36A0421033393433D
-:104EB000A3622000FFF71EFE056070BD10B5040060
-:104EC0000121FFF7A4FE18212000FFF722FE10BDEC
-:104ED00070B50D0004000021FFF799FE2A001D2186
-:104EE0002000E9F7FBFD70BD70B50E000121140034
-:104EF0005300C91A0500FFF78AFE21004C1EA1418C
-:104F0000320028001E31E9F7E9FD70BD10B504003C
-:104F10000121FFF77CFE20212000FFF7FAFD10BDE4
-:104F2000012110B504004942FFF771FE2121200044
-:104F3000FFF7EFFD10BD70B50D00022104004942DE
-:104F4000FFF765FE2A0026212000E9F7C7FD70BDA6
-:104F5000032110B504004942FFF759FE2721200024
-:104F6000FFF7D7FD10BD10B504000121FFF74FFE7C
-:104F700030212000FFF7CDFD10BD10B50400022147
-:104F8000FFF745FE31212000FFF7C3FD10BD0121D1
-:104F900010B504004942FFF73AFE32212000FFF726
-:104FA000B8FD10BD10B504000021FFF730FE33211D
-:104FB0002000FFF7AEFD10BD70B504000D00FFF737
-:104FC0007DFF2000FFF7EEFF29002000FFF7B3FF71
-:104FD00070BD10B504000021FFF719FE3421200038
-:104FE000FFF797FD10BD10B50400FFF767FF200025
-:104FF000FFF7EFFF2000FFF7ABFF10BD70B50D000E
-:1050000004000021FFF703FE2A0035212000E9F704
-:1050100073FD70BD70B50E000121150049420400FA
-:10502000FFF7F5FD2A003621002E00D137212000A0
-:10503000E9F762FD70BD70B50E000121150049420F
-:105040000400FFF7E4FD2A003821002E00D13921A9
-:105050002000E9F751FD70BD70B50D00040002217C
-:10506000FFF7D5FD2A003D212000FFF773FD70BD3D
-:1050700070B50D0004000021FFF7C9FD2A003F2193
-:105080002000FFF767FD70BD70B50D000400002122
-:10509000FFF7BDFD2A0040212000FFF75BFD70BD3A
-:1050A000012110B504004942FFF7B1FD4121200064
-:1050B000FFF72FFD10BD70B50D002B005A1E934158
-:1050C00003215B4219400400FFF7A1FD4721002D99
-:1050D00000D105392000FFF71CFD70BD70B50D0033
-:1050E00004000121FFF793FD2A0043212000FFF770
-:1050F00031FD70BD042110B54942FFF788FD10BD98
-:1051000010B504000021FFF782FD44212000FFF7C5
-:1051100000FD10BD70B504000D00FFF7F1FF200089
-:105120000E21E9F7DFFD29002000FFF72AFE20000D
-:105130000221FFF76CFD20003E21FFF7EAFC04216D
-:1051400020004942FFF763FD70BD10B50400002147
-:10515000FFF75DFD45212000FFF7DBFC10BD70B5BA
-:105160000C0000210500FFF752FD21003039280016
-:10517000C9B2FFF7CEFC70BD70B505000C00222946
-:1051800019D00026232901D10136033C0121280032
-:105190004942293CFFF73BFDE1B22800FFF7B9FC8B
-:1051A000002E07D000212800FFF731FDD62128006E
-:1051B000FFF7AFFC70BD01261F24E7E770B50D00B7
-:1051C00001210400491BFFF722FD2A005021200085
-:1051D000E9F784FC70BD70B50D0001210400491B86
-:1051E000FFF715FD2A0051212000E9F777FC70BD7B
-:1051F00070B50D0004000121FFF709FD2A005321BD
-:105200002000E9F76BFC70BD022110B50400494293
-:10521000FFF7FDFC54212000FFF77BFC10BD70B5AB
-:105220000D0001210400491BFFF7F1FC2A00562163
-:105230002000E9F753FC70BD70B50D00012104009A
-:10524000491BFFF7E4FC2A0058212000E9F746FC3F
-:1052500070BDF8B50500170003290FD0042910D040
-:10526000002402262800E143FFF7D1FCE219920056
-:10527000324328005721E9F731FCF8BD002426000D
-:10528000F0E70124FBE770B50D0004000139FFF7DA
-:10529000BEFC2A0059212000E9F720FC70BD70B542
-:1052A000140005000E008918FFF7B1FC22023243FA
-:1052B00028005A21E9F712FC70BD70B51A430D00A1
-:1052C00004000121002A07D1FFF7A1FC60212A690F
-:1052D0002000FFF72FFC70BD4942FFF798FC2A69B8
-:1052E0006121F5E770B50E0004990400D5B20B43B7
-:1052F0000DD10121891AFFF78AFC62213269200051
-:10530000FFF718FC29002000FFF703FC70BDD14314
-:10531000FFF77DFC32696321F1E707B50193009245
-:105320000B0064220021FFF70EFD07BD13B5012419
-:10533000019300920B0066226142FFF704FD13BD4A
-:10534000012110B549420400FFF761FC01235B21F4
-:10535000A3712000FFF7DDFB10BD70B505000C0048
-:105360004942FFF754FC28000221FFF7C3FB5C23EE
-:105370004470037070BD10B504000021FFF747FCB6
-:105380000423E2682000117D0B4313755D21FFF7B4
-:10539000C0FB10BD012110B504004942FFF737FCE6
-:1053A0000423E2682000117D0B4313755E21FFF793
-:1053B000B0FB10BD10B50421FFF729FC10BD03217F
-:1053C00010B54942FFF723FC10BD10B5EBF7BEFA4C
-:1053D00043000120184310BDF0B585B003900800CC
-:1053E0000D0001F04BF80524042803DC280001F02F
-:1053F00045F80400280001F04FF80527042803DCD5
-:10540000280001F049F80700039B01930023029351
-:105410000093009BA34212DBE343DB171C400523F0
-:105420006343039A0433D3180022042C2BDC1A7034
-:105430005A709A70DA701A7101340533F5E7002654
-:10544000BE420ADBFB430021DB173B40052B13D098
-:10545000019AD21811710133F8E73200009928003F
-:1054600000F0FEFF019B029A9B19187101238340F3
-:105470001A4302920136E3E7009B01330093019B3C
-:1054800005330193C5E7039B029A1A8405B0F0BD6A
-:1054900073B5060008000D00002403F0EAFC2300A9
-:1054A0000100220028000094EDF7AEFB012301006B
-:1054B0000093300023009622E9F7D0FF73BD70B54A
-:1054C000040008001600DDF7D9FA05003000DDF70A
-:1054D000D5FA290002002000EAF710F94300012064
-:1054E000184370BDA02104230320C9051A00C1324E
-:1054F000FF32920001335050112BF7D170478020BA
-:1055000010B5C005F0F7AAFDFE23FE2140029B0561
-:10551000400A18438905F5F797FB10BD70B50D00DB
-:10552000DDF7ACFA04002800DDF7A8FA844202DDBA
-:105530000020E7F74BFF001B0130F0F78FFD00194B
-:1055400000F0BEF870BDF8B5070008680C00DDF784
-:1055500095FA0600012F09D1002804DDF0F77EFD41
-:1055600000F0AEF8F8BD0020E7F730FF6068DDF727
-:1055700085FA851B022F06D18642F4DA2800F0F75F
-:105580006DFD8019ECE7A068DDF778FA041E0ADDEE
-:10559000281801382100F4F755FC0028E3DDF0F766
-:1055A0005DFD6043EDE70028DDD028180130F1E70C
-:1055B00010B5DDF763FA04001E2801DC002802D1D3
-:1055C0000020E7F703FF8020C005F0F747FD202209
-:1055D0000123121B5B42D340184000F08CF810BD31
-:1055E0004068704741607047F0B51C0087B00EAB53
-:1055F0001B780F0005930FAB1B7804920393A368ED
-:1056000006000D9A18010C99039BE6F751FF3B68C1
-:105610000500834203D200F04CFE30603D603568E7
-:10562000039B201D00930195059B0D9A0C99FCF797
-:10563000EAFD049B1860280007B0F0BDF8B50E0025
-:1056400017000500EAF700F904003B0032002900CA
-:105650000430FCF722FA2000F8BDF8B50F00150061
-:105660001E0004000021180003F0AFFB33002A00E5
-:105670003900201DFCF762FDF8BD01220300104037
-:1056800005D013410AD41800431E98417047996809
-:105690000029FBD01B7910001342F7D001204042B3
-:1056A000F4E7D3B50F000600EAF7CEF801230400B3
-:1056B000009332003B000430FCF712F92000D6BD05
-:1056C00043001A0010B5424002D40120184310BD17
-:1056D000C117FFF7E6FFFAE7D3B50F000600EAF7B8
-:1056E000B3F800230400009332003B000430FCF7C1
-:1056F000F7F82000D6BD10B5830F03D14000013369
-:10570000184310BD0021FFF7E7FFFAE7F0B585B0B9
-:1057100004000E0017000393EAF796F8039B0500B8
-:10572000009332003B0021680430FCF764F92368E1
-:1057300018182060280005B0F0BD10B5C30701D5CA
-:10574000401010BD0430FCF7E5FCFAE710B504305A
-:10575000FCF73BFD10BD10B50122EAF755FA10BD6C
-:1057600010B50222EAF750FA10BD10B50022EAF790
-:105770004BFA10BD0B6870B58668DC00B34201D3EC
-:10578000002208E0C268013312191568002D04D008
-:10579000042D02D00B60100070BD0834EEE701004C
-:1057A00010B50C318068FFF7E5FF002800D00068D5
-:1057B00010BD1FB5010004000C318068FFF7DAFF4F
-:1057C00000280DD02279012A0CD0022A0CD00268C0
-:1057D00002A902924368022001930393E0F74AFF73
-:1057E00004B010BD0068FBE74068F9E710B50C7A1B
-:1057F0000023012C05D11F2803D14968EAF7FAFAE2
-:105800000300180010BD70B50500102000F051FD18
-:1058100004002900EAF7D4FB200070BD70B5050034
-:105820008068FFF7F0FF2B68416803606B68040035
-:10583000DA0807230B400121D200134343602A7981
-:10584000D207D30F02798A431A4302239A43027183
-:105850002B79D2B29B080B4003318A439B00134340
-:105860000371AB68E968DA00C06803F092FA2000BF
-:1058700070BD4068C008704770B515000400012273
-:105880000430E3F779F94560200070BD022213B5BA
-:1058900004000090019110006946EAF7B5F9200074
-:1058A00016BD04307047012803D1CB885B00184334
-:1058B00070470020FCE770B500221E2B02D91A00A9
-:1058C0001E3AD2B2E2258418ED0064192478551CE2
-:1058D000EDB27F2C12D0E22664188518F600E4B2EF
-:1058E000AD192C700132D2B2934209D0E22685184C
-:1058F000F600AD192D78FF2DF4D0ECE72A00E1E792
-:1059000070BD10B5040003F0B4FA01002000EBF7FD
-:10591000D3F810BD70B5050003300C0000F0C9FCD1
-:10592000206045702068023070BDF8B54578871C4E
-:10593000040029003800EBF78DF8061E0CD1290071
-:105940003800EBF769F865192070AE702000EBF7AE
-:1059500037F806003000F8BD200000F0D9FCF9E768
-:1059600010B5EBF71BF8007810BD10B5EBF716F883
-:10597000407810BD10B5EBF711F8023010BD10B52E
-:105980000C00EBF70BF843780230236010BDF0B544
-:105990000400170082680D00561821008BB0039395
-:1059A0007B00F0185B190C319B00029101930528D4
-:1059B00014D895002A0005A803F0EBF905AB581997
-:1059C000019A039903F0E5F9606805AB3A003100EC
-:1059D000E6F7D6FF040020000BB0F0BD800000F019
-:1059E00068FC0600A36802999A0003F0D2F9A36844
-:1059F000019A98000399301803F0CBF9A3683A0094
-:105A0000E91860683300E6F7BBFF0400300000F0DF
-:105A10007FFCE0E702690123272A21D0222A1FD038
-:105A2000752A04D011000F339943622912D14169BC
-:105A30000123272914D0222912D0722A0AD1002347
-:105A400062290DD180690123272809D022384342D9
-:105A5000434105E00023622A02D14269722AF1D053
-:105A600018007047026910B504000A2A22D1C369E0
-:105A70000133C36101232362636960682361A36901
-:105A80006361A36898476369A0610D2B07D1033B4D
-:105A90006361984203D16068A3689847A061A369D5
-:105AA000013306D163695A1C03D00A2B01D00A23A3
-:105AB000A36110BD036A092A02D10733023A934356
-:105AC0000133D8E7F8B504000E000025012720694E
-:105AD000431C01D12800F8BD0A2809D1002E02D0AC
-:105AE000A36A002BF6D02000FFF7BCFF3D00EEE7D5
-:105AF000E2F7A6FD002803D02000FFF7B3FFE6E79A
-:105B00002369232B08D12000FFF7ACFF23695A1C1F
-:105B1000DDD00A2BF7D1DAE75C2BDBD163690A2BE6
-:105B2000D8D12000FFF79EFFE6E77FB5060054209E
-:105B300001910292039300F0BCFB030001AD40C34E
-:105B4000040007CD07C3022200250123524222622E
-:105B50000C32E262E36123636562A562142000F007
-:105B6000A8FB606320002021443001F0CCFA636B75
-:105B700020001D80A56165612561FFF773FF20008E
-:105B8000FFF770FF2000FFF76DFF2000EBF7B4FA7E
-:105B9000E36B012B03D02300052240331A70200051
-:105BA00004B070BD1FB5040001A8E2F731FD0199F2
-:105BB000029A039B2000FFF7B8FF04B010BD10B598
-:105BC000041E0CD0E368406898472000443001F080
-:105BD000BCFA606B00F09CFB200000F099FB10BD4C
-:105BE00010B50022EBF7CAFD002801D1EBF76EFDDE
-:105BF00010BD4A43F8B507001E0014000025B54249
-:105C000000D1F8BD22003900069803F0C2F8069BC7
-:105C100001351B190693F2E7F7B50F000021536811
-:105C2000080014680193966800F01AFF0500002E22
-:105C300011DA019B9C4201DA2800FEBDA300F9584D
-:105C40002800EEF7C9FAA419F3E7A300F9582800D1
-:105C5000EEF7C2FAA419019B9C42F6DBECE770B5A3
-:105C6000049E040015001B2813D10022B5420ED15A
-:105C70001A000B0011003200AE4200D92A001800B1
-:105C800003F078F81B2C10D144426041C2B21000DE
-:105C900070BD192805D01C2805D032002E00150033
-:105CA000E6E71A24E7E71D24E5E700229042EEDB51
-:105CB00001320028EBD1AE4202D0AE424041E5E7CE
-:105CC0001A3C601E8441E2B2E1E7F8B51700040017
-:105CD000002589004618B44203D101206D002843F5
-:105CE000F8BD390001CCDCF777FE431E98412D1832
-:105CF000F1E710B57F2440181440431E1C70802427
-:105D0000091A64425818002800DC10BD2000D2098E
-:105D1000013B10431870F5E730B5010003687F259B
-:105D200000201A78C001140052B22C402018013310
-:105D3000002AF6DB0B6030BD13B5421C01920278DD
-:105D40000C000300082A11D81000F3F7DDFF07113B
-:105D50000F0509090F0F0B0005330193019816BDBC
-:105D60000333FAE701A8FFF7D7FFF7E7192A01D8AD
-:105D70000233F2E701A8FFF7CFFF01A8FFF7CCFF3E
-:105D8000002CEBD0019B18180190E7E770B50400D8
-:105D9000160008000021A3694D1CDB091BD102314C
-:105DA00001F0F1F90823037029000130A269FFF71F
-:105DB000A0FF6569A369AB4206D30835A900E06975
-:105DC00000F095FA6561E061A369E269591C9B00E6
-:105DD000A1619E5070BD2900DEE710B50C000221C4
-:105DE00001F0D1F9230A0A330370447010BDF8B5ED
-:105DF0001E00037804000D001700002B0DD1416830
-:105E000083688B420ED31831C9000122C06800F0AC
-:105E10007BFA002802D101232370F8BD6368E0609B
-:105E200018336360A268E368511CD2009B18A1601C
-:105E300019682D022A0A0D0E2D0615431D603A78A9
-:105E40009E80DA70069ADA80E7E710B50C0005212B
-:105E500001F099F903230370431C05301C700133D2
-:105E600024128342FAD110BDF0B5046A89B0230030
-:105E7000403303931D7807000E00072D0BD1A16C52
-:105E8000E06CEAF719FE01003000FFF7A6FF2000E2
-:105E9000EBF732F94DE0082D0DD100222300A16C63
-:105EA000E06CDCF75BFB0200C3070ED5411030004D
-:105EB000FFF7CBFFEBE7092D0CD100940122002363
-:105EC000A16CE06CDCF7C6FB020031003800FFF784
-:105ED0005DFFDCE72B000A3B012B40D8A16C04A836
-:105EE00001F011F9A26CE16C04A801F0F0F82000B7
-:105EF000EBF702F9039B1B789D42F3D00A3B00208D
-:105F0000012B17D9059906980A2915D8EAF7D4FD67
-:105F1000041E14D00A3D0321300001F034F96B1E39
-:105F20009D4144700435240A0570847004A801F072
-:105F30000CF9012009B0F0BDEAF78CFDE8E70698FE
-:105F400005990A2D08D12200DBF702F80200310082
-:105F50003800FFF71BFFE9E7DBF712F8F6E702214D
-:105F6000300001F010F90123457003708FE713B57D
-:105F70000130019001A80C00FFF7CEFE20600198CF
-:105F800016BD002310B50B60C2185278DC00A24089
-:105F90000C68013322430A60042BF5D1053010BD93
-:105FA00007B501A9FFF7EDFF01980EBD37B5150044
-:105FB00002780C00032A07D1FFF7F2FF012340000B
-:105FC0001843206018003EBD0023082AFAD101A919
-:105FD000FFF7CDFF019B9B005B5923600123F1E795
-:105FE00070B50D000024A84201D3200070BD01212E
-:105FF0000134FFF7A1FEF6E710B50121FFF79CFE83
-:1060000010BD10B50021FFF797FE10BD13B501308C
-:10601000019001A80C00FFF77FFE01A8FFF77CFEAE
-:10602000019B18182060180016BD13B50400006805
-:106030000378002B02D10130206016BD192B03D844
-:106040000121FFF779FEF8E71A318B42F8D101A957
-:10605000FFF7DCFF20600198EFE737B51C00431C19
-:106060000193037801A81A3B0B601500FFF754FE5B
-:10607000286001A8FFF750FE019B18182060180047
-:106080003EBD07B501A9FFF7C1FF019B181A4342A6
-:106090005841C0B20EBD10B58068002800D110BDB7
-:1060A000446800F035F92000F7E7136870B5002B5D
-:1060B0000DD14568AC1CA40024589D4207D09E0019
-:1060C000A659B14204D102339B001B58136070BD26
-:1060D0000133F2E74B6810B502339B000A005958B0
-:1060E000EBF7D2FF10BD8168030010B5081E08D081
-:1060F0000122013999604900114358680332DCF7E5
-:1061000045FE10BD7FB51D0000240123060000944C
-:10611000080011001A00ECF7CFF8F82102AAFF31AD
-:106120002868E6F7A5FC029BA34208D021002000C6
-:1061300002AAFEF743FC0400200004B070BD0C204E
-:1061400000F0B7F806602B68040043602868DCF7AD
-:1061500007FEDCF793FCA060EEE7802307B55B0544
-:106160001A6E082100925B6E68460193DAF708FF09
-:106170000EBD10B5EFF3108072B6FFF7A1FA10BD97
-:1061800010B504000161880000F093F8606110BD53
-:1061900010B50400002902D0C06800F0B9F86069A9
-:1061A00000F0B6F810BD70B504000D0001290AD149
-:1061B0000121036949429A00406902F006FE00236A
-:1061C0002560636070BD0229F9D1406800F071F864
-:1061D0006368E060A360F2E710B5046842680023DA
-:1061E000022C01D1C3689B1889184160180010BDAA
-:1061F0000368012B03DC426843698900CA50704779
-:1062000042684B1E9B18494219404160704770B567
-:106210000C001500FFF7E0FF0419002803D170BD42
-:1062200005702D0A0130A042FAD1F8E770B50D00D3
-:106230000400DCF73BFB2900036A04222000984796
-:1062400070BD70B50D0016000400DCF72FFB3200A6
-:10625000036A29002000984770BD70B50D00040046
-:10626000DCF724FB2900036A00222000984770BD58
-:1062700070B50D000400DCF719FB2A0083692100CA
-:106280001F20984770BD00B589B001A8E7F75AFEF6
-:106290000120039B5B00184309B000BD00B589B025
-:1062A00001A8E7F74FFE0120029B5B00184309B0ED
-:1062B00000BD10B500210400E7F7AEFE002804D1B0
-:1062C000002C02D02000E7F76BF810BD10B50021BC
-:1062D000E7F7A2FE10BD10B50400FFF7EAFF0028A3
-:1062E00004D1002C02D02000E7F75AF810BD10B5F9
-:1062F00001220C00E7F790FF002804D1002C02D007
-:106300002000E7F74DF810BD10B5E7F785FF10BD89
-:1063100010B5E7F71BFF10BD04230122591A030033
-:106320008A40411D1878104003D101338B42F9D1C6
-:1063300070470120FCE710B5012803D14868DCF75D
-:106340000FFD10BD0020FCE710B504210400FFF78D
-:10635000E3FF03000420002B06D103212000FFF7F8
-:10636000DBFF431E9841023010BD002210B50369C7
-:10637000027642690400C36093420ED21878A37E6D
-:106380002077002B02D00523637605E0ECF776F842
-:10639000FFF7DAFF0130607610BD202303771B3B47
-:1063A000F2E705235A435118182903D10079000751
-:1063B000C00F70470722CB08C01840791140084130
-:1063C00001231840F5E783795A43511804224B08FA
-:1063D000C018C0798900114008410F231840704748
-:1063E00010B584796243511804228C002240F024B5
-:1063F0001441934049084118C87904402343CB71A4
-:1064000010BDF7B506000C001F000192BC420DDA6A
-:10641000019D089B9D4207DA2A00002321003000DD
-:10642000FFF7DEFF0135F4E70134EFE7F7BD0B01BD
-:10643000194382794379534301335B10C31898425F
-:1064400002D0C1710130FAE7704710B58379427903
-:1064500000215A4301325210073002F0B6FC10BD41
-:1064600010B50379DB0706D5FFF79BFF0300092072
-:106470005843C0B210BDFFF7A6FFFBE70279052322
-:10648000D20700D483791800704710B5FFF7F6FFE4
-:1064900043000120184310BD02790523D20700D420
-:1064A000437918007047F0B593B00493189B03929A
-:1064B000DC43199AE41723400593D343DB171A40B2
-:1064C0001A9B0D905E42039B029109929E4200DA54
-:1064D0001E00F343DB171E40029B0D989C79039B23
-:1064E000E7181A9BFF1AFFF7C9FF039B059A9D182F
-:1064F000BD4200DD3D000695854200DD0690029B11
-:106500000D985D79FFF7C8FF1A9B1A9ADB43DB17DA
-:106510001A401B9B0A92DB431B9ADB171A400B9213
-:106520001A9A059B944663440793A34200DD07949F
-:10653000099A1B9B944663440893AB4200DD08957F
-:10654000069B9E421ADA1B9B5C42049B9C4200DA2B
-:106550001C00E343049ADB1794461C40049B1B9ADF
-:10656000ED18099BAD1A63449D4200DD1D000595A1
-:10657000854200DD0590059B9C4209DB089B0B9A38
-:1065800000930A99079B0298FFF73BFF13B0F0BDF9
-:10659000039B1A9A93422FDC069B5D1E731E0E937B
-:1065A00001235B4209931B9A049B934229DC059BC0
-:1065B000013B0F93631E109301235B4211931A9BBF
-:1065C000039AEB189B1A0C930E9BAB4225D00F9F9E
-:1065D000109BBB421AD03A0029000D98FFF740FFEC
-:1065E00004991B9A0300521AD2190C990298FFF7CA
-:1065F000F7FE119BFF18EBE7069B35000E93012376
-:10660000D0E7059B0F9410930123D7E7099A099BC4
-:106610009446ED180C9B6344D5E71A9B039A0A999C
-:106620009D1A1B9B049AAE199F1A069B3C19ED18E4
-:10663000059B0B9AFF18029833000097FFF7E1FEC5
-:10664000089B3A0000930A992B000298FFF7D9FEA5
-:10665000089B220000932900079B0298FFF7D1FEB8
-:106660000094079B0B9A31008DE7F0B50B6887B05B
-:1066700048680D000493DCF701FA0590A868DCF780
-:10668000FDF90700E868DCF7F9F904002869DCF790
-:10669000F5F9E343C543DB17ED171C40054029001E
-:1066A0002000EBF705FF002306000393029301008F
-:1066B0000195049800943B00059AFFF7F4FE300022
-:1066C00007B0F0BD10B5FFF7E7FE43000120184307
-:1066D00010BDF7B50600FFF7D1FE00903000FFF7C0
-:1066E000DBFE010007000098EBF7E2FE00240190BA
-:1066F000BC4212DA0025009B9D420CDA29002200E0
-:106700003000FFF7ADFE2900030022000198FFF7DB
-:1067100067FE0135EFE70134EAE70198FEBD10B5E9
-:10672000FFF7D7FF10BDF7B50600FFF7A7FE0090F3
-:106730003000FFF7B1FE019001000098EBF7B8FEC2
-:1067400000240700019B9C4213DA0025009B9D4218
-:106750000DDA290022003000FFF782FE092329000C
-:106760001B1A22003800FFF73BFE0135EEE701342B
-:10677000E8E73800FEBD10B5FFF7D5FF10BDF0B556
-:1067800085B0170004000E00FFF778FE0100EBF75C
-:106790008FFE05002000FFF771FE00230190039398
-:1067A000029300903B00200032002900FFF77BFE9F
-:1067B000280005B0F0BD10B504000800DCF75EF954
-:1067C000002201002000FFF7DAFF10BD10B5040021
-:1067D0000800DCF753F9002241422000FFF7CFFF09
-:1067E00010BD10B504000800DCF748F900210200D4
-:1067F0002000FFF7C4FF10BD10B504000800DCF74F
-:106800003DF9002142422000FFF7B9FF10BDF7B566
-:1068100007000800EBF732FE0424060004230025DD
-:106820001B1B0193735D0122234113400832534324
-:1068300001992A0038000135FFF7D2FD052DF1D16D
-:10684000013CEBD2F7BD13B5040001A94068DAF7AB
-:10685000D7FFA268019900238A4207D2815CE068D1
-:10686000FFF7D5FFA3680133A360E368180016BDE6
-:1068700073B504000E000020042A0FD101A960683E
-:10688000DAF7BEFF00230500320001992068DCF72B
-:10689000CDF9295CA068FFF7BAFFA06876BD052195
-:1068A00070B505000800EBF703FE04002900FFF7B0
-:1068B000AEFF200070BD10B5140008001100E2F713
-:1068C00049FF200010BD046045608660C7604146F6
-:1068D000016149464161514681615946C161614644
-:1068E00001626946416268467047816810B5C368B5
-:1068F0008C6802000020A34204D2C96898000133CA
-:106900004058D36010BDF0B585B001900E000092E4
-:106910000293EAF735F8019BB34201D305B0F0BD0D
-:10692000019B3768043B0393009B002B04D0390084
-:106930001800FEF73BF807003500039B1C1DA5421D
-:106940000AD9009B2168002B1AD13A001920E6F7DA
-:1069500045FD029B984211D0043DAC421BD2009BE6
-:10696000002B12D12A6839001920E6F737FD029B67
-:106970009842F1D023682A6822602B600394DCE7F8
-:106980000098FEF713F80100DFE729680098FEF78A
-:106990000DF80200E7E723683268039F2260336046
-:1069A000341B019BA410EB1A013C08379B10A34237
-:1069B00009DA2900029B009A0198FFF7A4FF35002D
-:1069C0002E000197A7E73800029B009A3100FFF7DD
-:1069D0009AFF019FF4E710B50C6802000B00E06815
-:1069E000A168EBF709F810BD70B50400080000219C
-:1069F000E6F7BCF805002800E6F71AF901002000C8
-:106A0000002900D170BDEDF7E7FBF4E710B50A00EF
-:106A10008168C068FFF759F910BD70B505001020F6
-:106A2000FFF747FC04002900EDF710FD200070BDC2
-:106A300073B50D00002411001E00009401232200F4
-:106A40002800EBF739FCA54203D12800FFF7E5FF4A
-:106A500076BD2000FFF7E1FF3168FFF7C5FFF7E7DC
-:106A600070B50D000400FFF7D8FF002D03D0002300
-:106A7000A400A34200D170BDE958C268D1500433CC
-:106A8000F7E710B5C1688068FFF7EAFF10BD8368BB
-:106A90000B60C368136070478160704770B5002356
-:106AA000150004000A0081680068DCF7BFF8E3689D
-:106AB0008000C55070BDF7B51C000125002A02D129
-:106AC000431EE418023D00220023002906D00023C3
-:106AD0000027E356DE0F00237242BB4100210DE088
-:106AE000160E00961E020196267817023E433200CB
-:106AF000009F019E64193E43330001318142EFD172
-:106B00001000190003B0F0BD13B514000193130079
-:106B100001AA002908D1020001A9200002F039F9D8
-:106B200013BD815C197001330138FAD2F8E770B5F2
-:106B30000C00512826D010D8482820D004D801288D
-:106B400014D0422812D070BD4C2803D0502801D058
-:106B50004928F8D192001351F5E768280FD007D8DB
-:106B600064281BD0662813D06228ECD1A354EAE72E
-:106B70006C28EFD0712805D06928E4D1EAE75200EB
-:106B80001353E0E7D200A2181360DB175360DAE773
-:106B900018009500F4F752FA2851D4E7D2001800F3
-:106BA0008C18F5F7EBFF20606160CCE710B50B792E
-:106BB00001215B001943E6F711FC10BD10B500235D
-:106BC000012806D00B7901215B001943E5F766FE29
-:106BD0000300180010BD026813783E2B05D83C2B2B
-:106BE00005D2212B07D0402303E0402BFBD10132FB
-:106BF0000260180070473E23F9E7F7B50500066804
-:106C0000741C20780194E1F733FDA71B03000134C5
-:106C10000028F6D1390028680A22DBF79FFC019B87
-:106C200040102B60FEBD73B5DAF7D4FD00906846C6
-:106C3000FFF7D1FF00240600009B1878002803D13D
-:106C400064000130204376BDE1F712FD01250028E4
-:106C500003D06846FFF7D1FF0500009B1978732920
-:106C600004D16419009B01330093E5E701AA3000C9
-:106C7000EDF74CFD019B5A1E5B42013DF2D3141906
-:106C80001C400419F9E710B508001100E2F770FD87
-:106C900010BD70B5050008000E0002F0EAF8041EF1
-:106CA00004D002006B68310028689847200070BD4E
-:106CB000F0B58DB0049314AB1B78070003930F233A
-:106CC000080004A95B180021139E19708A4223D082
-:106CD00088421DDA2D2240421A700F25129B0A3B72
-:106CE00005930499F3F7AAF80A008446303209297B
-:106CF00001D9059A5218102308A94C1904A9C918DA
-:106D00004A55002D10D06346013D002BE9D10BE020
-:106D1000B2072ED52B221A700028DED130221F2474
-:106D200008ABDA7304ABE4180F21402504ABC91893
-:106D300035400B78002D20D00025AB420BD001222E
-:106D4000039B0192009338003300EEF711F8050021
-:106D5000159B013B15930CAB1A1B159B210001934E
-:106D6000039B380000933300EEF702F828180DB0AB
-:106D7000F0BD7207D0D52022CDE7002BEBD008AABA
-:106D80009442E8D9013C2370E5E7F0B51F008DB0CF
-:106D900012AB1B7802900393081C2B23B90702D473
-:106DA0007B07DB0F5B010193149B04AC0093210074
-:106DB00013002022E5F70EF80600FB0507D5431C5B
-:106DC0001F2B04D82522225400221E00E254402505
-:106DD00021003D4012D0002322781D002F2A0DD81B
-:106DE0000122009301920298EDF7C2FF09210500EC
-:106DF000139B013E013B139302ABC918139B320056
-:106E00000193039B029800933B00EDF7B1FF281814
-:106E10000DB0F0BD0EB403B503AA02CA0192EEF79D
-:106E200021F902B008BC03B01847802340109B052D
-:106E3000C018C0234910401A80001B064008C01823
-:106E400001231843704713B5040008001100002205
-:106E500013000092EBF730FA6368984716BD37B518
-:106E60001C000023050000930133080011001A00E4
-:106E7000EBF722FA6B68206898473EBD37B51C00D7
-:106E80000023050000930233080011001A00EBF7FD
-:106E900013FA03CC6B6898473EBD37B51C0000233E
-:106EA000050000930333080011001A00EBF704FA01
-:106EB00007CC6B6898473EBDF0B51D0000230F005E
-:106EC0000600012485B000934368110038001A00C1
-:106ED000EBF7F2F9B3681C43002F05D1A047F16826
-:106EE000EDF70CF905B0F0BD2868012F03D1EEF7DE
-:106EF00029FDA047F3E7022F09D1EEF723FD070094
-:106F00006868EEF71FFD01003800A047E7E7032F90
-:106F10000ED1EEF717FD07006868EEF713FD02903B
-:106F2000A868EEF70FFD029902003800A047D6E7E7
-:106F3000EEF708FD07006868EEF704FD0290A86808
-:106F4000EEF700FD0390E868EEF7FCFC039A0300FF
-:106F500002993800A047C2E7F0B50D001700040001
-:106F600001798288C90787B0C90F1E005208C388FB
-:106F7000009128003900EBF79FF92379DB070CD546
-:106F8000AA00B218390003A8FCF760FAA36803AAA4
-:106F900031002800984707B0F0BDA36831002800F1
-:106FA0009847F8E710B5FBF735FEFBF72DFE10BD4F
-:106FB00010B58068FBF72EFEFBF72CFE0430FFF7C0
-:106FC000F1FF10BDF0B585B01D000AAB1B781700AE
-:106FD0000393039A0368029000911B6B920719D5E3
-:106FE0005B68002401932C60002F10D02B003A0026
-:106FF00000990298019EB047002808D0431C0BD18D
-:107000002B680B2B03D1002C01D000232B60200018
-:1070100005B0F0BD1B68E4E70122039B134205D1D4
-:10702000009B3F1A1B1800932418DDE70400EEE7CD
-:1070300010B50022EEF74AFD10BD30B50C0087B048
-:107040000500012203A96068DBF7D2FE032D12D1EF
-:10705000A068DBF73FFD0021049B5A1A01930492BC
-:10706000824200D90200039B206859180223EEF7E0
-:10707000A7FE07B030BD042D0BD1A068DBF72AFDB9
-:107080000500E068DBF726FD0499A942E4D9290050
-:10709000E2E7012000214042DEE770B505004368C9
-:1070A0000120C9182B68060099420FD92B7B034099
-:1070B000002083420AD10723103199430831A86880
-:1070C0000C00FFF714F9A86030002C6070BD70B59B
-:1070D0000E00110004001500FFF7DFFF002807D1A4
-:1070E000237BDB070ED563682568AB420AD2ED1A15
-:1070F000A3686268310098182A0001F053FE6368A3
-:107100005D19656070BD10B50400002900D1013122
-:107110000023216063600800FFF7CBF80122237B86
-:10712000A0609343237310BD70B50D0004000131BE
-:10713000FFF7E9FF656070BD00238260027B43605A
-:1071400001331343016003737047037B10B50400E0
-:10715000DB0702D48068FFF7DBF80023A36010BDD3
-:10716000027B70B5002304000D00D20709D4036828
-:107170008068C918FFF7BBF82168A0604318491957
-:107180002160180070BD70B504000D00FFF785FF89
-:10719000031E04D06168A3685B1849196160180078
-:1071A00070BD0368426810B50400934205D0002307
-:1071B000A26861685354A06810BD0121FFF7D0FF99
-:1071C0000028F4D1F8E710B50C000121FFF7DBFF30
-:1071D000002800D0047010BD70B5050008000C0038
-:1071E00001F047FE210002002800FFF770FF70BD8C
-:1071F000F8B546680400170035008E4200D90D002E
-:10720000002F0FD039002000FFF747FF00280BD0D8
-:10721000A0687B194119721BC01801F0C3FD636897
-:10722000DF196760A0684019F8BD10B5140001228D
-:10723000FFF7DEFF002800D0047010BD10B5140069
-:107240000122FFF7D5FF002800D0047010BD43686D
-:107250008B4202D20023436070475B1AFBE770B594
-:1072600004001500626808008A4203D949198A425D
-:1072700001D8606070BDA368121A521B5918181803
-:1072800001F090FD63685D1B6560F3E77FB40C1C43
-:1072900003265643351CA0230C21DB0305331B02B8
-:1072A0005A180833011CEFF3108640B472B608E098
-:1072B0001960064200D11160760807D10134013D02
-:1072C00005D08026C04611602078F1E7FBE7116009
-:1072D00040BC86F310887FBC70470020704710B513
-:1072E000EEF7F8FD10B50400006800F086F8200005
-:1072F00010BD70B5060008000D0001F0BAFD0400D5
-:107300000530F1F725F9306000F06AF8336829009C
-:107310005C803068621C043001F03BFD70BD70B5CC
-:107320000B68040000680D00984205D000F065F875
-:107330002868206000F057F8200070BD00229142BC
-:1073400007DB03680222985E0022884201DD5B1899
-:107350001A7910007047002310B503600400EEF79F
-:1073600071FFA060E160200010BD70B50180428017
-:1073700004001D00EEF766FFA060E160002D02D062
-:107380002000EEF7BFFF200070BD10B504000068BC
-:1073900000F033F8200010BDF8B5D443E4171440D2
-:1073A000050020000C301F000E00F1F7D1F8286016
-:1073B00000F016F82B681C722B685F60002E05D059
-:1073C000286822000930310001F0E3FCF8BD0023F9
-:1073D00010B504000A001900FFF7DEFF200010BD01
-:1073E00003230380704710B50400EEF7B1FF0028B7
-:1073F00002D123880233238010BD10B50400EEF7BC
-:10740000A7FF002805D12388023B9BB2012B01D0A6
-:10741000238010BD2000F1F7CFF8FAE770477047DE
-:10742000036870B5040001811B6A98472368050052
-:107430005B69200098472081280070BD0089704753
-:10744000036870B5040081721B6A984723680500C1
-:10745000DB6920009847A072280070BD807A7047D1
-:107460007047704710B50400102101F019FC20008E
-:1074700010BD10B50400442101F012FC200010BD25
-:10748000C3680169426949435B4352435B189818DA
-:1074900070477FB50400FFF7F3FF25009023060037
-:1074A0001B04313598422AD9638F002B07D1013351
-:1074B00008221B216846FFF758FF012363879023AA
-:1074C0009B049E4219D9A38F002B07D101330922B7
-:1074D0001B216846FFF749FF0123A3878023DB04B4
-:1074E0009E420AD9E38F002B07D101330A221B21C8
-:1074F0006846FFF73AFF0123E38700232B702B78C0
-:10750000042B0ED801332B702000EFF717F8020080
-:107510000B280BD1628601231B216846FFF725FF4C
-:1075200015E00023E387A3876387EDE72300A18E9F
-:10753000303381420CD11A78042A01D801321A70F2
-:10754000A28E618E914202D01B78042BE2D87FBDBF
-:10755000A0860022F3E730B50400036A8BB00093E5
-:1075600002AD416A8269C369280000F06EFF230002
-:107570000C3307CD07C30222A37920009343A371E4
-:10758000FFF787FF0123A1881A0006A8FFF7EDFE89
-:1075900000200BB030BD70B505000B680C00080072
-:1075A0005B6A98472B000C3407CC07C3280070BDDA
-:1075B00010B5040003685B6A9847E06810BD10B519
-:1075C000040003685B6A9847206910BD10B5040089
-:1075D00003685B6A9847606910BD10B504000368D2
-:1075E0005B6A9847A3799B0702D42000EFF770F8F5
-:1075F000A06A10BD10B5040003685B6A9847A379C0
-:107600009B0702D42000EFF763F8E06A10BD408EBC
-:107610007047036870B5040001811B6998472368AF
-:1076200005009B69200098472081280070BD0089D3
-:107630007047704710B50400482101F031FB20006D
-:1076400010BD30B50400436BC26801699A1A8369A2
-:107650008BB05A43836B92125B1AC16942634B43EE
-:107660009B128363C16B406902AD091A206A4143D2
-:107670008912E16300912800216C00F0E6FE2300EE
-:10768000283307CD07C30123A1881A0006A8FFF7F6
-:107690006CFE00200BB030BD002310B58371643345
-:1076A00003810368040081801B6998470222A37943
-:1076B00093431A0001231343A37110BD84B030B566
-:1076C000069303000491059204AC0C3326CC26C328
-:1076D00026CC26C322681A60022382791343837161
-:1076E00030BC08BC04B01847030030B50C3134C9B5
-:1076F00034C334C934C30A681A6030BD02238079A8
-:107700001840704704238079184070478022002376
-:10771000D2008261C26102620222C36003614361DE
-:10772000436283799343837170474164704773B5B3
-:107730000C00050016000B680800DB699847E36B36
-:10774000280001960093626BA36B216C00F03EFE53
-:10775000280076BD70B505000B680C000800DB69D9
-:1077600098472B00283407CC07C3280070BDF0B51C
-:1077700087B0010003A8FFF7EDFF0398F5F7FEF9C6
-:10778000040004980D00F5F7F9F9060005980F00BC
-:10779000F5F7F4F92200009001912B002000290058
-:1077A000F4F7FCFB320004000D003B003000390010
-:1077B000F4F7F4FB02000B0020002900F3F7C8FCEB
-:1077C000009A019B04000D0010001900F4F7E6FB7D
-:1077D00002000B0020002900F3F7BAFCF5F78EFE3B
-:1077E000F5F796F907B0F0BD10B504000368DB6942
-:1077F0009847A06A10BD10B504000368DB6998477C
-:10780000E06A10BD10B504000368DB699847206B7F
-:1078100010BD82B030B5050085B0089202A80822DC
-:10782000099301F0B6FA039B029C5A10AD18DB07CE
-:1078300001D52B681C590AA90822684601F0A9FA4B
-:10784000089A099B2800A04705B030BC08BC02B0CC
-:107850001847F8B50A6803680E000700981AF3F78E
-:10786000EDFB72687B68051C981AF3F7E7FBB368B9
-:10787000041CB868C01AF3F7E1FB291C061C281C7D
-:10788000F3F7B0F8211C051C201CF3F7ABF8011C22
-:10789000281CF2F735FD311C041C301CF3F7A2F84C
-:1078A000011C201CF2F72CFDF8BDF0B585B001904D
-:1078B00002910392FFF7CDFF0127041C061C039BD6
-:1078C0009F4217DA0C217943029B01985918FFF760
-:1078D000C0FF051C011C201CF2F704FC002800D08E
-:1078E0002C1C291C301CF2F7E9FB002800D02E1CB0
-:1078F0000137E4E7211C301CF3F7A6F905B0F0BD11
-:10790000F0B58BB009938023DB000024C3600361D2
-:107910004361002305000C2707910892046044602E
-:10792000846084610293119B9C4265DB00270023E5
-:10793000109C0593019700973E1C059B119A93425A
-:1079400070DA210007A8FFF784FFF6F7F7F9011CAA
-:1079500003900298F2F76EFEFE218905F3F774F9A1
-:107960000490301CF3F74AFB06000498F3F746FB3B
-:10797000864200DA06003000F3F760FB2368079ABE
-:10798000061C981AF3F75AFB0399F2F753FE4000CE
-:1079900004994008F3F726F8011C0098F2F7B0FCB0
-:1079A000089B00900693069A6368981AF3F746FBC3
-:1079B0000399F2F73FFE400004994008F3F712F8EC
-:1079C000011C0198F2F79CFCA368019009980C3403
-:1079D000181AF3F733FB0399F2F72CFE40000499D1
-:1079E0004008F2F7FFFF011C381CF2F789FC059BE9
-:1079F000071C01330593A0E739006143109B07A8DA
-:107A00005918FFF726FFF6F799F9F3F7F7FAF3F7A6
-:107A100015FB0299061CF2F765FB002800D00296C0
-:107A2000013480E70099081CF2F7DCFF0199041C7F
-:107A3000081CF2F7D7FF011C201CF2F761FC391C6F
-:107A4000041C381CF2F7CEFF011C201CF2F758FC76
-:107A5000F6F774F9041C011C0098F2F7EBFD311CD9
-:107A6000F2F7C0FFFE218905F2F74AFC8921C9051A
-:107A7000F2F7B8FFF3F7C2FA211CE8600198F2F7B9
-:107A8000D9FD311CF2F7AEFFFE218905F2F738FC73
-:107A90008921C905F2F7A6FFF3F7B0FA211C286186
-:107AA000381CF2F7C7FD311CF2F79CFFFE21890557
-:107AB000F2F726FC8921C905F2F794FFF3F79EFA45
-:107AC000079B68612B60089B029800936B60099B81
-:107AD000AB60F3F793FAA86128000BB0F0BDF0B5E6
-:107AE0000025040017000B002E0028002A0091B08A
-:107AF0000791BA4208DA19680132401859687618B5
-:107B000099680C336D18F4E73900F2F79BF93900E6
-:107B100020603000F2F796F9390060602800F2F733
-:107B200091F93A00A06007992000FFF7BEFE0026F9
-:107B30000DAB0A90059606960393C8235B42049307
-:107B4000C8235B420293C8235B4201932200039B3C
-:107B500023CA23C32268049B9446039A6344136098
-:107B600062681D009446029B039A63445360A268B6
-:107B700008939446019B039A6344936007993A00E3
-:107B800003980993FFF791FE0A990B90F2F796FA82
-:107B9000002805D0089B099E05930B9B06950A9328
-:107BA000019BC83301931A00C8235B009A42CDD1D0
-:107BB000029BC83302939342C5D1049B029AC833F7
-:107BC00004939342BCD12368069A934206D163681A
-:107BD000059A934202D1A368B34205D0069BA660E2
-:107BE0002360059B6360A8E7200011B0F0BD70B56D
-:107BF00004000D00160086B003A8FFF770FF2000F8
-:107C0000019600950399049A059BFFF779FE2000E1
-:107C100006B070BD4A6810B55310C0180B68D20783
-:107C200001D50268D358984710BD10B50021406CAB
-:107C300000F0EDFF10BD10B50400EFF7DFF92000F4
-:107C4000782101F02DF8200010BD10B50400EFF7E9
-:107C5000C7F92000302101F023F8200010BD70B5D5
-:107C600005000400743501212800F0F7E9FD220029
-:107C7000563213780133DBB21370E17901318B4254
-:107C800022D1002326001370226D54360221525E49
-:107C900033882021934205DA200019B25030FFF7D3
-:107CA0004DFB0100E27900232800F0F783FD226DEF
-:107CB00033880221525E934207DD230000224833BD
-:107CC0001A702000EFF7A4FA70BD01333380FBE790
-:107CD00070B505000600826D5C350221525E2B886E
-:107CE000040074362021934204DA19B25830FFF7A9
-:107CF00025FB0100002330001A00F0F75BFDA26DA8
-:107D00002B880221525E934207DD23000022483374
-:107D10001A702000EFF77CFA70BD01332B80FBE76F
-:107D200073B504000600250074363000643500F099
-:107D3000B4FB0023EA5E2100002360310093300091
-:107D400000F0BBFB002804D123006C331B78002B10
-:107D50000AD16622A256002A06D02B886C349B18C2
-:107D60002B800123237073BD2300002248331A7037
-:107D70002000EFF74DFAF6E7F0B506000021050008
-:107D800004006636006E7156408864350023EA5E52
-:107D90004B1D1B1A200085B06C3003909A4210DCFA
-:107DA0000378002B0DD01C3D2B78062B02D1083018
-:107DB00000F073FB002320002B70EFF729FA05B0C9
-:107DC000F0BD27007437002A04DD494209B23800AB
-:107DD000F0F736FD0023EA5E2100002360310093B6
-:107DE000380000F06AFB0023F356002B05D1220077
-:107DF000483213702000EFF70BFA0123039A137037
-:107E000000232A88F3569B182B80D8E770B505000D
-:107E100048352B780400002B31D0EEF7CBF9220047
-:107E20004C3213881818230080B210804A331B8804
-:107E3000834224D8002313802B78022B02D1200008
-:107E4000FFF70DFF2B78032B02D12000FFF740FF37
-:107E50002B78042B02D12000FFF762FF2B78052B33
-:107E600002D02B78062B02D12000FFF785FF2B785C
-:107E7000072B04D1002320002B70EFF7C9F970BD48
-:107E80001FB5036F827A9B68040001339A4208D1C0
-:107E90008188012302226846FFF767FA0023A37254
-:107EA0001FBDEFF73BF92000FFF7B0FFA37A0133C6
-:107EB000F5E710B583790400DB0704D5027B022ABD
-:107EC00002D1FFF7DDFF10BD837A016F0133DBB212
-:107ED000837289688B4201D100238372002A02D108
-:107EE0002000EFF71BF9237B012B05D163730023DF
-:107EF0002000A373EEF7F6FF2000FFF787FFE2E70D
-:107F0000407A7047F0B5837987B004000D00DB0735
-:107F100003D5002903D007B0F0BD0029FBD0102302
-:107F2000216F01278A68CB5698180022984204DDF9
-:107F30003E009E4001333243F8E71123C868CB5618
-:107F4000012700211818984204DD3E009E400133AD
-:107F50003143F8E70A43002D09D00123002101A88D
-:107F6000F1F7F6F90123A2791343A371D3E72B00AC
-:107F7000290001A8F1F7ECF9290001A800F012FE90
-:107F80000122A3799343F0E710B50121FFF7BAFF6F
-:107F900010BD10B50021FFF7B5FF10BD10B574304E
-:107FA00000F07BFA10BD10B50400F0F709FE0023C5
-:107FB0002000237510BD1FB503AC63700023227031
-:107FC000009322000233EFF7BFF904B010BD1FB5D4
-:107FD0000F2401236C4400932300EFF7C5F9002818
-:107FE00000D1207804B010BD4A6810B55310C018F5
-:107FF0000B68D20701D50268D358984710BD82B0EC
-:1080000030B5050085B0089202A80822099300F057
-:10801000C0FE039B029C5A10AD18DB0701D52B68EC
-:108020001C590AA90822684600F0B3FE089A099B69
-:108030002800A04705B030BC08BC02B0184770B596
-:1080400004000D001822002100F0BFFE29002000CE
-:1080500000F093FC200070BD0368426880689B18A4
-:1080600010B518180321F1F7EDFE4B2800DA4B206C
-:10807000A9235B00984200DD1800181A0821FF238D
-:10808000FF315843F1F7DEFE10BD13B50C0001A817
-:10809000EFF75AFC210001A8EFF768FC13BD73B598
-:1080A0000D0014001E0001A8EFF74EFC33002A005B
-:1080B000210001A8EFF790FC73BD802307B55B0595
-:1080C000009101921A695B696946133B5A43022386
-:1080D000FFF7E5FF07BD84B010B50492802203913D
-:1080E000059352051369516952691139133A5A437C
-:1080F0004B430F99CB1AD21803A90C23FFF7CFFFDC
-:1081000010BC08BC04B0184780235B05F7B51A699A
-:108110005B690191113B5A430092EFF709FB06009E
-:10812000041E23D0302000F0CAFD302200210400BC
-:10813000002500F04AFE30273B006B4300990831D0
-:10814000C918B5420BDA3A00200000F022FE2100E7
-:10815000019800F084FE002808D00135ECE7B54214
-:1081600004D12000302100F09BFD00242000FEBD42
-:1081700010B509680431EFF70BFB10BD29DF70471C
-:1081800028DF704710B503685B6A984710BD10B5CB
-:108190000400EFF7E1FC2000A42100F081FD2000A5
-:1081A00010BD10B5C9B20D22FFF711FFC738434209
-:1081B000584110BD10B503685B6A984710BD10B5F3
-:1081C0000400EFF70BFE20005C2100F069FD2000A9
-:1081D00010BD10B5C9B20D22FFF7F9FE5A3843425F
-:1081E000584110BD10B50368DB69984710BD10B544
-:1081F0000400EFF769FE2000602100F051FD20002F
-:1082000010BD10B5C9B20722FFF7E1FEC4384342E2
-:10821000584110BD10B503685B6A984710BD10B592
-:108220000400EFF76BFF20005C2100F039FD200017
-:1082300010BD10B5C9B20F22FFF7C9FE3338434253
-:10824000584110BD10B50368DB69984710BD10B5E3
-:108250000400F0F707F82000602100F021FD200065
-:1082600010BD10B5C9B24F22FFF7B1FE40384342EE
-:10827000584110BD72B60B680165002B05D14365EE
-:108280008365086062B6704713005A6D002AFBD1FF
-:10829000586583654265F5E7036D002B0FD072B614
-:1082A000826D436D002A0BD05365436D002B01D0C6
-:1082B000826D9A65002343658365036562B67047E6
-:1082C000026D1360F1E770B50500EFF30884C36B2E
-:1082D000006C1C1B6B6C1B1A9C420CD91F23203496
-:1082E0009C43002801D0F0F767F92000F0F730F93F
-:1082F00028640019686470BD10B5F0F755F8F0F700
-:108300006BF8FAE7F0B58208830703D1031E02D1A8
-:108310001800F0BD0132541C72B6802621C9360601
-:10832000854225D90368002B02DB9B00C018F7E7C4
-:108330005B005B08990041180F68002F08DA8D4236
-:1083400006D931007F007F08DB1919430160F1E78E
-:10835000A342EAD302329A4203D292008218954293
-:1083600009D803685B005B08036062B6031DCFE7B2
-:1083700062B60023CCE7191B80231B06043A0B438B
-:1083800013600460F1E710B50800F0F7E1F810BDE4
-:1083900010B50800F0F710F910BD10B5838804007F
-:1083A0009B0703D51821806800F07AFC200010BDDF
-:1083B00010B5F0F729F9406810BD10B5F0F724F9B1
-:1083C000006810BD017042704360704782B0F0B524
-:1083D00005920200069308AB1B7805ACE0CCE0C226
-:1083E000002B1ED04A78002A05D0069A52424260DD
-:1083F000079A524282604A68022A16D0032A1AD08B
-:10840000012A04D102684168524201604260012B96
-:1084100017D0022B05D143685B42436083685B42FF
-:108420008360F0BC08BC02B0184702685242026088
-:1084300042685242EAE74268016852420260416083
-:10844000E5E7426803680260E7E782B037B50400F9
-:10845000180007930B7806920193089B0093030082
-:108460002000FFF7B3FF20003EBC08BC02B0184755
-:1084700010B504000068FEF7C0FF200010BD10B565
-:108480000A00002100F0A1FC10BD10B5040008682E
-:108490002060FEF7A8FF200010BD10B500684388DB
-:1084A000818806305943FFF7EAFF10BD10B504007C
-:1084B0000023F0F709F9200010BDF0B587B0039153
-:1084C0000CA90978070004910168002002914988ED
-:1084D0008C468A426BDA029989888B4267DA039C60
-:1084E0002668748801941419009484425FDDB5886D
-:1084F0005C19059484425ADD824205DA0098604591
-:1085000009DD6046009006E06046801A0090040095
-:1085100001988442F6DC002B2FDA059C8C4200DDAA
-:108520000C00B01D0026D11755422940B34202DA93
-:10853000019D6E425E43029D761886190635111C18
-:10854000002A00DA0021002209B2934201DD6246CE
-:108550005A43049B51186D18002B1DD000221000A7
-:10856000A24224DA002300998B420BDAF15C002945
-:1085700001D0E95401300133F5E7CC1AAC42D0DD2B
-:108580002C00CEE7039B01321B6801935B88F61831
-:108590003B685B88ED18E3E7049B0193019BA342D2
-:1085A00007DBE043009BC01720404343180007B09F
-:1085B000F0BD31002800009A00F0EBFB039B1B6824
-:1085C00002935B88F6183B685B88ED18019B0133CA
-:1085D000E3E710B5040000F024FB200010BD51DFDC
-:1085E000704761DF7047F8B506000F0004001518EA
-:1085F000AC4200D1F8BDBB1B195D2000F0F79CFA1E
-:108600000134F5E7F0B585B01C000AAB0500039115
-:1086100016001F78F0F7F6FA01235F400097230059
-:1086200032000399280000F07DFA201A441EA04170
-:1086300005B0F0BDF0B585B01C000AAB0500039194
-:1086400016001F78F0F7DEFA01235F400097230041
-:1086500032000399280000F023FA201A441EA0419A
-:1086600005B0F0BD836980681B681840431E9841BF
-:10867000704710B5043000F0FFF910BD704710B519
-:108680000400402100F00CFB200010BD10B500F0EC
-:1086900045F810BD10B500F046F810BD704718231E
-:1086A0004A1C5A43594382189268431810B5DB6834
-:1086B000002A03D1002B00D0984710BD002BFCD01E
-:1086C0001031411818009047F7E710B50400402119
-:1086D00000F0E6FA200010BD70B50D000400043073
-:1086E000F0F726FFE56370BD10B5043000F0ACFA7A
-:1086F00010BD70B50C00030011000430221E0AD01A
-:10870000182215004D435D19EC604C1C62439B1808
-:1087100000229A600132F0F757FF70BD10B50430A7
-:1087200000F085FA10BD10B50C000430F0F792FF90
-:10873000200010BD10B5040043684269991800F08C
-:1087400077F8E36A002B04D1A369002B00D0984787
-:1087500010BDA0690028FBD021001C319847F7E725
-:1087600010B5040000F06CF80023A361E36210BDB3
-:1087700070B50D00040000F063F86561206900F039
-:1087800064F94119200000F053F870BDC36A01007C
-:1087900010B58069002B03D1002800D0804710BDA0
-:1087A0000028FCD01C319847F9E710B50400F0F719
-:1087B0005FFA2000302100F073FA200010BD03683A
-:1087C00010B50400002B05D1C06800F03EF901236C
-:1087D0006060236010BD10B504000068002804D05C
-:1087E000E06800F032F96368C01A10BD10B5846803
-:1087F000FFF7F1FF201810BD10B50400C06800F0AD
-:1088000024F900236060A36010BD002310B503604D
-:10881000436083600400F0F7F7FAE0602000FFF7A0
-:10882000EBFF200010BD10B503689B68984710BD92
-:1088300010B50A000300011D006900F0CEF810BD5C
-:1088400010B5011D006900F0E4F810BD10B5022854
-:1088500004D8802300209B014B6010BDF7F7A2FFD6
-:108860000923036001204042F7E710B50120F7F724
-:108870009FFF7047704710B5FFF7FCFFFFF7F9FF48
-:10888000DAF7A0FB10BD10B5002801D000F001F808
-:10889000FEE710B59AB0032102A800F06EF802219D
-:1088A00008A800F06AF801210EA800F066F810216F
-:1088B00014A800F062F89624059B039A20001A6021
-:1088C000099A0C9B1A600F9A129B1A60159A179BB3
-:1088D00001921A6000F0C9F8069B039A20001A6002
-:1088E000099A0B9B1A600F9A119B01921A60159AB4
-:1088F000189B1A6000F0B9F8DEE70FB4012010B53C
-:10890000F7F756FF70B50D0004001600F0F7F0FA07
-:108910006B1C07D00021200000F0B4F831002000CB
-:1089200000F0AAF870BD70B5436804000D00002A7D
-:108930000AD0C26813602000012100F0A3F82900CA
-:10894000200000F099F870BD0269F3E710B503222A
-:10895000FFF7D8FF10BD10B5FFF7D4FF10BD70B5FD
-:108960000D0004001600F0F7C3FA6B1C04D03200AF
-:1089700000212000FFF7D7FF70BD10B50022FFF7E0
-:10898000EEFF10BD70B504000D0003681B6898472A
-:1089900063681D6070BD036870B5DB6804009847AC
-:1089A00063685A682368002A02D19B68984770BDA3
-:1089B0005B681568984763682D1A5A68002D07DCB4
-:1089C000916859601B68002BEAD050689847E7E728
-:1089D000236810681B699847E9E770B50D0072B607
-:1089E0004B60002346680A607468002C09D1002B94
-:1089F0000DD1036875601B6910009847AC6062B6C2
-:108A000070BD2168511AF2D42300A468EDE79D607F
-:108A1000F4E710B572B6426853688B420DD19B687B
-:108A200053600268002B03D19368984762B610BD6B
-:108A3000126918689047F9E71300002BF6D09A687E
-:108A40008A42F9D18A689A60F0E710B503685B68DA
-:108A5000984710BD70B50400F1F7AAF80500F1F7CA
-:108A6000A7F8401BA042FAD370BDFA2310B59B00B3
-:108A70005843FFF7EFFF10BD10B5007840B200F08B
-:108A800081F810BD002902D0012900D070470023D1
-:108A9000A022C356D205C133FF339B009950F5E79E
-:108AA000F7B50192B1221E0003684910D200995017
-:108AB0008021012289005A50190000240500FC3150
-:108AC000CC601A60771E019BA7420BDCD9190122EA
-:108AD0002800F0F731FB002819D02800F0F7F2FB4E
-:108AE0003E0010E0191900222800F0F725FB0028AD
-:108AF0000BD02800F0F718FC06002800F0F7E2FB86
-:108B0000002E00DB26003000FEBD0134DAE7089BB2
-:108B1000002BF8D02B68FC339A68002AFCD0002286
-:108B20009A60F0E7F8B51700B1221C000368D20084
-:108B3000491099508022002592009D500122060084
-:108B40009A60A54209DB069B002B04D03000F0F7A9
-:108B5000D1FB002813D120000EE0795D3000F0F742
-:108B6000D7FA002809D03000F0F7ACFB3000F0F75E
-:108B7000DBFB002800DB2800F8BD0135E1E7012020
-:108B80004042F9E7A0238000DB05C018E02310B5C0
-:108B90000C24DB00C2588900A243C250C2581143C2
-:108BA000C15010BDF8B505000E00002401273B00A0
-:108BB000A3402A691A4203D060B23100FFF7E2FFF6
-:108BC00001341F2CF3D1F8BD30B5002902D00129A2
-:108BD0000FD030BD01220C0013008B4005691D42EF
-:108BE00003D005688B00EB181C6001311F29F3D1FD
-:108BF000EFE700230A009A400469144203D0046896
-:108C00009A00A218116001331F2BF3D1E1E70B008A
-:108C1000426810B5146801696340194061401160F1
-:108C200010BD10B5407840B2F0F7A6FB10BD036848
-:108C30001A00FC32D1680129FCD10021D160A322A5
-:108C4000D2009858C0B270470368FC33D868013826
-:108C500043425841704782B00190C046C046C0466A
-:108C6000C046C046C046C046C046C046C046C046D4
-:108C7000C046C046C046019B013B0193002BECD18E
-:108C800002B07047704770470023CB565A1C01D181
-:108C9000180002E0834201D1486870470C31F3E7C5
-:108CA00010B500F001F810BD10B5EFF785FC10BD50
-:108CB0000B0010B501001800F7F766FD10BD10B5E8
-:108CC000041E00D101342000EFF742FC002807D138
-:108CD000F1F70AF8002801D100F003F88047F2E725
-:108CE00010BD10B50620F7F7BFFE0120FFF7CBFD42
-:108CF00070B568254A1E55430E0029007431FFF7F0
-:108D000042FB041E08D000212A00016046600C309E
-:108D1000A060683200F059F8200070BDF7B504007B
-:108D20000700002601914834002C01D13000FEBD1F
-:108D30006368A5680093009B013B009301D52468FC
-:108D4000F2E7AB89012B08D90E22AB5E013304D0C8
-:108D500029003800019B984706436835EBE7C9B204
-:108D60008218904201D10020704703788B42FBD0DB
-:108D70000130F6E730B50024A24201D1002005E021
-:108D8000035D651C0C5DA34201D0181B30BD2C0097
-:108D9000F2E7002310B59A4200D110BDCC5CC45458
-:108DA0000133F8E710B5884202D98B18984203D3F3
-:108DB000002307E08B5C8354013AFBD210BDCC5CEE
-:108DC000C45401339A42FAD1F8E7030012189342CF
-:108DD00000D1704719700133F9E770B504000D0038
-:108DE0001F2904D9162303600120404270BD436C43
-:108DF000002B04D08A009B181A68002A08D1200092
-:108E000000F015F82A0001002000F7F737FEEDE723
-:108E10000020012AEAD0511C03D11623013023601F
-:108E2000E4E7002428001C6090472000DEE710B52E
-:108E3000F8F716FB10BD10B50E23C95EF7F756FF05
-:108E400010BDC9B20378002B04D08B4200D170470B
-:108E50000130F7E74B42594149420840F7E70278B1
-:108E60000B78002A03D0013001319A42F7D0D01A92
-:108E700070470023C25C0133002AFBD1581E7047A3
-:108E8000002330B59A420AD0013AC45CCD5CAC42B2
-:108E900004D1934202D00133002CF6D1631B180099
-:108EA00030BD936810B5013B9360002B04DA9469E0
-:108EB000A34207DB0A2905D01368581C10601970FB
-:108EC000080010BDF7F732FE0100F9E7F8B506001B
-:108ED0000F001400D518AC4201D1002007E0217822
-:108EE0003A003000FFF7DDFF0134431CF3D1F8BD39
-:108EF000F7B5150001938A680B6900900C00934246
-:108F000000DA130022002B6043321278002A01D0CD
-:108F100001332B6023689B0602D52B6802332B603C
-:108F2000062723681F4027D0230043331B785A1E8F
-:108F300093412268920630D422000199433200986E
-:108F4000089EB047431C25D0062320682A68E168A4
-:108F500003400025042B03D18D1AEB43DB171D4082
-:108F6000A3682269934201DD9B1AED180027BD42D8
-:108F700020D1002010E00137E3682A689B1ABB4229
-:108F8000D2DD22000123193201990098089EB047D2
-:108F9000431CF0D101204042FEBD3020E118433196
-:108FA000087021005A1C45310978A2184332023357
-:108FB0001170C1E7220001231A3201990098089E1E
-:108FC000B047431CE6D00137D1E70000F8B5C046F2
-:108FD000F8BC08BC9E467047F8B5C046F8BC08BC53
-:108FE0009E467047000000004FBB610567ACDD3F47
-:108FF000182D4454FB21E93F9BF681D20B73EF3FC0
-:10900000182D4454FB21F93FE2652F227F2B7A3C37
-:10901000075C143326A6813CBDCBF07A8807703CF0
-:10902000075C143326A6913C30900200C101000079
-:1090300058B802000100000081010000000000009B
-:109040000000000000000000000000000000000020
-:109050000000000000000000000000000000000010
-:1090600000000000000000000000000058B80200EE
-:10907000A2020000C50200005D0200000000000026
-:109080009101000000000000FD020000D901000075
-:10909000C10100000000000000000000000000000E
-:1090A000000000000000000058B802006702000045
-:1090B00000000000000000000000000000000000B0
-:1090C0000000000000000000000000005B2602001D
-:1090D00081140200000000000000000000000000F9
-:1090E0000000000058B8020044020000DD03000048
-:1090F000E115020000000000C5050000A507000002
-:109100000000000000000000550300000000000007
-:10911000000000000000000000000000BC91020000
-:1091200058B80200B2020000DD030000E1150200A1
-:1091300000000000C5050000A507000000000000B9
-:1091400000000000550300000000000000000000C7
-:109150000000000000000000BC910200B4EA020020
-:10916000B504000078EA02004905000078EA020030
-:10917000F91402002CEB02000200FFFF8D15020023
-:109180002CEB02000200FFFF61050000B4EA0200C0
-:10919000D1040000B4EA0200CB150200B4EA0200D8
-:1091A000C1150200B4EA020071030000B4EA020033
-:1091B00043160200B4EA02003316020074C2020031
-:1091C0009700000012000000CC910200F60F000092
-:1091D0005C9102002E0C0000649102003E0500002C
-:1091E0006C910200761100008C9102004E1100007B
-:1091F000749102005611000080910200AE1200002E
-:1092000094910200B61200009C910200CE12000060
-:10921000A491020016130000AC9102001E1300007E
-:10922000B4910200D61400005C9202002E150000DA
-:1092300064920200461600006C9202004E16000076
-:1092400074920200DE1600007C920200FE160000FE
-:1092500084920200F60E0000E8E0020078EA0200C4
-:10926000A1050000B4EA020071050000B4EA0200A2
-:109270001B150200B4EA020015050000B4EA020062
-:10928000071502002CEB02000200FFFFED040000B6
-:10929000A09202000000000000000000000000009A
-:1092A00058B8020013020000211700000D1600003C
-:1092B00000000000000000009D1D000000000000F4
-:1092C00099150000CD0D000000000000C725020028
-:1092D0000000000000000000DC92020074C20200E6
-:1092E000B700000016000000EC920200E61100003A
-:1092F000B493020056150000289402009612000054
-:10930000CC9302005E150000349402004613000066
-:1093100000940200D6150000589402006E1500005B
-:1093200040940200EE150000649402009E110000BB
-:10933000A89302002616000070940200D6130000C5
-:1093400010940200761500004C94020006120000F2
-:10935000C0930200361500001C9402000E1100009C
-:109360009C930200BE130000089402000617000040
-:109370007C94020006130000F0930200BE1200006D
-:10938000D8930200C6120000E093020026130000EA
-:10939000F8930200F6120000E89302002CEB0200A2
-:1093A00004000400F11300002CEB02000400030091
-:1093B000A91200002CEB020004000400DD230200CF
-:1093C0002CEB02000300FFFF012500002CEB020044
-:1093D00004000400F723020078EA02005915000097
-:1093E00078EA02006915000078EA02008915000099
-:1093F00078EA02004915000078EA020079150000B9
-:10940000B4EA02009110000078EA0200B5140000EE
-:109410002CEB0200020002001F2402002CEB0200D1
-:10942000060004003B2402002CEB020004000400B0
-:10943000E92302002CEB02000400040003240200D4
-:109440002CEB020002000300F12300002CEB0200D1
-:10945000020002002D2402002CEB02000200030097
-:10946000B52200002CEB02000400030045120000AE
-:109470002CEB0200020002001124020078EA020034
-:10948000C514000078EA02002D2602000500000045
-:109490000500000003000000090000000D040000AA
-:1094A0006203030058B802000D0200000000000033
-:1094B00000000000AB2802000000000000000000D7
-:1094C000000000000000000000000000000000009C
-:1094D000000000000000000000000000000000008C
-:1094E00074C202001701000022000000F094020084
-:1094F000860F0000BE0000006E02000008E50200BA
-:10950000FE0400001C0000209605000054BC020070
-:109510009E05000060BC0200C605000084E9020050
-:109520006E0600009C990200A606000014BE020010
-:109530006E0B000064000020EE0B000054000020C1
-:10954000C600000014960200CE000000249602001F
-:10955000D60000001C960200DE0000000896020003
-:10956000E60000002C960200A6010000ACA202005A
-:10957000AE010000F4A20200B601000004A3020044
-:10958000BE0100000CA30200C601000014A30200EB
-:10959000CE0100001CA30200D601000024A302009B
-:1095A000DE0100002CA30200E601000034A302004B
-:1095B000EE0100003CA30200F6010000B4A202008C
-:1095C000FE010000BCA2020006020000C4A20200CC
-:1095D0000E020000CCA2020016020000D4A202007B
-:1095E0001E020000DCA2020026020000E4A202002B
-:1095F0002E020000ECA2020036020000FCA20200D3
-:1096000098B10200E09402002CEB0200000001007F
-:10961000293200003CEA0200A13100003CEA0200CD
-:10962000BD28020078EA0200B13100003CEA0200E5
-:10963000F13100003CEA02005D3B00003CEA020020
-:109640001D3A000078EA0200D93E00003CEA020020
-:10965000553800002CEB02000100FFFF6D3B0000BD
-:1096600074C202007F0000000F0000008896020014
-:109670003CEA0200A139000078EA0200F93E00004D
-:109680003CEA020061390000860F0000560D000020
-:109690004E0F00004C960200C60000004C960200DF
-:1096A0005E0D0000549602006E0500003496020024
-:1096B000760500003C960200660D000078960200D8
-:1096C0006E0D000000970200760D00004496020027
-:1096D0007E0D000070960200860D000008970200C3
-:1096E0008E0D000080960200CE0D000005000000E7
-:1096F000D60D000001000000DE0D00000300000098
-:109700003CEA02009D29020078EA0200AB2902002F
-:1097100098B10200609602009201000099010000D9
-:1097200098B102002897020074C2020047000000AE
-:109730000800000038970200860F0000561600004F
-:10974000CE0C0000DC9702002E170000B897020034
-:109750008E12000084970200CE140000CC97020005
-:1097600096100000A6130000BE11000078970200BA
-:10977000F6140000AC9702002CEB02000000010080
-:10978000193F000058D5020002000000AE0C000096
-:1097900098970200189702004CA0020003000000F6
-:1097A0000300000013000000050000002CEB020085
-:1097B00002000200393F00004CA00200030000003C
-:1097C0000700000009000000010000000C9A0200E0
-:1097D0000000000008000000175003000C9A02006F
-:1097E0000000000005000000C10403003CEA020084
-:1097F0000D40000074C202001700000002000000CB
-:1098000004980200860F0000FE0000004E0F0000CA
-:10981000EC97020098B10200F497020058B80200D9
-:109820003402000000000000652A02000000000071
-:109830000000000000000000000000000000000028
-:109840005B2602003D2A020000000000000000002C
-:1098500000000000000000004B2B02003B2B020028
-:10986000894700000D2B0200D142000058B80200C9
-:10987000670200000000000000000000000000007F
-:1098800000000000000000000000000000000000D8
-:109890005B260200C72B0200000000000000000051
-:1098A000000000000000000098B10200B098020023
-:1098B00074C202001700000002000000C0980200FD
-:1098C000860F00002610000026100000F4B20200EF
-:1098D00058B80200CC0000000000000000000000AA
-:1098E0000000000000000000000000000000000078
-:1098F0000000000000000000000000000000000068
-:1099000000000000000000000C99020074C2020078
-:1099100047000000080000001C99020076060000C5
-:109920008C9902007E0600009499020086060000D1
-:109930005C9902008E06000064990200CE050000CA
-:1099400074990200D60500007C990200DE05000033
-:1099500084990200960600006C99020078EA0200E1
-:109960008948000078EA02002148000078EA0200F5
-:109970007548000078EA02003948000078EA0200E1
-:109980004D48000078EA02006148000078EA0200D1
-:109990000549000078EA0200FD470000D098020067
-:1099A0000000000000000000954C0000854C000005
-:1099B0008D4C000098B10200BC99020074C20200F4
-:1099C0004700000008000000CC990200860F00004C
-:1099D00016170000CE00000094E80200B615000043
-:1099E0008CE80200BE1500009CE80200861600000C
-:1099F000B4E802008E160000BCE8020076160000F3
-:109A0000A4E802007E160000ACE8020058B802008C
-:109A1000C002000065510000E50F000000000000DA
-:109A20002D5100009D1D0000000000002D5300007E
-:109A30001151000000000000C725020000000000D6
-:109A400000000000489A020074C20200B700000043
-:109A500016000000589A0200E6110000B4930200BC
-:109A6000561500002894020096120000CC930200C4
-:109A70005E150000349402004613000000940200BA
-:109A8000D6150000589402006E15000040940200A4
-:109A9000EE150000649402009E110000A8930200DD
-:109AA0002616000070940200D613000010940200E5
-:109AB000761500004C94020006120000C0930200CC
-:109AC000361500001C9402000E1100009C93020049
-:109AD000BE13000008940200061700007C940200E8
-:109AE00006130000F0930200BE120000D89302009B
-:109AF000C6120000E093020026130000F893020053
-:109B0000F6120000E893020058B802006702000055
-:109B10000000000000000000000000000000000045
-:109B20000000000000000000000000005B260200B2
-:109B3000692C02000000000000000000000000008E
-:109B400000000000B4EA020065550000860F000026
-:109B50006E0C0000960B0000909B02001E07000098
-:109B6000849B0200060D0000989B0200760C00000A
-:109B7000EC9B020074C202002F00000005000000F0
-:109B80004C9B02002CEB02000100FFFF895B0000F0
-:109B90003CEA0200595900003CEA02004D54000022
-:109BA00074C202000F00000001000000B09B020020
-:109BB0008E0C0000449B0200ACA20200F4A2020042
-:109BC00004A302009001030100000000A5000100B1
-:109BD00001000000E2000300E4B302008F01030073
-:109BE000E4B3020098B10200749B020058B802006E
-:109BF0008E01000000000000352D02000000000072
-:109C0000972C0200E15B0000000000009955000065
-:109C10000000000000000000A32C02000000000073
-:109C200000000000A09B0200B4EA0200B55C000046
-:109C30002CEB02000400FFFF895E000078EA0200BE
-:109C40009964000078EA0200AD63000078EA02003F
-:109C5000FD5E000078EA02002D5F000078EA020055
-:109C6000552D020078EA02005D5F000078EA0200EC
-:109C7000795F00002CEB020000000100E5640000A9
-:109C8000B4EA0200692D02002CEB0200040003007C
-:109C9000496300003CEA0200715E0000B4EA020081
-:109CA0002163000078EA0200C72D020078EA020072
-:109CB000772D020078EA02003D2602002CEB02001C
-:109CC00000000100FD63000078EA02004B2D020055
-:109CD00078EA0200612D00003CEA02007D5E00008F
-:109CE0002CEB02000300FFFFD32D02002CEB02003F
-:109CF0000300FFFFDD2D020078EA02005964000036
-:109D000078EA0200852D020078EA0200F96000007E
-:109D10002CEB020004000300756400002CEB020031
-:109D20000100FFFF8D61000078EA0200416200003F
-:109D30002CEB0200020002006D620000F0EA02005B
-:109D40008D6300002CEB02000300FFFFE5620000C2
-:109D50002CEB020002000200932D020098B10200D9
-:109D6000649D020074C20200D70200005A00000085
-:109D7000749D0200860F000076100000DE0E0000C9
-:109D8000309C0200460F0000F4A30200AE0F00005A
-:109D90003C9C020066100000D4E702009E10000008
-:109DA000A09202008610000030B302003E110000B5
-:109DB00074C20200A61100001C980200DE1100000F
-:109DC0006CB30200EE11000088B002002612000001
-:109DD000E4900200A61200002CB902009E130000BD
-:109DE00088E70200DE130000B8A302008E14000012
-:109DF0004CB20200161500006C9002004E150000D7
-:109E000094D5020096150000209102004E05000036
-:109E1000E8A40200061600000C9A02003E1600009C
-:109E20001CB80200B61600004CA00200BE160000CE
-:109E300058B802003E170000E8A60200C610000055
-:109E4000A4B70200F6150000E0B702000E0E0000F5
-:109E500028900200E60F0000449C0200061000005B
-:109E60004C9C0200B60B0000549C020056100000EF
-:109E70005C9C0200AE100000649C0200BE1000005A
-:109E80006C9C02005E110000749C02007E110000B8
-:109E9000809C0200AE11000000A40200B611000078
-:109EA0000CA402004E120000889C02009E150000C7
-:109EB0003C9D020056120000949C02005E120000BD
-:109EC0009C9C020066120000A49C02009E00000000
-:109ED00040B202007E120000AC9C0200861200001C
-:109EE000B49C0200A6000000BC9C0200EE12000020
-:109EF00094B702000E1300009CB702003613000056
-:109F0000C89C020096130000D09C0200AE13000013
-:109F1000D89C0200EE130000E09C02002E1400000A
-:109F2000EC9C02007E140000F89C020096140000D5
-:109F3000009D0200AE140000089D0200E61400001F
-:109F4000109D0200EE1400001C9D02003E15000052
-:109F5000289D020066150000309D0200CE1500000D
-:109F6000449D020036160000509D0200FE0D0000C8
-:109F70001CA80200E60D000068A70200EE0D00001C
-:109F8000A4A70200F60D0000E0A70200060E0000E4
-:109F900058A80200160E000094A802001E0E000031
-:109FA000D0A80200260E00000CA902002E0E000010
-:109FB00048A90200360E000084A90200460E0000E7
-:109FC000FCA902003E0E0000C0A902004E0E0000D7
-:109FD00038AA0200560E000074AA02005E0E0000AD
-:109FE000B0AA02006E0E0000ECAA0200760E00007D
-:109FF00028AB0200860E000064AB02008E0E00004B
-:10A00000A0AB0200960E0000DCAB02009E0E00002A
-:10A0100018AC0200A60E000054AC0200AE0E000008
-:10A0200090AC0200B60E0000CCAC0200BE0E0000E8
-:10A0300008AD0200C60E000044AD02009E140000F0
-:10A04000D4BB02004CA002000000000058B802007F
-:10A05000D6020000C1650000256800000000000075
-:10A0600019660000B166000000000000B167000042
-:10A07000A5650000000000000000000000000000D6
-:10A08000000000009CA00200B4EA0200172E0200AB
-:10A090002CEB020004000400032E020074C2020034
-:10A0A0001700000002000000ACA002000E1100002A
-:10A0B00088A002009612000090A0020078EA020038
-:10A0C000992E020078EA020081720000B4EA0200D0
-:10A0D0000172000074C20200670000000C00000062
-:10A0E00004A1020074C20200670000000C0000001E
-:10A0F00064A1020074C202006F0000000D000000A5
-:10A10000C4A102003601000074A302002E01000069
-:10A1100054A30200460100006CA302003E010000AF
-:10A120004CA302004E01000064A30200560100008F
-:10A130005CA302004E02000007000000560200006F
-:10A14000030000005E020000010000003E0200006B
-:10A15000C4A0020046020000CCA00200960100004C
-:10A16000BCA002003601000074A302002E01000012
-:10A1700054A30200460100006CA302004E0100003F
-:10A1800064A30200560100005CA302005E0100000F
-:10A190002CA202004E020000070000005602000040
-:10A1A000030000005E020000010000003E0200000B
-:10A1B000C4A0020046020000CCA0020096010000EC
-:10A1C000BCA002003601000074A302002E010000B2
-:10A1D00054A30200460100006CA302003E010000EF
-:10A1E0004CA302004E01000064A3020056010000CF
-:10A1F0005CA302006601000044A302004E020000BE
-:10A200000700000056020000030000005E0200008C
-:10A21000010000003E020000C4A00200460200004F
-:10A22000CCA0020096010000BCA0020078EA020067
-:10A23000A92E020058B80200230000000000000010
-:10A24000000000000000000000000000000000000E
-:10A2500000000000000000000000000000000000FE
-:10A26000000000000000000000000000D4A0020078
-:10A2700058B80200220000000000000000000000AA
-:10A2800000000000000000000000000000000000CE
-:10A2900000000000000000000000000000000000BE
-:10A2A0000000000000000000E4A002007CA3020007
-:10A2B0000003010034A202000A06040070A202009A
-:10A2C0000B1A050070A202000C14010070A202001B
-:10A2D0000D17010070A202000E16010070A202000C
-:10A2E0000F15010070A202001010010070A2020000
-:10A2F000130009007CA302000102010070A2020009
-:10A30000141E09007CA302000201010034A2020015
-:10A310000304040034A202000405040070A2020039
-:10A320000511050070A20200060C040070A20200D4
-:10A33000070B040070A202000812010070A20200C4
-:10A34000090A040078EA0200CD73000078EA0200EE
-:10A350004D73000078EA020049720000B4EA02007E
-:10A36000A9730000B4EA020081730000B4EA02009D
-:10A37000BD720000B4EA0200A171000058B80200EA
-:10A3800024000000000000000000000000000000A9
-:10A3900000000000000000000000000000000000BD
-:10A3A00000000000000000000000000000000000AD
-:10A3B00000000000F4A0020058B802007B02000078
-:10A3C00000000000617400000000000000000000B8
-:10A3D0000000000000000000000000005B260200FA
-:10A3E000BF2E02000000000000000000000000007E
-:10A3F000000000002CEB020002000500AD78000018
-:10A400002CEB020002000300732F02002CEB020071
-:10A41000020003007D2F020074C202002F00000022
-:10A420000500000028A40200860F00000E0D0000A9
-:10A43000160D000084A40200260D000090A4020066
-:10A440001E0D000078A402004E0D0000E0A40200E2
-:10A45000E100020240000000A701020248000000E3
-:10A46000A601020280000000A50102028000000097
-:10A47000A8010102000000002CEB02000300FFFF16
-:10A48000872F02002CEB02000300FFFFB32F020016
-:10A490002CEB02000300FFFF9D2F020058B80200C2
-:10A4A0006702000000000000000000000000000043
-:10A4B000000000000000000000000000000000009C
-:10A4C0005B260200D97C00000000000000000000B4
-:10A4D000000000000000000098B1020018A4020073
-:10A4E00078EA0200257D000058B80200A9000000AB
-:10A4F000717E00000000000000000000000000006D
-:10A50000000000000000000000000000000000004B
-:10A51000000000000000000000000000000000003B
-:10A520000000000078EA02003D81000078EA0200A5
-:10A530001D810000B4EA0200D180000078EA020028
-:10A54000FD80000078EA0200CF300200B4EA020089
-:10A55000A580000078EA02009D81000078EA0200F0
-:10A56000E57E000078EA0200BD81000078EA020082
-:10A57000857F000078EA0200BF300200B4EA0200E2
-:10A580007980000078EA02004180000078EA020049
-:10A590004D7F000078EA0200A17F000078EA020007
-:10A5A0002D7F0000B4EA0200118000002CEB0200B5
-:10A5B000020002004182000078EA0200D97F000018
-:10A5C000B4EA0200DD81000078EA0200097F0000A1
-:10A5D00078EA02007D81000078EA0200098200002A
-:10A5E00078EA02005D81000078EA0200AF300200E4
-:10A5F00098B10200F8A5020074C20200E700000052
-:10A600001C00000008A60200860F0000E6130000F0
-:10A61000F609000056F8ADC0C6140000DA0FC9C034
-:10A62000DE150000D8A50200E6140000C0A5020057
-:10A63000C611000064A50200B6130000ACA502001C
-:10A640000611000054A50200AE150000D0A50200BE
-:10A650005E160000E0A50200EE0F000024A5020037
-:10A660002E1000002CA50200461000003CA50200A0
-:10A670004E10000034A50200B610000044A50200F0
-:10A68000FE1000004CA50200D61100006CA50200CF
-:10A69000F611000074A50200FE1100007CA5020066
-:10A6A0000E12000084A502006E130000A4A5020093
-:10A6B00036140000B8A50200DE1200008CA50200CE
-:10A6C000E612000094A50200FE1200009CA5020004
-:10A6D000AE160000E8A502000E150000C8A5020095
-:10A6E000361100005CA5020058B80200E702000025
-:10A6F00000000000CD82000000000000000000000B
-:10A700000000000000000000000000005B260200C6
-:10A71000DF30020000000000000000000000000028
-:10A72000000000002CEB02000200FFFFB5830000D8
-:10A7300074C202000F0000000100000040A70200E8
-:10A740004E0F000024A70200D0A802000000000065
-:10A750000000000044A0020074AA020000000000F3
-:10A760000000000044A0020058B80200BC01000034
-:10A77000C9830000658300000000000000000000A5
-:10A7800000000000518400000000000000000000F4
-:10A7900000000000000000000000000094A802007B
-:10A7A0000000000058B80200BD010000C98300008D
-:10A7B00065830000000000000000000000000000B1
-:10A7C00051840000000000000000000000000000B4
-:10A7D000000000000000000094A80200000000003B
-:10A7E00058B80200BE010000C98300006583000064
-:10A7F0000000000000000000000000005184000084
-:10A800000000000000000000000000000000000048
-:10A810000000000094A802000000000058B80200E8
-:10A82000BF010000C9830000658300000000000034
-:10A830000000000000000000518400000000000043
-:10A840000000000000000000000000000000000008
-:10A850000000000030A7020058B80200C00100004C
-:10A86000C9830000658300000000000000000000B4
-:10A870000000000051840000000000000000000003
-:10A8800000000000000000000000000094A802008A
-:10A890000000000058B80200C2010000C983000097
-:10A8A00065830000000000000000000000000000C0
-:10A8B00051840000000000000000000000000000C3
-:10A8C00000000000000000001CA8020000000000C2
-:10A8D00058B80200C3010000C9830000658300006E
-:10A8E0000000000000000000000000005184000093
-:10A8F0000000000000000000000000000000000058
-:10A90000000000001CA802000000000058B802006F
-:10A91000C4010000C983000065830000000000003E
-:10A920000000000000000000518400000000000052
-:10A930000000000000000000000000000000000017
-:10A9400094A802000000000058B80200C5010000F1
-:10A95000C9830000658300000000000000000000C3
-:10A960000000000051840000000000000000000012
-:10A9700000000000000000000000000018AC020011
-:10A980000000000058B80200C6010000C9830000A2
-:10A9900065830000000000000000000000000000CF
-:10A9A00051840000000000000000000000000000D2
-:10A9B000000000000000000038AA020000000000B3
-:10A9C00058B80200C7010000C98300006583000079
-:10A9D00000000000000000000000000051840000A2
-:10A9E0000000000000000000000000000000000067
-:10A9F0000000000038AA02000000000058B8020061
-:10AA0000C8010000C9830000658300000000000049
-:10AA10000000000000000000518400000000000061
-:10AA20000000000000000000000000000000000026
-:10AA30001CA802000000000058B80200C901000074
-:10AA4000C9830000658300000000000000000000D2
-:10AA50000000000051840000000000000000000021
-:10AA600000000000000000000000000094A80200A8
-:10AA70000000000058B80200CA010000C9830000AD
-:10AA800065830000000000000000000000000000DE
-:10AA900051840000000000000000000000000000E1
-:10AAA000000000000000000094A802000000000068
-:10AAB00058B80200CB010000C98300006583000084
-:10AAC00000000000000000000000000051840000B1
-:10AAD0000000000000000000000000000000000076
-:10AAE0000000000094A802000000000058B8020016
-:10AAF000CD010000C9830000658300000000000054
-:10AB00000000000000000000518400000000000070
-:10AB10000000000000000000000000000000000035
-:10AB2000A0AB02000000000058B80200CE010000F7
-:10AB3000C9830000658300000000000000000000E1
-:10AB40000000000051840000000000000000000030
-:10AB500000000000000000000000000094A80200B7
-:10AB60000000000058B80200D0010000C9830000B6
-:10AB700065830000000000000000000000000000ED
-:10AB800051840000000000000000000000000000F0
-:10AB9000000000000000000068A7020000000000A4
-:10ABA00058B80200D1010000C9830000658300008D
-:10ABB00000000000000000000000000051840000C0
-:10ABC0000000000000000000000000000000000085
-:10ABD0000000000094A802000000000058B8020025
-:10ABE000D2010000C983000065830000000000005E
-:10ABF0000000000000000000518400000000000080
-:10AC00000000000000000000000000000000000044
-:10AC100094A802000000000058B80200D301000010
-:10AC2000C9830000658300000000000000000000F0
-:10AC3000000000005184000000000000000000003F
-:10AC400000000000000000000000000094A80200C6
-:10AC50000000000058B80200D4010000C9830000C1
-:10AC600065830000000000000000000000000000FC
-:10AC700051840000000000000000000000000000FF
-:10AC800000000000000000001CA8020000000000FE
-:10AC900058B80200D5010000C98300006583000098
-:10ACA00000000000000000000000000051840000CF
-:10ACB0000000000000000000000000000000000094
-:10ACC0000000000094A802000000000058B8020034
-:10ACD000D6010000C9830000658300000000000069
-:10ACE000000000000000000051840000000000008F
-:10ACF0000000000000000000000000000000000054
-:10AD000008AD02000000000058B80200D7010000A2
-:10AD1000C9830000658300000000000000000000FF
-:10AD2000000000005184000000000000000000004E
-:10AD300000000000000000000000000094A80200D5
-:10AD40000000000058B80200D8010000C9830000CC
-:10AD5000658300000000000000000000000000000B
-:10AD6000518400000000000000000000000000000E
-:10AD7000000000000000000068A7020000000000C2
-:10AD800000960200AA0E030008960200DB0E0300E4
-:10AD900024960200400F03001C960200BE0F030021
-:10ADA0002C9602000310030084E902003710030010
-:10ADB0006CE902008E10030074E90200C610030063
-:10ADC0007CE90200FE10030054BC02008C11030059
-:10ADD00060BC0200D811030074BC020024120300FE
-:10ADE0007CBC0200661203006CBC0200E11203008E
-:10ADF0008C990200451303009C9902007D13030007
-:10AE000094990200201403005C990200AC14030022
-:10AE1000649902004115030074990200A41503000F
-:10AE20007C9902005016030084990200FC1603006E
-:10AE30006C990200A81703001C000020DD17030016
-:10AE40001CC00200FB17030004C00200A818030086
-:10AE5000D4BF020041190300DCBF02006C190300DB
-:10AE600010C00200FD190300F4BF0200861A03009F
-:10AE7000ECBF0200A81A0300E4BF0200CC1A0300D2
-:10AE8000FCBF02001A1B0300ACA20200751B0300EA
-:10AE9000F4A20200A41B030004A30200D31B0300BE
-:10AEA0000CA30200021C030014A30200311C0300C7
-:10AEB0001CA30200601C030024A302008F1C0300DB
-:10AEC0002CA30200BE1C030034A30200ED1C0300EF
-:10AED0003CA302001C1D0300B4A202004B1D030092
-:10AEE000BCA202007B1D0300C4A20200AB1D030034
-:10AEF000CCA20200DB1D0300D4A202000B1E030043
-:10AF0000DCA202003B1E0300E4A202006B1E030051
-:10AF1000ECA202009B1E0300FCA20200CB1E030059
-:10AF200074A30200FB1E030054A30200591F030078
-:10AF30006CA30200A31F03004CA30200F91F03002F
-:10AF400044A302006D20030014BE0200CB200300C6
-:10AF50001CBE02006921030028BE0200B4210300C8
-:10AF600008BE02000A22030008E502004C2203008A
-:10AF700044E5020040230300CCE402006A230300FE
-:10AF8000C4E4020095230300DCE40200242403004F
-:10AF9000F0E40200AF240300F8E4020000250300FF
-:10AFA00000E5020053250300E8E4020099250300B0
-:10AFB000B0E40200E3250300B8E402001626030013
-:10AFC000D4E40200CB2603006400002056270300CF
-:10AFD000A0E602009B27030098E602003028030049
-:10AFE00068EB02009828030080EB0200E9280300C8
-:10AFF00074EB02002C2903008CEB0200AC29030047
-:10B0000054000020F8290300D8D70200592A030071
-:10B01000F0D702000C2B0300E4D70200542B0300EE
-:10B02000F8D702007C2B030024D10200492C030036
-:10B030000CD10200982C0300ECD00200072D030075
-:10B04000F8D00200A72D0300E4D00200382E030040
-:10B0500018D10200912E030004D10200BB2E030080
-:10B0600014980200FB2E0300E4B90200162F03001F
-:10B07000DCB902009A2F030014BD0200E62F030082
-:10B080000CBD02001F30030058B802003D02000052
-:10B090009D870000FD870000000000003D87000044
-:10B0A0001B3402000000000000000000000000004F
-:10B0B0000000000000000000000000000000000090
-:10B0C00000000000CF00000019000000D0B0020016
-:10B0D000760F000068B90200761000005C9D020047
-:10B0E000AE0C000078BE020026100000A8980200F6
-:10B0F000C616000090BC02000E17000050E80200C7
-:10B10000E6130000F0A5020056160000209702008A
-:10B110003612000044E10200BE000000009602006A
-:10B12000F606000024D10200EE000000E4B902009F
-:10B13000FE000000149802000601000014BD020089
-:10B140001E0C00003CC30200360C0000B8C0020018
-:10B150009E0C000020D60200560D00001097020041
-:10B160006E0C0000E49B02000E0D0000D8A402004B
-:10B1700016170000B4990200F60C0000CCD60200AD
-:10B18000AE00000090BC0200B600000050E80200D3
-:10B1900096160000B499020058B802008702000019
-:10B1A000258A0000000000000000000000000000F0
-:10B1B00000000000598A00000000000000000000AC
-:10B1C000000000000000000000000000000000007F
-:10B1D0000000000006000000000000000000000069
-:10B1E00000000000000000002D000000D535020026
-:10B1F00025000000D535020026000000D5350200EC
-:10B200009F000000758E00002F000000758E00006A
-:10B21000DE000000758E00008D010000D5350200B3
-:10B2200030000000D5350200D4000000758E00000B
-:10B230007D010000758E000028000000D735020057
-:10B240002CEB020000000100058F000058B802003E
-:10B250009102000000000000E13502000000000043
-:10B2600000000000000000000000000000000000DE
-:10B2700000000000000000000000000000000000CE
-:10B280000000000000000000B4EA020095910000F8
-:10B29000B4EA02002991000058B8020067020000D9
-:10B2A000000000000000000000000000000000009E
-:10B2B0000000000000000000000000005B2602000B
-:10B2C0001F36020000000000000000000000000027
-:10B2D0000000000074C2020017000000020000001D
-:10B2E000E4B202001610000088B20200CE11000085
-:10B2F00090B2020058B80200040200003594000029
-:10B300004136020000000000ED9000004592000070
-:10B3100000000000C1940000159100000000000032
-:10B32000FD3502000000000000000000D4B2020061
-:10B3300058B8020010020000359400006595000026
-:10B3400000000000ED9000004592000000000000A9
-:10B35000C19400001591000000000000FD350200BE
-:10B360000000000000000000D4B2020058B8020043
-:10B370003B020000000000007336020000000000E5
-:10B3800000000000000000000000000000000000BD
-:10B390005B260200C99500000000000000000000CC
-:10B3A000000000000000000058B802006702000022
-:10B3B000000000000000000000000000000000008D
-:10B3C0000000000000000000000000005B260200FA
-:10B3D000FD950000000000000000000000000000DB
-:10B3E00000000000E8B3020058B80200CC010000E1
-:10B3F0006996000000000000000000007F260200A7
-:10B40000000000000000000000000000000000003C
-:10B41000000000000000000000000000000000002C
-:10B420000000000008E502000951815F08E5020004
-:10B4300001047D4408E5020001C4554208E502000C
-:10B44000011C531108E502000967140408E5020015
-:10B450000184544708E50200094150CC08E5020088
-:10B460000110957108E5020001447C4108E50200E5
-:10B470000160030708E5020009FB93BF08E502002D
-:10B4800001AAAAAA08E502000160100008E502006E
-:10B490000142100008E502000184100008E50200E6
-:10B4A0000108110008E502000100130008E5020090
-:10B4B0000100700008E502000100100C08E5020020
-:10B4C0000100108408E502000100104208E50200B6
-:10B4D0000100102108E502000100900108E50200CA
-:10B4E00001001C0008E502000940015508E50200C2
-:10B4F00001317E4708E502000144454508E50200A8
-:10B500000180280208E5020001E6780708E502004C
-:10B51000017F03E508E5020009BFFE5F08E50200C0
-:10B52000014308A708E50200014081E808E50200A0
-:10B5300001EA7F4708E502000140390208E5020000
-:10B5400001C47DA708E50200010A202208E50200E7
-:10B550000184907308E502000184D17308E50200BC
-:10B56000095ECABD08E502000951111508E502008F
-:10B57000097E9DE708E5020001B57E4208E502006C
-:10B5800001A5BCF508E502000118FFAF08E50200BF
-:10B590000940011708E5020009117CCA08E502000C
-:10B5A00001AE7EE708E50200010080E808E5020040
-:10B5B00001632B0708E50200093FC6F808E5020011
-:10B5C00001C0290708E5020009E4131508E5020097
-:10B5D000010A104508E502000184104708E5020051
-:10B5E00001C46D4708E5020001C07D0508E50200C1
-:10B5F000096194F408E502000180A80F08E5020043
-:10B6000001FB3BE708E5020001EE936208E502005A
-:10B6100009C411F708E502000100A22200000000A1
-:10B620000000000079960000A53602000F390200E4
-:10B630000F39020069A50000273C02000F39020003
-:10B6400025A00000773A0200399800000F39020067
-:10B650002DAA000001AA000059AC0000FF3802002A
-:10B66000E13F0200299800009545020091A90000E1
-:10B6700005A9000029B000006D440200C943020082
-:10B6800039A10000313E0200073D02000F390200DF
-:10B690006F4302004F3802004F3802001F3B020088
-:10B6A000153B0200CB3A0200293B02007D9A0000C4
-:10B6B000C13A0200B73A0200AD3A0200D199000047
-:10B6C000D1990000D1990000BB3F0200253902004A
-:10B6D00089B000005D3F0200CB3E020011AD0000CA
-:10B6E0009B3D0200EF38020063370200773A020008
-:10B6F0002F3A0200133A0200773A0200D1380200D2
-:10B70000853D02009DAC00003D3C020000000000B1
-:10B710000000000000000000000000000000000029
-:10B72000D9010000FA010000000000000000000044
-:10B730000000000000000000000000000000000009
-:10B7400000000000000000000000000000000000F9
-:10B7500000000000000000000000000000000000E9
-:10B7600000000000000000000000000000000000D9
-:10B77000ED010000E6010000E1010000EB01000026
-:10B78000E301000000000000DE01000000000000F6
-:10B7900001000000B4EA0200D5480200B4EA020049
-:10B7A000B1BD000058B802001802000000000000FF
-:10B7B00055470200000000000000000000000000EB
-:10B7C0000000000000000000000000000000000079
-:10B7D0000000000000000000000000000000000069
-:10B7E00058B80200BE0200000000000055470200E9
-:10B7F0000000000000000000000000000000000049
-:10B800000000000000000000000000000000000038
-:10B8100000000000000000000000000058B8020016
-:10B82000C702000035BA000079470200000000009E
-:10B830000000000000000000E9B700000000000068
-:10B8400000000000000000000000000000000000F8
-:10B85000000000000000000058B80200D7020000FD
-:10B8600059B8000079BC000075BA00007F260200BC
-:10B8700000000000A14702000000000000000000DE
-:10B8800000000000000000000000000000000000B8
-:10B8900000000000DA010000EC010000E7010000F8
-:10B8A0000000000000000000000000000100000097
-:10B8B0001FB14F0A9595E62477CC2B3217B7D138B4
-:10B8C0000AD7233CCDCCCC3DAEC59D74CA1B0E5AC5
-:10B8D00020BCBE4C00401C460000C8420000204175
-:10B8E0002CEB0200040003005DC200002CEB020000
-:10B8F0000600040015C30000A4B70200ECB8020063
-:10B9000074C20200170000000200000010B902001B
-:10B9100016120000F8B80200A616000020B90200B6
-:10B920002CEB02000600040095C2000058B802008B
-:10B93000540200006349020001C40000000000003E
-:10B9400065F800003DF90000000000000000000064
-:10B9500000000000000000000000000000000000E7
-:10B960000000000000B9020098B10200C82E0020BB
-:10B9700058B802004502000000000000000000006E
-:10B9800065D700000000000000000000000000007B
-:10B9900000000000000000000000000000000000A7
-:10B9A0000000000000000000000000003CEA02006F
-:10B9B000E1D7000074C202001F0000000300000075
-:10B9C000C4B90200860F0000EE0000004E0F000018
-:10B9D000ACB90200F6000000DCB902003CEA02004B
-:10B9E000C1D7000098B10200B4B902004CA0020017
-:10B9F0000800000034B402003CB402002CB4020081
-:10BA000054B402004CB402005CB4020064B40200FE
-:10BA100044B402004CA002000C00000094B40200E8
-:10BA20009CB40200A4B40200ACB40200B4B402009E
-:10BA3000BCB40200C4B40200CCB40200D4B402000E
-:10BA4000DCB4020084B402008CB402000100E20401
-:10BA50000000000000FC00000000000000000000EA
-:10BA600000000000000000000000000000000000D6
-:10BA700000000000000000000000000094BA020076
-:10BA80000200000094BA02000400000094BA020010
-:10BA90000100000058B802007E020000FDDB00003B
-:10BAA0000000000000000000000000000000000096
-:10BAB0000000000011DC0000000000000000000099
-:10BAC0000000000000000000000000000000000076
-:10BAD00019360000C1360000000000000000000020
-:10BAE0002CEB02000800040061E5000058B80200D9
-:10BAF0009A010000000000000000000000000000AB
-:10BB00000000000000000000000000000000000035
-:10BB1000000000000000000000000000D0BA020099
-:10BB20000000000030BB020078EA020051E500008E
-:10BB300074C202004F0000000900000040BB020078
-:10BB4000CE10000028BB0200960C000088BB02004B
-:10BB5000060F000084940200160F0000E0BA0200F5
-:10BB6000E60C000090BB0200AE06000068EB02008D
-:10BB7000CE0B000074EB0200C60B000080EB02004D
-:10BB8000B60600008CEB020078EA020011350000D6
-:10BB900078EA02003DE5000058B802009B01000071
-:10BBA0000000000000000000000000000000000095
-:10BBB0000000000000000000000000000000000085
-:10BBC0000000000000000000E0BB020000000000D8
-:10BBD00030BB02002CEB02000200020071E5000005
-:10BBE00019360000C136000000000000010000000E
-:10BBF00058B80200B1000000000000000000000082
-:10BC00000000000000000000000000000000000034
-:10BC10000000000000000000000000000000000024
-:10BC200000000000000000002CBC020074C20200F2
-:10BC30001F000000030000003CBC0200A60500003D
-:10BC400074BC0200AE0500007CBC0200B60500001A
-:10BC50006CBC0200F0BB02001CA30200000000004C
-:10BC6000F0BB0200BCA202000100000078EA020062
-:10BC700049E6000078EA0200FDE5000078EA0200EB
-:10BC800021E60000000001000000020000000400A6
-:10BC900098B1020098BC020074C202001F000000AC
-:10BCA00003000000A8BC0200860F0000C6160000BA
-:10BCB00076140000289C02007E0E0000B0C2020034
-:10BCC0003CEA0200CDEA000074C202001F0000003E
-:10BCD00003000000D8BC0200860F0000060100002F
-:10BCE0004E0F0000C0BC02000E0100000CBD02009F
-:10BCF00000000000398EE33D398E633E398EE33E0D
-:10BD0000ABAA2A3F721C473F0000803F3CEA02007A
-:10BD1000CDEA000098B10200C8BC0200214B02002D
-:10BD20002B4B0200174D02002F4D02002B4C02003E
-:10BD3000554C02006D4C0200854C02009D4C0200E7
-:10BD4000C94C0200E34C0200FD4C020058B802004E
-:10BD5000D300000000000000000000000000000010
-:10BD600000000000000000000000000000000000D3
-:10BD700000000000000000000000000000000000C3
-:10BD80000000000090BD020078EA02009DEE000075
-:10BD900074C202002700000004000000A0BD0200E1
-:10BDA000760B000008BE02007E15000088BD020070
-:10BDB000AE0600001CBE0200B606000028BE02004F
-:10BDC000DB000200A0860100DC000300E4B30200F7
-:10BDD000DD000300E4B30200D70002010000000010
-:10BDE000D800020100000000DA000100000000009D
-:10BDF000D700020100000000D9000301000000008C
-:10BE0000DA000100000000002CEB02000300FFFF3D
-:10BE100095ED00004CBD0200DC2900202CEB020057
-:10BE20000300FFFFE9ED00002CEB02000300FFFF21
-:10BE300045EE00003CEA020071EF00003CEA02001F
-:10BE400061EF000078EA02004DEF00002CEB0200E9
-:10BE50000000010015EF00002CEB020000000100C3
-:10BE6000C1EF00002CEB02000000010081EF000098
-:10BE70003CEA0200CB53020098B1020080BE0200EF
-:10BE800074C202004F0000000900000090BE0200D2
-:10BE9000860F0000AE0C0000F61000008494020033
-:10BEA000A614000058BE0200261400004CBE02007A
-:10BEB0000615000064BE0200E615000070BE020018
-:10BEC0006E12000034BE0200761200003CBE02007A
-:10BED0004E13000044BE02000500000005000000F3
-:10BEE00003000000090000000D040000E841030009
-:10BEF00058B802009C000000000000000000000094
-:10BF00000000000000000000000000000000000031
-:10BF10000000000000000000000000000000000021
-:10BF200000000000000000002CBF020074C20200EC
-:10BF30004F000000090000003CBF0200A602000004
-:10BF4000DCBF02009E02000010C0020006050000D7
-:10BF50001CC002000E05000004C002002E0C0000F0
-:10BF6000D4BF02006E050000F4BF02007605000099
-:10BF7000ECBF02007E050000E4BF020026150000B1
-:10BF8000FCBF02004E00030100000000A2000200FE
-:10BF9000900100008501010200000000A5000102DF
-:10BFA00001000000A600010200000000AA00030139
-:10BFB00000000000A200020096000000A50001029F
-:10BFC000010000005900010200000000A60001026B
-:10BFD0000000000078EA020085F60000F0EA0200A6
-:10BFE000BF54020078EA020095F0000078EA0200EF
-:10BFF000A9F0000078EA02001DF7000078EA0200CC
-:10C0000005F100002CEB02000300FFFFD5F5000056
-:10C010002CEB020008000400CDF600002CEB02001F
-:10C020000300FFFFD5F400002CEB0200000001002C
-:10C03000DDF7000078EA020001F800003CEA0200A7
-:10C04000C1F70000B4EA02001D550200B4EA020084
-:10C0500081F700002CEB02000200030047550200AC
-:10C0600074C20200470000000800000078C002000F
-:10C0700078EA0200B1550200860F0000360C00007D
-:10C080003E0C000070C00200460C000028C00200F8
-:10C090004E0C000054C00200560C000044C00200C8
-:10C0A0005E0C000034C00200360C00003CC00200F0
-:10C0B000660C00004CC0020098B1020060C0020093
-:10C0C00058B802000100000000000000000000005D
-:10C0D0000000000000000000000000000000000060
-:10C0E0000000000000000000000000000000000050
-:10C0F00000000000000000000000000078EA0200DC
-:10C10000CDFB000078EA02001D5802002CEB020073
-:10C1100004000300D1FF0000A4B702000CC102001C
-:10C120002CEB0200040003006B57020078EA0200C7
-:10C1300065FF000078EA020081FF000074C202007F
-:10C14000770000000E0000004CC102002E0C000021
-:10C15000FCC002003E05000004C102001E120000E7
-:10C1600018C102004612000020C102002E13000078
-:10C170002CC102005E13000034C10200D61400007E
-:10C18000BCC10200DE140000C8C10200A6150000F8
-:10C19000D0C10200FE160000DCC10200261700001C
-:10C1A000E8C102002E0F0000F8E00200C60F0000F8
-:10C1B00000E10200FE0E0000F0E002002CEB0200A5
-:10C1C000040003006157020078EA0200B1FD00009C
-:10C1D0002CEB020004000300575702002CEB020076
-:10C1E0000300FFFFD1FC000078EA0200B1FB000071
-:10C1F00058B80200670200000000000000000000C4
-:10C20000000000000000000000000000000000002E
-:10C21000000000005B260200B3570200000000008F
-:10C2200000000000000000000000000058B80200FC
-:10C230002802000059FC000000000000000000007F
-:10C2400000000000ED5702000000000000000000A8
-:10C2500099FB00000000000000000000000000004A
-:10C260000000000000000000C0420300CB420300B9
-:10C27000D542030058B8020027020000D1FE00009A
-:10C280001D00010000000000DDFB0000F5FD0000C6
-:10C29000000000006D0001007DFB000000000000B8
-:10C2A0000000000000000000000000003CC102008F
-:10C2B00058B80200CF010000D1FE00001D000100AF
-:10C2C00000000000DDFB0000F5FD000000000000A4
-:10C2D0006D0001007DFB0000000000000000000078
-:10C2E0000000000074C202003CC1020078EA0200B3
-:10C2F000AD00010078EA0200E101010074C2020011
-:10C3000017000000020000001CC3020074C20200FB
-:10C3100017000000020000002CC302002E0C0000D9
-:10C32000F4C2020006050000ECC20200860F000005
-:10C330001E0C0000260C000044C3020098B102004D
-:10C340000CC3020058B80200840100000000000085
-:10C350006D01010000000000A7580200000000006D
-:10C3600000000000D50001000000000000000000F7
-:10C37000000000000000000000000000FCC20200FD
-:10C38000A2000000A7000000A70000007F0000003E
-:10C3900080000000E20000003C0000003C000000C3
-:10C3A0000000000000000000E10000003C00000070
-:10C3B0003B0000000000000000000000C80000007A
-:10C3C0000000000000000000360000003700000000
-:10C3D000C700000000000000000000003600000060
-:10C3E0003600000000000000000000000A0000000D
-:10C3F000E8020000364F0300394F0300434F0300AB
-:10C40000474F03004B4F03004F4F0300554F0300AE
-:10C410005B4F0300634F0300674F03008A4F030025
-:10C42000954F0300A04F0300AD4F0300BA4F030028
-:10C43000C64F0300D24F0300DD4F0300E74F030058
-:10C44000EF4F0300F64F0300FE4F03000C500300B4
-:10C450001550030020500300285003003050030003
-:10C460003F50030047500300555003005C50030049
-:10C4700066500300745003007B5003008650030095
-:10C480009B500300B6500300C9500300D85003006E
-:10C49000E8500300F6500300055103001951030052
-:10C4A0003A5103005B5103006851030071510300CE
-:10C4B0007E510300875103008F5103009451030004
-:10C4C0009F510300AC510300B3510300BA51030064
-:10C4D000C1510300C8510300CF510300D6510300DE
-:10C4E000DD510300E4510300EB510300F25103005E
-:10C4F000FA510300025203000A52030012520300D1
-:10C500001A520300225203002A520300325203003F
-:10C510003A52030045520300505203005A5203009E
-:10C5200066520300705203008052030088520300D9
-:10C530009052030098520300A1520300AA52030034
-:10C54000B1520300BD520300C9520300D65203008A
-:10C55000E4520300EF520300FC52030008530300AF
-:10C560000F53030017530300255303002D530300FB
-:10C57000335303003B530300465303004E53030061
-:10C5800057530300635303006B53030076530300B8
-:10C590007C5303008253030087530300915303002D
-:10C5A0009A530300A3530300AC530300B553030095
-:10C5B000BE530300C7530300D0530300D9530300F5
-:10C5C000E2530300EC530300F6530300005403004E
-:10C5D0000B54030015540300205403002A54030095
-:10C5E000355403003F5403004A54030055540300DC
-:10C5F00065540300725403007C5403008C54030000
-:10C6000095540300A4540300AD540300B354030035
-:10C61000C4540300D3540300E3540300EF54030055
-:10C62000F6540300FF54030008550300115503009E
-:10C630001F550300265503002E55030039550300EE
-:10C6400045550300535503005B5503006355030034
-:10C650006D55030075550300805503008855030090
-:10C6600095550300A2550300B4550300C5550300BA
-:10C67000D8550300E2550300E9550300F2550300C5
-:10C68000FA550300035603000B560300125603002D
-:10C690001956030020560300275603002F560300A7
-:10C6A0003656030044560300565603005B560300FB
-:10C6B0006156030069560300725603008356030057
-:10C6C0008E56030099560300A6560300B456030085
-:10C6D000C2560300DA560300EA560300F25603007E
-:10C6E000FA560300025703000F57030021570300B7
-:10C6F0002E5703003C5703004B57030050570300CD
-:10C70000575703005E570300665703007057030036
-:10C710007C570300875703008C5703009157030091
-:10C72000965703009E570300B0570300BA57030003
-:10C73000C4570300D4570300E0570300F457030025
-:10C7400009580300175803001D580300245803001C
-:10C750002C58030033580300375803003D5803009A
-:10C76000465803004D58030053580300595803001E
-:10C77000615803006D580300785803008058030087
-:10C78000865803008D58030099580300A5580300EC
-:10C79000AB580300B3580300BB580300C55803004F
-:10C7A000D0580300D8580300E0580300EC580300A9
-:10C7B000FA580300045903000B59030017590300EA
-:10C7C00021590300285903002E5903003B59030047
-:10C7D00046590300505903005C5903006559030092
-:10C7E000705903007C590300865903008A590300DD
-:10C7F0008F590300965903009D590300A259030065
-:10C80000A7590300AE590300B5590300BB590300F3
-:10C81000C1590300C7590300CD590300D159030082
-:10C82000D8590300DD590300E2590300E959030018
-:10C83000F0590300F5590300FC590300025A0300A4
-:10C84000085A03000C5A0300115A0300175A030038
-:10C850001F5A0300275A03002E5A0300355A0300BB
-:10C860003C5A0300415A0300485A03004F5A030040
-:10C87000545A03005B5A0300625A0300695A0300CA
-:10C880006E5A0300755A03007C5A0300835A030052
-:10C890008A5A0300905A0300965A03009C5A0300D8
-:10C8A000A25A0300A85A0300AC5A0300B15A03006D
-:10C8B000B95A0300C05A0300C75A0300CC5A0300F8
-:10C8C000D15A0300D85A0300DD5A0300E45A03008A
-:10C8D000EB5A0300F15A0300F75A0300FD5A030014
-:10C8E000035B0300095B03000F5B0300155B0300A0
-:10C8F000195B0300205B0300255B03002C5B030036
-:10C90000315B0300385B03003E5B0300445B0300C4
-:10C910004A5B0300505B0300565B03005C5B030053
-:10C92000625B0300695B03006D5B0300725B0300E5
-:10C93000785B0300805B0300875B03008E5B030072
-:10C94000955B03009A5B0300A05B0300A65B0300FA
-:10C95000AC5B0300B25B0300B85B0300BC5B03008D
-:10C96000C15B0300C85B0300CF5B0300D65B030021
-:10C97000DB5B0300E25B0300E95B0300EE5B0300AB
-:10C98000F55B0300FB5B0300015C0300075C030035
-:10C990000D5C0300115C0300185C03001E5C0300C7
-:10C9A000245C03002A5C0300395C0300405C030044
-:10C9B000475C0300525C0300595C0300625C0300A7
-:10C9C000695C0300705C0300755C03007A5C030023
-:10C9D000805C03008A5C0300955C0300A05C03009C
-:10C9E000A65C0300AD5C0300BB5C0300C15C0300FC
-:10C9F000C85C0300CF5C0300D65C0300DD5C030071
-:10CA0000EE5C0300F95C0300045D03000C5D0300B1
-:10CA1000155D0300235D03002A5D0300365D0300FE
-:10CA2000405D0300495D0300535D03005B5D03004F
-:10CA3000685D0300755D03007E5D0300895D030092
-:10CA4000905D0300955D03009D5D0300AB5D0300F9
-:10CA5000B55D0300C05D0300CA5D0300D45D030043
-:10CA6000DE5D0300E75D0300F25D0300FC5D030093
-:10CA7000065E03000D5E03001A5E0300235E0300E2
-:10CA8000295E0300355E03003C5E0300455E030043
-:10CA90004D5E0300555E03005D5E0300695E0300AA
-:10CAA000715E03007A5E0300875E0300975E0300F9
-:10CAB0009E5E0300A85E0300BD5E0300CC5E030023
-:10CAC000D55E0300DD5E0300E75E0300EF5E03005A
-:10CAD000FB5E0300055F03000D5F03001C5F0300A6
-:10CAE000295F0300365F0300485F0300595F0300BE
-:10CAF0006A5F03007A5F0300855F0300905F0300B5
-:10CB00009C5F0300AC5F0300BA5F0300CD5F0300CE
-:10CB1000DA5F0300E55F0300F95F030007600300CD
-:10CB200015600300216003002C60030042600300D5
-:10CB30004C6003005A6003006A60030079600300E0
-:10CB40008960030097600300A4600300B0600300E5
-:10CB5000BF600300CC600300E0600300EA600300F4
-:10CB6000F560030007610300126103001E6103000A
-:10CB70002D6103003B610300476103005061030026
-:10CB80005B61030064610300726103008061030064
-:10CB90008961030094610300A1610300AC6103009B
-:10CBA000B7610300C0610300CA610300D3610300E1
-:10CBB000DE610300EB610300F66103000062030025
-:10CBC0000B62030016620300256203003662030055
-:10CBD00041620300506203005E620300686203006A
-:10CBE0007262030082620300886203008F620300A6
-:10CBF000956203009D620300A3620300AA62030022
-:10CC0000B3620300BA620300C2620300C962030098
-:10CC1000D5620300DB620300E2620300EA62030004
-:10CC2000F0620300F5620300FC6203000B63030083
-:10CC3000166303001B6303002763030032630300D2
-:10CC40003E63030046630300516303005C6303001B
-:10CC50006363030069630300776303007F6303007A
-:10CC6000896303008F630300956303009F630300E0
-:10CC7000A7630300B2630300B8630300C06303004B
-:10CC8000C8630300D0630300D7630300E1630300BC
-:10CC9000EB630300F2630300FE6303000B64030015
-:10CCA0001F640300256403002F6403003D64030038
-:10CCB0004764030050640300596403006664030082
-:10CCC0006C64030077640300836403008A640300D8
-:10CCD00091640300986403009E640300A76403004A
-:10CCE000AE640300B7640300BE640300C6640300BF
-:10CCF000CE640300D5640300DE640300E664030031
-:10CD0000F3640300FE6403000A6503001565030075
-:10CD10001A650300266503002C65030036650300D1
-:10CD2000406503004A650300516503005D6503002B
-:10CD30006B6503007165030076650300876503007A
-:10CD40008F650300986503009E650300AD650300D1
-:10CD5000C3650300CD650300D7650300E4650300E8
-:10CD6000F0650300FB650300036603001066030023
-:10CD70001A660300226603002C660300396603006E
-:10CD800044660300516603005B66030063660300AC
-:10CD90006A660300756603007C660300876603000D
-:10CDA0008D660300946603009C660300A46603007E
-:10CDB000AA660300B1660300B9660300C0660300FB
-:10CDC000C6660300CD660300D6660300DF66030077
-:10CDD000E5660300ED660300F3660300F9660300F1
-:10CDE00002670300086703000F670300156703006D
-:10CDF0001B670300236703002B67030032670300F0
-:10CE00003E67030049670300546703005A67030045
-:10CE1000616703006A670300746703007A670300B1
-:10CE2000816703008867030090670300966703002B
-:10CE3000A3670300AA670300B0670300B967030094
-:10CE4000BF670300C6670300D2670300D86703000B
-:10CE5000DF670300EB670300F0670300FB67030075
-:10CE6000016803000B6803001168030019680300E0
-:10CE70002B680300326803003E6803004868030023
-:10CE800050680300576803006A6803007368030072
-:10CE90007D680300846803008E68030099680300BE
-:10CEA000A1680300AA680300B2680300BB6803001E
-:10CEB000C4680300CB680300D2680300D86803008D
-:10CEC000DE680300E8680300F5680300FB68030000
-:10CED0000669030011690300186903002169030052
-:10CEE00029690300306903003C69030049690300B4
-:10CEF000586903005F690300656903006C690300FA
-:10CF0000746903007B690300836903008969030076
-:10CF10008F69030097690300AE690300CC690300C1
-:10CF2000D2690300D8690300E4690300EC690300D7
-:10CF3000F8690300056A0300106A03001B6A030016
-:10CF4000226A0300326A03003D6A0300456A030057
-:10CF50004D6A0300546A0300636A03006A6A0300AF
-:10CF6000716A0300796A0300856A03008E6A030010
-:10CF70009C6A0300A56A0300AD6A0300B76A030058
-:10CF8000BF6A0300C76A0300D06A0300DF6A0300B8
-:10CF9000E56A03003CEA0200C50E010074C202000B
-:10CFA000EF0000001D000000ACCF0200860F000063
-:10CFB000F60600004E0F000094CF0200C6000000ED
-:10CFC00004D10200260700000CD102002E07000049
-:10CFD000E4D002001E070000F8D002000E07000097
-:10CFE000ECD00200960B000018D102006E07000082
-:10CFF00014DA02007607000044DA0200BE070000DF
-:10D00000C0DD0200A607000000DD02009E07000050
-:10D0100050DB0200D607000038E00200860700005F
-:10D02000C8DA02005E070000A4D80200560700001C
-:10D0300038D80200E607000098E002007E070000F2
-:10D0400094DA0200C6070000C8DE0200CE07000026
-:10D05000F4DE02004607000010D802006607000058
-:10D060006CD902004E07000000D80200DE07000065
-:10D0700074E002009607000034DB02008E07000017
-:10D0800018DB0200B6070000A0DD0200AE070000BA
-:10D0900080DD0200DE00030100000000E20003006A
-:10D0A000ACA20200A500010001000000A6000100E2
-:10D0B00000000000DF00020100000000E0000200AC
-:10D0C000FFFFFFFFE2000300ACA20200A500010089
-:10D0D00001000000E700020200000000E60002027A
-:10D0E000000000003CEA0200A10C01002CEB020051
-:10D0F0000100FFFF090E01002CEB02000100FFFF01
-:10D10000510D01003CEA0200550C01002CEB02001D
-:10D110000100FFFF110D01002CEB020000000100D7
-:10D12000C90C010098B102009CCF020058B802005F
-:10D130001A02000000000000000000008F590200E9
-:10D1400000000000000000000000000000000000DF
-:10D1500000000000000000000000000000000000CF
-:10D1600000000000000000004F6B030011350300B9
-:10D17000556B03005A6B0300646B0300686B03007C
-:10D180006B6B0300726B030081390300786B030043
-:10D1900094870300816B0300856B03008A6B030097
-:10D1A0008F6B0300966B0300620D0300976A030008
-:10D1B000B8360300876B0300820D0300C6500300DE
-:10D1C000595003009E6B03001A370300A56B030040
-:10D1D000630D0300AB570300CE820300A96B03006D
-:10D1E000660D03005C0D030072640300B06B030066
-:10D1F00078EA02000918010074C202001F00000052
-:10D200000300000008D20200CE100000F0D102009E
-:10D21000760D000020D202006E16000028D2020017
-:10D22000B4EA0200E15B02002CEB020004000400FF
-:10D23000D517010058B8020047020000AD160100E2
-:10D2400000000000000000007F2602000000000037
-:10D2500000000000000000005B260200F91701003A
-:10D26000000000000000000000000000F8D10200F3
-:10D2700058B8020047020000000000000000000053
-:10D280005D1601007F260200000000000000000083
-:10D29000000000000000000000000000000000008E
-:10D2A000000000000000000000000000FCF8020088
-:10D2B00000F902004CF8020026F9020014FA0200FC
-:10D2C000BAF80200D4FA020066F80200D4F90200AB
-:10D2D000DAF7020048F80200FCF90200D2FB020073
-:10D2E000EAF9020092F9020074F902003EF9020024
-:10D2F000B8F902006CF7020044F9020092FB020048
-:10D3000016F9020004FB0200AAFB020080FA0200E8
-:10D31000A4FA02009EF90200A8F90200CEF9020068
-:10D3200028F70200C4F9020030F802003AFA0200BD
-:10D33000B4F80200BAFB020022F7020002FA02006F
-:10D340005AF7020084FA0200EEF80200DEF9020049
-:10D35000AEF70200B8F70200A2F702009AF7020047
-:10D36000F6FA0200EEFA0200FEFA02006AFA020081
-:10D370004CFA020052FA0200B0FA020078F80200F9
-:10D38000DEF70200CCFB0200000000001AFA0200E7
-:10D3900004F90200AAF80200B0F8020058F80200EE
-:10D3A00062F8020052F8020038F9020038FB02006D
-:10D3B00052FB02005AFB020062FB020044FB020027
-:10D3C0003EFB02004CFB0200E0FA020068FB020098
-:10D3D0007AFB020082FB020088FB02006EFB020067
-:10D3E00074FB02008EFB020040FA02000EFA0200FB
-:10D3F00028FA0200C0F80200D6F80200D2F80200B3
-:10D40000CCF80200C6F80200DAFA0200C0F7020007
-:10D410000AF90200F0F90200F6F9020098F9020098
-:10D420007EF9020084F902008AF902006CF9020018
-:10D43000CAF90200D8F9020060F9020090F802006F
-:10D4400066F7020066F9020096F802009CF80200F6
-:10D45000B2F9020074F7020036F802005CF902002B
-:10D4600052F902000EFB020024FB02001AFB02002C
-:10D4700014FB02002CFB020030FB0200A2F80200A9
-:10D48000B4FB02009EFB0200A4FB020070FA020043
-:10D4900076FA020094FA02009AFA0200AAFA02004E
-:10D4A000BEF902000CF802002AF8020020F802007F
-:10D4B00026F8020008FA020060F702008AFA020069
-:10D4C000E8F80200F4F80200AAF70200B4F702003C
-:10D4D000E4F902007AF7020094F70200B6FA0200BB
-:10D4E000BCFA0200C2FA0200C8FA0200CEFA020038
-:10D4F000E6FA020046FA020058FA02005EFA02005A
-:10D5000064FA020022FA0200DCF80200E2F80200EB
-:10D510006CF8020072F802008AF802007EF802003D
-:10D5200084F80200EAF702002EF7020034F7020046
-:10D5300042F702003CF7020048F702004EF70200F3
-:10D5400054F7020006F80200F2F70200FEF70200AC
-:10D55000C0FB0200C6FB020058B80200D602000061
-:10D56000D560020000000000000000001966000005
-:10D57000B1660000AB600200B1670000A565000065
-:10D58000000000000000000000000000000000009B
-:10D590000000000058B80200A902000000000000CE
-:10D5A0000561020000000000000000000000000013
-:10D5B00000000000000000005B260200E76002009F
-:10D5C000000000000000000000000000000000005B
-:10D5D00074C202002F00000005000000E0D5020028
-:10D5E000860F00009E0C00002E15000018D60200C9
-:10D5F000EE0C000008D60200FE0C000010D602005F
-:10D60000A60C0000ACD602003CEA02009D370000E8
-:10D6100078EA0200E537000078EA0200E935000008
-:10D6200098B10200D0D502009601000097010000D9
-:10D6300098010000990100009E0100000C9A020070
-:10D640000000000017000000846D03000C9A020027
-:10D6500000000000080000001750030058D5020029
-:10D66000050000008CD602004CD602007CD60200D9
-:10D670009CD602003CD6020028D602000C9A02007A
-:10D680000000000005000000276D03000C9A020056
-:10D690000000000008000000175003000C9A020070
-:10D6A00000000000560000002D6D03003CEA02005F
-:10D6B000E52001003CEA02007361020078EA020002
-:10D6C000F52001003CEA0200ED20010098B10200C3
-:10D6D000D4D6020074C20200570000000A00000005
-:10D6E000E4D60200860F0000F60C0000E6160000EB
-:10D6F00034D70200C600000014960200DE060000C7
-:10D70000C4D602006E110000B4D602008E110000D3
-:10D71000BCD602000E1400008CBA0200FE130000FA
-:10D720007CBA02000614000084BA02009E160000B3
-:10D73000E0B802003CEA02005B61020058B8020057
-:10D740007C0100000000000000000000000000005C
-:10D7500000000000000000000000000000000000C9
-:10D7600000000000000000000000000000000000B9
-:10D770000000000078D7020074C2020027000000F9
-:10D780000400000088D70200760B0000D8D7020002
-:10D79000B6060000F0D70200AE060000E4D7020093
-:10D7A000160C0000F8D702006F01020040420F0083
-:10D7B00070010200080000007E010200000000006D
-:10D7C0007F010302E4B3020080010302E4B302001C
-:10D7D00081010302E4B302002CEB02000300FFFF0F
-:10D7E000092101002CEB020004000300BD2101000F
-:10D7F000B4EA020021220100F0EA020065220100E1
-:10D800004CA0020002000000860800001E0A000072
-:10D810004CA0020008000000E60800003E0B0000DB
-:10D82000C60900006E0900003E0B00009E080000C3
-:10D830003E0B0000960A00004CA0020019000000F8
-:10D84000060900003E090000D60900005609000044
-:10D85000660A0000560A00004E0900003E0900005A
-:10D86000D609000056090000CE0A0000C60A0000D2
-:10D870004E0900003E0900003609000016080000AD
-:10D88000660A0000F60900006609000006080000AC
-:10D89000FE0700003E080000660A0000CE0A0000F5
-:10D8A000C60A00004CA0020030000000D6080000AC
-:10D8B000F6090000CE0A0000EE070000F60700009F
-:10D8C000EE070000CE0A0000F6090000D6080000AE
-:10D8D000F6090000CE0A0000EE070000F60700007F
-:10D8E000EE070000CE0A0000F6090000660A0000FC
-:10D8F000EE070000DE080000660900006E09000067
-:10D90000660900009E0800000E080000D60800000E
-:10D91000F6090000CE0A0000EE070000F60700003E
-:10D92000EE070000CE0A0000F6090000CE0A000053
-:10D930004E0800008E090000660A00009E0A0000E2
-:10D94000EE070000DE0800006E090000D6080000A7
-:10D95000F6090000CE0A0000F6090000CE0A000019
-:10D96000660A0000F6090000660900004CA00200EB
-:10D97000280000001E0800004E08000016090000E4
-:10D9800066080000360800003E0B00002E0800006C
-:10D990004E08000016090000660800003608000066
-:10D9A0003E0B000036080000160A00006E09000059
-:10D9B000F6090000660A0000F60900006E09000082
-:10D9C000F60900006E080000160900006609000054
-:10D9D0009E080000760800003E0B00008E08000044
-:10D9E00016090000660900009E0800007608000085
-:10D9F0003E0B000096080000160A00006E090000A9
-:10DA0000F6090000660A0000F60900006E09000031
-:10DA1000F60900004CA002000A000000460B0000BE
-:10DA2000CE0A0000CE0A0000CE0A00005E0A000006
-:10DA3000560B0000660A0000660A0000660A000035
-:10DA4000EE0900004CA00200120000009E09000038
-:10DA50006E090000F6090000260900000E0A000009
-:10DA6000260900000E0A00002E0900003E090000F1
-:10DA7000660900006E090000F60900009E0800001B
-:10DA8000660900002E0A00006E080000B6090000BA
-:10DA9000560900004CA002000B000000EE08000038
-:10DAA0004E0900003E0900005609000086090000EA
-:10DAB000BE090000CE0900003E0900004E0900002A
-:10DAC00056080000EE0800004CA002001200000002
-:10DAD000D60800009E0800006E0900003E09000004
-:10DAE000AE0A00003E090000AE0A00006E0A000007
-:10DAF000CE0A00009E0800009E080000CE0A00002A
-:10DB00003E0900008E0A00003E0900008E0A000057
-:10DB1000660A00006E0900004CA00200050000002B
-:10DB2000160B0000660A0000F609000066090000F6
-:10DB30009E0800004CA00200050000001E09000025
-:10DB400066090000F6090000660A0000CE0A00001F
-:10DB50004CA002006A0000007E0A0000D60A000005
-:10DB6000C60800007E0900006E080000AE09000033
-:10DB7000A6080000760800004E080000AE0800006D
-:10DB800066090000BE090000A60800006E0800003B
-:10DB9000B60800006E0900006E0A0000D60A0000F8
-:10DBA0006E0900006E0A0000A60800006609000069
-:10DBB00066080000AE080000660800007609000054
-:10DBC0006E0A0000DE0A00006E0900006E0A000006
-:10DBD000A60800006E09000066080000A609000003
-:10DBE0006E09000066090000A60800006608000033
-:10DBF000AE080000C60900006E080000AE08000074
-:10DC00006E0900006E0A0000A60800006609000008
-:10DC1000A608000066080000BE08000066080000B4
-:10DC2000AE08000066080000860A0000D60A000060
-:10DC300096080000860A0000D60A00004E08000080
-:10DC4000AE0800006E09000066080000160A000019
-:10DC50006E090000F60900006E0A00007608000058
-:10DC60004E080000860A0000D60A00004E08000098
-:10DC70006E0A0000160A00006E090000A6080000E7
-:10DC8000660800006E0A00006E090000F609000038
-:10DC90006E0A000096080000860A0000D60A0000FE
-:10DCA00096080000860A0000D60A00004E08000010
-:10DCB0004E080000AE0800006E0900006608000073
-:10DCC0006E0A0000D60A00006E0A000096080000E6
-:10DCD0008E080000F60700004E0800006E0A0000E3
-:10DCE000D60A00004E080000160A00006E09000067
-:10DCF000F60900006E0A000076080000AE08000079
-:10DD00004CA002001E000000060A0000F6090000F8
-:10DD1000660A0000CE0A0000CE0A0000660A000073
-:10DD2000F6090000660900009E0800009E08000039
-:10DD300066090000F60900004E0A0000C60900004E
-:10DD4000EE0900003E0A0000F6090000660A000025
-:10DD5000CE0A0000CE0A0000660A0000F6090000A4
-:10DD6000660900009E0800009E0800006609000089
-:10DD7000F6090000E6090000460900005E090000FF
-:10DD80004CA0020006000000160B00006E09000007
-:10DD90009E080000060B00008E0800002E090000FF
-:10DDA0004CA0020006000000FE0A00001609000058
-:10DDB000F6090000260B0000260A00002E0B0000CA
-:10DDC0004CA0020040000000FE080000F609000020
-:10DDD000CE0A000016090000F6090000F60A00004D
-:10DDE00016090000F6090000F6080000F609000018
-:10DDF000CE0A000016090000F6090000F60A00002D
-:10DE000016090000F6090000F60800006609000087
-:10DE1000CE0A0000A6090000660A0000F60A00000B
-:10DE2000A6090000660A0000F60800006609000066
-:10DE3000CE0A0000A6090000660A0000F60A0000EB
-:10DE4000A6090000660A00005E08000096090000AE
-:10DE5000CE0A0000A6090000660A0000F60A0000CB
-:10DE6000A6090000660A00005E080000960900008E
-:10DE7000CE0A0000A6090000660A0000F60A0000AB
-:10DE8000A6090000660A0000F6080000F609000076
-:10DE9000CE0A000016090000F6090000F60A00008C
-:10DEA00016090000F6090000F6080000F609000057
-:10DEB000CE0A000016090000F6090000F60A00006C
-:10DEC00016090000F60900004CA00200090000003D
-:10DED00006090000EE0A00006E0A0000CE0A0000EB
-:10DEE000E60A0000CE0A00003E0B00004E080000CB
-:10DEF000F60800004CA002004F000000AE09000030
-:10DF0000660800003E0B00004E0800004E080000AE
-:10DF1000F60700004E0800000E0B00003E0B00004C
-:10DF200066090000660900003E0B0000660800005C
-:10DF3000160900003E0B00009E0800009E0800002D
-:10DF40003E0B000066090000460A00003E09000082
-:10DF5000160800003E0B0000EE070000EE07000070
-:10DF6000D60A0000EE070000760A00003E0B000013
-:10DF7000F6090000F60900003E0B00009E080000B4
-:10DF8000660800003E0B00004E0800004E0800002E
-:10DF90003E0B000016090000DE090000BE0900006B
-:10DFA000660800003E0B00004E0800004E0800000E
-:10DFB000F60700004E0800007E0800003E0B00003F
-:10DFC000CE0A0000CE0A00003E0B000066090000E9
-:10DFD000A60800003E0B0000EE070000EE07000060
-:10DFE0003E0B0000EE070000460800001E0B00007C
-:10DFF0008E0A00002E080000EE070000D60A00007E
-:10E00000EE0700002E0A00002E080000EE070000B8
-:10E01000D60A0000EE070000660900003E0B000073
-:10E02000A6080000660900003E0B0000A6080000DC
-:10E03000C60900005E0B00004CA002000D000000AD
-:10E04000FE080000660900002E0A0000CE0A00004B
-:10E05000BE090000F6090000AE0A0000EE0700004D
-:10E06000260A0000660A0000260B00004E08000089
-:10E07000360900004CA0020007000000FE09000065
-:10E080004E0B0000860900004E0B0000D609000070
-:10E090004E0B0000CE0800004CA002001200000051
-:10E0A0000E090000B60A0000A60A0000C60A000019
-:10E0B000560900002E0B0000260A0000C60A0000C8
-:10E0C00056090000B60A00002E08000036090000BC
-:10E0D00026080000A60A0000BE0A0000360A00005A
-:10E0E000A60A0000360B0000B4EA020071620200CA
-:10E0F000B4EA02005B620200B4EA02002D62020090
-:10E10000F0EA0200436202003CEA0200312401000E
-:10E110003CEA0200E12301003CEA0200F92301008D
-:10E120003CEA0200112401003CEA02009D62020068
-:10E130003CEA0200876202002CEB020000000100B2
-:10E140004124010098B102004CE1020074C20200B7
-:10E1500047000000080000005CE10200860F00009C
-:10E1600036120000EE10000008E102006611000007
-:10E1700010E102008611000018E10200D612000032
-:10E1800020E102001E14000030E10200161400001D
-:10E1900028E102006616000038E102002CEB0200C4
-:10E1A0000C0008004D260100B4EA020031250100F0
-:10E1B00058B80200B000000000000000000000009D
-:10E1C00000000000376302000000000000000000B3
-:10E1D00071680200992401000000000000000000A6
-:10E1E00000000000000000000000000074C20200F7
-:10E1F000770200004E00000038E2020058B802002A
-:10E2000067020000000000000000000000000000A5
-:10E2100000000000000000000000000000000000FE
-:10E220005B260200476802000000000000000000BA
-:10E2300000000000000000007E02000044E5020033
-:10E2400086020000CCE40200A6020000C4E4020042
-:10E250009E020000DCE40200AE020000F0E40200D6
-:10E26000B6020000F8E40200BE02000000E5020071
-:10E27000C6020000E8E402003E050000B0E402002F
-:10E2800046050000B8E402008E020000D4E402005B
-:10E2900096020000A8E10200D60200009CE1020004
-:10E2A000DE0200002CB50200E602000034B50200D8
-:10E2B000EE02000024B50200FE020000A4B5020038
-:10E2C000F60200008CB5020006030000E4B4020070
-:10E2D0000E03000024B40200160300006CB4020018
-:10E2E0001E030000CCB502002603000094B5020016
-:10E2F0002E0300000CB502003603000044B50200F6
-:10E300003E03000014B602004603000064B502009C
-:10E310004E03000094B40200560300009CB40200B7
-:10E320005E030000A4B4020066030000ACB4020067
-:10E330006E030000B4B4020076030000BCB4020017
-:10E340007E030000C4B4020086030000CCB40200C7
-:10E350008E030000D4B4020096030000DCB4020077
-:10E360009E03000084B40200A60300008CB40200E7
-:10E37000AE03000034B40200B60300003CB4020057
-:10E38000BE0300002CB40200C603000054B4020017
-:10E39000CE0300004CB40200D60300005CB40200BF
-:10E3A000DE03000064B40200E603000044B402008F
-:10E3B000EE030000F4B50200F6030000ECB5020025
-:10E3C000FE0300007CB4020006040000F4B4020066
-:10E3D0000E040000FCB4020016040000B4B50200F4
-:10E3E0001E040000BCB50200260400007CB502003B
-:10E3F0002E040000ECB40200360400004CB502000C
-:10E400003E04000054B50200460400005CB5020062
-:10E410004E04000074B50200560400000CB6020061
-:10E420005E0400006CB5020066040000DCB502006A
-:10E43000DE04000014BA0200D6040000ECB90200A9
-:10E440006E040000FCB502007604000084B50200F2
-:10E450007E04000004B50200860400003CB5020002
-:10E460008E040000E4B502009604000074B40200BB
-:10E470009E040000C4B50200A604000014B502000A
-:10E48000AE040000D4B50200B60400001CB50200C2
-:10E49000BE0400009CB50200C604000004B60200E1
-:10E4A000CE040000ACB5020008E502000100000047
-:10E4B00078EA02001F6702002CEB02000A00050048
-:10E4C0006B660200F0EA0200F526010078EA02001D
-:10E4D000C566020078EA0200776702002CEB0200B2
-:10E4E000080004004D270100B4EA0200F9670200A9
-:10E4F000B4EA0200B7670200B4EA0200CD67020086
-:10E50000B4EA0200E367020058B802004C000000C1
-:10E51000C127010081280100000000000000000068
-:10E520009D2B010000000000000000000000000022
-:10E5300000000000000000000000000000000000DB
-:10E54000ECE1020078EA02008B64020058B8020095
-:10E550006702000000000000000000000000000052
-:10E5600000000000000000000000000000000000AB
-:10E570005B26020061250100000000000000000091
-:10E58000000000000000000058B80200AC000000CD
-:10E59000000000000000000000000000000000007B
-:10E5A000000000000000000000000000F124010055
-:10E5B000000000000000000000000000000000005B
-:10E5C0000000000058B802006C01000000000000CC
-:10E5D000000000000000000000000000000000003B
-:10E5E000000000000000000000000000000000002B
-:10E5F0000000000000E602000000000010E602003B
-:10E600009D400100B768020000000000000000000B
-:10E6100074C20200470000000800000020E602006B
-:10E62000760B0000A0E60200B60B000098E60200A0
-:10E63000AE06000068EB0200C60B000080EB020093
-:10E64000CE0B000074EB0200B60600008CEB02005B
-:10E65000D60B000003000000DE0B000005000000E8
-:10E660006F01020080250000700102000800000018
-:10E6700071010300E4B30200720102000100000016
-:10E6800073010302E4B3020074010302E4B3020065
-:10E6900075010302E4B3020078EA02008140010040
-:10E6A0002CEB02000300FFFFA13F01006A020302FE
-:10E6B000E4B30200A802010200000000B4EA020074
-:10E6C000D941010078EA02007142010078EA0200B3
-:10E6D000836A0200B4EA02000D6A0200B4EA020092
-:10E6E000D94301002CEB020004000400D7690200AA
-:10E6F000F0EA02002542010074C202005F0000003F
-:10E700000B00000008E7020016100000BCE6020043
-:10E710002E0C0000C4E602003E050000CCE602001C
-:10E720000E110000D4E60200CE110000DCE602006B
-:10E7300096120000E4E602009E120000F0E60200DD
-:10E74000D614000060E702002E1500006CE70200FE
-:10E750004615000074E70200C61500007CE70200C1
-:10E760002CEB020002000200F5420100B4EA0200B4
-:10E770007143010078EA0200A14101002CEB020084
-:10E780000300FFFF9942010058B802007302000025
-:10E7900091430100316A0200000000005D41010068
-:10E7A0008144010000000000554501008541010041
-:10E7B0000000000000000000000000000000000059
-:10E7C000F8E60200D4E7020000000000D4E70200EF
-:10E7D0000100000058B802000C020000D14A0100FC
-:10E7E000ED4A010000000000BD6B0200AD6B0200AD
-:10E7F0000000000000000000000000000000000019
-:10E800000000000000000000000000000000000008
-:10E8100074C20200370000000600000020E8020079
-:10E82000860F00000E170000A610000058E8020036
-:10E83000B61400006CE80200BE14000060E802009C
-:10E84000EE16000078E80200F616000078E80200F4
-:10E8500098B1020010E8020078EA0200276C02007A
-:10E860002CEB02000600FFFF214D01002CEB020003
-:10E870000200FFFFD94C01002CEB02000400030052
-:10E88000214B010000000000876C020078EA0200C2
-:10E89000CD55010078EA0200AD55010078EA02008A
-:10E8A00005560100B4EA0200E5550100B4EA020091
-:10E8B0002B6E02003CEA02001D5601003CEA0200F9
-:10E8C0003556010000000000C1000000C200000039
-:10E8D000C3000000C4000000C5000000C600000026
-:10E8E000C7000000C8000000C9000000CA00000006
-:10E8F000CB00000074C202004700000008000000C6
-:10E9000024E9020078EA0200A5560100B4EA0200F8
-:10E9100061570100B4EA02009157010078EA020051
-:10E92000CD570100CE0500006CE90200D6050000BD
-:10E9300074E90200DE0500007CE90200E605000043
-:10E9400004E90200EE05000064E90200F60500009B
-:10E950000CE90200FE05000014E9020006060000B2
-:10E960001CE9020078EA02003D57010078EA020043
-:10E970006956010078EA02007D56010078EA02003B
-:10E980009156010088E9020058B80200B700000063
-:10E990000000000000000000000000000000000077
-:10E9A0000000000000000000000000000000000067
-:10E9B0000000000000000000000000000000000057
-:10E9C000F4E8020058B80200450200000000000010
-:10E9D00000000000B96E02007F2602000000000067
-:10E9E0000000000000000000000000000000000027
-:10E9F0000000000000000000000000000000000017
-:10EA000058B80200450200000000000000000000AD
-:10EA10008D5801007F260200000000000000000069
-:10EA200000000000000000000000000000000000E6
-:10EA300000000000000000000000000058B80200C4
-:10EA4000450200000000000000000000476E0200C8
-:10EA50007F2602000000000000000000000000000F
-:10EA600000000000000000000000000000000000A6
-:10EA7000000000000000000058B80200450200003D
-:10EA800000000000000000005F6E02007F26020010
-:10EA90000000000000000000000000000000000076
-:10EAA0000000000000000000000000000000000066
-:10EAB0000000000058B802004502000000000000FD
-:10EAC000000000007D6E02007F26020000000000B2
-:10EAD0000000000000000000000000000000000036
-:10EAE0000000000000000000000000000000000026
-:10EAF00058B80200450200000000000000000000BD
-:10EB00009B6E02007F260200000000000000000053
-:10EB100000000000000000000000000000000000F5
-:10EB200000000000000000000000000058B80200D3
-:10EB3000450200000000000000000000596F0200C4
-:10EB40007F2602000000000000000000000000001E
-:10EB500000000000000000000000000000000000B5
-:10EB600000000000000000002CEB02000200020088
-:10EB7000317002002CEB020004000300A15C0100D4
-:10EB80002CEB020002000200FD5C01002CEB0200F5
-:10EB9000040004003B700200FFFF000000000000C2
-:10EBA00000000000000000001D7402001F7402003D
-:10EBB00063740200657402000000000000000000A1
-:10EBC0001D7402001F74020061740200737402005D
-:10EBD000217402003D740200417402005D74020061
-:10EBE000756301007D63010057750200000000009D
-:10EBF000000000001D7402001F7402003376020042
-:10EC000035760200B9670100137602002F76020004
-:10EC1000C1670100437602000100000017000000F8
-:10EC200046000000A30000005F010000D6020000C3
-:10EC3000C4050000A00B0000000000000000000060
-:10EC4000B37E02001F740200FD6F0100377C0200DA
-:10EC500060EC02000300000078EC020008000000F5
-:10EC6000020000000000000004000000010000009D
-:10EC70000800000002000000C409000000000000BD
-:10EC8000881300000800000010270000100000009A
-:10EC9000204E000018000000803801002000000015
-:10ECA000007102002800000000E2040030000000B3
-:10ECB0000088130038000000000000000000000081
-:10ECC0001D74020085810200597B01008F810200C2
-:10ECD000217402003D740200417402005D74020060
-:10ECE000657A01009D7B010057750200BCFFFFFFA4
-:10ECF000000000001D740200557A01007D7B0100B8
-:10ED00008D7B0100497B0100137602002F76020003
-:10ED1000997C01004376020028ED02000300000008
-:10ED200040ED0200080000000200000000000000AA
-:10ED300004000000010000000800000002000000C4
-:10ED4000E204000000000000C40900000800000008
-:10ED500088130000100000001027000018000000B9
-:10ED6000204E000020000000803801002800000034
-:10ED7000007102003000000000C4090038000000EB
-:10ED800000000000000000001D740200B5810200B8
-:10ED9000DD7D0100BF810200217402003D7402008C
-:10EDA000417402005D740200297D0100F57D0100BF
-:10EDB00057750200BCED02000B000000D4300000CB
-:10EDC00000000000A86100002000000050C3000007
-:10EDD00040000000A086010060000000400D03001C
-:10EDE00080000000801A06008800000000350C003A
-:10EDF00090000000006A1800B000000000D430004D
-:10EE0000D000000000A86100F00000000050C30026
-:10EE1000F800000000000000000000001D74020067
-:10EE2000E5810200C97E0100EF810200E17E010060
-:10EE3000137602002F760200857F010043760200E0
-:10EE400050EE02000400000070EE02000900000015
-:10EE5000020000000000000004000000100000009C
-:10EE6000080000002000000010000000300000003A
-:10EE70006902000080000000E8020000900000002D
-:10EE8000C40900007000000088130000600000004A
-:10EE90001027000050000000204E0000400000003D
-:10EEA000409C000030000000A0860100200000000F
-:10EEB00040420F00100000000000000000000000B1
-:10EEC0001D74020015820200FD8001001F820200F5
-:10EED000217402003D740200417402005D7402005E
-:10EEE000698001001581010057750200F4EE0200EF
-:10EEF00004000000102700000C000000204E00005D
-:10EF00000800000050C3000004000000A0860100BB
-:10EF10000000000000000000000000001D7402005E
-:10EF200045820200658201004F82020005820100D5
-:10EF3000137602002F7602007D82010043760200E4
-:10EF4000FFFF0100010000000000000000000000C1
-:10EF50007D8602007F8602000000000000000000A5
-:10EF60009D860200CB860200000000000000000029
-:10EF7000E16F01004B7C02003587020000000000B9
-:10EF800000000000718C0100AB8702008D87020039
-:10EF90000000000000000000000000000000000071
-:10EFA0006B880200ACEF0200142D0020259B0100AD
-:10EFB000B19B0100858C0200878C0200C99B010077
-:10EFC000010000000070004004000000020000008A
-:10EFD00000700040080000000300000000700040C6
-:10EFE000100000000400000000700040200000003D
-:10EFF0000500000000700040400000000600000016
-:10F000000070004080000000FF000000FFFFFFFFD5
-:10F0100000000000B004000000F0040060090000DF
-:10F0200000D00900C012000000B0130080250000CD
-:10F03000005027004038000000003B00004B00005B
-:10F0400000A04E008070000000F07500127A0000F1
-:10F05000000080000096000000509D0000E10000CC
-:10F0600000F0EB00002C010000903A0100C201000A
-:10F0700000E0D7010084030000B0AF0390D003008C
-:10F08000000000040008070000705F0700100E0079
-:10F09000A4DFBE0E40420F0000000010B2A7010026
-:10F0A000EEA6010012A70100B0A6010012A7010000
-:10F0B0008EA7010012A70100B0A60100EEA6010074
-:10F0C000EEA601008EA70100B0A60100E4A7010092
-:10F0D000E4A70100E4A701009AA70100EEA6010041
-:10F0E000EEA6010012A70100AEA6010012A70100C2
-:10F0F0008EA7010012A70100AEA60100EEA6010036
-:10F10000EEA601008EA70100AEA60100E4A7010053
-:10F11000E4A70100E4A7010098A70100DCAA010010
-:10F1200086AA010086AA0100B4AB010082AA0100F0
-:10F1300082AA0100AAAB0100B4AB010082AA0100BF
-:10F14000AAAB010082AA0100B4AB0100B8AB010078
-:10F15000B8AB0100B8AB0100C0AB01002CBA010094
-:10F160009EB80100E2B8010046B80100E2B8010013
-:10F17000D2B90100E2B8010046B801009EB8010012
-:10F180009EB80100D2B9010046B801003EB80100A6
-:10F190003EB801003EB80100E0B9010054C10100D1
-:10F1A00056C0010056C0010074C3010050C00100E8
-:10F1B00050C001005CC3010074C3010050C00100D5
-:10F1C0005CC3010050C0010074C301006AC30100A8
-:10F1D0006AC301006AC3010078C301003863ED3ED1
-:10F1E000DA0F493F5E987B3FDA0FC93F6937AC3190
-:10F1F00068212233B40F14336821A2330000004B7E
-:10F20000000000CB737172740000000061636F73C3
-:10F21000660000006173696E6600000065787066C4
-:10F2200000000000666D6F64660000006C6F67662A
-:10F2300000000000706F7766000000007371727448
-:10F24000660000000000003F000000BF8071313FF9
-:10F25000807131BFD1F71737D1F717B70000000021
-:10F2600000000080000FC93F000F494000CB9640CE
-:10F27000000FC9400053FB4000CB164100ED2F4169
-:10F28000000F49410031624100537B41003A8A41FD
-:10F2900000CB9641005CA34100EDAF41007EBC4134
-:10F2A000000FC94100A0D5410031E24100C2EE414A
-:10F2B0000053FB4100F20342003A0A42008310422D
-:10F2C00000CB164200141D42005C234200A52942D7
-:10F2D00000ED2F4200363642007E3C4200C74242DB
-:10F2E000000F4942A2000000F90000008300000066
-:10F2F0006E0000004E0000004400000015000000F9
-:10F3000029000000FC00000027000000570000005A
-:10F31000D1000000F500000034000000DD00000016
-:10F32000C0000000DB00000062000000950000004B
-:10F33000990000003C000000430000009000000025
-:10F3400041000000FE0000005100000063000000CA
-:10F35000AB000000DE000000BB000000C5000000A4
-:10F3600061000000B7000000240000006E000000F3
-:10F370003A000000420000004D000000D2000000F2
-:10F38000E000000006000000490000002E00000020
-:10F39000EA00000009000000D10000009200000017
-:10F3A0001C000000FE0000001D000000EB0000003B
-:10F3B0001C000000B100000029000000A7000000B0
-:10F3C0003E000000E8000000820000003500000060
-:10F3D000F50000002E000000BB000000440000000B
-:10F3E00084000000E90000009C00000070000000A4
-:10F3F00026000000B40000005F0000007E00000056
-:10F40000410000003900000091000000D60000001B
-:10F4100039000000830000005300000039000000A4
-:10F42000F40000009C000000840000005F00000069
-:10F430008B000000BD000000F90000002800000063
-:10F440003B0000001F000000F800000097000000D3
-:10F45000FF000000DE000000050000009800000032
-:10F460000F000000EF0000002F000000110000005E
-:10F470008B0000005A0000000A0000006D00000030
-:10F480001F0000006D000000360000007E0000003C
-:10F49000CF00000027000000CB00000009000000A2
-:10F4A000B70000004F000000460000003F000000D1
-:10F4B000660000009E0000005F000000EA000000FF
-:10F4C0002D0000007500000027000000BA000000B9
-:10F4D000C7000000EB000000E5000000F1000000A4
-:10F4E0007B0000003D000000070000003900000024
-:10F4F000F70000008A0000005200000092000000A7
-:10F50000EA0000006B000000FB0000005F0000004C
-:10F51000B10000001F0000008D0000005D00000031
-:10F52000080000005600000003000000300000004A
-:10F5300046000000FC0000007B0000006B000000A3
-:10F54000AB000000F0000000CF000000BC00000095
-:10F55000200000009A000000F400000036000000C7
-:10F560001D000000A9000000E30000009100000061
-:10F57000610000005E000000E60000001B000000CB
-:10F5800008000000650000009900000085000000F0
-:10F590005F00000014000000A000000068000000F0
-:10F5A000400000008D000000FF000000D8000000B7
-:10F5B000800000004D0000007300000027000000E4
-:10F5C00031000000060000000600000015000000E9
-:10F5D00056000000CA00000073000000A8000000F0
-:10F5E000C900000060000000E20000007B00000095
-:10F5F000C00000008C0000006B0000000000C93F4C
-:10F600000000F0390000DA370000A2330000842E39
-:10F610000000502B0000C2270000D0220000C41FB1
-:10F620000000C61B00004417040000000700000093
-:10F6300009000000000000000000000000000000C1
-:10F6400000000000000000000000000000000000BA
-:10F6500000000000000000000000000000000000AA
-:10F66000000000000000000000000000000000009A
-:10F67000000000000000000000000000000000008A
-:10F68000000000000000000000000000000000007A
-:10F69000000000007000002000686E0200786F0219
-:10F6A000008871020060C0020070C1020080C302C5
-:10F6B000000002000400060008000A000C0011000F
-:10F6C00017001D0025002F003B00490061007F004E
-:10F6D000A700DF00250185010902B3029703C704D3
-:10F6E0005B0671089D0CDF124B1C6D2A913F575F22
-:10F6F000FF8E7BD6000002000200040007000D0010
-:10F70000190031006100E108E907EE0E4D0DDA0B3A
-:10F710002F0BF70961080000180E8E0C00008F0AED
-:10F720006809233124203A101D317D2011109F33A8
-:10F73000A0204810A013A120A220A320A2223210B2
-:10F740007A20A12231107A20A3627A20A430A41258
-:10F75000A720A520A5624D107A20253126208320E0
-:10F7600083122F103010656212100710122313102D
-:10F770007A206A306A6248107A208A1C07100810C2
-:10F7800009100A100B100C100E100F100D102A206B
-:10F790002B202C208B1236208C202C2346109930C5
-:10F7A00047102B2344108C304510871129202962E3
-:10F7B0008A208830883291202A2342108B304310CF
-:10F7C000581C4E104F10501051105310541055101B
-:10F7D000561058105710591052100921141035A501
-:10F7E000151007109E30491078209E6342109F30FC
-:10F7F0004310A7A51D10972022101C20A630A82377
-:10F8000020107C20A630A612A720A8207E19361032
-:10F81000381040103E103F10411022107F208020F1
-:10F82000802223108130812126107F222610221071
-:10F830001F3121207E206B18132014201520162044
-:10F8400017200320352002200A21161002623D20D5
-:10F850003E203E12352003203C244C1068202D30E1
-:10F8600004103D323C200722181097209962342062
-:10F870009B309A6249107A2034627A209A309C2216
-:10F8800048109D309D33342048109B12A7209C20A7
-:10F890006462682065306731642048106831071061
-:10F8A0004A1074631A10491078203A6233203B30B2
-:10F8B0003B210410213122203B100522062052302A
-:10F8C00052125320542056123620062055624D10F5
-:10F8D0005620543255205362582056209733982092
-:10F8E00048109812202021208512272028202762E6
-:10F8F0008620852086132F1030103D1000610130C6
-:10F9000001323920391204104F20591509200A20DC
-:10F910000B200D200C2015271D10972022103320BE
-:10F9200049107820743003A8171007104210403097
-:10F9300043103F30491078203F625A107A2010223D
-:10F940001F106920132620107A20491078206C306F
-:10F9500074306D2419107A20491078206C326D2093
-:10F9600063220710653066336320481060634210DD
-:10F97000662043100F241E105D2021105F205D12B1
-:10F9800068205E205E62612068305F133110602065
-:10F9900066200E22211067205C120E200F201AA470
-:10F9A0002410483049107A201BA4241048304910F4
-:10F9B0007C206931071048101122251069207D1222
-:10F9C0001E201F201E2226107D20613262201C3145
-:10F9D0001D2027100821281062124A100C102862DE
-:10F9E000872089308962321085200D2229105A30F3
-:10F9F0005A627A205B305B621E107A200B222A103A
-:10FA00003330243125208220821237103910506281
-:10FA100004200410043351204B10381304105020DC
-:10FA20006B20962249107A3051180720082059205F
-:10FA30005C201020112012200520202231102120CE
-:10FA40004F126B20502092123220312031627A20E6
-:10FA50003230322249109330931294209520942210
-:10FA600049107A3095627A209630303392204810CF
-:10FA7000781279205020796404100510182006109F
-:10FA800018324F2026318520842084143110331001
-:10FA9000351034107A121A2019207B2420101C20D3
-:10FAA0001A107A2019621C207B307C121B201C202B
-:10FAB00033337A2048108C628D208E308D122020B6
-:10FAC0007A208E12A7208F208F62481090309033BA
-:10FAD0008D204810063357204810571220207A20D6
-:10FAE00047220710453091132D202E202F202E2342
-:10FAF0004410302045102D2342109F3043102F22F8
-:10FB00004A10071016242B10491078206E206E1210
-:10FB10006F20732071627A20653070241B10713061
-:10FB2000491078206F637220743073307232702005
-:10FB300073231C104910782040334120481045623F
-:10FB400049107A20442332100710453046624D1088
-:10FB50007A2041134220432044204263071045305D
-:10FB600046304322311047304833492048104C2258
-:10FB7000321007104D624D107A2049134A204B2055
-:10FB80004C204A6207104D304B2231104E304E61EE
-:10FB9000071014252C107A204910782074307662D2
-:10FBA0007A20773077621210212017242D107520CB
-:10FBB00049107820753176204810223123203C10DE
-:10FBC000A912AA203320AA221E107A2036222E1033
-:10FBD000A9300C2136207A65726F2073746570002D
-:10FBE00072616E67652825642C202564002C202511
-:10FBF0006429002766726F7A656E736574272068C2
-:10FC00006173206E6F20737563682061747472690C
-:10FC10006275746500706F702066726F6D20616E22
-:10FC200020656D707479207365740066726F7A65F3
-:10FC30006E0073657428290066726F7A656E73654D
-:10FC40007428007B002C200063616E277420636F92
-:10FC50006E766572742027257127206F626A65634E
-:10FC60007420746F20257120696D706C69636974EC
-:10FC70006C790062797465732076616C7565206FAC
-:10FC80007574206F662072616E67650077726F6EA3
-:10FC900067206E756D626572206F66206172677590
-:10FCA0006D656E7473006F6E6C7920736C6963653B
-:10FCB00073207769746820737465703D3120286102
-:10FCC0006B61204E6F6E65292061726520737570BF
-:10FCD000706F7274656400696E636F6D706C6574CB
-:10FCE0006520666F726D617400666F726D6174205D
-:10FCF000726571756972657320612064696374004F
-:10FD0000696E636F6D706C65746520666F726D618E
-:10FD100074206B6579006E6F7420656E6F7567680F
-:10FD200020617267756D656E747320666F722066F0
-:10FD30006F726D617420737472696E67002525633C
-:10FD400020726571756972657320696E74206F72B7
-:10FD5000206368617200696E746567657220726500
-:10FD600071756972656400756E737570706F727409
-:10FD7000656420666F726D6174206368617261638F
-:10FD8000746572202725632720283078257829205C
-:10FD9000617420696E646578202564006E6F74203C
-:10FDA000616C6C20617267756D656E747320636F32
-:10FDB0006E76657274656420647572696E6720730F
-:10FDC0007472696E6720666F726D617474696E67B4
-:10FDD0000073696E676C6520277D2720656E636FF1
-:10FDE000756E746572656420696E20666F726D61F0
-:10FDF0007420737472696E670062616420636F6E51
-:10FE000076657273696F6E20737065636966696584
-:10FE10007200756E6D61746368656420277B2720AE
-:10FE2000696E20666F726D617400657870656374C9
-:10FE3000656420273A2720616674657220666F72B8
-:10FE40006D617420737065636966696572006361D2
-:10FE50006E2774207377697463682066726F6D20F3
-:10FE60006175746F6D61746963206669656C642087
-:10FE70006E756D626572696E6720746F206D616E5C
-:10FE800075616C206669656C642073706563696672
-:10FE900069636174696F6E007475706C6520696E5A
-:10FEA000646578206F7574206F662072616E676577
-:10FEB0000061747472696275746573206E6F74206A
-:10FEC000737570706F727465642079657400636116
-:10FED0006E2774207377697463682066726F6D2073
-:10FEE0006D616E75616C206669656C642073706508
-:10FEF00063696669636174696F6E20746F206175F0
-:10FF0000746F6D61746963206669656C64206E75D9
-:10FF10006D626572696E67003C3E3D5E00626364BF
-:10FF20006545664667476E6F7378582500696E763B
-:10FF3000616C696420666F726D61742073706563B3
-:10FF40006966696572007369676E206E6F742061FF
-:10FF50006C6C6F77656420696E20737472696E676C
-:10FF600020666F726D617420737065636966696580
-:10FF700072007369676E206E6F7420616C6C6F77AE
-:10FF80006564207769746820696E7465676572209E
-:10FF9000666F726D617420737065636966696572FE
-:10FFA0002027632700756E6B6E6F776E20666F7209
-:10FFB0006D617420636F6465202725632720666F59
-:10FFC00072206F626A656374206F66207479706551
-:10FFD000202725732700756E6B6E6F776E20666F16
-:10FFE000726D617420636F64652027256327206626
-:10FFF0006F72206F626A656374206F662074797017
-:020000040003F7
-:10000000652027666C6F61742700273D2720616C8F
-:1000100069676E6D656E74206E6F7420616C6C6FB5
-:1000200077656420696E20737472696E6720666FED
-:10003000726D6174207370656369666965720075BD
-:100040006E6B6E6F776E20666F726D617420636F7A
-:100050006465202725632720666F72206F626A65BA
-:100060006374206F6620747970652027737472271B
-:1000700000656D70747920736570617261746F7260
-:10008000005C2563005C5C005C6E005C72005C746C
-:10009000005C78253032780073746172742F656E5D
-:1000A0006420696E6469636573007375627374724A
-:1000B000696E67206E6F7420666F756E64006A6F7C
-:1000C000696E20657870656374732061206C697354
-:1000D00074206F66207374722F6279746573206F59
-:1000E000626A6563747320636F6E73697374656E9F
-:1000F0007420776974682073656C66206F626A6526
-:10010000637400252E2A73007273706C6974284E14
-:100110006F6E652C6E290020090A0D0B0C00636FB1
-:100120006D706C65782076616C756573206E6F7488
-:1001300020737570706F7274656400696E76616C9F
-:1001400069642073796E74617820666F72206E75B1
-:100150006D62657200696E742829206172672032B1
-:10016000206D757374206265203E3D203220616EE3
-:1001700064203C3D20333600696E76616C696420F2
-:1001800073796E74617820666F7220696E7465672A
-:100190006572207769746820626173652025640048
-:1001A0006F626A6563742077697468206275666639
-:1001B00065722070726F746F636F6C2072657175F9
-:1001C0006972656400257120696E646963657320D6
-:1001D0006D75737420626520696E746567657273EE
-:1001E0002C206E6F7420257300257120696E646564
-:1001F00078206F7574206F662072616E6765006F7E
-:10020000626A6563742027257327206973206E6FE7
-:10021000742061207475706C65206F72206C697336
-:100220007400726571756573746564206C656E67C2
-:10023000746820256420627574206F626A65637437
-:1002400020686173206C656E6774682025640063A4
-:10025000616E277420636F6E76657274202573203B
-:10026000746F20666C6F61740063616E2774206325
-:100270006F6E7665727420257320746F20696E74BA
-:10028000006F626A656374206F6620747970652000
-:100290002725732720686173206E6F206C656E2898
-:1002A000290054726163656261636B20286D6F730E
-:1002B0007420726563656E742063616C6C206C6180
-:1002C0007374293A0A00202046696C652022257142
-:1002D000222C206C696E65202564002C20696E201C
-:1002E00025710A003C25713E0027257327206F6287
-:1002F0006A65637420646F6573206E6F7420737514
-:1003000070706F7274206974656D2064656C6574BB
-:10031000696F6E0027257327206F626A65637420FA
-:100320006973206E6F742073756273637269707481
-:1003300061626C650027257327206F626A656374AC
-:1003400020646F6573206E6F7420737570706F72A8
-:1003500074206974656D2061737369676E6D656E75
-:1003600074000000040202040200000204040400FD
-:100370000202000404030100000103030300010161
-:10038000020303040201010301040301000300004E
-:1003900004010102000003024D656D6F7279457220
-:1003A000726F723A206C6578657220636F756C6449
-:1003B000206E6F7420616C6C6F63617465206D6575
-:1003C0006D6F7279006C696E65202575200025714E
-:1003D00020006D61696E2E707900736F66742072F3
-:1003E00065626F6F740D0A006E6F206D6F7265200D
-:1003F00073746F7261676520737061636500492F64
-:100400004F206F7065726174696F6E206F6E20632C
-:100410006C6F7365642066696C650066696C652045
-:100420006E6F7420666F756E640001000100E2EC6F
-:10043000F0F4F8FC0004617267756D656E747320EA
-:100440006D757374206265206B6579776F72647364
-:1004500000756E6B6E6F776E20617267756D656E7D
-:100460007420272571270076616C7565206F75747F
-:10047000206F662072616E676520666F7220617200
-:1004800067756D656E742027257127007265636539
-:1004900069766564207061636B6574206973206E92
-:1004A0006F74206120737472696E67007261646991
-:1004B0006F206973206E6F7420656E61626C656475
-:1004C00000332E342E30002B2D786B63642E636F37
-:1004D0006D2F333533B32D2B0A7CC0207C0A7CB4BE
-:1004E000205C302F89207C0A7CB2202F83205C89FD
-:1004F000207C0A7C8820596F7527726520666C798C
-:10050000696E672192204D6963726F507974686FCC
-:100510006E2120202F7C88207C0A7C8C20486F77DD
-:100520003FA6205C205C87207C0A7C8C202FB32097
-:100530007C0A7C8A2030B5207C0A7C89202F7C5C58
-:10054000B4207C0A7C8A207CB5207C0A7C852D84A2
-:100550005F2F5F5C9E5F962D7C0A7CC0207C0A2BFF
-:10056000C02D2B0A00006571016E65026373036381
-:1005700063046D6905706C067673077663086869B5
-:10058000096C730A67650B6C740C67740D6C65639A
-:10059000616E206F6E6C79206861766520757020C1
-:1005A000746F203420706172616D657465727320A0
-:1005B000746F205468756D6220617373656D626C31
-:1005C0007900706172616D6574657273206D757309
-:1005D000742062652072656769737465727320693F
-:1005E0006E2073657175656E636520723020746F5F
-:1005F0002072330027257327206578706563747334
-:1006000020616E2061646472657373206F6620746C
-:10061000686520666F726D205B612C20625D0075DD
-:100620006E737570706F72746564205468756D6256
-:1006300020696E737472756374696F6E20272573F9
-:1006400027207769746820256420617267756D655D
-:100650006E7473006272616E6368206E6F742069DD
-:100660006E2072616E67650004656F72086C736C52
-:100670000C6C73721061737214616463187362633B
-:100680001C726F7220747374246E656728636D70BA
-:100690002C636D6E306F7272346D756C3862696385
-:1006A0003C6D766E272573272065787065637473BB
-:1006B00020616E20696E7465676572002725732757
-:1006C00020696E7465676572203078257820646FC4
-:1006D0006573206E6F742066697420696E206D6189
-:1006E000736B203078257800272573272065787074
-:1006F000656374732061206C6162656C006C61627B
-:10070000656C2027257127206E6F742064656669EB
-:100710006E656400272573272065787065637473A0
-:10072000206174206D6F7374207225640027257317
-:10073000272065787065637473206120726567692E
-:10074000737465720027257327206578706563745C
-:1007500073207B72302C2072312C202E2E2E7D00A7
-:1007600000723000017231000272320003723300F5
-:1007700004723400057235000672360007723700C5
-:1007800008723800097239000A7231300B72313147
-:100790000C7231320D7231330E7231340F723135C9
-:1007A0000A736C000B6670000D7370000E6C7200A3
-:1007B0000F70630066756E6374696F6E2074616B91
-:1007C000657320256420706F736974696F6E616C46
-:1007D00020617267756D656E747320627574202573
-:1007E00064207765726520676976656E0066756E50
-:1007F0006374696F6E20676F74206D756C746970B7
-:100800006C652076616C75657320666F722061720D
-:1008100067756D656E74202725712700756E657884
-:10082000706563746564206B6579776F72642061AD
-:100830007267756D656E7420272571270066756E69
-:100840006374696F6E206D697373696E672072657A
-:1008500071756972656420706F736974696F6E6118
-:100860006C20617267756D656E7420232564006667
-:10087000756E6374696F6E206D697373696E67203E
-:100880007265717569726564206B6579776F7264E2
-:1008900020617267756D656E74202725712700666B
-:1008A000756E6374696F6E206D697373696E67200E
-:1008B0006B6579776F72642D6F6E6C7920617267EA
-:1008C000756D656E7400737472696E6720696E640D
-:1008D00069636573206D75737420626520696E7439
-:1008E00065676572732C206E6F74202573007374B6
-:1008F00072696E6720696E646578206F7574206F09
-:10090000662072616E6765005C7525303478005C26
-:10091000552530387800416C6C6F636174696F6E77
-:1009200020696E20696E74657272757074206861DA
-:100930006E646C6572006E6F7420616E2041756428
-:10094000696F4672616D6500696E646578206F75C8
-:1009500074206F6620626F756E64730063616E6EE3
-:100960006F742064656C65746520656C656D656E7B
-:100970007473206F6620417564696F4672616D659E
-:100980000063616E6E6F7420736574207265747598
-:10099000726E5F70696E20776974686F757420700D
-:1009A000696E0063616E27742073657420617474CE
-:1009B00072696275746500636872282920617267C4
-:1009C000206E6F7420696E2072616E6765283078C2
-:1009D0003131303030302900617267206973206115
-:1009E0006E20656D7074792073657175656E6365D1
-:1009F000006F7264282920657870656374656420CF
-:100A000061206368617261637465722C2062757421
-:100A100020737472696E67206F66206C656E6774F0
-:100A20006820256420666F756E6400332D617267DF
-:100A300020706F772829206E6F7420737570706F27
-:100A400072746564006D75737420757365206B65D1
-:100A500079776F726420617267756D656E74206658
-:100A60006F72206B65792066756E6374696F6E00B6
-:100A70002C004F4B0050686F6E656D657320746F6E
-:100A80006F206C6F6E6700496C6C6567616C2070DD
-:100A9000697463680050686F6E656D65206E6F7471
-:100AA00020756E64657273746F6F6400496E707543
-:100AB000742070686F6E656D657300494E544552C1
-:100AC0004E414C204552524F523A20496C6C65675A
-:100AD000616C2070686F6E656D6520696E64657805
-:100AE00000496E7365727420427265616474680DAA
-:100AF0000050726F6365737365642070686F6E6514
-:100B00006D6573000000000000A4A4A4A4A4A48444
-:100B100084A4A48484848484848444444444444CCD
-:100B20004C4C484C40404040404044444444484081
-:100B30004C440000B4B4B49494944E4E4E4E4E4E79
-:100B40004E4E4E4E4E4E4B4B4B4B4B4B4B4B4B4BE3
-:100B50004B4B80C1C180C1C1C1C100000000000079
-:100B60000000000000000000000000001010101045
-:100B7000080C0804402420202400002420202420E5
-:100B8000200020000000000000000000000004041D
-:100B90000400000000000000000004040400000045
-:100BA0000000000012121208080808080B060C0AC0
-:100BB00005050B0A0A0A09080709070608060707B8
-:100BC00007020502020202020206060706060208E2
-:100BD00003011E0D0C0C0C0E090601020501010695
-:100BE00001020601020802020402020601040601D3
-:100BF00004C7FF00121212080B090B0E0F0B100C8A
-:100C000006060E0C0E0C0B08080B0A09080808084B
-:100C1000080305020202020202060608060602098D
-:100C20000402010E0F0F0F0E0E0802020702010749
-:100C3000020207020208020206020207020407017A
-:100C4000040505202E3F2C2D494945414141415580
-:100C5000414945554F524C575957524C57594D4E93
-:100C60004E4451535346542F2F5A5A5644432A4AFE
-:100C70002A2A2A45414F414F55422A2A442A2A47C7
-:100C80002A2A472A2A502A2A542A2A4B2A2A4B2A15
-:100C90002A5555552A2A2A2A2A5948484541484F53
-:100CA00048585852584858585858482A2A2A2A2AE0
-:100CB0002A58582A2A482A4848582A482A48482A56
-:100CC0002A2A2A2A5959595757572A2A2A2A2A2A70
-:100CD0002A2A2A582A2A2A2A2A2A2A2A2A2A2A5818
-:100CE0002A2A4C4D4E2A313233343536373865781E
-:100CF00070656374696E6720612070696E00696E4B
-:100D000076616C696420706572696F6400696E76E3
-:100D1000616C69642070756C6C0076616C7565201F
-:100D20006D757374206265206265747765656E20E9
-:100D30003020616E6420313032330076616C75652D
-:100D4000206D7573742062652030206F7220310031
-:100D5000696D706F727420000A2573007768696C82
-:100D60006500666F72007472790063616E6E6F74F5
-:100D700020706572666F726D2072656C6174697641
-:100D80006520696D706F7274006E6F206D6F647591
-:100D90006C65206E616D65642027257127005F5F9B
-:100DA000696E69745F5F2E707900476C697463685F
-:100DB00065733A2025640D0A007465787420746F99
-:100DC0006F206C6F6E6700636F756C64206E6F745C
-:100DD00020706172736520696E70757400736C6940
-:100DE000636528006469766973696F6E2062792093
-:100DF0007A65726F006D61746820646F6D61696EF1
-:100E0000206572726F72000A000B0C0D0E0F00004D
-:100E100000000000000000030303030300000000C3
-:100E200000000000000000000000000000000301BE
-:100E3000010101010101010101010101010145451A
-:100E4000454545454545454501010101010101591A
-:100E500059595959591919191919191919191919C2
-:100E60001919191919191919190101010101016932
-:100E700069696969692929292929292929292929A2
-:100E800029292929292929292901010101004D6937
-:100E900063726F426974416363656C65726F6D65FF
-:100EA00074657220747970650A0055736566756C97
-:100EB00020737475666620746F20636F6E74726F32
-:100EC0006C20746865206D6963726F3A6269742082
-:100ED00068617264776172652E0A00507574206DC6
-:100EE0006963726F3A62697420696E2070616E691D
-:100EF000632829206D6F646520616E6420646973C6
-:100F0000706C617920616E20756E686170707920F7
-:100F1000666163652E0A507265737320726573652E
-:100F20007420627574746F6E20746F2065786974B4
-:100F30002070616E69632829206D6F64652E0A0038
-:100F4000507574206D6963726F3A62697420746FB2
-:100F500020736C6565702874696D652920666F72F1
-:100F600020736F6D65206D696C6C697365636F6E5E
-:100F70006473202831207365636F6E64203D2031D7
-:100F8000303030206D7329206F662074696D652EB6
-:100F90000A736C65657028323030302920676976B5
-:100FA0006573206D6963726F3A62697420612032E3
-:100FB000207365636F6E64206E61702E0A00526547
-:100FC0007475726E2072756E6E696E675F74696D8E
-:100FD00065282920696E206D696C6C697365636F83
-:100FE0006E64732073696E6365206D6963726F3A16
-:100FF0006269742773206C61737420726573657401
-:101000002E0A0052657475726E206D6963726F3AB4
-:1010100062697427732074656D706572617475728E
-:101020006520696E20646567726565732043656C31
-:10103000636975732E0A00446574656374206D6975
-:1010400063726F3A6269742773206D6F76656D65A0
-:101050006E7420696E2033442E0A4974206D6561D8
-:1010600073757265732074696C7420285820616EE2
-:101070006420592920616E642075702D646F776E2D
-:1010800020285A29206D6F74696F6E2E0A005265F0
-:101090007475726E206D6963726F3A62697427733A
-:1010A0002074696C7420285820616363656C6572D4
-:1010B0006174696F6E2920696E206D696C6C692D91
-:1010C0006727732E0A0052657475726E206D69630E
-:1010D000726F3A62697427732074696C742028599E
-:1010E00020616363656C65726174696F6E29206944
-:1010F0006E206D696C6C692D6727732E0A0052652E
-:101100007475726E206D6963726F3A6269742773C9
-:101110002075702D646F776E206D6F74696F6E200F
-:10112000285A20616363656C65726174696F6E290A
-:1011300020696E206D696C6C692D6727732E0A5AC1
-:10114000206973206120706F736974697665206E01
-:10115000756D626572207768656E206D6F76696E59
-:10116000672075702E204D6F76696E6720646F77EB
-:101170006E2C205A2069732061206E656761746946
-:101180007665206E756D6265722E0A006D696372F8
-:101190006F3A62697427732027412720627574743F
-:1011A0006F6E2E205768656E20627574746F6E20A6
-:1011B0006973207072657373656420646F776E2C39
-:1011C0002069735F70726573736564282920697381
-:1011D00020547275652E0A006D6963726F3A6269F8
-:1011E0007427732027422720627574746F6E2E2037
-:1011F0005768656E20627574746F6E206973207015
-:1012000072657373656420646F776E2C2069735FF9
-:101210007072657373656428292069732054727530
-:10122000652E0A0049662074686520627574746FC3
-:101230006E206973207072657373656420646F77C4
-:101240006E2C2069735F7072657373656428292042
-:10125000697320547275652C20656C736520466136
-:101260006C73652E0A00557365207761735F707229
-:101270006573736564282920746F206C6561726ED4
-:101280002069662074686520627574746F6E2077BB
-:10129000617320707265737365642073696E636532
-:1012A00020746865206C6173742074696D650A77B9
-:1012B00061735F7072657373656428292077617349
-:1012C0002063616C6C65642E2052657475726E7358
-:1012D0002054727565206F722046616C73652E0A0A
-:1012E00000557365206765745F707265737365730D
-:1012F000282920746F2067657420746865207275D2
-:101300006E6E696E6720746F74616C206F66206208
-:101310007574746F6E20707265737365732C2061C1
-:101320006E6420616C736F0A7265736574207468F3
-:10133000697320636F756E74657220746F207A65AF
-:10134000726F2E0A004769766573206120636F6DA6
-:10135000706173732068656164696E67206265748B
-:101360007765656E20302D333630207769746820BC
-:1013700030206173206E6F7274682E0A0055736599
-:10138000206D6963726F3A626974277320636F6DB1
-:101390007061737320746F20646574656374207466
-:1013A000686520646972656374696F6E2069742072
-:1013B00069732068656164696E6720696E2E0A54DE
-:1013C000686520636F6D706173732063616E206464
-:1013D0006574656374206D61676E6574696320660A
-:1013E00069656C64732E0A49742075736573207483
-:1013F00068652045617274682773206D61676E654A
-:10140000746963206669656C6420746F2064657418
-:1014100065637420646972656374696F6E2E0A0077
-:101420004966206D6963726F3A626974277320633D
-:101430006F6D706173732069735F63616C69627251
-:1014400061746564282920616E642061646A757323
-:1014500074656420666F722061636375726163797D
-:101460002C2072657475726E20547275652E0A494F
-:101470006620636F6D70617373206861736E27748B
-:10148000206265656E2061646A75737465642066A8
-:101490006F722061636375726163792C2072657469
-:1014A00075726E2046616C73652E0A004966206D68
-:1014B0006963726F3A62697420697320636F6E6644
-:1014C000757365642C2063616C6962726174652850
-:1014D000292074686520636F6D7061737320746F69
-:1014E0002061646A75737420746865206974732060
-:1014F00061636375726163792E0A49742077696C40
-:101500006C2061736B20796F7520746F20726F741B
-:10151000617465207468652064657669636520740C
-:101520006F2064726177206120636972636C65204B
-:101530006F6E2074686520646973706C61792E0A1F
-:10154000005265736574206D6963726F3A626974E5
-:10155000277320636F6D70617373207573696E6795
-:1015600020636C6561725F63616C6962726174694A
-:101570006F6E282920636F6D6D616E642E0A52753F
-:101580006E2063616C696272617465282920746FD2
-:1015900020696D70726F7665206163637572616337
-:1015A000792E0A0052657475726E206D61676E65E2
-:1015B000746963206669656C64206465746563742E
-:1015C000656420616C6F6E67206D6963726F3A624B
-:1015D00069742773205820617869732E0A557375D2
-:1015E000616C6C792C2074686520636F6D70617319
-:1015F000732072657475726E7320746865206561FE
-:101600007274682773206D61676E65746963206604
-:1016100069656C6420696E206D6963726F2D546515
-:10162000736C6120756E6974732E0A556E6C6573E8
-:10163000732E2E2E61207374726F6E67206D61673A
-:101640006E6574206973206E6561726279210A008B
-:1016500052657475726E206D61676E657469632082
-:101660006669656C64206465746563746564206193
-:101670006C6F6E67206D6963726F3A62697427736D
-:10168000205920617869732E0A557375616C6C79E5
-:101690002C2074686520636F6D70617373207265B0
-:1016A0007475726E73207468652065617274682742
-:1016B00073206D61676E65746963206669656C642B
-:1016C00020696E206D6963726F2D5465736C6120A3
-:1016D000756E6974732E0A556E6C6573732E2E2E9B
-:1016E00061207374726F6E67206D61676E65742020
-:1016F0006973206E6561726279210A0052657475A2
-:10170000726E206D61676E65746963206669656CD1
-:101710006420646574656374656420616C6F6E67D2
-:10172000206D6963726F3A6269742773205A206171
-:101730007869732E0A557375616C6C792C20746806
-:101740006520636F6D706173732072657475726E5E
-:1017500073207468652065617274682773206D61F9
-:10176000676E65746963206669656C6420696E20C4
-:101770006D6963726F2D5465736C6120756E697449
-:10178000732E0A556E6C6573732E2E2E6120737442
-:10179000726F6E67206D61676E6574206973206E6D
-:1017A0006561726279210A0052657475726E2073E8
-:1017B0007472656E677468206F66206D61676E6510
-:1017C000746963206669656C642061726F756E640C
-:1017D000206D6963726F3A6269742E0A006D6963E5
-:1017E000726F3A626974277320357835204C45440E
-:1017F00020646973706C61792E0A005573652073DB
-:10180000686F7728782920746F207072696E742051
-:1018100074686520737472696E67206F7220696DD9
-:10182000616765732027782720746F2074686520AE
-:10183000646973706C61792E205472792073686FBB
-:1018400077282748692127292E0A55736520736850
-:101850006F7728732C20692920746F2073686F7745
-:1018600020737472696E67202773272C206F6E6552
-:101870002063686172616374657220617420612005
-:1018800074696D65207769746820612064656C6196
-:1018900079206F660A276927206D696C6C6973650A
-:1018A000636F6E64732E0A00557365207363726FE5
-:1018B0006C6C28732920746F207363726F6C6C20BA
-:1018C00074686520737472696E67202773272061BE
-:1018D00063726F73732074686520646973706C61E0
-:1018E000792E0A557365207363726F6C6C28732CA4
-:1018F00020692920746F207363726F6C6C2073747D
-:1019000072696E67202773272077697468206120C9
-:1019100064656C6179206F6620276927206D696C8A
-:101920006C697365636F6E64732061667465720AB7
-:1019300065616368206368617261637465722E0A11
-:101940000055736520636C656172282920746F20CF
-:10195000636C656172206D6963726F3A62697427A6
-:101960007320646973706C61792E0A005573652069
-:101970006765745F706978656C28782C20792920F8
-:10198000746F2072657475726E2074686520646966
-:1019900073706C61792773206272696768746E6511
-:1019A0007373206174204C454420706978656C2005
-:1019B00028782C79292E0A4272696768746E6573DB
-:1019C000732063616E2062652066726F6D20302027
-:1019D000284C4544206973206F66662920746F2067
-:1019E0003920286D6178696D756D204C4544206201
-:1019F00072696768746E657373292E0A0055736582
-:101A0000207365745F706978656C28782C20792C58
-:101A100020622920746F20736574207468652064C7
-:101A20006973706C6179206174204C454420706941
-:101A300078656C2028782C792920746F206272696F
-:101A40006768746E657373202762270A7768696315
-:101A5000682063616E20626520736574206265741E
-:101A60007765656E203020286F66662920746F20A8
-:101A700039202866756C6C206272696768746E65BF
-:101A80007373292E0A00557365206F6E2829207400
-:101A90006F207475726E206F6E20746865206469A3
-:101AA00073706C61792E0A00557365206F66662825
-:101AB0002920746F207475726E206F6666207468BA
-:101AC0006520646973706C61792E0A005573652016
-:101AD00069735F6F6E282920746F20717565727944
-:101AE00020696620746865206D6963726F3A626967
-:101AF00074277320646973706C6179206973206F37
-:101B00006E20285472756529206F72206F666620DA
-:101B10002846616C7365292E0A005573652072652D
-:101B200061645F6C696768745F6C6576656C2829B1
-:101B300020746F206765742074686520616D626928
-:101B4000656E74206C69676874206C6576656C2CB2
-:101B5000206265747765656E203020286461726B41
-:101B60002920616E642032353520286272696768E9
-:101B700074292E0A006D6963726F3A626974277363
-:101B80002070696E2030206F6E2074686520676F4A
-:101B90006C64206564676520636F6E6E6563746F47
-:101BA000722E0A006D6963726F3A6269742773203E
-:101BB00070696E2031206F6E2074686520676F6CCD
-:101BC00064206564676520636F6E6E6563746F7211
-:101BD0002E0A006D6963726F3A6269742773207010
-:101BE000696E2032206F6E2074686520676F6C64A8
-:101BF000206564676520636F6E6E6563746F722E17
-:101C00000A006D6963726F3A6269742773207069A4
-:101C10006E2033206F6E2074686520676F6C6420BF
-:101C20006564676520636F6E6E6563746F722E0AFC
-:101C3000006D6963726F3A62697427732070696E10
-:101C40002034206F6E2074686520676F6C64206597
-:101C500064676520636F6E6E6563746F722E0A0031
-:101C60006D6963726F3A62697427732070696E20C0
-:101C700035206F6E2074686520676F6C6420656422
-:101C8000676520636F6E6E6563746F722E0A006DF8
-:101C90006963726F3A62697427732070696E2036C7
-:101CA000206F6E2074686520676F6C6420656467C0
-:101CB0006520636F6E6E6563746F722E0A006D69C6
-:101CC00063726F3A62697427732070696E203720DF
-:101CD0006F6E2074686520676F6C6420656467654B
-:101CE00020636F6E6E6563746F722E0A006D696398
-:101CF000726F3A62697427732070696E2038206FA2
-:101D00006E2074686520676F6C6420656467652069
-:101D1000636F6E6E6563746F722E0A006D69637215
-:101D20006F3A62697427732070696E2039206F6E74
-:101D30002074686520676F6C642065646765206344
-:101D40006F6E6E6563746F722E0A006D6963726FD9
-:101D50003A62697427732070696E203130206F6E8B
-:101D60002074686520676F6C642065646765206314
-:101D70006F6E6E6563746F722E0A006D6963726FA9
-:101D80003A62697427732070696E203131206F6E5A
-:101D90002074686520676F6C6420656467652063E4
-:101DA0006F6E6E6563746F722E0A006D6963726F79
-:101DB0003A62697427732070696E203132206F6E29
-:101DC0002074686520676F6C6420656467652063B4
-:101DD0006F6E6E6563746F722E0A006D6963726F49
-:101DE0003A62697427732070696E203133206F6EF8
-:101DF0002074686520676F6C642065646765206384
-:101E00006F6E6E6563746F722E0A006D6963726F18
-:101E10003A62697427732070696E203134206F6EC6
-:101E20002074686520676F6C642065646765206353
-:101E30006F6E6E6563746F722E0A006D6963726FE8
-:101E40003A62697427732070696E203135206F6E95
-:101E50002074686520676F6C642065646765206323
-:101E60006F6E6E6563746F722E0A006D6963726FB8
-:101E70003A62697427732070696E203136206F6E64
-:101E80002074686520676F6C6420656467652063F3
-:101E90006F6E6E6563746F722E0A006D6963726F88
-:101EA0003A62697427732070696E203139206F6E31
-:101EB0002074686520676F6C6420656467652063C3
-:101EC0006F6E6E6563746F722E0A006D6963726F58
-:101ED0003A62697427732070696E203230206F6E09
-:101EE0002074686520676F6C642065646765206393
-:101EF0006F6E6E6563746F722E0A006D6963726F28
-:101F00003A6269742C2077726974655F64696769E5
-:101F100074616C2863686F6963652920746F20742D
-:101F200068652070696E2E20596F7520686176652E
-:101F30002074776F202763686F6963652720766157
-:101F40006C7565732C0A3020286C6F29206F722005
-:101F50003120286869292E0A006D6963726F3A6220
-:101F600069742C20726561645F6469676974616C6F
-:101F700028292076616C75652066726F6D20746803
-:101F8000652070696E2061732065697468657220D0
-:101F90003020286C6F29206F722031202868692931
-:101FA0002E0A006D6963726F3A6269742C20777231
-:101FB0006974655F616E616C6F672876616C7565C9
-:101FC0002920746F207468652070696E2E20596F07
-:101FD000752063616E2075736520616E792076616E
-:101FE0006C7565206265747765656E0A3020616E78
-:101FF0006420313032332E0A006D6963726F3A62A9
-:1020000069742C20726561645F616E616C6F672812
-:10201000292076616C75652066726F6D2074686525
-:102020002070696E2E20576F772C20616E616C6F67
-:102030006720686173206C6F7473206F662076610F
-:102040006C7565730A2830202D20363535333529D7
-:102050002E204469676974616C20686173206F6E1B
-:102060006C79203020616E6420312E0A0049662090
-:1020700070696E2069735F746F7563686564282981
-:10208000206F6E206D6963726F3A6269742C2072E2
-:10209000657475726E20547275652E204966206EC7
-:1020A0006F7468696E6720697320746F75636869FF
-:1020B0006E67207468652070696E2C0A726574758D
-:1020C000726E2046616C73652E0A00436F6D6D75EC
-:1020D0006E69636174652077697468206F6E65202E
-:1020E0006F72206D6F7265206E616D65642064652E
-:1020F000766963657320636F6E6E656374656420D3
-:10210000746F206D6963726F3A6269742E20456145
-:102110006368206E616D65640A6465766963652035
-:1021200068617320616E2027616464726573732730
-:102130002C20636F6D6D756E6963617465732075B6
-:1021400073696E67204932432C20616E6420636F8F
-:102150006E6E6563747320746F2074686520492FF8
-:102160004F2070696E732E0A005573652072656189
-:102170006428616464726573732C206E2920746F07
-:10218000207265616420276E272062797465732050
-:1021900066726F6D2074686520646576696365207A
-:1021A0007769746820746869732061646472657308
-:1021B000732E0A005573652077726974652861640F
-:1021C00064726573732C206275666665722920746B
-:1021D0006F20777269746520746F2074686520279A
-:1021E00062756666657227206F6620746865206474
-:1021F000657669636520617420746869732027615E
-:10220000646472657373272E0A0055736520696EC6
-:102210006974286672657175656E63792C207363C5
-:102220006C2C207364612920746F20736574207492
-:10223000686520627573206672657175656E637975
-:1022400020616E642070696E732E0A0043726561AE
-:10225000746520616E6420757365206275696C74A5
-:102260002D696E20494D4147455320746F20736896
-:102270006F77206F6E2074686520646973706C617D
-:10228000792E205573653A0A496D616765280A20E1
-:10229000202730393039303A270A20202739393978
-:1022A00039393A270A20202739393939393A270A62
-:1022B00020202730393939303A270A20202730307A
-:1022C0003930303A27290A2E2E2E746F206D616B1B
-:1022D000652061206E6577203578352068656172EC
-:1022E0007420696D6167652E204E756D626572732D
-:1022F00020676F2066726F6D203020286F66662918
-:1023000020746F203920286272696768746573745D
-:10231000292E204E6F74650A74686520636F6C6F98
-:102320006E20273A2720746F2073657420746865C7
-:1023300020656E64206F66206120726F772E0A0020
-:1023400052657475726E207468652077696474686C
-:10235000206F662074686520696D61676520696E0D
-:1023600020706978656C732E0A0052657475726E00
-:102370002074686520686569676874206F662074DA
-:10238000686520696D61676520696E207069786590
-:102390006C732E0A00557365206765745F706978E9
-:1023A000656C28782C20792920746F2072657475EB
-:1023B000726E2074686520696D616765277320629D
-:1023C00072696768746E657373206174204C45444C
-:1023D00020706978656C2028782C79292E0A427241
-:1023E000696768746E6573732063616E206265202F
-:1023F00066726F6D203020284C4544206973206F31
-:1024000066662920746F203920286D6178696D75A2
-:102410006D204C4544206272696768746E65737301
-:10242000292E0A00557365207365745F706978659D
-:102430006C28782C20792C20622920746F207365F9
-:102440007420746865204C454420706978656C2060
-:1024500028782C792920696E2074686520696D615F
-:10246000676520746F206272696768746E65737344
-:102470000A2762272077686963682063616E20629B
-:102480006520736574206265747765656E20302001
-:10249000286F66662920746F2039202866756C6C59
-:1024A000206272696768746E657373292E0A00551D
-:1024B00073652073686966745F6C65667428692942
-:1024C00020746F206D616B65206120636F707920CF
-:1024D0006F662074686520696D6167652062757438
-:1024E000206D6F7665642027692720706978656C98
-:1024F0007320746F20746865206C6566742E0A0002
-:102500005573652073686966745F726967687428BB
-:10251000692920746F206D616B65206120636F7085
-:1025200079206F662074686520696D616765206237
-:102530007574206D6F76656420276927207069782F
-:10254000656C7320746F0A746865207269676874BB
-:102550002E0A005573652073686966745F7570286C
-:10256000692920746F206D616B65206120636F7035
-:1025700079206F662074686520696D6167652062E7
-:102580007574206D6F7665642027692720706978DF
-:10259000656C732075702E0A005573652073686929
-:1025A00066745F646F776E28692920746F206D618F
-:1025B0006B65206120636F7079206F662074686599
-:1025C00020696D61676520627574206D6F76656442
-:1025D0002027692720706978656C7320646F776E97
-:1025E0002E0A0055736520636F7079282920746F57
-:1025F000206D616B652061206E6577206578616371
-:102600007420636F7079206F662074686520696D2F
-:102610006167652E0A005573652063726F702878B4
-:10262000312C2079312C2078322C207932292074D9
-:102630006F206D616B652061206375742D6F7574FB
-:1026400020636F7079206F662074686520696D6102
-:10265000676520776865726520636F6F7264696E65
-:102660006174650A2878312C7931292069732074C6
-:10267000686520746F70206C65667420636F726E7D
-:102680006572206F6620746865206375742D6F75A0
-:1026900074206172656120616E6420636F6F726483
-:1026A000696E617465202878322C7932292069732B
-:1026B000207468650A626F74746F6D207269676850
-:1026C0007420636F726E65722E0A005573652069FF
-:1026D0006E76657274282920746F206D616B652099
-:1026E00061206E6567617469766520636F7079201B
-:1026F0006F662074686520696D6167652E20576874
-:10270000657265206120706978656C20776173203F
-:10271000627269676874206F720A6F6E20696E203A
-:10272000746865206F726967696E616C2C206974CA
-:102730002069732064696D206F72206F666620695E
-:102740006E20746865206E656761746976652063C4
-:102750006F70792E0A00436F6D6D756E69636174D9
-:1027600065207769746820612073657269616C20E7
-:1027700064657669636520636F6E6E656374656416
-:1027800020746F206D6963726F3A626974277320D9
-:10279000492F4F2070696E732E0A005573652069AA
-:1027A0006E6974282920746F2073657420757020F9
-:1027B000636F6D6D756E69636174696F6E2E205500
-:1027C00073652070696E7320302028545829206169
-:1027D0006E6420312028525829207769746820615E
-:1027E00020626175640A72617465206F66203936F3
-:1027F00030302E0A4F7665727269646520746865A0
-:102800002064656661756C747320666F7220276240
-:1028100061756472617465272C2027706172697418
-:10282000792720616E64202770696E73272E0A0055
-:1028300049662074686572652061726520696E63FF
-:102840006F6D696E6720636861726163746572732E
-:102850002077616974696E6720746F2062652072E9
-:102860006561642C20616E7928292077696C6C2061
-:1028700072657475726E20547275652E0A4F746895
-:102880006572776973652C2072657475726E73203A
-:1028900046616C73652E0A0055736520726561642C
-:1028A000282920746F2072656164206368617261F9
-:1028B00063746572732E0A557365207265616428AE
-:1028C0006E2920746F20726561642C206174206D04
-:1028D0006F73742C20276E27206279746573206FC4
-:1028E0006620646174612E0A00557365207265610B
-:1028F000646C696E65282920746F2072656164209C
-:1029000061206C696E65207468617420656E647303
-:1029100020776974682061206E65776C696E652028
-:102920006368617261637465722E0A005573652075
-:1029300072656164696E746F286275662920746FB0
-:10294000207265616420627974657320696E746FAA
-:1029500020746865206275666665722027627566F8
-:10296000272E0A5573652072656164696E746F283D
-:10297000627566662C206E2920746F207265616412
-:102980002C206174206D6F73742C20276E27206EAD
-:10299000756D626572206F66206279746573206957
-:1029A0006E746F2027627566272E0A0055736520A6
-:1029B0007772697465286275662920746F20777252
-:1029C0006974652074686520627974657320696E26
-:1029D0002062756666657220276275662720746FAF
-:1029E0002074686520636F6E6E656374656420642F
-:1029F00065766963652E0A00436F6D6D756E696358
-:102A0000617465207573696E6720612073657269F2
-:102A1000616C207065726970686572616C20696EA6
-:102A20007465726661636520285350492920646586
-:102A30007669636520636F6E6E6563746564207488
-:102A40006F0A6D6963726F3A626974277320492F48
-:102A50004F2070696E732E0A0055736520696E6988
-:102A600074282920746F2073657420757020636F3B
-:102A70006D6D756E69636174696F6E2E204F76653A
-:102A80007272696465207468652064656661756C3E
-:102A9000747320666F722062617564726174652C54
-:102AA000206D6F64652C0A53434C4B2C204D4F53C3
-:102AB0004920616E64204D49534F2E205468652093
-:102AC00064656661756C7420636F6E6E65637469AE
-:102AD0006F6E73206172652070696E313320666F8E
-:102AE000722053434C4B2C2070696E313520666F39
-:102AF000720A4D4F534920616E642070696E313403
-:102B000020666F72204D49534F2E0A005573652081
-:102B10007772697465286275662920746F207772F0
-:102B200069746520627974657320696E20627566C8
-:102B300066657220276275662720746F2074686549
-:102B400020636F6E6E656374656420646576696387
-:102B5000652E0A005573652072656164286E292010
-:102B6000746F207265616420276E27206279746516
-:102B700073206F6620646174612E0A0055736520AE
-:102B800077726974655F72656164696E746F286FCE
-:102B900075742C20696E2920746F207772697465B2
-:102BA0002074686520276F757427206275666665D6
-:102BB0007220746F2074686520636F6E6E65637435
-:102BC0006564206465766963650A616E6420726578
-:102BD000616420616E7920726573706F6E73652019
-:102BE000696E746F207468652027696E272062758E
-:102BF000666665722E20546865206C656E67746821
-:102C0000206F662074686520627566666572732041
-:102C100073686F756C640A626520746865207361FF
-:102C20006D652E2054686520627566666572732036
-:102C300063616E206265207468652073616D652034
-:102C40006F626A6563742E0A00506C756720696E46
-:102C5000206120737065616B6572207769746820EC
-:102C600063726F636F64696C6520636C6970732055
-:102C7000616E64206D616B65206D6963726F3A628D
-:102C8000697420676F20626C65657020616E6420D6
-:102C9000626C6F6F702E0A00557365207365745FE8
-:102CA00074656D706F286E756D6265722C20627030
-:102CB0006D2920746F206D616B65206120626561F4
-:102CC00074206C617374206120276E756D6265726B
-:102CD00027206F66207469636B73206C6F6E6720AA
-:102CE000616E640A706C617965642061742027628A
-:102CF000706D2720626561747320706572206D6944
-:102D00006E7574652E0A005573652070697463686A
-:102D100028667265712C206C656E67746829207452
-:102D20006F206D616B65206D6963726F3A626974C3
-:102D300020706C61792061206E6F74652061742051
-:102D4000276672657127206672657175656E637995
-:102D500020666F720A276C656E67746827206D693C
-:102D60006C6C697365636F6E64732E20452E672EDD
-:102D7000207069746368283434302C20313030304E
-:102D8000292077696C6C20706C617920636F6E63A9
-:102D90006572742027412720666F72203120736589
-:102DA000636F6E642E0A0055736520706C6179281C
-:102DB0006D757369632920746F206D616B65206D7B
-:102DC0006963726F3A62697420706C617920276D53
-:102DD0007573696327206C697374206F66206E6F4A
-:102DE0007465732E20547279206F75742074686531
-:102DF0000A6275696C7420696E206D757369632051
-:102E0000746F2073656520686F7720697420776F11
-:102E1000726B732E20452E672E206D757369632E9D
-:102E2000706C6179286D757369632E50554E4348F7
-:102E30004C494E45292E0A00557365206765745F1D
-:102E400074656D706F282920746F207265747572B7
-:102E50006E20746865206E756D626572206F6620E5
-:102E60007469636B7320696E2061206265617420F0
-:102E7000616E64206E756D626572206F662062659A
-:102E80006174730A706572206D696E7574652E0ABF
-:102E90000055736520746F2073746F702829207437
-:102EA0006865206D75736963207468617420697347
-:102EB00020706C6179696E672E0A0049662074681B
-:102EC000696E677320676F2077726F6E672C207250
-:102ED00065736574282920746865206D757369634E
-:102EE00020746F206974732064656661756C74204A
-:102EF00073657474696E67732E0A005365653A20B2
-:102F0000687474703A2F2F786B63642E636F6D2F23
-:102F10003335332F0A00546865205A656E206F667A
-:102F200020507974686F6E20646566696E657320E1
-:102F30007768617420697420697320746F206265FA
-:102F400020507974686F6E69632E20497420776F02
-:102F5000756C646E277420666974206F6E207468C7
-:102F600069730A64657669636520736F20776527E6
-:102F70007665207772697474656E2061205A656E7B
-:102F8000206F66204D6963726F507974686F6E2090
-:102F9000696E73746561642E0A00557365206175EE
-:102FA00074686F7273282920746F2072657665616A
-:102FB0006C20746865206E616D6573206F66207487
-:102FC00068652070656F706C652077686F2063722C
-:102FD0006561746564207468697320736F667477C3
-:102FE0006172652E0A00416C6C20796F75206E65E8
-:102FF00065642E20557365206C6F76652E62616462
-:1030000061626F6F6D282920746F20726570656131
-:103010007420746865206566666563742E0A0048CE
-:10302000656172206D7920736F756C2073706561B6
-:103030006B3A0A546865207665727920696E7374FC
-:10304000616E7420746861742049207361772079FF
-:103050006F752C206469640A4D792068656172740B
-:1030600020666C7920746F20796F75722073657299
-:10307000766963652E0A0057656C636F6D65207411
-:103080006F204D6963726F507974686F6E206F6E38
-:1030900020746865206D6963726F3A626974210AF1
-:1030A0000A54727920746865736520636F6D6D6171
-:1030B0006E64733A0A2020646973706C61792E73B0
-:1030C00063726F6C6C282748656C6C6F27290A2027
-:1030D0002072756E6E696E675F74696D6528290A66
-:1030E0002020736C6565702831303030290A20202B
-:1030F000627574746F6E5F612E69735F7072657351
-:1031000073656428290A5768617420646F207468A5
-:1031100065736520636F6D6D616E647320646F3FCE
-:103120002043616E20796F7520696D70726F7665CE
-:10313000207468656D3F2048494E543A2075736588
-:103140002074686520757020616E6420646F776EEE
-:103150000A6172726F77206B65797320746F2067D4
-:10316000657420796F757220636F6D6D616E642078
-:10317000686973746F72792E20507265737320744E
-:10318000686520544142206B657920746F20617519
-:10319000746F2D636F6D706C6574650A756E66690A
-:1031A0006E697368656420776F7264732028736F2B
-:1031B0002027646927206265636F6D65732027642B
-:1031C0006973706C61792720616674657220796F0C
-:1031D0007520707265737320544142292E20546803
-:1031E0006573650A747269636B7320736176652019
-:1031F00061206C6F74206F6620747970696E67202F
-:10320000616E64206C6F6F6B20636F6F6C210A0AB4
-:103210004578706C6F72653A0A547970652027683A
-:10322000656C7028736F6D657468696E67292720F7
-:10323000746F2066696E64206F75742061626F75AB
-:10324000742069742E20547970652027646972286F
-:10325000736F6D657468696E67292720746F2073BA
-:10326000656520776861740A69742063616E206403
-:103270006F2E2054797065202764697228292720D1
-:10328000746F207365652077686174207374756648
-:103290006620697320617661696C61626C652E20BD
-:1032A000466F7220676F6F646E6573732073616B16
-:1032B000652C0A646F6E2774207479706520276905
-:1032C0006D706F72742074686973272E0A0A436FD9
-:1032D0006E74726F6C20636F6D6D616E64733A0A09
-:1032E00020204354524C2D432020202020202020F9
-:1032F0002D2D2073746F7020612072756E6E696E53
-:10330000672070726F6772616D0A20204354524CBF
-:103310002D4420202020202020202D2D206F6E20C5
-:103320006120626C616E6B206C696E652C20646F2D
-:10333000206120736F6674207265736574206F66F8
-:1033400020746865206D6963726F3A6269740A203F
-:10335000204354524C2D4520202020202020202D79
-:103360002D20656E746572207061737465206D6FB9
-:1033700064652C207475726E696E67206F666620B6
-:103380006175746F2D696E64656E740A0A466F729A
-:103390002061206C697374206F6620617661696CAE
-:1033A00061626C65206D6F64756C65732C20747937
-:1033B00070652068656C7028276D6F64756C657327
-:1033C00027290A0A466F72206D6F726520696E6642
-:1033D0006F726D6174696F6E2061626F75742050D9
-:1033E0007974686F6E2C2076697369743A206874FA
-:1033F00074703A2F2F707974686F6E2E6F72672F0A
-:103400000A546F2066696E64206F75742061626F64
-:103410007574204D6963726F507974686F6E2C20DB
-:1034200076697369743A20687474703A2F2F6D69E5
-:1034300063726F707974686F6E2E6F72672F0A50A7
-:103440007974686F6E2F6D6963726F3A6269742068
-:10345000646F63756D656E746174696F6E206973F6
-:1034600020686572653A2068747470733A2F2F6D06
-:103470006963726F6269742D6D6963726F707974BC
-:10348000686F6E2E72656164746865646F63732E15
-:10349000696F2F0A003C6D6F64756C65202725737A
-:1034A000273E0050696E20256420696E202571201A
-:1034B0006D6F646500506C757320616E79206D6F5F
-:1034C00064756C6573206F6E207468652066696C26
-:1034D0006573797374656D0A006F626A6563742041
-:1034E00000206973206F6620747970652025730A47
-:1034F00000202D2D20006279746561727261792837
-:10350000620061727261792827256327002C205B95
-:10351000004E6F6E65002020202020202020000813
-:1035200008080808080808000506070409080A042E
-:10353000031213141615170F0D0E111063616E2769
-:10354000742061737369676E20746F206C69746591
-:1035500072616C0063616E27742061737369676EBA
-:1035600020746F2065787072657373696F6E00697F
-:103570006C6C6567616C2065787072657373696FD8
-:103580006E20666F72206175676D656E746564206C
-:1035900061737369676E6D656E74006D756C7469C7
-:1035A000706C65202A7820696E2061737369676E7C
-:1035B0006D656E740063616E27742064656C65745C
-:1035C000652065787072657373696F6E00657870D9
-:1035D000656374696E67206B65793A76616C7565B1
-:1035E00020666F722064696374696F6E617279001E
-:1035F000657870656374696E67206A75737420619D
-:103600002076616C756520666F7220736574007337
-:103610007570657228292063616E27742066696E53
-:10362000642073656C660027627265616B27206F8A
-:10363000757473696465206C6F6F700027636F6EBB
-:1036400074696E756527206F757473696465206C85
-:103650006F6F7000696E76616C6964206D6963726A
-:103660006F707974686F6E206465636F7261746FD8
-:1036700072006E6F6E2D64656661756C7420617288
-:1036800067756D656E7420666F6C6C6F7773206400
-:10369000656661756C7420617267756D656E740026
-:1036A0006964656E746966696572207265646566D1
-:1036B000696E656420617320676C6F62616C006382
-:1036C000616E2774206465636C617265206E6F6E35
-:1036D0006C6F63616C20696E206F75746572206316
-:1036E0006F6465006E6F2062696E64696E67206644
-:1036F0006F72206E6F6E6C6F63616C20666F756E9B
-:1037000064006964656E74696669657220726564D7
-:103710006566696E6564206173206E6F6E6C6F63A1
-:10372000616C002772657475726E27206F757473F3
-:103730006964652066756E6374696F6E00696E7684
-:10374000616C69642073796E746178006E616D6577
-:103750002072657573656420666F7220617267758B
-:103760006D656E7400696E6C696E6520617373655A
-:103770006D626C6572206D757374206265206120C6
-:1037800066756E6374696F6E00756E6B6E6F776EC3
-:1037900020747970650072657475726E20616E6E4A
-:1037A0006F746174696F6E206D757374206265202B
-:1037B000616E206964656E7469666965720065781A
-:1037C00070656374696E6720616E20617373656DE7
-:1037D000626C657220696E737472756374696F6E62
-:1037E00000276C6162656C2720726571756972656E
-:1037F00073203120617267756D656E74006C616253
-:10380000656C207265646566696E65640027616C2D
-:1038100069676E2720726571756972657320312042
-:10382000617267756D656E7400276461746127202D
-:103830007265717569726573206174206C6561735E
-:1038400074203220617267756D656E747300276431
-:103850006174612720726571756972657320696E84
-:10386000746567657220617267756D656E7473004B
-:103870002A78206D7573742062652061737369679F
-:103880006E6D656E74207461726765740063616E3D
-:1038900027742068617665206D756C7469706C653D
-:1038A000202A780063616E27742068617665206D38
-:1038B000756C7469706C65202A2A78004C48532016
-:1038C0006F66206B6579776F726420617267206D17
-:1038D00075737420626520616E206964006E6F6E7E
-:1038E0002D6B6579776F72642061726720616674F1
-:1038F0006572202A2F2A2A006E6F6E2D6B657977EC
-:103900006F726420617267206166746572206B65F6
-:1039100079776F7264206172670064656661756CA7
-:103920007420276578636570743A27206D75737409
-:10393000206265206C61737400277969656C642767
-:10394000206F7574736964652066756E6374696F42
-:103950006E003C2573206F626A6563742061742079
-:1039600025703E006973737562636C6173732829F7
-:10397000206172672031206D75737420626520614B
-:1039800020636C6173730027257327206F626A655B
-:103990006374206973206E6F742063616C6C616264
-:1039A0006C65005F5F696E69745F5F2829207368CA
-:1039B0006F756C642072657475726E204E6F6E65E3
-:1039C0002C206E6F7420272573270069737375622E
-:1039D000636C6173732829206172672032206D75D2
-:1039E0007374206265206120636C617373206F7251
-:1039F0002061207475706C65206F6620636C617344
-:103A000073657300747970652027257127206973A9
-:103A1000206E6F7420616E206163636570746162F3
-:103A20006C6520626173652074797065006D756CDA
-:103A30007469706C65206261736573206861766576
-:103A400020696E7374616E6365206C61792D6F758A
-:103A50007420636F6E666C696374003C7375706587
-:103A6000723A200063616E6E6F74206372656174D8
-:103A700065202725712720696E7374616E636573F5
-:103A800000747970652074616B65732031206F72EA
-:103A9000203320617267756D656E7473003C636CD2
-:103AA00061737320272571273E0000010102020285
-:103AB0000203030303030303030463616E277420FB
-:103AC000636F6E7665727420696E6620746F20690C
-:103AD0006E740063616E277420636F6E7665727416
-:103AE000204E614E20746F20696E7400617267759C
-:103AF0006D656E74206861732077726F6E672074D5
-:103B0000797065006D656D6F727920616C6C6F63A3
-:103B10006174696F6E206661696C65642C206865EC
-:103B20006170206973206C6F636B6564006D656DF7
-:103B30006F727920616C6C6F636174696F6E20665F
-:103B400061696C65642C20616C6C6F636174696E73
-:103B500067202575206279746573006E65676174EE
-:103B600069766520736869667420636F756E74008A
-:103B7000756E737570706F7274656420747970659A
-:103B80007320666F722025713A20272573272C2019
-:103B9000272573270027257327206F626A656374C2
-:103BA000206973206E6F74206974657261626C6540
-:103BB0000063616E6E6F7420696D706F7274206E39
-:103BC000616D652025710027257327206F626A6566
-:103BD0006374206973206E6F7420616E2069746550
-:103BE0007261746F72006E616D65202725712720E8
-:103BF0006973206E6F7420646566696E6564007415
-:103C0000797065206F626A656374202725712720AB
-:103C1000686173206E6F2061747472696275746577
-:103C200020272571270027257327206F626A656387
-:103C30007420686173206E6F20617474726962759C
-:103C40007465202725712700657863657074696F36
-:103C50006E73206D75737420646572697665206675
-:103C6000726F6D2042617365457863657074696F2A
-:103C70006E00756E737570706F7274656420747900
-:103C8000706520666F722025713A20272573270002
-:103C90006E656564206D6F7265207468616E2025A5
-:103CA000642076616C75657320746F20756E706129
-:103CB000636B00746F6F206D616E792076616C7537
-:103CC000657320746F20756E7061636B2028657852
-:103CD0007065637465642025642900546865205A02
-:103CE000656E206F66204D6963726F507974686FDE
-:103CF0006E2C206279204E6963686F6C6173204876
-:103D00002E20546F6C6C65727665790A0A436F6475
-:103D1000652C0A4861636B2069742C0A4C657373C7
-:103D2000206973206D6F72652C0A4B656570206980
-:103D3000742073696D706C652C0A536D616C6C2016
-:103D400069732062656175746966756C2C0A0A4234
-:103D5000652062726176652120427265616B207414
-:103D600068696E677321204C6561726E20616E64B4
-:103D700020686176652066756E210A4578707265E7
-:103D8000737320796F757273656C662077697468D8
-:103D9000204D6963726F507974686F6E2E0A0A48FD
-:103DA00061707079206861636B696E6721203A2DBC
-:103DB000290A004D6963726F507974686F6E206FC5
-:103DC0006E20746865206D6963726F3A6269742051
-:103DD00069732062726F7567687420746F20796FE1
-:103DE000752062793A0A44616D69656E20502E2013
-:103DF00047656F7267652C204D61726B2053686157
-:103E00006E6E6F6E2C205261646F6D697220446F0C
-:103E100070696572616C736B692C204D6174746894
-:103E2000657720456C73652C0A4361726F6C20576F
-:103E3000696C6C696E672C20546F6D2056696E65D5
-:103E4000722C20416C616E204A61636B736F6E2C23
-:103E5000204E69636B20436F67686C616E2C204A4B
-:103E60006F7365706820486169672C0A416C6578DA
-:103E7000204368616E2C20416E6472656120477238
-:103E8000616E64692C205061756C204567616E2CF1
-:103E90002050696F7472204B617370727A796B2C49
-:103EA00020416E64726577204D756C686F6C6C6133
-:103EB0006E642C0A4D61747420576865656C657278
-:103EC0002C204A6F6520476C616E63792C2041621B
-:103ED0006269652042726F6F6B7320616E64204E61
-:103EE0006963686F6C617320482E20546F6C6C6539
-:103EF000727665792E0A0046696E616C2064617481
-:103F00006120666F7220737065656368206F7574D9
-:103F10007075742E202569206672616D65733A0D87
-:103F20000A0D0A0020666C61677320616D706C3148
-:103F300020667265713120616D706C322066726529
-:103F4000713220616D706C33206672657133207040
-:103F5000697463680D002D2D2D2D2D2D2D2D2D2DEA
-:103F60002D2D2D2D2D2D2D2D2D2D2D2D2D2D2D2D81
-:103F70002D2D2D2D2D2D2D2D2D2D2D2D2D2D2D2D71
-:103F80002D2D2D2D2D2D0D00253569202535692050
-:103F90002535692025356920253569202535692095
-:103FA000253569202535690D0A003D3D3D3D3D3DE6
-:103FB0003D3D3D3D3D3D3D3D3D3D3D3D3D3D3D3D31
-:103FC0003D3D3D3D3D3D3D3D3D3D3D3D3D3D3D3D21
-:103FD0003D3D3D3D3D0D0025733A0D0A0D0A002083
-:103FE0006964782020202070686F6E656D652020E0
-:103FF0006C656E67746820207374726573730D004E
-:1040000020253369202020202020256325632020BF
-:1040100020202020253369202020202020202569F1
-:104020000D0A00202533692020202020203F3F203A
-:10403000202020202025336920202020202020251A
-:10404000690D0A00616464726573732025303878E5
-:10405000206973206E6F7420616C69676E656420DF
-:10406000746F202564206279746573003C25752D7A
-:10407000626974206D656D6F72793E004743206DF3
-:10408000656D6F7279206C61796F75743B20667213
-:104090006F6D2025703A000A202020202020202843
-:1040A0002575206C696E657320616C6C2066726585
-:1040B0006529000A253035783A200047433A2074B4
-:1040C0006F74616C3A2025752C20757365643A20F5
-:1040D00025752C20667265653A2025750A00204EEC
-:1040E0006F2E206F6620312D626C6F636B733A20E8
-:1040F00025752C20322D626C6F636B733A20257509
-:104100002C206D617820626C6B20737A3A202575C3
-:104110002C206D6178206672656520737A3A2025BF
-:10412000750A00696C6C6567616C206D6F64650071
-:104130004932432072656164206572726F72202576
-:104140006400493243207772697465206572726F2A
-:104150007220256400737461636B3A202575206FAB
-:104160007574206F662025750A0071737472207053
-:104170006F6F6C3A206E5F706F6F6C3D25752C20F1
-:104180006E5F717374723D25752C206E5F7374724F
-:104190005F646174615F62797465733D25752C207D
-:1041A0006E5F746F74616C5F62797465733D2575C1
-:1041B0000A000000040202040200000204040400D9
-:1041C00002020004040301000001030303000101D3
-:1041D00002030304020101030104030100030000C0
-:1041E00004010102000003020000040202040200B4
-:1041F00000020404040002020004040301000001A0
-:10420000030303000101020303040201010301048B
-:1042100003010003000004010102000003026E6FAD
-:104220007420616E20696D616765006272696768FC
-:10423000746E657373206F7574206F6620626F757E
-:104240006E6473006F766572666C6F7720636F6E55
-:1042500076657274696E67206C6F6E6720696E7424
-:1042600020746F206D616368696E6520776F72647A
-:1042700000706F706974656D28293A2064696374F1
-:10428000696F6E61727920697320656D7074790051
-:1042900025712800646963742075706461746520F9
-:1042A00073657175656E6365206861732077726FE1
-:1042B0006E67206C656E67746800285B005D29007E
-:1042C000646963745F6974656D7300646963745FC6
-:1042D0006B65797300646963745F76616C7565738F
-:1042E00000696E76616C6964206E756D626572201E
-:1042F0006F6620706978656C7300696E76616C69B1
-:104300006420636F6C6F7572005265616420657222
-:10431000726F72004F75742D6F662D6275666665DB
-:1043200072207265616400577269746520657272EB
-:104330006F720000000000000D0D0E0F0F0F0F0F29
-:104340000C0D0C0F0F0D0D0D0E0D0C0D0D0D0C09A0
-:104350000900000000000000000B0B0B0B00000127
-:104360000B00020E0F0F0F0F0D02040002040001DC
-:104370000400010400000000000000000C00000028
-:10438000000F0F00000000000A0B0D0E0D0C0C0BAF
-:10439000090B0B0C0C0C08080C080A08080A030986
-:1043A00006000000000000000003050304000000F8
-:1043B000050A020E0D0C0D0C0800010000010000A2
-:1043C0000100000100000000000000000A00000AD7
-:1043D00000000000000000000807080801010001BB
-:1043E00000070501000601000700050100080000A4
-:1043F00003000000000000000000010000000000B9
-:10440000010E010901000100000000000000000091
-:104410000000000000000000000000000700000590
-:104420000013100001020202030304040506080938
-:104430000B0D0F00001F1F1F1F02020202020202CB
-:1044400002020505020A020805050B0A090808A070
-:104450000808171F121212121E1E14141414171714
-:104460001A1A1D1D0202020202021A1D1B1A1D1B2E
-:104470001A1D1B1A1D1B171D17171D17171D1717A0
-:104480001D17171700131313130A0E12181A1614F8
-:1044900010140E120E1212100C0E0A120E0A08063A
-:1044A00006060611060606060E10090A080A060682
-:1044B00006050600121A141A120C0606060606064F
-:1044C000060606060606060606060606060A0A0684
-:1044D00006062C1300434343435448423E282C1EF7
-:1044E000242C4830241E32241C4418321E18522E0C
-:1044F00036563643494F1A4249253342282F4F4FEB
-:10450000424F6E0048261E2A1E221A1A1A424242A2
-:104510006E6E6E5454541A1A1A4242426D566D54BD
-:1045200054547F7F005B5B5B5B6E5D5B58595758F3
-:1045300052595D3E52583E6E505D5A3C6E5A6E5115
-:104540007965795B636A51795D525D674C5D65653C
-:10455000796579005A58585858525151517979799A
-:10456000706E6E5E5E5E5151517979796565705EEF
-:104570005E5E080100020202020404040404040452
-:1045800004040404040403030404030303030301F5
-:1045900002030201030303030101030303020203F5
-:1045A00002030000050505050404020002020003E1
-:1045B00002000402000302000202000203000303DF
-:1045C0000003B0A000000000000A0E13181B17150E
-:1045D00010140E120E1212100D0F0B120E0B0906F4
-:1045E00006060000000000000000000000000000BF
-:1045F00000000000131B151B120D0000000000003E
-:1046000000000000000000000000000000010102A6
-:10461000020303040405050606070700010203045C
-:1046200005060708090A0B0C0D0E0F00010304060E
-:1046300007090A0C0D0F10121315160002040608C4
-:104640000A0C0E10121416181A1C1E000205070A76
-:104650000C0F111416191B1E202325000306090C2C
-:104660000F1215181B1E2124272A2D0003070A0EDE
-:104670001115181C1F23262A2D313400FCF8F4F0E4
-:10468000ECE8E4E0DCD8D4D0CCC8C400FCF9F5F206
-:10469000EEEBE7E4E0DDD9D6D2CFCB00FDFAF7F4BC
-:1046A000F1EEEBE8E5E2DFDCD9D6D300FDFBF8F66E
-:1046B000F3F1EEECE9E7E4E2DFDDDA00FEFCFAF824
-:1046C000F6F4F2F0EEECEAE8E6E4E200FEFDFBFAD6
-:1046D000F8F7F5F4F2F1EFEEECEBE900FFFEFDFC8C
-:1046E000FBFAF9F8F7F6F5F4F3F2F100FFFFFEFE3E
-:1046F000FDFDFCFCFBFBFAFAF9F9F80002020202EC
-:10470000040404040404040404040404040302046C
-:104710000402020202020101010101010101010181
-:104720000102020201000100010005050505050462
-:104730000402000102000102000102000102000265
-:10474000020001030002030002A0A000000000001C
-:104750000101010101010101010101010101010149
-:104760000101010101010101010000000000000040
-:104770000000000000000000000000010101010134
-:104780000000000000000000000000000000000029
-:104790000000000000000000000000000000009089
-:1047A0009090909090909090909090909090909009
-:1047B00090909090909090909090909090909090F9
-:1047C00090909090909090909090909090909090E9
-:1047D00090909090909090909090909090909090D9
-:1047E00090909090909090909090909090909090C9
-:1047F00090909090909090909090909090909090B9
-:1048000090909090909090909090909090909090A8
-:1048100090909090909090909090909090909070B8
-:104820007070707070707070707070707070707088
-:104830007070707070707070707070707070707078
-:104840007070707070707070707070707070707068
-:104850007070707070707070707070707070707058
-:104860007070707070707070707070707070707048
-:104870007070707070707070707070707070707038
-:104880007070707070707070707070707070707028
-:104890007070707070707070707070707070703850
-:1048A000846B19C66318867398C6B11CCA318CC74D
-:1048B0003188C23098463118C6350CCA310CC62131
-:1048C00010246912C23114C471084A2249AB6AA883
-:1048D000AC495132D55288936C94221554D2259606
-:1048E000D450A5462108856B18C46310CE6B188C74
-:1048F00071198C63350CC63399CC6CB54EA29946B0
-:10490000212882952EE3309CC5309CA2B19C673152
-:104910008866592C5318846750CAE30AACAB30AC94
-:1049200062308C63109462B18C8228963398D6B52D
-:104930004C6229A54AB59CC63114D6389C4BB48626
-:104940006518AE671CA66319962319841308A6522E
-:10495000ACCA22896EAB198C6234C46219866318A2
-:10496000C42358D6A35042544AAD4A25116B6489DA
-:104970004A63398A23312AEAA2A944C512CD4234B6
-:104980008C62188C63114866319D44331D46319CFE
-:10499000C6B10CCD3288C47318867308D663580725
-:1049A00081E0F03C0787903C7C0FC7C0C0F07C1EC4
-:1049B000078080001C7870F1C71FC00CFE1C1F1FF1
-:1049C0000E0A7AC071F2838F030F0F0C0079F86121
-:1049D000E0430F83E718F9C113DAE9638F0F83838C
-:1049E00087C31F3C70F0E1E1E387B8710E20E38DCF
-:1049F00048781C938730E1C1C1E478218383C38761
-:104A00000639E5C387070E1C1C70F4719C603632B2
-:104A1000C31E3CF38F0E3C70E3C78F0F0F0E3C7824
-:104A2000F0E38706F0E307C199870F18787070FCF0
-:104A3000F310B18C8C317C70E1863C646CB0E1E3A6
-:104A40000F238F0F1E3E383C387B8F070E3CF41728
-:104A50001E3C78F29E7249E32536385839E2DE3C36
-:104A60007878E1C761E1E1B0F0F0C3C70E38C0F07B
-:104A7000CE73731834B0E1C78E1C3CF838F0E1C136
-:104A80008B868F1C7870F078ACB18F3931DB386150
-:104A9000C30E0E387873171E391E3864E1F1C14E0B
-:104AA0000F40A202C58F81A1FC120864E03C22E005
-:104AB00045078E0C3290F01F2049E0F80C60F0178B
-:104AC0001A41AAA4D08D12821E1E03F83E030C7355
-:104AD000807044260324E13E044E041CC109CC9E90
-:104AE000902107904364C00FC6909CC15B03E21DF8
-:104AF00081E05E1D0384B82C0F80B183E030411E3D
-:104B000043898350FC242E1383F17C4C2CC90D83E4
-:104B1000B0B582E4E8069C07A0991D073E828F701D
-:104B2000307440CA10E4E80F92143F06F8848843BA
-:104B3000810A343941C6E31C4703B0B8130AC26482
-:104B4000F818F960B3C0652060A68CC381203026B8
-:104B50001E1C38D301B02640F40BC3421F853226F9
-:104B60006040C9CB01EC112840FA0434E0704C8C51
-:104B70001D07690316C80423E8C69A0B1A03E076DA
-:104B80000605CF1EBC5831716600F83F04FC0C745A
-:104B9000278A8071C23A2606C01F050F9840AE01D1
-:104BA0007FC007FF000EFE0003DF8003EF801BF1D4
-:104BB000C200E7E018FCE021FC803CFC400E7E00D7
-:104BC0003F3E000FFE001FFF003EF007FC007E107E
-:104BD0003FFF003F380E7C01870CFCC7003E040FEE
-:104BE0003E1F0F0F1F0F028387CF03870F3FC007A2
-:104BF0009E603FC003FE003FE077E1C0FEE0C3E0FF
-:104C000001DFF80307007E70007C3818FE0C1E7868
-:104C10001C7C3E0E1F1E1E3E007F8307DB87830722
-:104C2000C7071071FF003FE201E0C1C3E1007FC090
-:104C300005F020F8F070FE7879F8023F0C8F030F32
-:104C40009FE0C1C78703C3C3B0E1E1C1E3E071F0F6
-:104C500000FC707C0C3E380E1C70C3C70381C1C7BA
-:104C6000E7000FC7871909EFC433E0C1FCF870F003
-:104C700078F8F061C7001FF8017CF8F078703C7C90
-:104C8000CE0E2183CF08078F08C1878F80C7E3002E
-:104C900007F8E0EF0039F7800EF8E1E3F8219FC054
-:104CA000FF03F807C01FF8C404FCC4C1BC87F00FA1
-:104CB000C07F05E025ECC03E8447F08E03F803FB7F
-:104CC000C019F8079C0C17F807E01FA1FC0FFC01A6
-:104CD000F03F00FE03F01F00FD00FF880DF901FF0B
-:104CE000007007C03E42F30DC47F80FC07F05EC039
-:104CF0003F00783F81FF01F801C3E80CE4648FE4D2
-:104D00000FF007F0C21F007FC06F807E03F807F02E
-:104D10003FC0780F8207FE227770027603FE00FE06
-:104D200067007CC7F18EC63BE03F84F319D8039936
-:104D3000FC09B80FF8009D2461F90D00FD03F01F78
-:104D4000903F01F81FD00FF83701F807F00FC03F70
-:104D500000FE03F80FC03F00FA03F00F80FF01B818
-:104D600007F001FC01BC80131E007FE1407FA07FA3
-:104D7000B0003FC01FC0380FF01F80FF01FC03F1DF
-:104D80007E01FE01F0FF007FC01D07F00FC07E0610
-:104D9000E007E00FF806C1FE01FC03E00F00FC0095
-:104DA0000000000000000000000000000000000003
-:104DB000000000000000000000000000000000F102
-:104DC000E2D3BB7C950102030300720002000000E5
-:104DD00000000000000000000000000000000000D3
-:104DE00000001B000019000000000000000000008F
-:104DF0000000101010101010202020202020303033
-:104E000030303030304040404040404050505050B2
-:104E100050505050606060606060606060606060D2
-:104E20007070707070707070707070707070707082
-:104E30007070707070707070707070707070706082
-:104E400060606060606060606060605050505050B2
-:104E50005050504040404040404030303030303082
-:104E600030202020202020101010101010000000F2
-:104E70000000F0F0F0F0F0F0E0E0E0E0E0E0D0D0B2
-:104E8000D0D0D0D0D0C0C0C0C0C0C0C0B0B0B0B012
-:104E9000B0B0B0B0A0A0A0A0A0A0A0A0A0A0A0A0D2
-:104EA0009090909090909090909090909090909002
-:104EB000909090909090909090909090909090A0E2
-:104EC000A0A0A0A0A0A0A0A0A0A0A0B0B0B0B0B092
-:104ED000B0B0B0C0C0C0C0C0C0C0D0D0D0D0D0D0A2
-:104EE000D0E0E0E0E0E0E0F0F0F0F0F0F000000012
-:104EF00000E0E6ECF3F900060C06181A1717170085
-:104F0000000000005449433F282C1F252D4931241F
-:104F10001E33251D4518321E18532E36560000002C
-:104F20000000000000000000000000000000004839
-:104F3000271F2B1E220000000005000051282573AA
-:104F4000290A008F012A00FA015F008A012F006CF4
-:104F50000325236F007B032523780058057B3A2324
-:104F6000627D00AF010A0073206D6178696D756D17
-:104F700020726563757273696F6E20646570746802
-:104F800020657863656564656400BD083C6D6F6489
-:104F9000756C653E0080083C6C616D6264613E002A
-:104FA000D40A3C6C697374636F6D703E00CC0A3C2C
-:104FB00064696374636F6D703E0054093C7365747B
-:104FC000636F6D703E0034093C67656E6578707282
-:104FD0003E0052083C737472696E673E00E3073C02
-:104FE000737464696E3E00B7057574662D3800945D
-:104FF0000468656C70007305696E70757400E00B71
-:10500000636F6C6C656374696F6E73001206737402
-:105010007275637400C0086D6963726F62697400B1
-:105020001005726573657400EA05736C6565700040
-:10503000C80C72756E6E696E675F74696D6500D0BD
-:105040000570616E696300E90B74656D706572616E
-:105050007475726500A304746869730063076175F1
-:1050600074686F727300F10B616E746967726176B8
-:105070006974790055046C6F7665002C0862616470
-:1050800061626F6F6D00CD124D6963726F4269741A
-:105090004469676974616C50696E0007184D6963F3
-:1050A000726F426974416E616C6F674469676974BD
-:1050B000616C50696E0052104D6963726F42697481
-:1050C000546F75636850696E00920C726561645F1D
-:1050D0006469676974616C00FD0D77726974655F5E
-:1050E0006469676974616C00620B726561645F6119
-:1050F0006E616C6F67002D0C77726974655F616E0D
-:10510000616C6F670008117365745F616E616C6F2D
-:10511000675F706572696F6400EE1E7365745F612E
-:105120006E616C6F675F706572696F645F6D6963F4
-:10513000726F7365636F6E6473007A1E6765745F68
-:10514000616E616C6F675F706572696F645F6D69D6
-:1051500063726F7365636F6E647300040A69735FD3
-:10516000746F7563686564007906756E7573656440
-:1051700000C80A617564696F5F706C617900F3063D
-:10518000627574746F6E008005746F7563680020BB
-:1051900002337600AF086765745F6D6F646500E683
-:1051A0000A4D6963726F426974494F000204706965
-:1051B0006E3000030470696E3100010470696E3254
-:1051C00000010470696E3300060470696E340007D4
-:1051D0000470696E3500040470696E360005047051
-:1051E000696E37000A0470696E38000B0470696ECE
-:1051F0003900530570696E313000520570696E31A7
-:105200003100510570696E313200500570696E31A0
-:105210003300570570696E313400560570696E3180
-:105220003500550570696E3136005A0570696E316A
-:105230003900300570696E32300049086765745F67
-:1052400070756C6C00DD087365745F70756C6C0054
-:10525000BA0750554C4C5F555000AD0950554C4C59
-:105260005F444F574E001E074E4F5F50554C4C0049
-:10527000870D4D6963726F426974496D616765009E
-:105280006205496D616765004205696D616765008A
-:105290002305776964746800FA066865696768744D
-:1052A00000B706696E7665727400CA0466696C6C34
-:1052B00000B0097365745F706978656C00A4096754
-:1052C00065745F706978656C00A10A7368696674BB
-:1052D0005F6C65667400BA0B73686966745F7269A7
-:1052E00067687400DF0873686966745F75700048EA
-:1052F0000A73686966745F646F776E00E2096D6FA8
-:105300006E6F737061636500F604626C6974000F00
-:1053100005484541525400CF0B48454152545F5314
-:105320004D414C4C001505484150505900930353D2
-:105330004144009B05534D494C4500A608434F4E40
-:105340004655534544002605414E475259000B0629
-:1053500041534C45455000880953555250524953CA
-:10536000454400C60553494C4C590030084641425B
-:10537000554C4F55530005034D4548000A03594508
-:10538000530004024E4F006E07434C4F434B3132E3
-:1053900000DC06434C4F434B3100DF06434C4F4388
-:1053A0004B3200DE06434C4F434B3300D906434C8F
-:1053B0004F434B3400D806434C4F434B3500DB067C
-:1053C000434C4F434B3600DA06434C4F434B3700B8
-:1053D000D506434C4F434B3800D406434C4F434B08
-:1053E00039006C07434C4F434B3130006D07434C41
-:1053F0004F434B313100ED074152524F575F4E0042
-:10540000C8084152524F575F4E4500E6074152527D
-:105410004F575F4500B5084152524F575F53450003
-:10542000F0074152524F575F5300A7084152524F65
-:10543000575F535700F4074152524F575F5700DAF6
-:10544000084152524F575F4E5700EB0854524941A2
-:105450004E474C45008F0D545249414E474C455FD5
-:105460004C45465400510A4348455353424F41521C
-:105470004400A1074449414D4F4E4400610D444949
-:10548000414D4F4E445F534D414C4C0084065351A7
-:105490005541524500840C5351554152455F534D7F
-:1054A000414C4C00EB06524142424954005E0343DA
-:1054B0004F5700AB0E4D555349435F43524F544332
-:1054C000484554005F0C4D555349435F5155415673
-:1054D0004552006C0D4D555349435F51554156455A
-:1054E00052530033095049544348464F524B00E24F
-:1054F00004584D41530055065041434D414E00B4B0
-:1055000006544152474554004506545348495254A5
-:1055100000270B524F4C4C4552534B415445003CD5
-:10552000044455434B00A105484F55534500C80856
-:10553000544F52544F49534500560942555454450F
-:1055400052464C5900E90B535449434B4649475581
-:10555000524500C20547484F535400980553574FD2
-:105560005244007D0747495241464645004805538D
-:105570004B554C4C00C908554D4252454C4C4100CE
-:105580009705534E414B4500F10A414C4C5F415247
-:10559000524F575300C00A414C4C5F434C4F434B52
-:1055A00053005A0F4D6963726F4269744469737096
-:1055B0006C617900910E7365745F627269676874DB
-:1055C0006E657373009E107365745F646973706CAD
-:1055D00061795F6D6F6465001F07646973706C614A
-:1055E0007900860473686F770028067363726F6CA6
-:1055F0006C00500564656C617900B806737472695B
-:1056000064650085057374617274008E0477616946
-:10561000740039046C6F6F7000E004636F70790080
-:105620000B0463726F7000B505736C696365009855
-:10563000047465787400F60B536C69636564496D96
-:1056400061676500BD0F5363726F6C6C696E675361
-:105650007472696E670064026F6E008A036F66661B
-:1056600000610569735F6F6E00C106466163616426
-:105670006500160E4D6963726F42697442757474E9
-:105680006F6E00ED08627574746F6E5F6100EE08F6
-:10569000627574746F6E5F6200E60A69735F7072A0
-:1056A000657373656400F90B7761735F707265737E
-:1056B00073656400FD0B6765745F70726573736575
-:1056C00073005B154D6963726F4269744163636572
-:1056D0006C65726F6D65746572001E0D6163636544
-:1056E0006C65726F6D657465720034056765745F13
-:1056F000780035056765745F790036056765745F06
-:105700007A00F40A6765745F76616C75657300D41E
-:105710000F63757272656E745F6765737475726519
-:1057200000070A69735F6765737475726500D80B4B
-:105730007761735F6765737475726500180C6765D0
-:10574000745F676573747572657300A0027570008D
-:105750003704646F776E00DE046C65667400E505DF
-:10576000726967687400210766616365207570005F
-:1057700036096661636520646F776E00B6086672ED
-:10578000656566616C6C00310233670094023667B0
-:10579000005A0238670031057368616B6500100FAD
-:1057A0004D6963726F426974436F6D70617373000A
-:1057B0005507636F6D70617373002D0768656164D1
-:1057C000696E6700230D69735F63616C6962726162
-:1057D00074656400020963616C69627261746500DA
-:1057E0004911636C6561725F63616C6962726174B7
-:1057F000696F6E00F4126765745F6669656C645F5B
-:10580000737472656E67746800B80B4D6963726F6C
-:10581000426974493243005D0369326300B7047220
-:10582000656164009805777269746500B604616407
-:10583000647200CB016E00740362756600F206723A
-:10584000657065617400E5046672657100530373E9
-:10585000646100F90373636C0004056D757369631B
-:1058600000A1096672657175656E6379007B0864D5
-:1058700075726174696F6E00830570697463680086
-:10588000F20370696E002104706C6179009B0973EA
-:1058900065745F74656D706F008F096765745F7400
-:1058A000656D706F00DA0362706D004305746963A3
-:1058B0006B73009F054241444459009D0742415F7C
-:1058C00044494E4700FC084249525448444159005B
-:1058D000C805424C554553005905434841534500BE
-:1058E000FC0944414441444144554D00480B454E58
-:1058F0005445525441494E455200420746554E4583
-:1059000052414C00D30446554E4B00AA094A554D0E
-:10591000505F444F574E00FD074A554D505F55505C
-:10592000003D044E59414E006B034F444500970A19
-:10593000504F5745525F444F574E000108504F5744
-:1059400045525F5550003A075052454C554445006A
-:10595000EB0950554E43484C494E4500B10650594D
-:1059600054484F4E00C70852494E47544F4E4500C9
-:10597000640957415741574157414100170757455F
-:105980004444494E4700C401610067026123002C72
-:105990000461233A31002E0461233A330076026118
-:1059A00032007002613400BB0461343A3100B90442
-:1059B00061343A33000F03613A31000C03613A322B
-:1059C000000A03613A34000B03613A3500C70162F3
-:1059D00000DE0462323A31009402623300930262C4
-:1059E0003400D80462343A3100DB0462343A3200C5
-:1059F0009202623500D90462353A31000C03623AF2
-:105A000031000F03623A3200C6016300A50263232E
-:105A100000700363233500BB056323353A3100B8BA
-:105A2000056323353A32006E0463233A310067047C
-:105A300063233A3800FC0463323A3200B502633320
-:105A4000007C0463333A33007B0463333A3400B29E
-:105A500002633400F90463343A3100FB0463343ADE
-:105A60003300FC0463343A3400B302633500780435
-:105A700063353A31007B0463353A32007A0463358A
-:105A80003A33007D0463353A34000D03633A310044
-:105A90000E03633A32000F03633A33000803633A9C
-:105AA00034000403633A3800C1016400C202642375
-:105AB00000FF056423353A32000A0464233A3200B9
-:105AC0000B0464233A3300D202643300D5026434F9
-:105AD000001E0464343A3100D4026435001F0464AB
-:105AE000353A31001C0464353A32000A03643A3115
-:105AF000000903643A32000803643A33000F036478
-:105B00003A34000E03643A35000D03643A3600035C
-:105B100003643A3800C0016500BA0465333A3300C3
-:105B2000F4026534003F0465343A3100F50265350E
-:105B3000003F0465363A33000B03653A3100080331
-:105B4000653A32000903653A33000E03653A3400C2
-:105B50000F03653A35000C03653A36000203653AD7
-:105B60003800E00465623A3800C30166000102664D
-:105B70002300350366233500FD056623353A3200E0
-:105B80004B0466233A3100480466233A320042044B
-:105B900066233A380011026632000803663A310083
-:105BA0000B03663A32000A03663A33000D03663A85
-:105BB00034000103663A3800C201670021026723FE
-:105BC00000EA0467233A3100E80467233A3300FA15
-:105BD0000467333A310036026734007D0467343A93
-:105BE00031007E0467343A32003702673500FC0426
-:105BF00067353A31000903673A31000A03673A32E0
-:105C0000000B03673A33000103673A3800D701728B
-:105C100000CB0472343A32001C03723A31001F0385
-:105C2000723A32001E03723A3300320C4D696372CD
-:105C30006F42697455415254007704756172740063
-:105C40001F04696E697400F508626175647261749D
-:105C50006500490462697473004206706172697478
-:105C600079009D0473746F7000410470696E730055
-:105C70008902747800CF027278001303616E790094
-:105C8000760772656164616C6C00F9087265616425
-:105C90006C696E65004B0872656164696E746F00B3
-:105CA0006A034F444400DD044556454E004A0B4DFF
-:105CB0006963726F42697453504900CF037370690E
-:105CC0000026046D6F646500720473636C6B001DC5
-:105CD000046D6F7369009D046D69736F00890E77A1
-:105CE000726974655F72656164696E746F006908DA
-:105CF0006E656F706978656C0069084E656F5069F4
-:105D000078656C007C05636C65617200BE0672612B
-:105D10006E646F6D00660B67657472616E646269B4
-:105D200074730092047365656400A30972616E6404
-:105D300072616E676500AF0772616E64696E7400B0
-:105D40002E0663686F696365000107756E69666F8B
-:105D5000726D005305617564696F00AE0A41756428
-:105D6000696F4672616D6500270A72657475726E9F
-:105D70005F70696E00B806736F75726365005608D0
-:105D8000636F707966726F6D00A2046E616D65005D
-:105D900079026F7300B705756E616D65000B0B6D51
-:105DA0006963726F707974686F6E009B07737973A3
-:105DB0006E616D650062086E6F64656E616D650091
-:105DC000EC0772656C6561736500BF077665727379
-:105DD000696F6E001A074279746573494F001E0699
-:105DE00054657874494F00F7087772697461626C82
-:105DF000650098076C6973746469720060076D616F
-:105E00006368696E6500200473697A6500040A6935
-:105E1000735F706C6179696E67006D06737065659C
-:105E2000636800AE0373617900940970726F6E6FDE
-:105E3000756E636500B60473696E67003106746839
-:105E4000726F6174006E056D6F7574680062057322
-:105E50007065656400D40564656275670043097404
-:105E600072616E736C61746500D405726164696FF0
-:105E7000004F06636F6E66696700BF0A73656E64E4
-:105E80005F627974657300880D7265636569766514
-:105E90005F627974657300B90473656E64004E07C0
-:105EA00072656365697665006B1272656365697614
-:105EB000655F62797465735F696E746F00020C725E
-:105EC0006563656976655F66756C6C0059066C651F
-:105ED0006E677468009405717565756500260763C3
-:105EE00068616E6E656C00DA05706F77657200A888
-:105EF00009646174615F7261746500730761646451
-:105F00007265737300BA0567726F7570007B0C520F
-:105F10004154455F3235304B42495400DB0A52410F
-:105F200054455F314D42495400580A524154455F2F
-:105F3000324D424954002D0F41726974686D657489
-:105F400069634572726F7200970E41737365727464
-:105F5000696F6E4572726F7200210E4174747269BE
-:105F6000627574654572726F7200070D42617365E8
-:105F7000457863657074696F6E009108454F4645BA
-:105F800072726F7200F008456C6C6970736973000F
-:105F9000F209457863657074696F6E00160D476588
-:105FA0006E657261746F724578697400200B496D7B
-:105FB000706F72744572726F72005C10496E646526
-:105FC0006E746174696F6E4572726F7200830A49F4
-:105FD0006E6465784572726F7200EA084B657945A8
-:105FE00072726F7200AF114B6579626F61726449B2
-:105FF0006E7465727275707400FF0B4C6F6F6B7509
-:10600000704572726F7200DC0B4D656D6F72794571
-:1060100072726F7200BA094E616D654572726F726D
-:106020000017084E6F6E655479706500C6134E6F89
-:1060300074496D706C656D656E7465644572726FE0
-:106040007200A1074F534572726F7200F00B4F72CE
-:1060500064657265644469637400810D4F7665728E
-:10606000666C6F774572726F7200610C52756E7458
-:10607000696D654572726F7200EA0D53746F7049F5
-:106080007465726174696F6E00940B53796E7461FC
-:10609000784572726F7200200A53797374656D458A
-:1060A000786974002509547970654572726F7200C1
-:1060B000220C556E69636F64654572726F7200964B
-:1060C0000A56616C75654572726F7200B6115A6539
-:1060D000726F4469766973696F6E4572726F720090
-:1060E000C4075F5F6164645F5F002B085F5F626F7E
-:1060F0006F6C5F5F00420F5F5F6275696C645F6326
-:106100006C6173735F5F00A7085F5F63616C6C5FB6
-:106110005F002B095F5F636C6173735F5F00C60C88
-:106120005F5F636F6E7461696E735F5F00FD0B5F2D
-:106130005F64656C6974656D5F5F006D095F5F65C5
-:106140006E7465725F5F0071065F5F65715F5F000F
-:1061500045085F5F657869745F5F00A7065F5F67EA
-:10616000655F5F00400B5F5F676574617474725FA9
-:106170005F00260B5F5F6765746974656D5F5F0024
-:10618000B6065F5F67745F5F00F7085F5F68617303
-:10619000685F5F00380A5F5F696D706F72745F5F80
-:1061A000005F085F5F696E69745F5F00CF085F5FC3
-:1061B000697465725F5F00CC065F5F6C655F5F004E
-:1061C000E2075F5F6C656E5F5F005D065F5F6C742A
-:1061D0005F5F008E085F5F6D61696E5F5F00FF0A41
-:1061E0005F5F6D6F64756C655F5F00E2085F5F6E97
-:1061F000616D655F5F0079075F5F6E65775F5F0068
-:1062000002085F5F6E6578745F5F00C8085F5F704B
-:106210006174685F5F006B0C5F5F7175616C6E61CC
-:106220006D655F5F00010E5F5F7265706C5F70721D
-:10623000696E745F5F0010085F5F726570725F5F08
-:1062400000610C5F5F72657665727365645F5F0005
-:10625000320B5F5F7365746974656D5F5F00D007B3
-:106260005F5F7374725F5F0021075F5F7375625FCA
-:106270005F004F0D5F5F74726163656261636B5FA6
-:106280005F009503616273001B0461636F730044D8
-:106290000361646400A805616C69676E0044036172
-:1062A0006C6C009104616E645F006B0661707065D8
-:1062B0006E6400C20461726773007C056172726172
-:1062C000790050046173696E00430961736D5F74F6
-:1062D00068756D62006503617372001F046174610B
-:1062E0006E00CD056174616E3200E00362696E007C
-:1062F000CB02626C00EB04626F6F6C00970C626FF4
-:10630000756E645F6D6574686F6400F70862756927
-:106310006C74696E7300DF026278007609627974CA
-:1063200065617272617900220862797465636F64D5
-:1063300065006109627974656F72646572005C055D
-:106340006279746573004D0863616C6373697A6583
-:10635000000D0863616C6C61626C65000604636526
-:10636000696C00DC0363687200B40B636C61737367
-:106370006D6574686F64003305636C6F73650074DA
-:1063800007636C6F73757265005003636C7A003B32
-:1063900003636D70009B07636F6C6C65637400C072
-:1063A00005636F6E7374003308636F707973696788
-:1063B0006E007A03636F7300A605636F756E7400D9
-:1063C000E805637073696400E905637073696500CB
-:1063D00015046461746100CE0764656661756C7450
-:1063E00000020764656772656573003F0464696352
-:1063F00074002D09646963745F7669657700720AB9
-:10640000646966666572656E6365009C11646966A1
-:10641000666572656E63655F75706461746500FAC8
-:106420000364697200910764697361626C650004BA
-:106430000B64697361626C655F697271000F076458
-:1064400069736361726400B8066469766D6F640095
-:106450000406656E61626C6500910A656E61626C2E
-:10646000655F697271000A03656E64001B08656EE2
-:10647000647377697468007109656E756D65726122
-:106480007465009B046576616C001E046578656325
-:106490000085046578697400C80365787000630638
-:1064A000657874656E640093046661627300250606
-:1064B00066696C74657200010466696E6400350576
-:1064C000666C6F6174007D05666C6F6F7200E50429
-:1064D000666D6F64002606666F726D6174001C0540
-:1064E000667265787000350A66726F6D5F627974E6
-:1064F000657300370866726F6D6B65797300ED091F
-:1065000066726F7A656E73657400270866756E63D0
-:1065100074696F6E006102676300960967656E6556
-:106520007261746F7200330367657400C00767653A
-:106530007461747472009D07676C6F62616C7300A4
-:106540008C076861736174747200B7046861736862
-:1065500000AD09686561705F6C6F636B00560B6816
-:106560006561705F756E6C6F636B00700368657852
-:10657000002802696400170E696D706C656D656EA8
-:10658000746174696F6E007B05696E6465780012D2
-:1065900006696E73657274001603696E7400280CC8
-:1065A000696E74657273656374696F6E0006136952
-:1065B0006E74657273656374696F6E5F7570646124
-:1065C000746500EB076973616C70686100A8076906
-:1065D00073646967697400F70A69736469736A6F41
-:1065E000696E74009A096973656E61626C65640016
-:1065F000A608697366696E697465003E056973690A
-:106600006E6600B60A6973696E7374616E636500C5
-:10661000FC0769736C6F776572009E0569736E6124
-:106620006E005B076973737061636500B50A697317
-:10663000737562636C61737300B908697373756213
-:1066400073657400FC0A69737375706572736574A1
-:1066500000DD076973757070657200E30569746524
-:106660006D73008F04697465720047086974657200
-:1066700061746F7200A7046A6F696E00F6086B623E
-:10668000645F696E74720032036B65790001046B9C
-:106690006579730043056C6162656C0040056C644C
-:1066A000657870005F036C6472005D046C647262F4
-:1066B00000E2056C647265780057046C64726800CF
-:1066C00062036C656E0027046C6973740089066C44
-:1066D0006974746C65003B066C6F63616C730021B8
-:1066E000036C6F6700C6056C6F77657200B6036C4C
-:1066F000736C00A8036C737200E5066C73747269A6
-:106700007000B9036D61700035046D61746800B18B
-:10671000036D61780020036D656D0007056D656D83
-:1067200031360041056D656D33320018046D656DBD
-:10673000380052096D656D5F616C6C6F6300CB084A
-:106740006D656D5F6672656500D1086D656D5F6929
-:106750006E666F00AF036D696E0025046D6F646631
-:1067600000BF066D6F64756C6500EC076D6F647536
-:106770006C657300F1036D6F760065046D6F767460
-:106780000066046D6F76770052056D6F7677740042
-:1067900089036D7273001E0A6E616D656474757095
-:1067A0006C650042046E65787400B4036E6F70000F
-:1067B00090066F626A65637400FD036F637400D1B5
-:1067C000046F70656E0087096F70745F6C65766525
-:1067D0006C001C036F726400BC047061636B001F6B
-:1067E000097061636B5F696E746F001C02706900F1
-:1067F0003A08706C6174666F726D002A03706F7076
-:1068000000BF07706F706974656D002D03706F773E
-:106810000054057072696E74001C0F7072696E749A
-:106820005F657863657074696F6E00BB0470757323
-:106830006800B009717374725F696E666F008707D4
-:1068400072616469616E73001A0572616E6765003A
-:10685000E80472626974005F10726561645F6C695C
-:106860006768745F6C6576656C00630672656D6F52
-:1068700076650049077265706C61636500D00472CB
-:106880006570720025077265766572736500A108F0
-:10689000726576657273656400D2057266696E64AE
-:1068A00000E90672696E64657800E705726F756EBF
-:1068B0006400A5067273706C6974003B0672737491
-:1068C000726970001A047363616E00CD04736469A9
-:1068D0007600230373657000270373657400D40783
-:1068E00073657461747472006C0A736574646566B0
-:1068F00061756C7400B10373696E000B08736C658D
-:1069000065705F6D73001308736C6565705F7573F8
-:1069100000BF04736F7274005E06736F72746564F7
-:1069200000B70573706C6974002104737172740090
-:106930009709737461636B5F75736500740A737490
-:10694000617274737769746800620C73746174693E
-:10695000636D6574686F64005704737465700050EC
-:10696000037374720032047374726200AD05737441
-:106970007265780038047374726800290573747244
-:106980006970002103737562002E0373756D00C476
-:1069900005737570657200CE1473796D6D657472D0
-:1069A00069635F646966666572656E636500601B36
-:1069B00073796D6D65747269635F6469666665722B
-:1069C000656E63655F75706461746500BC0373799F
-:1069D0007300FE0374616E00F20974687265736877
-:1069E0006F6C6400B3057468726F77009D097469F9
-:1069F000636B735F61646400B10A7469636B735F96
-:106A0000646966660042087469636B735F6D730046
-:106A10005A087469636B735F757300F00474696D71
-:106A20006500890D74696D655F70756C73655F7560
-:106A30007300D808746F5F6279746573005B0574C6
-:106A400072756E6300FD057475706C65009D04744D
-:106A500079706500150C75636F6C6C656374696F94
-:106A60006E73008B047564697600E30475696E7457
-:106A700000F605756E696F6E000409756E697175B3
-:106A8000655F6964000706756E7061636B000E0BCD
-:106A9000756E7061636B5F66726F6D00B4067570C2
-:106AA000646174650027057570706572004707752D
-:106AB00073747275637400E5057574696D65004ED5
-:106AC0000576616C7565007D0676616C7565730091
-:106AD0006E0C76657273696F6E5F696E666F009D8E
-:106AE0000377666900E6037A697000696E76616C07
-:106AF00069642070697463680028295B5D7B7D2C64
-:106B00003A3B407E3C653D633C653D3E653D633EB2
-:106B1000653D2A653D632A653D2B653D2D653D65D7
-:106B20003E26653D7C653D2F653D632F653D2565B2
-:106B30003D5E653D3D653D212E00756E69636F6468
-:106B400065206E616D6520657363617065730046D5
-:106B5000616C73650054727565005F5F6465627592
-:106B6000675F5F00616E64006173006173736572DB
-:106B70007400627265616B00636F6E74696E756537
-:106B80000064656C00656C696600656C7365006522
-:106B900078636570740066696E616C6C79006C6115
-:106BA0006D626461006E6F740072657475726E0060
-:106BB0007969656C640042434445464748494B4CFB
-:106BC0003D363E3758383F3957315032592F4E30C5
-:106BD0004F5A3A543B553351345235533C564D403D
-:106BE00067656E657261746F722069676E6F72653A
-:106BF000642047656E657261746F724578697400D0
-:106C00003C67656E657261746F72206F626A65635E
-:106C10007420272571272061742025703E00636150
-:106C20006E27742073656E64206E6F6E2D4E6F6ECE
-:106C3000652076616C756520746F2061206A7573BC
-:106C4000742D737461727465642067656E6572611A
-:106C5000746F7200736C6963652073746570206370
-:106C6000616E6E6F74206265207A65726F006F626C
-:106C70006A656374206E6F7420696E207365717528
-:106C8000656E63650070617273657220636F756C09
-:106C900064206E6F7420616C6C6F63617465206535
-:106CA0006E6F756768206D656D6F727900756E65C2
-:106CB0007870656374656420696E64656E740075D0
-:106CC0006E696E64656E7420646F6573206E6F7498
-:106CD000206D6174636820616E79206F75746572D0
-:106CE00020696E64656E746174696F6E206C657680
-:106CF000656C0063616E6E6F74206D6978206279D7
-:106D000074657320616E64206E6F6E627974657352
-:106D1000206C69746572616C7300030000000000F0
-:106D200000000025713D00312E302E31006D696369
-:106D3000726F3A6269742076312E302E312B6230B8
-:106D40006266346139206F6E20323031382D313235
-:106D50002D31333B204D6963726F507974686F6ECB
-:106D60002076312E392E322D33342D67643634316E
-:106D70003534633733206F6E20323031372D303960
-:106D80002D3031006D6963726F3A626974207769E2
-:106D90007468206E524635313832320053504920E3
-:106DA0006E6F7420696E697469616C6973656400E3
-:106DB00066756E6374696F6E20646F6573206E6FA5
-:106DC000742074616B65206B6579776F72642061E4
-:106DD0007267756D656E74730066756E6374696F46
-:106DE0006E206D697373696E67202564207265710A
-:106DF000756972656420706F736974696F6E616C18
-:106E000020617267756D656E74730066756E63746C
-:106E1000696F6E20657870656374656420617420A5
-:106E20006D6F737420256420617267756D656E7473
-:106E3000732C20676F74202564002725712720613B
-:106E40007267756D656E74207265717569726564BF
-:106E500000657874726120706F736974696F6E6118
-:106E60006C20617267756D656E74732067697665F5
-:106E70006E006578747261206B6579776F7264203B
-:106E8000617267756D656E747320676976656E00F3
-:106E9000696D6167652063616E6E6F742062652045
-:106EA0006D6F646966696564202874727920636F08
-:106EB0007079696E672066697273742900657870ED
-:106EC000656374696E6720616E20696D6167650036
-:106ED0006D757374207370656369667920626F7471
-:106EE00068206F6666736574730073697A652063E2
-:106EF000616E6E6F74206265206E6567617469767D
-:106F000065006272696768746E657373206D756C75
-:106F10007469706C696572206D757374206E6F741E
-:106F2000206265206E6567617469766500696E64CC
-:106F300065782063616E6E6F74206265206E656790
-:106F4000617469766500696E64657820746F6F207E
-:106F50006C6172676500756E6578706563746564F1
-:106F60002063686172616374657220696E20496D87
-:106F700061676520646566696E6974696F6E004952
-:106F80006D6167652873292074616B6573206120CA
-:106F9000737472696E6700696D61676520646174FE
-:106FA0006120697320696E636F7272656374207308
-:106FB000697A6500496D61676528292074616B6590
-:106FC00073203020746F203320617267756D656E99
-:106FD000747300496D61676528000A202020200035
-:106FE000270A20202020270030313233343536372D
-:106FF000383900696D61676573206D75737420623F
-:1070000065207468652073616D652073697A650019
-:10701000457272203336363833004572722033366B
-:10702000383934005DC12028412E293D4548345966
-:107030002EA0284129203D41C82028415245292021
-:107040003D4141D220284152294F3D4158D228414B
-:107050005229233D454834D2205E28415329233DFF
-:10706000455934D328412957413D41D82841572912
-:107070003D414FB5203A28414E59293D4548344EAF
-:1070800049D92841295E2B233D4559B5233A28414A
-:107090004C4C59293D554C49D92028414C29233D78
-:1070A00055CC28414741494E293D41584745483430
-:1070B000CE233A28414729453D4948CA2841295EFF
-:1070C000253D45D92841295E2B3A233D41C5203A2B
-:1070D0002841295E2B203D4559B420284152522990
-:1070E0003D4158D228415252293D414534D2205E7B
-:1070F00028415229203D414135D2284152293D4164
-:107100004135D228414952293D454834D228414988
-:10711000293D4559B4284159293D4559B52841557E
-:10712000293D414FB4233A28414C29203D55CC23D9
-:107130003A28414C5329203D554CDA28414C4B29E3
-:107140003D414F34CB28414C295E3D414FCC203A44
-:107150002841424C45293D4559344255CC284142AD
-:107160004C45293D41584255CC284129564F3D4573
-:1071700059B428414E47292B3D4559344ECA284120
-:1071800054415249293D4148544141345249D9283A
-:107190004129544F4D3D41C52841295454493D4151
-:1071A000C52028415429203D4145D4202841295457
-:1071B0003D41C82841293D41C55DC22028422920C2
-:1071C0003D424959B420284245295E233D4249C8E1
-:1071D000284245494E47293D4249593449484ED8ED
-:1071E0002028424F544829203D424F573454C8204C
-:1071F0002842555329233D42494834DA2842524512
-:10720000414B293D4252455935CB284255494C29DD
-:107210003D42494834CC2842293DC25DC320284321
-:1072200029203D534959B420284348295E3DCB5E6F
-:1072300045284348293DCB284348412952233D4B0B
-:107240004548B5284348293D43C820532843492988
-:10725000233D534159B428434929413D53C828434C
-:1072600049294F3D53C828434929454E3D53C82815
-:1072700043495459293D5349485449D92843292B56
-:107280003DD328434B293DCB28434F4D4D4F444FD1
-:107290005245293D4B4141344D4148444F48D22845
-:1072A000434F4D293D4B4148CD2843554954293D35
-:1072B0004B4948D42843524541293D4B52495945F1
-:1072C000D92843293DCB5DC420284429203D444989
-:1072D00059B4202844522E29203D444141344B5476
-:1072E00045D2233A2844454429203D444948C42EE8
-:1072F00045284429203DC4233A5E45284429203DA1
-:10730000D420284445295E233D4449C82028444FC1
-:1073100029203D4455D72028444F4553293D444119
-:1073200048DA28444F4E4529203D44414835CE286F
-:10733000444F494E47293D4455573449484ED8207B
-:1073400028444F57293D4441D72328445529413DDE
-:107350004A55D723284455295E233D4A41D828441D
-:10736000293DC45DC520284529203D49594959B4C6
-:10737000233A28452920BD273A5E28452920BD20EB
-:107380003A284529203D49D92328454429203DC490
-:10739000233A2845294420BD2845562945523D45D4
-:1073A0004834D62845295E253D4959B428455249D7
-:1073B00029233D4959345249D928455249293D4547
-:1073C00048345249C8233A28455229233D45D228FA
-:1073D0004552524F52293D454834524F48D22845D4
-:1073E00052415345293D494852455935D3284552C4
-:1073F00029233D4548D2284552293D45D2202845DC
-:1074000056454E293D4959564548CE233A284529E7
-:1074100057BD40284557293D55D7284557293D593F
-:1074200055D72845294F3D49D9233A262845532980
-:10743000203D4948DA233A2845295320BD233A28DC
-:10744000454C5929203D4C49D9233A28454D454EB4
-:1074500054293D4D45484ED4284546554C293D4676
-:107460005548CC284545293D4959B4284541524EF7
-:10747000293D455235CE2028454152295E3D455291
-:10748000B528454144293D4548C4233A284541296A
-:10749000203D495941D82845412953553D4548B5D6
-:1074A000284541293D4959B52845494748293D4581
-:1074B00059B4284549293D4959B4202845594529F9
-:1074C0003D4159B4284559293D49D9284555293DBB
-:1074D000595557B528455155414C293D4959344BCB
-:1074E0005755CC2845293D45C85DC620284629204A
-:1074F0003D454834C62846554C293D465548CC287C
-:10750000465249454E44293D46524548354EC428C9
-:10751000464154484552293D46414134444845D2AC
-:1075200028462946BD2846293DC65DC7202847294B
-:10753000203D4A4959B428474956293D47494835CD
-:10754000D620284729495E3DC728474529543D474D
-:107550004548B553552847474553293D474A45486F
-:1075600034D3284747293DC72042232847293DC710
-:107570002847292B3DCA284752454154293D4752A7
-:10758000455934D428474F4E29453D47414F35CEC4
-:107590002328474829BD2028474E293DCE28472982
-:1075A0003DC75DC820284829203D45593443C8209F
-:1075B00028484156293D2F48414536D62028484580
-:1075C0005245293D2F484959D22028484F55522924
-:1075D0003D41573545D228484F57293D2F4841D77F
-:1075E000284829233D2FC8284829BD5DC92028499E
-:1075F0004E293D4948CE20284929203D4159B428EB
-:107600004929203D41D928494E29443D415935CE8B
-:1076100053454D2849293D49D920414E54284929EF
-:107620003D41D928494552293D495945D2233A522D
-:107630002849454429203D4959C428494544292021
-:107640003D415935C42849454E293D49594548CE03
-:1076500028494529543D41593445C8284927293DE1
-:107660004159B5203A2849295E253D4159B5203A6E
-:1076700028494529203D4159B4284929253D49D962
-:10768000284945293D4959B4202849444541293DC7
-:1076900041594449593541C82849295E2B3A233D6F
-:1076A00049C828495229233D4159D228495A2925F8
-:1076B0003D4159DA28495329253D4159DA495E2887
-:1076C00049295E233D49C82B5E2849295E2B3D414F
-:1076D000D9233A5E2849295E2B3D49C82849295EAD
-:1076E0002B3D41D9284952293D45D22849474829AF
-:1076F0003D4159B428494C44293D4159354CC42099
-:107700002849474E293D494847CE2849474E292018
-:107710003D415934CE2849474E295E3D415934CE2A
-:107720002849474E29253D415934CE284943524FD7
-:10773000293D4159344B524FC82849515545293D9F
-:10774000495934CB2849293D49C85DCA20284A29CE
-:10775000203D4A4559B4284A293DCA5DCB20284BD3
-:1077600029203D4B4559B420284B294EBD284B2993
-:107770003DCB5DCC20284C29203D454834CC284CBD
-:107780004F2943233D4C4FD74C284C29BD233A5E0B
-:10779000284C29253D55CC284C454144293D4C4990
-:1077A00059C420284C41554748293D4C414534C6D1
-:1077B000284C293DCC5DCD20284D29203D4548341D
-:1077C000CD20284D522E29203D4D49483453544553
-:1077D000D220284D532E293D4D494835DA20284DD9
-:1077E00052532E29203D4D494834534958DA284DEB
-:1077F0004F56293D4D555734D6284D414348494EA3
-:10780000293D4D41485348495935CE4D284D29BD54
-:10781000284D293DCD5DCE20284E29203D454834B8
-:10782000CE45284E47292B3D4ECA284E4729523D6A
-:107830004E58C7284E4729233D4E58C7284E474C1F
-:1078400029253D4E584755CC284E47293D4ED8282E
-:107850004E4B293D4E58CB20284E4F5729203D4EA8
-:107860004157B44E284E29BD284E4F4E29453D4E16
-:10787000414834CE284E293DCE5DCF20284F2920C7
-:107880003D4F4834D7284F4629203D4148D620282F
-:107890004F4829203D4F57B5284F524F554748294B
-:1078A0003D4552344FD7233A284F5229203D45D2E7
-:1078B000233A284F525329203D4552DA284F522966
-:1078C0003D414FD220284F4E45293D574148CE23B8
-:1078D000284F4E4529203D574148CE284F57293D36
-:1078E0004FD720284F564552293D4F57355645D240
-:1078F0005052284F29563D5557B4284F56293D41DF
-:107900004834D6284F295E253D4F57B5284F295E6C
-:10791000454E3D4FD7284F295E49233D4F57B52847
-:107920004F4C29443D4F5734CC284F554748542994
-:107930003D414F35D4284F554748293D414835C62C
-:1079400020284F55293D41D748284F552953233DDD
-:107950004157B4284F5553293D4158D3284F5552CC
-:10796000293D4F48D2284F554C44293D554835C4F0
-:10797000284F55295E4C3D4148B5284F5550293D6B
-:10798000555735D0284F55293D41D7284F59293DC6
-:107990004FD9284F494E47293D4F573449484ED873
-:1079A000284F49293D4F59B5284F4F52293D4F483F
-:1079B00035D2284F4F4B293D554835CB46284F4FA0
-:1079C00044293D555735C44C284F4F44293D414823
-:1079D00035C44D284F4F44293D555735C4284F4F86
-:1079E00044293D554835C446284F4F54293D5548F4
-:1079F00035D4284F4F293D5557B5284F27293D4F9E
-:107A0000C8284F29453D4FD7284F29203D4FD7281B
-:107A10004F41293D4F57B420284F4E4C59293D4FD7
-:107A200057344E4C49D920284F4E4345293D5741A4
-:107A300048344ED3284F4E2754293D4F57344ED407
-:107A400043284F294E3D41C1284F294E473D41CF44
-:107A5000203A5E284F294E3D41C849284F4E293DC6
-:107A600055CE233A284F4E293D55CE235E284F4E02
-:107A7000293D55CE284F2953543D4FD7284F4629ED
-:107A80005E3D414F34C6284F54484552293D414838
-:107A900035444845D252284F29423D5241C15E5299
-:107AA000284F293A233D4F57B5284F535329203D9E
-:107AB000414F35D3233A5E284F4D293D4148CD28CB
-:107AC0004F293D41C15DD020285029203D504959C2
-:107AD000B4285048293DC62850454F504C293D50A8
-:107AE0004959355055CC28504F57293D504157B42E
-:107AF0002850555429203D505548D428502950BD70
-:107B000028502953BD2850294EBD2850524F462E8B
-:107B1000293D50524F48464548345345D2285029B4
-:107B20003DD05DD120285129203D4B595557B428CF
-:107B300051554152293D4B574F4835D2285155296F
-:107B40003D4BD72851293DCB5DD220285229203DDD
-:107B5000414135D220285245295E233D5249D9283A
-:107B6000522952BD2852293DD25DD32028532920C5
-:107B70003D454834D3285348293D53C82328534909
-:107B80004F4E293D5A4855CE28534F4D45293D5318
-:107B90004148CD232853555229233D5A4845D228E0
-:107BA00053555229233D534845D223285355292361
-:107BB0003D5A4855D7232853535529233D534855FB
-:107BC000D72328534544293D5AC423285329233D0C
-:107BD000DA2853414944293D534548C45E28534956
-:107BE0004F4E293D534855CE28532953BD2E285377
-:107BF00029203DDA233A2E45285329203DDA233A1D
-:107C00005E23285329203DD355285329203DD320D6
-:107C10003A23285329203DDA2323285329203DDA0B
-:107C20002028534348293D53CB285329432BBD23B8
-:107C300028534D293D5A55CD2328534E29273D5AC7
-:107C400055CD2853544C45293D5355CC2853293DF7
-:107C5000D35DD420285429203D544959B4202854B8
-:107C600048452920233D444849D9202854484529DE
-:107C7000203D444841D828544F29203D5455D82010
-:107C80002854484154293D44484145D4202854486B
-:107C9000495329203D44484948D320285448455950
-:107CA000293D444845D920285448455245293D445A
-:107CB000484548D22854484552293D444845D22891
-:107CC0005448454952293D44484548D22028544803
-:107CD000414E29203D44484145CE20285448454D39
-:107CE00029203D44484145CE285448455345292044
-:107CF0003D44484959DA20285448454E293D4448D6
-:107D00004548CE285448524F554748293D5448527B
-:107D10005557B42854484F5345293D44484F48DAF5
-:107D20002854484F55474829203D44484FD72854A8
-:107D30004F444159293D5455584445D928544F4D35
-:107D40004F2952524F573D54554D4141B528544F3C
-:107D50002954414C3D544F57B52028544855532978
-:107D60003D4448414834D3285448293D54C8233A17
-:107D700028544544293D544958C45328544929237B
-:107D80004E3D43C8285449294F3D53C828544929DA
-:107D9000413D53C8285449454E293D534855CE28A6
-:107DA00054555229233D434845D228545529413D35
-:107DB000434855D7202854574F293D5455D7262896
-:107DC0005429454E20BD2854293DD45DD520285541
-:107DD00029203D595557B42028554E29493D59551C
-:107DE00057CE2028554E293D4148CE202855504F8A
-:107DF0004E293D415850414FCE4028555229233DF0
-:107E0000554834D228555229233D59554834D22853
-:107E10005552293D45D22855295E203D41C8285557
-:107E2000295E5E3D4148B5285559293D4159B52047
-:107E30004728552923BD4728552925BD47285529B9
-:107E4000233DD7234E2855293D5955D7402855293C
-:107E50003D55D72855293D5955D75DD62028562957
-:107E6000203D564959B42856494557293D5659553C
-:107E700057B52856293DD65DD720285729203D449F
-:107E800041483442554C5955D72028574552452929
-:107E90003D5745D22857412953483D5741C128579E
-:107EA000412953543D5745D928574129533D5741FE
-:107EB000C828574129543D5741C128574845524584
-:107EC000293D57484548D22857484154293D5748ED
-:107ED0004148D42857484F4C293D2F484F57CC286C
-:107EE00057484F293D2F4855D7285748293D57C84F
-:107EF0002857415229233D574548D22857415229F6
-:107F00003D57414FD228574F52295E3D5745D22801
-:107F10005752293DD228574F4D29413D575548CDFD
-:107F200028574F4D29453D574948CD2857454129A8
-:107F3000523D5745C82857414E54293D5741413578
-:107F40004ED4414E5328574552293D45D2285729F2
-:107F50003DD75DD820285829203D4548344BD220B4
-:107F60002858293DDA2858293D4BD35DD920285976
-:107F700029203D574159B428594F554E47293D595D
-:107F800041484ED82028594F5552293D594F48D283
-:107F90002028594F55293D5955D72028594553294F
-:107FA0003D594548D3202859293DD9462859293DCE
-:107FB00041D9505328594348293D4159CB233A5E72
-:107FC0002859293D49D9233A5E285929493D49D99B
-:107FD000203A285929203D41D9203A285929233DC2
-:107FE00041D9203A2859295E2B3A233D49C8203AE5
-:107FF0002859295E233D41D92859293D49C85DDAD0
-:1080000020285A29203D5A4959B4285A293DDAEAEC
-:10801000284129BD2821293DAE282229203D2D4176
-:1080200048354E4B574F5754AD2822293D4B574F9B
-:10803000573454AD2823293D204E4148344D424504
-:10804000D22824293D20444141344C45D2282529B9
-:108050003D20504552534548344ED42826293D20D2
-:1080600041454EC4282729BD282A293D20414534B1
-:1080700053544552494853CB282B293D20504C415D
-:108080004834D3282C293DAC20282D29203DAD286B
-:108090002D29BD282E293D20504F594ED4282F2957
-:1080A0003D20534C41453453C82830293D205A497E
-:1080B0005934524FD72028315354293D4645523424
-:1080C00053D4202831305448293D544548344E5427
-:1080D000C82831293D2057414834CE2028324E440B
-:1080E000293D534548344B554EC42832293D205430
-:1080F0005557B42028335244293D5448455234C47E
-:108100002833293D205448524959B42834293D2068
-:10811000464F4834D22028355448293D46494834F2
-:108120004654C82835293D2046415934D6202836A2
-:108130003429203D534948344B5354495920464F24
-:1081400048D22836293D20534948344BD328372973
-:108150003D20534548345655CE2028385448293DB3
-:1081600045593454C82838293D20455934D4283934
-:10817000293D204E415934CE283A293DAE283B298D
-:108180003DAE283C293D204C4548345320444841CD
-:1081900045CE283D293D204959344B57554CDA28C6
-:1081A0003E293D20475245593454455220444841C8
-:1081B00045CE283F293DBF2840293D20414536D4A2
-:1081C000285E293D204B414534524958D45DC100B9
-:1081D000000000000000000000000000000000009F
-:1081E000000000000000000000000000000000008F
-:1081F00002020202020282000002020202020203E2
-:108200000303030303030303030202020202020245
-:10821000C0A8B0ACC0A0B8A0C0BCA0ACA8ACC0A066
-:10822000A0ACB4A4C0A8A8B0C0BC0000000200204C
-:10823000209B20C0B920CDA34C8A8E0095F7A2398F
-:10824000C5067EC726374E91F155A1FE24452DA7C0
-:1082500036532E47DA7D7E7E7F80818282828484BF
-:108260008484848587878888898A8B8B8C8C8C6CA6
-:108270006F63616C207661726961626C6520726502
-:10828000666572656E636564206265666F726520FF
-:1082900061737369676E6D656E74006279746520D1
-:1082A000636F6465206E6F7420696D706C656D65B9
-:1082B0006E746564004E6F20616374697665206535
-:1082C0007863657074696F6E20746F207265726177
-:1082D00069736500706F702066726F6D20656D70D8
-:1082E0007479206C697374006261642074797065BC
-:1082F000636F64650062756666657220746F6F20D7
-:10830000736D616C6C00747275650066616C736589
-:1083100000286E756C6C2900202020202020202051
-:1083200020202020202020200030303030303030FD
-:108330003030303030303030300004004D696372FE
-:108340006F507974686F6E2076312E392E322D334E
-:10835000342D67643634313534633733206F6E2003
-:10836000323031372D30392D30313B206D69637219
-:108370006F3A6269742076312E302E31207769741D
-:1083800068206E524635313832320D0A0054797009
-:1083900065202268656C7028292220666F72206D26
-:1083A0006F726520696E666F726D6174696F6E2E93
-:1083B0000D0A003E3E3E20000D0A70617374652078
-:1083C0006D6F64653B204374726C2D4320746F2085
-:1083D00063616E63656C2C204374726C2D44207451
-:1083E0006F2066696E6973680D0A3D3D3D20002E61
-:1083F0002E2E2000726177205245504C3B20435472
-:10840000524C2D4220746F20657869740D0A006902
-:108410006E76616C6964206765737475726500734C
-:10842000747265616D206F7065726174696F6E2022
-:108430006E6F7420737570706F72746564006F7501
-:1084400074206F66206D656D6F7279000000040204
-:1084500002040200000204040400020200040403F7
-:1084600001000001030303000101020303040201F0
-:1084700001030104030100030000040101020000E4
-:1084800003021B1B000E110000000000080808007A
-:10849000080A4A4000000A5FEA5FEA0ED92ED36E4E
-:1084A00019324489330C924C924D080800000004A4
-:1084B000880808040804848488000A448A40000468
-:1084C0008EC480000000048800000EC00000000080
-:1084D000080001224488100C9252524C048C84846F
-:1084E0008E1C824C901E1EC244924C06CA525FE201
-:1084F0001FF01EC13E02448ED12E1FE24488100E92
-:10850000D12ED12E0ED12EC4880008000800000400
-:108510008004880244880482000EC00EC0080482D1
-:1085200044880ED126C0040ED135B36C0C925ED2B5
-:10853000521C925C925C0ED010100E1C9252525C37
-:108540001ED01C901E1ED01C90100ED013712E1227
-:10855000525ED2521C8808081C1FE242524C125430
-:10856000981492101010101E113B75B1311139354D
-:10857000B3710C9252524C1C925C90100C92524C63
-:10858000861C925C92510ED00C825C1FE484848421
-:10859000125252524C1131312A44113135BB7112F1
-:1085A000524C9252112A4484841EC488101E0EC854
-:1085B00008080E10080482410EC242424E048A404E
-:1085C0000000000000001F0804800000000ED252CE
-:1085D0004F10101C925C000ED0100E02424ED24E74
-:1085E0000C925C900E06C81C88080ED24EC24C102D
-:1085F000101C92520800080808024002424C101455
-:108600009814920808080806001B75B131001C92E6
-:108610005252000C92524C001C925C90000ED24EB2
-:10862000C2000ED010100006C8049808080EC80733
-:10863000001252524F0011312A4400113135BB0053
-:10864000124C8C9200112A4498001EC4881E06C445
-:108650008C8486080808080818080C881800000C84
-:108660008360302C3235352C302C3235352C300AA5
-:10867000302C3235352C302C3235352C300A302C1C
-:10868000302C302C302C300A3235352C302C302C1C
-:10869000302C3235350A302C3235352C3235352CEC
-:1086A0003235352C300A0054494C5420544F204662
-:1086B000494C4C2053435245454E2000636F6D702A
-:1086C00061737343616C0000000100020003000449
-:1086D0000000010101020103010401000201020284
-:1086E0000203020402000301030203030304030064
-:1086F0000401040204030404044E6F2061766169DE
-:108700006C61626C6520493243004F6E6C79203891
-:10871000626974732053504920737570706F72745E
-:1087200065640053504920666F726D6174206572F4
-:10873000726F72004E6F20617661696C61626C6568
-:10874000205350490070696E6D6170206E6F742007
-:10875000666F756E6420666F7220706572697068EE
-:108760006572616C00232D302B2000686C4C006515
-:10877000666745464700303132333435363738394D
-:108780004142434445460030313233343536373880
-:108790003961626364656600000000006C79FC7FEB
-:1087A0000100000000000000720A0300773003009F
-:1087B000494A0200494A0200494A0200E80300000F
-:1087C000F0BE0200000000000000000000000000F9
-:1087D0000000000000000000000000000000010098
-:1087E0000000000000000000000000000000000089
-:1087F00000000000000000003CD702000000000064
-:108800000000000000000000C4E5020087840300AF
-:10881000700000200000000054F6020074F6020010
-:1088200034F602000000000000000000000000001C
-:108830000000000000000000000000000000000038
-:108840000000000000000000000000000000000028
-:108850000000000000000000000000000000000018
-:108860000000000000000000000000000000000008
-:1088700000000000204EFFFF000000000101010188
-:10888000010101010101050505050505050501FFBA
-:1088900000000401E90000004D310000DD4C000043
-:1088A000FD97000005610100DD6201002D630100FC
-:0888B00095880100C1000000E1
-:020000041000EA
-:1010C0007CB0EE17FFFFFFFF0A0000000000E30006
-:0C10D000FFFFFFFF2D6D0300000000007B
-:0400000500018E2147
-:00000001FF
-"""
-
-
 if __name__ == "__main__":  # pragma: no cover
     main(sys.argv[1:])
@@ -34,9 +34,15 @@ from PyQt5.QtWidgets import (
     QWidget,
     QCheckBox,
     QLineEdit,
+    QSpinBox,
+    QDoubleSpinBox,
+    QComboBox,
+    QHBoxLayout,
+    QApplication,
 )
-from PyQt5.QtGui import QTextCursor
+from PyQt5.QtGui import QTextCursor, QTextDocument
 from mu.resources import load_icon
+from mu.logs import LogReader
 
 
 logger = logging.getLogger(__name__)
@@ -123,10 +129,27 @@ class ModeSelector(QDialog):
 
 class LogWidget(QWidget):
     """
-    Used to display Mu's logs.
+    Used to display Mu's logs. The end of the log is shown first and earlier
+    (or later) pages are loaded as they're scrolled to, so a big log doesn't
+    need to be read all at once.
     """
 
-    def setup(self, log):
+    #: The levels that may be filtered by, with None for all of them.
+    levels = [
+        None,
+        logging.DEBUG,
+        logging.INFO,
+        logging.WARNING,
+        logging.ERROR,
+        logging.CRITICAL,
+    ]
+    #: The fewest lines to show, if there are enough at the filtered level.
+    min_lines = 100
+    #: The most pages to read at once looking for lines at the filtered level
+    #: (more are read as the view is scrolled).
+    max_pages = 16
+
+    def setup(self, log_file):
         widget_layout = QVBoxLayout()
         self.setLayout(widget_layout)
         label = QLabel(
@@ -137,11 +160,144 @@ class LogWidget(QWidget):
         )
         label.setWordWrap(True)
         widget_layout.addWidget(label)
+        controls_layout = QHBoxLayout()
+        self.level_combo = QComboBox()
+        self.level_combo.addItem(_("All messages"))
+        for level in self.levels[1:]:
+            self.level_combo.addItem(logging.getLevelName(level))
+        self.level_combo.currentIndexChanged.connect(self.show_tail)
+        controls_layout.addWidget(self.level_combo)
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText(_("Search the log"))
+        self.search_box.returnPressed.connect(self.search)
+        controls_layout.addWidget(self.search_box)
+        widget_layout.addLayout(controls_layout)
         self.log_text_area = QPlainTextEdit()
         self.log_text_area.setReadOnly(True)
         self.log_text_area.setLineWrapMode(QPlainTextEdit.NoWrap)
-        self.log_text_area.setPlainText(log)
         widget_layout.addWidget(self.log_text_area)
+        self.reader = LogReader(log_file)
+        self.show_tail()
+        scroll_bar = self.log_text_area.verticalScrollBar()
+        scroll_bar.valueChanged.connect(self.scrolled)
+
+    @property
+    def level(self):
+        """
+        The level of the messages shown, or None for all of them.
+        """
+        return self.levels[self.level_combo.currentIndex()]
+
+    def show_window(self, start, stop):
+        """
+        Show the log between the offsets.
+        """
+        self.start, self.stop = start, stop
+        text = self.reader.text(start, stop, self.level)
+        # Replacing the text moves the view, which mustn't load more pages.
+        scroll_bar = self.log_text_area.verticalScrollBar()
+        blocked = scroll_bar.blockSignals(True)
+        self.log_text_area.setPlainText(text)
+        scroll_bar.blockSignals(blocked)
+
+    def show_tail(self):
+        """
+        Show the end of the log, with enough earlier pages to fill the view
+        (reading no more than max_pages of them).
+        """
+        size = self.reader.size
+        self.show_window(self.reader.page_before(size), size)
+        document = self.log_text_area.document()
+        pages = 1
+        while (
+            self.start
+            and document.blockCount() < self.min_lines
+            and pages < self.max_pages
+        ):
+            pages += self.load_previous(self.max_pages - pages)
+        self.log_text_area.moveCursor(QTextCursor.End)
+
+    def load_previous(self, max_pages=None):
+        """
+        Add the page before those shown, keeping the view where it is, and
+        return the number of pages read. If it has no lines at the filtered
+        level, earlier pages are added too (up to max_pages), so there's
+        something new to scroll to.
+        """
+        max_pages = max_pages or self.max_pages
+        text = ""
+        pages = 0
+        while self.start and not text and pages < max_pages:
+            start = self.reader.page_before(self.start)
+            text = self.reader.text(start, self.start, self.level)
+            self.start = start
+            pages += 1
+        document = self.log_text_area.document()
+        lines = document.blockCount()
+        cursor = QTextCursor(document)
+        cursor.insertText(text)
+        scroll_bar = self.log_text_area.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.value() + document.blockCount() - lines)
+        return pages
+
+    def load_next(self):
+        """
+        Add the page after those shown. If it has no lines at the filtered
+        level, later pages are added too (up to max_pages).
+        """
+        text = ""
+        pages = 0
+        while (
+            self.stop < self.reader.size
+            and not text
+            and pages < self.max_pages
+        ):
+            stop = self.reader.page_after(self.stop)
+            text = self.reader.text(self.stop, stop, self.level)
+            self.stop = stop
+            pages += 1
+        cursor = QTextCursor(self.log_text_area.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+
+    def scrolled(self, value):
+        """
+        Load the adjacent page when the view is scrolled to either end.
+        """
+        scroll_bar = self.log_text_area.verticalScrollBar()
+        if value == scroll_bar.minimum():
+            self.load_previous()
+        elif value == scroll_bar.maximum():
+            self.load_next()
+
+    def search(self):
+        """
+        Select the previous occurrence of the search term. If it isn't in the
+        pages shown, the log is searched and the page containing it shown.
+        """
+        term = self.search_box.text()
+        if not term:
+            return
+        flags = QTextDocument.FindBackward | QTextDocument.FindCaseSensitively
+        if self.log_text_area.find(term, flags):
+            return
+        offset = self.reader.find(term, self.start, self.level)
+        if offset < 0:
+            QApplication.beep()
+            return
+        stop = self.reader.line_end(offset)
+        start = min(
+            self.reader.page_before(stop), self.reader.line_start(offset)
+        )
+        self.show_window(start, stop)
+        self.log_text_area.moveCursor(QTextCursor.End)
+        self.log_text_area.find(term, flags)
+
+    def close_log(self):
+        """
+        Release the log file.
+        """
+        self.reader.close()
 
 
 class EnvironmentVariablesWidget(QWidget):
@@ -174,15 +330,21 @@ class MicrobitSettingsWidget(QWidget):
     Used for configuring how to interact with the micro:bit:
 
     * Minification flag.
+    * Flash on save flag.
     * Override runtime version to use.
     """
 
-    def setup(self, minify, custom_runtime_path):
+    def setup(self, minify, custom_runtime_path, flash_on_save=False):
         widget_layout = QVBoxLayout()
         self.setLayout(widget_layout)
         self.minify = QCheckBox(_("Minify Python code before flashing?"))
         self.minify.setChecked(minify)
         widget_layout.addWidget(self.minify)
+        self.flash_on_save = QCheckBox(
+            _("Flash Python code again each time it's saved?")
+        )
+        self.flash_on_save.setChecked(flash_on_save)
+        widget_layout.addWidget(self.flash_on_save)
         label = QLabel(
             _(
                 "Override the built-in MicroPython runtime with "
@@ -251,13 +413,16 @@ class AdminDialog(QDialog):
         self.log_widget = LogWidget()
         self.log_widget.setup(log)
         self.tabs.addTab(self.log_widget, _("Current Log"))
+        self.finished.connect(self.log_widget.close_log)
         self.envar_widget = EnvironmentVariablesWidget()
         self.envar_widget.setup(settings.get("envars", ""))
         self.tabs.addTab(self.envar_widget, _("Python3 Environment"))
         self.log_widget.log_text_area.setFocus()
         self.microbit_widget = MicrobitSettingsWidget()
         self.microbit_widget.setup(
-            settings.get("minify", False), settings.get("microbit_runtime", "")
+            settings.get("minify", False),
+            settings.get("microbit_runtime", ""),
+            settings.get("flash_on_save", False),
         )
         self.tabs.addTab(self.microbit_widget, _("BBC micro:bit Settings"))
         self.package_widget = PackagesWidget()
@@ -273,6 +438,7 @@ class AdminDialog(QDialog):
         return {
             "envars": self.envar_widget.text_area.toPlainText(),
             "minify": self.microbit_widget.minify.isChecked(),
+            "flash_on_save": self.microbit_widget.flash_on_save.isChecked(),
             "microbit_runtime": self.microbit_widget.runtime_path.text(),
             "packages": self.package_widget.text_area.toPlainText(),
         }
@@ -338,6 +504,87 @@ class FindReplaceDialog(QDialog):
         return self.replace_all_flag.isChecked()
 
 
+class TriggerDialog(QDialog):
+    """
+    Display a dialog for getting the settings of the plotter's trigger:
+
+    * The series (counting from 1) to watch,
+    * The level the series must cross,
+    * Whether to trigger on a rising or falling edge,
+    * The number of samples to capture before and after the trigger.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+    def setup(
+        self,
+        series=0,
+        level=0.0,
+        rising=True,
+        pre_trigger=50,
+        post_trigger=50,
+    ):
+        self.setMinimumSize(300, 200)
+        self.setWindowTitle(_("Plotter Trigger"))
+        widget_layout = QVBoxLayout()
+        self.setLayout(widget_layout)
+        # Series.
+        series_label = QLabel(_("Series:"))
+        self.series = QSpinBox()
+        self.series.setRange(1, 64)
+        self.series.setValue(series + 1)
+        widget_layout.addWidget(series_label)
+        widget_layout.addWidget(self.series)
+        # Level.
+        level_label = QLabel(_("Level:"))
+        self.level = QDoubleSpinBox()
+        self.level.setRange(-1e9, 1e9)
+        self.level.setDecimals(3)
+        self.level.setValue(level)
+        widget_layout.addWidget(level_label)
+        widget_layout.addWidget(self.level)
+        # Edge.
+        edge_label = QLabel(_("Edge:"))
+        self.edge = QComboBox()
+        self.edge.addItems([_("Rising"), _("Falling")])
+        self.edge.setCurrentIndex(0 if rising else 1)
+        widget_layout.addWidget(edge_label)
+        widget_layout.addWidget(self.edge)
+        # Capture window.
+        pre_label = QLabel(_("Samples before trigger:"))
+        self.pre_trigger = QSpinBox()
+        self.pre_trigger.setRange(0, 10000)
+        self.pre_trigger.setValue(pre_trigger)
+        widget_layout.addWidget(pre_label)
+        widget_layout.addWidget(self.pre_trigger)
+        post_label = QLabel(_("Samples after trigger:"))
+        self.post_trigger = QSpinBox()
+        self.post_trigger.setRange(1, 10000)
+        self.post_trigger.setValue(post_trigger)
+        widget_layout.addWidget(post_label)
+        widget_layout.addWidget(self.post_trigger)
+        button_box = QDialogButtonBox(
+            QDialogButtonBox.Ok | QDialogButtonBox.Cancel
+        )
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        widget_layout.addWidget(button_box)
+
+    def settings(self):
+        """
+        Return a dictionary of the trigger settings entered by the user, with
+        the series counted from 0.
+        """
+        return {
+            "series": self.series.value() - 1,
+            "level": self.level.value(),
+            "rising": self.edge.currentIndex() == 0,
+            "pre_trigger": self.pre_trigger.value(),
+            "post_trigger": self.post_trigger.value(),
+        }
+
+
 class PackageDialog(QDialog):
     """
     Display a dialog to indicate the status of the packaging related changes
@@ -30,9 +30,9 @@ from PyQt5.Qsci import (
     QsciLexerCSS,
 )
 from PyQt5.QtCore import Qt, pyqtSignal
-from PyQt5.QtWidgets import QApplication
+from PyQt5.QtWidgets import QApplication, QWidget
 from mu.interface.themes import Font, DayTheme
-from mu.logic import NEWLINE
+from mu.logic import NEWLINE, content_hash
 
 
 # Regular Expression for valid individual code 'words'
@@ -94,6 +94,8 @@ class EditorPane(QsciScintilla):
         self.path = path
         self.setText(text)
         self.newline = newline
+        # Identifies the text last loaded from or saved to the file.
+        self.saved_hash = content_hash(text) if path else None
         self.check_indicators = {  # IDs are arbitrary
             "error": {"id": 19, "markers": {}},
             "style": {"id": 20, "markers": {}},
@@ -615,3 +617,74 @@ class EditorPane(QsciScintilla):
             self.setSelection(line_number, 0, line_number, len(line_content))
             self.replaceSelectedText(new_line)
             self.setSelection(line_number, 0, line_number, len(new_line) - 1)
+
+
+class TabPlaceholder(QWidget):
+    """
+    Stands in for the EditorPane of a file restored from the last session
+    until its tab is first shown, so the file isn't read and no editor is
+    built for it until it's needed.
+
+    It quacks enough like an EditorPane for the code that works through all
+    the tabs, but is never modified and ignores changes to its settings,
+    which are applied to the EditorPane that replaces it instead.
+    """
+
+    # Never emitted, but watched by FileTabs for the dirty indicator.
+    modificationChanged = pyqtSignal(bool)
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.breakpoint_handles = set()
+
+    @property
+    def label(self):
+        """
+        The filename of the file the tab is for.
+        """
+        return os.path.basename(self.path)
+
+    @property
+    def title(self):
+        """
+        The title of the tab, which is the same as its label since it's never
+        modified.
+        """
+        return self.label
+
+    def isModified(self):
+        """
+        A placeholder is never modified.
+        """
+        return False
+
+    def setReadOnly(self, read_only):
+        """
+        The EditorPane that takes its place is made read-only if needed.
+        """
+
+    def set_api(self, api):
+        """
+        The EditorPane that takes its place gets the API of the mode then.
+        """
+
+    def set_theme(self, theme=DayTheme):
+        """
+        The EditorPane that takes its place gets the theme of the time.
+        """
+
+    def reset_annotations(self):
+        """
+        There are no annotations to reset.
+        """
+
+    def reset_debugger_highlight(self):
+        """
+        There is no debugger highlight to reset.
+        """
+
+    def setSelection(self, line_from, index_from, line_to, index_to):
+        """
+        There is no text to select.
+        """
@@ -64,7 +64,7 @@ from mu.interface.panes import (
     FileSystemPane,
     PlotterPane,
 )
-from mu.interface.editor import EditorPane
+from mu.interface.editor import EditorPane, TabPlaceholder
 from mu.resources import load_icon, load_pixmap
 
 
@@ -291,6 +291,11 @@ class FileTabs(QTabWidget):
         """
         current_tab = self.widget(tab_id)
         window = self.nativeParentWidget()
+        if isinstance(current_tab, TabPlaceholder):
+            # The file is only loaded when its tab is first shown. The title
+            # is updated when its EditorPane takes its place.
+            window.load_placeholder.emit(current_tab)
+            return
         if current_tab:
             window.update_title(current_tab.title)
         else:
@@ -318,6 +323,8 @@ class Window(QMainWindow):
     write_to_serial = pyqtSignal(bytes)
     data_received = pyqtSignal(bytes)
     open_file = pyqtSignal(str)
+    text_changed = pyqtSignal(object)
+    load_placeholder = pyqtSignal(object)
     load_theme = pyqtSignal(str)
     previous_folder = None
     default_pane = FileSystemPane
@@ -456,6 +463,11 @@ class Window(QMainWindow):
             # Bubble the signal up
             self.open_file.emit(file)
 
+        @new_tab.textChanged.connect
+        def on_text_changed():
+            # Bubble the signal up with the tab that changed
+            self.text_changed.emit(new_tab)
+
         self.tabs.setCurrentIndex(new_tab_index)
         self.connect_zoom(new_tab)
         self.set_theme(self.theme)
@@ -464,6 +476,40 @@ class Window(QMainWindow):
             new_tab.setReadOnly(self.read_only_tabs)
         return new_tab
 
+    def add_placeholder(self, path):
+        """
+        Adds a tab for the file at the referenced path, which is only loaded
+        once the tab is shown (see load_placeholder).
+        """
+        placeholder = TabPlaceholder(path)
+        self.tabs.addTab(placeholder, placeholder.label)
+        return placeholder
+
+    def is_placeholder(self, tab):
+        """
+        Return a boolean to indicate if the referenced tab is a placeholder
+        for a file that hasn't been loaded yet.
+        """
+        return isinstance(tab, TabPlaceholder)
+
+    def replace_placeholder(self, placeholder, path, text, api, newline):
+        """
+        Replaces the referenced placeholder with a tab for the file with the
+        referenced path and text, in the same place.
+        """
+        index = self.tabs.indexOf(placeholder)
+        new_tab = self.add_tab(path, text, api, newline)
+        self.remove_placeholder(placeholder)
+        self.tabs.tabBar().moveTab(self.tabs.indexOf(new_tab), index)
+        return new_tab
+
+    def remove_placeholder(self, placeholder):
+        """
+        Removes the tab for the referenced placeholder.
+        """
+        self.tabs.removeTab(self.tabs.indexOf(placeholder))
+        placeholder.deleteLater()
+
     def focus_tab(self, tab):
         """
         Force focus on the referenced tab.
@@ -900,8 +946,8 @@ class Window(QMainWindow):
 
     def show_admin(self, log, settings, packages):
         """
-        Display the administrative dialog with referenced content of the log
-        and settings. Return a dictionary of the settings that may have been
+        Display the administrative dialog with the referenced log file and
+        settings. Return a dictionary of the settings that may have been
         changed by the admin dialog.
         """
         admin_box = AdminDialog(self)
@@ -25,6 +25,8 @@ import logging
 import signal
 import string
 import bisect
+import time
+import statistics
 import os.path
 from PyQt5.QtCore import (
     Qt,
@@ -33,6 +35,7 @@ from PyQt5.QtCore import (
     pyqtSignal,
     QTimer,
     QUrl,
+    QPointF,
 )
 from collections import deque
 from PyQt5.QtWidgets import (
@@ -57,6 +60,8 @@ from PyQt5.QtGui import (
 from qtconsole.rich_jupyter_widget import RichJupyterWidget
 from mu import language_code
 from mu.interface.themes import Font
+from mu.interface.dialogs import TriggerDialog
+from mu.telemetry import TelemetryDecoder
 from mu.interface.themes import DEFAULT_FONT_SIZE
 
 
@@ -72,6 +77,14 @@ except ImportError:  # pragma: no cover
     CHARTS = False
 
 
+NUMPY = True
+try:  # pragma: no cover
+    import numpy
+except ImportError:  # pragma: no cover
+    logger.info("Unable to find NumPy. Plotter statistics will not display.")
+    NUMPY = False
+
+
 PANE_ZOOM_SIZES = {
     "xs": 8,
     "s": 10,
@@ -150,6 +163,9 @@ class MicroPythonREPLPane(QTextEdit):
     def __init__(self, serial, theme="day", parent=None):
         super().__init__(parent)
         self.serial = serial
+        # Removes binary telemetry frames (meant for the plotter) from the
+        # text to display.
+        self.telemetry = TelemetryDecoder()
         self.setFont(Font().load())
         self.setAcceptRichText(False)
         self.setReadOnly(False)
@@ -243,8 +259,10 @@ class MicroPythonREPLPane(QTextEdit):
     def process_bytes(self, data):
         """
         Given some incoming bytes of data, work out how to handle / display
-        them in the REPL widget.
+        them in the REPL widget. Binary telemetry frames (see mu.telemetry)
+        are left to the plotter.
         """
+        data, _samples = self.telemetry.feed(data)
         tc = self.textCursor()
         # The text cursor must be on the last line of the document. If it isn't
         # then move it there.
@@ -261,7 +279,7 @@ class MicroPythonREPLPane(QTextEdit):
                 # VT100 cursor detected: <Esc>[
                 i += 2  # move index to after the [
                 regex = r"(?P<count>[\d]*)(;?[\d]*)*(?P<action>[ABCDKm])"
-                m = re.search(regex, data[i:].decode("utf-8"))
+                m = re.search(regex, data[i:].decode("utf-8", "replace"))
                 if m:
                     # move to (almost) after control seq
                     # (will ++ at end of loop)
@@ -340,7 +358,7 @@ class MicroPythonREPLPane(QTextEdit):
         commands.append(b"\x04")
         raw_off = [b"\x02"]
         command_sequence = raw_on + newline + commands + raw_off
-        logger.info(command_sequence)
+        logger.debug("Command sequence: %r", command_sequence)
         self.execute(command_sequence)
 
     def execute(self, commands):
@@ -350,7 +368,7 @@ class MicroPythonREPLPane(QTextEdit):
         """
         if commands:
             command = commands[0]
-            logger.info("Sending command {}".format(command))
+            logger.debug("Sending command %r", command)
             self.serial.write(command)
             remainder = commands[1:]
             remaining_task = lambda commands=remainder: self.execute(commands)
@@ -1239,6 +1257,83 @@ class DebugInspector(QTreeView):
         pass
 
 
+class PlotterStatsPanel(QFrame):
+    """
+    A side panel for the plotter that shows the rolling mean, standard
+    deviation, minimum and maximum of each series of data and, optionally,
+    the magnitude spectrum of each series.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setObjectName("plotterstatspanel")
+        self.setFrameShape(QFrame.StyledPanel)
+        self.setAutoFillBackground(True)
+        layout = QGridLayout()
+        self.setLayout(layout)
+        self.stats_label = QLabel()
+        self.stats_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        layout.addWidget(self.stats_label, 0, 0)
+        # Line series for the spectrum of each series of data.
+        self.spectrum_series = []
+        self.spectrum = QChart()
+        self.spectrum.legend().hide()
+        self.spectrum.setTitle(_("Spectrum"))
+        self.axis_f = QValueAxis()
+        self.axis_m = QValueAxis()
+        self.axis_f.setLabelFormat("%.1f")
+        self.axis_m.setLabelFormat("%.2f")
+        self.spectrum_view = QChartView(self.spectrum)
+        self.spectrum_view.setRenderHint(QPainter.Antialiasing)
+        self.spectrum_view.hide()
+        layout.addWidget(self.spectrum_view, 1, 0)
+        layout.setRowStretch(1, 1)
+
+    def update_stats(self, means, stds, mins, maxs):
+        """
+        Display the referenced statistics, one row per series of data.
+        """
+        rows = [_("Series\tMean\tStd dev\tMin\tMax")]
+        for i, stats in enumerate(zip(means, stds, mins, maxs)):
+            rows.append(
+                "{}\t{:.3g}\t{:.3g}\t{:.3g}\t{:.3g}".format(i + 1, *stats)
+            )
+        self.stats_label.setText("\n".join(rows))
+
+    def update_spectrum(self, freqs, magnitudes):
+        """
+        Given the frequencies of the bins and a magnitude for each bin of each
+        series of data, plot the spectrum of each series.
+        """
+        while len(self.spectrum_series) < len(magnitudes):
+            new_series = QLineSeries()
+            self.spectrum.addSeries(new_series)
+            self.spectrum.setAxisX(self.axis_f, new_series)
+            self.spectrum.setAxisY(self.axis_m, new_series)
+            self.spectrum_series.append(new_series)
+        while len(self.spectrum_series) > len(magnitudes):
+            self.spectrum.removeSeries(self.spectrum_series.pop())
+        for line_series, series_magnitudes in zip(
+            self.spectrum_series, magnitudes
+        ):
+            line_series.replace(
+                [QPointF(f, m) for f, m in zip(freqs, series_magnitudes)]
+            )
+        self.axis_f.setRange(0, max(freqs[-1], 1))
+        self.axis_m.setRange(0, max(magnitudes.max(), 1))
+
+    def set_theme(self, theme):
+        """
+        Sets the theme / look for the spectrum chart.
+        """
+        if theme == "day":
+            self.spectrum.setTheme(QChart.ChartThemeLight)
+        elif theme == "night":
+            self.spectrum.setTheme(QChart.ChartThemeDark)
+        else:
+            self.spectrum.setTheme(QChart.ChartThemeHighContrast)
+
+
 class PlotterPane(QChartView):
     """
     This plotter widget makes viewing sensor data easy!
@@ -1254,15 +1349,50 @@ class PlotterPane(QChartView):
         super().__init__(parent)
         # Holds the raw input to be checked for actionable data to display.
         self.input_buffer = []
-        # Holds the raw actionable data detected while plotting.
-        self.raw_data = []
+        # Extracts binary telemetry frames from the raw input.
+        self.telemetry = TelemetryDecoder()
+        # Streams the actionable data detected while plotting to a file (see
+        # BaseMode.start_data_capture).
+        self.capture = None
         self.setObjectName("plotterpane")
         self.max_x = 100  # Maximum value along x axis
         self.max_y = 1000  # Maximum value +/- along y axis
         self.flooded = False  # Flag to indicate if data flooding is happening.
+        self.time_axis = False  # Flag to label the x axis in seconds.
+        self.show_stats = False  # Flag to display timing statistics.
+        # Monotonic host time at which the plotter started.
+        self.start_time = time.monotonic()
+        # Delay (in seconds) between receiving and drawing the latest data.
+        self.latency = 0.0
 
         # Holds deques for each slot of incoming data (assumes 1 to start with)
         self.data = [deque([0] * self.max_x)]
+        # Holds the host timestamps of the incoming data (newest first).
+        self.times = deque(maxlen=self.max_x)
+        # Ring buffer (one row per series) of the most recent data, used for
+        # statistics. Only filled while the statistics panel is displayed.
+        self.ring_size = 1024
+        self.ring = None
+        self.ring_index = 0  # Where to put the next tuple of values.
+        self.ring_count = 0  # How many tuples of values are in the ring.
+        self.show_panel = False  # Flag to display the statistics panel.
+        self.show_spectrum = False  # Flag to display the FFT spectrum.
+        # The state of the trigger: None (the chart scrolls as usual), "armed"
+        # (waiting for the trigger condition), "triggered" (capturing the
+        # samples after the trigger) or "frozen" (displaying the capture).
+        self.trigger_state = None
+        self.trigger = {
+            "series": 0,
+            "level": 0.0,
+            "rising": True,
+            "pre_trigger": 50,
+            "post_trigger": 50,
+        }
+        # Preallocated buffer of tuples captured around the trigger. While
+        # armed, the first pre_trigger slots are used as a ring buffer.
+        self.trigger_buffer = []
+        self.trigger_index = 0  # Number of tuples put into the buffer.
+        self.trigger_last = None  # Last value of the series being watched.
         # Holds line series for each slot of incoming data (assumes 1 to start
         # with).
         self.series = [QLineSeries()]
@@ -1279,21 +1409,299 @@ class PlotterPane(QChartView):
         self.axis_y = QValueAxis()
         self.axis_x.setRange(0, self.max_x)
         self.axis_y.setRange(-self.max_y, self.max_y)
-        self.axis_x.setLabelFormat("time")
+        self.axis_x.setLabelFormat("%d")
         self.axis_y.setLabelFormat("%d")
         self.chart.setAxisX(self.axis_x, self.series[0])
         self.chart.setAxisY(self.axis_y, self.series[0])
         self.setChart(self.chart)
         self.setRenderHint(QPainter.Antialiasing)
+        self.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.customContextMenuRequested.connect(self.context_menu)
+        # The statistics panel is refreshed at a low fixed rate (in ms) so
+        # it doesn't slow down the plotting of incoming data.
+        self.stats_panel = PlotterStatsPanel(self)
+        self.stats_panel.hide()
+        self.stats_panel_width = 320
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(500)
+        self.stats_timer.timeout.connect(self.refresh_stats)
+
+    def context_menu(self):
+        """
+        Creates custom context menu to toggle the time axis and statistics.
+        """
+        menu = QMenu(self)
+        time_axis = menu.addAction(_("Show time in seconds"))
+        time_axis.setCheckable(True)
+        time_axis.setChecked(self.time_axis)
+        time_axis.toggled.connect(self.set_time_axis)
+        show_stats = menu.addAction(_("Show timing statistics"))
+        show_stats.setCheckable(True)
+        show_stats.setChecked(self.show_stats)
+        show_stats.toggled.connect(self.set_show_stats)
+        if NUMPY:
+            show_panel = menu.addAction(_("Show statistics panel"))
+            show_panel.setCheckable(True)
+            show_panel.setChecked(self.show_panel)
+            show_panel.toggled.connect(self.set_show_panel)
+            show_spectrum = menu.addAction(_("Show spectrum (FFT)"))
+            show_spectrum.setCheckable(True)
+            show_spectrum.setChecked(self.show_spectrum)
+            show_spectrum.setEnabled(self.show_panel)
+            show_spectrum.toggled.connect(self.set_show_spectrum)
+        menu.addSeparator()
+        menu.addAction(_("Trigger..."), self.show_trigger_dialog)
+        if self.trigger_state:
+            menu.addAction(_("Re-arm trigger"), self.rearm_trigger)
+            menu.addAction(_("Stop trigger"), self.disarm_trigger)
+        menu.exec_(QCursor.pos())
+
+    def show_trigger_dialog(self):
+        """
+        Ask the user for the trigger settings and, if they click OK, arm the
+        trigger.
+        """
+        dialog = TriggerDialog(self)
+        dialog.setup(**self.trigger)
+        if dialog.exec():
+            self.arm_trigger(**dialog.settings())
+
+    def arm_trigger(
+        self, series, level, rising=True, pre_trigger=50, post_trigger=50
+    ):
+        """
+        Wait for the referenced series (counting from 0) to cross the level
+        (on a rising or falling edge), then capture pre_trigger samples from
+        before and post_trigger samples from after (and including) the
+        triggering sample, and freeze the display.
+
+        While armed, nothing is drawn, so watching for the trigger costs
+        little more than a comparison per sample.
+        """
+        self.trigger = {
+            "series": series,
+            "level": level,
+            "rising": rising,
+            "pre_trigger": pre_trigger,
+            "post_trigger": post_trigger,
+        }
+        self.trigger_buffer = [None] * (pre_trigger + post_trigger)
+        self.trigger_index = 0
+        self.trigger_last = None
+        self.trigger_state = "armed"
+        self.chart.setTitle(_("Waiting for trigger..."))
+
+    def rearm_trigger(self):
+        """
+        Arm the trigger again, with the same settings.
+        """
+        self.arm_trigger(**self.trigger)
+
+    def disarm_trigger(self):
+        """
+        Stop using the trigger and return to the scrolling display.
+        """
+        self.trigger_state = None
+        self.trigger_buffer = []
+        self.chart.setTitle("")
+        self.set_time_axis(self.time_axis)
+
+    def trigger_sample(self, values):
+        """
+        Handle a tuple of values received while the trigger is in use.
+        """
+        pre_trigger = self.trigger["pre_trigger"]
+        if self.trigger_state == "armed":
+            series = self.trigger["series"]
+            value = values[series] if series < len(values) else None
+            last, self.trigger_last = self.trigger_last, value
+            level = self.trigger["level"]
+            if last is None or value is None:
+                triggered = False
+            elif self.trigger["rising"]:
+                triggered = last < level <= value
+            else:
+                triggered = last > level >= value
+            if not triggered:
+                if pre_trigger:
+                    index = self.trigger_index % pre_trigger
+                    self.trigger_buffer[index] = values
+                self.trigger_index += 1
+                return
+            # Put the pre-trigger samples into order, oldest first.
+            if pre_trigger:
+                index = self.trigger_index % pre_trigger
+                ring = self.trigger_buffer[:pre_trigger]
+                self.trigger_buffer[:pre_trigger] = ring[index:] + ring[:index]
+            self.trigger_index = pre_trigger
+            self.trigger_state = "triggered"
+        if self.trigger_state == "triggered":
+            self.trigger_buffer[self.trigger_index] = values
+            self.trigger_index += 1
+            if self.trigger_index == len(self.trigger_buffer):
+                self.freeze_trigger()
+
+    def freeze_trigger(self):
+        """
+        Display the samples captured around the trigger, with the x axis
+        showing the number of samples before / after the trigger.
+        """
+        self.trigger_state = "frozen"
+        pre_trigger = self.trigger["pre_trigger"]
+        captured = [
+            (i - pre_trigger, values)
+            for i, values in enumerate(self.trigger_buffer)
+            if values is not None
+        ]
+        self.adjust_series(len(self.trigger_buffer[pre_trigger]))
+        max_y_range = 0
+        for i, line_series in enumerate(self.series):
+            points = [(x, v[i]) for x, v in captured if i < len(v)]
+            line_series.clear()
+            for point in points:
+                line_series.append(*point)
+            if points:
+                max_y_range = max(max_y_range, max(abs(y) for x, y in points))
+        self.rescale_y(max_y_range)
+        self.axis_x.setLabelFormat("%d")
+        self.axis_x.setRange(captured[0][0], captured[-1][0])
+        self.chart.setTitle(
+            _("Triggered on series {} crossing {}").format(
+                self.trigger["series"] + 1, self.trigger["level"]
+            )
+        )
+
+    def set_show_panel(self, enabled):
+        """
+        Show or hide the statistics panel on the right hand side of the chart.
+        """
+        self.show_panel = enabled
+        self.ring = None
+        self.ring_index = 0
+        self.ring_count = 0
+        if enabled:
+            self.setViewportMargins(0, 0, self.stats_panel_width, 0)
+            self.place_stats_panel()
+            self.stats_panel.show()
+            self.stats_timer.start()
+        else:
+            self.setViewportMargins(0, 0, 0, 0)
+            self.stats_panel.hide()
+            self.stats_timer.stop()
+
+    def set_show_spectrum(self, enabled):
+        """
+        Show or hide the FFT magnitude spectrum in the statistics panel.
+        """
+        self.show_spectrum = enabled
+        self.stats_panel.spectrum_view.setVisible(enabled)
+
+    def place_stats_panel(self):
+        """
+        Position the statistics panel in the margin to the right of the chart.
+        """
+        self.stats_panel.setGeometry(
+            self.width() - self.stats_panel_width,
+            0,
+            self.stats_panel_width,
+            self.height(),
+        )
+
+    def resizeEvent(self, event):
+        """
+        Keep the statistics panel in place when the plotter is resized.
+        """
+        super().resizeEvent(event)
+        self.place_stats_panel()
+
+    def buffer_values(self, values):
+        """
+        Add a tuple of values to the ring buffer used for statistics. If the
+        number of values changes, the ring buffer starts again.
+        """
+        if self.ring is None or self.ring.shape[0] != len(values):
+            self.ring = numpy.zeros((len(values), self.ring_size))
+            self.ring_index = 0
+            self.ring_count = 0
+        self.ring[:, self.ring_index] = values
+        self.ring_index = (self.ring_index + 1) % self.ring_size
+        self.ring_count = min(self.ring_count + 1, self.ring_size)
+
+    def refresh_stats(self):
+        """
+        Update the statistics panel with values calculated (in vectorized
+        form) over the contents of the ring buffer.
+        """
+        if not self.ring_count:
+            return
+        if self.ring_count < self.ring_size:
+            window = self.ring[:, : self.ring_count]
+        else:
+            # Oldest values first.
+            window = numpy.roll(self.ring, -self.ring_index, axis=1)
+        means = window.mean(axis=1)
+        self.stats_panel.update_stats(
+            means, window.std(axis=1), window.min(axis=1), window.max(axis=1)
+        )
+        if self.show_spectrum and self.ring_count > 1:
+            # Use the measured sample rate so the frequencies are in Hz.
+            # Without one, the frequencies are in cycles per sample.
+            rate = self.timing_stats()[0] or 1.0
+            samples = window.shape[1]
+            freqs = numpy.fft.rfftfreq(samples, d=1.0 / rate)
+            spectrum = numpy.fft.rfft(window - means[:, None], axis=1)
+            magnitudes = numpy.abs(spectrum) * 2 / samples
+            self.stats_panel.update_spectrum(freqs, magnitudes)
+
+    def set_time_axis(self, enabled):
+        """
+        Label the x axis with seconds since the plotter started, rather than
+        with the index of each sample.
+        """
+        self.time_axis = enabled
+        if enabled:
+            self.axis_x.setLabelFormat("%.1fs")
+        else:
+            self.axis_x.setLabelFormat("%d")
+            self.axis_x.setRange(0, self.max_x)
+        self.update_series()
+
+    def set_show_stats(self, enabled):
+        """
+        Show or hide the timing statistics in the chart's title.
+        """
+        self.show_stats = enabled
+        if not enabled:
+            self.chart.setTitle("")
+
+    def timing_stats(self):
+        """
+        Return a tuple of samples per second, inter-sample jitter (the
+        standard deviation of the gaps between samples, in seconds) and the
+        latency (in seconds) between receiving and drawing the latest data,
+        based upon the samples currently displayed.
+        """
+        rate, jitter = 0.0, 0.0
+        if len(self.times) > 1:
+            duration = self.times[0] - self.times[-1]
+            if duration > 0:
+                rate = (len(self.times) - 1) / duration
+            times = list(self.times)
+            gaps = [newer - older for newer, older in zip(times, times[1:])]
+            jitter = statistics.pstdev(gaps)
+        return rate, jitter, self.latency
 
     def process_bytes(self, data):
         """
-        Takes raw bytes and, if a valid tuple is detected, adds the data to
-        the plotter.
+        Takes raw bytes and, if a valid tuple (or binary telemetry frame, see
+        mu.telemetry) is detected, adds the data to the plotter. Each tuple
+        is timestamped with the host's monotonic clock at the moment the
+        bytes were received.
 
         The the length of the bytes data > 1024 then a data_flood signal is
         emitted to ensure Mu can take action to remain responsive.
         """
+        received = time.monotonic()
         # Data flooding guards.
         if self.flooded:
             return
@@ -1301,6 +1709,9 @@ class PlotterPane(QChartView):
             self.flooded = True
             self.data_flood.emit()
             return
+        data, samples = self.telemetry.feed(data)
+        for values in samples:
+            self.add_data(values, received)
         data = data.replace(b"\r\n", b"\n")
         self.input_buffer.append(data)
         # Check if the data contains a Python tuple, containing numbers, on a
@@ -1327,7 +1738,7 @@ class PlotterPane(QChartView):
                         continue
                 if numeric_values:
                     # There were numeric values in the tuple, so use them!
-                    self.add_data(tuple(numeric_values))
+                    self.add_data(tuple(numeric_values), received)
         # Reset the input buffer.
         self.input_buffer = []
         if lines[-1]:
@@ -1335,18 +1746,58 @@ class PlotterPane(QChartView):
             # processing next time we read data from self.serial.
             self.input_buffer.append(lines[-1])
 
-    def add_data(self, values):
+    def add_data(self, values, timestamp=None):
         """
         Given a tuple of values, ensures there are the required number of line
         series, add the data to the line series, update the range of the chart
         so the chart displays nicely.
-        """
-        # Store incoming data to dump as CSV at the end of the session.
-        self.raw_data.append(values)
+
+        The timestamp is the host's monotonic time when the values were
+        received (defaults to now).
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if self.show_panel:
+            self.buffer_values(values)
+        # Stream incoming data to the capture file for the session.
+        if self.capture:
+            self.capture.write(values, timestamp)
+        # When the trigger is in use, nothing scrolls past.
+        if self.trigger_state:
+            self.trigger_sample(values)
+            return
         # Check the number of incoming values.
-        if len(values) != len(self.series):
+        self.adjust_series(len(values))
+
+        # Add the incoming values (and when they were received) to the data
+        # to be displayed, and compute max range.
+        self.times.appendleft(timestamp)
+        max_ranges = []
+        for i, value in enumerate(values):
+            self.data[i].appendleft(value)
+            max_ranges.append(max([max(self.data[i]), abs(min(self.data[i]))]))
+            if len(self.data[i]) > self.max_x:
+                self.data[i].pop()
+
+        self.rescale_y(max(max_ranges))
+
+        self.update_series()
+        self.latency = time.monotonic() - timestamp
+        if self.show_stats:
+            rate, jitter, latency = self.timing_stats()
+            self.chart.setTitle(
+                _(
+                    "{:.1f} samples/s, jitter {:.1f} ms, latency {:.1f} ms"
+                ).format(rate, jitter * 1000, latency * 1000)
+            )
+
+    def adjust_series(self, value_len):
+        """
+        Ensure there are the required number of line series (and deques of
+        data to display) for the referenced number of values.
+        """
+        if value_len != len(self.series):
             # Adjust the number of line series.
-            value_len = len(values)
             series_len = len(self.series)
             if value_len > series_len:
                 # Add new line series.
@@ -1364,17 +1815,10 @@ class PlotterPane(QChartView):
                 self.series = self.series[:value_len]
                 self.data = self.data[:value_len]
 
-        # Add the incoming values to the data to be displayed, and compute
-        # max range.
-        max_ranges = []
-        for i, value in enumerate(values):
-            self.data[i].appendleft(value)
-            max_ranges.append(max([max(self.data[i]), abs(min(self.data[i]))]))
-            if len(self.data[i]) > self.max_x:
-                self.data[i].pop()
-
-        # Re-scale y-axis.
-        max_y_range = max(max_ranges)
+    def rescale_y(self, max_y_range):
+        """
+        Re-scale the y axis so values up to max_y_range display nicely.
+        """
         y_range = bisect.bisect_left(self.y_ranges, max_y_range)
         if y_range < len(self.y_ranges):
             self.max_y = self.y_ranges[y_range]
@@ -1390,13 +1834,23 @@ class PlotterPane(QChartView):
         else:
             self.axis_y.setLabelFormat("%d")
 
-        # Update the line series with the data.
+    def update_series(self):
+        """
+        Update the line series with the data, plotted against either the
+        sample index or the seconds since the plotter started.
+        """
+        if self.time_axis and self.times:
+            x_vals = [t - self.start_time for t in reversed(self.times)]
+            self.axis_x.setRange(x_vals[0], max(x_vals[-1], x_vals[0] + 1))
+        else:
+            x_vals = range(self.max_x)
+        offset = len(x_vals) - 1
         for i, line_series in enumerate(self.series):
             line_series.clear()
             xy_vals = []
-            for j in range(self.max_x):
-                val = self.data[i][self.max_x - 1 - j]
-                xy_vals.append((j, val))
+            for j, x in enumerate(x_vals):
+                val = self.data[i][offset - j]
+                xy_vals.append((x, val))
             for point in xy_vals:
                 line_series.append(*point)
 
@@ -1410,3 +1864,4 @@ class PlotterPane(QChartView):
             self.chart.setTheme(QChart.ChartThemeDark)
         else:
             self.chart.setTheme(QChart.ChartThemeHighContrast)
+        self.stats_panel.set_theme(theme)
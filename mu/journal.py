@@ -0,0 +1,254 @@
+"""
+An append-only journal of the unsaved work in the editor's tabs, so it can be
+recovered if Mu doesn't exit cleanly (e.g. it crashes or the computer loses
+power).
+
+Each line of the journal is a JSON object recording either the whole text of
+a buffer, a change to it (as the span of the old text that was replaced and
+its replacement) or that it no longer has unsaved work. Once enough changes
+have been appended, the journal is compacted to just the current text of the
+buffers.
+
+Copyright (c) 2015-2017 Nicholas H.Tollervey and others (see the AUTHORS file).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import json
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+#: The journal is compacted once this many characters of changes have been
+#: appended to it (or more than the size of the buffers, if that's bigger).
+COMPACT_SIZE = 64 * 1024
+
+
+def _common_prefix(a, b):
+    """
+    Return the length of the longest common prefix of the two strings. The
+    strings are compared in slices, which is much quicker than comparing them
+    a character at a time.
+    """
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(a, b, limit):
+    """
+    Return the length of the longest common suffix of the two strings, up to
+    the given limit.
+    """
+    len_a, len_b = len(a), len(b)
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len_a - middle : len_a - low] == b[len_b - middle : len_b - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def diff(old, new):
+    """
+    Return a (start, end, replacement) tuple describing the change from the
+    old to the new text: the span of the old text to replace with the
+    replacement.
+    """
+    start = _common_prefix(old, new)
+    suffix = _common_suffix(old, new, min(len(old), len(new)) - start)
+    return start, len(old) - suffix, new[start : len(new) - suffix]
+
+
+def patch(text, change):
+    """
+    Return the text with the change (as returned by diff) applied.
+    """
+    start, end, replacement = change
+    return text[:start] + replacement + text[end:]
+
+
+class Journal:
+    """
+    The journal of the unsaved work in the buffers of some owners (e.g. the
+    editor's tabs) kept in the file at the referenced path.
+    """
+
+    def __init__(self, path, compact_size=COMPACT_SIZE):
+        self.path = path
+        self.compact_size = compact_size
+        self.file = None
+        self.ids = {}  #: Owner -> its buffer's id in the journal.
+        self.buffers = {}  #: Owner -> [path, newline, text] last recorded.
+        self.next_id = 0
+        self.appended = 0  #: Characters appended since compaction.
+
+    @property
+    def owners(self):
+        """
+        The owners of the buffers recorded in the journal.
+        """
+        return list(self.buffers)
+
+    def record(self, owner, path, newline, text):
+        """
+        Record the current path, newline convention and text of the owner's
+        buffer. Only what's changed since it was last recorded is appended.
+        """
+        buffer = self.buffers.get(owner)
+        if buffer == [path, newline, text]:
+            return  # Nothing has changed.
+        if buffer is None:
+            self.ids[owner] = self.next_id
+            self.next_id += 1
+            entry = {"text": text}
+        else:
+            entry = {"diff": diff(buffer[2], text)}
+        entry["id"] = self.ids[owner]
+        if buffer is None or buffer[:2] != [path, newline]:
+            entry.update(path=path, newline=newline)
+        self.buffers[owner] = [path, newline, text]
+        self.appended += self._append(entry)
+        live_size = sum(len(buffer[2]) for buffer in self.buffers.values())
+        if self.appended > max(self.compact_size, live_size):
+            self.compact()
+
+    def forget(self, owner):
+        """
+        Record that the owner's buffer no longer has unsaved work (e.g. it
+        was saved or closed).
+        """
+        if self.buffers.pop(owner, None) is not None:
+            self._append({"id": self.ids.pop(owner), "forget": True})
+
+    def _append(self, entry):
+        """
+        Append the entry to the journal, returning the length of the line
+        written. The file is flushed so the entry survives Mu crashing, but
+        not fsynced since that would be too slow.
+        """
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+        line = json.dumps(entry) + "\n"
+        self.file.write(line)
+        self.file.flush()
+        return len(line)
+
+    def compact(self):
+        """
+        Replace the journal with just the current text of the buffers.
+        """
+        self.close()
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for owner, (path, newline, text) in self.buffers.items():
+                entry = {
+                    "id": self.ids[owner],
+                    "path": path,
+                    "newline": newline,
+                    "text": text,
+                }
+                f.write(json.dumps(entry) + "\n")
+        os.replace(temp_path, self.path)
+        self.appended = 0
+        logger.debug("Compacted journal {}".format(self.path))
+
+    def replay(self):
+        """
+        Return a list of the (path, newline, text) of the buffers with unsaved
+        work recorded in the journal, in the order they were first recorded.
+        A partly written last line (Mu may have crashed while writing it) is
+        ignored, as is anything that can't be made sense of. Since later
+        changes to the buffers it may have been for would be applied to the
+        wrong text, they're ignored too until a buffer's whole text is
+        recorded again, so an earlier version of it is recovered.
+        """
+        buffers = {}
+        broken = set()  # The ids of buffers whose changes can't be applied.
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as ex:
+            logger.error("Unable to read journal {}".format(self.path))
+            logger.error(ex)
+            return []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                buffer_id = entry["id"]
+                if not isinstance(buffer_id, int):
+                    raise TypeError("Invalid buffer id")
+            except (ValueError, KeyError, TypeError):
+                # Which buffer it was for isn't known, so it may be any.
+                logger.warning("Ignoring journal entry: {!r}".format(line))
+                broken.update(buffers)
+                continue
+            try:
+                if entry.get("forget"):
+                    buffers.pop(buffer_id, None)
+                    broken.discard(buffer_id)
+                    continue
+                buffer = buffers.setdefault(buffer_id, [None, None, None])
+                if "path" in entry:
+                    buffer[:2] = entry["path"], entry["newline"]
+                if "text" in entry:
+                    buffer[2] = entry["text"]
+                    broken.discard(buffer_id)
+                elif "diff" in entry and buffer_id not in broken:
+                    buffer[2] = patch(buffer[2], entry["diff"])
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Ignoring journal entry: {!r}".format(line))
+                broken.add(buffer_id)
+        for buffer_id in broken.intersection(buffers):
+            logger.warning(
+                "Recovering an earlier version of buffer {}".format(buffer_id)
+            )
+        return [
+            tuple(buffer)
+            for _, buffer in sorted(buffers.items())
+            if buffer[2] is not None
+        ]
+
+    def close(self):
+        """
+        Close the journal's file (it's reopened if anything else is
+        recorded).
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def clear(self):
+        """
+        Forget every buffer and remove the journal.
+        """
+        self.close()
+        self.ids = {}
+        self.buffers = {}
+        self.appended = 0
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -20,24 +20,29 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
 import sys
 import codecs
+import hashlib
 import io
 import re
 import json
 import logging
 import tempfile
+import time
 import platform
 import webbrowser
 import random
 import locale
+import queue
 import shutil
 import appdirs
 import site
 from PyQt5.QtWidgets import QMessageBox
-from PyQt5.QtCore import QLocale
+from PyQt5.QtCore import QLocale, QLockFile, QThread, QTimer, pyqtSignal
 from pyflakes.api import check
 from pycodestyle import StyleGuide, Checker
 from mu.resources import path
 from mu.debugger.utils import is_breakpoint_line
+from mu.mounts import mount_table, MOUNTINFO
+from mu.journal import Journal
 from mu import __version__
 
 
@@ -50,6 +55,11 @@ DATA_DIR = appdirs.user_data_dir(appname="mu", appauthor="python")
 # The directory containing user installed third party modules.
 MODULE_DIR = os.path.join(DATA_DIR, "site-packages")
 sys.path.append(MODULE_DIR)
+# The index of the names of the packages installed in MODULE_DIR.
+PACKAGE_INDEX = os.path.join(DATA_DIR, "packages.json")
+# How recently (in seconds) a directory can have been modified for its
+# modification time not to be trusted to change if it's modified again.
+MTIME_RESOLUTION = 2
 # The default directory for application logs.
 LOG_DIR = appdirs.user_log_dir(appname="mu", appauthor="python")
 # The path to the log file for the application.
@@ -71,6 +81,19 @@ EXPANDED_IMPORT = (
 )
 # Port number for debugger.
 DEBUGGER_PORT = 31415
+# Fsync every saved file before it replaces the original.
+FSYNC_ALWAYS = "always"
+# Fsync files saved to device volumes straight away, but files saved to local
+# disks together once there are no more saves waiting. Device volumes are only
+# known where the mount table is kept up to date (Linux, see Editor.setup), so
+# elsewhere this is the same as FSYNC_ALWAYS.
+FSYNC_BATCHED = "batched"
+# How long (in ms) after a change to an unsaved tab to record it in the
+# journal of unsaved work.
+JOURNAL_DELAY = 2000
+# How many instances of Mu running at once can each keep a journal of unsaved
+# work.
+MAX_JOURNALS = 10
 # Default images to copy over for use in PyGameZero demo apps.
 DEFAULT_IMAGES = [
     "alien.png",
@@ -184,37 +207,118 @@ ENCODING_COOKIE_RE = re.compile(
     "^[ \t\v]*#.*?coding[:=][ \t]*([-_.a-zA-Z0-9]+)"
 )
 
+# Files at least this big (in bytes) are loaded in the background.
+LARGE_FILE_SIZE = 1024 * 1024
+# How much of a file to read at a time when reporting progress.
+READ_CHUNK_SIZE = 256 * 1024
+
 logger = logging.getLogger(__name__)
 
 
+def stable_mtime(path):
+    """
+    Return the modification time (in ns) of the referenced path, or None if
+    it was modified too recently to be sure it'll be different if it's
+    modified again (some filesystems only record it to the nearest second or
+    two).
+    """
+    stat = os.stat(path)
+    if time.time() - stat.st_mtime < MTIME_RESOLUTION:
+        return None
+    return stat.st_mtime_ns
+
+
+def read_package_name(pkg):
+    """
+    Return the name of the package whose metadata is in the referenced
+    dist-info or egg-info directory, or None if it can't be read.
+    """
+    if pkg.endswith("dist-info"):
+        # Modern.
+        metadata_file = os.path.join(pkg, "METADATA")
+    else:
+        # Legacy (eggs).
+        metadata_file = os.path.join(pkg, "PKG-INFO")
+    try:
+        with open(metadata_file, "rb") as f:
+            lines = f.readlines()
+            name = lines[1].rsplit(b":")[-1].strip()
+            return name.decode("utf-8")
+    except Exception as ex:
+        # Just log any errors.
+        logger.error("Unable to get metadata for package: " + pkg)
+        logger.error(ex)
+    return None
+
+
+def load_package_index():
+    """
+    Return the index of installed packages saved by installed_packages, or
+    an empty index if there isn't one for MODULE_DIR.
+    """
+    try:
+        with open(PACKAGE_INDEX, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(index, dict) or index.get("module_dir") != MODULE_DIR:
+        return {}
+    return index
+
+
+def save_package_index(index):
+    """
+    Save the index of installed packages, logging any errors since it'll just
+    be rebuilt next time.
+    """
+    try:
+        with open(PACKAGE_INDEX, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+    except OSError as ex:
+        logger.error("Unable to save package index: " + PACKAGE_INDEX)
+        logger.error(ex)
+
+
 def installed_packages():
     """
     List all the third party modules installed by the user.
+
+    The names are kept in an index (see PACKAGE_INDEX) along with the
+    modification times of MODULE_DIR and each package's metadata directory.
+    If MODULE_DIR hasn't changed, the index is used as it is. Otherwise, only
+    the metadata of packages that have changed is read again.
     """
-    result = []
+    index = load_package_index()
+    try:
+        module_mtime = stable_mtime(MODULE_DIR)
+    except OSError:
+        module_mtime = None
+    old_packages = index.get("packages", {})
+    if module_mtime is not None and index.get("mtime") == module_mtime:
+        return sorted(package["name"] for package in old_packages.values())
     pkg_dirs = [
-        os.path.join(MODULE_DIR, d)
+        d
         for d in os.listdir(MODULE_DIR)
         if d.endswith("dist-info") or d.endswith("egg-info")
     ]
     logger.info("Packages found: {}".format(pkg_dirs))
-    for pkg in pkg_dirs:
-        if pkg.endswith("dist-info"):
-            # Modern.
-            metadata_file = os.path.join(pkg, "METADATA")
-        else:
-            # Legacy (eggs).
-            metadata_file = os.path.join(pkg, "PKG-INFO")
+    packages = {}
+    for pkg_dir in pkg_dirs:
+        pkg = os.path.join(MODULE_DIR, pkg_dir)
         try:
-            with open(metadata_file, "rb") as f:
-                lines = f.readlines()
-                name = lines[1].rsplit(b":")[-1].strip()
-                result.append(name.decode("utf-8"))
-        except Exception as ex:
-            # Just log any errors.
-            logger.error("Unable to get metadata for package: " + pkg)
-            logger.error(ex)
-    return sorted(result)
+            mtime = stable_mtime(pkg)
+        except OSError:
+            mtime = None
+        package = old_packages.get(pkg_dir)
+        if mtime is None or not package or package.get("mtime") != mtime:
+            name = read_package_name(pkg)
+            package = {"name": name, "mtime": mtime} if name else None
+        if package:
+            packages[pkg_dir] = package
+    save_package_index(
+        {"module_dir": MODULE_DIR, "mtime": module_mtime, "packages": packages}
+    )
+    return sorted(package["name"] for package in packages.values())
 
 
 def write_and_flush(fileobj, content):
@@ -234,11 +338,70 @@ def write_and_flush(fileobj, content):
     os.fsync(fileobj)
 
 
-def save_and_encode(text, filepath, newline=os.linesep):
+def content_hash(text):
+    """
+    Return a string identifying the given text, to tell if it's changed
+    without keeping a copy.
+    """
+    return hashlib.sha1(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def fsync_path(path):
+    """
+    Ensure the data already written to the file (or directory) at the
+    referenced path is, in fact, on the disk. Failures are logged since not
+    every platform or filesystem supports this.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY if os.path.isdir(path) else os.O_RDWR)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError as ex:
+        logger.warning("Unable to fsync {}: {}".format(path, ex))
+
+
+def write_atomically(filepath, data, fsync=True):
+    """
+    Write the bytes to a temporary file next to the referenced file, then
+    rename it over the file so a crash mid-write never leaves it half
+    written. Unless fsync is False, the data is flushed to the disk first.
+    """
+    # Replace the file a symlink points to, rather than the symlink.
+    filepath = os.path.realpath(filepath)
+    directory, name = os.path.split(filepath)
+    temp_path = os.path.join(directory, ".{}.mu-save".format(name))
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        with open(fd, "wb") as f:
+            if fsync:
+                write_and_flush(f, data)
+            else:
+                f.write(data)
+        try:
+            shutil.copymode(filepath, temp_path)
+        except OSError:
+            pass  # A new file, so keep the default permissions.
+        os.replace(temp_path, filepath)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    if fsync and os.name == "posix":
+        # Ensure the rename is on the disk too.
+        fsync_path(directory)
+
+
+def save_and_encode(text, filepath, newline=os.linesep, fsync=True):
     """
     Detect the presence of an encoding cookie and use that encoding; if
     none is present, do not add one and use the Mu default encoding.
     If the codec is invalid, log a warning and fall back to the default.
+
+    The file is replaced atomically, see write_atomically.
     """
     match = ENCODING_COOKIE_RE.match(text)
     if match:
@@ -251,11 +414,11 @@ def save_and_encode(text, filepath, newline=os.linesep):
     else:
         encoding = ENCODING
 
-    with open(filepath, "w", encoding=encoding, newline="") as f:
-        text_to_write = (
-            newline.join(l.rstrip(" ") for l in text.splitlines()) + newline
-        )
-        write_and_flush(f, text_to_write)
+    text_to_write = (
+        newline.join(l.rstrip(" ") for l in text.splitlines()) + newline
+    )
+    # Encode first, so a file which can't be encoded is left alone.
+    write_atomically(filepath, text_to_write.encode(encoding), fsync)
 
 
 def sniff_encoding(filepath):
@@ -265,6 +428,17 @@ def sniff_encoding(filepath):
     * If there is a PEP 263 encoding cookie, return the appropriate encoding
     * Otherwise return None for read_and_decode to attempt several defaults
     """
+    with open(filepath, "rb") as f:
+        line = f.readline()
+    return sniff_encoding_of(line)
+
+
+def sniff_encoding_of(data):
+    """
+    Determine the encoding of the given bytes from their first line, as for
+    sniff_encoding, so a file already read into memory needn't be opened
+    again.
+    """
     boms = [
         (codecs.BOM_UTF8, "utf-8-sig"),
         (codecs.BOM_UTF16_BE, "utf-16"),
@@ -273,15 +447,15 @@ def sniff_encoding(filepath):
     #
     # Try for a BOM
     #
-    with open(filepath, "rb") as f:
-        line = f.readline()
     for bom, encoding in boms:
-        if line.startswith(bom):
+        if data.startswith(bom):
             return encoding
 
     #
     # Look for a PEP 263 encoding cookie
     #
+    end_of_line = data.find(b"\n")
+    line = data if end_of_line < 0 else data[: end_of_line + 1]
     default_encoding = locale.getpreferredencoding()
     try:
         uline = line.decode(default_encoding)
@@ -301,6 +475,32 @@ def sniff_encoding(filepath):
     return None
 
 
+def count_newlines(text):
+    """
+    Return the number of Windows (U+000D U+000A) and Posix (a lone U+000A)
+    newlines in the text.
+    """
+    windows = text.count("\r\n")
+    return windows, text.count("\n") - windows
+
+
+def majority_newline(windows, posix):
+    """
+    Return the newline convention used the most, given the number of Windows
+    and Posix newlines found.
+    """
+    #
+    # If no lines are present, default to the platform newline
+    # If there's a tie, use the platform default
+    #
+    conventions_found = [
+        (0, 1, os.linesep),
+        (windows, os.linesep == "\r\n", "\r\n"),
+        (posix, os.linesep == "\n", "\n"),
+    ]
+    return max(conventions_found)[-1]
+
+
 def sniff_newline_convention(text):
     """Determine which line-ending convention predominates in the text.
 
@@ -309,32 +509,61 @@ def sniff_newline_convention(text):
     But editors can produce either convention from either platform. And
     a file which has been copied and edited around might even have both!
     """
-    candidates = [
-        ("\r\n", "\r\n"),
-        # Match \n at the start of the string
-        # or \n preceded by any character other than \r
-        ("\n", "^\n|[^\r]\n"),
-    ]
-    #
-    # If no lines are present, default to the platform newline
-    # If there's a tie, use the platform default
-    #
-    conventions_found = [(0, 1, os.linesep)]
-    for candidate, pattern in candidates:
-        instances = re.findall(pattern, text)
-        convention = (len(instances), candidate == os.linesep, candidate)
-        conventions_found.append(convention)
-    majority_convention = max(conventions_found)
-    return majority_convention[-1]
+    return majority_newline(*count_newlines(text))
 
 
-def read_and_decode(filepath):
+def file_key(path):
+    """
+    Return a key identifying the file at the referenced path whatever path
+    it's reached by (its device and inode numbers), or None if there's no
+    such file.
     """
-    Read the contents of a file,
+    try:
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def read_bytes(f, progress=None):
     """
-    sniffed_encoding = sniff_encoding(filepath)
+    Read the rest of the open binary file f into a single buffer.
+
+    If given, progress is called with the percentage of the file read so far
+    as it's read in chunks straight into the buffer.
+    """
+    if not progress:
+        return f.read()
+    size = os.fstat(f.fileno()).st_size
+    data = bytearray(size)
+    with memoryview(data) as view:
+        read = 0
+        while read < size:
+            count = f.readinto(view[read : read + READ_CHUNK_SIZE])
+            if not count:
+                break
+            read += count
+            progress(read * 100 // size)
+    del data[read:]
+    # The file may have grown since its size was checked.
+    data += f.read()
+    return data
+
+
+def read_and_decode(filepath, progress=None):
+    """
+    Read the contents of a file, returning its text and newline convention.
+
+    The file is read once: the encoding is sniffed from the bytes read and
+    the newlines are counted and converted in the decoded text.
+
+    If given, progress is called with the percentage of the file read so far.
+    """
+    with open(filepath, "rb") as f:
+        btext = read_bytes(f, progress)
+    sniffed_encoding = sniff_encoding_of(btext)
     #
-    # If sniff_encoding has found enough clues to indicate an encoding,
+    # If sniff_encoding_of has found enough clues to indicate an encoding,
     # use that. Otherwise try a series of defaults before giving up.
     #
     if sniffed_encoding:
@@ -343,8 +572,6 @@ def read_and_decode(filepath):
     else:
         candidate_encodings = [ENCODING, locale.getpreferredencoding()]
 
-    with open(filepath, "rb") as f:
-        btext = f.read()
     for encoding in candidate_encodings:
         logger.debug("Trying to decode with %s", encoding)
         try:
@@ -354,16 +581,20 @@ def read_and_decode(filepath):
         except UnicodeDecodeError:
             continue
     else:
-        raise UnicodeDecodeError(encoding, btext, 0, 0, "Unable to decode")
+        raise UnicodeDecodeError(
+            encoding, bytes(btext), 0, 0, "Unable to decode"
+        )
 
     #
     # Sniff and convert newlines here so that, by the time
     # the text reaches the editor it is ready to use. Then
     # convert everything to the Mu internal newline character
     #
-    newline = sniff_newline_convention(text)
+    windows, posix = count_newlines(text)
+    newline = majority_newline(windows, posix)
     logger.debug("Detected newline %r", newline)
-    text = re.sub("\r\n", NEWLINE, text)
+    if windows:
+        text = text.replace("\r\n", NEWLINE)
     return text, newline
 
 
@@ -396,6 +627,17 @@ def get_admin_file_path(filename):
     return file_path
 
 
+def get_journal_path(slot=0):
+    """
+    The journal records unsaved work, so it can be recovered if Mu doesn't
+    exit cleanly. It's kept next to the session file. Each instance of Mu
+    running at once keeps its own journal, in the referenced slot (see
+    Editor.lock_journal).
+    """
+    name = "journal-{}.jsonl".format(slot) if slot else "journal.jsonl"
+    return os.path.join(os.path.dirname(get_session_path()), name)
+
+
 def get_session_path():
     """
     The session file stores details about the state of Mu from the user's
@@ -426,6 +668,27 @@ def get_settings_path():
     return get_admin_file_path("settings.json")
 
 
+def get_log_level():
+    """
+    Return the level of the messages to log. The default is to log everything
+    but an administrator can change this via the "log_level" key in the
+    settings file (e.g. "INFO" or "WARNING"), so Mu doesn't spend time
+    formatting and writing debug messages nobody will read.
+    """
+    settings = {}
+    try:
+        with open(get_settings_path(), encoding="utf-8") as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if not isinstance(settings, dict):
+        settings = {}
+    level = logging.getLevelName(str(settings.get("log_level", "")).upper())
+    if isinstance(level, int):
+        return level
+    return logging.DEBUG
+
+
 def extract_envars(raw):
     """
     Returns a list of environment variables given a string containing
@@ -635,6 +898,156 @@ class REPL:
         logger.info("Created new REPL object with port: {}".format(self.port))
 
 
+class FileLoader(QThread):
+    """
+    Used to read a file in a non-blocking manner.
+    """
+
+    # Emitted with the path of the file and the percentage of it read.
+    progress = pyqtSignal(str, int)
+    # Emitted with the path of the file and the result of the read function.
+    loaded = pyqtSignal(str, object)
+    # Emitted with the path of the file and the exception raised reading it.
+    failed = pyqtSignal(str, object)
+
+    def __init__(self, path, read):
+        """
+        The read function is called with the path and a function to which
+        it should report progress.
+        """
+        super().__init__()
+        self.path = path
+        self.read = read
+
+    def run(self):
+        """
+        Read the file.
+        """
+        try:
+            result = self.read(self.path, self.report_progress)
+        except Exception as ex:
+            self.failed.emit(self.path, ex)
+        else:
+            self.loaded.emit(self.path, result)
+
+    def report_progress(self, percent):
+        """
+        Signal how much of the file has been read.
+        """
+        self.progress.emit(self.path, percent)
+
+
+class FileSaver(QThread):
+    """
+    Used to save files in a non-blocking manner, one after another, so a
+    slow disk or device volume never stalls the editor.
+    """
+
+    # Emitted with the path of the file and the context it was saved with.
+    saved = pyqtSignal(str, object)
+    # Emitted with the path of the file, the context it was saved with and
+    # the exception raised saving it.
+    failed = pyqtSignal(str, object, object)
+
+    def __init__(self, fsync_policy=FSYNC_BATCHED):
+        super().__init__()
+        self.fsync_policy = fsync_policy
+        self.jobs = queue.Queue()
+        self.unsynced = set()  # Paths saved without being fsynced.
+
+    def save(self, path, text, newline, context=None, wait=False):
+        """
+        Queue the text to be saved to the file at path with the given newline
+        convention. The context is passed back with the signal emitted once
+        it's saved.
+
+        If asked to wait, the file is saved straight away (once any saves
+        already queued are done) rather than in the background.
+        """
+        fsync = self.needs_fsync(path)
+        if wait:
+            self.flush()
+            self.write(path, text, newline, context, fsync)
+            self.sync()
+        else:
+            self.jobs.put((path, text, newline, context, fsync))
+            if not self.isRunning():
+                self.start()
+
+    def flush(self):
+        """
+        Wait for the saves already queued to be done.
+        """
+        self.jobs.join()
+
+    def stop(self):
+        """
+        Finish the saves already queued, then stop the thread.
+        """
+        if self.isRunning():
+            self.jobs.put(None)
+            self.wait()
+
+    def run(self):
+        """
+        Save the files queued, fsyncing the batch of files saved to local
+        disks whenever there are no more saves waiting.
+        """
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    self.sync()
+                    return
+                self.write(*job)
+                if self.jobs.empty():
+                    self.sync()
+            finally:
+                self.jobs.task_done()
+
+    def needs_fsync(self, path):
+        """
+        Return a boolean to indicate if the file should be fsynced as soon as
+        it's written. Device volumes (whose users are apt to unplug them) are
+        always fsynced, as is everything if it's unknown which are device
+        volumes: i.e. unless the mount table is being kept up to date, which
+        is only on Linux.
+
+        This is called when the save is queued, so the mount table is only
+        used from the thread that owns it.
+        """
+        if self.fsync_policy == FSYNC_ALWAYS or not mount_table.watching:
+            return True
+        return mount_table.on_volume(os.path.abspath(path))
+
+    def write(self, path, text, newline, context, fsync):
+        """
+        Save the text to the file, fsyncing it straight away if asked to, and
+        signal the outcome.
+        """
+        try:
+            save_and_encode(text, path, newline, fsync)
+        except (OSError, UnicodeEncodeError) as ex:
+            self.failed.emit(path, context, ex)
+        else:
+            if not fsync:
+                self.unsynced.add(os.path.realpath(path))
+            self.saved.emit(path, context)
+
+    def sync(self):
+        """
+        Fsync the files saved without being fsynced, and their directories.
+        """
+        paths, self.unsynced = self.unsynced, set()
+        directories = set()
+        for filepath in paths:
+            fsync_path(filepath)
+            directories.add(os.path.dirname(filepath))
+        if os.name == "posix":
+            for directory in directories:
+                fsync_path(directory)
+
+
 class Editor:
     """
     Application logic for the editor itself.
@@ -649,7 +1062,21 @@ class Editor:
         self.mode = "python"
         self.modes = {}  # See set_modes.
         self.envars = []  # See restore session and show_admin
+        self.loaders = {}  # Path -> FileLoader for big files being loaded.
+        self.open_files = {}  # File key -> tab, see _find_open_tab.
+        self.tab_files = {}  # Tab -> (path, file key) it was indexed with.
+        self.saver = FileSaver()  # Saves files in the background.
+        self.saver.saved.connect(self._save_finished)
+        self.saver.failed.connect(self._save_failed)
+        self.journal = None  # Unsaved work, see restore_session.
+        self.journal_lock = None  # Keeps other instances off the journal.
+        self.journal_pending = set()  # Tabs changed since last journalled.
+        self.journal_timer = QTimer()
+        self.journal_timer.setSingleShot(True)
+        self.journal_timer.setInterval(JOURNAL_DELAY)
+        self.journal_timer.timeout.connect(self.update_journal)
         self.minify = False
+        self.flash_on_save = False
         self.microbit_runtime = ""
         self.connected_devices = set()
         self.find = ""
@@ -675,6 +1102,9 @@ class Editor:
             # Open the file
             self.direct_load(file)
 
+        view.load_placeholder.connect(self.load_placeholder)
+        view.text_changed.connect(self.tab_changed)
+
     def setup(self, modes):
         """
         Define the available modes and ensure there's a default working
@@ -722,9 +1152,23 @@ class Editor:
             logger.debug("Creating directory: {}".format(static_path))
             shutil.copytree(path("static", "web/"), static_path)
             # Copy all the static directories.
+        # Ensure the MicroPython helper for binary plotter telemetry is
+        # available to copy onto devices.
+        telemetry_path = os.path.join(wd, "mu_telemetry.py")
+        if not os.path.exists(telemetry_path):
+            logger.debug("Creating file: {}".format(telemetry_path))
+            shutil.copy(
+                path("mu_telemetry.py", "micropython/"), telemetry_path
+            )
         # Start the timer to poll every second for an attached or removed
         # USB device.
         self._view.set_usb_checker(1, self.check_usb)
+        # Keep the table of volumes mounted by attached devices up to date,
+        # where it's cheap to do so. Elsewhere (e.g. OSX) the table would be
+        # read by running the mount command, so it's only refreshed when a
+        # device is looked for.
+        if os.path.exists(MOUNTINFO):
+            mount_table.start()
 
     def restore_session(self, paths=None):
         """
@@ -762,12 +1206,22 @@ class Editor:
                 if "paths" in old_session:
                     old_paths = self._abspath(old_session["paths"])
                     launch_paths = self._abspath(paths) if paths else set()
+                    placeholder = None
                     for old_path in old_paths:
                         # if the os passed in a file, defer loading it now
                         if old_path in launch_paths:
                             continue
-                        self.direct_load(old_path)
-                    logger.info("Loaded files.")
+                        # Files are only loaded when their tab is shown.
+                        if os.path.isfile(old_path):
+                            placeholder = self._view.add_placeholder(old_path)
+                        else:
+                            logger.info(
+                                "The file {} does not exist.".format(old_path)
+                            )
+                    if placeholder:
+                        # Show the last tab, as if they'd all been loaded.
+                        self._view.focus_tab(placeholder)
+                    logger.info("Restored tabs.")
                 if "envars" in old_session:
                     self.envars = old_session["envars"]
                     logger.info(
@@ -780,6 +1234,23 @@ class Editor:
                         "Minify scripts on micro:bit? "
                         "{}".format(self.minify)
                     )
+                if "flash_on_save" in old_session:
+                    self.flash_on_save = old_session["flash_on_save"]
+                    logger.info(
+                        "Flash micro:bit when saved? "
+                        "{}".format(self.flash_on_save)
+                    )
+                fsync_policy = old_session.get("fsync_policy")
+                if fsync_policy in (FSYNC_ALWAYS, FSYNC_BATCHED):
+                    self.saver.fsync_policy = fsync_policy
+                    logger.info(
+                        "Fsync policy for saved files: "
+                        "{}".format(self.saver.fsync_policy)
+                    )
+                elif fsync_policy is not None:
+                    logger.warning(
+                        "Unknown fsync policy: {!r}".format(fsync_policy)
+                    )
                 if "microbit_runtime" in old_session:
                     self.microbit_runtime = old_session["microbit_runtime"]
                     if self.microbit_runtime:
@@ -799,6 +1270,7 @@ class Editor:
                     self._view.set_zoom()
                 old_window = old_session.get("window", {})
                 self._view.size_window(**old_window)
+        self.recover_unsaved()
         # handle os passed file last,
         # so it will not be focused over by another tab
         if paths and len(paths) > 0:
@@ -814,6 +1286,82 @@ class Editor:
             tab.setCursorPosition(len(py.split(NEWLINE)), 0)
             logger.info("Starting with blank file.")
 
+    def lock_journal(self):
+        """
+        Lock the first journal no other running instance of Mu is using and
+        return its path, or None if they're all in use. Any unsaved work in
+        it was left by an instance that didn't exit cleanly.
+        """
+        for slot in range(MAX_JOURNALS):
+            journal_path = get_journal_path(slot)
+            lock = QLockFile(journal_path + ".lock")
+            # The lock is held for as long as Mu runs, so it's only stale
+            # once the instance holding it has exited.
+            lock.setStaleLockTime(0)
+            if lock.tryLock(0):
+                self.journal_lock = lock
+                return journal_path
+        return None
+
+    def recover_unsaved(self):
+        """
+        Reopen, as modified tabs, any unsaved work recorded in the journal
+        (i.e. if Mu didn't exit cleanly last time), then start a new journal.
+        The journals of other instances of Mu still running are left alone.
+        """
+        journal_path = self.lock_journal()
+        if journal_path is None:
+            logger.warning("Unable to journal unsaved work: all in use.")
+            return
+        self.journal = Journal(journal_path)
+        recovered = self.journal.replay()
+        self.journal.clear()
+        for file_path, newline, text in recovered:
+            logger.info("Recovering unsaved work in: {}".format(file_path))
+            api = self.modes[self.mode].api()
+            tab = self._find_open_tab(file_path) if file_path else None
+            if tab is None:
+                tab = self._view.add_tab(file_path, text, api, newline)
+            elif self._view.is_placeholder(tab):
+                tab = self._view.replace_placeholder(
+                    tab, file_path, text, api, newline
+                )
+            else:
+                # The restored tab already shown has been loaded.
+                tab.setText(text)
+                tab.newline = newline
+            # The text isn't what was last saved.
+            tab.saved_hash = None
+            tab.setModified(True)
+            self.journal.record(tab, file_path, newline, text)
+        if recovered:
+            self.show_status_message(_("Recovered unsaved work."))
+
+    def tab_changed(self, tab):
+        """
+        Called when the text in a tab changes, to record it in the journal of
+        unsaved work once typing pauses (or after JOURNAL_DELAY at most).
+        """
+        self.journal_pending.add(tab)
+        if not self.journal_timer.isActive():
+            self.journal_timer.start()
+
+    def update_journal(self):
+        """
+        Record the changes to unsaved tabs in the journal, and forget tabs
+        that have since been saved or closed.
+        """
+        if self.journal is None:
+            return
+        tabs = self._view.widgets
+        pending, self.journal_pending = self.journal_pending, set()
+        for tab in pending.union(self.journal.owners):
+            if tab in tabs and tab.isModified():
+                if tab in pending:
+                    self.journal.record(tab, tab.path, tab.newline, tab.text())
+            else:
+                self.journal.forget(tab)
+
     def toggle_theme(self):
         """
         Switches between themes (night, day or high-contrast).
@@ -845,111 +1393,232 @@ class Editor:
 
         This method will work its way around duplicate paths and also attempt
         to cleanly handle / report / log errors when encountered in a helpful
-        manner.
+        manner. Big files are read in the background by a FileLoader, with the
+        tab added once they've been read.
         """
         logger.info("Loading script from: {}".format(path))
-        error = _(
-            "The file contains characters Mu expects to be encoded as "
-            "{0} or as the computer's default encoding {1}, but which "
-            "are encoded in some other way.\n\nIf this file was saved "
-            "in another application, re-save the file via the "
-            "'Save as' option and set the encoding to {0}"
-        )
-        error = error.format(ENCODING, locale.getpreferredencoding())
         # Does the file even exist?
         if not os.path.isfile(path):
             logger.info("The file {} does not exist.".format(path))
             return
         # see if file is open first
-        for widget in self._view.widgets:
-            if widget.path is None:  # this widget is an unsaved buffer
-                continue
-            # The widget could be for a file on a MicroPython device that
-            # has since been unplugged. We should ignore it and assume that
-            # folks understand this file is no longer available (there's
-            # nothing else we can do).
-            if not os.path.isfile(widget.path):
-                logger.info(
-                    "The file {} no longer exists.".format(widget.path)
-                )
-                continue
-            # Check for duplication of open file.
-            if os.path.samefile(path, widget.path):
-                logger.info("Script already open.")
-                msg = _('The file "{}" is already open.')
-                self._view.show_message(msg.format(os.path.basename(path)))
-                self._view.focus_tab(widget)
-                return
-        name, text, newline, file_mode = None, None, None, None
+        widget = self._find_open_tab(path)
+        if widget:
+            logger.info("Script already open.")
+            msg = _('The file "{}" is already open.')
+            self._view.show_message(msg.format(os.path.basename(path)))
+            self._view.focus_tab(widget)
+            return
+        if path in self.loaders:
+            logger.info("Script already loading.")
+            return
         try:
-            if path.lower().endswith(".py"):
-                # Open the file, read the textual content and set the name as
-                # the path to the file.
-                try:
-                    text, newline = read_and_decode(path)
-                except UnicodeDecodeError:
-                    message = _("Mu cannot read the characters in {}")
-                    filename = os.path.basename(path)
-                    self._view.show_message(message.format(filename), error)
-                    return
-                name = path
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if size < LARGE_FILE_SIZE:
+            try:
+                result = self._read(path)
+            except (OSError, UnicodeDecodeError) as ex:
+                self._load_failed(path, ex)
             else:
-                # Delegate the open operation to the Mu modes. Leave the name
-                # as None if handling a hex file, thus forcing the user to work
-                # out what to name the recovered script.
-                for mode_name, mode in self.modes.items():
-                    try:
-                        text, newline = mode.open_file(path)
-                        if not path.endswith(".hex"):
-                            name = path
-                    except Exception as exc:
-                        # No worries, log it and try the next mode
-                        logger.warning(
-                            "Error when mode {} try to open the "
-                            "{} file.".format(mode_name, path),
-                            exc_info=exc,
-                        )
-                    else:
-                        if text:
-                            file_mode = mode_name
-                            break
-                else:
-                    message = _("Mu was not able to open this file")
-                    info = _(
-                        "Currently Mu only works with Python source "
-                        "files or hex files created with embedded "
-                        "MicroPython code."
+                self._load_finished(path, result)
+            return
+        # Read big files in the background so Mu stays responsive.
+        loader = FileLoader(path, self._read)
+        loader.progress.connect(self._load_progress)
+        loader.loaded.connect(self._load_finished)
+        loader.failed.connect(self._load_failed)
+        loader.finished.connect(lambda: self.loaders.pop(path, None))
+        self.loaders[path] = loader
+        loader.start()
+
+    def load_placeholder(self, placeholder):
+        """
+        Called when the tab for a file restored from the last session is first
+        shown, to load the file into an editor in place of the placeholder.
+        """
+        path = placeholder.path
+        logger.info("Loading restored script from: {}".format(path))
+        try:
+            name, text, newline, file_mode = self._read(path)
+        except (OSError, UnicodeDecodeError) as ex:
+            self._view.remove_placeholder(placeholder)
+            self._load_failed(path, ex)
+            return
+        if not path.lower().endswith(".py") and file_mode is None:
+            self._view.remove_placeholder(placeholder)
+            logger.info("No mode could open {}.".format(path))
+            return
+        self._view.replace_placeholder(
+            placeholder, name, text, self.modes[self.mode].api(), newline
+        )
+
+    def _index_tab(self, tab):
+        """
+        Add the file the referenced tab is for to the index of open files.
+        """
+        self._forget_tab(tab)
+        key = file_key(tab.path) if tab.path else None
+        if tab.path and key is None:
+            # The tab could be for a file on a MicroPython device that has
+            # since been unplugged. We should ignore it and assume that folks
+            # understand this file is no longer available (there's nothing
+            # else we can do).
+            logger.info("The file {} no longer exists.".format(tab.path))
+        self.tab_files[tab] = (tab.path, key)
+        if key:
+            self.open_files[key] = tab
+
+    def _forget_tab(self, tab):
+        """
+        Remove the referenced tab from the index of open files.
+        """
+        path, key = self.tab_files.pop(tab, (None, None))
+        if key and self.open_files.get(key) is tab:
+            del self.open_files[key]
+
+    def _find_open_tab(self, path):
+        """
+        Return the tab in which the file at the referenced path is open, by
+        whatever path, or None if it isn't open.
+
+        The index of open files is first brought up to date with the tabs:
+        closed tabs are forgotten and the files of tabs not seen before, or
+        whose path has changed, are looked up. So usually, only the file at
+        path needs looking up. If it isn't found, the files of any tabs for
+        the same path are looked up again in case they've been replaced.
+        """
+        tabs = self._view.widgets
+        for tab in set(self.tab_files).difference(tabs):
+            self._forget_tab(tab)
+        for tab in tabs:
+            if tab not in self.tab_files or self.tab_files[tab][0] != tab.path:
+                self._index_tab(tab)
+        key = file_key(path)
+        if not key:
+            return None
+        tab = self.open_files.get(key)
+        if tab:
+            if file_key(tab.path) == key:
+                return tab
+            # The tab's file was replaced, and another now has its old key.
+            self._index_tab(tab)
+        # The file may have been replaced since its tab was indexed (e.g. by a
+        # git checkout or another editor saving it), so it has a new key. Look
+        # up the files of the tabs for the same path again.
+        normalised_path = os.path.normcase(os.path.abspath(path))
+        for tab in tabs:
+            if (
+                tab.path
+                and os.path.normcase(os.path.abspath(tab.path))
+                == normalised_path
+            ):
+                self._index_tab(tab)
+        return self.open_files.get(key)
+
+    def _read(self, path, progress=None):
+        """
+        Read the file at the referenced path, returning a tuple of the name
+        for its tab, its text and newline convention and the name of the mode
+        that decoded it (if it's not a Python file). If no mode can decode
+        it, the text is None.
+
+        If given, progress is called with the percentage of a Python file
+        read so far.
+
+        This may be called from a FileLoader thread, so must not touch the
+        user interface.
+        """
+        name, text, newline, file_mode = None, None, None, None
+        if path.lower().endswith(".py"):
+            # Open the file, read the textual content and set the name as
+            # the path to the file.
+            text, newline = read_and_decode(path, progress)
+            name = path
+        else:
+            # Delegate the open operation to the Mu modes. Leave the name
+            # as None if handling a hex file, thus forcing the user to work
+            # out what to name the recovered script.
+            for mode_name, mode in self.modes.items():
+                try:
+                    text, newline = mode.open_file(path)
+                    if not path.endswith(".hex"):
+                        name = path
+                except Exception as exc:
+                    # No worries, log it and try the next mode
+                    logger.warning(
+                        "Error when mode {} try to open the "
+                        "{} file.".format(mode_name, path),
+                        exc_info=exc,
                     )
-                    self._view.show_message(message, info)
-                    return
-        except OSError:
-            message = _("Could not load {}").format(path)
-            logger.exception("Could not load {}".format(path))
+                else:
+                    if text:
+                        file_mode = mode_name
+                        break
+        return name, text, newline, file_mode
+
+    def _load_progress(self, path, percent):
+        """
+        Show how much of a big file has been loaded.
+        """
+        message = _("Loading {}: {}%").format(os.path.basename(path), percent)
+        self.show_status_message(message)
+
+    def _load_failed(self, path, ex):
+        """
+        Tell the user why the referenced file couldn't be loaded.
+        """
+        if isinstance(ex, UnicodeDecodeError):
+            error = _(
+                "The file contains characters Mu expects to be encoded as "
+                "{0} or as the computer's default encoding {1}, but which "
+                "are encoded in some other way.\n\nIf this file was saved "
+                "in another application, re-save the file via the "
+                "'Save as' option and set the encoding to {0}"
+            )
+            error = error.format(ENCODING, locale.getpreferredencoding())
+            message = _("Mu cannot read the characters in {}")
+            filename = os.path.basename(path)
+            self._view.show_message(message.format(filename), error)
+            return
+        message = _("Could not load {}").format(path)
+        logger.error("Could not load {}".format(path), exc_info=ex)
+        info = _(
+            "Does this file exist?\nIf it does, do you have "
+            "permission to read it?\n\nPlease check and try again."
+        )
+        self._view.show_message(message, info)
+
+    def _load_finished(self, path, result):
+        """
+        Add a tab for the file read from the referenced path, given the
+        result of reading it (see _read).
+        """
+        name, text, newline, file_mode = result
+        if not path.lower().endswith(".py") and file_mode is None:
+            message = _("Mu was not able to open this file")
             info = _(
-                "Does this file exist?\nIf it does, do you have "
-                "permission to read it?\n\nPlease check and try again."
+                "Currently Mu only works with Python source "
+                "files or hex files created with embedded "
+                "MicroPython code."
             )
             self._view.show_message(message, info)
-        else:
-            if file_mode and self.mode != file_mode:
-                device_name = self.modes[file_mode].name
-                message = _("Is this a {} file?").format(device_name)
-                info = _(
-                    "It looks like this could be a {} file.\n\n"
-                    "Would you like to change Mu to the {}"
-                    "mode?"
-                ).format(device_name, device_name)
-                if (
-                    self._view.show_confirmation(
-                        message, info, icon="Question"
-                    )
-                    == QMessageBox.Ok
-                ):
-                    self.change_mode(file_mode)
-            logger.debug(text)
-            self._view.add_tab(
-                name, text, self.modes[self.mode].api(), newline
-            )
+            return
+        if file_mode and self.mode != file_mode:
+            device_name = self.modes[file_mode].name
+            message = _("Is this a {} file?").format(device_name)
+            info = _(
+                "It looks like this could be a {} file.\n\n"
+                "Would you like to change Mu to the {}"
+                "mode?"
+            ).format(device_name, device_name)
+            if (
+                self._view.show_confirmation(message, info, icon="Question")
+                == QMessageBox.Ok
+            ):
+                self.change_mode(file_mode)
+        self._view.add_tab(name, text, self.modes[self.mode].api(), newline)
 
     def get_dialog_directory(self, default=None):
         """
@@ -1035,39 +1704,70 @@ class Editor:
                     result.append(abspath)
         return result
 
-    def save_tab_to_file(self, tab, show_error_messages=True):
+    def save_tab_to_file(self, tab, show_error_messages=True, wait=False):
         """
         Given a tab, will attempt to save the script in the tab to the path
         associated with the tab. If there's a problem this will be logged and
         reported and the tab status will continue to show as Modified.
+
+        The file is saved in the background unless asked to wait for it to
+        be saved (e.g. before it's run).
         """
         logger.info("Saving script to: {}".format(tab.path))
-        logger.debug(tab.text())
-        try:
-            save_and_encode(tab.text(), tab.path, tab.newline)
-        except OSError as e:
-            logger.error(e)
-            error_message = _("Could not save file (disk problem)")
-            information = _(
-                "Error saving file to disk. Ensure you have "
-                "permission to write the file and "
-                "sufficient disk space."
-            )
-        except UnicodeEncodeError:
+        text = tab.text()
+        logger.debug(text)
+        self.saver.save(
+            tab.path,
+            text,
+            tab.newline,
+            (tab, text, show_error_messages),
+            wait=wait,
+        )
+
+    def _save_finished(self, path, context):
+        """
+        Called once the text of a tab has been saved to the file at path.
+        """
+        tab, text, show_error_messages = context
+        if tab not in self._view.widgets:
+            return  # The tab was closed while it was being saved.
+        # Saving replaced the file.
+        self._index_tab(tab)
+        tab.saved_hash = content_hash(text)
+        # Only mark the tab as unmodified if nothing was typed meanwhile.
+        if tab.text() == text:
+            tab.setModified(False)
+        # So the journal forgets the work that's no longer unsaved.
+        self.tab_changed(tab)
+        self.show_status_message(_("Saved file: {}").format(path))
+
+    def _save_failed(self, path, context, ex):
+        """
+        Called if the text of a tab couldn't be saved to the file at path.
+        """
+        tab, text, show_error_messages = context
+        if isinstance(ex, UnicodeEncodeError):
             error_message = _("Could not save file (encoding problem)")
-            logger.exception(error_message)
+            logger.error(error_message)
+            logger.error(ex)
             information = _(
                 "Unable to convert all the characters. If you "
                 "have an encoding line at the top of the file, "
                 "remove it and try again."
             )
         else:
-            error_message = information = None
-        if error_message and show_error_messages:
+            logger.error(ex)
+            error_message = _("Could not save file (disk problem)")
+            information = _(
+                "Error saving file to disk. Ensure you have "
+                "permission to write the file and "
+                "sufficient disk space."
+            )
+        if show_error_messages:
             self._view.show_message(error_message, information)
-        else:
+        elif tab in self._view.widgets:
             tab.setModified(False)
-            self.show_status_message(_("Saved file: {}").format(tab.path))
+            self.show_status_message(_("Saved file: {}").format(path))
 
     def check_for_shadow_module(self, path):
         """
@@ -1111,6 +1811,7 @@ class Editor:
         if tab.path:
             # The user specified a path to a file.
             self.save_tab_to_file(tab)
+            self.modes[self.mode].tab_saved(tab)
         else:
             # The user cancelled the filename selection.
             tab.path = None
@@ -1224,12 +1925,21 @@ class Editor:
         # Make sure the mode's stop method is called so
         # everything is cleaned up.
         self.modes[self.mode].stop()
+        # Finish any saves still in progress.
+        self.saver.stop()
+        # Any unsaved work has been abandoned.
+        if self.journal:
+            self.journal.clear()
+        if self.journal_lock:
+            self.journal_lock.unlock()
         session = {
             "theme": self.theme,
             "mode": self.mode,
             "paths": paths,
             "envars": self.envars,
             "minify": self.minify,
+            "flash_on_save": self.flash_on_save,
+            "fsync_policy": self.saver.fsync_policy,
             "microbit_runtime": self.microbit_runtime,
             "zoom_level": self._view.zoom_position,
             "window": {
@@ -1272,16 +1982,17 @@ class Editor:
         settings = {
             "envars": envars,
             "minify": self.minify,
+            "flash_on_save": self.flash_on_save,
             "microbit_runtime": self.microbit_runtime,
         }
         packages = installed_packages()
-        with open(LOG_FILE, "r", encoding="utf8") as logfile:
-            new_settings = self._view.show_admin(
-                logfile.read(), settings, "\n".join(packages)
-            )
+        new_settings = self._view.show_admin(
+            LOG_FILE, settings, "\n".join(packages)
+        )
         if new_settings:
             self.envars = extract_envars(new_settings["envars"])
             self.minify = new_settings["minify"]
+            self.flash_on_save = new_settings["flash_on_save"]
             runtime = new_settings["microbit_runtime"].strip()
             if runtime and not os.path.isfile(runtime):
                 self.microbit_runtime = ""
@@ -1323,6 +2034,14 @@ class Editor:
             logger.info("To remove: {}".format(to_remove))
             logger.info("Site packages: {}".format(MODULE_DIR))
             self._view.sync_packages(to_remove, to_add, MODULE_DIR)
+            # Bring the index of installed packages up to date, rather than
+            # the next time the admin dialog is opened. This waits until
+            # pip's changes are old enough for their modification times to
+            # be relied on (see stable_mtime), otherwise they'd be read again
+            # anyway.
+            QTimer.singleShot(
+                (MTIME_RESOLUTION + 1) * 1000, installed_packages
+            )
 
     def select_mode(self, event=None):
         """
@@ -1401,11 +2120,16 @@ class Editor:
     def autosave(self):
         """
         Cycles through each tab and, if changed, saves it to the filesystem.
+        Tabs whose text is the same as when they were last loaded or saved
+        (e.g. because an edit was undone) aren't written again.
         """
         if self._view.modified:
             # Something has changed, so save it!
             for tab in self._view.widgets:
                 if tab.path and tab.isModified():
+                    if content_hash(tab.text()) == tab.saved_hash:
+                        tab.setModified(False)
+                        continue
                     # Suppress error message on autosave attempts
                     self.save_tab_to_file(tab, show_error_messages=False)
                     logger.info(
@@ -1437,6 +2161,11 @@ class Editor:
                 to_remove.append(connected)
         for device in to_remove:
             self.connected_devices.remove(device)
+            mode_name, port = device
+            mode = self.modes.get(mode_name)
+            if hasattr(mode, "remove_device"):
+                # The mode keeps track of what's on its devices.
+                mode.remove_device(port)
             if self.rmDeviceCallback is not None:
                 self.rmDeviceCallback(device)
         # Add newly connected devices.
@@ -1626,7 +2355,7 @@ class Editor:
         try:
             source_code = tab.text()
             logger.info("Tidy code.")
-            logger.info(source_code)
+            logger.debug(source_code)
             filemode = FileMode(target_versions=PY36_VERSIONS, line_length=88)
             tidy_code = format_str(source_code, mode=filemode)
             # The following bypasses tab.setText which resets the undo history.
@@ -0,0 +1,170 @@
+"""
+Reads Mu's log a page at a time, so even a log of tens of megabytes can be
+shown straight away. The log is memory-mapped, so only the pages that are
+shown (or searched) are ever read from the disk.
+
+Copyright (c) 2015-2017 Nicholas H.Tollervey and others (see the AUTHORS file).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import re
+import mmap
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+#: The number of bytes of the log in a page (rounded to whole lines).
+PAGE_SIZE = 64 * 1024
+#: Matches the start of a log record, capturing its level (see setup_logging
+#: in mu.app for the format).
+RECORD_RE = re.compile(
+    rb"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3} - [^\n]*?"
+    rb" (DEBUG|INFO|WARNING|ERROR|CRITICAL): ",
+    re.MULTILINE,
+)
+#: The number of each level.
+LEVELS = {
+    b"DEBUG": logging.DEBUG,
+    b"INFO": logging.INFO,
+    b"WARNING": logging.WARNING,
+    b"ERROR": logging.ERROR,
+    b"CRITICAL": logging.CRITICAL,
+}
+#: How many lines to look back through for the start of the record a line
+#: belongs to (e.g. a line of a traceback).
+MAX_RECORD_LINES = 1000
+
+
+class LogReader:
+    """
+    Reads the log at the referenced path a page at a time. Pages always
+    start and end at the start of a line.
+
+    The log is read as it was when the reader was created.
+    """
+
+    def __init__(self, path, page_size=PAGE_SIZE):
+        self.path = path
+        self.page_size = page_size
+        self.file = None
+        self.data = b""
+        try:
+            self.file = open(path, "rb")
+            self.data = mmap.mmap(
+                self.file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        except (OSError, ValueError) as ex:
+            # The log may not exist yet, or be empty (which can't be mapped).
+            logger.info("Unable to map log {}: {}".format(path, ex))
+
+    @property
+    def size(self):
+        """
+        The number of bytes in the log.
+        """
+        return len(self.data)
+
+    def close(self):
+        """
+        Release the log.
+        """
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = b""
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def line_start(self, offset):
+        """
+        Return the offset of the start of the line containing the offset.
+        """
+        return self.data.rfind(b"\n", 0, offset) + 1
+
+    def line_end(self, offset):
+        """
+        Return the offset of the start of the line after the one containing
+        the offset (or the end of the log).
+        """
+        end = self.data.find(b"\n", offset)
+        return self.size if end < 0 else end + 1
+
+    def page_before(self, offset):
+        """
+        Return the offset of the start of the page that ends at the offset
+        (which is the start of a line).
+        """
+        return self.line_start(max(0, offset - self.page_size))
+
+    def page_after(self, offset):
+        """
+        Return the offset of the end of the page that starts at the offset
+        (which is the start of a line).
+        """
+        if offset >= self.size:
+            return self.size
+        return self.line_end(min(self.size, offset + self.page_size) - 1)
+
+    def level_at(self, offset):
+        """
+        Return the level of the record containing the offset, or None if it
+        can't be found.
+        """
+        position = self.line_start(offset)
+        for _ in range(MAX_RECORD_LINES):
+            match = RECORD_RE.match(self.data, position)
+            if match:
+                return LEVELS[match.group(1)]
+            if position == 0:
+                break
+            position = self.line_start(position - 1)
+        return None
+
+    def text(self, start, stop, level=None):
+        """
+        Return the text of the log between the offsets. If a level is given,
+        only the records at that level or above are included.
+        """
+        if level is None:
+            return self.data[start:stop].decode("utf-8", "replace")
+        chunks = []
+        position = start
+        record_level = self.level_at(start) if start < stop else None
+        for match in RECORD_RE.finditer(self.data, start, stop):
+            if record_level is None or record_level >= level:
+                chunks.append(self.data[position : match.start()])
+            position = match.start()
+            record_level = LEVELS[match.group(1)]
+        if record_level is None or record_level >= level:
+            chunks.append(self.data[position:stop])
+        return b"".join(chunks).decode("utf-8", "replace")
+
+    def find(self, term, before, level=None):
+        """
+        Return the offset of the last occurrence of the term (a string)
+        before the given offset in a record at the given level or above, or
+        -1 if there isn't one.
+        """
+        term = term.encode("utf-8")
+        offset = before
+        while term:
+            offset = self.data.rfind(term, 0, offset)
+            if offset < 0:
+                break
+            record_level = self.level_at(offset) if level else None
+            if record_level is None or record_level >= level:
+                return offset
+        return -1
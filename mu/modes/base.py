@@ -21,8 +21,10 @@ import os
 import os.path
 import csv
 import time
+import struct
 import logging
 import pkgutil
+import threading
 from serial import Serial
 from PyQt5.QtSerialPort import QSerialPortInfo
 from PyQt5.QtCore import QObject, pyqtSignal
@@ -84,6 +86,28 @@ def get_default_workspace():
     return workspace_dir
 
 
+def get_capture_settings():
+    """
+    Return a tuple containing the file format used to capture plotter data
+    ("csv" or "bin") and a flag to indicate if each captured tuple should be
+    prefixed with the host time (in seconds) at which it was received.
+
+    The default is CSV without timestamps, but an administrator can change
+    this via the "capture_format" and "capture_timestamps" keys in the
+    settings file.
+    """
+    capture_format = "csv"
+    settings = {}
+    try:
+        with open(get_settings_path()) as f:
+            settings = json.load(f)
+    except (FileNotFoundError, ValueError):
+        pass
+    if settings.get("capture_format") in DataCapture.FORMATS:
+        capture_format = settings["capture_format"]
+    return capture_format, bool(settings.get("capture_timestamps", False))
+
+
 class BaseMode(QObject):
     """
     Represents the common aspects of a mode.
@@ -114,6 +138,13 @@ class BaseMode(QObject):
         """
         pass  # Default is to do nothing
 
+    def tab_saved(self, tab):
+        """
+        Called when the user saves the referenced tab (but not when it's
+        autosaved). Override in child classes to act on the saved script.
+        """
+        pass  # Default is to do nothing
+
     def actions(self):
         """
         Return an ordered list of actions provided by this module. An action
@@ -183,24 +214,38 @@ class BaseMode(QObject):
         """
         return NotImplemented
 
-    def remove_plotter(self):
+    def start_data_capture(self):
         """
-        If there's an active plotter, hide it.
-
-        Save any data captured while the plotter was active into a directory
+        Stream any data received by the active plotter into a directory
         called 'data_capture' in the workspace directory. The file contains
-        CSV data and is named with a timestamp for easy identification.
+        CSV (or binary) data and is named with a timestamp for easy
+        identification.
         """
         data_dir = os.path.join(get_default_workspace(), "data_capture")
-        if not os.path.exists(data_dir):
-            logger.debug("Creating directory: {}".format(data_dir))
-            os.makedirs(data_dir)
-        # Save the raw data as CSV
-        filename = "{}.csv".format(time.strftime("%Y%m%d-%H%M%S"))
-        f = os.path.join(data_dir, filename)
-        with open(f, "w") as csvfile:
-            csv_writer = csv.writer(csvfile)
-            csv_writer.writerows(self.view.plotter_pane.raw_data)
+        capture_format, timestamps = get_capture_settings()
+        filename = "{}.{}".format(
+            time.strftime("%Y%m%d-%H%M%S"), capture_format
+        )
+        path = os.path.join(data_dir, filename)
+        logger.info("Capturing plotter data to: {}".format(path))
+        self.view.plotter_pane.capture = DataCapture(
+            path, capture_format, timestamps=timestamps
+        )
+
+    def stop_data_capture(self):
+        """
+        Flush and close the file capturing data from the active plotter.
+        """
+        plotter_pane = self.view.plotter_pane
+        if plotter_pane and plotter_pane.capture:
+            plotter_pane.capture.close()
+            plotter_pane.capture = None
+
+    def remove_plotter(self):
+        """
+        If there's an active plotter, hide it and finish capturing its data.
+        """
+        self.stop_data_capture()
         self.view.remove_plotter()
         self.plotter = None
         logger.info("Removing plotter")
@@ -215,6 +260,7 @@ class BaseMode(QObject):
         data).
         """
         logger.error("Plotting data flood detected.")
+        self.stop_data_capture()
         self.view.remove_plotter()
         self.plotter = None
         msg = _("Data Flood Detected!")
@@ -367,6 +413,7 @@ class MicroPythonMode(BaseMode):
         if device_port:
             try:
                 self.view.add_micropython_plotter(device_port, self.name, self)
+                self.start_data_capture()
                 logger.info("Started plotter")
                 self.plotter = True
             except IOError as ex:
@@ -495,3 +542,151 @@ class FileManager(QObject):
         except Exception as ex:
             logger.error(ex)
             self.on_delete_fail.emit(device_filename)
+
+
+class DataCapture:
+    """
+    Streams tuples of plotter data to a file on a background thread so long
+    logging sessions use constant memory and survive a crash of Mu.
+
+    Incoming tuples are buffered in memory and appended to the file every
+    flush_interval seconds (or sooner if max_pending tuples are waiting).
+    The file, and the thread writing to it, are only created when the first
+    tuple arrives, so sessions without data leave nothing behind.
+
+    If timestamps is True, each tuple is prefixed with the number of seconds
+    between the host receiving the first and the current tuple.
+
+    Two formats are supported:
+
+    * "csv" - one comma separated row per tuple.
+    * "bin" - one record per tuple: a little-endian unsigned short count of
+      values followed by that many 64-bit floats. Records are as long as
+      their tuples, so they vary in length if the tuples do.
+    """
+
+    FORMATS = ("csv", "bin")
+    RECORD_HEADER = struct.Struct("<H")
+
+    def __init__(
+        self,
+        path,
+        file_format="csv",
+        timestamps=False,
+        flush_interval=1.0,
+        max_pending=1000,
+    ):
+        if file_format not in self.FORMATS:
+            raise ValueError("Unknown capture format: {}".format(file_format))
+        self.path = path
+        self.file_format = file_format
+        self.timestamps = timestamps
+        self.origin = None  # Host time of the first tuple.
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending = []
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.closed = False
+        self.thread = None
+
+    def write(self, values, timestamp=None):
+        """
+        Queue a tuple of numeric values to be written to the capture file.
+
+        The timestamp is the host's monotonic time when the values were
+        received (defaults to now).
+        """
+        if self.closed:
+            return
+        if self.timestamps:
+            if timestamp is None:
+                timestamp = time.monotonic()
+            if self.origin is None:
+                self.origin = timestamp
+            values = (round(timestamp - self.origin, 6),) + tuple(values)
+        with self.lock:
+            self.pending.append(values)
+            pending = len(self.pending)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        elif pending >= self.max_pending:
+            self.wake.set()
+
+    def close(self):
+        """
+        Write any outstanding data, then close the file and stop the thread.
+        """
+        self.closed = True
+        if self.thread:
+            self.wake.set()
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        """
+        Periodically drain the pending tuples into the capture file.
+        """
+        try:
+            data_dir = os.path.dirname(self.path)
+            if data_dir and not os.path.exists(data_dir):
+                logger.debug("Creating directory: {}".format(data_dir))
+                os.makedirs(data_dir)
+            if self.file_format == "csv":
+                capture_file = open(self.path, "w", newline="")
+            else:
+                capture_file = open(self.path, "wb")
+        except OSError as ex:
+            logger.error("Unable to capture plotter data.")
+            logger.error(ex)
+            self.closed = True
+            return
+        with capture_file:
+            csv_writer = csv.writer(capture_file)
+            while True:
+                self.wake.wait(self.flush_interval)
+                self.wake.clear()
+                closed = self.closed
+                with self.lock:
+                    rows, self.pending = self.pending, []
+                if rows:
+                    if self.file_format == "csv":
+                        csv_writer.writerows(rows)
+                    else:
+                        capture_file.write(self.pack(rows))
+                    capture_file.flush()
+                if closed:
+                    break
+
+    @classmethod
+    def pack(cls, rows):
+        """
+        Return the binary records representing the referenced tuples.
+        """
+        records = []
+        for values in rows:
+            records.append(cls.RECORD_HEADER.pack(len(values)))
+            records.append(struct.pack("<{}d".format(len(values)), *values))
+        return b"".join(records)
+
+    @classmethod
+    def unpack(cls, data):
+        """
+        Return a list of tuples recovered from binary capture records. A
+        truncated final record (e.g. after a crash) is ignored.
+        """
+        result = []
+        offset = 0
+        header_size = cls.RECORD_HEADER.size
+        while offset + header_size <= len(data):
+            (count,) = cls.RECORD_HEADER.unpack_from(data, offset)
+            end = offset + header_size + count * 8
+            if end > len(data):
+                break
+            values = struct.unpack_from(
+                "<{}d".format(count), data, offset + header_size
+            )
+            result.append(values)
+            offset = end
+        return result
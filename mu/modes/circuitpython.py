@@ -18,8 +18,8 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 import os
 import ctypes
-from subprocess import check_output
 from mu.modes.base import MicroPythonMode
+from mu.mounts import mount_table
 from mu.modes.api import ADAFRUIT_APIS, SHARED_APIS
 from mu.interface.panes import CHARTS
 
@@ -109,15 +109,7 @@ class CircuitPythonMode(MicroPythonMode):
         # plugged in CIRCUITPY board.
         if os.name == "posix":
             # We're on Linux or OSX
-            for mount_command in ["mount", "/sbin/mount"]:
-                try:
-                    mount_output = check_output(mount_command).splitlines()
-                    mounted_volumes = [x.split()[2] for x in mount_output]
-                    for volume in mounted_volumes:
-                        if volume.endswith(b"CIRCUITPY"):
-                            device_dir = volume.decode("utf-8")
-                except FileNotFoundError:
-                    next
+            device_dir = mount_table.find("CIRCUITPY")
         elif os.name == "nt":
             # We're on Windows.
 
@@ -105,7 +105,7 @@ class DebugMode(BaseMode):
         if tab.path:
             # If needed, save the script.
             if tab.isModified():
-                self.editor.save_tab_to_file(tab)
+                self.editor.save_tab_to_file(tab, wait=True)
             logger.debug(tab.text())
             self.set_buttons(modes=False)
             envars = self.editor.envars
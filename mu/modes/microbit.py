@@ -20,15 +20,18 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
 import sys
 import os.path
+import hashlib
 import logging
+import threading
 import semver
 from tokenize import TokenError
 from mu.logic import HOME_DIRECTORY, sniff_newline_convention
 from mu.contrib import uflash, microfs
 from mu.modes.api import MICROBIT_APIS, SHARED_APIS
 from mu.modes.base import MicroPythonMode, FileManager
+from mu.mounts import mount_table
 from mu.interface.panes import CHARTS
-from PyQt5.QtCore import QThread, pyqtSignal, QTimer
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, QTimer
 
 # We can run without nudatus
 can_minify = True
@@ -40,6 +43,166 @@ except ImportError:  # pragma: no cover
 logger = logging.getLogger(__name__)
 
 
+#: How often (in ms) to check the mount table while flashing.
+MOUNT_POLL_INTERVAL = 200
+#: How long (in ms) to give the device to settle after it's remounted.
+MOUNT_SETTLE_TIME = 1000
+#: How long (in ms) to wait for a flash to finish before giving up watching.
+FLASH_TIMEOUT = 30000
+#: How long (in ms) after the last edit to measure the size of the script.
+SIZE_CHECK_DELAY = 1000
+#: How many minified scripts to keep.
+MINIFIED_CACHE_SIZE = 16
+
+
+#: Minified scripts, by the script_hash of the original.
+_minified = {}
+_minified_lock = threading.Lock()
+
+
+def runtime_hash(path_to_runtime):
+    """
+    Return a string identifying the MicroPython runtime in the referenced hex
+    file, or the runtime bundled with Mu if path_to_runtime is None. If the
+    hex file can't be read, returns None.
+    """
+    if not path_to_runtime:
+        return uflash.MICROPYTHON_VERSION
+    try:
+        with open(path_to_runtime, "rb") as runtime_file:
+            return "custom:" + hashlib.sha1(runtime_file.read()).hexdigest()
+    except OSError as ex:
+        logger.warning(ex)
+        return None
+
+
+def script_hash(python_script):
+    """
+    Return a string identifying the given Python script.
+    """
+    if isinstance(python_script, str):
+        python_script = python_script.encode("utf-8")
+    return hashlib.sha1(python_script).hexdigest()
+
+
+def minify(python_script):
+    """
+    Return the minified version of the Python script (as bytes). Results are
+    cached, so a script measured while it's being edited isn't minified again
+    when it's flashed. Raises TokenError if the script can't be minified.
+    """
+    key = script_hash(python_script)
+    with _minified_lock:
+        if key in _minified:
+            return _minified[key]
+    if isinstance(python_script, bytes):
+        python_script = python_script.decode("utf-8")
+    mangled = nudatus.mangle(python_script).encode("utf-8")
+    with _minified_lock:
+        if len(_minified) >= MINIFIED_CACHE_SIZE:
+            # Forget the oldest.
+            del _minified[next(iter(_minified))]
+        _minified[key] = mangled
+    return mangled
+
+
+class FlashMonitor(QObject):
+    """
+    Watches the micro:bit's MICROBIT volume to tell when flashing has
+    finished: the device unmounts itself once it has received the hex file
+    and mounts itself again when it's running the new firmware. Should this
+    not be seen within the timeout, flashing is assumed to have finished
+    anyway.
+    """
+
+    # Emitted once flashing has finished.
+    finished = pyqtSignal()
+
+    def __init__(self, path_to_microbit, timeout=FLASH_TIMEOUT):
+        super().__init__()
+        self.path_to_microbit = path_to_microbit
+        self.timeout = timeout
+        self.unmounted = False
+        self.only_microbit = True
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll)
+        self.finish_timer = QTimer(self)
+        self.finish_timer.setSingleShot(True)
+        self.finish_timer.timeout.connect(self.finish)
+
+    def start(self):
+        """
+        Start watching the device.
+        """
+        self.unmounted = False
+        mount_table.refresh()
+        paths = mount_table.all_volumes.get("MICROBIT", [])
+        self.only_microbit = len(paths) <= 1
+        self.poll_timer.start(MOUNT_POLL_INTERVAL)
+        self.finish_timer.start(self.timeout)
+
+    def stop(self):
+        """
+        Stop watching the device without signalling that flashing finished.
+        """
+        self.poll_timer.stop()
+        self.finish_timer.stop()
+
+    def poll(self):
+        """
+        Check whether the micro:bit has been unmounted or, if it has, mounted
+        again, in which case it's finished flashing and is ready once it has
+        settled. Every mounted micro:bit is checked, since others may be
+        attached. If it's the only one, it may be mounted at a different path
+        the second time.
+        """
+        mount_table.refresh()
+        paths = mount_table.all_volumes.get("MICROBIT", [])
+        if not self.unmounted:
+            self.unmounted = self.path_to_microbit not in paths
+        elif self.path_to_microbit in paths or (self.only_microbit and paths):
+            self.poll_timer.stop()
+            self.finish_timer.start(MOUNT_SETTLE_TIME)
+
+    def finish(self):
+        """
+        Stop watching and signal that flashing has finished.
+        """
+        if self.poll_timer.isActive():
+            logger.warning("Timed out waiting for the micro:bit to remount.")
+        self.stop()
+        self.finished.emit()
+
+
+class ScriptMeasurer(QThread):
+    """
+    Used to measure how much space a script needs on the micro:bit in a
+    non-blocking manner.
+    """
+
+    # Emitted with the size of the script and, if it's too long and could be
+    # minified, of the minified script (otherwise -1).
+    measured = pyqtSignal(int, int)
+
+    def __init__(self, python_script, minify_enabled):
+        super().__init__()
+        self.python_script = python_script
+        self.minify_enabled = minify_enabled
+
+    def run(self):
+        """
+        Measure the script, minifying it if needed.
+        """
+        size = len(self.python_script)
+        minified_size = -1
+        if size >= uflash._MAX_SIZE and self.minify_enabled and can_minify:
+            try:
+                minified_size = len(minify(self.python_script))
+            except TokenError:
+                pass
+        self.measured.emit(size, minified_size)
+
+
 class DeviceFlasher(QThread):
     """
     Used to flash the micro:bit in a non-blocking manner.
@@ -47,6 +210,9 @@ class DeviceFlasher(QThread):
 
     # Emitted when flashing the micro:bit fails for any reason.
     on_flash_fail = pyqtSignal(str)
+    # Emitted with the path of each device as it's finished with and the
+    # reason flashing it failed (an empty string if it didn't).
+    on_device_flashed = pyqtSignal(str, str)
 
     def __init__(self, paths_to_microbits, python_script, path_to_runtime):
         """
@@ -64,13 +230,14 @@ class DeviceFlasher(QThread):
 
     def run(self):
         """
-        Flash the device.
+        Flash the devices.
         """
         try:
             uflash.flash(
                 paths_to_microbits=self.paths_to_microbits,
                 python_script=self.python_script,
                 path_to_runtime=self.path_to_runtime,
+                report=self.report,
             )
         except Exception as ex:
             # Catch everything so Mu can recover from all of the wide variety
@@ -78,6 +245,12 @@ class DeviceFlasher(QThread):
             logger.error(ex)
             self.on_flash_fail.emit(str(ex))
 
+    def report(self, path, error):
+        """
+        Called by uflash as each device is finished with.
+        """
+        self.on_device_flashed.emit(path, str(error) if error else "")
+
 
 class MicrobitMode(MicroPythonMode):
     """
@@ -90,6 +263,10 @@ class MicrobitMode(MicroPythonMode):
     fs = None  #: Reference to filesystem navigator.
     flash_thread = None
     flash_timer = None
+    flash_on_save_path = None  #: The file to flash again when it's saved.
+    flash_pending = False  #: Flash again once the current flash finishes.
+    flash_paths = []  #: The micro:bits being flashed by flash_all.
+    flash_results = {}  #: Path of each micro:bit flashed -> error.
     file_extensions = ["hex"]
 
     valid_boards = [(0x0D28, 0x0204)]  # micro:bit USB VID, PID
@@ -98,6 +275,25 @@ class MicrobitMode(MicroPythonMode):
 
     python_script = ""
 
+    def __init__(self, editor, view):
+        super().__init__(editor, view)
+        #: What Mu knows about each device since it was plugged in, by
+        #: "serial_number": the "port" it's on, the MicroPython "version" it
+        #: reported, the "runtime" Mu flashed onto it and the hash of the
+        #: "script" Mu copied onto it as main.py.
+        self.device_cache = {}
+        #: The entry in the device_cache for the device being flashed.
+        self.flash_device = {}
+        #: The runtime being flashed onto that device, if any.
+        self.flash_runtime = None
+        # Measure the script a short while after it was last edited.
+        self.size_thread = None
+        self.size_timer = QTimer()
+        self.size_timer.setSingleShot(True)
+        self.size_timer.setInterval(SIZE_CHECK_DELAY)
+        self.size_timer.timeout.connect(self.measure_script)
+        view.text_changed.connect(self.script_changed)
+
     def actions(self):
         """
         Return an ordered list of actions provided by this module. An action
@@ -111,6 +307,15 @@ class MicrobitMode(MicroPythonMode):
                 "handler": self.flash,
                 "shortcut": "F3",
             },
+            {
+                "name": "flash_all",
+                "display_name": _("Flash All"),
+                "description": _(
+                    "Flash your code onto every attached micro:bit at once."
+                ),
+                "handler": self.flash_all,
+                "shortcut": "Shift+F3",
+            },
             {
                 "name": "files",
                 "display_name": _("Files"),
@@ -147,40 +352,24 @@ class MicrobitMode(MicroPythonMode):
         """
         return SHARED_APIS + MICROBIT_APIS
 
-    def flash(self):
+    def get_script(self, tab):
         """
-        Takes the currently active tab, compiles the Python script therein into
-        a hex file and flashes it all onto the connected device.
-
-        WARNING: This method is getting more complex due to several edge
-        cases. Ergo, it's a target for refactoring.
+        Return the Python script in the referenced tab as bytes ready to flash,
+        minified if it's too long and the user allows. If it can't be flashed,
+        the user is told why and None is returned.
         """
-        user_defined_microbit_path = None
-        self.python_script = ""
-        logger.info("Preparing to flash script.")
-        # The first thing to do is check the script is valid and of the
-        # expected length.
-        # Grab the Python script.
-        tab = self.view.current_tab
-        if tab is None:
-            # There is no active text editor. Exit.
-            return
-        # Check the script's contents.
         python_script = tab.text().encode("utf-8")
         logger.debug("Python script:")
         logger.debug(python_script)
         # Check minification status.
-        minify = False
-        if uflash.get_minifier():
-            minify = self.editor.minify
+        minify_enabled = self.minify_enabled()
         # Attempt and handle minification.
         if len(python_script) >= uflash._MAX_SIZE:
             message = _('Unable to flash "{}"').format(tab.label)
-            if minify and can_minify:
+            if minify_enabled and can_minify:
                 orginal = len(python_script)
-                script = python_script.decode("utf-8")
                 try:
-                    mangled = nudatus.mangle(script).encode("utf-8")
+                    mangled = minify(python_script)
                 except TokenError as e:
                     msg, (line, col) = e.args
                     logger.debug("Minify failed")
@@ -192,9 +381,7 @@ class MicrobitMode(MicroPythonMode):
                 saved = orginal - len(mangled)
                 percent = saved / orginal * 100
                 logger.debug(
-                    "Script minified, {} bytes ({:.2f}%) saved:".format(
-                        saved, percent
-                    )
+                    "Script minified, %d bytes (%.2f%%) saved:", saved, percent
                 )
                 logger.debug(mangled)
                 python_script = mangled
@@ -204,7 +391,7 @@ class MicrobitMode(MicroPythonMode):
                     )
                     self.view.show_message(message, information, "Warning")
                     return
-            elif minify and not can_minify:
+            elif minify_enabled and not can_minify:
                 information = _(
                     "Your script is too long and the minifier"
                     " isn't available"
@@ -215,12 +402,96 @@ class MicrobitMode(MicroPythonMode):
                 information = _("Your script is too long!")
                 self.view.show_message(message, information, "Warning")
                 return
+        return python_script
+
+    def minify_enabled(self):
+        """
+        Return a boolean to indicate if scripts that are too long should be
+        minified.
+        """
+        return bool(uflash.get_minifier() and self.editor.minify)
+
+    def script_changed(self, tab):
+        """
+        Called when the text in a tab is changed. If it's the current tab in
+        micro:bit mode, (re)start the countdown to measuring it.
+        """
+        if self.editor.mode == "microbit" and tab is self.view.current_tab:
+            self.size_timer.start()
+
+    def measure_script(self):
+        """
+        Measure the script in the current tab in the background, unless the
+        last measurement hasn't finished yet, in which case try again later.
+        """
+        tab = self.view.current_tab
+        if tab is None or self.editor.mode != "microbit":
+            return
+        if self.size_thread:
+            self.size_timer.start()
+            return
+        python_script = tab.text().encode("utf-8")
+        self.size_thread = ScriptMeasurer(python_script, self.minify_enabled())
+        self.size_thread.measured.connect(self.script_measured)
+        self.size_thread.finished.connect(self.measure_finished)
+        self.size_thread.start()
+
+    def script_measured(self, size, minified_size):
+        """
+        Show how much of the space on the micro:bit the script needs.
+        """
+        if size < uflash._MAX_SIZE:
+            message = _("Your script uses {} of {} bytes.").format(
+                size, uflash._MAX_SIZE
+            )
+        elif 0 <= minified_size < uflash._MAX_SIZE:
+            message = _(
+                "Your script uses {} of {} bytes once minified."
+            ).format(minified_size, uflash._MAX_SIZE)
+        else:
+            message = _("Your script is {} bytes too long!").format(
+                (size if minified_size < 0 else minified_size)
+                - uflash._MAX_SIZE
+                + 1
+            )
+        self.editor.show_status_message(message)
+
+    def measure_finished(self):
+        """
+        Called when the script has been measured.
+        """
+        self.size_thread = None
+
+    def flash(self):
+        """
+        Takes the currently active tab, compiles the Python script therein into
+        a hex file and flashes it all onto the connected device.
+
+        WARNING: This method is getting more complex due to several edge
+        cases. Ergo, it's a target for refactoring.
+        """
+        user_defined_microbit_path = None
+        self.python_script = ""
+        logger.info("Preparing to flash script.")
+        # The first thing to do is check the script is valid and of the
+        # expected length.
+        # Grab the Python script.
+        tab = self.view.current_tab
+        if tab is None:
+            # There is no active text editor. Exit.
+            return
+        if self.editor.flash_on_save and tab.path:
+            # Flash the tab again whenever the user saves it.
+            self.flash_on_save_path = tab.path
+        python_script = self.get_script(tab)
+        if python_script is None:
+            return
         # By this point, there's a valid Python script in "python_script".
         # Assign this to an attribute for later processing in a different
         # method.
         self.python_script = python_script
         # Next step: find the microbit port and serial number.
-        path_to_microbit = uflash.find_microbit()
+        path_to_microbit = uflash.find_microbit(mount_table.find_all)
         logger.info("Path to micro:bit: {}".format(path_to_microbit))
         port = None
         serial_number = None
@@ -255,61 +526,73 @@ class MicrobitMode(MicroPythonMode):
                 # flash.
                 logger.info("Python script empty. Forcing flash.")
                 force_flash = True
-            logger.info("Checking target device.")
-            # Get the version of MicroPython on the device.
-            try:
-                version_info = microfs.version()
-                logger.info(version_info)
-                board_info = version_info["version"].split()
-                if board_info[0] == "micro:bit" and board_info[1].startswith(
-                    "v"
-                ):
-                    # New style versions, so the correct information will be
-                    # in the "release" field.
-                    try:
-                        # Check the release is a correct semantic version.
-                        semver.parse(version_info["release"])
-                        board_version = version_info["release"]
-                    except ValueError:
-                        # If it's an invalid semver, set to unknown version to
-                        # force flash.
-                        board_version = "0.0.1"
-                else:
-                    # 0.0.1 indicates an old unknown version. This is just a
-                    # valid arbitrary flag for semver comparison a couple of
-                    # lines below.
-                    board_version = "0.0.1"
-                logger.info("Board MicroPython: {}".format(board_version))
-                logger.info(
-                    "Mu MicroPython: {}".format(uflash.MICROPYTHON_VERSION)
+            # What Mu knows about the device since it was plugged in.
+            if serial_number and not user_defined_microbit_path:
+                device = self.device_cache.setdefault(
+                    serial_number, {"serial_number": serial_number}
                 )
-                # If there's an older version of MicroPython on the device,
-                # update it with the one packaged with Mu.
-                if (
-                    semver.compare(board_version, uflash.MICROPYTHON_VERSION)
-                    < 0
-                ):
-                    force_flash = True
-            except Exception:
-                # Could not get version of MicroPython. This means either the
-                # device has a really old version of MicroPython or is running
-                # something else. In any case, flash MicroPython onto the
-                # device.
-                logger.warning("Could not detect version of MicroPython.")
-                force_flash = True
+                device["port"] = port
+            else:
+                device = {}
             # Check use of custom runtime.
             rt_hex_path = self.editor.microbit_runtime.strip()
             message = _('Flashing "{}" onto the micro:bit.').format(tab.label)
             if rt_hex_path and os.path.exists(rt_hex_path):
                 message = message + _(" Runtime: {}").format(rt_hex_path)
-                force_flash = True  # Using a custom runtime, so flash it.
             else:
                 rt_hex_path = None
                 self.editor.microbit_runtime = ""
+            runtime = runtime_hash(rt_hex_path)
+            logger.info("Checking target device.")
+            if runtime and device.get("runtime") == runtime:
+                # Mu flashed the runtime onto the device itself.
+                logger.info("Device already has the runtime.")
+            elif rt_hex_path:
+                force_flash = True  # Using a custom runtime, so flash it.
+            else:
+                # Get the version of MicroPython on the device, asking it only
+                # once since it was plugged in.
+                try:
+                    board_version = device.get("version")
+                    if board_version is None:
+                        board_version = self.get_board_version()
+                        device["version"] = board_version
+                    logger.info("Board MicroPython: {}".format(board_version))
+                    logger.info(
+                        "Mu MicroPython: {}".format(uflash.MICROPYTHON_VERSION)
+                    )
+                    # If there's an older version of MicroPython on the
+                    # device, update it with the one packaged with Mu.
+                    if (
+                        semver.compare(
+                            board_version, uflash.MICROPYTHON_VERSION
+                        )
+                        < 0
+                    ):
+                        force_flash = True
+                except Exception:
+                    # Could not get version of MicroPython. This means either
+                    # the device has a really old version of MicroPython or is
+                    # running something else. In any case, flash MicroPython
+                    # onto the device.
+                    logger.warning("Could not detect version of MicroPython.")
+                    force_flash = True
             # Check for use of user defined path (to save hex onto local
             # file system.
             if user_defined_microbit_path:
                 force_flash = True
+            self.flash_device = device
+            self.flash_runtime = None
+            if not force_flash and device.get("script") == script_hash(
+                self.python_script
+            ):
+                # Mu has already copied this script onto the device.
+                logger.info("Script unchanged on device. Nothing to flash.")
+                self.editor.show_status_message(
+                    _("The micro:bit already has this code.")
+                )
+                self.python_script = ""
+                return
             # If we need to flash the device with a clean hex, do so now.
             if force_flash:
                 logger.info("Flashing new MicroPython runtime onto device")
@@ -334,6 +617,7 @@ class MicrobitMode(MicroPythonMode):
                     # script, since this will be copied over when the
                     # flashing operation has finished.
                     model_serial_number = int(serial_number[:4])
+                    self.flash_runtime = runtime
                     if rt_hex_path:
                         # If the user has specified a bespoke runtime hex file
                         # assume they know what they're doing and hope for the
@@ -369,13 +653,9 @@ class MicrobitMode(MicroPythonMode):
                         # defined location on the local filesystem.
                         self.flash_thread.finished.connect(self.flash_finished)
                     else:
-                        # Other platforms don't block, so schedule the finish
-                        # call for 10 seconds (approximately how long flashing
-                        # the connected device takes).
-                        self.flash_timer = QTimer()
-                        self.flash_timer.timeout.connect(self.flash_finished)
-                        self.flash_timer.setSingleShot(True)
-                        self.flash_timer.start(10000)
+                        # Other platforms don't block, so watch for the
+                        # device remounting itself once flashed.
+                        self.watch_flash(path_to_microbit)
                 self.flash_thread.on_flash_fail.connect(self.flash_failed)
                 self.flash_thread.start()
             else:
@@ -392,14 +672,12 @@ class MicrobitMode(MicroPythonMode):
                         [path_to_microbit], self.python_script, rt_hex_path
                     )
                     self.python_script = ""
+                    self.flash_runtime = runtime
                     if sys.platform == "win32":
                         # Windows blocks on write.
                         self.flash_thread.finished.connect(self.flash_finished)
                     else:
-                        self.flash_timer = QTimer()
-                        self.flash_timer.timeout.connect(self.flash_finished)
-                        self.flash_timer.setSingleShot(True)
-                        self.flash_timer.start(10000)
+                        self.watch_flash(path_to_microbit)
                     self.flash_thread.on_flash_fail.connect(self.flash_failed)
                     self.flash_thread.start()
                 except Exception as ex:
@@ -421,6 +699,160 @@ class MicrobitMode(MicroPythonMode):
             )
             self.view.show_message(message, information)
 
+    def get_board_version(self):
+        """
+        Ask the connected device for the version of MicroPython it's running.
+        Old or unknown versions are reported as "0.0.1".
+        """
+        version_info = microfs.version()
+        logger.info(version_info)
+        board_info = version_info["version"].split()
+        if board_info[0] == "micro:bit" and board_info[1].startswith("v"):
+            # New style versions, so the correct information will be in the
+            # "release" field.
+            try:
+                # Check the release is a correct semantic version.
+                semver.parse(version_info["release"])
+                return version_info["release"]
+            except ValueError:
+                # If it's an invalid semver, set to unknown version to force
+                # flash.
+                return "0.0.1"
+        # 0.0.1 indicates an old unknown version. This is just a valid
+        # arbitrary flag for semver comparison.
+        return "0.0.1"
+
+    def tab_saved(self, tab):
+        """
+        Called when the user saves a tab (but not when it's autosaved, which
+        would flash half-typed code). If it's the file last flashed and in the
+        current tab, flash it again, or once the flash in progress has
+        finished. However many times it's saved meanwhile, it's only flashed
+        once more. It isn't flashed while the REPL, plotter or file system
+        is using the serial connection (when the Flash button is disabled).
+        """
+        if not (
+            self.editor.flash_on_save
+            and self.editor.mode == "microbit"
+            and tab is self.view.current_tab
+            and tab.path
+            and tab.path == self.flash_on_save_path
+        ):
+            return
+        if self.repl or self.plotter or self.fs:
+            logger.info("Not flashing on save while the device is in use.")
+            return
+        if self.flash_thread:
+            logger.info("Saved while flashing. Flashing again afterwards.")
+            self.flash_pending = True
+        else:
+            self.flash()
+
+    def flash_all(self):
+        """
+        Takes the currently active tab and flashes the Python script therein,
+        embedded in the MicroPython runtime, onto every attached micro:bit at
+        once.
+        """
+        if self.flash_thread:
+            # A flash is already in progress.
+            return
+        tab = self.view.current_tab
+        if tab is None:
+            # There is no active text editor. Exit.
+            return
+        python_script = self.get_script(tab)
+        if python_script is None:
+            return
+        paths_to_microbits = uflash.find_microbits(mount_table.find_all)
+        logger.info("Paths to micro:bits: {}".format(paths_to_microbits))
+        if not paths_to_microbits:
+            message = _("Could not find an attached BBC micro:bit.")
+            information = _(
+                "Please ensure the micro:bits are attached and configured by"
+                " your computer, which may take several seconds, before"
+                " trying again."
+            )
+            self.view.show_message(message, information)
+            return
+        rt_hex_path = self.editor.microbit_runtime.strip()
+        if not (rt_hex_path and os.path.exists(rt_hex_path)):
+            rt_hex_path = None
+        self.flash_results = {}
+        self.flash_paths = paths_to_microbits
+        message = _('Flashing "{}" onto {} micro:bits.').format(
+            tab.label, len(paths_to_microbits)
+        )
+        self.editor.show_status_message(message, 10)
+        self.set_buttons(flash=False, flash_all=False)
+        # The script is embedded in the hex, so there's no main.py to copy
+        # and the devices are finished with as soon as the thread is.
+        self.python_script = ""
+        # Flashing wipes the devices, so what was known about them is stale.
+        self.device_cache.clear()
+        self.flash_thread = DeviceFlasher(
+            paths_to_microbits, python_script, rt_hex_path
+        )
+        self.flash_thread.on_device_flashed.connect(self.device_flashed)
+        self.flash_thread.finished.connect(self.flash_all_finished)
+        self.flash_thread.start()
+
+    def device_flashed(self, path, error):
+        """
+        Called as each device being flashed by flash_all is finished with.
+        """
+        self.flash_results[path] = error
+        if error:
+            logger.error("Could not flash {}: {}".format(path, error))
+        else:
+            logger.info("Flashed {}".format(path))
+        flashed = len([e for e in self.flash_results.values() if not e])
+        self.editor.show_status_message(
+            _("Flashed {} of {} micro:bits.").format(
+                flashed, len(self.flash_paths)
+            )
+        )
+
+    def flash_all_finished(self):
+        """
+        Called when the thread used to flash all the micro:bits has finished.
+        Any that weren't flashed are reported to the user.
+        """
+        if not (self.repl or self.plotter or self.fs):
+            self.set_buttons(flash=True, flash_all=True)
+        self.flash_thread = None
+        failed = [
+            path
+            for path in self.flash_paths
+            if self.flash_results.get(path) != ""
+        ]
+        if failed:
+            message = _("Could not flash {} of {} micro:bits.").format(
+                len(failed), len(self.flash_paths)
+            )
+            information = "\n".join(
+                "{}: {}".format(
+                    path, self.flash_results.get(path, _("Not flashed."))
+                )
+                for path in failed
+            )
+            self.view.show_message(message, information, "Warning")
+        else:
+            self.editor.show_status_message(
+                _("Finished flashing {} micro:bits.").format(
+                    len(self.flash_paths)
+                )
+            )
+
+    def watch_flash(self, path_to_microbit):
+        """
+        Call flash_finished once the device at path_to_microbit has remounted
+        itself after flashing.
+        """
+        self.flash_timer = FlashMonitor(path_to_microbit)
+        self.flash_timer.finished.connect(self.flash_finished)
+        self.flash_timer.start()
+
     def flash_finished(self):
         """
         Called when the thread used to flash the micro:bit has finished.
@@ -429,11 +861,26 @@ class MicrobitMode(MicroPythonMode):
         self.editor.show_status_message(_("Finished flashing."))
         self.flash_thread = None
         self.flash_timer = None
+        if self.flash_runtime:
+            # The device has a fresh runtime and an empty file system.
+            self.flash_device.pop("version", None)
+            self.flash_device.pop("script", None)
+            self.flash_device["runtime"] = self.flash_runtime
+            self.flash_runtime = None
+            if self.flash_device.get("serial_number"):
+                # Flashing may have looked like the device being unplugged.
+                self.device_cache[self.flash_device["serial_number"]] = (
+                    self.flash_device
+                )
         if self.python_script:
             try:
                 self.copy_main()
             except Exception as ex:
                 self.flash_failed(ex)
+        if self.flash_pending:
+            # The file was saved again while flashing.
+            self.flash_pending = False
+            self.flash()
 
     def copy_main(self):
         """
@@ -458,6 +905,7 @@ class MicrobitMode(MicroPythonMode):
             # Reset the device.
             serial.write(b"import microbit\r\n")
             serial.write(b"microbit.reset()\r\n")
+            self.flash_device["script"] = script_hash(self.python_script)
             self.editor.show_status_message(_("Copied code onto micro:bit."))
         self.python_script = ""
 
@@ -474,12 +922,33 @@ class MicrobitMode(MicroPythonMode):
             " information."
         )
         self.view.show_message(message, information, "Warning")
+        # There's no knowing what's on the device now.
+        self.flash_device.clear()
+        self.flash_runtime = None
+        self.flash_pending = False
         if self.flash_timer:
             self.flash_timer.stop()
             self.flash_timer = None
         self.set_buttons(flash=True)
         self.flash_thread = None
 
+    def remove_device(self, port):
+        """
+        Called when the device on the port is unplugged. Whatever is plugged
+        back in may have been changed elsewhere, so forget about it.
+        """
+        for serial_number, device in list(self.device_cache.items()):
+            if device.get("port") == port:
+                del self.device_cache[serial_number]
+
+    def forget_scripts(self):
+        """
+        Forget which scripts Mu copied onto the devices, since the user may
+        change them via the REPL or file system.
+        """
+        for device in self.device_cache.values():
+            device.pop("script", None)
+
     def toggle_repl(self, event):
         """
         Check for the existence of the file pane before toggling REPL.
@@ -487,9 +956,10 @@ class MicrobitMode(MicroPythonMode):
         if self.fs is None:
             super().toggle_repl(event)
             if self.repl:
-                self.set_buttons(flash=False, files=False)
+                self.forget_scripts()
+                self.set_buttons(flash=False, flash_all=False, files=False)
             elif not (self.repl or self.plotter):
-                self.set_buttons(flash=True, files=True)
+                self.set_buttons(flash=True, flash_all=True, files=True)
         else:
             message = _("REPL and file system cannot work at the same time.")
             information = _(
@@ -507,9 +977,9 @@ class MicrobitMode(MicroPythonMode):
         if self.fs is None:
             super().toggle_plotter(event)
             if self.plotter:
-                self.set_buttons(flash=False, files=False)
+                self.set_buttons(flash=False, flash_all=False, files=False)
             elif not (self.repl or self.plotter):
-                self.set_buttons(flash=True, files=True)
+                self.set_buttons(flash=True, flash_all=True, files=True)
         else:
             message = _(
                 "The plotter and file system cannot work at the same " "time."
@@ -543,11 +1013,16 @@ class MicrobitMode(MicroPythonMode):
                 self.add_fs()
                 if self.fs:
                     logger.info("Toggle filesystem on.")
-                    self.set_buttons(flash=False, repl=False, plotter=False)
+                    self.forget_scripts()
+                    self.set_buttons(
+                        flash=False, flash_all=False, repl=False, plotter=False
+                    )
             else:
                 self.remove_fs()
                 logger.info("Toggle filesystem off.")
-                self.set_buttons(flash=True, repl=True, plotter=True)
+                self.set_buttons(
+                    flash=True, flash_all=True, repl=True, plotter=True
+                )
 
     def add_fs(self):
         """
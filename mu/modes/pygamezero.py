@@ -138,7 +138,7 @@ class PyGameZeroMode(BaseMode):
         if tab.path:
             # If needed, save the script.
             if tab.isModified():
-                self.editor.save_tab_to_file(tab)
+                self.editor.save_tab_to_file(tab, wait=True)
             logger.debug(tab.text())
             envars = self.editor.envars
             args = ["-m", "pgzero"]
@@ -195,7 +195,7 @@ class PythonMode(BaseMode):
         if tab.path:
             # If needed, save the script.
             if tab.isModified():
-                self.editor.save_tab_to_file(tab)
+                self.editor.save_tab_to_file(tab, wait=True)
             envars = self.editor.envars
             cwd = os.path.dirname(tab.path)
             self.runner = self.view.add_python3_runner(
@@ -291,6 +291,7 @@ class PythonMode(BaseMode):
         Add a plotter pane.
         """
         self.view.add_python3_plotter(self)
+        self.start_data_capture()
         logger.info("Started plotter")
         self.plotter = True
         self.set_buttons(debug=False)
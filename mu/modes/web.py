@@ -164,7 +164,7 @@ class WebMode(BaseMode):
                 return
             # If needed, save the script.
             if tab.isModified():
-                self.editor.save_tab_to_file(tab)
+                self.editor.save_tab_to_file(tab, wait=True)
             logger.debug(tab.text())
             envars = self.editor.envars
             envars.append(("FLASK_APP", os.path.basename(tab.path)))
@@ -0,0 +1,230 @@
+"""
+Keeps track of the filesystems mounted by attached devices, such as the
+MICROBIT volume of a BBC micro:bit or the CIRCUITPY volume of a board running
+CircuitPython, so modes don't need to ask the OS each time they need one.
+
+Copyright (c) 2015-2017 Nicholas H.Tollervey and others (see the AUTHORS file).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import os
+import re
+import logging
+from subprocess import check_output
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+logger = logging.getLogger(__name__)
+
+
+#: The table of mounted filesystems on Linux.
+MOUNTINFO = "/proc/self/mountinfo"
+#: Commands listing mounted filesystems where there's no MOUNTINFO (e.g. OSX).
+#: The mount command may not be on the path of unprivileged users on OSX.
+MOUNT_COMMANDS = ["mount", "/sbin/mount"]
+#: The names of the volumes mounted by the devices Mu works with.
+VOLUME_NAMES = ["MICROBIT", "CIRCUITPY"]
+#: Matches the label of a device volume (the last part of its mount point),
+#: which may be suffixed with a number when several devices with the same
+#: name are attached (e.g. MICROBIT1 with udisks or "MICROBIT 1" on OSX).
+VOLUME_LABEL = r"^{}( ?\d+)?$"
+#: How often (in ms) to check for changes to the mounted filesystems.
+POLL_INTERVAL = 1000
+
+
+def _unescape(path):
+    """
+    Return the path with the octal escapes used in MOUNTINFO (for spaces and
+    the like) replaced by the characters they represent.
+    """
+    return re.sub(
+        r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), path
+    )
+
+
+def parse_mountinfo(table):
+    """
+    Return a list of the mount points in the given MOUNTINFO bytes.
+    """
+    result = []
+    for line in table.decode("utf-8", "replace").splitlines():
+        fields = line.split(" ")
+        if len(fields) > 4:
+            result.append(_unescape(fields[4]))
+    return result
+
+
+def parse_mount(output):
+    """
+    Return a list of the mount points in the given output bytes of the mount
+    command. Lines are of the form "DEVICE on MOUNT_POINT type TYPE (OPTIONS)"
+    on Linux and "DEVICE on MOUNT_POINT (OPTIONS)" on OSX, and the mount point
+    may contain spaces.
+    """
+    result = []
+    for line in output.splitlines():
+        match = re.match(rb"^.*? on (.+?)(?: type \S+)? \(", line)
+        if match:
+            result.append(match.group(1).decode("utf-8", "replace"))
+        elif len(line.split()) > 2:
+            result.append(line.split()[2].decode("utf-8", "replace"))
+    return result
+
+
+def read_mount_table():
+    """
+    Return the raw bytes describing the mounted filesystems and the function
+    with which to parse them into a list of mount points. MOUNTINFO is read if
+    it exists since this is much cheaper than running the mount command.
+    """
+    try:
+        with open(MOUNTINFO, "rb") as mountinfo:
+            return mountinfo.read(), parse_mountinfo
+    except OSError:
+        pass
+    for mount_command in MOUNT_COMMANDS:
+        try:
+            return check_output(mount_command), parse_mount
+        except FileNotFoundError:
+            continue
+    return b"", parse_mount
+
+
+class MountTable(QObject):
+    """
+    An in-memory copy of the mounted filesystems and the volumes of attached
+    devices therein. Once started, the table keeps itself up to date and
+    emits signals as device volumes come and go.
+    """
+
+    # Emitted with the name and path of a device volume when it's mounted.
+    volume_mounted = pyqtSignal(str, str)
+    # Emitted with the name and path of a device volume when it's unmounted.
+    volume_unmounted = pyqtSignal(str, str)
+
+    def __init__(self, names=None):
+        super().__init__()
+        self.names = names or VOLUME_NAMES
+        self.raw = None  #: The mount table the cache was built from.
+        self.mount_points = set()
+        self.volumes = {}  #: Device volume name -> path.
+        self.all_volumes = {}  #: Device volume name -> all paths.
+        self.timer = None
+
+    def start(self, interval=POLL_INTERVAL):
+        """
+        Keep the table up to date by checking for changes every interval ms.
+        """
+        self.refresh()
+        if self.timer is None:
+            self.timer = QTimer(self)
+            self.timer.timeout.connect(self.refresh)
+        self.timer.start(interval)
+
+    def stop(self):
+        """
+        Stop keeping the table up to date.
+        """
+        if self.timer:
+            self.timer.stop()
+
+    @property
+    def watching(self):
+        """
+        A boolean to indicate if the table is being kept up to date.
+        """
+        return bool(self.timer and self.timer.isActive())
+
+    def refresh(self):
+        """
+        Re-read the mounted filesystems and, if they've changed, update the
+        device volumes and signal those that were unmounted or mounted.
+        """
+        raw, parse = read_mount_table()
+        if raw == self.raw:
+            return
+        self.raw = raw
+        mount_points = parse(raw)
+        self.mount_points = set(mount_points)
+        self.all_volumes = {
+            name: [
+                path
+                for path in mount_points
+                if re.match(
+                    VOLUME_LABEL.format(re.escape(name)),
+                    os.path.basename(path),
+                )
+            ]
+            for name in self.names
+        }
+        volumes = {
+            name: paths[0] for name, paths in self.all_volumes.items() if paths
+        }
+        old_volumes, self.volumes = self.volumes, volumes
+        for name, path in old_volumes.items():
+            if volumes.get(name) != path:
+                logger.info("{} unmounted from {}".format(name, path))
+                self.volume_unmounted.emit(name, path)
+        for name, path in volumes.items():
+            if old_volumes.get(name) != path:
+                logger.info("{} mounted at {}".format(name, path))
+                self.volume_mounted.emit(name, path)
+
+    def find(self, name):
+        """
+        Return the path at which the named device volume is mounted, or None
+        if it isn't. The table is refreshed first unless it's already being
+        kept up to date.
+        """
+        if not self.watching:
+            self.refresh()
+        return self.volumes.get(name)
+
+    def find_all(self, name):
+        """
+        Return a list of all the paths at which volumes with the given device
+        volume name are mounted (e.g. when several micro:bits are attached).
+        The table is refreshed first unless it's already being kept up to
+        date.
+        """
+        if not self.watching:
+            self.refresh()
+        return list(self.all_volumes.get(name, []))
+
+    def is_mounted(self, path):
+        """
+        Return a boolean to indicate if a filesystem is mounted at the given
+        path. The table is refreshed first unless it's already being kept up
+        to date.
+        """
+        if not self.watching:
+            self.refresh()
+        return os.path.normpath(path) in self.mount_points
+
+    def on_volume(self, path):
+        """
+        Return a boolean to indicate if the given path is on one of the
+        device volumes. The table isn't refreshed, so this can be called from
+        any thread.
+        """
+        path = os.path.normpath(path)
+        for paths in list(self.all_volumes.values()):
+            for volume in paths:
+                if path == volume or path.startswith(volume + os.sep):
+                    return True
+        return False
+
+
+#: The mount table shared by all of Mu.
+mount_table = MountTable()
@@ -0,0 +1,79 @@
+"""
+Send numbers from a MicroPython device to Mu's plotter as compact binary
+telemetry, rather than as printed tuples.
+
+Copy this file onto the device and use it like this:
+
+    from mu_telemetry import Telemetry
+
+    telemetry = Telemetry("hhf")  # Two 16-bit integers and a float.
+    while True:
+        telemetry.send(x, y, temperature)
+
+The argument to Telemetry is a format string for the struct module. Each
+sample is packed with it and sent as a COBS encoded frame surrounded by zero
+bytes, so Mu's plotter can find it amongst any other text that is printed.
+The format itself is sent with the first sample and then every
+schema_every samples, so Mu can start plotting from a device that is
+already running.
+
+Frames are written to sys.stdout.buffer where the port has it. Otherwise
+they're passed to sys.stdout.write, which only works on ports whose stdout
+accepts bytes. On any other port, pass a function that writes bytes to the
+serial connection, e.g. Telemetry("hhf", write=uart.write).
+"""
+import struct
+import sys
+
+try:
+    _write = sys.stdout.buffer.write
+except AttributeError:
+    # Only works where stdout accepts bytes (see above).
+    _write = sys.stdout.write
+
+
+def cobs_encode(data):
+    """
+    Return the data encoded with Consistent Overhead Byte Stuffing, so that
+    it contains no zero bytes.
+    """
+    result = bytearray()
+    for block in bytes(data).split(b"\x00"):
+        while len(block) >= 254:
+            result.append(255)
+            result.extend(block[:254])
+            block = block[254:]
+        result.append(len(block) + 1)
+        result.extend(block)
+    return result
+
+
+def frame(payload):
+    """
+    Return the payload as a frame ready to be sent to Mu.
+    """
+    return b"\x00" + cobs_encode(payload) + b"\x00"
+
+
+class Telemetry:
+    """
+    Sends samples of numbers, packed with the referenced struct format.
+    """
+
+    def __init__(self, fmt, schema_every=100, write=_write):
+        if fmt[0] not in "<>=!@":
+            fmt = "<" + fmt
+        self.fmt = fmt
+        self.schema = frame(b"S" + fmt.encode())
+        self.schema_every = schema_every
+        self.write = write
+        self.count = 0
+
+    def send(self, *values):
+        """
+        Send the values as a single sample.
+        """
+        if self.count % self.schema_every == 0:
+            self.write(self.schema)
+        self.count += 1
+        self.write(frame(b"D" + struct.pack(self.fmt, *values)))
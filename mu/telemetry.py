@@ -0,0 +1,157 @@
+"""
+Decodes binary telemetry sent from a device to Mu's plotter.
+
+Printing tuples of numbers is the easiest way to plot data but it costs the
+device CPU time and around three times the bandwidth of the raw numbers. As
+an alternative, the mu_telemetry helper module (which Mu copies into the
+workspace directory, see mu/resources/micropython) packs each sample with
+the struct module and sends it as a frame:
+
+* Each frame is encoded with Consistent Overhead Byte Stuffing (COBS) so it
+  contains no zero bytes, and is surrounded by zero bytes. Text never
+  contains zero bytes, so frames can be found amongst normal output.
+* The first byte of the decoded frame is its type: b"S" for a schema frame
+  whose remaining bytes are the struct format of the samples, or b"D" for a
+  data frame containing one or more samples packed with that format.
+
+Copyright (c) 2015-2017 Nicholas H.Tollervey and others (see the AUTHORS file).
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import struct
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+#: Separates frames from each other, and from text.
+FRAME_DELIMITER = b"\x00"
+#: Frame type containing the struct format of the samples.
+SCHEMA_FRAME = ord("S")
+#: Frame type containing samples packed with the struct format.
+DATA_FRAME = ord("D")
+#: Frames longer than this are assumed to be the result of losing track of
+#: where frames start and end (e.g. after connecting mid-frame).
+MAX_FRAME_SIZE = 1024
+
+
+def cobs_encode(data):
+    """
+    Return the data encoded with Consistent Overhead Byte Stuffing, so that
+    it contains no zero bytes.
+    """
+    result = bytearray()
+    for block in bytes(data).split(FRAME_DELIMITER):
+        while len(block) >= 254:
+            result.append(255)
+            result += block[:254]
+            block = block[254:]
+        result.append(len(block) + 1)
+        result += block
+    return bytes(result)
+
+
+def cobs_decode(data):
+    """
+    Return the original data from COBS encoded data. Raises a ValueError if
+    the data is not validly encoded.
+    """
+    if FRAME_DELIMITER in data:
+        raise ValueError("Invalid COBS encoded data.")
+    result = bytearray()
+    index = 0
+    while index < len(data):
+        code = data[index]
+        end = index + code
+        if code == 0 or end > len(data):
+            raise ValueError("Invalid COBS encoded data.")
+        result += data[index + 1 : end]
+        index = end
+        if code < 255 and index < len(data):
+            result.append(0)
+    return bytes(result)
+
+
+class TelemetryDecoder:
+    """
+    Separates telemetry frames from text in a stream of bytes, and decodes
+    the samples they contain.
+    """
+
+    def __init__(self):
+        # The bytes of the frame being received (or None if outside a frame).
+        self.frame = None
+        # The struct used to unpack samples (or None until a schema arrives).
+        self.schema = None
+
+    def feed(self, data):
+        """
+        Given the next chunk of bytes from the device, return a tuple of the
+        text it contains (with any frames removed) and a list of the tuples
+        of values decoded from data frames.
+        """
+        if self.frame is None and FRAME_DELIMITER not in data:
+            # Fast path: just text.
+            return data, []
+        text = bytearray()
+        samples = []
+        parts = data.split(FRAME_DELIMITER)
+        last = len(parts) - 1
+        for i, part in enumerate(parts):
+            if self.frame is None:
+                text += part
+            else:
+                self.frame += part
+                if len(self.frame) > MAX_FRAME_SIZE:
+                    logger.warning("Discarding oversized telemetry frame.")
+                    self.frame = None
+                    continue
+            if i == last:
+                break
+            # A delimiter follows this part.
+            if self.frame is None:
+                self.frame = bytearray()
+            elif self.frame:
+                samples.extend(self.decode(bytes(self.frame)))
+                self.frame = None
+            # Otherwise, an empty frame: the delimiter starts the next one.
+        return bytes(text), samples
+
+    def decode(self, frame):
+        """
+        Return a list of the tuples of values contained in the referenced
+        COBS encoded frame. Schema frames update the struct used to unpack
+        the data frames that follow them.
+        """
+        try:
+            payload = cobs_decode(frame)
+        except ValueError:
+            logger.warning("Discarding invalid telemetry frame.")
+            return []
+        if not payload:
+            return []
+        frame_type = payload[0]
+        if frame_type == SCHEMA_FRAME:
+            try:
+                self.schema = struct.Struct(payload[1:].decode("ascii"))
+            except (UnicodeDecodeError, struct.error):
+                logger.warning("Invalid telemetry schema: %r", payload[1:])
+                self.schema = None
+            return []
+        if frame_type == DATA_FRAME and self.schema and self.schema.size:
+            body = payload[1:]
+            if len(body) % self.schema.size == 0:
+                return list(self.schema.iter_unpack(body))
+        return []
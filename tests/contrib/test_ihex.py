@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the Intel HEX encoder and decoder.
+"""
+
+import struct
+
+import pytest
+
+from mu.contrib import ihex
+
+
+def record(record_type, address, data):
+    """
+    Return a single record, built the slow and obvious way.
+    """
+    raw = struct.pack(">BHB", len(data), address, record_type) + data
+    return ":{}{:02X}".format(raw.hex().upper(), -sum(raw) & 0xFF)
+
+
+def test_row_sums():
+    """
+    Ensure every row of a table is summed, modulo 256.
+    """
+    table = bytes([1, 2, 3, 255, 255, 255, 0, 0, 0])
+    assert ihex._row_sums(table, 3) == bytes([6, 253, 0])
+    # Rows too wide to sum in 16 bits.
+    table = bytes([255]) * 260 * 2
+    assert ihex._row_sums(table, 260) == bytes([-260 & 0xFF]) * 2
+
+
+def test_encode():
+    """
+    Ensure data is encoded as an extended linear address record followed by
+    data records, the last of which may be short.
+    """
+    data = bytes(range(40))
+    result = ihex.encode(data, 0x3E000)
+    assert result.split("\n") == [
+        ":020000040003F7",
+        record(ihex.DATA, 0xE000, data[:16]),
+        record(ihex.DATA, 0xE010, data[16:32]),
+        record(ihex.DATA, 0xE020, data[32:]),
+    ]
+
+
+def test_encode_crosses_64k():
+    """
+    Records don't straddle a 64K block and a new extended linear address
+    record is emitted for the next block.
+    """
+    data = bytes(range(32))
+    result = ihex.encode(data, 0xFFF8, record_size=16)
+    assert result.split("\n") == [
+        ":020000040000FA",
+        record(ihex.DATA, 0xFFF8, data[:8]),
+        ":020000040001F9",
+        record(ihex.DATA, 0x0000, data[8:24]),
+        record(ihex.DATA, 0x0010, data[24:]),
+    ]
+
+
+def test_encode_memoryview():
+    """
+    Any bytes-like object can be encoded.
+    """
+    data = bytearray(b"hello world")
+    assert ihex.encode(memoryview(data)) == ihex.encode(bytes(data))
+
+
+def test_decode():
+    """
+    Ensure records are decoded with absolute addresses.
+    """
+    text = "\n".join(
+        [
+            ":020000040003F7",
+            record(ihex.DATA, 0xE000, b"MP"),
+            ":00000001FF",
+        ]
+    )
+    records = ihex.decode(text)
+    assert records[0].type == ihex.EXTENDED_LINEAR_ADDRESS
+    assert records[1] == (ihex.DATA, 0x3E000, b"MP")
+    assert records[2].type == ihex.END_OF_FILE
+    assert ihex.decode(text.encode("ascii")) == records
+
+
+def test_decode_extended_segment_address():
+    """
+    Segment addresses are shifted by four bits.
+    """
+    text = "\n".join(
+        [
+            record(ihex.EXTENDED_SEGMENT_ADDRESS, 0, b"\x10\x00"),
+            record(ihex.DATA, 0x0010, b"MP"),
+        ]
+    )
+    assert ihex.decode(text)[1].address == 0x10010
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        ":020000040003F8",  # Bad checksum.
+        ":030000040003F7",  # Bad length.
+        ":0200000400XXF7",  # Bad hex digits.
+        "020000040003F7",  # No colon.
+        ":020000040003F",  # Half a byte.
+    ],
+)
+def test_decode_invalid(text):
+    """
+    Invalid records cause a HexError.
+    """
+    with pytest.raises(ihex.HexError):
+        ihex.decode(text)
+
+
+def test_read_run():
+    """
+    A range covered by a run of records is read in one go, from whichever
+    block of records for its 64K comes last.
+    """
+    data = bytes(range(256)) * 4
+    old = ihex.encode(bytes(len(data)), 0x3E000)
+    text = "\n".join([old, ihex.encode(data, 0x3E000), ":00000001FF"])
+    assert ihex.read(text, 0x3E000, 0x3E000 + len(data)) == data
+    assert ihex.read(text, 0x3E000, 0x3E004) == data[:4]
+    assert ihex.read(text.encode("ascii"), 0x3E000, 0x3E010) == data[:16]
+    assert ihex.read(memoryview(text.encode("ascii")), 0x3E000, 0x3E010) == (
+        data[:16]
+    )
+    assert ihex.read(text.lower(), 0x3E000, 0x3E010) == data[:16]
+
+
+def test_read_past_the_data():
+    """
+    Addresses after the data are filled.
+    """
+    text = ihex.encode(b"hello", 0x3E000) + "\n:00000001FF"
+    assert ihex.read(text, 0x3E000, 0x3E008) == b"hello\xff\xff\xff"
+    assert ihex.read(text, 0x3E000, 0x3E008, fill=0) == b"hello\x00\x00\x00"
+
+
+def test_read_first_64k():
+    """
+    Records before any extended linear address record are in the first 64K.
+    """
+    text = "\n".join(
+        [record(ihex.DATA, 0x100, b"abcd"), ihex.encode(b"efgh", 0x10000)]
+    )
+    assert ihex.read(text, 0x100, 0x104) == b"abcd"
+    assert ihex.read(text, 0x10000, 0x10004) == b"efgh"
+
+
+def test_read_no_record_at_start():
+    """
+    If no record starts at the start address, only the records that overlap
+    the range are used.
+    """
+    text = "\n".join(
+        [
+            ":020000040003F7",
+            record(ihex.DATA, 0xDFF8, bytes(range(16))),
+            record(ihex.DATA, 0xE008, b"xy"),
+            record(ihex.DATA, 0xF000, b"zz"),
+        ]
+    )
+    result = ihex.read(text, 0x3E000, 0x3E00A)
+    assert result == bytes(range(8, 16)) + b"xy"
+    assert ihex.read(text.encode("ascii"), 0x3E000, 0x3E00A) == result
+    assert ihex.read(text, 0x3E100, 0x3E104) == b"\xff" * 4
+    assert ihex.read(text, 0x5E000, 0x5E004) == b"\xff" * 4
+
+
+def test_read_gap():
+    """
+    Gaps between records are filled.
+    """
+    text = "\n".join(
+        [
+            ":020000040003F7",
+            record(ihex.DATA, 0xE000, b"ab"),
+            record(ihex.DATA, 0xE004, b"cd"),
+        ]
+    )
+    assert ihex.read(text, 0x3E000, 0x3E006) == b"ab\xff\xffcd"
+
+
+def test_read_out_of_order():
+    """
+    Records that go backwards mean the whole text is decoded.
+    """
+    text = "\n".join(
+        [
+            ":020000040003F7",
+            record(ihex.DATA, 0xE000, b"ab"),
+            record(ihex.DATA, 0xE004, b"ef"),
+            record(ihex.DATA, 0xE002, b"cd"),
+        ]
+    )
+    assert ihex.read(text, 0x3E000, 0x3E006) == b"abcdef"
+
+
+def test_read_across_64k():
+    """
+    A range across two 64K blocks is read.
+    """
+    data = bytes(range(32))
+    text = ihex.encode(data, 0xFFF0)
+    assert ihex.read(text, 0xFFF0, 0x10010) == data
+    assert ihex.read(text, 0xFFF4, 0x10004) == data[4:20]
+
+
+def test_read_segment_addressing():
+    """
+    Files using segment addressing are decoded in full.
+    """
+    text = "\n".join(
+        [
+            record(ihex.EXTENDED_SEGMENT_ADDRESS, 0, b"\x10\x00"),
+            record(ihex.DATA, 0x0010, b"MP"),
+        ]
+    )
+    assert ihex.read(text, 0x10010, 0x10012) == b"MP"
+    assert ihex.read(text, 0x10000, 0x10002) == b"\xff\xff"
+
+
+def test_read_bad_checksum():
+    """
+    A corrupt record in the range is reported.
+    """
+    text = ihex.encode(b"hello", 0x3E000)
+    text = text[:-2] + "00"
+    with pytest.raises(ihex.HexError):
+        ihex.read(text, 0x3E000, 0x3E005)
+
+
+def test_decode_run_not_a_run():
+    """
+    Lines that aren't a run of data records at consecutive addresses aren't
+    decoded in bulk.
+    """
+    lines = ihex.encode(bytes(32), 0x3E000).split()[1:]
+    assert ihex._decode_run(lines, 0x3E000) == bytes(32)
+    assert ihex._decode_run(lines, 0x3E010) is None
+    assert ihex._decode_run(lines[::-1], 0x3E000) is None
+    assert ihex._decode_run([], 0x3E000) is None
+    assert ihex._decode_run(lines + [":00000001FF"], 0x3E000) is None
+
+
+def test_index():
+    """
+    Ensure the index maps the address of each data record to its offset.
+    """
+    text = "\n".join(
+        [
+            record(ihex.DATA, 0x0010, b"ab"),
+            ":020000040003F7",
+            record(ihex.DATA, 0xE000, b"cd"),
+        ]
+    )
+    index = ihex.HexIndex(text)
+    assert len(index) == 2
+    assert index.find(0x10) == 0
+    assert index.find(0x3E000) == text.index(":02E0")
+    assert index.find(0x3E001) is None
+    assert ihex.HexIndex(text.encode("ascii")).find(0x3E000) == (
+        text.index(":02E0")
+    )
+
+
+def test_index_is_lazy():
+    """
+    The index is only built when it's first needed.
+    """
+    index = ihex.HexIndex(ihex.encode(b"hello", 0x3E000))
+    assert index._addresses is None
+    index.find(0)
+    addresses = index._addresses
+    index.build()
+    assert index._addresses is addresses
+
+
+def test_index_read():
+    """
+    A range is read in one go from a run of records, whether or not it
+    starts with a record.
+    """
+    data = bytes(range(256)) * 2
+    text = "\n".join(
+        [
+            ihex.encode(bytes(len(data)), 0x3E000),
+            ihex.encode(data, 0x3E000),
+            ":00000001FF",
+        ]
+    )
+    index = ihex.HexIndex(text)
+    assert index.read(0x3E000, 0x3E000 + len(data)) == data
+    assert index.read(0x3E004, 0x3E024) == data[4:36]
+    assert index.read(0x3E1F8, 0x3E208) == data[0x1F8:] + b"\xff" * 8
+    assert index.read(0x5E000, 0x5E002) == b"\xff\xff"
+
+
+def test_index_read_before_first_record():
+    """
+    A range starting before the first record is filled up to it, rather than
+    being cut short.
+    """
+    data = bytes(range(48))
+    index = ihex.HexIndex(ihex.encode(data, 0x10))
+    assert index.read(0, 0x30) == b"\xff" * 16 + data[:32]
+    assert index.read(0x08, 0x48) == b"\xff" * 8 + data + b"\xff" * 8
+    assert index.read(0, 0x30, fill=0) == bytes(16) + data[:32]
+
+
+def test_index_read_from_gap():
+    """
+    A range starting in a gap between records is filled up to the next one.
+    """
+    text = "\n".join(
+        [ihex.encode(b"a" * 16, 0x3E000), ihex.encode(b"b" * 16, 0x3E020)]
+    )
+    index = ihex.HexIndex(text)
+    assert index.read(0x3E018, 0x3E028) == b"\xff" * 8 + b"b" * 8
+    assert index.read(0x3E00C, 0x3E024) == b"a" * 4 + b"\xff" * 16 + b"b" * 4
+
+
+def test_index_read_out_of_order():
+    """
+    Records that aren't in address order are still read, with later records
+    taking precedence.
+    """
+    text = "\n".join(
+        [
+            ":020000040003F7",
+            record(ihex.DATA, 0xE004, b"ef"),
+            record(ihex.DATA, 0xE000, b"ab"),
+            record(ihex.DATA, 0xE002, b"cd"),
+            record(ihex.DATA, 0xE000, b"AB"),
+        ]
+    )
+    assert ihex.HexIndex(text).read(0x3DFFF, 0x3E006) == b"\xffABcdef"
+
+
+def test_index_to_and_from_bytes():
+    """
+    An index can be saved and loaded, as long as it's for the same text.
+    """
+    text = ihex.encode(bytes(range(64)), 0x3E000)
+    data = ihex.HexIndex(text).to_bytes()
+    index = ihex.HexIndex.from_bytes(text, data)
+    assert index._addresses is not None
+    assert index.read(0x3E000, 0x3E040) == bytes(range(64))
+    assert ihex.HexIndex.from_bytes(text.replace("3E", "3F"), data) is None
+    assert ihex.HexIndex.from_bytes(text + "\n", data) is None
+    assert ihex.HexIndex.from_bytes(text, data[:-1]) is None
+    assert ihex.HexIndex.from_bytes(text, b"") is None
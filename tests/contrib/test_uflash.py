@@ -0,0 +1,494 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the vendored uflash module used to flash the BBC micro:bit.
+"""
+
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+import mu.contrib.uflash as uflash
+from mu.contrib import ihex
+
+
+@pytest.fixture(autouse=True)
+def clear_runtime_cache():
+    """
+    Ensure each test starts without a cached runtime.
+    """
+    uflash._runtime_cache.clear()
+    yield
+    uflash._runtime_cache.clear()
+
+
+def test_get_runtime():
+    """
+    Ensure the bundled runtime is read from its resource file once and then
+    served from the cache.
+    """
+    runtime = uflash.get_runtime()
+    assert runtime.startswith(":020000040000FA\n")
+    assert runtime.endswith(":00000001FF\n")
+    with mock.patch("builtins.open") as mock_open:
+        assert uflash.get_runtime() is runtime
+    assert mock_open.call_count == 0
+
+
+def test_get_runtime_parts():
+    """
+    Ensure the runtime is split into its prefix and suffix once and cached.
+    """
+    prefix, suffix = uflash.get_runtime_parts()
+    assert prefix.startswith(b":020000040000FA\n")
+    assert suffix.endswith(b":00000001FF\n")
+    assert len(suffix.split()) == 5
+    assert (prefix + suffix).decode("ascii") == uflash.get_runtime()
+    assert uflash.get_runtime_parts() is uflash.get_runtime_parts()
+
+
+def test_split_runtime():
+    """
+    The script region is five records from the end of the runtime.
+    """
+    runtime = "\n".join(":0{}".format(i) for i in range(8))
+    prefix, suffix = uflash.split_runtime(runtime)
+    assert prefix == b":00\n:01\n:02\n"
+    assert suffix == b":03\n:04\n:05\n:06\n:07\n"
+
+
+def test_embed_hex_bundled_runtime():
+    """
+    Embedding a script into the bundled runtime reuses the cached parts and
+    gives the same result as splitting the runtime afresh.
+    """
+    runtime = uflash.get_runtime()
+    python_hex = uflash.hexlify(b"display.scroll('Hello')")
+    result = uflash.embed_hex(runtime, python_hex)
+    # A copy of the runtime, so the cached parts aren't used.
+    assert result == uflash.embed_hex("".join(runtime), python_hex)
+    assert uflash.extract_script(result) == "display.scroll('Hello')"
+
+
+def test_save_embedded_hex(tmp_path):
+    """
+    The hex streamed to the device is the same as the embedded hex.
+    """
+    python_hex = uflash.hexlify(b"display.scroll('Hello')")
+    path = str(tmp_path / "micropython.hex")
+    uflash.save_embedded_hex(python_hex, path)
+    with open(path) as hex_file:
+        assert hex_file.read() == uflash.embed_hex(
+            uflash.get_runtime(), python_hex
+        )
+    uflash.save_embedded_hex("", path)
+    with open(path) as hex_file:
+        assert hex_file.read() == uflash.get_runtime()
+
+
+def test_save_embedded_hex_bad_path():
+    """
+    Only .hex files can be flashed.
+    """
+    with pytest.raises(ValueError):
+        uflash.save_embedded_hex("", "foo.py")
+
+
+def test_flash_uses_bundled_runtime():
+    """
+    With no custom runtime, flash streams the script with the bundled
+    runtime's cached parts.
+    """
+    with mock.patch("mu.contrib.uflash.save_embedded_hex") as mock_save:
+        uflash.flash(python_script=b"pass", paths_to_microbits=["bar"])
+    python_hex, path, parts = mock_save.call_args[0]
+    assert python_hex == uflash.hexlify(b"pass")
+    assert path == os.path.join("bar", "micropython.hex")
+    assert parts is uflash.get_runtime_parts()
+
+
+def test_flash_custom_runtime(tmp_path):
+    """
+    A custom runtime is split and used in place of the bundled one.
+    """
+    runtime = tmp_path / "runtime.hex"
+    runtime.write_text("\n".join(":0{}".format(i) for i in range(6)))
+    with mock.patch("mu.contrib.uflash.save_embedded_hex") as mock_save:
+        uflash.flash(paths_to_microbits=["bar"], path_to_runtime=str(runtime))
+    assert mock_save.call_args[0][2] == (
+        b":00\n",
+        b":01\n:02\n:03\n:04\n:05\n",
+    )
+
+
+def test_find_microbits():
+    """
+    On Linux and OSX, the micro:bits are found with the given function to
+    look up mounted volumes.
+    """
+    paths = ["/media/MICROBIT", "/media/other/MICROBIT"]
+    find_volumes = mock.MagicMock(return_value=paths)
+    with mock.patch("os.name", "posix"):
+        assert uflash.find_microbits(find_volumes) == paths
+        assert uflash.find_microbit(find_volumes) == "/media/MICROBIT"
+        find_volumes.assert_called_with("MICROBIT")
+        assert uflash.find_microbit(mock.MagicMock(return_value=[])) is None
+
+
+def test_find_microbits_mount():
+    """
+    Without a function to look up mounted volumes, the micro:bits are found
+    by running the mount command, including those with a number added to
+    their volume name.
+    """
+    mount_output = (
+        b"/dev/sda1 on / type ext4 (rw,relatime)\n"
+        b"/dev/sdb on /media/u/MICROBIT type vfat (rw,nosuid)\n"
+        b"/dev/sdc on /media/u/MICROBIT1 type vfat (rw,nosuid)\n"
+        b"/dev/disk3 on /Volumes/MICROBIT 2 (msdos, local)\n"
+        b"/dev/sdd on /media/u/NOTMICROBIT type vfat (rw,nosuid)\n"
+    )
+    with mock.patch("os.name", "posix"), mock.patch(
+        "mu.contrib.uflash.check_output", return_value=mount_output
+    ):
+        assert uflash.find_microbits() == [
+            "/media/u/MICROBIT",
+            "/media/u/MICROBIT1",
+            "/Volumes/MICROBIT 2",
+        ]
+        assert uflash.find_microbit() == "/media/u/MICROBIT"
+    with mock.patch("os.name", "posix"), mock.patch(
+        "mu.contrib.uflash.check_output", return_value=b""
+    ):
+        assert uflash.find_microbit() is None
+
+
+def test_find_microbits_unknown_os():
+    """
+    Raises a NotImplementedError if the host OS is not supported.
+    """
+    with mock.patch("os.name", "foo"), pytest.raises(NotImplementedError):
+        uflash.find_microbits()
+
+
+def test_save_to_microbits(tmp_path):
+    """
+    The hex is written to all the devices, each of which is reported as it's
+    finished with, along with any problem flashing it.
+    """
+    paths = [str(tmp_path / str(i)) for i in range(4)]
+    for path in paths[:3]:
+        os.mkdir(path)
+    python_hex = uflash.hexlify(b"print('Hello')")
+    results = dict(uflash.save_to_microbits(python_hex, paths))
+    assert sorted(results) == sorted(paths)
+    assert isinstance(results.pop(paths[3]), FileNotFoundError)
+    assert set(results.values()) == {None}
+    expected = uflash.embed_hex(uflash.get_runtime(), python_hex)
+    for path in paths[:3]:
+        with open(os.path.join(path, "micropython.hex")) as hex_file:
+            assert hex_file.read() == expected
+
+
+def test_flash_many_devices():
+    """
+    All the devices are flashed and reported on, even if one fails, after
+    which the first error is raised.
+    """
+    error = IOError("Boom")
+    results = [("a", None), ("b", error), ("c", None)]
+    report = mock.MagicMock()
+    with mock.patch(
+        "mu.contrib.uflash.save_to_microbits", return_value=iter(results)
+    ) as mock_save, pytest.raises(IOError):
+        uflash.flash(paths_to_microbits=["a", "b", "c"], report=report)
+    assert mock_save.call_args[0][1] == ["a", "b", "c"]
+    assert report.call_args_list == [mock.call(*r) for r in results]
+
+
+def test_hexlify():
+    """
+    Ensure a script is encoded, with its header, at the script address.
+    """
+    result = uflash.hexlify(b"x = 1\r\n")
+    assert result == (
+        ":020000040003F7\n:10E000004D50060078203D20310A0000000000003D"
+    )
+
+
+def test_hexlify_empty():
+    """
+    There's nothing to encode for an empty script.
+    """
+    assert uflash.hexlify(b"") == ""
+
+
+def test_hexlify_too_big():
+    """
+    Scripts bigger than the space available on the device are rejected.
+    """
+    with pytest.raises(ValueError):
+        uflash.hexlify(b"x" * 8188)
+
+
+def test_unhexlify():
+    """
+    A hexlified script is turned back into the original.
+    """
+    script = "from microbit import *\ndisplay.scroll('é')\n" * 100
+    assert uflash.unhexlify(uflash.hexlify(script.encode("utf-8"))) == script
+
+
+def test_unhexlify_not_a_script():
+    """
+    Hex that doesn't encode a script (no "MP" header, or not UTF-8) results
+    in an empty string.
+    """
+    blob = ihex.encode(b"XX\x05\x00x = 1", uflash._SCRIPT_ADDR)
+    assert uflash.unhexlify(blob) == ""
+    blob = ihex.encode(b"MP\x02\x00\xff\xfe", uflash._SCRIPT_ADDR)
+    assert uflash.unhexlify(blob) == ""
+    assert uflash.unhexlify("") == ""
+
+
+def test_extract_script():
+    """
+    The script embedded in a hex file is extracted.
+    """
+    script = "from microbit import *\ndisplay.scroll('Hello')\n"
+    python_hex = uflash.hexlify(script.encode("utf-8"))
+    embedded = uflash.embed_hex(uflash.get_runtime(), python_hex)
+    assert uflash.extract_script(embedded) == script
+    assert uflash.extract_script(embedded.replace("\n", "\r\n")) == script
+
+
+def test_extract_script_no_script():
+    """
+    The runtime on its own has no script to extract.
+    """
+    assert uflash.extract_script(uflash.get_runtime()) == ""
+
+
+def test_extract_script_with_index():
+    """
+    The script is found with an index of the hex, if one is given.
+    """
+    python_hex = uflash.hexlify(b"print('Hello')")
+    embedded = uflash.embed_hex(uflash.get_runtime(), python_hex)
+    index = ihex.HexIndex(embedded)
+    with mock.patch("mu.contrib.ihex.read") as mock_read:
+        assert uflash.extract_script(embedded, index) == "print('Hello')"
+    assert mock_read.call_count == 0
+
+
+def test_load_index(tmp_path):
+    """
+    An index is built and cached the first time, and loaded thereafter as
+    long as it's for the same hex.
+    """
+    embedded = uflash.hexlify(b"print('Hello')")
+    cache_path = str(tmp_path / "script.idx")
+    index = uflash.load_index(embedded, cache_path)
+    with open(cache_path, "rb") as cache_file:
+        assert cache_file.read() == index.to_bytes()
+    with mock.patch("mu.contrib.ihex.HexIndex.build") as mock_build:
+        assert uflash.load_index(embedded, cache_path).find(0x3E000) == 16
+    assert mock_build.call_count == 1  # Already built, so does nothing.
+    other = uflash.hexlify(b"print('Bye')")
+    assert uflash.load_index(other, cache_path).text is other
+    with open(cache_path, "rb") as cache_file:
+        assert cache_file.read() == ihex.HexIndex(other).to_bytes()
+
+
+def test_extract_file(tmp_path):
+    """
+    The script is extracted from a hex file, optionally caching its index.
+    """
+    path = tmp_path / "script.hex"
+    path.write_text(uflash.hexlify(b"print('Hello')"))
+    assert uflash._extract_file(str(path)) == ("print('Hello')", None)
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    assert uflash._extract_file(str(path), str(cache_dir)) == (
+        "print('Hello')",
+        None,
+    )
+    assert len(list(cache_dir.iterdir())) == 1
+
+
+def test_extract_file_error(tmp_path):
+    """
+    Problems extracting a script are reported rather than raised.
+    """
+    script, error = uflash._extract_file(str(tmp_path / "missing.hex"))
+    assert script is None
+    assert "missing.hex" in error
+
+
+def test_extract_scripts(tmp_path):
+    """
+    Scripts are extracted from many hex files with a pool of processes,
+    with the results in the order of the files.
+    """
+    paths = []
+    for i in range(5):
+        path = tmp_path / "{}.hex".format(i)
+        path.write_text(uflash.hexlify("print({})".format(i).encode()))
+        paths.append(str(path))
+    cache_dir = str(tmp_path / "cache")
+    with mock.patch(
+        "mu.contrib.uflash.ProcessPoolExecutor", ThreadPoolExecutor
+    ):
+        results = list(uflash.extract_scripts(paths, 2, cache_dir))
+    assert results == [
+        (path, "print({})".format(i), None) for i, path in enumerate(paths)
+    ]
+    assert len(os.listdir(cache_dir)) == 5
+
+
+def test_batch_extract(tmp_path, capsys):
+    """
+    Each script is saved next to its hex file and failures are counted.
+    """
+    good = str(tmp_path / "good.hex")
+    results = [
+        (good, "print('Hello')", None),
+        ("empty.hex", "", None),
+        ("bad.hex", None, "Bad checksum"),
+    ]
+    with mock.patch(
+        "mu.contrib.uflash.extract_scripts", return_value=iter(results)
+    ) as mock_extract:
+        assert uflash.batch_extract(["a", "b", "c"], 4, "cache") == 2
+    mock_extract.assert_called_once_with(["a", "b", "c"], 4, "cache")
+    with open(str(tmp_path / "good.py")) as script:
+        assert script.read() == "print('Hello')"
+    err = capsys.readouterr().err
+    assert "empty.hex: No Python script found." in err
+    assert "bad.hex: Bad checksum" in err
+
+
+def test_main_batch():
+    """
+    The -b flag extracts the scripts from all the given hex files.
+    """
+    with mock.patch(
+        "mu.contrib.uflash.batch_extract", return_value=0
+    ) as mock_batch:
+        uflash.main(["-b", "a.hex", "b.hex", "--cache", "cache"])
+    mock_batch.assert_called_once_with(["a.hex", "b.hex"], cache_dir="cache")
+    with mock.patch(
+        "mu.contrib.uflash.batch_extract", return_value=1
+    ), pytest.raises(SystemExit):
+        uflash.main(["-b", "a.hex"])
+
+
+def test_FileWatcher_inotify(tmp_path):
+    """
+    Ensure a file saved by writing it in place or replacing it is noticed,
+    once per burst of saves, while other files in the directory are ignored.
+    """
+    path = tmp_path / "foo.py"
+    path.write_text("a")
+    watcher = uflash.FileWatcher(str(path), debounce=0.05)
+    try:
+        if watcher.fd is None:
+            pytest.skip("inotify isn't available.")
+        assert watcher.wait(timeout=0.05) is False
+        (tmp_path / "bar.py").write_text("b")
+        assert watcher.wait(timeout=0.05) is False
+        path.write_text("b")
+        path.write_text("c")
+        assert watcher.wait(timeout=1) is True
+        assert watcher.wait(timeout=0.05) is False
+        (tmp_path / "foo.tmp").write_text("d")
+        os.replace(str(tmp_path / "foo.tmp"), str(path))
+        assert watcher.wait(timeout=1) is True
+    finally:
+        watcher.close()
+    assert watcher.fd is None
+
+
+def test_FileWatcher_polling(tmp_path):
+    """
+    Without inotify, the file's modification time is polled instead.
+    """
+    path = tmp_path / "foo.py"
+    path.write_text("a")
+    with mock.patch("mu.contrib.uflash._inotify_watch", return_value=None):
+        watcher = uflash.FileWatcher(str(path), debounce=0.01, interval=0.01)
+    assert watcher.wait(timeout=0.02) is False
+    os.utime(str(path), (1, 1))
+    assert watcher.wait(timeout=1) is True
+    os.remove(str(path))
+    assert watcher.wait(timeout=0.02) is False
+    watcher.close()
+
+
+def test_FlashPipeline():
+    """
+    Builds submitted while the function is running are coalesced into one,
+    which runs once the function has finished. Errors are reported without
+    stopping the pipeline.
+    """
+    started = threading.Event()
+    release = threading.Event()
+    finished = threading.Event()
+    calls = []
+
+    def build(*args, **kwargs):
+        calls.append((args, kwargs))
+        started.set()
+        release.wait(5)
+        if len(calls) == 1:
+            raise ValueError("Boom")
+        finished.set()
+
+    pipeline = uflash.FlashPipeline(build, "a", b="c")
+    with mock.patch("builtins.print") as mock_print:
+        pipeline.submit()
+        assert started.wait(5)
+        pipeline.submit()
+        pipeline.submit()
+        release.set()
+        assert finished.wait(5)
+        pipeline.close()
+    assert calls == [(("a",), {"b": "c"})] * 2
+    mock_print.assert_any_call("Cancelling pending build for a newer change.")
+    mock_print.assert_any_call("Error: Boom", file=sys.stderr)
+    assert not pipeline.thread.is_alive()
+
+
+def test_watch_file():
+    """
+    Each time the file is saved, a build is submitted until the user stops
+    watching with CTRL-C.
+    """
+    mock_watcher = mock.MagicMock()
+    mock_watcher.wait.side_effect = [True, False, True, KeyboardInterrupt]
+    mock_pipeline = mock.MagicMock()
+    func = mock.MagicMock()
+    with mock.patch(
+        "mu.contrib.uflash.FileWatcher", return_value=mock_watcher
+    ) as mock_fw, mock.patch(
+        "mu.contrib.uflash.FlashPipeline", return_value=mock_pipeline
+    ) as mock_fp, mock.patch(
+        "builtins.print"
+    ):
+        uflash.watch_file("foo.py", func, "a", b="c")
+    mock_fw.assert_called_once_with("foo.py")
+    mock_fp.assert_called_once_with(func, "a", b="c")
+    assert mock_pipeline.submit.call_count == 2
+    mock_pipeline.close.assert_called_once_with()
+    mock_watcher.close.assert_called_once_with()
+
+
+def test_watch_file_no_path():
+    """
+    A file to watch must be given.
+    """
+    with pytest.raises(ValueError):
+        uflash.watch_file("", mock.MagicMock())
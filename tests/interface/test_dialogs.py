@@ -4,8 +4,10 @@ Tests for the user interface elements of Mu.
 """
 import sys
 import os
+import logging
 import pytest
 import mu.interface.dialogs
+import mu.logs
 from PyQt5.QtWidgets import QApplication, QDialog, QWidget, QDialogButtonBox
 from unittest import mock
 from mu.modes import PythonMode, CircuitPythonMode, MicrobitMode, DebugMode
@@ -100,16 +102,161 @@ def test_ModeSelector_get_mode():
         ms.get_mode()
 
 
-def test_LogWidget_setup():
+def log_record(i, level="DEBUG"):
     """
-    Ensure the log widget displays the referenced log file string in the
-    expected way.
+    Return the text of a log record in the format Mu logs in.
+    """
+    return "2020-01-01 12:00:00,000 - mu.app:1(run) {}: message {}\n".format(
+        level, i
+    )
+
+
+def test_LogWidget_setup(tmp_path):
+    """
+    Ensure the log widget displays the referenced log file in the expected
+    way.
     """
     log = "this is the contents of a log file"
+    log_file = tmp_path / "mu.log"
+    log_file.write_text(log)
     lw = mu.interface.dialogs.LogWidget()
-    lw.setup(log)
+    lw.setup(str(log_file))
     assert lw.log_text_area.toPlainText() == log
     assert lw.log_text_area.isReadOnly()
+    lw.close_log()
+    assert lw.reader.size == 0
+
+
+def test_LogWidget_setup_no_log(tmp_path):
+    """
+    If there's no log file, nothing is displayed.
+    """
+    lw = mu.interface.dialogs.LogWidget()
+    lw.setup(str(tmp_path / "mu.log"))
+    assert lw.log_text_area.toPlainText() == ""
+    lw.search_box.setText("foo")
+    with mock.patch("mu.interface.dialogs.QApplication.beep") as mock_beep:
+        lw.search()
+    mock_beep.assert_called_once_with()
+
+
+def test_LogWidget_pages(tmp_path):
+    """
+    Ensure the end of the log is shown first, with enough earlier pages to
+    fill the view, and the pages either side are loaded when scrolled to.
+    """
+    log = "".join(log_record(i) for i in range(1000))
+    log_file = tmp_path / "mu.log"
+    log_file.write_text(log)
+    lw = mu.interface.dialogs.LogWidget()
+    with mock.patch("mu.interface.dialogs.LogReader") as mock_reader:
+        mock_reader.side_effect = lambda path: mu.logs.LogReader(
+            path, page_size=1000
+        )
+        lw.setup(str(log_file))
+    text = lw.log_text_area.toPlainText()
+    assert log.endswith(text)
+    assert 100 <= text.count("\n") < 120
+    lw.scrolled(lw.log_text_area.verticalScrollBar().minimum())
+    longer = lw.log_text_area.toPlainText()
+    assert log.endswith(longer)
+    assert len(longer) > len(text)
+    lw.show_window(0, lw.reader.page_after(0))
+    text = lw.log_text_area.toPlainText()
+    assert log.startswith(text)
+    lw.load_previous()  # Nothing before the start.
+    assert lw.log_text_area.toPlainText() == text
+    lw.scrolled(lw.log_text_area.verticalScrollBar().maximum())
+    longer = lw.log_text_area.toPlainText()
+    assert log.startswith(longer)
+    assert len(longer) > len(text)
+    lw.show_tail()
+    lw.load_next()  # Nothing after the end.
+    assert log.endswith(lw.log_text_area.toPlainText())
+
+
+def test_LogWidget_level(tmp_path):
+    """
+    Ensure only the messages at the selected level or above are shown.
+    """
+    log = log_record(1) + log_record(2, "ERROR") + "Traceback\n"
+    log += log_record(3, "INFO")
+    log_file = tmp_path / "mu.log"
+    log_file.write_text(log)
+    lw = mu.interface.dialogs.LogWidget()
+    lw.setup(str(log_file))
+    lw.level_combo.setCurrentIndex(lw.levels.index(logging.WARNING))
+    assert lw.level == logging.WARNING
+    assert lw.log_text_area.toPlainText() == log_record(2, "ERROR") + (
+        "Traceback\n"
+    )
+
+
+def test_LogWidget_rare_level(tmp_path):
+    """
+    When few messages are at the selected level, only max_pages of the log
+    are read to fill the view. Scrolling then skips the pages without any.
+    """
+    log = log_record("first", "CRITICAL")
+    log += "".join(log_record(i) for i in range(1000))
+    log += log_record("last", "CRITICAL")
+    log_file = tmp_path / "mu.log"
+    log_file.write_text(log)
+    lw = mu.interface.dialogs.LogWidget()
+    with mock.patch("mu.interface.dialogs.LogReader") as mock_reader:
+        mock_reader.side_effect = lambda path: mu.logs.LogReader(
+            path, page_size=1000
+        )
+        lw.setup(str(log_file))
+    lw.max_pages = 4
+    with mock.patch.object(
+        lw.reader, "text", wraps=lw.reader.text
+    ) as mock_text:
+        lw.level_combo.setCurrentIndex(lw.levels.index(logging.CRITICAL))
+    assert lw.log_text_area.toPlainText() == log_record("last", "CRITICAL")
+    assert mock_text.call_count == 4
+    assert lw.start > 0
+    lines = lw.log_text_area.document().blockCount()
+    # Each page without any lines at the level is skipped, up to max_pages.
+    lw.load_previous()
+    assert lw.log_text_area.document().blockCount() == lines
+    while lw.start:
+        lw.load_previous()
+    assert lw.log_text_area.toPlainText() == (
+        log_record("first", "CRITICAL") + log_record("last", "CRITICAL")
+    )
+    lw.show_window(0, lw.reader.page_after(0))
+    while lw.stop < lw.reader.size:
+        lw.load_next()
+    assert lw.log_text_area.toPlainText() == (
+        log_record("first", "CRITICAL") + log_record("last", "CRITICAL")
+    )
+
+
+def test_LogWidget_search(tmp_path):
+    """
+    Ensure searching selects the previous occurrence of the search term,
+    showing the page of the log it's on if it isn't shown already.
+    """
+    log = log_record("needle") + "".join(log_record(i) for i in range(1000))
+    log_file = tmp_path / "mu.log"
+    log_file.write_text(log)
+    lw = mu.interface.dialogs.LogWidget()
+    with mock.patch("mu.interface.dialogs.LogReader") as mock_reader:
+        mock_reader.side_effect = lambda path: mu.logs.LogReader(
+            path, page_size=1000
+        )
+        lw.setup(str(log_file))
+    lw.search_box.setText("message 999")
+    lw.search()
+    assert lw.log_text_area.textCursor().selectedText() == "message 999"
+    lw.search_box.setText("needle")
+    lw.search()
+    assert lw.start == 0
+    assert lw.log_text_area.textCursor().selectedText() == "needle"
+    lw.search_box.setText("")
+    lw.search()
+    assert lw.log_text_area.textCursor().selectedText() == "needle"
 
 
 def test_EnvironmentVariablesWidget_setup():
@@ -132,8 +279,9 @@ def test_MicrobitSettingsWidget_setup():
     minify = True
     custom_runtime_path = "/foo/bar"
     mbsw = mu.interface.dialogs.MicrobitSettingsWidget()
-    mbsw.setup(minify, custom_runtime_path)
+    mbsw.setup(minify, custom_runtime_path, True)
     assert mbsw.minify.isChecked()
+    assert mbsw.flash_on_save.isChecked()
     assert mbsw.runtime_path.text() == "/foo/bar"
 
 
@@ -148,26 +296,31 @@ def test_PackagesWidget_setup():
     assert pw.text_area.toPlainText() == packages
 
 
-def test_AdminDialog_setup():
+def test_AdminDialog_setup(tmp_path):
     """
     Ensure the admin dialog is setup properly given the content of a log
     file and envars.
     """
     log = "this is the contents of a log file"
+    log_file = tmp_path / "mu.log"
+    log_file.write_text(log)
     settings = {
         "envars": "name=value",
         "minify": True,
+        "flash_on_save": True,
         "microbit_runtime": "/foo/bar",
     }
     packages = "foo\nbar\nbaz\n"
     mock_window = QWidget()
     ad = mu.interface.dialogs.AdminDialog(mock_window)
-    ad.setup(log, settings, packages)
+    ad.setup(str(log_file), settings, packages)
     assert ad.log_widget.log_text_area.toPlainText() == log
     s = ad.settings()
     assert s["packages"] == packages
     del s["packages"]
     assert s == settings
+    ad.reject()
+    assert ad.log_widget.reader.size == 0
 
 
 def test_FindReplaceDialog_setup():
@@ -197,6 +350,39 @@ def test_FindReplaceDialog_setup_with_args():
     assert frd.replace_flag()
 
 
+def test_TriggerDialog_setup():
+    """
+    Ensure the trigger dialog is setup properly with default settings.
+    """
+    td = mu.interface.dialogs.TriggerDialog()
+    td.setup()
+    assert td.series.value() == 1
+    assert td.settings() == {
+        "series": 0,
+        "level": 0.0,
+        "rising": True,
+        "pre_trigger": 50,
+        "post_trigger": 50,
+    }
+
+
+def test_TriggerDialog_setup_with_args():
+    """
+    Ensure the trigger dialog is setup properly given existing settings.
+    """
+    settings = {
+        "series": 2,
+        "level": -1.5,
+        "rising": False,
+        "pre_trigger": 0,
+        "post_trigger": 200,
+    }
+    td = mu.interface.dialogs.TriggerDialog()
+    td.setup(**settings)
+    assert td.series.value() == 3
+    assert td.settings() == settings
+
+
 def test_PackageDialog_setup():
     """
     Ensure the PackageDialog is set up correctly and kicks off the process of
@@ -70,9 +70,18 @@ def test_EditorPane_init_python():
         mock_configure.assert_called_once_with()
         assert editor.isUtf8()
         assert editor.newline == "\r\n"
+        assert editor.saved_hash == mu.interface.editor.content_hash(text)
         assert isinstance(editor.lexer, mu.interface.editor.PythonLexer)
 
 
+def test_EditorPane_init_no_path():
+    """
+    A tab that isn't for a file has no saved text.
+    """
+    editor = mu.interface.editor.EditorPane(None, "foo")
+    assert editor.saved_hash is None
+
+
 def test_EditorPane_init_html():
     """
     Ensure everything is set and configured given a path and text passed into
@@ -948,3 +957,22 @@ def test_EditorPane_wheelEvent_with_modifier_ignored():
     ) as mw:
         ep.wheelEvent(None)
         assert mw.call_count == 0
+
+
+def test_TabPlaceholder():
+    """
+    Ensure a placeholder stands in for an unmodified EditorPane, ignoring
+    changes to its settings.
+    """
+    tp = mu.interface.editor.TabPlaceholder("/foo/bar.py")
+    assert tp.path == "/foo/bar.py"
+    assert tp.label == "bar.py"
+    assert tp.title == "bar.py"
+    assert tp.isModified() is False
+    assert tp.breakpoint_handles == set()
+    tp.setReadOnly(True)
+    tp.set_api(["api"])
+    tp.set_theme()
+    tp.reset_annotations()
+    tp.reset_debugger_highlight()
+    tp.setSelection(0, 0, 0, 0)
@@ -243,6 +243,20 @@ def test_FileTabs_change_tab_no_tabs():
     mock_window.update_title.assert_called_once_with(None)
 
 
+def test_FileTabs_change_tab_placeholder():
+    """
+    When a placeholder's tab is shown, the window is asked to load its file.
+    """
+    qtw = mu.interface.main.FileTabs()
+    placeholder = mu.interface.editor.TabPlaceholder("/foo/bar.py")
+    qtw.widget = mock.MagicMock(return_value=placeholder)
+    mock_window = mock.MagicMock()
+    qtw.nativeParentWidget = mock.MagicMock(return_value=mock_window)
+    qtw.change_tab(0)
+    mock_window.load_placeholder.emit.assert_called_once_with(placeholder)
+    assert mock_window.update_title.call_count == 0
+
+
 def test_FileTabs_addTab():
     """
     Expect tabs to be added with the right label and a button
@@ -662,6 +676,60 @@ def test_Window_add_tab():
     on_modified = ep.modificationChanged.connect.call_args[0][0]
     on_modified()
     w.tabs.setTabText.assert_called_once_with(new_tab_index, ep.label)
+    # Edits to the tab are signalled with the tab that changed.
+    mock_text_changed = mock.MagicMock()
+    w.text_changed.connect(mock_text_changed)
+    ep.setText("foo")
+    mock_text_changed.assert_called_with(ep)
+
+
+def test_Window_placeholders():
+    """
+    Placeholders are added as tabs without loading their files, and replaced
+    in the same place by an editor once their tab is shown.
+    """
+    w = mu.interface.main.Window()
+    w.tabs = mu.interface.main.FileTabs()
+    w.tabs.nativeParentWidget = mock.MagicMock(return_value=w)
+    w.connect_zoom = mock.MagicMock()
+    w.set_theme = mock.MagicMock()
+    w.breakpoint_toggle = mock.MagicMock()
+    w.theme = "day"
+    w.read_only_tabs = False
+    loaded = []
+
+    def load_placeholder(placeholder):
+        loaded.append(placeholder.path)
+        w.replace_placeholder(placeholder, placeholder.path, "text", [], "\n")
+
+    w.load_placeholder.connect(load_placeholder)
+    first = w.add_placeholder("/foo/a.py")
+    second = w.add_placeholder("/foo/b.py")
+    third = w.add_placeholder("/foo/c.py")
+    # The first tab is shown as soon as it's added.
+    assert loaded == ["/foo/a.py"]
+    assert [w.tabs.tabText(i) for i in range(w.tab_count)] == [
+        "a.py",
+        "b.py",
+        "c.py",
+    ]
+    assert isinstance(w.tabs.widget(0), mu.interface.editor.EditorPane)
+    assert w.widgets[1:] == [second, third]
+    w.focus_tab(second)
+    assert loaded == ["/foo/a.py", "/foo/b.py"]
+    assert [tab.path for tab in w.widgets] == [
+        "/foo/a.py",
+        "/foo/b.py",
+        "/foo/c.py",
+    ]
+    assert w.current_tab.path == "/foo/b.py"
+    assert w.current_tab.text() == "text"
+    assert w.widgets[2] is third
+    assert w.is_placeholder(third)
+    assert not w.is_placeholder(w.current_tab)
+    assert w.tabs.indexOf(first) == -1
+    w.remove_placeholder(third)
+    assert w.tab_count == 2
 
 
 def test_Window_focus_tab():
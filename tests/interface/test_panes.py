@@ -4,16 +4,19 @@ Tests for the user interface elements of Mu.
 """
 from PyQt5.QtWidgets import QApplication, QMessageBox, QLabel
 from PyQt5.QtChart import QChart, QLineSeries, QValueAxis
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QTextCursor
+from PyQt5.QtCore import Qt, QSize, QPointF
+from PyQt5.QtGui import QTextCursor, QResizeEvent
 from unittest import mock
 import sys
 import os
 import signal
 import mu
 import platform
+import struct
+import numpy
 from collections import deque
 import mu.interface.panes
+import mu.telemetry
 
 # Required so the QWidget tests don't abort with the message:
 # "QWidget: Must construct a QApplication before a QWidget"
@@ -368,6 +371,32 @@ def test_MicroPythonREPLPane_process_bytes():
     rp.ensureCursorVisible.assert_called_once_with()
 
 
+def test_MicroPythonREPLPane_process_bytes_telemetry():
+    """
+    Binary telemetry frames meant for the plotter aren't shown in the REPL,
+    even if they contain what looks like the start of a VT100 code followed
+    by bytes that aren't valid UTF-8.
+    """
+    rp = mu.interface.panes.MicroPythonREPLPane(mock.MagicMock())
+    rp.insertPlainText = mock.MagicMock()
+    frame = mu.telemetry.cobs_encode(b"D\x1b[\xff\xfe")
+    rp.process_bytes(b"ab\x00" + frame + b"\x00c")
+    inserted = "".join(c[0][0] for c in rp.insertPlainText.call_args_list)
+    assert inserted == "abc"
+
+
+def test_MicroPythonREPLPane_process_bytes_VT100_invalid_utf8():
+    """
+    Bytes that aren't valid UTF-8 after the start of a VT100 code don't stop
+    the REPL from working.
+    """
+    rp = mu.interface.panes.MicroPythonREPLPane(mock.MagicMock())
+    rp.insertPlainText = mock.MagicMock()
+    rp.process_bytes(b"\x1b[\xff1A")
+    rp.process_bytes(b"x")
+    assert rp.insertPlainText.call_args_list[-1][0][0] == "x"
+
+
 def test_MicroPythonREPLPane_process_bytes_VT100():
     """
     Ensure bytes coming from the device to the application are processed as
@@ -2280,7 +2309,7 @@ def test_PlotterPane_init():
     """
     pp = mu.interface.panes.PlotterPane()
     assert pp.input_buffer == []
-    assert pp.raw_data == []
+    assert pp.capture is None
     assert pp.max_x == 100
     assert pp.max_y == 1000
     assert len(pp.data) == 1
@@ -2301,8 +2330,30 @@ def test_PlotterPane_process_bytes():
     """
     pp = mu.interface.panes.PlotterPane()
     pp.add_data = mock.MagicMock()
-    pp.process_bytes(b"(1, 2.3, 4)\r\n")
-    pp.add_data.assert_called_once_with((1, 2.3, 4))
+    with mock.patch("mu.interface.panes.time.monotonic", return_value=42.0):
+        pp.process_bytes(b"(1, 2.3, 4)\r\n")
+    pp.add_data.assert_called_once_with((1, 2.3, 4), 42.0)
+
+
+def test_PlotterPane_process_bytes_telemetry():
+    """
+    Binary telemetry frames are decoded and plotted, while any surrounding
+    text is still checked for tuples.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.add_data = mock.MagicMock()
+    cobs = mu.telemetry.cobs_encode
+    data = (
+        b"\x00" + cobs(b"S<hh") + b"\x00"
+        b"\x00" + cobs(b"D" + struct.pack("<hh", 5, -6)) + b"\x00"
+        b"(1, 2)\r\n"
+    )
+    with mock.patch("mu.interface.panes.time.monotonic", return_value=42.0):
+        pp.process_bytes(data)
+    assert pp.add_data.call_args_list == [
+        mock.call((5, -6), 42.0),
+        mock.call((1, 2), 42.0),
+    ]
 
 
 def test_PlotterPane_process_bytes_guards_against_data_flood():
@@ -2345,15 +2396,15 @@ def test_PlotterPane_process_bytes_overrun_input_buffer():
     pp = mu.interface.panes.PlotterPane()
     pp.add_data = mock.MagicMock()
     pp.process_bytes(b"(1, 2.3, 4)\r\n")
-    pp.add_data.assert_called_once_with((1, 2.3, 4))
+    pp.add_data.assert_called_once_with((1, 2.3, 4), mock.ANY)
     pp.add_data.reset_mock()
     pp.process_bytes(b"(1, 2.")
     assert pp.add_data.call_count == 0
     pp.process_bytes(b"3, 4)\r\n")
-    pp.add_data.assert_called_once_with((1, 2.3, 4))
+    pp.add_data.assert_called_once_with((1, 2.3, 4), mock.ANY)
     pp.add_data.reset_mock()
     pp.process_bytes(b"(1, 2.3, 4)\r\n")
-    pp.add_data.assert_called_once_with((1, 2.3, 4))
+    pp.add_data.assert_called_once_with((1, 2.3, 4), mock.ANY)
 
 
 def test_PlotterPane_add_data():
@@ -2364,14 +2415,456 @@ def test_PlotterPane_add_data():
     pp = mu.interface.panes.PlotterPane()
     mock_line_series = mock.MagicMock()
     pp.series = [mock_line_series]
-    pp.add_data((1,))
-    assert (1,) in pp.raw_data
+    pp.capture = mock.MagicMock()
+    with mock.patch("mu.interface.panes.time.monotonic", return_value=42.0):
+        pp.add_data((1,))
+    pp.capture.write.assert_called_once_with((1,), 42.0)
+    assert pp.times[0] == 42.0
     mock_line_series.clear.assert_called_once_with()
     for i in range(99):
         mock_line_series.append.call_args_list[i][0] == (i, 0)
     mock_line_series.append.call_args_list[99][0] == (99, 1)
 
 
+def test_PlotterPane_add_data_show_stats():
+    """
+    If timing statistics are enabled, ensure they're displayed in the chart's
+    title once the data is drawn.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.series = [mock.MagicMock()]
+    pp.chart = mock.MagicMock()
+    pp.set_show_stats(True)
+    with mock.patch("mu.interface.panes.time.monotonic", return_value=10.5):
+        pp.add_data((1,), 10.0)
+        pp.add_data((2,), 10.25)
+    assert pp.latency == 0.25
+    title = pp.chart.setTitle.call_args[0][0]
+    assert title == "4.0 samples/s, jitter 0.0 ms, latency 250.0 ms"
+    pp.set_show_stats(False)
+    pp.chart.setTitle.assert_called_with("")
+
+
+def test_PlotterPane_timing_stats():
+    """
+    Ensure the sample rate and jitter are derived from the gaps between the
+    timestamps of the displayed samples.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    assert pp.timing_stats() == (0.0, 0.0, 0.0)
+    pp.times.extend([3.0, 2.0, 1.5, 1.0])
+    pp.latency = 0.1
+    rate, jitter, latency = pp.timing_stats()
+    assert rate == 1.5
+    assert round(jitter, 6) == round(0.2357022603955158, 6)
+    assert latency == 0.1
+    # Samples arriving at the same time can't be used to calculate a rate.
+    pp.times.clear()
+    pp.times.extend([1.0, 1.0])
+    assert pp.timing_stats() == (0.0, 0.0, 0.1)
+
+
+def test_PlotterPane_set_time_axis():
+    """
+    With the time axis enabled, the data is plotted against the seconds since
+    the plotter started. Disabling it returns to plotting by sample index.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.start_time = 100.0
+    pp.axis_x = mock.MagicMock()
+    mock_line_series = mock.MagicMock()
+    pp.series = [mock_line_series]
+    pp.add_data((1,), 101.0)
+    pp.add_data((2,), 101.5)
+    mock_line_series.reset_mock()
+    pp.set_time_axis(True)
+    pp.axis_x.setLabelFormat.assert_called_once_with("%.1fs")
+    pp.axis_x.setRange.assert_called_once_with(1.0, 2.0)
+    assert mock_line_series.append.call_args_list == [
+        mock.call(1.0, 1),
+        mock.call(1.5, 2),
+    ]
+    pp.axis_x.reset_mock()
+    mock_line_series.reset_mock()
+    pp.set_time_axis(False)
+    pp.axis_x.setLabelFormat.assert_called_once_with("%d")
+    pp.axis_x.setRange.assert_called_once_with(0, 100)
+    assert mock_line_series.append.call_count == 100
+    assert mock_line_series.append.call_args_list[99] == mock.call(99, 2)
+
+
+def test_PlotterPane_context_menu():
+    """
+    Ensure the context menu offers checkable actions for the time axis and
+    timing statistics.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    mock_menu = mock.MagicMock()
+    mock_time_axis = mock.MagicMock()
+    mock_show_stats = mock.MagicMock()
+    mock_show_panel = mock.MagicMock()
+    mock_show_spectrum = mock.MagicMock()
+    mock_menu.addAction.side_effect = [
+        mock_time_axis,
+        mock_show_stats,
+        mock_show_panel,
+        mock_show_spectrum,
+        mock.MagicMock(),
+    ]
+    with mock.patch(
+        "mu.interface.panes.QMenu", return_value=mock_menu
+    ), mock.patch("mu.interface.panes.QCursor"):
+        pp.context_menu()
+    mock_time_axis.setChecked.assert_called_once_with(False)
+    mock_time_axis.toggled.connect.assert_called_once_with(pp.set_time_axis)
+    mock_show_stats.setChecked.assert_called_once_with(False)
+    mock_show_stats.toggled.connect.assert_called_once_with(pp.set_show_stats)
+    mock_show_panel.toggled.connect.assert_called_once_with(pp.set_show_panel)
+    # The spectrum can only be shown once the statistics panel is shown.
+    mock_show_spectrum.setEnabled.assert_called_once_with(False)
+    mock_show_spectrum.toggled.connect.assert_called_once_with(
+        pp.set_show_spectrum
+    )
+    assert mock_menu.exec_.call_count == 1
+
+
+def test_PlotterPane_context_menu_without_numpy():
+    """
+    Without NumPy the statistics panel isn't offered.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    mock_menu = mock.MagicMock()
+    with mock.patch(
+        "mu.interface.panes.QMenu", return_value=mock_menu
+    ), mock.patch("mu.interface.panes.QCursor"), mock.patch(
+        "mu.interface.panes.NUMPY", False
+    ):
+        pp.context_menu()
+    assert mock_menu.addAction.call_count == 3
+
+
+def test_PlotterPane_context_menu_trigger():
+    """
+    Once the trigger is in use, the context menu offers to re-arm or stop it.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    mock_menu = mock.MagicMock()
+    pp.trigger_state = "frozen"
+    with mock.patch(
+        "mu.interface.panes.QMenu", return_value=mock_menu
+    ), mock.patch("mu.interface.panes.QCursor"):
+        pp.context_menu()
+    calls = mock_menu.addAction.call_args_list
+    assert calls[-3] == mock.call("Trigger...", pp.show_trigger_dialog)
+    assert calls[-2] == mock.call("Re-arm trigger", pp.rearm_trigger)
+    assert calls[-1] == mock.call("Stop trigger", pp.disarm_trigger)
+
+
+def test_PlotterPane_show_trigger_dialog():
+    """
+    If the user clicks OK in the trigger dialog, the trigger is armed with
+    the settings they chose.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.arm_trigger = mock.MagicMock()
+    mock_dialog = mock.MagicMock()
+    mock_dialog.settings.return_value = {"series": 1, "level": 2}
+    mock_dialog.exec.return_value = True
+    with mock.patch(
+        "mu.interface.panes.TriggerDialog", return_value=mock_dialog
+    ):
+        pp.show_trigger_dialog()
+    mock_dialog.setup.assert_called_once_with(**pp.trigger)
+    pp.arm_trigger.assert_called_once_with(series=1, level=2)
+    pp.arm_trigger.reset_mock()
+    mock_dialog.exec.return_value = False
+    with mock.patch(
+        "mu.interface.panes.TriggerDialog", return_value=mock_dialog
+    ):
+        pp.show_trigger_dialog()
+    assert pp.arm_trigger.call_count == 0
+
+
+def test_PlotterPane_trigger_rising_edge():
+    """
+    Once armed, nothing is drawn until the watched series rises through the
+    level. The samples before and after the trigger are then displayed and
+    the display is frozen.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    mock_line_series = mock.MagicMock()
+    pp.series = [mock_line_series]
+    pp.chart = mock.MagicMock()
+    pp.axis_x = mock.MagicMock()
+    pp.arm_trigger(0, 5, pre_trigger=2, post_trigger=3)
+    assert pp.trigger_state == "armed"
+    assert pp.trigger_buffer == [None] * 5
+    for value in [5, 1, 2, 3, 4]:
+        pp.add_data((value,))
+    assert mock_line_series.append.call_count == 0
+    pp.add_data((6,))
+    assert pp.trigger_state == "triggered"
+    assert pp.trigger_buffer[:3] == [(3,), (4,), (6,)]
+    pp.add_data((7,))
+    assert mock_line_series.append.call_count == 0
+    pp.add_data((8,))
+    assert pp.trigger_state == "frozen"
+    assert mock_line_series.append.call_args_list == [
+        mock.call(-2, 3),
+        mock.call(-1, 4),
+        mock.call(0, 6),
+        mock.call(1, 7),
+        mock.call(2, 8),
+    ]
+    pp.axis_x.setRange.assert_called_once_with(-2, 2)
+    assert pp.max_y == 10
+    # Frozen, so further data isn't displayed.
+    pp.add_data((9,))
+    assert mock_line_series.append.call_count == 5
+
+
+def test_PlotterPane_trigger_falling_edge_partial_pre_trigger():
+    """
+    A falling edge may trigger before the pre-trigger samples have filled up,
+    in which case only the captured samples are displayed. Tuples without
+    the watched series are ignored by the trigger.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.series = [mock.MagicMock(), mock.MagicMock()]
+    pp.data.append(deque([0] * pp.max_x))
+    pp.axis_x = mock.MagicMock()
+    pp.arm_trigger(1, 0, rising=False, pre_trigger=3, post_trigger=1)
+    pp.add_data((1,))
+    pp.add_data((1, 2))
+    pp.add_data((1, -2))
+    assert pp.trigger_state == "frozen"
+    assert pp.trigger_buffer == [None, (1,), (1, 2), (1, -2)]
+    pp.axis_x.setRange.assert_called_once_with(-2, 0)
+    assert pp.series[1].append.call_args_list == [
+        mock.call(-1, 2),
+        mock.call(0, -2),
+    ]
+
+
+def test_PlotterPane_trigger_without_pre_trigger():
+    """
+    The trigger works when no samples from before the trigger are wanted.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.series = [mock.MagicMock()]
+    pp.arm_trigger(0, 1, pre_trigger=0, post_trigger=1)
+    pp.add_data((0,))
+    pp.add_data((1,))
+    assert pp.trigger_state == "frozen"
+    assert pp.trigger_buffer == [(1,)]
+
+
+def test_PlotterPane_rearm_and_disarm_trigger():
+    """
+    Re-arming uses the same settings. Disarming returns to the scrolling
+    display.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.arm_trigger(1, 2.5, False, 10, 20)
+    pp.trigger_state = "frozen"
+    pp.rearm_trigger()
+    assert pp.trigger_state == "armed"
+    assert pp.trigger["level"] == 2.5
+    assert len(pp.trigger_buffer) == 30
+    pp.set_time_axis = mock.MagicMock()
+    pp.disarm_trigger()
+    assert pp.trigger_state is None
+    assert pp.trigger_buffer == []
+    pp.set_time_axis.assert_called_once_with(False)
+
+
+def test_PlotterPane_trigger_then_disarm_time_axis():
+    """
+    Samples received while the trigger is in use aren't plotted, so after
+    disarming it, the times on the x axis still match the values plotted.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.start_time = 100.0
+    pp.time_axis = True
+    pp.axis_x = mock.MagicMock()
+    mock_line_series = mock.MagicMock()
+    pp.series = [mock_line_series]
+    pp.add_data((1,), 101.0)
+    pp.arm_trigger(0, 50, True, 1, 1)
+    pp.add_data((2,), 102.0)
+    pp.add_data((3,), 103.0)
+    pp.disarm_trigger()
+    mock_line_series.reset_mock()
+    pp.add_data((4,), 104.0)
+    assert mock_line_series.append.call_args_list == [
+        mock.call(1.0, 1),
+        mock.call(4.0, 4),
+    ]
+
+
+def test_PlotterPane_set_show_panel():
+    """
+    Showing the statistics panel reserves space for it to the right of the
+    chart and starts the timer used to refresh it. Hiding it reverses this.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.stats_panel = mock.MagicMock()
+    pp.stats_timer = mock.MagicMock()
+    pp.setViewportMargins = mock.MagicMock()
+    pp.ring = "old ring"
+    pp.set_show_panel(True)
+    assert pp.show_panel is True
+    assert pp.ring is None
+    pp.setViewportMargins.assert_called_once_with(0, 0, 320, 0)
+    pp.stats_panel.show.assert_called_once_with()
+    pp.stats_timer.start.assert_called_once_with()
+    pp.setViewportMargins.reset_mock()
+    pp.set_show_panel(False)
+    assert pp.show_panel is False
+    pp.setViewportMargins.assert_called_once_with(0, 0, 0, 0)
+    pp.stats_panel.hide.assert_called_once_with()
+    pp.stats_timer.stop.assert_called_once_with()
+
+
+def test_PlotterPane_set_show_spectrum():
+    """
+    Ensure the spectrum chart is shown or hidden.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.stats_panel = mock.MagicMock()
+    pp.set_show_spectrum(True)
+    assert pp.show_spectrum is True
+    pp.stats_panel.spectrum_view.setVisible.assert_called_once_with(True)
+
+
+def test_PlotterPane_resize_places_stats_panel():
+    """
+    Resizing the plotter keeps the statistics panel on the right hand side.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.resize(800, 400)
+    pp.resizeEvent(QResizeEvent(QSize(800, 400), QSize(0, 0)))
+    assert pp.stats_panel.geometry().x() == 800 - pp.stats_panel_width
+    assert pp.stats_panel.geometry().height() == 400
+
+
+def test_PlotterPane_buffer_values():
+    """
+    Values are only added to the ring buffer while the statistics panel is
+    shown. The ring buffer wraps around when full and starts again if the
+    number of values changes.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.add_data((1, 2))
+    assert pp.ring is None
+    pp.show_panel = True
+    pp.ring_size = 3
+    for i in range(4):
+        pp.add_data((i, i * 2))
+    assert pp.ring_count == 3
+    assert pp.ring_index == 1
+    assert pp.ring.tolist() == [[3, 1, 2], [6, 2, 4]]
+    pp.buffer_values((1,))
+    assert pp.ring.shape == (1, 3)
+    assert pp.ring_count == 1
+
+
+def test_PlotterPane_refresh_stats():
+    """
+    Ensure the rolling statistics are calculated over the ring buffer and
+    displayed in the statistics panel.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.stats_panel = mock.MagicMock()
+    pp.refresh_stats()
+    assert pp.stats_panel.update_stats.call_count == 0
+    pp.ring_size = 4
+    for values in [(1, 10), (3, 10), (5, 10)]:
+        pp.buffer_values(values)
+    pp.refresh_stats()
+    means, stds, mins, maxs = pp.stats_panel.update_stats.call_args[0]
+    assert means.tolist() == [3, 10]
+    assert stds.tolist() == [numpy.std([1, 3, 5]), 0]
+    assert mins.tolist() == [1, 10]
+    assert maxs.tolist() == [5, 10]
+    assert pp.stats_panel.update_spectrum.call_count == 0
+    # Once the ring is full the oldest values are dropped.
+    for values in [(7, 10), (9, 10)]:
+        pp.buffer_values(values)
+    pp.refresh_stats()
+    means, stds, mins, maxs = pp.stats_panel.update_stats.call_args[0]
+    assert means.tolist() == [6, 10]
+    assert mins.tolist() == [3, 10]
+
+
+def test_PlotterPane_refresh_stats_spectrum():
+    """
+    With the spectrum shown, the FFT magnitude of each series is plotted
+    against frequencies in Hz derived from the measured sample rate.
+    """
+    pp = mu.interface.panes.PlotterPane()
+    pp.stats_panel = mock.MagicMock()
+    pp.show_spectrum = True
+    pp.ring_size = 8
+    pp.times.extend([0.5, 0.4, 0.3, 0.2, 0.1, 0.0])  # Samples at 10Hz.
+    for i in range(10):
+        # Alternating values are at the highest (Nyquist) frequency.
+        pp.buffer_values((i % 2, 1))
+    pp.refresh_stats()
+    freqs, magnitudes = pp.stats_panel.update_spectrum.call_args[0]
+    assert numpy.allclose(freqs, [0, 1.25, 2.5, 3.75, 5])
+    assert magnitudes.shape == (2, 5)
+    assert magnitudes[0].argmax() == 4
+    assert magnitudes[1].max() == 0
+
+
+def test_PlotterStatsPanel_update_stats():
+    """
+    Ensure the statistics are displayed with a row per series.
+    """
+    panel = mu.interface.panes.PlotterStatsPanel()
+    panel.update_stats([1.5, 2], [0.5, 0], [1, 2], [2, 2])
+    rows = panel.stats_label.text().split("\n")
+    assert len(rows) == 3
+    assert rows[1] == "1\t1.5\t0.5\t1\t2"
+    assert rows[2] == "2\t2\t0\t2\t2"
+
+
+def test_PlotterStatsPanel_update_spectrum():
+    """
+    Ensure there's a spectrum line series for each series of data.
+    """
+    panel = mu.interface.panes.PlotterStatsPanel()
+    freqs = numpy.array([0, 1, 2])
+    panel.update_spectrum(freqs, numpy.array([[0, 3, 1], [0, 1, 1]]))
+    assert len(panel.spectrum_series) == 2
+    assert panel.spectrum_series[0].count() == 3
+    assert panel.spectrum_series[0].at(1) == QPointF(1, 3)
+    assert panel.axis_f.max() == 2
+    assert panel.axis_m.max() == 3
+    panel.update_spectrum(freqs, numpy.array([[0, 0, 0]]))
+    assert len(panel.spectrum_series) == 1
+    assert panel.axis_m.max() == 1
+
+
+def test_PlotterStatsPanel_set_theme():
+    """
+    Ensure the theme of the spectrum chart follows the plotter's.
+    """
+    panel = mu.interface.panes.PlotterStatsPanel()
+    panel.spectrum = mock.MagicMock()
+    panel.set_theme("day")
+    panel.spectrum.setTheme.assert_called_once_with(QChart.ChartThemeLight)
+    panel.spectrum.setTheme.reset_mock()
+    panel.set_theme("night")
+    panel.spectrum.setTheme.assert_called_once_with(QChart.ChartThemeDark)
+    panel.spectrum.setTheme.reset_mock()
+    panel.set_theme("contrast")
+    panel.spectrum.setTheme.assert_called_once_with(
+        QChart.ChartThemeHighContrast
+    )
+
+
 def test_PlotterPane_add_data_adjust_values_up():
     """
     If more values than have been encountered before are added to the incoming
@@ -5,7 +5,12 @@ Tests for the BaseMode class.
 import os
 import mu
 import pytest
-from mu.modes.base import BaseMode, MicroPythonMode, FileManager
+from mu.modes.base import (
+    BaseMode,
+    MicroPythonMode,
+    FileManager,
+    DataCapture,
+)
 from unittest import mock
 
 
@@ -23,6 +28,7 @@ def test_base_mode():
     assert bm.editor == editor
     assert bm.view == view
     assert bm.stop() is None
+    assert bm.tab_saved(mock.MagicMock()) is None
     assert bm.actions() == NotImplemented
     assert bm.workspace_dir()
     assert bm.api() == NotImplemented
@@ -145,36 +151,79 @@ def test_base_mode_add_plotter():
     assert bm.add_plotter() == NotImplemented
 
 
+def test_base_mode_start_data_capture():
+    """
+    Ensure the active plotter streams its data into a timestamped file in the
+    expected directory, using the configured format.
+    """
+    editor = mock.MagicMock()
+    view = mock.MagicMock()
+    bm = BaseMode(editor, view)
+    with mock.patch(
+        "mu.modes.base.get_capture_settings", return_value=("bin", True)
+    ), mock.patch("mu.modes.base.time.strftime", return_value="20190101"):
+        bm.start_data_capture()
+    capture = view.plotter_pane.capture
+    assert isinstance(capture, mu.modes.base.DataCapture)
+    assert capture.file_format == "bin"
+    assert capture.timestamps is True
+    dd = os.path.join(bm.workspace_dir(), "data_capture")
+    assert capture.path == os.path.join(dd, "20190101.bin")
+    # Nothing is created until data arrives.
+    assert capture.thread is None
+
+
 def test_base_mode_remove_plotter():
     """
-    Ensure the plotter is removed and data is saved as a CSV file in the
-    expected directory.
+    Ensure the plotter is removed and the data capture is closed.
     """
     editor = mock.MagicMock()
     view = mock.MagicMock()
-    view.plotter_pane.raw_data = [1, 2, 3]
+    mock_capture = mock.MagicMock()
+    view.plotter_pane.capture = mock_capture
     bm = BaseMode(editor, view)
     bm.plotter = mock.MagicMock()
-    mock_mkdir = mock.MagicMock()
-    mock_open = mock.mock_open()
-    mock_csv_writer = mock.MagicMock()
-    mock_csv = mock.MagicMock()
-    mock_csv.writer.return_value = mock_csv_writer
-    with mock.patch(
-        "mu.modes.base.os.path.exists", return_value=False
-    ), mock.patch("mu.modes.base.os.makedirs", mock_mkdir), mock.patch(
-        "builtins.open", mock_open
-    ), mock.patch(
-        "mu.modes.base.csv", mock_csv
-    ):
-        bm.remove_plotter()
+    bm.remove_plotter()
     assert bm.plotter is None
     view.remove_plotter.assert_called_once_with()
-    dd = os.path.join(bm.workspace_dir(), "data_capture")
-    mock_mkdir.assert_called_once_with(dd)
-    mock_csv_writer.writerows.assert_called_once_with(
-        view.plotter_pane.raw_data
+    mock_capture.close.assert_called_once_with()
+    assert view.plotter_pane.capture is None
+
+
+def test_base_mode_stop_data_capture_no_plotter():
+    """
+    If there's no plotter pane, stopping the data capture does nothing.
+    """
+    editor = mock.MagicMock()
+    view = mock.MagicMock()
+    view.plotter_pane = None
+    bm = BaseMode(editor, view)
+    bm.stop_data_capture()
+    assert view.plotter_pane is None
+
+
+def test_get_capture_settings():
+    """
+    The capture format defaults to CSV without timestamps, but may be set in
+    the settings file.
+    """
+    with mock.patch(
+        "mu.modes.base.get_settings_path", return_value="tests/settings.json"
+    ):
+        assert mu.modes.base.get_capture_settings() == ("csv", False)
+    mock_open = mock.mock_open(
+        read_data='{"capture_format": "bin", "capture_timestamps": true}'
     )
+    with mock.patch("builtins.open", mock_open):
+        assert mu.modes.base.get_capture_settings() == ("bin", True)
+    mock_open = mock.mock_open(read_data='{"capture_format": "xls"}')
+    with mock.patch("builtins.open", mock_open):
+        assert mu.modes.base.get_capture_settings() == ("csv", False)
+    with mock.patch(
+        "mu.modes.base.get_settings_path",
+        return_value="tests/settingscorrupt.json",
+    ):
+        assert mu.modes.base.get_capture_settings() == ("csv", False)
 
 
 def test_base_on_data_flood():
@@ -184,8 +233,11 @@ def test_base_on_data_flood():
     """
     editor = mock.MagicMock()
     view = mock.MagicMock()
+    mock_capture = mock.MagicMock()
+    view.plotter_pane.capture = mock_capture
     bm = BaseMode(editor, view)
     bm.on_data_flood()
+    mock_capture.close.assert_called_once_with()
     view.remove_plotter.assert_called_once_with()
     assert view.show_message.call_count == 1
 
@@ -510,6 +562,7 @@ def test_micropython_mode_add_plotter():
         mm.add_plotter()
     assert view.show_message.call_count == 0
     assert view.add_micropython_plotter.call_args[0][0] == "COM0"
+    assert isinstance(view.plotter_pane.capture, mu.modes.base.DataCapture)
 
 
 def test_micropython_on_data_flood():
@@ -666,3 +719,97 @@ def test_FileManager_delete_fail():
     with mock.patch("mu.modes.base.microfs.rm", side_effect=Exception("boom")):
         fm.delete("foo.py")
     fm.on_delete_fail.emit.assert_called_once_with("foo.py")
+
+
+def test_DataCapture_invalid_format():
+    """
+    Only known formats may be used to capture data.
+    """
+    with pytest.raises(ValueError):
+        DataCapture("capture.xls", "xls")
+
+
+def test_DataCapture_csv(tmp_path):
+    """
+    Tuples written to a CSV capture end up as rows in the file, which is only
+    created (along with its directory) once data arrives.
+    """
+    path = str(tmp_path / "data_capture" / "capture.csv")
+    dc = DataCapture(path, "csv", flush_interval=0.01)
+    assert not os.path.exists(path)
+    dc.write((1, 2.5))
+    dc.write((3, 4))
+    dc.close()
+    assert dc.thread is None
+    with open(path) as f:
+        assert f.read().splitlines() == ["1,2.5", "3,4"]
+    # Writes after closing are ignored.
+    dc.write((5, 6))
+    assert dc.pending == []
+
+
+def test_DataCapture_bin(tmp_path):
+    """
+    Tuples written to a binary capture are stored as records of a count
+    followed by the values, which can be unpacked again.
+    """
+    path = str(tmp_path / "capture.bin")
+    dc = DataCapture(path, "bin", max_pending=2)
+    dc.write((1, 2.5))
+    dc.write((3,))
+    dc.write((4, 5, 6))
+    dc.close()
+    with open(path, "rb") as f:
+        data = f.read()
+    assert len(data) == 3 * 2 + 6 * 8
+    assert DataCapture.unpack(data) == [(1.0, 2.5), (3.0,), (4.0, 5.0, 6.0)]
+    # A truncated record (e.g. after a crash) is ignored.
+    assert DataCapture.unpack(data[:-1]) == [(1.0, 2.5), (3.0,)]
+
+
+def test_DataCapture_timestamps(tmp_path):
+    """
+    If timestamps are enabled, each row starts with the seconds elapsed since
+    the first tuple was received.
+    """
+    path = str(tmp_path / "capture.csv")
+    dc = DataCapture(path, timestamps=True)
+    dc.write((1, 2), 10.0)
+    dc.write((3, 4), 10.25)
+    with mock.patch("mu.modes.base.time.monotonic", return_value=11.5):
+        dc.write((5, 6))
+    dc.close()
+    with open(path) as f:
+        assert f.read().splitlines() == [
+            "0.0,1,2",
+            "0.25,3,4",
+            "1.5,5,6",
+        ]
+
+
+def test_DataCapture_close_without_data():
+    """
+    Closing a capture that never received data doesn't create anything.
+    """
+    dc = DataCapture("capture.csv")
+    with mock.patch("builtins.open") as mock_open:
+        dc.close()
+    assert mock_open.call_count == 0
+    assert dc.closed
+
+
+def test_DataCapture_cannot_open_file(tmp_path):
+    """
+    If the capture file can't be created the problem is logged and further
+    data is ignored.
+    """
+    path = str(tmp_path / "capture.csv")
+    dc = DataCapture(path)
+    with mock.patch(
+        "builtins.open", side_effect=OSError("BOOM")
+    ), mock.patch("mu.modes.base.logger") as mock_logger:
+        dc.write((1,))
+        dc.thread.join()
+    assert mock_logger.error.call_count == 2
+    assert dc.closed
+    dc.close()
@@ -6,7 +6,16 @@ import os
 import os.path
 import pytest
 from mu.logic import HOME_DIRECTORY
-from mu.modes.microbit import MicrobitMode, DeviceFlasher
+from mu.modes.microbit import (
+    MicrobitMode,
+    DeviceFlasher,
+    FlashMonitor,
+    ScriptMeasurer,
+    minify,
+    mount_table,
+    runtime_hash,
+    script_hash,
+)
 from mu.modes.api import MICROBIT_APIS, SHARED_APIS
 from mu.contrib import uflash
 from unittest import mock
@@ -26,6 +35,93 @@ def test_DeviceFlasher_init():
     assert df.path_to_runtime is None
 
 
+def mount_microbits(mock_mount_table, *paths):
+    """
+    Set the paths at which micro:bits are mounted in the mocked mount table.
+    """
+    mock_mount_table.all_volumes = {"MICROBIT": list(paths)}
+
+
+def test_FlashMonitor_remount():
+    """
+    Flashing has finished once the device is unmounted, remounted (perhaps
+    somewhere else, if it's the only micro:bit) and has had time to settle.
+    """
+    monitor = FlashMonitor("/media/MICROBIT")
+    with mock.patch("mu.modes.microbit.mount_table") as mock_mount_table:
+        mount_microbits(mock_mount_table, "/media/MICROBIT")
+        monitor.start()
+        assert mock_mount_table.refresh.call_count == 1
+        assert monitor.poll_timer.isActive()
+        monitor.poll()
+        assert mock_mount_table.refresh.call_count == 2
+        assert not monitor.unmounted
+        mount_microbits(mock_mount_table)
+        monitor.poll()
+        assert monitor.unmounted
+        assert monitor.poll_timer.isActive()
+        mount_microbits(mock_mount_table, "/media/other/MICROBIT")
+        monitor.poll()
+    assert not monitor.poll_timer.isActive()
+    assert monitor.finish_timer.interval() == 1000
+    assert monitor.finish_timer.isActive()
+    slot = mock.MagicMock()
+    monitor.finished.connect(slot)
+    monitor.finish()
+    slot.assert_called_once_with()
+    assert not monitor.finish_timer.isActive()
+
+
+def test_FlashMonitor_several_microbits():
+    """
+    With several micro:bits attached, flashing has only finished once the
+    one being flashed is mounted again at the same path, not when another
+    one is.
+    """
+    monitor = FlashMonitor("/media/MICROBIT")
+    with mock.patch("mu.modes.microbit.mount_table") as mock_mount_table:
+        mount_microbits(
+            mock_mount_table, "/media/MICROBIT", "/media/MICROBIT1"
+        )
+        monitor.start()
+        mount_microbits(mock_mount_table, "/media/MICROBIT1")
+        monitor.poll()
+        assert monitor.unmounted
+        monitor.poll()
+        mount_microbits(
+            mock_mount_table, "/media/MICROBIT1", "/media/MICROBIT2"
+        )
+        monitor.poll()
+        assert monitor.poll_timer.isActive()
+        mount_microbits(
+            mock_mount_table, "/media/MICROBIT", "/media/MICROBIT1"
+        )
+        monitor.poll()
+    assert not monitor.poll_timer.isActive()
+    assert monitor.finish_timer.interval() == 1000
+    monitor.stop()
+
+
+def test_FlashMonitor_timeout():
+    """
+    If the device isn't seen to remount before the timeout, flashing is
+    assumed to have finished anyway.
+    """
+    monitor = FlashMonitor("/media/MICROBIT", timeout=10)
+    with mock.patch("mu.modes.microbit.mount_table.refresh"):
+        monitor.start()
+    assert monitor.finish_timer.interval() == 10
+    slot = mock.MagicMock()
+    monitor.finished.connect(slot)
+    with mock.patch("mu.modes.microbit.logger.warning") as mock_warning:
+        monitor.finish()
+    assert mock_warning.call_count == 1
+    slot.assert_called_once_with()
+    assert not monitor.poll_timer.isActive()
+    # Stopping again doesn't matter.
+    monitor.stop()
+
+
 def test_DeviceFlasher_run():
     """
     Ensure the uflash.flash function is called as expected.
@@ -38,9 +134,25 @@ def test_DeviceFlasher_run():
         paths_to_microbits=["path"],
         python_script="script",
         path_to_runtime=None,
+        report=df.report,
     )
 
 
+def test_DeviceFlasher_report():
+    """
+    Ensure each device is reported on with the reason flashing it failed, if
+    it did.
+    """
+    df = DeviceFlasher(["a", "b"], "script", None)
+    df.on_device_flashed = mock.MagicMock()
+    df.report("a", None)
+    df.report("b", IOError("Boom"))
+    assert df.on_device_flashed.emit.call_args_list == [
+        mock.call("a", ""),
+        mock.call("b", "Boom"),
+    ]
+
+
 def test_DeviceFlasher_run_fail():
     """
     Ensure the on_flash_fail signal is emitted if an exception is thrown.
@@ -68,15 +180,17 @@ def test_microbit_mode():
     assert mm.view == view
 
     actions = mm.actions()
-    assert len(actions) == 4
+    assert len(actions) == 5
     assert actions[0]["name"] == "flash"
     assert actions[0]["handler"] == mm.flash
-    assert actions[1]["name"] == "files"
-    assert actions[1]["handler"] == mm.toggle_files
-    assert actions[2]["name"] == "repl"
-    assert actions[2]["handler"] == mm.toggle_repl
-    assert actions[3]["name"] == "plotter"
-    assert actions[3]["handler"] == mm.toggle_plotter
+    assert actions[1]["name"] == "flash_all"
+    assert actions[1]["handler"] == mm.flash_all
+    assert actions[2]["name"] == "files"
+    assert actions[2]["handler"] == mm.toggle_files
+    assert actions[3]["name"] == "repl"
+    assert actions[3]["handler"] == mm.toggle_repl
+    assert actions[4]["name"] == "plotter"
+    assert actions[4]["handler"] == mm.toggle_plotter
 
 
 def test_microbit_mode_no_charts():
@@ -88,13 +202,15 @@ def test_microbit_mode_no_charts():
     mm = MicrobitMode(editor, view)
     with mock.patch("mu.modes.microbit.CHARTS", False):
         actions = mm.actions()
-        assert len(actions) == 3
+        assert len(actions) == 4
         assert actions[0]["name"] == "flash"
         assert actions[0]["handler"] == mm.flash
-        assert actions[1]["name"] == "files"
-        assert actions[1]["handler"] == mm.toggle_files
-        assert actions[2]["name"] == "repl"
-        assert actions[2]["handler"] == mm.toggle_repl
+        assert actions[1]["name"] == "flash_all"
+        assert actions[1]["handler"] == mm.flash_all
+        assert actions[2]["name"] == "files"
+        assert actions[2]["handler"] == mm.toggle_files
+        assert actions[3]["name"] == "repl"
+        assert actions[3]["handler"] == mm.toggle_repl
 
 
 def test_flash_no_tab():
@@ -151,6 +267,105 @@ def test_flash_with_attached_device_has_latest_firmware():
         mm.copy_main.assert_called_once_with()
 
 
+def test_runtime_hash(tmp_path):
+    """
+    The bundled runtime is identified by its version and custom runtimes by
+    the hash of their contents.
+    """
+    assert runtime_hash(None) == uflash.MICROPYTHON_VERSION
+    runtime = tmp_path / "runtime.hex"
+    runtime.write_bytes(b":00000001FF")
+    assert runtime_hash(str(runtime)).startswith("custom:")
+    assert runtime_hash(str(runtime)) == runtime_hash(str(runtime))
+    assert runtime_hash(str(tmp_path / "missing.hex")) is None
+
+
+def test_script_hash():
+    """
+    Scripts are hashed as UTF-8 encoded bytes.
+    """
+    assert script_hash("é") == script_hash("é".encode("utf-8"))
+    assert script_hash(b"foo") != script_hash(b"bar")
+
+
+def test_flash_probes_version_once():
+    """
+    The device is only asked for its version of MicroPython the first time
+    it's flashed, and an unchanged script isn't copied onto it again.
+    """
+    version_info = {
+        "release": uflash.MICROPYTHON_VERSION,
+        "version": "micro:bit v1.0.0+b51a405 on 2018-09-18; MicroPython",
+    }
+    with mock.patch(
+        "mu.modes.microbit.uflash.find_microbit", return_value="bar"
+    ), mock.patch(
+        "mu.modes.microbit.microfs", autospec=True
+    ) as mock_microfs, mock.patch(
+        "mu.modes.microbit.os.path.exists", return_value=True
+    ), mock.patch(
+        "mu.modes.microbit.DeviceFlasher"
+    ) as mock_flasher_class:
+        mock_microfs.version.return_value = version_info
+        mock_microfs.execute.return_value = ("", "")
+        view = mock.MagicMock()
+        view.current_tab.text = mock.MagicMock(return_value="foo")
+        editor = mock.MagicMock()
+        editor.minify = False
+        editor.microbit_runtime = ""
+        mm = MicrobitMode(editor, view)
+        mm.find_device = mock.MagicMock(return_value=("COM1", "990112345"))
+        mm.flash()
+        assert mock_microfs.execute.call_count == 1
+        assert mm.device_cache["990112345"] == {
+            "serial_number": "990112345",
+            "port": "COM1",
+            "version": uflash.MICROPYTHON_VERSION,
+            "script": script_hash(b"foo"),
+        }
+        mm.flash()
+        assert mock_microfs.execute.call_count == 1
+        editor.show_status_message.assert_called_with(
+            "The micro:bit already has this code."
+        )
+        view.current_tab.text.return_value = "bar"
+        mm.flash()
+        assert mock_microfs.execute.call_count == 2
+    assert mock_microfs.version.call_count == 1
+    assert mock_flasher_class.call_count == 0
+
+
+def test_flash_runtime_already_flashed():
+    """
+    If Mu has flashed the custom runtime onto the device itself, it isn't
+    flashed again and the script is simply copied.
+    """
+    with mock.patch(
+        "mu.modes.microbit.uflash.find_microbit", return_value="bar"
+    ), mock.patch(
+        "mu.modes.microbit.microfs.version"
+    ) as mock_version, mock.patch(
+        "mu.modes.microbit.os.path.exists", return_value=True
+    ), mock.patch(
+        "mu.modes.microbit.runtime_hash", return_value="custom:abc"
+    ), mock.patch(
+        "mu.modes.microbit.DeviceFlasher"
+    ) as mock_flasher_class:
+        view = mock.MagicMock()
+        view.current_tab.text = mock.MagicMock(return_value="foo")
+        editor = mock.MagicMock()
+        editor.minify = False
+        editor.microbit_runtime = "/foo/bar.hex"
+        mm = MicrobitMode(editor, view)
+        mm.device_cache["990112345"] = {"runtime": "custom:abc"}
+        mm.find_device = mock.MagicMock(return_value=("COM1", "990112345"))
+        mm.copy_main = mock.MagicMock()
+        mm.flash()
+    mm.copy_main.assert_called_once_with()
+    assert mock_flasher_class.call_count == 0
+    assert mock_version.call_count == 0
+
+
 def test_flash_device_has_latest_firmware_encounters_serial_problem_windows():
     """
     If copy_main encounters an IOError on Windows, revert to old-school
@@ -231,7 +446,7 @@ def test_flash_device_has_latest_firmware_encounters_serial_problem_unix():
     ), mock.patch(
         "mu.modes.microbit.DeviceFlasher", mock_flasher_class
     ), mock.patch(
-        "mu.modes.microbit.QTimer", mock_timer_class
+        "mu.modes.microbit.FlashMonitor", mock_timer_class
     ), mock.patch(
         "mu.modes.microbit.sys.platform", "linux"
     ):
@@ -255,9 +470,9 @@ def test_flash_device_has_latest_firmware_encounters_serial_problem_unix():
         )
         mock_flasher.start.assert_called_once_with()
         assert mm.flash_timer == mock_timer
-        mock_timer.timeout.connect.assert_called_once_with(mm.flash_finished)
-        mock_timer.setSingleShot.assert_called_once_with(True)
-        mock_timer.start.assert_called_once_with(10000)
+        mock_timer_class.assert_called_once_with("bar")
+        mock_timer.finished.connect.assert_called_once_with(mm.flash_finished)
+        mock_timer.start.assert_called_once_with()
 
 
 def test_flash_with_attached_device_has_latest_firmware_encounters_problem():
@@ -508,7 +723,7 @@ def test_flash_forced_with_attached_device_as_not_windows():
     ), mock.patch(
         "mu.modes.microbit.sys.platform", "linux"
     ), mock.patch(
-        "mu.modes.microbit.QTimer", mock_timer_class
+        "mu.modes.microbit.FlashMonitor", mock_timer_class
     ):
         view = mock.MagicMock()
         view.current_tab.text = mock.MagicMock(return_value="foo")
@@ -526,9 +741,9 @@ def test_flash_forced_with_attached_device_as_not_windows():
         mm.set_buttons.assert_called_once_with(flash=False)
         mock_flasher_class.assert_called_once_with(["bar"], b"", None)
         assert mock_flasher.finished.connect.call_count == 0
-        mock_timer.timeout.connect.assert_called_once_with(mm.flash_finished)
-        mock_timer.setSingleShot.assert_called_once_with(True)
-        mock_timer.start.assert_called_once_with(10000)
+        mock_timer_class.assert_called_once_with("bar")
+        mock_timer.finished.connect.assert_called_once_with(mm.flash_finished)
+        mock_timer.start.assert_called_once_with()
         mock_flasher.on_flash_fail.connect.assert_called_once_with(
             mm.flash_failed
         )
@@ -595,7 +810,7 @@ def test_flash_with_attached_known_device_and_forced():
     ), mock.patch(
         "mu.modes.microbit.sys.platform", "linux"
     ), mock.patch(
-        "mu.modes.microbit.QTimer", mock_timer_class
+        "mu.modes.microbit.FlashMonitor", mock_timer_class
     ):
         view = mock.MagicMock()
         # Trigger force flash with an empty file.
@@ -866,6 +1081,32 @@ def test_flash_finished_copy_main():
     mm.copy_main.assert_called_once_with()
 
 
+def test_flash_finished_records_runtime():
+    """
+    Once a runtime is flashed, the device is known to have it and an empty
+    file system, even if flashing looked like the device was unplugged.
+    """
+    mm = MicrobitMode(mock.MagicMock(), mock.MagicMock())
+    mm.set_buttons = mock.MagicMock()
+    device = {
+        "serial_number": "990112345",
+        "port": "COM1",
+        "version": "0.0.1",
+        "script": "abc",
+    }
+    mm.flash_device = device
+    mm.flash_runtime = uflash.MICROPYTHON_VERSION
+    mm.flash_finished()
+    assert mm.device_cache == {
+        "990112345": {
+            "serial_number": "990112345",
+            "port": "COM1",
+            "runtime": uflash.MICROPYTHON_VERSION,
+        }
+    }
+    assert mm.flash_runtime is None
+
+
 def test_flash_finished_copy_main_encounters_error():
     """
     If copy_main encounters an error, flash_failed is called.
@@ -910,6 +1151,114 @@ def test_flash_finished_no_copy():
     assert mm.copy_main.call_count == 0
 
 
+def test_flash_finished_flash_pending():
+    """
+    If the file was saved while it was being flashed, it's flashed again.
+    """
+    view = mock.MagicMock()
+    editor = mock.MagicMock()
+    mm = MicrobitMode(editor, view)
+    mm.python_script = ""
+    mm.set_buttons = mock.MagicMock()
+    mm.flash_thread = mock.MagicMock()
+    mm.flash_timer = mock.MagicMock()
+    mm.flash = mock.MagicMock()
+    mm.flash_pending = True
+    mm.flash_finished()
+    mm.flash.assert_called_once_with()
+    assert mm.flash_pending is False
+
+
+def test_flash_on_save_path():
+    """
+    If flashing on save is switched on, flashing a tab means it's flashed
+    again when the user saves it.
+    """
+    editor = mock.MagicMock()
+    view = mock.MagicMock()
+    view.current_tab.path = "foo.py"
+    mm = MicrobitMode(editor, view)
+    mm.get_script = mock.MagicMock(return_value=None)
+    editor.flash_on_save = False
+    mm.flash()
+    assert mm.flash_on_save_path is None
+    editor.flash_on_save = True
+    mm.flash()
+    assert mm.flash_on_save_path == "foo.py"
+
+
+def test_tab_saved():
+    """
+    When the user saves the file last flashed in the current tab, it's
+    flashed, or flashed again once the flash in progress has finished.
+    """
+    editor = mock.MagicMock()
+    editor.mode = "microbit"
+    view = mock.MagicMock()
+    view.current_tab.path = "foo.py"
+    mm = MicrobitMode(editor, view)
+    mm.flash_on_save_path = "foo.py"
+    mm.flash = mock.MagicMock()
+    mm.tab_saved(view.current_tab)
+    mm.flash.assert_called_once_with()
+    mm.flash_thread = mock.MagicMock()
+    mm.tab_saved(view.current_tab)
+    mm.tab_saved(view.current_tab)
+    assert mm.flash.call_count == 1
+    assert mm.flash_pending is True
+
+
+@pytest.mark.parametrize(
+    "flash_on_save, mode, path, current",
+    [
+        (False, "microbit", "foo.py", True),
+        (True, "python", "foo.py", True),
+        (True, "microbit", "bar.py", True),
+        (True, "microbit", None, True),
+        (True, "microbit", "foo.py", False),
+    ],
+)
+def test_tab_saved_ignored(flash_on_save, mode, path, current):
+    """
+    Saves are ignored if flashing on save has been switched off, another
+    mode is in use, the file isn't the one last flashed or isn't in the
+    current tab.
+    """
+    editor = mock.MagicMock()
+    editor.flash_on_save = flash_on_save
+    editor.mode = mode
+    view = mock.MagicMock()
+    tab = view.current_tab if current else mock.MagicMock()
+    tab.path = path
+    mm = MicrobitMode(editor, view)
+    mm.flash_on_save_path = "foo.py"
+    mm.flash = mock.MagicMock()
+    mm.tab_saved(tab)
+    assert mm.flash.call_count == 0
+    assert mm.flash_pending is False
+
+
+@pytest.mark.parametrize("pane", ["repl", "plotter", "fs"])
+def test_tab_saved_device_in_use(pane):
+    """
+    Saves don't flash the device while the REPL, plotter or file system is
+    using its serial connection.
+    """
+    editor = mock.MagicMock()
+    editor.mode = "microbit"
+    view = mock.MagicMock()
+    view.current_tab.path = "foo.py"
+    mm = MicrobitMode(editor, view)
+    mm.flash_on_save_path = "foo.py"
+    mm.flash = mock.MagicMock()
+    setattr(mm, pane, mock.MagicMock())
+    mm.tab_saved(view.current_tab)
+    assert mm.flash.call_count == 0
+    mm.flash_thread = mock.MagicMock()
+    mm.tab_saved(view.current_tab)
+    assert mm.flash_pending is False
+
+
 def test_copy_main_no_python_script():
     """
     If copy_main is called and there's nothing in self.python_script, then
@@ -950,6 +1299,7 @@ def test_copy_main_with_python_script():
         assert serial.write.call_args_list[1][0][0] == b"microbit.reset()\r\n"
         # The script is re-set to empty.
         assert mm.python_script == ""
+    assert mm.flash_device["script"] == script_hash(b"import love")
 
 
 def test_copy_main_with_python_script_encounters_device_error():
@@ -966,6 +1316,156 @@ def test_copy_main_with_python_script_encounters_device_error():
             mm.copy_main()
 
 
+def test_flash_all():
+    """
+    Ensure the script in the current tab is flashed onto every attached
+    micro:bit at once, reporting on each as it's finished with.
+    """
+    view = mock.MagicMock()
+    view.current_tab.text.return_value = "print('Hello')"
+    view.current_tab.label = "foo.py"
+    editor = mock.MagicMock()
+    editor.microbit_runtime = ""
+    mm = MicrobitMode(editor, view)
+    mm.set_buttons = mock.MagicMock()
+    mm.python_script = "stale"
+    mock_flasher = mock.MagicMock()
+    paths = ["/media/MICROBIT", "/media/other/MICROBIT"]
+    with mock.patch(
+        "mu.modes.microbit.uflash.find_microbits", return_value=paths
+    ) as mock_find, mock.patch(
+        "mu.modes.microbit.DeviceFlasher", return_value=mock_flasher
+    ) as mock_flasher_class:
+        mm.flash_all()
+    mock_find.assert_called_once_with(mount_table.find_all)
+    mock_flasher_class.assert_called_once_with(paths, b"print('Hello')", None)
+    mock_flasher.on_device_flashed.connect.assert_called_once_with(
+        mm.device_flashed
+    )
+    mock_flasher.finished.connect.assert_called_once_with(
+        mm.flash_all_finished
+    )
+    mock_flasher.start.assert_called_once_with()
+    mm.set_buttons.assert_called_once_with(flash=False, flash_all=False)
+    assert mm.flash_paths == paths
+    assert mm.flash_results == {}
+    assert mm.python_script == ""
+
+
+def test_flash_all_while_flashing():
+    """
+    Nothing is flashed while a flash is already in progress.
+    """
+    view = mock.MagicMock()
+    mm = MicrobitMode(mock.MagicMock(), view)
+    mm.flash_thread = mock.MagicMock()
+    mm.get_script = mock.MagicMock()
+    with mock.patch("mu.modes.microbit.DeviceFlasher") as mock_flasher_class:
+        mm.flash_all()
+    assert mm.get_script.call_count == 0
+    assert mock_flasher_class.call_count == 0
+
+
+def test_flash_all_no_microbits():
+    """
+    If there are no micro:bits to flash, the user is told.
+    """
+    view = mock.MagicMock()
+    view.current_tab.text.return_value = "print('Hello')"
+    mm = MicrobitMode(mock.MagicMock(), view)
+    with mock.patch(
+        "mu.modes.microbit.uflash.find_microbits", return_value=[]
+    ), mock.patch("mu.modes.microbit.DeviceFlasher") as mock_flasher_class:
+        mm.flash_all()
+    assert view.show_message.call_count == 1
+    assert mock_flasher_class.call_count == 0
+
+
+def test_flash_all_no_tab_or_script():
+    """
+    Without a tab, or a script that can be flashed, there's nothing to do.
+    """
+    view = mock.MagicMock()
+    view.current_tab = None
+    mm = MicrobitMode(mock.MagicMock(), view)
+    mm.get_script = mock.MagicMock()
+    mm.flash_all()
+    assert mm.get_script.call_count == 0
+    view.current_tab = mock.MagicMock()
+    mm.get_script.return_value = None
+    with mock.patch("mu.modes.microbit.uflash.find_microbits") as mock_find:
+        mm.flash_all()
+    assert mock_find.call_count == 0
+
+
+def test_device_flashed():
+    """
+    Progress is shown as each device is finished with.
+    """
+    editor = mock.MagicMock()
+    mm = MicrobitMode(editor, mock.MagicMock())
+    mm.flash_paths = ["a", "b", "c"]
+    mm.flash_results = {}
+    mm.device_flashed("a", "")
+    mm.device_flashed("b", "Boom")
+    assert mm.flash_results == {"a": "", "b": "Boom"}
+    editor.show_status_message.assert_called_with("Flashed 1 of 3 micro:bits.")
+
+
+def test_flash_all_finished():
+    """
+    Once all the devices are finished with, the buttons are re-enabled and
+    the user is told the outcome.
+    """
+    view = mock.MagicMock()
+    editor = mock.MagicMock()
+    mm = MicrobitMode(editor, view)
+    mm.set_buttons = mock.MagicMock()
+    mm.flash_thread = mock.MagicMock()
+    mm.flash_paths = ["a", "b"]
+    mm.flash_results = {"a": "", "b": ""}
+    mm.flash_all_finished()
+    mm.set_buttons.assert_called_once_with(flash=True, flash_all=True)
+    assert mm.flash_thread is None
+    editor.show_status_message.assert_called_once_with(
+        "Finished flashing 2 micro:bits."
+    )
+    assert view.show_message.call_count == 0
+
+
+@pytest.mark.parametrize("pane", ["repl", "plotter", "fs"])
+def test_flash_all_finished_device_in_use(pane):
+    """
+    The Flash buttons stay disabled if the REPL, plotter or file system was
+    opened while flashing, since they're using the serial connection.
+    """
+    mm = MicrobitMode(mock.MagicMock(), mock.MagicMock())
+    mm.set_buttons = mock.MagicMock()
+    mm.flash_thread = mock.MagicMock()
+    mm.flash_paths = ["a"]
+    mm.flash_results = {"a": ""}
+    setattr(mm, pane, mock.MagicMock())
+    mm.flash_all_finished()
+    assert mm.set_buttons.call_count == 0
+    assert mm.flash_thread is None
+
+
+def test_flash_all_finished_failures():
+    """
+    The devices that couldn't be flashed are listed with the reason why.
+    """
+    view = mock.MagicMock()
+    mm = MicrobitMode(mock.MagicMock(), view)
+    mm.set_buttons = mock.MagicMock()
+    mm.flash_paths = ["a", "b", "c"]
+    mm.flash_results = {"a": "", "b": "Boom"}
+    mm.flash_all_finished()
+    message, information, icon = view.show_message.call_args[0]
+    assert message == "Could not flash 2 of 3 micro:bits."
+    assert information == "b: Boom\nc: Not flashed."
+    assert icon == "Warning"
+
+
 def test_flash_failed():
     """
     Ensure things are cleaned up if flashing failed.
@@ -985,6 +1485,39 @@ def test_flash_failed():
     mock_timer.stop.assert_called_once_with()
 
 
+def test_flash_failed_forgets_device():
+    """
+    If flashing failed, there's no knowing what's on the device.
+    """
+    mm = MicrobitMode(mock.MagicMock(), mock.MagicMock())
+    mm.set_buttons = mock.MagicMock()
+    mm.device_cache["990112345"] = {"port": "COM1", "runtime": "1.0.1"}
+    mm.flash_device = mm.device_cache["990112345"]
+    mm.flash_failed("Boom")
+    assert mm.device_cache == {"990112345": {}}
+
+
+def test_remove_device():
+    """
+    Devices on the unplugged port are forgotten.
+    """
+    mm = MicrobitMode(mock.MagicMock(), mock.MagicMock())
+    mm.device_cache = {"a": {"port": "COM1"}, "b": {"port": "COM2"}}
+    mm.remove_device("COM1")
+    assert mm.device_cache == {"b": {"port": "COM2"}}
+
+
+def test_forget_scripts():
+    """
+    The scripts on the devices are forgotten when the REPL or file system
+    is used to access them.
+    """
+    mm = MicrobitMode(mock.MagicMock(), mock.MagicMock())
+    mm.device_cache = {"a": {"port": "COM1", "script": "abc"}, "b": {}}
+    mm.forget_scripts()
+    assert mm.device_cache == {"a": {"port": "COM1"}, "b": {}}
+
+
 def test_flash_minify():
     view = mock.MagicMock()
     script = "#" + ("x" * 8193) + "\n"
@@ -994,13 +1527,17 @@ def test_flash_minify():
     editor.minify = True
     mm = MicrobitMode(editor, view)
     mm.set_buttons = mock.MagicMock()
-    with mock.patch("mu.modes.microbit.DeviceFlasher"):
+    with mock.patch("mu.modes.microbit.DeviceFlasher"), mock.patch.dict(
+        "mu.modes.microbit._minified", clear=True
+    ):
         with mock.patch("nudatus.mangle", return_value="") as m:
             mm.flash()
             m.assert_called_once_with(script)
 
     ex = TokenError("Bad", (1, 0))
-    with mock.patch("nudatus.mangle", side_effect=ex) as m:
+    with mock.patch("nudatus.mangle", side_effect=ex), mock.patch.dict(
+        "mu.modes.microbit._minified", clear=True
+    ):
         mm.flash()
         view.show_message.assert_called_once_with(
             "Problem with script", "Bad [1:0]", "Warning"
@@ -1030,6 +1567,149 @@ def test_flash_minify_no_minify():
             )
 
 
+def test_minify():
+    """
+    Ensure minified scripts are cached, forgetting the oldest when full.
+    """
+    with mock.patch.dict(
+        "mu.modes.microbit._minified", clear=True
+    ), mock.patch("mu.modes.microbit.MINIFIED_CACHE_SIZE", 2), mock.patch(
+        "nudatus.mangle", side_effect=lambda script: script.upper()
+    ) as mock_mangle:
+        assert minify(b"a") == b"A"
+        assert minify("a") == b"A"
+        assert mock_mangle.call_count == 1
+        minify(b"b")
+        minify(b"c")
+        assert minify(b"c") == b"C"
+        assert mock_mangle.call_count == 3
+        assert minify(b"a") == b"A"
+        assert mock_mangle.call_count == 4
+
+
+def test_ScriptMeasurer_run():
+    """
+    Ensure the size of a script is measured, minifying it only if it's too
+    long and minification is enabled.
+    """
+    sm = ScriptMeasurer(b"x = 1", True)
+    sm.measured = mock.MagicMock()
+    with mock.patch("mu.modes.microbit.minify") as mock_minify:
+        sm.run()
+    sm.measured.emit.assert_called_once_with(5, -1)
+    assert mock_minify.call_count == 0
+    script = b"#" + b"x" * 8193
+    sm = ScriptMeasurer(script, True)
+    sm.measured = mock.MagicMock()
+    with mock.patch("mu.modes.microbit.minify", return_value=b"") as m:
+        sm.run()
+    m.assert_called_once_with(script)
+    sm.measured.emit.assert_called_once_with(8194, 0)
+    sm = ScriptMeasurer(script, True)
+    sm.measured = mock.MagicMock()
+    ex = TokenError("Bad", (1, 0))
+    with mock.patch("mu.modes.microbit.minify", side_effect=ex):
+        sm.run()
+    sm.measured.emit.assert_called_once_with(8194, -1)
+    sm = ScriptMeasurer(script, False)
+    sm.measured = mock.MagicMock()
+    with mock.patch("mu.modes.microbit.minify") as mock_minify:
+        sm.run()
+    sm.measured.emit.assert_called_once_with(8194, -1)
+    assert mock_minify.call_count == 0
+
+
+def test_script_changed():
+    """
+    Edits to the current tab in micro:bit mode restart the countdown to
+    measuring the script.
+    """
+    editor = mock.MagicMock()
+    view = mock.MagicMock()
+    mm = MicrobitMode(editor, view)
+    view.text_changed.connect.assert_called_once_with(mm.script_changed)
+    mm.size_timer = mock.MagicMock()
+    mm.script_changed(view.current_tab)
+    assert mm.size_timer.start.call_count == 0
+    editor.mode = "microbit"
+    mm.script_changed(mock.MagicMock())
+    assert mm.size_timer.start.call_count == 0
+    mm.script_changed(view.current_tab)
+    mm.size_timer.start.assert_called_once_with()
+
+
+def test_measure_script():
+    """
+    Ensure the script in the current tab is measured in the background.
+    """
+    editor = mock.MagicMock()
+    editor.mode = "microbit"
+    view = mock.MagicMock()
+    view.current_tab.text.return_value = "x = 1"
+    mm = MicrobitMode(editor, view)
+    mm.minify_enabled = mock.MagicMock(return_value=True)
+    with mock.patch("mu.modes.microbit.ScriptMeasurer") as mock_measurer:
+        mm.measure_script()
+    mock_measurer.assert_called_once_with(b"x = 1", True)
+    assert mm.size_thread == mock_measurer()
+    mm.size_thread.measured.connect.assert_called_once_with(mm.script_measured)
+    mm.size_thread.finished.connect.assert_called_once_with(
+        mm.measure_finished
+    )
+    mm.size_thread.start.assert_called_once_with()
+    mm.measure_finished()
+    assert mm.size_thread is None
+
+
+def test_measure_script_busy():
+    """
+    If the last measurement hasn't finished, try again later.
+    """
+    editor = mock.MagicMock()
+    editor.mode = "microbit"
+    mm = MicrobitMode(editor, mock.MagicMock())
+    mm.size_thread = mock.MagicMock()
+    mm.size_timer = mock.MagicMock()
+    with mock.patch("mu.modes.microbit.ScriptMeasurer") as mock_measurer:
+        mm.measure_script()
+    assert mock_measurer.call_count == 0
+    mm.size_timer.start.assert_called_once_with()
+
+
+def test_measure_script_not_needed():
+    """
+    Nothing is measured if there's no tab or the mode has changed.
+    """
+    editor = mock.MagicMock()
+    view = mock.MagicMock()
+    mm = MicrobitMode(editor, view)
+    with mock.patch("mu.modes.microbit.ScriptMeasurer") as mock_measurer:
+        mm.measure_script()
+        editor.mode = "microbit"
+        view.current_tab = None
+        mm.measure_script()
+    assert mock_measurer.call_count == 0
+
+
+@pytest.mark.parametrize(
+    "size, minified_size, message",
+    [
+        (100, -1, "Your script uses 100 of 8188 bytes."),
+        (9000, 8000, "Your script uses 8000 of 8188 bytes once minified."),
+        (9000, 8200, "Your script is 13 bytes too long!"),
+        (8188, -1, "Your script is 1 bytes too long!"),
+    ],
+)
+def test_script_measured(size, minified_size, message):
+    """
+    Ensure the user is told how much space the script needs.
+    """
+    editor = mock.MagicMock()
+    mm = MicrobitMode(editor, mock.MagicMock())
+    mm.script_measured(size, minified_size)
+    editor.show_status_message.assert_called_once_with(message)
+
+
 def test_add_fs():
     """
     It's possible to add the file system pane if the REPL is inactive.
@@ -1082,6 +1762,8 @@ def test_toggle_files_on():
     """
     view = mock.MagicMock()
     view.button_bar.slots = {
+        "flash": mock.MagicMock(),
+        "flash_all": mock.MagicMock(),
         "repl": mock.MagicMock(),
         "plotter": mock.MagicMock(),
     }
@@ -1092,12 +1774,14 @@ def test_toggle_files_on():
         mm.fs = True
 
     mm.add_fs = mock.MagicMock(side_effect=side_effect)
+    mm.forget_scripts = mock.MagicMock()
     mm.repl = None
     mm.fs = None
     mm.toggle_files(None)
     assert mm.add_fs.call_count == 1
-    view.button_bar.slots["repl"].setEnabled.assert_called_once_with(False)
-    view.button_bar.slots["plotter"].setEnabled.assert_called_once_with(False)
+    mm.forget_scripts.assert_called_once_with()
+    for slot in view.button_bar.slots.values():
+        slot.setEnabled.assert_called_once_with(False)
 
 
 def test_toggle_files_off():
@@ -1108,10 +1792,14 @@ def test_toggle_files_off():
     editor = mock.MagicMock()
     mm = MicrobitMode(editor, view)
     mm.remove_fs = mock.MagicMock()
+    mm.set_buttons = mock.MagicMock()
     mm.repl = None
     mm.fs = True
     mm.toggle_files(None)
     assert mm.remove_fs.call_count == 1
+    mm.set_buttons.assert_called_once_with(
+        flash=True, flash_all=True, repl=True, plotter=True
+    )
 
 
 def test_toggle_files_with_repl():
@@ -1161,9 +1849,13 @@ def test_toggle_repl():
         side_effect=side_effect,
     ) as tr:
         mm.repl = None
+        mm.forget_scripts = mock.MagicMock()
         mm.toggle_repl(None)
         tr.assert_called_once_with(None)
-        mm.set_buttons.assert_called_once_with(flash=False, files=False)
+        mm.set_buttons.assert_called_once_with(
+            flash=False, flash_all=False, files=False
+        )
+        mm.forget_scripts.assert_called_once_with()
 
 
 def test_toggle_repl_no_repl_or_plotter():
@@ -1188,7 +1880,9 @@ def test_toggle_repl_no_repl_or_plotter():
         mm.repl = None
         mm.toggle_repl(None)
         tr.assert_called_once_with(None)
-        mm.set_buttons.assert_called_once_with(flash=True, files=True)
+        mm.set_buttons.assert_called_once_with(
+            flash=True, flash_all=True, files=True
+        )
 
 
 def test_toggle_repl_with_fs():
@@ -1226,7 +1920,9 @@ def test_toggle_plotter():
         mm.plotter = None
         mm.toggle_plotter(None)
         tp.assert_called_once_with(None)
-        mm.set_buttons.assert_called_once_with(flash=False, files=False)
+        mm.set_buttons.assert_called_once_with(
+            flash=False, flash_all=False, files=False
+        )
 
 
 def test_toggle_plotter_no_repl_or_plotter():
@@ -1251,7 +1947,9 @@ def test_toggle_plotter_no_repl_or_plotter():
         mm.plotter = None
         mm.toggle_plotter(None)
         tp.assert_called_once_with(None)
-        mm.set_buttons.assert_called_once_with(flash=True, files=True)
+        mm.set_buttons.assert_called_once_with(
+            flash=True, flash_all=True, files=True
+        )
 
 
 def test_toggle_plotter_with_fs():
@@ -5,6 +5,7 @@ Tests for the Python3 mode.
 import sys
 import os
 from mu.modes.python3 import PythonMode, KernelRunner
+from mu.modes.base import DataCapture
 from mu.modes.api import PYTHON3_APIS, SHARED_APIS, PI_APIS
 from mu.logic import MODULE_DIR
 from unittest import mock
@@ -224,7 +225,9 @@ def test_python_run_script():
     view.add_python3_runner.return_value = mock_runner
     pm = PythonMode(editor, view)
     pm.run_script()
-    editor.save_tab_to_file.assert_called_once_with(view.current_tab)
+    editor.save_tab_to_file.assert_called_once_with(
+        view.current_tab, wait=True
+    )
     view.add_python3_runner.assert_called_once_with(
         "/foo/bar", "/foo", interactive=True, envars=editor.envars
     )
@@ -282,7 +285,9 @@ def test_python_run_script_uses_editor_save():
     pm = PythonMode(editor, view)
     pm.stop_script = mock.MagicMock()
     pm.run_script()
-    editor.save_tab_to_file.assert_called_once_with(view.current_tab)
+    editor.save_tab_to_file.assert_called_once_with(
+        view.current_tab, wait=True
+    )
 
 
 def test_python_stop_script():
@@ -455,6 +460,7 @@ def test_python_add_plotter():
     pm.set_buttons = mock.MagicMock()
     pm.add_plotter()
     view.add_python3_plotter.assert_called_once_with(pm)
+    assert isinstance(view.plotter_pane.capture, DataCapture)
     assert pm.plotter
     pm.set_buttons.assert_called_once_with(debug=False)
     # Check button states are updated depending on other aspects of the mode
@@ -4,9 +4,12 @@ Tests for the app script.
 """
 import sys
 import os.path
+import logging
+import threading
 from unittest import mock
+import mu.app
 from mu.app import excepthook, run, setup_logging, debug, setup_modes
-from mu.logic import LOG_FILE, LOG_DIR, DEBUGGER_PORT, ENCODING
+from mu.logic import LOG_FILE, LOG_DIR, DATA_DIR, DEBUGGER_PORT, ENCODING
 from mu.interface.themes import NIGHT_STYLE, DAY_STYLE, CONTRAST_STYLE
 
 
@@ -50,9 +53,22 @@ def test_setup_logging():
         "mu.app.os.path.exists", return_value=False
     ), mock.patch("mu.app.logging") as logging, mock.patch(
         "mu.app.os.makedirs", return_value=None
-    ) as mkdir:
-        setup_logging()
-        mkdir.assert_called_once_with(LOG_DIR)
+    ) as mkdir, mock.patch(
+        "mu.app.QueueListener"
+    ) as listener, mock.patch(
+        "mu.app.QueueHandler"
+    ) as queue_handler, mock.patch(
+        "mu.app.atexit.register"
+    ) as register, mock.patch(
+        "mu.app.get_log_level", return_value=20
+    ):
+        with mock.patch("mu.app.log_listener", None):
+            assert setup_logging() == listener.return_value
+            assert mu.app.log_listener == listener.return_value
+        assert mkdir.call_args_list == [
+            mock.call(LOG_DIR),
+            mock.call(DATA_DIR),
+        ]
         log_conf.assert_called_once_with(
             LOG_FILE,
             when="midnight",
@@ -60,10 +76,60 @@ def test_setup_logging():
             delay=0,
             encoding=ENCODING,
         )
+        assert listener.call_args[0][1] == log_conf.return_value
+        listener.return_value.start.assert_called_once_with()
+        register.assert_called_once_with(listener.return_value.stop)
         logging.getLogger.assert_called_once_with()
+        log = logging.getLogger.return_value
+        queue_handler.assert_called_once_with(listener.return_value.queue)
+        log.addHandler.assert_called_once_with(queue_handler.return_value)
+        assert log.setLevel.call_args == mock.call(20)
         assert sys.excepthook == excepthook
 
 
+def test_setup_logging_writes_in_background(tmp_path):
+    """
+    Ensure messages are written to the log by the listener's thread, and
+    those queued when it's stopped are written.
+    """
+    log_file = str(tmp_path / "mu.log")
+    log = logging.getLogger()
+    handlers, level = log.handlers[:], log.level
+    with mock.patch("mu.app.LOG_FILE", log_file), mock.patch(
+        "mu.app.LOG_DIR", str(tmp_path)
+    ), mock.patch("mu.app.DATA_DIR", str(tmp_path)), mock.patch(
+        "mu.app.get_log_level", return_value=logging.INFO
+    ), mock.patch(
+        "mu.app.atexit.register"
+    ), mock.patch(
+        "mu.app.log_listener", None
+    ):
+        listener = setup_logging()
+    try:
+        threads = []
+        with mock.patch(
+            "logging.handlers.TimedRotatingFileHandler.emit",
+            side_effect=lambda record: threads.append(
+                threading.current_thread()
+            ),
+        ) as mock_emit:
+            logging.getLogger("mu.test").info("Hello %s", "world")
+            logging.getLogger("mu.test").debug("Not logged")
+            listener.stop()
+        assert mock_emit.call_count == 1
+        record = mock_emit.call_args[0][0]
+        assert record.getMessage() == "Hello world"
+        assert threads[0] != threading.current_thread()
+    finally:
+        for handler in listener.handlers:
+            handler.close()
+        for handler in log.handlers[:]:
+            if handler not in handlers:
+                log.removeHandler(handler)
+        log.setLevel(level)
+        sys.excepthook = sys.__excepthook__
+
+
 def test_setup_modes_with_pgzero():
     """
     If pgzero is installed, allow Pygame Zero mode.
@@ -134,7 +200,7 @@ def test_run():
         assert ed.call_count == 1
         assert len(ed.mock_calls) == 3
         assert win.call_count == 1
-        assert len(win.mock_calls) == 6
+        assert len(win.mock_calls) == 7
         assert ex.call_count == 1
         window.load_theme.emit("day")
         qa.assert_has_calls([mock.call().setStyleSheet(DAY_STYLE)])
@@ -159,6 +225,52 @@ def test_excepthook():
         exit.assert_called_once_with(1)
 
 
+def test_excepthook_flushes_log():
+    """
+    The error is written to the log before exiting, in case Mu dies without
+    running the atexit hooks. Logging still works afterwards.
+    """
+    ex = Exception("BANG")
+    exc_args = (type(ex), ex, ex.__traceback__)
+    listener = mock.MagicMock()
+    with mock.patch("mu.app.log_listener", listener), mock.patch(
+        "mu.app.logging.error"
+    ) as error, mock.patch("mu.app.sys.exit") as exit, mock.patch(
+        "mu.app.sys.__excepthook__"
+    ):
+        error.side_effect = lambda *args, **kwargs: listener.log()
+        exit.side_effect = lambda code: listener.exit()
+        excepthook(*exc_args)
+    assert [c[0] for c in listener.mock_calls] == [
+        "log",
+        "stop",
+        "start",
+        "exit",
+    ]
+
+
+def test_flush_log(tmp_path):
+    """
+    Ensure the messages queued are written to the log file, and logging
+    carries on.
+    """
+    handler = logging.FileHandler(str(tmp_path / "mu.log"))
+    listener = mu.app.QueueListener(mu.app.queue.Queue(), handler)
+    listener.start()
+    try:
+        with mock.patch("mu.app.log_listener", listener):
+            listener.queue.put(logging.makeLogRecord({"msg": "Hello"}))
+            mu.app.flush_log()
+            with open(str(tmp_path / "mu.log")) as f:
+                assert f.read() == "Hello\n"
+            assert listener._thread.is_alive()
+    finally:
+        listener.stop()
+        handler.close()
+    with mock.patch("mu.app.log_listener", None):
+        mu.app.flush_log()  # Logging isn't set up.
+
+
 def test_debug():
     """
     Ensure the debugger is run with the expected arguments given the filename
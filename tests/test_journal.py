@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the journal of unsaved work.
+"""
+import json
+import os
+from unittest import mock
+
+import pytest
+
+from mu import journal
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        ("hello world", "hello there world"),
+        ("hello world", "hello"),
+        ("hello", ""),
+        ("", "hello"),
+        ("aaaa", "aaaaa"),
+        ("abc", "xyz"),
+        ("same", "same"),
+    ],
+)
+def test_diff_and_patch(old, new):
+    """
+    Ensure the change from one text to another can be applied to get the new
+    text.
+    """
+    assert journal.patch(old, journal.diff(old, new)) == new
+
+
+def test_diff():
+    """
+    Ensure only the span that changed is recorded.
+    """
+    assert journal.diff("hello world", "hello there world") == (
+        6,
+        6,
+        "there ",
+    )
+    assert journal.diff("abcdef", "abXYef") == (2, 4, "XY")
+
+
+def test_record_and_replay(tmp_path):
+    """
+    Ensure the buffers recorded are replayed in the order they were first
+    recorded, with their changes and without those forgotten.
+    """
+    path = str(tmp_path / "journal.jsonl")
+    j = journal.Journal(path)
+    j.record("a", "a.py", "\n", "hello")
+    j.record("b", None, "\n", "untitled")
+    j.record("c", "c.py", "\n", "saved")
+    j.record("a", "a.py", "\n", "hello world")
+    j.record("a", "a.py", "\n", "hello world")  # Unchanged.
+    j.record("b", "b.py", "\r\n", "untitled")  # Saved as b.py.
+    j.forget("c")
+    j.forget("c")  # Already forgotten.
+    j.close()
+    with open(path) as f:
+        entries = [json.loads(line) for line in f]
+    assert len(entries) == 6
+    assert entries[3] == {"id": 0, "diff": [5, 5, " world"]}
+    assert journal.Journal(path).replay() == [
+        ("a.py", "\n", "hello world"),
+        ("b.py", "\r\n", "untitled"),
+    ]
+    assert j.owners == ["a", "b"]
+
+
+def test_replay_no_journal(tmp_path):
+    """
+    If there's no journal, there's nothing to replay.
+    """
+    j = journal.Journal(str(tmp_path / "journal.jsonl"))
+    assert j.replay() == []
+
+
+def test_replay_unreadable(tmp_path):
+    """
+    If the journal can't be read, it's logged and there's nothing to replay.
+    """
+    j = journal.Journal(str(tmp_path))
+    with mock.patch("mu.journal.logger.error") as mock_error:
+        assert j.replay() == []
+    assert mock_error.call_count == 2
+
+
+def test_replay_partial_entry(tmp_path):
+    """
+    A partly written last entry (e.g. if Mu crashed while writing it) is
+    ignored.
+    """
+    path = str(tmp_path / "journal.jsonl")
+    j = journal.Journal(path)
+    j.record("a", "a.py", "\n", "hello")
+    j.close()
+    with open(path, "a") as f:
+        f.write('{"id": 0, "diff": [5, 5, " wor')
+    assert journal.Journal(path).replay() == [("a.py", "\n", "hello")]
+
+
+def test_replay_invalid_entry(tmp_path):
+    """
+    Once an entry can't be made sense of, later changes to the buffers it
+    may have been for aren't applied to the wrong text. An earlier version of
+    them is recovered, or a later one if their whole text is recorded again.
+    """
+    path = str(tmp_path / "journal.jsonl")
+    j = journal.Journal(path)
+    j.record("a", "a.py", "\n", "hello")
+    j.record("b", "b.py", "\n", "abc")
+    j.close()
+    with open(path, "a") as f:
+        # A partly written entry, followed by more.
+        f.write('{"id": 0, "diff": [0, 1, "j"')
+        f.write('{"id": 1, "diff": [0, 0, "x"]}\n')
+        f.write('{"id": 1, "diff": [0, 0, "y"]}\n')
+        f.write('{"id": 0, "text": "help"}\n')
+        f.write('{"id": 0, "diff": [4, 4, "!"]}\n')
+        f.write('{"id": 0, "diff": [4]}\n')
+        f.write('{"id": 0, "diff": [0, 0, ">"]}\n')
+    with mock.patch("mu.journal.logger.warning") as mock_warning:
+        assert journal.Journal(path).replay() == [
+            ("a.py", "\n", "help!"),
+            ("b.py", "\n", "abc"),
+        ]
+    # Two entries are ignored, and earlier versions of both buffers used.
+    assert mock_warning.call_count == 4
+
+
+def test_replay_invalid_entry_before_changes(tmp_path):
+    """
+    Changes recorded after an entry that can't be made sense of aren't
+    applied to the buffers it may have been for.
+    """
+    path = str(tmp_path / "journal.jsonl")
+    with open(path, "w") as f:
+        f.write('{"id": 0, "path": "a.py", "newline": "\\n", "text": "ab"}\n')
+        f.write('{"id": 0, "diff": [2, 2, "c"]}\n')
+        f.write('{"id": 0, "diff": [3, 3, "d"], oops}\n')
+        f.write('{"id": 0, "diff": [4, 4, "e"]}\n')
+        f.write('{"id": 1, "diff": [0, 0, "no text"]}\n')
+        f.write('{"id": 2, "path": null, "newline": "\\n", "text": "x"}\n')
+        f.write('{"id": 2, "diff": [1, 1, "y"]}\n')
+    assert journal.Journal(path).replay() == [
+        ("a.py", "\n", "abc"),
+        (None, "\n", "xy"),
+    ]
+
+
+def test_compact(tmp_path):
+    """
+    Once enough changes have been appended, the journal is compacted to the
+    current text of the buffers.
+    """
+    path = str(tmp_path / "journal.jsonl")
+    j = journal.Journal(path, compact_size=100)
+    j.record("a", "a.py", "\n", "")
+    j.record("b", "b.py", "\n", "b")
+    j.forget("b")
+    for i in range(20):
+        j.record("a", "a.py", "\n", "x" * i)
+    j.close()
+    with open(path) as f:
+        lines = f.readlines()
+    assert len(lines) < 20
+    assert not os.path.exists(path + ".tmp")
+    assert journal.Journal(path).replay() == [("a.py", "\n", "x" * 19)]
+
+
+def test_clear(tmp_path):
+    """
+    Ensure clearing the journal removes it and forgets all the buffers.
+    """
+    path = str(tmp_path / "journal.jsonl")
+    j = journal.Journal(path)
+    j.record("a", "a.py", "\n", "hello")
+    j.clear()
+    assert not os.path.exists(path)
+    assert j.owners == []
+    j.clear()  # Clearing again does nothing.
+    j.record("a", "a.py", "\n", "hello")
+    j.close()
+    assert journal.Journal(path).replay() == [("a.py", "\n", "hello")]
@@ -8,14 +8,17 @@ import codecs
 import contextlib
 import json
 import locale
+import logging
 import re
 import shutil
 import subprocess
 import tempfile
+import time
 from unittest import mock
 import uuid
 
 import pytest
+import mu.journal
 import mu.logic
 from PyQt5.QtWidgets import QMessageBox
 from PyQt5.QtCore import pyqtSignal, QObject
@@ -157,6 +160,45 @@ def generate_session(
     shutil.rmtree(dirpath)
 
 
+#: The real FileSaver.save, see foreground_saves.
+FILE_SAVER_SAVE = mu.logic.FileSaver.save
+
+
+@pytest.fixture(autouse=True)
+def foreground_saves():
+    """
+    Files are saved straight away rather than in the background, so tests
+    can check the outcome without waiting for another thread.
+    """
+
+    def save(self, path, text, newline, context=None, wait=False):
+        FILE_SAVER_SAVE(self, path, text, newline, context, wait=True)
+
+    with mock.patch("mu.logic.FileSaver.save", save):
+        yield
+
+
+#: The real get_journal_path, see journal_path.
+GET_JOURNAL_PATH = mu.logic.get_journal_path
+
+
+@pytest.fixture(autouse=True)
+def journal_path(tmp_path):
+    """
+    The journal of unsaved work is kept in a temporary directory rather than
+    the user's data directory.
+    """
+    def get_journal_path(slot=0):
+        with mock.patch(
+            "mu.logic.get_session_path",
+            return_value=str(tmp_path / "session.json"),
+        ):
+            return GET_JOURNAL_PATH(slot)
+
+    with mock.patch("mu.logic.get_journal_path", get_journal_path):
+        yield get_journal_path()
+
+
 def mocked_view(text, path, newline):
     """Create a mocked view with path, newline and text
     """
@@ -169,6 +211,7 @@ def mocked_view(text, path, newline):
     view.get_save_path = mock.MagicMock(return_value=path)
     view.get_load_path = mock.MagicMock()
     view.add_tab = mock.MagicMock()
+    view.widgets = [view.current_tab]
     return view
 
 
@@ -225,6 +268,8 @@ def test_installed_packages_dist_info():
     )
     with mock.patch("builtins.open", mock_open), mock.patch(
         "mu.logic.os.listdir", mock_listdir
+    ), mock.patch("mu.logic.load_package_index", return_value={}), mock.patch(
+        "mu.logic.save_package_index"
     ):
         mock_open.reset_mock()
         result = mu.logic.installed_packages()
@@ -259,6 +304,8 @@ def test_installed_packages_egg_info():
     )
     with mock.patch("builtins.open", mock_open), mock.patch(
         "mu.logic.os.listdir", mock_listdir
+    ), mock.patch("mu.logic.load_package_index", return_value={}), mock.patch(
+        "mu.logic.save_package_index"
     ):
         mock_open.reset_mock()
         result = mu.logic.installed_packages()
@@ -278,13 +325,123 @@ def test_installed_packages_errors():
     mock_open = mock.MagicMock(side_effect=Exception("Boom"))
     with mock.patch("builtins.open", mock_open), mock.patch(
         "mu.logic.os.listdir", mock_listdir
-    ), mock.patch("mu.logic.logger.error") as mock_log:
+    ), mock.patch("mu.logic.logger.error") as mock_log, mock.patch(
+        "mu.logic.load_package_index", return_value={}
+    ), mock.patch(
+        "mu.logic.save_package_index"
+    ):
         mock_open.reset_mock()
         result = mu.logic.installed_packages()
         assert result == []
         assert mock_log.call_count == 4
 
 
+@contextlib.contextmanager
+def package_dir(*packages):
+    """
+    Create a temporary MODULE_DIR containing the named packages (with an old
+    modification time, so it can be trusted) and an index for it.
+    """
+    dirpath = tempfile.mkdtemp(prefix="mu-")
+    module_dir = os.path.join(dirpath, "site-packages")
+    os.mkdir(module_dir)
+    for name in packages:
+        add_package(module_dir, name)
+    with mock.patch("mu.logic.MODULE_DIR", module_dir), mock.patch(
+        "mu.logic.PACKAGE_INDEX", os.path.join(dirpath, "packages.json")
+    ):
+        yield module_dir
+    shutil.rmtree(dirpath)
+
+
+def add_package(module_dir, name):
+    """
+    Add the metadata for the named package to the module_dir, with old
+    modification times.
+    """
+    info = os.path.join(module_dir, name + "-1.0.dist-info")
+    os.mkdir(info)
+    with open(os.path.join(info, "METADATA"), "w") as f:
+        f.write("Metadata-Version: 2.1\nName: {}\n".format(name))
+    os.utime(info, (0, 0))
+    os.utime(module_dir, (0, 0))
+
+
+def test_installed_packages_index():
+    """
+    Ensure the names of the packages are kept in an index, which is used as
+    it is until MODULE_DIR changes. Then only new packages are read.
+    """
+    with package_dir("foo", "bar") as module_dir:
+        assert mu.logic.installed_packages() == ["bar", "foo"]
+        index = mu.logic.load_package_index()
+        assert index["mtime"] == 0
+        assert index["packages"]["foo-1.0.dist-info"] == {
+            "name": "foo",
+            "mtime": 0,
+        }
+        with mock.patch("mu.logic.os.listdir") as mock_listdir:
+            assert mu.logic.installed_packages() == ["bar", "foo"]
+        assert mock_listdir.call_count == 0
+        add_package(module_dir, "baz")
+        os.utime(module_dir, (60, 60))
+        with mock.patch(
+            "mu.logic.read_package_name", return_value="baz"
+        ) as mock_read:
+            assert mu.logic.installed_packages() == ["bar", "baz", "foo"]
+        mock_read.assert_called_once_with(
+            os.path.join(module_dir, "baz-1.0.dist-info")
+        )
+
+
+def test_installed_packages_recently_modified():
+    """
+    A directory modified too recently for its modification time to be
+    trusted isn't indexed by it, so it's checked again next time.
+    """
+    with package_dir("foo") as module_dir:
+        os.utime(module_dir)
+        assert mu.logic.installed_packages() == ["foo"]
+        assert mu.logic.load_package_index()["mtime"] is None
+        with mock.patch("mu.logic.os.listdir", return_value=[]):
+            assert mu.logic.installed_packages() == []
+
+
+def test_load_package_index_invalid():
+    """
+    An index that can't be read, or is for another MODULE_DIR, is ignored.
+    """
+    with package_dir() as module_dir:
+        assert mu.logic.load_package_index() == {}
+        with open(mu.logic.PACKAGE_INDEX, "w") as f:
+            f.write("[not valid")
+        assert mu.logic.load_package_index() == {}
+        mu.logic.save_package_index({"module_dir": "elsewhere"})
+        assert mu.logic.load_package_index() == {}
+        mu.logic.save_package_index({"module_dir": module_dir})
+        assert mu.logic.load_package_index() == {"module_dir": module_dir}
+
+
+def test_save_package_index_error():
+    """
+    A failure to save the index is logged.
+    """
+    with mock.patch(
+        "mu.logic.PACKAGE_INDEX", "/no/such/dir/x.json"
+    ), mock.patch("mu.logic.logger.error") as mock_log:
+        mu.logic.save_package_index({})
+    assert mock_log.call_count == 2
+
+
+def test_content_hash():
+    """
+    Ensure different text has a different hash.
+    """
+    assert mu.logic.content_hash("foo") == mu.logic.content_hash("foo")
+    assert mu.logic.content_hash("foo") != mu.logic.content_hash("foo ")
+    assert mu.logic.content_hash("\ud800")
+
+
 def test_write_and_flush():
     """
     Ensure the write and flush function tries to write to the filesystem and
@@ -305,43 +462,116 @@ def test_save_and_encode():
     to the default encoding (UTF-8 -- as per Python standard practice).
     """
     encoding_cookie = "# -*- coding: latin-1 -*-"
-    text = encoding_cookie + '\n\nprint("Hello")'
-    mock_open = mock.MagicMock()
-    mock_wandf = mock.MagicMock()
+    text = encoding_cookie + '\n\nprint("Hello \xe9")'
+    mock_write = mock.MagicMock()
     # Valid cookie
-    with mock.patch("mu.logic.open", mock_open), mock.patch(
-        "mu.logic.write_and_flush", mock_wandf
-    ):
+    with mock.patch("mu.logic.write_atomically", mock_write):
         mu.logic.save_and_encode(text, "foo.py")
-    mock_open.assert_called_once_with(
-        "foo.py", "w", encoding="latin-1", newline=""
+    mock_write.assert_called_once_with(
+        "foo.py", (text + os.linesep).encode("latin-1"), True
     )
-    assert mock_wandf.call_count == 1
-    mock_open.reset_mock()
-    mock_wandf.reset_mock()
+    mock_write.reset_mock()
     # Invalid cookie
     encoding_cookie = "# -*- coding: utf-42 -*-"
-    text = encoding_cookie + '\n\nprint("Hello")'
-    with mock.patch("mu.logic.open", mock_open), mock.patch(
-        "mu.logic.write_and_flush", mock_wandf
-    ):
-        mu.logic.save_and_encode(text, "foo.py")
-    mock_open.assert_called_once_with(
-        "foo.py", "w", encoding=mu.logic.ENCODING, newline=""
+    text = encoding_cookie + '\n\nprint("Hello \xe9")'
+    with mock.patch("mu.logic.write_atomically", mock_write):
+        mu.logic.save_and_encode(text, "foo.py", "\n", fsync=False)
+    mock_write.assert_called_once_with(
+        "foo.py", (text + "\n").encode(mu.logic.ENCODING), False
     )
-    assert mock_wandf.call_count == 1
-    mock_open.reset_mock()
-    mock_wandf.reset_mock()
+    mock_write.reset_mock()
     # No cookie
-    text = 'print("Hello")'
-    with mock.patch("mu.logic.open", mock_open), mock.patch(
-        "mu.logic.write_and_flush", mock_wandf
-    ):
-        mu.logic.save_and_encode(text, "foo.py")
-    mock_open.assert_called_once_with(
-        "foo.py", "w", encoding=mu.logic.ENCODING, newline=""
+    text = 'print("Hello \xe9")'
+    with mock.patch("mu.logic.write_atomically", mock_write):
+        mu.logic.save_and_encode(text, "foo.py", "\n")
+    mock_write.assert_called_once_with(
+        "foo.py", (text + "\n").encode(mu.logic.ENCODING), True
     )
-    assert mock_wandf.call_count == 1
+
+
+def test_save_and_encode_unencodable():
+    """
+    If the text can't be encoded, the file is left alone.
+    """
+    with generate_python_file("hello") as filepath:
+        with pytest.raises(UnicodeEncodeError):
+            mu.logic.save_and_encode("# coding: ascii\n\xe9", filepath)
+        with open(filepath) as f:
+            assert f.read() == "hello"
+        assert os.listdir(os.path.dirname(filepath)) == [
+            os.path.basename(filepath)
+        ]
+
+
+def test_write_atomically():
+    """
+    Ensure the file is replaced by a temporary file that's fsynced first,
+    keeping its permissions.
+    """
+    with generate_python_file("hello") as filepath:
+        os.chmod(filepath, 0o600)
+        with mock.patch("mu.logic.write_and_flush") as mock_wandf:
+            mock_wandf.side_effect = lambda f, data: f.write(data)
+            mu.logic.write_atomically(filepath, b"goodbye")
+        assert mock_wandf.call_count == 1
+        with open(filepath, "rb") as f:
+            assert f.read() == b"goodbye"
+        assert os.stat(filepath).st_mode & 0o777 == 0o600
+        assert os.listdir(os.path.dirname(filepath)) == [
+            os.path.basename(filepath)
+        ]
+        # Without fsync.
+        with mock.patch("mu.logic.write_and_flush") as mock_wandf:
+            mu.logic.write_atomically(filepath, b"hello again", fsync=False)
+        assert mock_wandf.call_count == 0
+        with open(filepath, "rb") as f:
+            assert f.read() == b"hello again"
+
+
+def test_write_atomically_symlink():
+    """
+    The file a symlink points to is replaced, rather than the symlink.
+    """
+    with generate_python_file("hello") as filepath:
+        link = filepath + ".link"
+        os.symlink(filepath, link)
+        mu.logic.write_atomically(link, b"goodbye", fsync=False)
+        assert os.path.islink(link)
+        with open(filepath, "rb") as f:
+            assert f.read() == b"goodbye"
+
+
+def test_write_atomically_fails():
+    """
+    If the file can't be replaced, it's left alone and the temporary file is
+    removed.
+    """
+    with generate_python_file("hello") as filepath:
+        with mock.patch(
+            "mu.logic.os.replace", side_effect=OSError("boom")
+        ), pytest.raises(OSError):
+            mu.logic.write_atomically(filepath, b"goodbye")
+        with open(filepath) as f:
+            assert f.read() == "hello"
+        assert os.listdir(os.path.dirname(filepath)) == [
+            os.path.basename(filepath)
+        ]
+
+
+def test_fsync_path():
+    """
+    Ensure files are fsynced, and a failure to do so is only logged.
+    """
+    with generate_python_file("hello") as filepath:
+        with mock.patch("mu.logic.os.fsync") as mock_fsync:
+            mu.logic.fsync_path(filepath)
+            mu.logic.fsync_path(os.path.dirname(filepath))
+        assert mock_fsync.call_count == 2
+        with mock.patch(
+            "mu.logic.os.fsync", side_effect=OSError("boom")
+        ), mock.patch("mu.logic.logger.warning") as mock_warning:
+            mu.logic.fsync_path(filepath)
+        assert mock_warning.call_count == 1
 
 
 def test_sniff_encoding_from_BOM():
@@ -394,6 +624,28 @@ def test_sniff_encoding_fallback_to_locale():
         assert mu.logic.sniff_encoding("foo.py") is None
 
 
+def test_sniff_encoding_of():
+    """
+    Ensure the encoding is sniffed from the first line of bytes already read.
+    """
+    mock_locale = mock.MagicMock()
+    mock_locale.getpreferredencoding.return_value = "UTF-8"
+    with mock.patch("mu.logic.locale", mock_locale):
+        assert mu.logic.sniff_encoding_of(codecs.BOM_UTF16_LE) == "utf-16"
+        data = b"# -*- coding: latin-1 -*-\n# -*- coding: ascii -*-\n"
+        assert mu.logic.sniff_encoding_of(data) == "latin-1"
+        assert mu.logic.sniff_encoding_of(b"\n" + data) is None
+        assert mu.logic.sniff_encoding_of(b"") is None
+
+
+def test_count_newlines():
+    """
+    Ensure Windows and Posix newlines are counted, including blank lines.
+    """
+    assert mu.logic.count_newlines("a\n\nb\r\n\r\n\n") == (2, 3)
+    assert mu.logic.count_newlines("") == (0, 0)
+
+
 def test_sniff_newline_convention():
     """
     Ensure sniff_newline_convention returns the expected newline convention.
@@ -540,6 +792,16 @@ def test_get_session_path():
         mock_func.assert_called_once_with("session.json")
 
 
+def test_get_journal_path():
+    """
+    Ensure the journal is kept next to the session file.
+    """
+    session_path = os.path.join("foo", "session.json")
+    with mock.patch("mu.logic.get_session_path", return_value=session_path):
+        assert GET_JOURNAL_PATH() == os.path.join("foo", "journal.jsonl")
+        assert GET_JOURNAL_PATH(2) == os.path.join("foo", "journal-2.jsonl")
+
+
 def test_get_settings_path():
     """
     Ensure the result of calling get_admin_file_path with settings.json returns
@@ -551,6 +813,45 @@ def test_get_settings_path():
         mock_func.assert_called_once_with("settings.json")
 
 
+def test_get_log_level():
+    """
+    Everything is logged unless a valid level is set in the settings file.
+    """
+    with mock.patch(
+        "mu.logic.get_settings_path", return_value="tests/settings.json"
+    ):
+        assert mu.logic.get_log_level() == logging.DEBUG
+    mock_open = mock.mock_open(read_data='{"log_level": "warning"}')
+    with mock.patch("builtins.open", mock_open):
+        assert mu.logic.get_log_level() == logging.WARNING
+    mock_open = mock.mock_open(read_data='{"log_level": "CHATTY"}')
+    with mock.patch("builtins.open", mock_open):
+        assert mu.logic.get_log_level() == logging.DEBUG
+    with mock.patch(
+        "mu.logic.get_settings_path",
+        return_value="tests/settingscorrupt.json",
+    ):
+        assert mu.logic.get_log_level() == logging.DEBUG
+
+
+def test_get_log_level_unusable_settings():
+    """
+    A settings file that can't be read, or that isn't a JSON object, doesn't
+    stop Mu from starting. Everything is logged instead.
+    """
+    with mock.patch("mu.logic.get_settings_path", return_value="tests"):
+        assert mu.logic.get_log_level() == logging.DEBUG
+    with mock.patch("builtins.open", side_effect=PermissionError):
+        assert mu.logic.get_log_level() == logging.DEBUG
+    mock_open = mock.mock_open(read_data="[]")
+    with mock.patch("builtins.open", mock_open):
+        assert mu.logic.get_log_level() == logging.DEBUG
+    mock_open = mock.mock_open(read_data='"WARNING"')
+    with mock.patch("builtins.open", mock_open):
+        assert mu.logic.get_log_level() == logging.DEBUG
+    assert mock_open.call_args[1] == {"encoding": "utf-8"}
+
+
 def test_extract_envars():
     """
     Given a correct textual representation, get the expected list
@@ -776,6 +1077,7 @@ def test_editor_init():
         assert e.modes == {}
         assert e.envars == []
         assert e.minify is False
+        assert e.flash_on_save is False
         assert e.microbit_runtime == ""
         assert e.connected_devices == set()
         assert e.find == ""
@@ -796,19 +1098,42 @@ def test_editor_setup():
     mock_mode = mock.MagicMock()
     mock_mode.workspace_dir.return_value = "foo"
     mock_modes = {"python": mock_mode}
-    with mock.patch("os.path.exists", return_value=False), mock.patch(
-        "os.makedirs", return_value=None
-    ) as mkd, mock.patch("shutil.copy") as mock_shutil_copy, mock.patch(
+    with mock.patch(
+        "os.path.exists", side_effect=lambda p: p == mu.logic.MOUNTINFO
+    ), mock.patch("os.makedirs", return_value=None) as mkd, mock.patch(
+        "shutil.copy"
+    ) as mock_shutil_copy, mock.patch(
         "shutil.copytree"
-    ) as mock_shutil_copytree:
+    ) as mock_shutil_copytree, mock.patch(
+        "mu.logic.mount_table"
+    ) as mock_mount_table:
         e.setup(mock_modes)
         assert mkd.call_count == 5
         assert mkd.call_args_list[0][0][0] == "foo"
         asset_len = len(mu.logic.DEFAULT_IMAGES) + len(mu.logic.DEFAULT_SOUNDS)
-        assert mock_shutil_copy.call_count == asset_len
+        # Plus the MicroPython telemetry helper.
+        assert mock_shutil_copy.call_count == asset_len + 1
         assert mock_shutil_copytree.call_count == 2
     assert e.modes == mock_modes
     view.set_usb_checker.assert_called_once_with(1, e.check_usb)
+    mock_mount_table.start.assert_called_once_with()
+
+
+def test_editor_setup_no_mountinfo():
+    """
+    Where there's no kernel mount table to read cheaply (e.g. OSX), the
+    table of mounted volumes isn't polled, since that would mean running the
+    mount command every second.
+    """
+    view = mock.MagicMock()
+    e = mu.logic.Editor(view)
+    with mock.patch("os.path.exists", return_value=False), mock.patch(
+        "os.makedirs"
+    ), mock.patch("shutil.copy"), mock.patch("shutil.copytree"), mock.patch(
+        "mu.logic.mount_table"
+    ) as mock_mount_table:
+        e.setup({"python": mock.MagicMock()})
+    assert mock_mount_table.start.call_count == 0
 
 
 def test_editor_restore_session_existing_runtime():
@@ -820,19 +1145,40 @@ def test_editor_restore_session_existing_runtime():
     ed = mocked_editor(mode)
     with mock.patch("os.path.isfile", return_value=True):
         with generate_session(
-            theme, mode, file_contents, microbit_runtime="/foo", zoom_level=5
+            theme,
+            mode,
+            file_contents,
+            microbit_runtime="/foo",
+            zoom_level=5,
+            flash_on_save=True,
+            fsync_policy=mu.logic.FSYNC_ALWAYS,
         ):
             ed.restore_session()
 
     assert ed.theme == theme
-    assert ed._view.add_tab.call_count == len(file_contents)
+    assert ed._view.add_placeholder.call_count == len(file_contents)
     ed._view.set_theme.assert_called_once_with(theme)
     assert ed.envars == [["name", "value"]]
     assert ed.minify is False
+    assert ed.flash_on_save is True
+    assert ed.saver.fsync_policy == mu.logic.FSYNC_ALWAYS
     assert ed.microbit_runtime == "/foo"
     assert ed._view.zoom_position == 5
 
 
+def test_editor_restore_session_invalid_fsync_policy():
+    """
+    An fsync policy in the session that isn't known is ignored.
+    """
+    ed = mocked_editor()
+    with generate_session(fsync_policy="sometimes"), mock.patch(
+        "mu.logic.logger.warning"
+    ) as mock_warning:
+        ed.restore_session()
+    assert ed.saver.fsync_policy == mu.logic.FSYNC_BATCHED
+    mock_warning.assert_any_call("Unknown fsync policy: 'sometimes'")
+
+
 def test_editor_restore_session_missing_runtime():
     """
     If the referenced microbit_runtime file doesn't exist, reset to '' so Mu
@@ -846,7 +1192,7 @@ def test_editor_restore_session_missing_runtime():
         ed.restore_session()
 
     assert ed.theme == theme
-    assert ed._view.add_tab.call_count == len(file_contents)
+    assert ed._view.add_placeholder.call_count == len(file_contents)
     ed._view.set_theme.assert_called_once_with(theme)
     assert ed.envars == [["name", "value"]]
     assert ed.minify is False
@@ -947,8 +1293,8 @@ def test_editor_restore_session_invalid_file():
 
 def test_restore_session_open_tabs_in_the_same_order():
     """
-    Editor.restore_session() loads editor tabs in the same order as the 'paths'
-    array in the session.json file.
+    Editor.restore_session() adds editor tabs in the same order as the 'paths'
+    array in the session.json file, with the last one shown.
     """
     mocked_view = mock.MagicMock()
     mocked_view.tab_count = 0
@@ -958,20 +1304,184 @@ def test_restore_session_open_tabs_in_the_same_order():
     mocked_mode.save_timeout = 5
     ed.modes = {"python": mocked_mode}
 
-    ed.direct_load = mock.MagicMock()
-
     settings_paths = ["a.py", "b.py", "c.py", "d.py"]
     settings_json_payload = json.dumps({"paths": settings_paths})
 
     mock_open = mock.mock_open(read_data=settings_json_payload)
-    with mock.patch("builtins.open", mock_open):
+    with mock.patch("builtins.open", mock_open), mock.patch(
+        "os.path.isfile", return_value=True
+    ):
         ed.restore_session()
 
-    direct_load_calls_args = [
+    add_placeholder_calls_args = [
         os.path.basename(args[0])
-        for args, _kwargs in ed.direct_load.call_args_list
+        for args, _kwargs in mocked_view.add_placeholder.call_args_list
+    ]
+    assert add_placeholder_calls_args == settings_paths
+    mocked_view.focus_tab.assert_called_once_with(
+        mocked_view.add_placeholder()
+    )
+
+
+def test_restore_session_missing_file():
+    """
+    Files from the last session that no longer exist aren't restored.
+    """
+    ed = mocked_editor()
+    ed._view.tab_count = 0
+    settings = json.dumps({"paths": ["a.py"]})
+    mock_open = mock.mock_open(read_data=settings)
+    with mock.patch("builtins.open", mock_open), mock.patch(
+        "os.path.isfile", return_value=False
+    ):
+        ed.restore_session()
+    assert ed._view.add_placeholder.call_count == 0
+    assert ed._view.focus_tab.call_count == 0
+
+
+def test_restore_session_recovers_unsaved_work(journal_path):
+    """
+    Unsaved work recorded in the journal is reopened, in place of the
+    placeholder for its file if there is one, and journalled again.
+    """
+    journal = mu.journal.Journal(journal_path)
+    journal.record("a", "a.py", "\n", "a = 1")
+    journal.record("b", None, "\r\n", "b = 2")
+    journal.close()
+    ed = mocked_editor()
+    placeholder = mock.MagicMock()
+    ed._find_open_tab = mock.MagicMock(side_effect=[placeholder])
+    ed.show_status_message = mock.MagicMock()
+    with generate_session():
+        ed.restore_session()
+    api = ed.modes["python"].api()
+    ed._find_open_tab.assert_called_once_with("a.py")
+    ed._view.replace_placeholder.assert_called_once_with(
+        placeholder, "a.py", "a = 1", api, "\n"
+    )
+    ed._view.add_tab.assert_called_once_with(None, "b = 2", api, "\r\n")
+    tab = ed._view.add_tab.return_value
+    assert tab.saved_hash is None
+    tab.setModified.assert_called_once_with(True)
+    ed.show_status_message.assert_any_call("Recovered unsaved work.")
+    assert ed.journal.owners == [
+        ed._view.replace_placeholder.return_value,
+        tab,
     ]
-    assert direct_load_calls_args == settings_paths
+    ed.journal.close()
+    assert len(mu.journal.Journal(journal_path).replay()) == 2
+
+
+def test_restore_session_recovers_unsaved_work_loaded_tab(journal_path):
+    """
+    Unsaved work for a restored tab that's already been loaded (e.g. because
+    it's the current tab) is put into its editor, rather than replacing it.
+    """
+    journal = mu.journal.Journal(journal_path)
+    journal.record("a", "a.py", "\r\n", "a = 1")
+    journal.close()
+    ed = mocked_editor()
+    tab = mock.MagicMock()
+    tab.newline = "\n"
+    ed._find_open_tab = mock.MagicMock(return_value=tab)
+    ed._view.is_placeholder.return_value = False
+    with generate_session():
+        ed.restore_session()
+    ed._view.is_placeholder.assert_called_once_with(tab)
+    assert ed._view.replace_placeholder.call_count == 0
+    assert ed._view.add_tab.call_count == 0
+    tab.setText.assert_called_once_with("a = 1")
+    assert tab.newline == "\r\n"
+    assert tab.saved_hash is None
+    tab.setModified.assert_called_once_with(True)
+    assert ed.journal.owners == [tab]
+    ed.journal.close()
+
+
+def test_restore_session_nothing_to_recover(journal_path):
+    """
+    If there's no unsaved work to recover, a new journal is started.
+    """
+    ed = mocked_editor()
+    ed.show_status_message = mock.MagicMock()
+    with generate_session():
+        ed.restore_session()
+    assert ed.journal.path == journal_path
+    assert ed.journal.owners == []
+    assert ed._view.add_tab.call_count == 0
+
+
+def test_restore_session_journal_in_use(journal_path):
+    """
+    The journal of another instance of Mu that's still running isn't
+    recovered or cleared. A journal of its own is started instead.
+    """
+    journal = mu.journal.Journal(journal_path)
+    journal.record("a", "a.py", "\n", "a = 1")
+    journal.close()
+    running = mocked_editor()
+    assert running.lock_journal() == journal_path
+    ed = mocked_editor()
+    with generate_session():
+        ed.restore_session()
+    assert ed._view.add_tab.call_count == 0
+    assert ed.journal.path == mu.logic.get_journal_path(1)
+    assert len(mu.journal.Journal(journal_path).replay()) == 1
+    # Once the other instance has exited, its journal can be recovered.
+    running.journal_lock.unlock()
+    assert mocked_editor().lock_journal() == journal_path
+
+
+def test_restore_session_all_journals_in_use():
+    """
+    If every journal is in use, unsaved work isn't journalled.
+    """
+    ed = mocked_editor()
+    with mock.patch("mu.logic.QLockFile") as mock_lock_file:
+        mock_lock_file.return_value.tryLock.return_value = False
+        with generate_session():
+            ed.restore_session()
+    assert mock_lock_file.call_count == mu.logic.MAX_JOURNALS
+    assert ed.journal is None
+
+
+def test_tab_changed():
+    """
+    Ensure changed tabs are noted and the journal updated after a delay,
+    even if the text keeps changing.
+    """
+    ed = mocked_editor()
+    ed.journal_timer = mock.MagicMock()
+    ed.journal_timer.isActive.return_value = False
+    ed.tab_changed("tab")
+    ed.journal_timer.start.assert_called_once_with()
+    ed.journal_timer.isActive.return_value = True
+    ed.tab_changed("other tab")
+    assert ed.journal_timer.start.call_count == 1
+    assert ed.journal_pending == {"tab", "other tab"}
+
+
+def test_update_journal(journal_path):
+    """
+    Ensure changes to unsaved tabs are recorded, and tabs that are saved or
+    closed are forgotten.
+    """
+    ed = mocked_editor()
+    ed.update_journal()  # No journal yet.
+    ed.journal = mock.MagicMock()
+    changed, saved, closed, unchanged = (mock.MagicMock() for i in range(4))
+    saved.isModified.return_value = False
+    ed._view.widgets = [changed, saved, unchanged]
+    ed.journal.owners = [saved, closed, unchanged]
+    ed.journal_pending = {changed, saved}
+    ed.update_journal()
+    ed.journal.record.assert_called_once_with(
+        changed, changed.path, changed.newline, changed.text()
+    )
+    assert ed.journal.forget.call_count == 2
+    ed.journal.forget.assert_any_call(saved)
+    ed.journal.forget.assert_any_call(closed)
+    assert ed.journal_pending == set()
 
 
 def test_editor_restore_saved_window_geometry():
@@ -1039,20 +1549,17 @@ def test_editor_session_and_open_focus_passed_file():
     mock_open = mock.mock_open(read_data=settings)
     with mock.patch("builtins.open", mock_open), mock.patch(
         "os.path.exists", return_value=True
-    ):
+    ), mock.patch("os.path.isfile", return_value=True):
         ed.restore_session(paths=["path/foo.py"])
 
-    # direct_load should be called twice (once for each path)
-    assert ed.direct_load.call_count == 2
+    # The rest of the session is restored as placeholders.
+    view.add_placeholder.assert_called_once_with(
+        os.path.abspath("path/bar.py")
+    )
     # However, "foo.py" as the passed_filename should be direct_load-ed
     # at the end so it has focus, despite being the first file listed in
     # the restored session.
-    assert ed.direct_load.call_args_list[0][0][0] == os.path.abspath(
-        "path/bar.py"
-    )
-    assert ed.direct_load.call_args_list[1][0][0] == os.path.abspath(
-        "path/foo.py"
-    )
+    ed.direct_load.assert_called_once_with(os.path.abspath("path/foo.py"))
 
 
 def test_toggle_theme_to_night():
@@ -1144,7 +1651,7 @@ def test_load_python_file():
             mock_read.return_value = text, newline
             ed.load()
 
-    mock_read.assert_called_once_with(filepath)
+    mock_read.assert_called_once_with(filepath, None)
     ed._view.add_tab.assert_called_once_with(
         filepath, text, ed.modes[ed.mode].api(), newline
     )
@@ -1165,7 +1672,7 @@ def test_load_python_file_case_insensitive_file_type():
             mock_read.return_value = text, newline
             ed.load()
 
-    mock_read.assert_called_once_with(filepath.upper())
+    mock_read.assert_called_once_with(filepath.upper(), None)
     ed._view.add_tab.assert_called_once_with(
         filepath.upper(), text, ed.modes[ed.mode].api(), newline
     )
@@ -1263,6 +1770,97 @@ def test_no_duplicate_load_python_file_widget_file_no_longer_exists():
         assert log == "The file not_a_file.py no longer exists."
 
 
+def test_file_key():
+    """
+    Ensure a file has the same key whatever path it's reached by, and a
+    missing file has none.
+    """
+    with generate_python_file("abc") as filepath:
+        dirname, filename = os.path.split(filepath)
+        other_path = os.path.join(dirname, ".", filename)
+        assert mu.logic.file_key(filepath) == mu.logic.file_key(other_path)
+        assert mu.logic.file_key(filepath) is not None
+    assert mu.logic.file_key(filepath) is None
+
+
+def test_find_open_tab():
+    """
+    Ensure the open files are indexed so only new tabs and the file being
+    looked for need looking up.
+    """
+    ed = mocked_editor()
+    with generate_python_files(["a", "b"]) as paths:
+        tab_a, tab_b, unsaved_tab = (
+            mock.MagicMock(),
+            mock.MagicMock(),
+            mock.MagicMock(),
+        )
+        tab_a.path, tab_b.path = paths
+        unsaved_tab.path = None
+        ed._view.widgets = [tab_a, unsaved_tab]
+        with mock.patch(
+            "mu.logic.file_key", wraps=mu.logic.file_key
+        ) as mock_key:
+            assert ed._find_open_tab(paths[1]) is None
+            assert mock_key.call_count == 2
+            ed._view.widgets = [tab_a, unsaved_tab, tab_b]
+            assert ed._find_open_tab(paths[0]) is tab_a
+            # Checking the tab still has the file found.
+            assert mock_key.call_count == 5
+            assert ed._find_open_tab("missing.py") is None
+            assert mock_key.call_count == 6
+        # Closed tabs are forgotten.
+        ed._view.widgets = [tab_b]
+        assert ed._find_open_tab(paths[0]) is None
+        assert ed._find_open_tab(paths[1]) is tab_b
+        assert list(ed.tab_files) == [tab_b]
+        # Renamed tabs are indexed again.
+        tab_b.path = paths[0]
+        assert ed._find_open_tab(paths[0]) is tab_b
+        assert ed._find_open_tab(paths[1]) is None
+
+
+def test_find_open_tab_replaced_file():
+    """
+    If the file of a tab has been replaced since it was indexed, another
+    file that has its old key isn't mistaken for it.
+    """
+    ed = mocked_editor()
+    tab = mock.MagicMock()
+    tab.path = "a.py"
+    ed._view.widgets = [tab]
+    with mock.patch("mu.logic.file_key", return_value=(1, 2)):
+        assert ed._find_open_tab("a.py") is tab
+    keys = [(1, 2), (1, 3), (1, 3)]
+    with mock.patch("mu.logic.file_key", side_effect=keys):
+        assert ed._find_open_tab("b.py") is None
+    assert ed.tab_files[tab] == ("a.py", (1, 3))
+
+
+def test_find_open_tab_file_replaced_outside_mu(tmp_path):
+    """
+    If something other than Mu replaces the file of a tab (e.g. a git
+    checkout or another editor saving it), the tab is still found by its
+    path even though the file has a new key.
+    """
+    ed = mocked_editor()
+    path = tmp_path / "a.py"
+    path.write_text("old")
+    tab = mock.MagicMock()
+    tab.path = str(path)
+    ed._view.widgets = [tab]
+    assert ed._find_open_tab(str(path)) is tab
+    old_key = ed.tab_files[tab][1]
+    # Keep the old file, so its inode isn't reused for the new one.
+    os.rename(str(path), str(tmp_path / "a.py.orig"))
+    new_path = tmp_path / "new.py"
+    new_path.write_text("new")
+    os.replace(str(new_path), str(path))
+    assert mu.logic.file_key(str(path)) != old_key
+    assert ed._find_open_tab(os.path.join(str(tmp_path), ".", "a.py")) is tab
+    assert ed.tab_files[tab] == (str(path), mu.logic.file_key(str(path)))
+
+
 def test_load_other_file():
     """
     If the user specifies a file supported by a Mu mode (like a .hex file) then
@@ -1392,6 +1990,255 @@ def test_load_recovers_from_oserror():
     assert ed._view.show_message.call_count == 1
 
 
+def test_load_large_file():
+    """
+    Big files are read in the background, with progress reported, and added
+    as a tab once they've been read.
+    """
+    ed = mocked_editor()
+    with generate_python_file("python") as filepath, mock.patch(
+        "mu.logic.LARGE_FILE_SIZE", 1
+    ), mock.patch("mu.logic.FileLoader") as mock_loader:
+        ed._load(filepath)
+        # Loading the same file again while it's loading does nothing.
+        ed._load(filepath)
+    mock_loader.assert_called_once_with(filepath, ed._read)
+    loader = mock_loader()
+    loader.progress.connect.assert_called_once_with(ed._load_progress)
+    loader.loaded.connect.assert_called_once_with(ed._load_finished)
+    loader.failed.connect.assert_called_once_with(ed._load_failed)
+    loader.start.assert_called_once_with()
+    assert ed.loaders == {filepath: loader}
+    assert ed._view.add_tab.call_count == 0
+    on_finished = loader.finished.connect.call_args[0][0]
+    on_finished()
+    assert ed.loaders == {}
+    ed.show_status_message = mock.MagicMock()
+    ed._load_progress(filepath, 50)
+    ed.show_status_message.assert_called_once_with(
+        "Loading {}: 50%".format(os.path.basename(filepath))
+    )
+    ed._load_finished(filepath, (filepath, "python", "\n", None))
+    ed._view.add_tab.assert_called_once_with(
+        filepath, "python", ed.modes[ed.mode].api(), "\n"
+    )
+    ed._load_failed(filepath, OSError("boom"))
+    assert ed._view.show_message.call_count == 1
+
+
+def test_load_placeholder():
+    """
+    When a restored tab is first shown, its file is read and the placeholder
+    replaced by an editor.
+    """
+    ed = mocked_editor()
+    placeholder = mock.MagicMock()
+    with generate_python_file("python") as filepath:
+        placeholder.path = filepath
+        ed.load_placeholder(placeholder)
+    ed._view.replace_placeholder.assert_called_once_with(
+        placeholder, filepath, "python", ed.modes[ed.mode].api(), "\n"
+    )
+
+
+def test_load_placeholder_error():
+    """
+    If the file can't be read, its tab is removed and the user told why.
+    """
+    ed = mocked_editor()
+    placeholder = mock.MagicMock()
+    placeholder.path = "foo.py"
+    with mock.patch("mu.logic.read_and_decode", side_effect=OSError("boom")):
+        ed.load_placeholder(placeholder)
+    ed._view.remove_placeholder.assert_called_once_with(placeholder)
+    assert ed._view.show_message.call_count == 1
+    assert ed._view.replace_placeholder.call_count == 0
+
+
+def test_load_placeholder_not_supported():
+    """
+    If no mode can open the file, its tab is removed.
+    """
+    ed = mocked_editor()
+    ed.modes[ed.mode].open_file.return_value = (None, None)
+    placeholder = mock.MagicMock()
+    placeholder.path = "foo.txt"
+    ed.load_placeholder(placeholder)
+    ed._view.remove_placeholder.assert_called_once_with(placeholder)
+    assert ed._view.replace_placeholder.call_count == 0
+
+
+def test_FileLoader_run():
+    """
+    Ensure the file is read and the result or error signalled.
+    """
+    read = mock.MagicMock(return_value="result")
+    fl = mu.logic.FileLoader("foo.py", read)
+    fl.loaded = mock.MagicMock()
+    fl.failed = mock.MagicMock()
+    fl.progress = mock.MagicMock()
+    fl.run()
+    read.assert_called_once_with("foo.py", fl.report_progress)
+    fl.loaded.emit.assert_called_once_with("foo.py", "result")
+    fl.report_progress(42)
+    fl.progress.emit.assert_called_once_with("foo.py", 42)
+    ex = OSError("boom")
+    read.side_effect = ex
+    fl.run()
+    fl.failed.emit.assert_called_once_with("foo.py", ex)
+
+
+def test_FileSaver_save():
+    """
+    Ensure saves are queued and made in the background, one after another,
+    with the files saved to local disks fsynced together at the end.
+    """
+    fs = mu.logic.FileSaver()
+    fs.start = mock.MagicMock()
+    with mock.patch.object(fs, "needs_fsync", return_value=False):
+        FILE_SAVER_SAVE(fs, "foo.py", "foo", "\n", "context")
+        FILE_SAVER_SAVE(fs, "bar.py", "bar", "\n")
+    assert fs.start.call_count == 2
+    fs.jobs.put(None)
+    fs.saved = mock.MagicMock()
+    with mock.patch("mu.logic.save_and_encode") as mock_save, mock.patch(
+        "mu.logic.fsync_path"
+    ) as mock_fsync, mock.patch("mu.logic.mount_table") as mock_table:
+        fs.run()
+    # The mount table isn't used from the saver's thread.
+    assert mock_table.mock_calls == []
+    assert mock_save.call_args_list == [
+        mock.call("foo", "foo.py", "\n", False),
+        mock.call("bar", "bar.py", "\n", False),
+    ]
+    assert fs.saved.emit.call_args_list == [
+        mock.call("foo.py", "context"),
+        mock.call("bar.py", None),
+    ]
+    mock_fsync.assert_any_call(os.path.realpath("foo.py"))
+    mock_fsync.assert_any_call(os.path.realpath("bar.py"))
+    assert fs.unsynced == set()
+    # The queue is done with.
+    fs.flush()
+
+
+def test_FileSaver_save_wait():
+    """
+    If asked to wait, the file is saved straight away.
+    """
+    fs = mu.logic.FileSaver()
+    fs.start = mock.MagicMock()
+    fs.saved = mock.MagicMock()
+    with mock.patch("mu.logic.save_and_encode") as mock_save, mock.patch(
+        "mu.logic.fsync_path"
+    ):
+        FILE_SAVER_SAVE(fs, "foo.py", "foo", "\n", "context", wait=True)
+    assert mock_save.call_count == 1
+    fs.saved.emit.assert_called_once_with("foo.py", "context")
+    assert fs.start.call_count == 0
+
+
+def test_FileSaver_write_failed():
+    """
+    Ensure a failure to save the file is signalled.
+    """
+    fs = mu.logic.FileSaver()
+    fs.failed = mock.MagicMock()
+    ex = OSError("boom")
+    with mock.patch("mu.logic.save_and_encode", side_effect=ex):
+        fs.write("foo.py", "foo", "\n", "context", False)
+    fs.failed.emit.assert_called_once_with("foo.py", "context", ex)
+    assert fs.unsynced == set()
+
+
+def test_FileSaver_needs_fsync():
+    """
+    Files on device volumes are fsynced straight away, as is every file if
+    the policy says so or the device volumes aren't known.
+    """
+    fs = mu.logic.FileSaver()
+    with mock.patch("mu.logic.mount_table") as mock_table:
+        mock_table.watching = True
+        mock_table.on_volume.return_value = False
+        assert fs.needs_fsync("foo.py") is False
+        mock_table.on_volume.return_value = True
+        assert fs.needs_fsync("foo.py") is True
+        mock_table.on_volume.return_value = False
+        mock_table.watching = False
+        assert fs.needs_fsync("foo.py") is True
+        mock_table.watching = True
+        fs.fsync_policy = mu.logic.FSYNC_ALWAYS
+        assert fs.needs_fsync("foo.py") is True
+
+
+def test_FileSaver_stop():
+    """
+    Ensure the thread is only stopped once the queued saves are done.
+    """
+    fs = mu.logic.FileSaver()
+    with mock.patch("mu.logic.save_and_encode") as mock_save:
+        FILE_SAVER_SAVE(fs, "foo.py", "foo", "\n")
+        fs.stop()
+    assert mock_save.call_count == 1
+    assert not fs.isRunning()
+    # Stopping a stopped saver does nothing.
+    fs.stop()
+
+
+def test_save_tab_to_file_in_background():
+    """
+    Ensure the tab is saved in the background unless asked to wait.
+    """
+    ed = mocked_editor(text="foo", path="foo.py", newline="\n")
+    ed.saver = mock.MagicMock()
+    tab = ed._view.current_tab
+    ed.save_tab_to_file(tab)
+    ed.saver.save.assert_called_once_with(
+        "foo.py", "foo", "\n", (tab, "foo", True), wait=False
+    )
+    ed.saver.reset_mock()
+    ed.save_tab_to_file(tab, show_error_messages=False, wait=True)
+    ed.saver.save.assert_called_once_with(
+        "foo.py", "foo", "\n", (tab, "foo", False), wait=True
+    )
+
+
+def test_save_finished():
+    """
+    Once saved, the tab is marked unmodified unless it's been changed or
+    closed meanwhile.
+    """
+    ed = mocked_editor(text="foo", path="foo.py", newline="\n")
+    ed.show_status_message = mock.MagicMock()
+    tab = ed._view.current_tab
+    ed._save_finished("foo.py", (tab, "foo", True))
+    tab.setModified.assert_called_once_with(False)
+    assert tab.saved_hash == mu.logic.content_hash("foo")
+    assert ed.show_status_message.call_count == 1
+    # The journal forgets the tab's unsaved work.
+    assert ed.journal_pending == {tab}
+    tab.setModified.reset_mock()
+    ed._save_finished("foo.py", (tab, "fo", True))
+    assert tab.setModified.call_count == 0
+    ed._view.widgets = []
+    ed._save_finished("foo.py", (tab, "foo", True))
+    assert tab.setModified.call_count == 0
+    assert ed.show_status_message.call_count == 2
+
+
+def test_save_failed_no_error_messages():
+    """
+    If a save without error messages fails (e.g. an autosave), the failure is
+    only logged.
+    """
+    ed = mocked_editor(text="foo", path="foo.py", newline="\n")
+    tab = ed._view.current_tab
+    with mock.patch("mu.logic.logger.error") as mock_error:
+        ed._save_failed("foo.py", (tab, "foo", False), OSError("boom"))
+    assert mock_error.call_count == 1
+    assert ed._view.show_message.call_count == 0
+
+
 #
 # When loading files Mu makes a note of the majority line-ending convention
 # in use in the file. When it is saved, that convention is used.
@@ -1639,7 +2486,8 @@ def test_save_no_path():
     ed.check_for_shadow_module = mock.MagicMock(return_value=False)
     with mock.patch("mu.logic.save_and_encode") as mock_save:
         ed.save()
-    mock_save.assert_called_with(text, path, newline)
+    mock_save.assert_called_with(text, path, newline, True)
+    ed.modes["python"].tab_saved.assert_called_once_with(ed._view.current_tab)
 
 
 def test_save_no_path_no_path_given():
@@ -1683,9 +2531,9 @@ def test_save_file_with_exception():
     view.current_tab.text = mock.MagicMock(return_value="foo")
     view.current_tab.setModified = mock.MagicMock(return_value=None)
     view.show_message = mock.MagicMock()
-    mock_open = mock.MagicMock(side_effect=OSError())
     ed = mu.logic.Editor(view)
-    with mock.patch("builtins.open", mock_open):
+    ed.modes = {"python": mock.MagicMock()}
+    with mock.patch("mu.logic.save_and_encode", side_effect=OSError()):
         ed.save()
     assert view.current_tab.setModified.call_count == 0
     assert view.show_message.call_count == 1
@@ -1720,13 +2568,22 @@ def test_save_python_file():
     view.current_tab.newline = "\n"
     view.get_save_path = mock.MagicMock(return_value=path)
     view.current_tab.setModified = mock.MagicMock(return_value=None)
+    view.widgets = [view.current_tab]
     ed = mu.logic.Editor(view)
-    with mock.patch("mu.logic.save_and_encode") as mock_save:
+    mock_mode = mock.MagicMock()
+    ed.modes = {"python": mock_mode}
+    with mock.patch("mu.logic.save_and_encode") as mock_save, mock.patch(
+        "mu.logic.file_key", return_value=(1, 2)
+    ):
         ed.save()
 
-    mock_save.assert_called_once_with(contents, path, newline)
+    mock_save.assert_called_once_with(contents, path, newline, True)
+    # The mode is told the user saved the tab (e.g. to flash it again).
+    mock_mode.tab_saved.assert_called_once_with(view.current_tab)
     assert view.get_save_path.call_count == 0
     view.current_tab.setModified.assert_called_once_with(False)
+    # Saving may have replaced the file, so it's indexed again.
+    assert ed.open_files == {(1, 2): view.current_tab}
 
 
 def test_save_with_non_py_file_extension():
@@ -1738,7 +2595,7 @@ def test_save_with_non_py_file_extension():
     ed._view.get_save_path.return_value = path
     with mock.patch("mu.logic.save_and_encode") as mock_save:
         ed.save()
-    mock_save.assert_called_once_with(text, path, newline)
+    mock_save.assert_called_once_with(text, path, newline, True)
     ed._view.get_save_path.call_count == 0
 
 
@@ -2328,6 +3185,45 @@ def test_quit_calls_mode_stop():
     ed.modes[ed.mode].stop.assert_called_once_with()
 
 
+def test_quit_finishes_saves():
+    """
+    Ensure the saves still in progress are finished before quitting.
+    """
+    view = mock.MagicMock()
+    view.modified = False
+    view.widgets = []
+    ed = mu.logic.Editor(view)
+    ed.modes = {"python": mock.MagicMock()}
+    ed.mode = "python"
+    ed.saver = mock.MagicMock()
+    ed.saver.fsync_policy = mu.logic.FSYNC_BATCHED
+    with mock.patch("sys.exit", return_value=None), mock.patch(
+        "builtins.open", mock.mock_open()
+    ), mock.patch("mu.logic.json.dump"):
+        ed.quit()
+    ed.saver.stop.assert_called_once_with()
+
+
+def test_quit_clears_journal():
+    """
+    Unsaved work has been abandoned on quitting, so the journal is cleared.
+    """
+    view = mock.MagicMock()
+    view.modified = False
+    view.widgets = []
+    ed = mu.logic.Editor(view)
+    ed.modes = {"python": mock.MagicMock()}
+    ed.mode = "python"
+    ed.journal = mock.MagicMock()
+    ed.journal_lock = mock.MagicMock()
+    with mock.patch("sys.exit", return_value=None), mock.patch(
+        "builtins.open", mock.mock_open()
+    ), mock.patch("mu.logic.json.dump"):
+        ed.quit()
+    ed.journal.clear.assert_called_once_with()
+    ed.journal_lock.unlock.assert_called_once_with()
+
+
 def test_quit_calls_sys_exit():
     """
     Ensure that sys.exit(0) is called.
@@ -2363,15 +3259,18 @@ def test_show_admin():
     ed.sync_package_state = mock.MagicMock()
     ed.envars = [["name", "value"]]
     ed.minify = True
+    ed.flash_on_save = True
     ed.microbit_runtime = "/foo/bar"
     settings = {
         "envars": "name=value",
         "minify": True,
+        "flash_on_save": True,
         "microbit_runtime": "/foo/bar",
     }
     new_settings = {
         "envars": "name=value",
         "minify": True,
+        "flash_on_save": True,
         "microbit_runtime": "/foo/bar",
         "packages": "baz\n",
     }
@@ -2382,13 +3281,12 @@ def test_show_admin():
         "os.path.isfile", return_value=True
     ), mock.patch("mu.logic.installed_packages", mock_ip):
         ed.show_admin(None)
-        mock_open.assert_called_once_with(
-            mu.logic.LOG_FILE, "r", encoding="utf8"
-        )
         assert view.show_admin.call_count == 1
+        assert view.show_admin.call_args[0][0] == mu.logic.LOG_FILE
         assert view.show_admin.call_args[0][1] == settings
         assert ed.envars == [["name", "value"]]
         assert ed.minify is True
+        assert ed.flash_on_save is True
         assert ed.microbit_runtime == "/foo/bar"
         # Expect package names to be normalised to lowercase.
         ed.sync_package_state.assert_called_once_with(["foo", "bar"], ["baz"])
@@ -2403,6 +3301,7 @@ def test_show_admin_no_change():
     ed.sync_package_state = mock.MagicMock()
     ed.envars = [["name", "value"]]
     ed.minify = True
+    ed.flash_on_save = True
     ed.microbit_runtime = "/foo/bar"
     new_settings = {}
     view.show_admin.return_value = new_settings
@@ -2425,15 +3324,18 @@ def test_show_admin_missing_microbit_runtime():
     ed.sync_package_state = mock.MagicMock()
     ed.envars = [["name", "value"]]
     ed.minify = True
+    ed.flash_on_save = True
     ed.microbit_runtime = "/foo/bar"
     settings = {
         "envars": "name=value",
         "minify": True,
+        "flash_on_save": True,
         "microbit_runtime": "/foo/bar",
     }
     new_settings = {
         "envars": "name=value",
         "minify": True,
+        "flash_on_save": True,
         "microbit_runtime": "/foo/bar",
         "packages": "baz\n",
     }
@@ -2444,13 +3346,12 @@ def test_show_admin_missing_microbit_runtime():
         "os.path.isfile", return_value=False
     ), mock.patch("mu.logic.installed_packages", mock_ip):
         ed.show_admin(None)
-        mock_open.assert_called_once_with(
-            mu.logic.LOG_FILE, "r", encoding="utf8"
-        )
         assert view.show_admin.call_count == 1
+        assert view.show_admin.call_args[0][0] == mu.logic.LOG_FILE
         assert view.show_admin.call_args[0][1] == settings
         assert ed.envars == [["name", "value"]]
         assert ed.minify is True
+        assert ed.flash_on_save is True
         assert ed.microbit_runtime == ""
         assert view.show_message.call_count == 1
         ed.sync_package_state.assert_called_once_with(["foo", "bar"], ["baz"])
@@ -2465,10 +3366,36 @@ def test_sync_package_state():
     ed = mu.logic.Editor(view)
     old_packages = ["foo", "bar"]
     new_packages = ["bar", "baz"]
-    ed.sync_package_state(old_packages, new_packages)
+    with mock.patch("mu.logic.QTimer.singleShot") as mock_single_shot:
+        ed.sync_package_state(old_packages, new_packages)
     view.sync_packages.assert_called_once_with(
         {"foo"}, {"baz"}, mu.logic.MODULE_DIR
     )
+    # The index of installed packages is brought up to date once the
+    # modification times of pip's changes can be relied on.
+    delay, callback = mock_single_shot.call_args[0]
+    assert delay > mu.logic.MTIME_RESOLUTION * 1000
+    assert callback is mu.logic.installed_packages
+
+
+def test_package_index_refreshed_after_sync():
+    """
+    Once pip's changes are old enough for their modification times to be
+    trusted, refreshing the index means they're not read again next time.
+    """
+    with package_dir("foo") as module_dir:
+        add_package(module_dir, "bar")
+        now = time.time()
+        os.utime(module_dir, (now, now))
+        assert mu.logic.installed_packages() == ["bar", "foo"]
+        assert mu.logic.load_package_index()["mtime"] is None
+        later = now + mu.logic.MTIME_RESOLUTION + 1
+        with mock.patch("mu.logic.time.time", return_value=later):
+            assert mu.logic.installed_packages() == ["bar", "foo"]
+            assert mu.logic.load_package_index()["mtime"] is not None
+            with mock.patch("mu.logic.os.listdir") as mock_listdir:
+                assert mu.logic.installed_packages() == ["bar", "foo"]
+        assert mock_listdir.call_count == 0
 
 
 def test_select_mode():
@@ -2611,6 +3538,26 @@ def test_autosave():
     )
 
 
+def test_autosave_unchanged():
+    """
+    Ensure tabs whose text is the same as when last loaded or saved aren't
+    saved again, but are marked as unmodified.
+    """
+    view = mock.MagicMock()
+    view.modified = True
+    mock_tab = mock.MagicMock()
+    mock_tab.path = "foo"
+    mock_tab.isModified.return_value = True
+    mock_tab.text.return_value = "foo"
+    mock_tab.saved_hash = mu.logic.content_hash("foo")
+    view.widgets = [mock_tab]
+    ed = mu.logic.Editor(view)
+    ed.save_tab_to_file = mock.MagicMock()
+    ed.autosave()
+    assert ed.save_tab_to_file.call_count == 0
+    mock_tab.setModified.assert_called_once_with(False)
+
+
 def test_check_usb():
     """
     Ensure the check_usb callback actually checks for connected USB devices.
@@ -2777,6 +3724,20 @@ def test_check_usb_remove_disconnected_devices():
     assert len(ed.connected_devices) == 0
 
 
+def test_check_usb_remove_device_from_mode():
+    """
+    Ensure a mode keeping track of its devices is told when one is removed.
+    """
+    view = mock.MagicMock()
+    ed = mu.logic.Editor(view)
+    mock_mode = mock.MagicMock()
+    mock_mode.find_device.return_value = (None, None)
+    ed.modes = {"microbit": mock_mode}
+    ed.connected_devices = {("microbit", "/dev/ttyACM1")}
+    ed.check_usb()
+    mock_mode.remove_device.assert_called_once_with("/dev/ttyACM1")
+
+
 def test_show_status_message():
     """
     Ensure the method calls the status_bar in the view layer.
@@ -2993,6 +3954,57 @@ def test_logic_independent_import_app():
 #
 
 
+def test_read_and_decode_progress():
+    """
+    If asked, progress is reported as the file is read in chunks.
+    """
+    progress = mock.MagicMock()
+    with generate_python_file("abc\ndef\n") as filepath, mock.patch(
+        "mu.logic.READ_CHUNK_SIZE", 3
+    ):
+        text, newline = mu.logic.read_and_decode(filepath, progress)
+    assert text == "abc\ndef\n"
+    assert newline == "\n"
+    assert progress.call_args_list == [
+        mock.call(37),
+        mock.call(75),
+        mock.call(100),
+    ]
+
+
+def test_read_and_decode_opens_once():
+    """
+    The file is only opened and read once to sniff its encoding, decode it
+    and convert its newlines.
+    """
+    data = b"# -*- coding: latin-1 -*-\r\nx = '\xe9'\r\n"
+    mock_open = mock.mock_open(read_data=data)
+    with mock.patch("mu.logic.open", mock_open):
+        text, newline = mu.logic.read_and_decode("foo.py")
+    mock_open.assert_called_once_with("foo.py", "rb")
+    assert text == "# -*- coding: latin-1 -*-\nx = '\xe9'\n"
+    assert newline == "\r\n"
+
+
+def test_read_bytes_changed_size():
+    """
+    A file that shrinks or grows while it's being read in chunks is read to
+    its end.
+    """
+    progress = mock.MagicMock()
+    with generate_python_file() as filepath:
+        with open(filepath, "wb") as f:
+            f.write(b"abcdef")
+        with open(filepath, "rb") as f, mock.patch(
+            "mu.logic.os.fstat", return_value=mock.MagicMock(st_size=10)
+        ):
+            assert mu.logic.read_bytes(f, progress) == b"abcdef"
+        with open(filepath, "rb") as f, mock.patch(
+            "mu.logic.os.fstat", return_value=mock.MagicMock(st_size=3)
+        ):
+            assert mu.logic.read_bytes(f, progress) == b"abcdef"
+
+
 def test_read_newline_no_text():
     """If the file being loaded is empty, use the platform default newline
     """
@@ -3232,6 +4244,8 @@ def test_handle_open_file():
 
     class Dummy(QObject):
         open_file = pyqtSignal(str)
+        load_placeholder = pyqtSignal(object)
+        text_changed = pyqtSignal(object)
 
     view = Dummy()
     edit = mu.logic.Editor(view)
@@ -3241,6 +4255,40 @@ def test_handle_open_file():
     m.assert_called_once_with("/test/path.py")
 
 
+def test_handle_load_placeholder():
+    """
+    Ensure the view's load_placeholder signal loads the placeholder's file.
+    """
+
+    class Dummy(QObject):
+        open_file = pyqtSignal(str)
+        load_placeholder = pyqtSignal(object)
+        text_changed = pyqtSignal(object)
+
+    view = Dummy()
+    with mock.patch("mu.logic.Editor.load_placeholder") as m:
+        mu.logic.Editor(view)
+        view.load_placeholder.emit("placeholder")
+    m.assert_called_once_with("placeholder")
+
+
+def test_handle_text_changed():
+    """
+    Ensure changes to the text in tabs are noted for the journal.
+    """
+
+    class Dummy(QObject):
+        open_file = pyqtSignal(str)
+        load_placeholder = pyqtSignal(object)
+        text_changed = pyqtSignal(object)
+
+    view = Dummy()
+    with mock.patch("mu.logic.Editor.tab_changed") as m:
+        mu.logic.Editor(view)
+        view.text_changed.emit("tab")
+    m.assert_called_once_with("tab")
+
+
 def test_load_cli():
     """
     Ensure loading paths specified from the command line works as expected.
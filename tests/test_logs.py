@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for reading Mu's log a page at a time.
+"""
+import logging
+from unittest import mock
+
+from mu import logs
+
+
+def record(i, level="DEBUG"):
+    """
+    Return the text of a log record in the format Mu logs in.
+    """
+    return "2020-01-01 12:00:00,000 - mu.app:1(run) {}: message {}\n".format(
+        level, i
+    )
+
+
+def make_log(tmp_path, text):
+    """
+    Return the path of a log containing the given text.
+    """
+    path = tmp_path / "mu.log"
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def test_reader_no_log(tmp_path):
+    """
+    A log that doesn't exist, or is empty, has nothing in it.
+    """
+    with mock.patch("mu.logs.logger.info") as mock_info:
+        reader = logs.LogReader(str(tmp_path / "missing.log"))
+    assert mock_info.call_count == 1
+    assert reader.size == 0
+    assert reader.text(0, 0) == ""
+    assert reader.find("foo", 0) == -1
+    reader.close()
+    reader = logs.LogReader(make_log(tmp_path, ""))
+    assert reader.size == 0
+    assert reader.page_before(0) == 0
+    assert reader.page_after(0) == 0
+    reader.close()
+
+
+def test_reader_pages(tmp_path):
+    """
+    Ensure pages start and end on line boundaries and, together, cover the
+    whole log.
+    """
+    text = "".join(record(i) for i in range(100))
+    reader = logs.LogReader(make_log(tmp_path, text), page_size=500)
+    stop = reader.size
+    pages = []
+    while stop:
+        start = reader.page_before(stop)
+        assert start == 0 or text[start - 1] == "\n"
+        assert stop - start <= 500 + len(record(99))
+        pages.insert(0, reader.text(start, stop))
+        stop = start
+    assert "".join(pages) == text
+    start = 0
+    pages = []
+    while start < reader.size:
+        stop = reader.page_after(start)
+        assert text[stop - 1] == "\n"
+        pages.append(reader.text(start, stop))
+        start = stop
+    assert "".join(pages) == text
+    reader.close()
+    reader.close()  # Closing again does nothing.
+
+
+def test_reader_no_final_newline(tmp_path):
+    """
+    The last line of the log may not end with a newline.
+    """
+    reader = logs.LogReader(make_log(tmp_path, "first\nlast"))
+    assert reader.line_start(8) == 6
+    assert reader.line_end(8) == reader.size
+    assert reader.page_after(6) == reader.size
+    reader.close()
+
+
+def test_reader_text_level(tmp_path):
+    """
+    Ensure only records at the given level or above are returned, including
+    the lines that follow them (e.g. a traceback), even if the page starts
+    part way through a record.
+    """
+    traceback = "Traceback:\n  line\n"
+    text = (
+        "started\n"
+        + record(1)
+        + record(2, "ERROR")
+        + traceback
+        + record(3, "INFO")
+        + record(4, "WARNING")
+    )
+    reader = logs.LogReader(make_log(tmp_path, text))
+    assert reader.text(0, reader.size, logging.WARNING) == (
+        "started\n" + record(2, "ERROR") + traceback + record(4, "WARNING")
+    )
+    start = text.index(traceback) + len("Traceback:\n")
+    assert reader.level_at(start) == logging.ERROR
+    assert reader.text(start, reader.size, logging.ERROR) == "  line\n"
+    assert reader.text(start, reader.size, logging.CRITICAL) == ""
+    assert reader.level_at(0) is None
+    reader.close()
+
+
+def test_reader_decodes(tmp_path):
+    """
+    Ensure the text is decoded as UTF-8, replacing anything that isn't.
+    """
+    path = tmp_path / "mu.log"
+    path.write_bytes("café\n".encode("utf-8") + b"\xff\n")
+    reader = logs.LogReader(str(path))
+    assert reader.text(0, reader.size) == "café\n�\n"
+    reader.close()
+
+
+def test_reader_find(tmp_path):
+    """
+    Ensure the last occurrence of a term before an offset, in a record at the
+    given level or above, is found.
+    """
+    text = record("needle", "ERROR") + record("needle") + record("hay")
+    reader = logs.LogReader(make_log(tmp_path, text))
+    second = text.rindex("needle")
+    assert reader.find("needle", reader.size) == second
+    assert reader.find("needle", second) == text.index("needle")
+    assert reader.find("needle", reader.size, logging.INFO) == text.index(
+        "needle"
+    )
+    assert reader.find("needle", 0) == -1
+    assert reader.find("", reader.size) == -1
+    assert reader.find("missing", reader.size, logging.INFO) == -1
+    reader.close()
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the shared table of mounted device volumes.
+"""
+from unittest import mock
+
+from mu import mounts
+
+
+MOUNTINFO = (
+    b"22 1 8:1 / / rw,relatime shared:1 - ext4 /dev/sda1 rw\n"
+    b"95 22 8:17 / /media/ntoll/MICROBIT rw - vfat /dev/sdb rw\n"
+    b"96 22 8:33 / /media/ntoll/CIRCUITPY\\0401 rw - vfat /dev/sdc rw\n"
+)
+
+
+def test_parse_mountinfo():
+    """
+    Ensure mount points are read from the kernel's mount table, with escaped
+    characters restored.
+    """
+    assert mounts.parse_mountinfo(MOUNTINFO) == [
+        "/",
+        "/media/ntoll/MICROBIT",
+        "/media/ntoll/CIRCUITPY 1",
+    ]
+
+
+def test_parse_mount():
+    """
+    Ensure mount points are read from the output of the mount command.
+    """
+    with open("tests/modes/mount_exists.txt", "rb") as fixture_file:
+        result = mounts.parse_mount(fixture_file.read())
+    assert result[:2] == ["/sys", "/proc"]
+    assert "/media/ntoll/CIRCUITPY" in result
+
+
+def test_parse_mount_spaces():
+    """
+    Ensure mount points containing spaces are read from the output of the
+    mount command on Linux and OSX.
+    """
+    output = (
+        b"/dev/sdb on /media/u/MICROBIT 1 type vfat (rw,nosuid)\n"
+        b"/dev/disk2 on /Volumes/MICROBIT 2 (msdos, local, nodev)\n"
+        b"map auto_home on /System/Volumes/Data/home (autofs)\n"
+    )
+    assert mounts.parse_mount(output) == [
+        "/media/u/MICROBIT 1",
+        "/Volumes/MICROBIT 2",
+        "/System/Volumes/Data/home",
+    ]
+
+
+def test_read_mount_table_mountinfo():
+    """
+    Where there's a kernel mount table, it's read in preference to running
+    the mount command.
+    """
+    mock_open = mock.mock_open(read_data=MOUNTINFO)
+    with mock.patch("builtins.open", mock_open), mock.patch(
+        "mu.mounts.check_output"
+    ) as mock_check:
+        assert mounts.read_mount_table() == (
+            MOUNTINFO,
+            mounts.parse_mountinfo,
+        )
+    mock_open.assert_called_once_with(mounts.MOUNTINFO, "rb")
+    assert mock_check.call_count == 0
+
+
+def test_read_mount_table_no_mount_command():
+    """
+    When the user doesn't have administrative privileges on OSX then the mount
+    command isn't on their path. In which case, check Mu uses the more
+    explicit /sbin/mount instead.
+    """
+    mock_check = mock.MagicMock(side_effect=[FileNotFoundError, b"output"])
+    with mock.patch(
+        "builtins.open", side_effect=FileNotFoundError
+    ), mock.patch("mu.mounts.check_output", mock_check):
+        assert mounts.read_mount_table() == (b"output", mounts.parse_mount)
+    assert mock_check.call_args_list == [
+        mock.call("mount"),
+        mock.call("/sbin/mount"),
+    ]
+    mock_check.side_effect = FileNotFoundError
+    with mock.patch(
+        "builtins.open", side_effect=FileNotFoundError
+    ), mock.patch("mu.mounts.check_output", mock_check):
+        assert mounts.read_mount_table() == (b"", mounts.parse_mount)
+
+
+def test_MountTable_refresh():
+    """
+    Ensure the device volumes are found and changes to them are signalled.
+    """
+    table = mounts.MountTable()
+    mounted = mock.MagicMock()
+    unmounted = mock.MagicMock()
+    table.volume_mounted.connect(mounted)
+    table.volume_unmounted.connect(unmounted)
+    with mock.patch(
+        "mu.mounts.read_mount_table",
+        return_value=(MOUNTINFO, mounts.parse_mountinfo),
+    ):
+        table.refresh()
+    assert table.volumes == {
+        "MICROBIT": "/media/ntoll/MICROBIT",
+        "CIRCUITPY": "/media/ntoll/CIRCUITPY 1",
+    }
+    assert mounted.call_count == 2
+    mounted.assert_any_call("MICROBIT", "/media/ntoll/MICROBIT")
+    assert unmounted.call_count == 0
+    # The micro:bit is remounted elsewhere.
+    remounted = MOUNTINFO.replace(b"ntoll/MICROBIT", b"other/MICROBIT")
+    mounted.reset_mock()
+    with mock.patch(
+        "mu.mounts.read_mount_table",
+        return_value=(remounted, mounts.parse_mountinfo),
+    ):
+        table.refresh()
+        assert table.is_mounted("/media/other/MICROBIT/")
+    unmounted.assert_called_once_with("MICROBIT", "/media/ntoll/MICROBIT")
+    mounted.assert_called_once_with("MICROBIT", "/media/other/MICROBIT")
+
+
+def test_MountTable_refresh_unchanged():
+    """
+    If the mounted filesystems haven't changed, they're not parsed again.
+    """
+    table = mounts.MountTable()
+    parse = mock.MagicMock(return_value=["/media/ntoll/MICROBIT"])
+    with mock.patch(
+        "mu.mounts.read_mount_table", return_value=(MOUNTINFO, parse)
+    ):
+        table.refresh()
+        table.refresh()
+    assert parse.call_count == 1
+
+
+def test_MountTable_find():
+    """
+    When the table isn't being kept up to date, it's refreshed before a
+    volume is looked up. Otherwise, the cached volumes are used.
+    """
+    table = mounts.MountTable()
+    with mock.patch(
+        "mu.mounts.read_mount_table",
+        return_value=(MOUNTINFO, mounts.parse_mountinfo),
+    ) as mock_read:
+        assert table.find("MICROBIT") == "/media/ntoll/MICROBIT"
+        assert mock_read.call_count == 1
+        table.start()
+        assert table.watching
+        assert mock_read.call_count == 2
+        assert table.find("MICROBIT") == "/media/ntoll/MICROBIT"
+        assert table.find("FOO") is None
+        assert table.is_mounted("/")
+        assert mock_read.call_count == 2
+        table.stop()
+    assert not table.watching
+
+
+def test_MountTable_find_all():
+    """
+    Ensure all the volumes with the same name are found, including those
+    with a number added to their name to tell them apart.
+    """
+    table = mounts.MountTable()
+    mountinfo = MOUNTINFO + b"97 22 8:49 / /media/ntoll/MICROBIT1 rw\n"
+    mountinfo += b"98 22 8:65 / /media/ntoll/MICROBIT\\04012 rw\n"
+    mountinfo += b"99 22 8:81 / /media/ntoll/1/MICROBIT rw\n"
+    mountinfo += b"100 22 8:97 / /media/ntoll/NOTMICROBIT rw\n"
+    mountinfo += b"101 22 8:113 / /media/ntoll/MICROBIT_BACKUP rw\n"
+    with mock.patch(
+        "mu.mounts.read_mount_table",
+        return_value=(mountinfo, mounts.parse_mountinfo),
+    ):
+        assert table.find_all("MICROBIT") == [
+            "/media/ntoll/MICROBIT",
+            "/media/ntoll/MICROBIT1",
+            "/media/ntoll/MICROBIT 12",
+            "/media/ntoll/1/MICROBIT",
+        ]
+        assert table.find_all("FOO") == []
+        assert table.on_volume("/media/ntoll/MICROBIT 12/main.py")
+
+
+def test_MountTable_find_all_mount_command():
+    """
+    Ensure several micro:bits are found in the output of the mount command
+    on OSX, where the second is mounted as "MICROBIT 1".
+    """
+    table = mounts.MountTable()
+    output = (
+        b"/dev/disk1s1 on / (apfs, local, journaled)\n"
+        b"/dev/disk2 on /Volumes/MICROBIT (msdos, local, nodev)\n"
+        b"/dev/disk3 on /Volumes/MICROBIT 1 (msdos, local, nodev)\n"
+    )
+    with mock.patch(
+        "mu.mounts.read_mount_table", return_value=(output, mounts.parse_mount)
+    ):
+        assert table.find_all("MICROBIT") == [
+            "/Volumes/MICROBIT",
+            "/Volumes/MICROBIT 1",
+        ]
+
+
+def test_MountTable_on_volume():
+    """
+    Ensure paths on the device volumes are recognised.
+    """
+    table = mounts.MountTable()
+    with mock.patch(
+        "mu.mounts.read_mount_table",
+        return_value=(MOUNTINFO, mounts.parse_mountinfo),
+    ):
+        table.refresh()
+    assert table.on_volume("/media/ntoll/MICROBIT")
+    assert table.on_volume("/media/ntoll/CIRCUITPY 1/code.py")
+    assert not table.on_volume("/media/ntoll/MICROBIT2/main.py")
+    assert not table.on_volume("/home/ntoll/mu_code/main.py")
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the decoding of binary telemetry sent to the plotter.
+"""
+import struct
+import importlib.util
+from unittest import mock
+
+import pytest
+
+import mu.telemetry
+from mu.resources import path
+from mu.telemetry import TelemetryDecoder, cobs_encode, cobs_decode
+
+
+def frame(payload):
+    """
+    Return the payload framed as the device sends it.
+    """
+    return b"\x00" + cobs_encode(payload) + b"\x00"
+
+
+def schema(fmt):
+    return frame(b"S" + fmt.encode("ascii"))
+
+
+def sample(fmt, *values):
+    return frame(b"D" + struct.pack(fmt, *values))
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"",
+        b"\x00",
+        b"\x00\x00",
+        b"abc",
+        b"a\x00b\x00",
+        bytes(range(256)),
+        b"x" * 254,
+        b"x" * 254 + b"\x00" + b"y" * 600,
+    ],
+)
+def test_cobs_round_trip(data):
+    """
+    Ensure COBS encoding removes all zero bytes and can be reversed.
+    """
+    encoded = cobs_encode(data)
+    assert b"\x00" not in encoded
+    assert cobs_decode(encoded) == data
+
+
+def test_cobs_encode_known_values():
+    """
+    Check the encoding against examples from the COBS specification.
+    """
+    assert cobs_encode(b"\x00") == b"\x01\x01"
+    assert cobs_encode(b"\x11\x22\x00\x33") == b"\x03\x11\x22\x02\x33"
+    assert cobs_encode(b"\x11\x00\x00\x00") == b"\x02\x11\x01\x01\x01"
+
+
+def test_cobs_decode_invalid():
+    """
+    Zero bytes and truncated blocks are not valid COBS encoded data.
+    """
+    with pytest.raises(ValueError):
+        cobs_decode(b"\x03\x11\x00")
+    with pytest.raises(ValueError):
+        cobs_decode(b"\x05\x11")
+
+
+def test_TelemetryDecoder_text_only():
+    """
+    Text without any frames is returned untouched.
+    """
+    td = TelemetryDecoder()
+    assert td.feed(b"(1, 2)\r\n") == (b"(1, 2)\r\n", [])
+
+
+def test_TelemetryDecoder_samples_amongst_text():
+    """
+    Samples are decoded with the most recent schema, and removed from the
+    surrounding text.
+    """
+    td = TelemetryDecoder()
+    data = (
+        b"hello"
+        + schema("<hf")
+        + sample("<hf", 1, 2.5)
+        + b"\r\n(3, 4)\r\n"
+        + sample("<hf", -7, 0.25)
+    )
+    text, samples = td.feed(data)
+    assert text == b"hello\r\n(3, 4)\r\n"
+    assert samples == [(1, 2.5), (-7, 0.25)]
+
+
+def test_TelemetryDecoder_frames_split_across_chunks():
+    """
+    A frame may be split across several chunks of incoming data.
+    """
+    td = TelemetryDecoder()
+    data = schema("<i") + sample("<i", 0) + sample("<i", 123456)
+    samples = []
+    for i in range(len(data)):
+        text, decoded = td.feed(data[i : i + 1])
+        assert text == b""
+        samples.extend(decoded)
+    assert samples == [(0,), (123456,)]
+
+
+def test_TelemetryDecoder_batched_samples():
+    """
+    A data frame may contain several samples.
+    """
+    td = TelemetryDecoder()
+    batch = b"D" + struct.pack("<hh", 1, 2) + struct.pack("<hh", 3, 4)
+    text, samples = td.feed(schema("<hh") + frame(batch))
+    assert samples == [(1, 2), (3, 4)]
+
+
+def test_TelemetryDecoder_ignores_bad_frames():
+    """
+    Data frames without a schema, or which don't match it, and frames which
+    are invalid or of an unknown type are ignored.
+    """
+    td = TelemetryDecoder()
+    assert td.feed(sample("<i", 1)) == (b"", [])
+    td.feed(schema("<i"))
+    assert td.feed(sample("<hhh", 1, 2, 3)) == (b"", [])
+    assert td.feed(frame(b"X123")) == (b"", [])
+    assert td.feed(frame(b"")) == (b"", [])
+    with mock.patch("mu.telemetry.logger") as mock_logger:
+        assert td.feed(b"\x00\x05\x11\x00") == (b"", [])
+    assert mock_logger.warning.call_count == 1
+    assert td.feed(sample("<i", 1)) == (b"", [(1,)])
+
+
+def test_TelemetryDecoder_invalid_schema():
+    """
+    An invalid schema is ignored, as are the data frames which follow it.
+    """
+    td = TelemetryDecoder()
+    td.feed(schema("<h"))
+    with mock.patch("mu.telemetry.logger") as mock_logger:
+        td.feed(frame(b"S<hq!"))
+    assert mock_logger.warning.call_count == 1
+    assert td.schema is None
+    assert td.feed(sample("<h", 1)) == (b"", [])
+
+
+def test_TelemetryDecoder_resynchronises():
+    """
+    If the decoder starts mid-frame (so frames and text are the wrong way
+    around) it recovers once frames arrive back to back, or once a "frame"
+    grows too large.
+    """
+    td = TelemetryDecoder()
+    full = schema("<h") + sample("<h", 1)
+    # Start part way through the schema frame.
+    text, samples = td.feed(full[3:] + sample("<h", 2) + schema("<h"))
+    assert samples == []
+    text, samples = td.feed(sample("<h", 3))
+    assert samples == [(3,)]
+    # Lose track again, and receive lots of text.
+    td.frame = bytearray()
+    with mock.patch("mu.telemetry.logger") as mock_logger:
+        td.feed(b"x" * (mu.telemetry.MAX_FRAME_SIZE + 1))
+    assert mock_logger.warning.call_count == 1
+    assert td.frame is None
+    assert td.feed(b"(1, 2)\n") == (b"(1, 2)\n", [])
+
+
+def test_micropython_helper():
+    """
+    Frames sent by the MicroPython helper module (which also works in
+    CPython) are decoded by the TelemetryDecoder.
+    """
+    spec = importlib.util.spec_from_file_location(
+        "mu_telemetry", path("mu_telemetry.py", "micropython/")
+    )
+    helper = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(helper)
+    sent = []
+    telemetry = helper.Telemetry("hf", schema_every=2, write=sent.append)
+    assert telemetry.fmt == "<hf"
+    for i in range(3):
+        telemetry.send(i, i / 2)
+    # Schema, sample, sample, schema, sample.
+    assert len(sent) == 5
+    assert sent[0] == sent[3] == schema("<hf")
+    td = TelemetryDecoder()
+    text, samples = td.feed(b"".join(sent))
+    assert text == b""
+    assert samples == [(0, 0.0), (1, 0.5), (2, 1.0)]
+    assert helper.cobs_encode(b"x" * 300 + b"\x00") == cobs_encode(
+        b"x" * 300 + b"\x00"
+    )